@@ -57,6 +57,9 @@ from admin_web.core.rbac import require_role
 from admin_web.modules.base import WebModule
 from admin_web.modules.gk_knowledge.module import GKKnowledgeModule
 from admin_web.modules.process_manager.module import ProcessManagerModule
+from src.core.ai.db_log_sink import close_db_log_sink
+from src.core.ai.gigachat_client_pool import close_gigachat_client_pool
+from src.core.ai.llm_provider import close_llm_http_clients
 
 logger = logging.getLogger(__name__)
 
@@ -240,9 +243,21 @@ async def _mount_static() -> None:
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
-    """Хуки завершения модулей."""
+    """Хуки завершения модулей, дозапись очереди логов БД и закрытие клиентов LLM."""
     for module in _MODULES:
         module.on_shutdown()
+    sink_stats = await close_db_log_sink()
+    if sink_stats:
+        logger.info(
+            "Очередь логов БД закрыта: записано=%d, отброшено=%d, ошибок=%d",
+            sink_stats["written"],
+            sink_stats["dropped"],
+            sink_stats["failed"],
+        )
+    closed = await close_llm_http_clients()
+    if closed:
+        logger.info("Закрыто HTTP-клиентов LLM: %d", closed)
+    close_gigachat_client_pool()
 
 
 # ---------------------------------------------------------------------------
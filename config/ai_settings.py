@@ -68,6 +68,16 @@ LLM_READ_TIMEOUT: Final[int] = int(os.getenv("AI_LLM_READ_TIMEOUT", "120"))
 # Reasoner может отвечать значительно дольше обычной chat-модели.
 LLM_REASONER_READ_TIMEOUT: Final[int] = int(os.getenv("AI_LLM_REASONER_READ_TIMEOUT", "300"))
 
+# Пул HTTP-соединений DeepSeek (общий для всех экземпляров провайдера в event loop).
+# Включить HTTP/2 (требуется пакет h2; без него — HTTP/1.1 keep-alive).
+DEEPSEEK_HTTP2_ENABLED: Final[bool] = os.getenv("DEEPSEEK_HTTP2_ENABLED", "1") == "1"
+# Максимум одновременных соединений к DeepSeek API.
+DEEPSEEK_MAX_CONNECTIONS: Final[int] = int(os.getenv("DEEPSEEK_MAX_CONNECTIONS", "20"))
+# Максимум простаивающих keep-alive соединений в пуле.
+DEEPSEEK_MAX_KEEPALIVE_CONNECTIONS: Final[int] = int(os.getenv("DEEPSEEK_MAX_KEEPALIVE_CONNECTIONS", "10"))
+# Время жизни простаивающего keep-alive соединения (секунды).
+DEEPSEEK_KEEPALIVE_EXPIRY_SECONDS: Final[float] = float(os.getenv("DEEPSEEK_KEEPALIVE_EXPIRY_SECONDS", "60"))
+
 # Параметры генерации LLM для intent-классификации.
 LLM_CLASSIFICATION_TEMPERATURE: Final[float] = float(
     os.getenv("AI_LLM_CLASSIFICATION_TEMPERATURE", "0.1")
@@ -84,6 +94,13 @@ LLM_CHAT_MAX_TOKENS: Final[int] = int(
     os.getenv("AI_LLM_CHAT_MAX_TOKENS", "1024")
 )
 
+# Потоковый вывод свободного ответа AI (general_chat/fallback_chat): плейсхолдер
+# в Telegram обновляется по мере генерации (``stream_chat``, SSE у DeepSeek).
+AI_CHAT_STREAMING_ENABLED: Final[bool] = os.getenv("AI_CHAT_STREAMING_ENABLED", "1") == "1"
+# Минимальный интервал между обновлениями плейсхолдера (миллисекунды);
+# Telegram ограничивает частоту редактирования сообщений.
+AI_CHAT_STREAM_UPDATE_INTERVAL_MS: Final[int] = int(os.getenv("AI_CHAT_STREAM_UPDATE_INTERVAL_MS", "1000"))
+
 # Логирование prompt/response модели
 # Включить логирование входа/выхода модели в приложении.
 AI_LOG_MODEL_IO: Final[bool] = os.getenv("AI_LOG_MODEL_IO", "1") == "1"
@@ -94,6 +111,20 @@ AI_MODEL_IO_DB_LOG_ENABLED: Final[bool] = os.getenv("AI_MODEL_IO_DB_LOG_ENABLED"
 # Срок хранения записей model I/O в БД (дней).
 AI_MODEL_IO_DB_RETENTION_DAYS: Final[int] = int(os.getenv("AI_MODEL_IO_DB_RETENTION_DAYS", "30"))
 
+# Фоновая пакетная запись логов в БД (ai_router_log, ai_model_io_log, rag_query_log, gk_responder_log)
+# Включить фоновую запись (0 — INSERT в вызывающем потоке, как раньше).
+AI_DB_LOG_SINK_ENABLED: Final[bool] = os.getenv("AI_DB_LOG_SINK_ENABLED", "1") == "1"
+# Размер очереди записей; при переполнении новые записи отбрасываются (со счётчиком).
+AI_DB_LOG_SINK_MAX_QUEUE: Final[int] = int(os.getenv("AI_DB_LOG_SINK_MAX_QUEUE", "5000"))
+# Суммарный размер параметров записей в очереди (байт); при превышении записи отбрасываются.
+AI_DB_LOG_SINK_MAX_QUEUE_BYTES: Final[int] = int(os.getenv("AI_DB_LOG_SINK_MAX_QUEUE_BYTES", str(64 * 1024 * 1024)))
+# Максимум записей в одном пакете (executemany).
+AI_DB_LOG_SINK_BATCH_SIZE: Final[int] = int(os.getenv("AI_DB_LOG_SINK_BATCH_SIZE", "100"))
+# Максимальный размер одного INSERT пакета таблицы (байт); должен быть заметно меньше max_allowed_packet MySQL.
+AI_DB_LOG_SINK_MAX_BATCH_BYTES: Final[int] = int(os.getenv("AI_DB_LOG_SINK_MAX_BATCH_BYTES", str(2 * 1024 * 1024)))
+# Максимальное время накопления пакета перед записью (миллисекунды).
+AI_DB_LOG_SINK_FLUSH_INTERVAL_MS: Final[int] = int(os.getenv("AI_DB_LOG_SINK_FLUSH_INTERVAL_MS", "1000"))
+
 # =============================================
 # Пороги уверенности (confidence)
 # =============================================
@@ -107,6 +138,19 @@ CHAT_CONFIDENCE_THRESHOLD: Final[float] = float(os.getenv("AI_CHAT_CONFIDENCE_TH
 # Максимальная длина пользовательского запроса (символов).
 MAX_INPUT_LENGTH: Final[int] = int(os.getenv("AI_MAX_INPUT_LENGTH", "4000"))
 
+# Быстрый локальный pre-classifier intent перед LLM (коды UPOS/КТР, тикеты СООС, centroid-модель).
+AI_INTENT_PRECLASSIFIER_ENABLED: Final[bool] = os.getenv("AI_INTENT_PRECLASSIFIER_ENABLED", "1") == "1"
+# Минимальная уверенность правил pre-classifier, при которой LLM-классификация пропускается.
+AI_INTENT_PRECLASSIFIER_MIN_CONFIDENCE: Final[float] = float(
+    os.getenv("AI_INTENT_PRECLASSIFIER_MIN_CONFIDENCE", "0.9")
+)
+# Путь к centroid-модели intent (.npz, scripts/train_intent_centroids.py); пусто — модель не используется.
+AI_INTENT_CENTROID_MODEL_PATH: Final[str] = os.getenv("AI_INTENT_CENTROID_MODEL_PATH", "").strip()
+# Минимальное косинусное сходство с ближайшим центроидом для быстрого ответа.
+AI_INTENT_CENTROID_MIN_SIMILARITY: Final[float] = float(os.getenv("AI_INTENT_CENTROID_MIN_SIMILARITY", "0.85"))
+# Минимальный отрыв ближайшего центроида от второго по сходству.
+AI_INTENT_CENTROID_MIN_MARGIN: Final[float] = float(os.getenv("AI_INTENT_CENTROID_MIN_MARGIN", "0.05"))
+
 # =============================================
 # Rate-limit: защита от спама и стоимости
 # =============================================
@@ -234,6 +278,20 @@ AI_RAG_SUMMARY_FALLBACK_MAX_CONTEXT_CHARS: Final[int] = int(
 # TTL-кэш ответов RAG (секунды)
 # Время жизни кешированного ответа на одинаковый запрос.
 AI_RAG_CACHE_TTL_SECONDS: Final[int] = int(os.getenv("AI_RAG_CACHE_TTL_SECONDS", "300"))
+# Максимум записей в кэше ответов RAG (LRU-вытеснение).
+AI_RAG_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("AI_RAG_CACHE_MAX_ENTRIES", "2000"))
+# Бюджет кэша ответов RAG по приблизительному размеру (МБ, 0 — без ограничения).
+AI_RAG_CACHE_MAX_MB: Final[float] = float(os.getenv("AI_RAG_CACHE_MAX_MB", "32"))
+# Семантический кэш ответов RAG: ответ на близкий по эмбеддингу вопрос той же
+# версии корпуса и категории переиспользуется без HyDE/retrieval/LLM.
+# Токены с цифрами (коды ошибок, номера) у вопросов должны совпадать точно.
+AI_RAG_SEMANTIC_CACHE_ENABLED: Final[bool] = os.getenv("AI_RAG_SEMANTIC_CACHE_ENABLED", "1") == "1"
+# Минимальное косинусное сходство вопросов для попадания в семантический кэш.
+AI_RAG_SEMANTIC_CACHE_THRESHOLD: Final[float] = float(os.getenv("AI_RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# Максимум записей семантического кэша (LRU-вытеснение).
+AI_RAG_SEMANTIC_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("AI_RAG_SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+# Максимум записей в кэше нормализации токенов (лемматизация/стемминг) RAG и GK.
+AI_RAG_TOKEN_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("AI_RAG_TOKEN_CACHE_MAX_ENTRIES", "200000"))
 
 # Векторный retrieval (локальный индекс и локальная embedding-модель)
 # Глобальный флаг включения векторного retrieval.
@@ -299,6 +357,29 @@ AI_RAG_VECTOR_EMBEDDING_CACHE_DIR: Final[str] = os.getenv("AI_RAG_VECTOR_EMBEDDI
 AI_RAG_VECTOR_EMBEDDING_OFFLINE: Final[bool] = os.getenv("AI_RAG_VECTOR_EMBEDDING_OFFLINE", "0") == "1"
 # Завершать старт процесса с ошибкой, если эмбеддинг-модель недоступна.
 AI_RAG_VECTOR_EMBEDDING_FAIL_FAST: Final[bool] = os.getenv("AI_RAG_VECTOR_EMBEDDING_FAIL_FAST", "0") == "1"
+# Объединять одновременные encode-запросы (RAG, GK, prefilter, HyDE) в один батч модели.
+AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED: Final[bool] = (
+    os.getenv("AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED", "1") == "1"
+)
+# Максимальное число текстов в объединённом батче.
+AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH: Final[int] = int(
+    os.getenv("AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH", "32")
+)
+# Сколько миллисекунд ждать попутные запросы перед запуском батча (0 — без ожидания,
+# батч собирается только из запросов, пришедших во время предыдущего прохода модели).
+AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_WAIT_MS: Final[float] = float(
+    os.getenv("AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_WAIT_MS", "5")
+)
+# Кэшировать эмбеддинги по (модель, нормализованный текст): запросы, HyDE, summary, GK.
+AI_RAG_EMBEDDING_CACHE_ENABLED: Final[bool] = os.getenv("AI_RAG_EMBEDDING_CACHE_ENABLED", "1") == "1"
+# Бюджет in-memory LRU кэша эмбеддингов (МБ).
+AI_RAG_EMBEDDING_CACHE_MAX_MB: Final[float] = float(os.getenv("AI_RAG_EMBEDDING_CACHE_MAX_MB", "64"))
+# Каталог memory-mapped хранилища эмбеддингов (если пусто — только память).
+AI_RAG_EMBEDDING_CACHE_DISK_DIR: Final[str] = os.getenv("AI_RAG_EMBEDDING_CACHE_DISK_DIR", "").strip()
+# Ёмкость дискового хранилища на одну модель (векторов, кольцевой буфер).
+AI_RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES: Final[int] = int(
+    os.getenv("AI_RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES", "200000")
+)
 # Вес lexical-score в гибридной формуле ранжирования.
 AI_RAG_VECTOR_LEXICAL_WEIGHT: Final[float] = float(os.getenv("AI_RAG_VECTOR_LEXICAL_WEIGHT", "0.45"))
 # Вес semantic-score в гибридной формуле ранжирования.
@@ -365,6 +446,8 @@ AI_RAG_HYDE_SETTING_KEY: Final[str] = "ai_rag_hyde_enabled"
 AI_RAG_HYDE_MAX_CHARS: Final[int] = int(os.getenv("AI_RAG_HYDE_MAX_CHARS", "500"))
 # TTL кэша HyDE-текстов (секунды).
 AI_RAG_HYDE_CACHE_TTL_SECONDS: Final[int] = int(os.getenv("AI_RAG_HYDE_CACHE_TTL_SECONDS", "300"))
+# Максимум записей в кэше HyDE-текстов.
+AI_RAG_HYDE_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("AI_RAG_HYDE_CACHE_MAX_ENTRIES", "2000"))
 # Дополнять BM25 lexical scoring уникальными токенами из HyDE-текста.
 # Если включено, токены из гипотетического документа (после фильтрации стоп-слов)
 # добавляются к query-токенам для summary prefilter и chunk BM25 scoring.
@@ -417,6 +500,10 @@ AI_RAG_SPELLCHECK_LLM_MAX_CHARS: Final[int] = int(
 AI_RAG_SPELLCHECK_LLM_CACHE_TTL_SECONDS: Final[int] = int(
     os.getenv("AI_RAG_SPELLCHECK_LLM_CACHE_TTL_SECONDS", "300")
 )
+# Максимум записей в кэше LLM-коррекций.
+AI_RAG_SPELLCHECK_LLM_CACHE_MAX_ENTRIES: Final[int] = int(
+    os.getenv("AI_RAG_SPELLCHECK_LLM_CACHE_MAX_ENTRIES", "2000")
+)
 
 
 # =============================================
@@ -648,6 +735,28 @@ def is_rag_spellcheck_llm_fallback_enabled() -> bool:
     return normalized in {"1", "true", "yes", "on"}
 
 
+# =============================================
+# Настройки retrieval executor и мониторинга event loop
+# =============================================
+
+# Размер пула потоков для блокирующих I/O-операций retrieval (MySQL, Qdrant).
+AI_RETRIEVAL_IO_WORKERS: Final[int] = int(os.getenv("AI_RETRIEVAL_IO_WORKERS", "8"))
+# Размер отдельного пула для вычисления эмбеддингов запросов (CPU/GPU-bound).
+# Запросы через коалесцер (AI_RAG_VECTOR_EMBEDDING_COALESCE_*) этим пулом не ограничиваются.
+AI_RETRIEVAL_EMBEDDING_WORKERS: Final[int] = int(os.getenv("AI_RETRIEVAL_EMBEDDING_WORKERS", "2"))
+# Включить фоновое измерение задержки event loop бота.
+AI_EVENT_LOOP_LAG_MONITOR_ENABLED: Final[bool] = os.getenv("AI_EVENT_LOOP_LAG_MONITOR_ENABLED", "1") == "1"
+# Интервал замера задержки event loop (секунды).
+AI_EVENT_LOOP_LAG_INTERVAL_SECONDS: Final[float] = float(
+    os.getenv("AI_EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5")
+)
+# Порог задержки event loop (мс), при превышении которого пишется warning.
+AI_EVENT_LOOP_LAG_WARN_MS: Final[float] = float(os.getenv("AI_EVENT_LOOP_LAG_WARN_MS", "200"))
+# Период записи сводки задержки event loop в лог (секунды, 0 — не писать).
+AI_EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("AI_EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS", "300")
+)
+
 # =============================================
 # Настройки GigaChat (визуальное описание изображений)
 # =============================================
@@ -666,6 +775,14 @@ GIGACHAT_CA_BUNDLE_FILE: Final[str] = os.getenv("GIGACHAT_CA_BUNDLE_FILE", "")
 GIGACHAT_TIMEOUT: Final[float] = float(os.getenv("GIGACHAT_TIMEOUT", "60.0"))
 # Максимальное число повторных попыток при ошибках GigaChat.
 GIGACHAT_MAX_RETRIES: Final[int] = int(os.getenv("GIGACHAT_MAX_RETRIES", "2"))
+# Размер пула потоков для синхронных вызовов GigaChat SDK.
+GIGACHAT_MAX_WORKERS: Final[int] = int(os.getenv("GIGACHAT_MAX_WORKERS", "4"))
+# Максимум одновременных запросов к GigaChat (остальные ждут в очереди).
+GIGACHAT_MAX_IN_FLIGHT: Final[int] = int(os.getenv("GIGACHAT_MAX_IN_FLIGHT", "4"))
+# За сколько секунд до истечения access token обновлять его в фоне (0 — только по требованию SDK).
+GIGACHAT_TOKEN_REFRESH_AHEAD_SECONDS: Final[float] = float(
+    os.getenv("GIGACHAT_TOKEN_REFRESH_AHEAD_SECONDS", "300")
+)
 
 # =============================================
 # Настройки Group Knowledge (майнинг знаний)
@@ -820,6 +937,9 @@ GK_RU_NORMALIZATION_ENABLED: Final[bool] = os.getenv("GK_RU_NORMALIZATION_ENABLE
 GK_SEARCH_CANDIDATES_PER_METHOD: Final[int] = int(os.getenv("GK_SEARCH_CANDIDATES_PER_METHOD", "20"))
 # TTL кэша BM25-корпуса в секундах (перезагружает Q&A-пары из БД).
 GK_BM25_CORPUS_TTL_SECONDS: Final[int] = int(os.getenv("GK_BM25_CORPUS_TTL_SECONDS", "300"))
+# Перекрытие окна инкрементального обновления BM25-корпуса (секунды): пары с updated_at
+# не раньше watermark минус перекрытие перечитываются, чтобы не терять поздно закоммиченные транзакции.
+GK_BM25_INCREMENTAL_OVERLAP_SECONDS: Final[int] = int(os.getenv("GK_BM25_INCREMENTAL_OVERLAP_SECONDS", "120"))
 # Мастер-переключатель передачи подсказок релевантности в промпт LLM.
 GK_RELEVANCE_HINTS_ENABLED: Final[bool] = os.getenv("GK_RELEVANCE_HINTS_ENABLED", "1") == "1"
 # Если включено, пары с tier=низкая не передаются в LLM-контекст ответа GK.
@@ -847,6 +967,8 @@ GK_SPELLCHECK_LLM_FALLBACK_THRESHOLD: Final[float] = float(os.getenv("GK_SPELLCH
 GK_SPELLCHECK_LLM_MAX_CHARS: Final[int] = int(os.getenv("GK_SPELLCHECK_LLM_MAX_CHARS", "500"))
 # TTL кэша LLM-fallback коррекции (секунды).
 GK_SPELLCHECK_LLM_CACHE_TTL_SECONDS: Final[int] = int(os.getenv("GK_SPELLCHECK_LLM_CACHE_TTL_SECONDS", "300"))
+# Максимум записей в кэше LLM-fallback коррекции.
+GK_SPELLCHECK_LLM_CACHE_MAX_ENTRIES: Final[int] = int(os.getenv("GK_SPELLCHECK_LLM_CACHE_MAX_ENTRIES", "2000"))
 
 # ---------------------------------------------------------------------------
 # GK Term Mining (сканирование терминов и аббревиатур)
@@ -22,3 +22,35 @@ MYSQL_PASSWORD: Final[str] = os.getenv("MYSQL_PASSWORD", "dev_password")
 MYSQL_HOST: Final[str] = os.getenv("MYSQL_HOST", "localhost")
 MYSQL_PORT: Final[int] = int(os.getenv("MYSQL_PORT", "3306"))
 MYSQL_DATABASE: Final[str] = os.getenv("MYSQL_DATABASE", "myapp_dev")
+
+# ─────────────────────────────────────────────────────────────
+# Пул соединений
+# ─────────────────────────────────────────────────────────────
+
+# Максимум одновременно открытых соединений пула.
+DB_POOL_SIZE: Final[int] = int(os.getenv("DB_POOL_SIZE", "5"))
+# Сколько секунд ждать свободное соединение, прежде чем вернуть ошибку.
+DB_POOL_ACQUIRE_TIMEOUT_SECONDS: Final[float] = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT_SECONDS", "10"))
+# Соединение, простаивавшее дольше этого, проверяется ping перед выдачей.
+DB_POOL_PREPING_IDLE_SECONDS: Final[float] = float(os.getenv("DB_POOL_PREPING_IDLE_SECONDS", "30"))
+# Максимальный срок жизни соединения (0 — без ограничения); старые соединения пересоздаются.
+DB_POOL_MAX_LIFETIME_SECONDS: Final[float] = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "3600"))
+# Потоки асинхронного фасада БД для функций, открывающих соединение сами
+# (запросы через выданные соединения выполняются в отдельном пуле размером DB_POOL_SIZE).
+DB_ASYNC_IO_WORKERS: Final[int] = int(os.getenv("DB_ASYNC_IO_WORKERS", "8"))
+
+# ─────────────────────────────────────────────────────────────
+# Снимок настроек (bot_settings, gamification_settings, certification_settings)
+# и справочники кодов UPOS и КТР (src/common/code_dictionary.py)
+# ─────────────────────────────────────────────────────────────
+
+# Как часто (сек) сверять счётчики версий в settings_version; задаёт задержку
+# применения изменений, сделанных другим процессом (admin_web, второй бот).
+SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS: Final[float] = float(
+    os.getenv("SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS", "1")
+)
+# Максимальный возраст снимка (сек): страховка, если таблица settings_version
+# не создана или настройки изменены в БД напрямую, минуя set_setting.
+SETTINGS_SNAPSHOT_MAX_AGE_SECONDS: Final[float] = float(
+    os.getenv("SETTINGS_SNAPSHOT_MAX_AGE_SECONDS", "60")
+)
@@ -42,6 +42,18 @@ TELEGRAM_SEND_DOC_READ_TIMEOUT_SECONDS: Final[int] = int(
     os.getenv("TELEGRAM_SEND_DOC_READ_TIMEOUT_SECONDS", "180")
 )
 
+# =============================================
+# Runtime status
+# Публикация внутрипроцессной статистики (кэши, пул БД) в runtime_process_status
+# =============================================
+
+# Интервал публикации снимка статистики процесса (0 — не публиковать).
+RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS: Final[int] = int(
+    os.getenv("RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS", "60")
+)
+# Снимки старше этого возраста не показываются и удаляются (процесс остановлен).
+RUNTIME_STATUS_MAX_AGE_SECONDS: Final[int] = int(os.getenv("RUNTIME_STATUS_MAX_AGE_SECONDS", "600"))
+
 # =============================================
 # Настройки обработки изображений (vyezd_byl)
 # =============================================
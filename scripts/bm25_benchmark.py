@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Бенчмарк BM25: rank_bm25.BM25Okapi против векторизованного SparseBM25Index.
+
+Генерирует синтетический корпус (по умолчанию 100 000 документов с
+Zipf-распределением словаря), проверяет совпадение score и замеряет:
+  - BM25Okapi: построение + scoring на каждый запрос (прежнее поведение);
+  - SparseBM25Index: однократное построение и scoring/top-k на запрос.
+
+Примеры:
+  python scripts/bm25_benchmark.py
+  python scripts/bm25_benchmark.py --documents 20000 --queries 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _build_corpus(documents: int, vocabulary: int, seed: int) -> List[List[str]]:
+    """Собрать синтетический корпус с Zipf-подобной частотой токенов."""
+    rng = random.Random(seed)
+    words = [f"w{index}" for index in range(vocabulary)]
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+    corpus: List[List[str]] = []
+    for _ in range(documents):
+        length = rng.randint(8, 60)
+        corpus.append(rng.choices(words, weights=weights, k=length))
+    return corpus
+
+
+def _build_queries(queries: int, vocabulary: int, seed: int) -> List[List[str]]:
+    """Собрать запросы из 2–6 токенов средней и низкой частоты."""
+    rng = random.Random(seed + 1)
+    return [
+        [f"w{rng.randint(5, vocabulary - 1)}" for _ in range(rng.randint(2, 6))]
+        for _ in range(queries)
+    ]
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _report(label: str, durations: List[float]) -> None:
+    print(
+        f"{label:<40} mean={statistics.mean(durations) * 1000:9.2f} ms  "
+        f"p50={_percentile(durations, 50) * 1000:9.2f} ms  "
+        f"p95={_percentile(durations, 95) * 1000:9.2f} ms"
+    )
+
+
+def main(argv: List[str] | None = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк BM25Okapi vs SparseBM25Index")
+    parser.add_argument("--documents", type=int, default=100_000, help="Размер корпуса (по умолчанию 100000)")
+    parser.add_argument("--vocabulary", type=int, default=50_000, help="Размер словаря")
+    parser.add_argument("--queries", type=int, default=20, help="Число запросов")
+    parser.add_argument("--top-k", type=int, default=10, help="Размер top-k")
+    parser.add_argument("--legacy-queries", type=int, default=3, help="Сколько запросов прогнать через BM25Okapi (0 — пропустить)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    import numpy as np  # noqa: PLC0415
+
+    from src.core.ai.bm25_engine import SparseBM25Index  # noqa: PLC0415
+
+    print(f"Корпус: documents={args.documents} vocabulary={args.vocabulary} queries={args.queries}")
+    corpus = _build_corpus(args.documents, args.vocabulary, args.seed)
+    queries = _build_queries(args.queries, args.vocabulary, args.seed)
+
+    started = time.perf_counter()
+    index = SparseBM25Index(corpus, k1=1.5, b=0.75)
+    print(f"SparseBM25Index build: {(time.perf_counter() - started) * 1000:.1f} ms, terms={index.vocabulary_size}")
+
+    score_durations: List[float] = []
+    top_k_durations: List[float] = []
+    for query in queries:
+        started = time.perf_counter()
+        index.get_scores(query)
+        score_durations.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index.top_k(query, args.top_k)
+        top_k_durations.append(time.perf_counter() - started)
+    _report("SparseBM25Index.get_scores", score_durations)
+    _report(f"SparseBM25Index.top_k(k={args.top_k})", top_k_durations)
+
+    if args.legacy_queries <= 0:
+        return 0
+
+    try:
+        from rank_bm25 import BM25Okapi  # noqa: PLC0415
+    except ImportError:
+        print("rank_bm25 не установлен — сравнение с BM25Okapi пропущено.")
+        return 0
+
+    legacy_durations: List[float] = []
+    max_abs_diff = 0.0
+    for query in queries[: args.legacy_queries]:
+        started = time.perf_counter()
+        legacy_scores = BM25Okapi(corpus, k1=1.5, b=0.75).get_scores(query)
+        legacy_durations.append(time.perf_counter() - started)
+        max_abs_diff = max(max_abs_diff, float(np.max(np.abs(legacy_scores - index.get_scores(query)))))
+    _report("BM25Okapi build + get_scores", legacy_durations)
+    print(f"Максимальное расхождение score: {max_abs_diff:.3e}")
+    return 0 if max_abs_diff < 1e-9 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Перестройка и обслуживание предрасчитанных сводок аттестации.
+
+Режимы:
+  - по умолчанию: полная перестройка certification_user_summary,
+    certification_user_category_results и certification_monthly_results
+    по истории certification_attempts (после установки
+    sql/certification_summary_setup.sql или при расхождении данных).
+    Запускайте при остановленном боте;
+  - --sweep-expired: пересчёт результатов по категориям, лучший процент
+    которых вышел из окна CATEGORY_RESULT_VALIDITY_DAYS. Безопасно
+    запускать при работающем боте, например ежедневно из cron.
+
+Примеры:
+  python scripts/certification_summary_rebuild.py
+  python scripts/certification_summary_rebuild.py --sweep-expired
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа скрипта."""
+    from src.sbs_helper_telegram_bot.certification import certification_logic, settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description="Перестройка сводок аттестации")
+    parser.add_argument(
+        "--sweep-expired",
+        action="store_true",
+        help="Только пересчитать истёкшие результаты по категориям",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Размер пачки (по умолчанию 1000 для перестройки, "
+        f"{settings.CATEGORY_RESULT_SWEEP_BATCH_SIZE} для очистки)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.sweep_expired:
+        updated = certification_logic.sweep_expired_category_results(
+            args.batch_size or settings.CATEGORY_RESULT_SWEEP_BATCH_SIZE
+        )
+        print(f"expired category results recalculated: {updated}")
+        return 0
+
+    counts = certification_logic.rebuild_certification_summaries(args.batch_size or 1000)
+    if counts is None:
+        print("rebuild failed, see log")
+        return 1
+    for table, count in counts.items():
+        print(f"{table}: {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
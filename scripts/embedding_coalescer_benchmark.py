@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Бенчмарк объединения encode-запросов: 1, 8 и 32 одновременных вызывающих.
+
+Каждый вызывающий в отдельном потоке кодирует ``--requests`` коротких
+запросов по одному тексту — как RAG/GK/HyDE при одновременных вопросах.
+Сравниваются:
+  - direct: каждый вызов — отдельный проход модели (прежнее поведение);
+  - coalesced: вызовы объединяются ``EmbeddingRequestCoalescer``;
+  - off_loop: рабочий путь retrieval — ``RetrievalExecutor.encode_texts``
+    из I/O-потоков над ``LocalEmbeddingProvider`` с коалесцером и
+    embedding-пулом размера ``AI_RETRIEVAL_EMBEDDING_WORKERS`` (кэш
+    эмбеддингов отключён).
+
+По умолчанию используется синтетическая CPU-модель на NumPy (фиксированная
+стоимость прохода + стоимость на текст), чтобы бенчмарк работал без
+sentence-transformers. С ``--real-model`` используется ``LocalEmbeddingProvider``
+и модель из AI_RAG_VECTOR_EMBEDDING_MODEL.
+
+Примеры:
+  python scripts/embedding_coalescer_benchmark.py
+  python scripts/embedding_coalescer_benchmark.py --real-model --requests 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+from unittest import mock
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _build_synthetic_encoder(dim: int, hidden: int, call_overhead_ms: float) -> Callable[[List[str]], List[List[float]]]:
+    """Собрать синтетическую модель: 2 dense-слоя над хэш-эмбеддингами символов."""
+    import numpy as np  # noqa: PLC0415
+
+    rng = np.random.default_rng(0)
+    token_table = rng.standard_normal((4096, hidden)).astype(np.float32)
+    layer_1 = rng.standard_normal((hidden, hidden)).astype(np.float32) / np.sqrt(hidden)
+    layer_2 = rng.standard_normal((hidden, dim)).astype(np.float32) / np.sqrt(hidden)
+    lock = threading.Lock()
+
+    def _encode(texts: List[str]) -> List[List[float]]:
+        with lock:
+            # Фиксированная стоимость прохода (подготовка батча, запуск графа модели).
+            deadline = time.perf_counter() + call_overhead_ms / 1000.0
+            while time.perf_counter() < deadline:
+                pass
+            seq_len = 64
+            ids = np.array(
+                [[hash((text, position)) % 4096 for position in range(seq_len)] for text in texts],
+                dtype=np.int64,
+            )
+            hidden_states = np.tanh(token_table[ids] @ layer_1)
+            pooled = hidden_states.mean(axis=1) @ layer_2
+            pooled /= np.linalg.norm(pooled, axis=1, keepdims=True) + 1e-9
+            return pooled.tolist()
+
+    return _encode
+
+
+def _run(callers: int, requests: int, encode_one: Callable[[str], List[float]]) -> float:
+    barrier = threading.Barrier(callers)
+    errors: List[BaseException] = []
+
+    def _worker(caller_id: int) -> None:
+        barrier.wait()
+        try:
+            for request_id in range(requests):
+                vector = encode_one(f"вопрос пользователя {caller_id}-{request_id} про настройку терминала")
+                if not vector:
+                    raise RuntimeError("пустой вектор")
+        except BaseException as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_worker, args=(caller_id,)) for caller_id in range(callers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк объединения encode-запросов")
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 8, 32], help="Числа одновременных вызывающих")
+    parser.add_argument("--requests", type=int, default=40, help="Запросов на одного вызывающего")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--dim", type=int, default=1024, help="Размерность синтетической модели")
+    parser.add_argument("--hidden", type=int, default=256, help="Скрытый размер синтетической модели")
+    parser.add_argument("--call-overhead-ms", type=float, default=8.0, help="Фиксированная стоимость прохода синтетической модели")
+    parser.add_argument("--real-model", action="store_true", help="Использовать LocalEmbeddingProvider")
+    args = parser.parse_args(argv)
+
+    from config import ai_settings  # noqa: PLC0415
+    from src.core.ai.embedding_coalescer import EmbeddingRequestCoalescer  # noqa: PLC0415
+    from src.core.ai.retrieval_executor import RetrievalExecutor  # noqa: PLC0415
+    from src.core.ai.vector_search import LocalEmbeddingProvider  # noqa: PLC0415
+
+    if args.real_model:
+        provider = LocalEmbeddingProvider()
+        if not provider.is_ready():
+            print(f"Embedding-модель недоступна: {provider.last_error_message()}")
+            return 1
+        encode_batch = provider._encode_texts_batch  # noqa: SLF001 — прямой проход модели без коалесцера
+        print("Модель: LocalEmbeddingProvider")
+    else:
+        encode_batch = _build_synthetic_encoder(args.dim, args.hidden, args.call_overhead_ms)
+        print(f"Модель: синтетическая NumPy dim={args.dim} hidden={args.hidden} overhead={args.call_overhead_ms} ms")
+
+    encode_batch(["прогрев"])
+    print(f"requests/caller={args.requests} max_batch={args.max_batch} max_wait={args.max_wait_ms} ms")
+
+    for callers in args.callers:
+        total = callers * args.requests
+        direct_elapsed = _run(callers, args.requests, lambda text: encode_batch([text])[0])
+
+        coalescer = EmbeddingRequestCoalescer(
+            encode_batch,
+            max_batch_size=args.max_batch,
+            max_wait_ms=args.max_wait_ms,
+        )
+        coalesced_elapsed = _run(callers, args.requests, lambda text: coalescer.encode_texts([text])[0])
+        stats = coalescer.snapshot()
+        coalescer.close()
+
+        executor = RetrievalExecutor(io_workers=max(callers, 1))
+        with mock.patch.object(ai_settings, "AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED", True), \
+             mock.patch.object(ai_settings, "AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH", args.max_batch), \
+             mock.patch.object(ai_settings, "AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_WAIT_MS", args.max_wait_ms), \
+             mock.patch("src.core.ai.vector_search.get_embedding_cache", return_value=None):
+            wired_provider = LocalEmbeddingProvider()
+            wired_provider._encode_texts_batch = encode_batch  # noqa: SLF001 — модель бенчмарка
+            off_loop_elapsed = _run(
+                callers, args.requests, lambda text: executor.encode_texts(wired_provider, [text])[0]
+            )
+        off_loop_stats = wired_provider.coalescer_stats()
+        wired_provider._coalescer.close()  # noqa: SLF001
+        executor.shutdown(wait=True)
+
+        print(
+            f"callers={callers:<3} direct={total / direct_elapsed:8.1f} q/s  "
+            f"coalesced={total / coalesced_elapsed:8.1f} q/s  "
+            f"x{direct_elapsed / coalesced_elapsed:5.2f}  "
+            f"avg_batch={stats['avg_batch_texts']:.1f} batches={int(stats['batches'])}  "
+            f"off_loop={total / off_loop_elapsed:8.1f} q/s "
+            f"avg_batch={off_loop_stats['avg_batch_texts']:.1f} (embedding_workers={executor.embedding_workers})"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
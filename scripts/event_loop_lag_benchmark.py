@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Бенчмарк задержки event loop: retrieval в loop против retrieval executor.
+
+Эмулирует одновременные вопросы пользователей. Retrieval каждого вопроса —
+блокирующий запрос к БД/Qdrant (``--io-ms``, ``time.sleep``) и CPU-bound
+кодирование запроса (``--cpu-ms``, busy loop). Замеряется задержка event
+loop монитором ``EventLoopLagMonitor`` в двух режимах:
+  - inline: retrieval вызывается прямо в корутине (до изменения);
+  - executor: retrieval выполняется через ``RetrievalExecutor``.
+
+Примеры:
+  python scripts/event_loop_lag_benchmark.py
+  python scripts/event_loop_lag_benchmark.py --questions 50 --io-ms 30 --cpu-ms 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _run_mode(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    from src.core.ai.event_loop_monitor import EventLoopLagMonitor  # noqa: PLC0415
+    from src.core.ai.retrieval_executor import RetrievalExecutor  # noqa: PLC0415
+
+    executor = RetrievalExecutor(io_workers=args.io_workers, embedding_workers=args.embedding_workers)
+    monitor = EventLoopLagMonitor(interval_seconds=args.interval_ms / 1000.0, warn_ms=1e9, report_interval_seconds=0)
+
+    class _Provider:
+        def encode_texts(self, texts: List[str]) -> List[List[float]]:
+            _busy_wait(args.cpu_ms / 1000.0)
+            return [[0.0] for _ in texts]
+
+    provider = _Provider()
+
+    def _retrieve_sync() -> None:
+        time.sleep(args.io_ms / 1000.0)
+        executor.encode_texts(provider, ["вопрос"])
+        time.sleep(args.io_ms / 1000.0)
+
+    def _retrieve_inline() -> None:
+        time.sleep(args.io_ms / 1000.0)
+        provider.encode_texts(["вопрос"])
+        time.sleep(args.io_ms / 1000.0)
+
+    async def _question() -> None:
+        if mode == "inline":
+            _retrieve_inline()
+        else:
+            await executor.run_io(_retrieve_sync)
+
+    monitor.start()
+    await asyncio.sleep(args.interval_ms / 1000.0 * 3)
+    started = time.perf_counter()
+    await asyncio.gather(*(_question() for _ in range(args.questions)))
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(args.interval_ms / 1000.0 * 3)
+    await monitor.stop()
+    executor.shutdown(wait=True)
+
+    stats = monitor.snapshot()
+    stats["elapsed_ms"] = elapsed * 1000.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк задержки event loop при retrieval")
+    parser.add_argument("--questions", type=int, default=20, help="Число одновременных вопросов")
+    parser.add_argument("--io-ms", type=float, default=20.0, help="Длительность одного блокирующего I/O-шага, мс")
+    parser.add_argument("--cpu-ms", type=float, default=10.0, help="Длительность кодирования запроса, мс")
+    parser.add_argument("--io-workers", type=int, default=8)
+    parser.add_argument("--embedding-workers", type=int, default=2)
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="Интервал замера задержки, мс")
+    args = parser.parse_args(argv)
+
+    print(
+        f"questions={args.questions} io={args.io_ms}ms x2 cpu={args.cpu_ms}ms "
+        f"io_workers={args.io_workers} embedding_workers={args.embedding_workers}"
+    )
+    for mode in ("inline", "executor"):
+        stats = asyncio.run(_run_mode(mode, args))
+        print(
+            f"{mode:<9} total={stats['elapsed_ms']:8.1f} ms  lag p50={stats['p50_ms']:7.1f} ms  "
+            f"p95={stats['p95_ms']:7.1f} ms  max={stats['max_ms']:7.1f} ms  samples={int(stats['samples'])}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -37,6 +37,9 @@ from src.common.constants.sync import (
     TELETHON_API_HASH,
     GK_COLLECTOR_SESSION_NAME,
 )
+from src.core.ai.db_log_sink import close_db_log_sink
+from src.core.ai.gigachat_client_pool import close_gigachat_client_pool
+from src.core.ai.llm_provider import close_llm_http_clients
 from src.group_knowledge import database as gk_db
 from src.group_knowledge.collector_responder import CollectorResponderBridge
 from src.group_knowledge.image_processor import ImageProcessor
@@ -65,9 +68,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger("gk_collector")
 
+
 QA_COMMAND_PATTERN = re.compile(r"^/qa(?:@[A-Za-z0-9_]+)?(?:\s+(.+))?$", re.IGNORECASE)
 
 
+async def _close_loop_ai_resources() -> None:
+    """Дописать очередь логов БД и закрыть HTTP-клиенты LLM текущего event loop."""
+    # Сначала дописать очередь логов: в ней вызовы LLM и ответы до остановки.
+    sink_stats = await close_db_log_sink()
+    if sink_stats:
+        logger.info(
+            "Очередь логов БД закрыта: записано=%d, отброшено=%d, ошибок=%d",
+            sink_stats["written"],
+            sink_stats["dropped"],
+            sink_stats["failed"],
+        )
+    closed = await close_llm_http_clients()
+    if closed:
+        logger.info("Закрыто HTTP-клиентов LLM: %d", closed)
+
+
 def _validate_telethon_credentials() -> bool:
     """Проверить наличие обязательных Telethon-параметров."""
     if not TELETHON_API_ID or TELETHON_API_ID == 0 or not TELETHON_API_HASH:
@@ -127,6 +147,11 @@ def _run_image_queue_in_thread(
             "Ошибка в фоновом потоке обработки изображений: %s", exc, exc_info=True
         )
     finally:
+        # Логи и HTTP-клиенты LLM привязаны к event loop потока
+        try:
+            loop.run_until_complete(_close_loop_ai_resources())
+        except Exception as exc:
+            logger.warning("Ошибка закрытия ресурсов потока обработки изображений: %s", exc)
         loop.close()
 
 
@@ -595,6 +620,8 @@ async def run_collector(args: argparse.Namespace) -> None:
             except asyncio.CancelledError:
                 pass
         await responder_bridge.stop()
+        await _close_loop_ai_resources()
+        close_gigachat_client_pool()
         await disconnect_client_quietly(client)
         logger.info("Коллектор остановлен")
 
@@ -627,11 +654,15 @@ async def _run_fill_missing_is_question(args: argparse.Namespace) -> None:
         client=None,
         groups=selected_groups,
     )
-    updated = await collector.fill_missing_question_classification(
-        group_id=args.group_id,
-        days=args.fill_days,
-        limit=args.fill_limit,
-    )
+    try:
+        updated = await collector.fill_missing_question_classification(
+            group_id=args.group_id,
+            days=args.fill_days,
+            limit=args.fill_limit,
+        )
+    finally:
+        await _close_loop_ai_resources()
+        close_gigachat_client_pool()
     logger.info("Заполнение missing is_question завершено: updated=%d", updated)
 
 
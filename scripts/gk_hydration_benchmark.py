@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Бенчмарк гидратации кандидатов vector-поиска Group Knowledge.
+
+Сравнивает три способа поднять Q&A-пары для top_k кандидатов Qdrant:
+  - legacy: ``gk_db.get_qa_pair_by_id`` на каждый hit (N round-trip);
+  - bulk: один ``gk_db.get_qa_pairs_by_ids`` (1 round-trip);
+  - corpus: пары уже есть в загруженном BM25-корпусе (0 round-trip).
+
+MySQL эмулируется задержкой на запрос (``--rtt-ms``) и на строку
+(``--row-us``), чтобы результат не зависел от доступности БД.
+
+Примеры:
+  python scripts/gk_hydration_benchmark.py
+  python scripts/gk_hydration_benchmark.py --top-k 50 --rtt-ms 1.5 --iterations 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from unittest.mock import patch
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _report(label: str, durations: List[float], queries: int) -> None:
+    print(
+        f"{label:<28} mean={statistics.mean(durations) * 1000:8.2f} ms  "
+        f"p50={_percentile(durations, 50) * 1000:8.2f} ms  "
+        f"p95={_percentile(durations, 95) * 1000:8.2f} ms  "
+        f"db_queries/iter={queries}"
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк гидратации Q&A-пар vector-поиска GK")
+    parser.add_argument("--corpus", type=int, default=20_000, help="Размер корпуса Q&A-пар")
+    parser.add_argument("--top-k", type=int, default=50, help="Число кандидатов Qdrant (по умолчанию 50)")
+    parser.add_argument("--iterations", type=int, default=30, help="Число повторов")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Эмулируемая задержка одного запроса к MySQL, мс")
+    parser.add_argument("--row-us", type=float, default=20.0, help="Эмулируемая стоимость одной строки, мкс")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    from src.group_knowledge.models import QAPair  # noqa: PLC0415
+    from src.group_knowledge.qa_search import QASearchService  # noqa: PLC0415
+
+    pairs = [
+        QAPair(
+            id=pair_id,
+            question_text=f"Вопрос {pair_id}",
+            answer_text=f"Ответ {pair_id}",
+            extraction_type="thread_reply",
+            approved=1,
+        )
+        for pair_id in range(1, args.corpus + 1)
+    ]
+    pairs_by_id = {int(pair.id): pair for pair in pairs}
+    query_counter = {"count": 0}
+
+    def _simulate(rows: int) -> None:
+        query_counter["count"] += 1
+        time.sleep(args.rtt_ms / 1000.0 + rows * args.row_us / 1_000_000.0)
+
+    def fake_get_qa_pair_by_id(pair_id: int) -> Optional[QAPair]:
+        _simulate(1)
+        return pairs_by_id.get(int(pair_id))
+
+    def fake_get_qa_pairs_by_ids(pair_ids: Iterable[int]) -> Dict[int, QAPair]:
+        ids = list(pair_ids)
+        _simulate(len(ids))
+        return {pair_id: pairs_by_id[pair_id] for pair_id in ids if pair_id in pairs_by_id}
+
+    rng = random.Random(args.seed)
+    batches = [rng.sample(range(1, args.corpus + 1), args.top_k) for _ in range(args.iterations)]
+
+    cold_service = QASearchService()
+    warm_service = QASearchService()
+    warm_service._set_corpus(pairs, [[f"q{pair.id}"] for pair in pairs])
+
+    print(
+        f"Корпус: pairs={args.corpus} top_k={args.top_k} iterations={args.iterations} "
+        f"rtt={args.rtt_ms} ms row={args.row_us} us"
+    )
+
+    with patch("src.group_knowledge.qa_search.gk_db.get_qa_pair_by_id", side_effect=fake_get_qa_pair_by_id), \
+            patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_by_ids", side_effect=fake_get_qa_pairs_by_ids):
+        import src.group_knowledge.qa_search as qa_search_module  # noqa: PLC0415
+
+        results = {}
+        for label, runner in (
+            ("legacy: get_qa_pair_by_id", lambda ids: {i: qa_search_module.gk_db.get_qa_pair_by_id(i) for i in ids}),
+            ("bulk: get_qa_pairs_by_ids", cold_service._hydrate_qa_pairs),
+            ("corpus cache", warm_service._hydrate_qa_pairs),
+        ):
+            durations: List[float] = []
+            query_counter["count"] = 0
+            for batch in batches:
+                started = time.perf_counter()
+                hydrated = runner(batch)
+                durations.append(time.perf_counter() - started)
+                if len(hydrated) != len(batch):
+                    print(f"{label}: гидратировано {len(hydrated)} из {len(batch)}")
+                    return 1
+            results[label] = durations
+            _report(label, durations, query_counter["count"] // len(batches))
+
+    legacy_mean = statistics.mean(results["legacy: get_qa_pair_by_id"])
+    for label in ("bulk: get_qa_pairs_by_ids", "corpus cache"):
+        speedup = legacy_mean / max(statistics.mean(results[label]), 1e-9)
+        print(f"Ускорение {label}: x{speedup:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -34,6 +34,18 @@ from src.common.constants.sync import (
     TELETHON_API_HASH,
     GK_RESPONDER_SESSION_NAME,
 )
+from src.common.database import get_pool_snapshot
+from src.common.runtime_status import (
+    register_runtime_status_provider,
+    start_runtime_status_publisher,
+    stop_runtime_status_publisher,
+)
+from src.core.ai.db_log_sink import close_db_log_sink
+from src.core.ai.embedding_cache import get_embedding_cache_stats
+from src.core.ai.event_loop_monitor import start_event_loop_lag_monitor, stop_event_loop_lag_monitor
+from src.core.ai.gigachat_client_pool import close_gigachat_client_pool
+from src.core.ai.llm_provider import close_llm_http_clients
+from src.core.ai.retrieval_executor import shutdown_retrieval_executor
 from src.group_knowledge.message_collector import (
     _get_available_groups,
     load_groups_config,
@@ -294,6 +306,15 @@ async def run_responder(args: argparse.Namespace) -> None:
             raise
         logger.warning("Прогрев GK-поиска завершился с ошибкой: %s", exc)
 
+    # Фоновый замер задержки event loop: поиск и генерация ответов не должны
+    # блокировать обработку новых сообщений Telethon.
+    start_event_loop_lag_monitor()
+
+    # Статистика кэша эмбеддингов и пула MySQL процесса публикуется в БД для health-проверок.
+    register_runtime_status_provider("db_pool", get_pool_snapshot)
+    register_runtime_status_provider("embedding_cache", get_embedding_cache_stats)
+    start_runtime_status_publisher("gk_responder")
+
     stop_event = asyncio.Event()
 
     # Graceful shutdown
@@ -358,6 +379,22 @@ async def run_responder(args: argparse.Namespace) -> None:
             "Остановка автоответчика. Статистика: обработано=%d ответов=%d dry_run=%d",
             stats["handled"], stats["answered"], stats["dry_run"],
         )
+        # Сначала дописать очередь логов: в ней ответы, отправленные до остановки.
+        sink_stats = await close_db_log_sink()
+        if sink_stats:
+            logger.info(
+                "Очередь логов БД закрыта: записано=%d, отброшено=%d, ошибок=%d",
+                sink_stats["written"],
+                sink_stats["dropped"],
+                sink_stats["failed"],
+            )
+        await stop_event_loop_lag_monitor()
+        await stop_runtime_status_publisher()
+        closed = await close_llm_http_clients()
+        if closed:
+            logger.info("Закрыто HTTP-клиентов LLM: %d", closed)
+        close_gigachat_client_pool()
+        shutdown_retrieval_executor()
         await disconnect_client_quietly(client)
         logger.info("Автоответчик остановлен")
 
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Бенчмарк накладных расходов HTTP-вызова LLM: клиент на запрос против общего пула.
+
+Поднимает локальный mock OpenAI-совместимого сервера (``/v1/chat/completions``,
+обычный JSON-ответ и SSE при ``"stream": true``) и замеряет p50/p95 времени
+вызова в режимах:
+  - per_call: новый ``httpx.AsyncClient`` на каждый запрос (как было в
+    ``DeepSeekProvider._call_api`` до пула) — TCP-соединение каждый раз;
+  - pooled: общий клиент ``get_shared_http_client`` с keep-alive;
+  - provider: полный ``DeepSeekProvider._call_api`` поверх пула;
+  - stream: ``DeepSeekProvider.stream_chat`` — время до первого фрагмента
+    (ttft) и до конца ответа.
+
+Сервер отвечает через ``--server-delay-ms``; в потоке фрагменты идут
+с интервалом ``--chunk-delay-ms``. Против реального API с TLS выигрыш пула
+больше: на каждый новый запрос без пула добавляется TLS-handshake.
+
+Примеры:
+  python scripts/llm_http_pool_benchmark.py
+  python scripts/llm_http_pool_benchmark.py --requests 500 --concurrency 8
+  python scripts/llm_http_pool_benchmark.py --chunks 40 --chunk-delay-ms 25
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _report(label: str, durations: List[float], extra: str = "") -> None:
+    print(
+        f"{label:<9} p50={_percentile(durations, 50) * 1000:8.2f} ms  "
+        f"p95={_percentile(durations, 95) * 1000:8.2f} ms  "
+        f"max={max(durations) * 1000:8.2f} ms{extra}"
+    )
+
+
+async def _start_mock_server(args: argparse.Namespace) -> Any:
+    """Запустить mock OpenAI-совместимого сервера, вернуть (runner, base_url)."""
+    from aiohttp import web  # noqa: PLC0415
+
+    async def completions(request: "web.Request") -> "web.StreamResponse":
+        payload = await request.json()
+        if args.server_delay_ms > 0:
+            await asyncio.sleep(args.server_delay_ms / 1000.0)
+        if not payload.get("stream"):
+            return web.json_response(
+                {
+                    "id": "bench",
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}}],
+                }
+            )
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for index in range(args.chunks):
+            event = {"choices": [{"index": 0, "delta": {"content": f"t{index} "}}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if args.chunk_delay_ms > 0:
+                await asyncio.sleep(args.chunk_delay_ms / 1000.0)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}"
+
+
+async def _measure(
+    call: Callable[[], Awaitable[Any]],
+    requests: int,
+    concurrency: int,
+) -> List[float]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    durations: List[float] = []
+
+    async def _one() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(_one() for _ in range(requests)))
+    return durations
+
+
+async def _run(args: argparse.Namespace) -> int:
+    import httpx  # noqa: PLC0415
+
+    from src.core.ai.llm_provider import (  # noqa: PLC0415
+        DeepSeekProvider,
+        close_llm_http_clients,
+        get_shared_http_client,
+    )
+
+    runner, base_url = await _start_mock_server(args)
+    url = f"{base_url}/v1/chat/completions"
+    payload = {"model": "deepseek-chat", "messages": [{"role": "user", "content": "hi"}], "stream": False}
+    headers = {"Authorization": "Bearer bench", "Content-Type": "application/json"}
+    timeout = httpx.Timeout(30.0)
+    provider = DeepSeekProvider(api_key="bench", base_url=base_url, model="deepseek-chat")
+
+    async def per_call() -> None:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.post(url, json=payload, headers=headers)
+            response.raise_for_status()
+            response.json()
+
+    async def pooled() -> None:
+        response = await get_shared_http_client(base_url).post(url, json=payload, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        response.json()
+
+    async def via_provider() -> None:
+        await provider._call_api([{"role": "user", "content": "hi"}], purpose="benchmark")
+
+    ttft: List[float] = []
+
+    async def stream() -> None:
+        started = time.perf_counter()
+        first = True
+        async for _chunk in provider.stream_chat([{"role": "user", "content": "hi"}], system_prompt="bench"):
+            if first:
+                ttft.append(time.perf_counter() - started)
+                first = False
+
+    try:
+        print(
+            f"server={base_url} requests={args.requests} concurrency={args.concurrency} "
+            f"server_delay={args.server_delay_ms}ms"
+        )
+        results: Dict[str, List[float]] = {}
+        for label, call in (("per_call", per_call), ("pooled", pooled), ("provider", via_provider)):
+            await _measure(call, min(args.warmup, args.requests), args.concurrency)
+            results[label] = await _measure(call, args.requests, args.concurrency)
+            _report(label, results[label])
+
+        speedup = _percentile(results["per_call"], 50) / max(_percentile(results["pooled"], 50), 1e-9)
+        print(f"pooled vs per_call p50: x{speedup:.2f}")
+
+        stream_requests = max(1, args.requests // 10)
+        durations = await _measure(stream, stream_requests, args.concurrency)
+        _report(
+            "stream",
+            durations,
+            f"  ttft p50={_percentile(ttft, 50) * 1000:.2f} ms p95={_percentile(ttft, 95) * 1000:.2f} ms "
+            f"chunks={args.chunks}",
+        )
+    finally:
+        await close_llm_http_clients()
+        await runner.cleanup()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк пула HTTP-соединений LLM-провайдера")
+    parser.add_argument("--requests", type=int, default=200, help="Число запросов на режим")
+    parser.add_argument("--concurrency", type=int, default=1, help="Одновременных запросов")
+    parser.add_argument("--warmup", type=int, default=10, help="Прогревочных запросов на режим")
+    parser.add_argument("--server-delay-ms", type=float, default=0.0, help="Задержка ответа mock-сервера, мс")
+    parser.add_argument("--chunks", type=int, default=20, help="Фрагментов в потоковом ответе")
+    parser.add_argument("--chunk-delay-ms", type=float, default=10.0, help="Интервал между фрагментами, мс")
+    args = parser.parse_args(argv)
+
+    # Бенчмарк не должен писать в ai_model_io_log и засорять логи payload-ами.
+    os.environ.setdefault("AI_MODEL_IO_DB_LOG_ENABLED", "0")
+    os.environ.setdefault("AI_LOG_MODEL_IO", "0")
+
+    import logging  # noqa: PLC0415
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
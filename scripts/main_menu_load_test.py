@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Нагрузочный тест главного меню: одновременные пользователи и event loop бота.
+
+Запускает настоящий обработчик ``text_entered`` с кнопкой «Главное меню»
+для ``--users`` пользователей одновременно. Проверка авторизации и сборка
+сообщения главного меню — блокирующие запросы к БД (``--db-ms`` каждый,
+``time.sleep``), ответ Telegram — ``--telegram-ms`` (``asyncio.sleep``).
+Сравниваются два режима:
+  - blocking: запросы БД выполняются прямо в корутине (до изменения);
+  - async: запросы идут через ``run_db`` асинхронного фасада БД.
+
+С ``--real-db`` запросы не эмулируются, а выполняются к настроенной MySQL
+(нужны существующие пользователи с Telegram ID от ``--first-user-id``).
+
+Примеры:
+  python scripts/main_menu_load_test.py
+  python scripts/main_menu_load_test.py --users 200 --db-ms 15 --io-workers 16
+  python scripts/main_menu_load_test.py --real-db --users 50 --first-user-id 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _make_update(user_id: int, text: str, telegram_seconds: float) -> SimpleNamespace:
+    async def reply_text(*_args, **_kwargs) -> None:
+        await asyncio.sleep(telegram_seconds)
+
+    message = SimpleNamespace(text=text, reply_text=reply_text)
+    return SimpleNamespace(
+        message=message,
+        effective_user=SimpleNamespace(id=user_id, first_name="Нагрузка"),
+    )
+
+
+async def _run_mode(mode: str, args: argparse.Namespace) -> Dict[str, float]:
+    from src.common.async_database import AsyncDatabase  # noqa: PLC0415
+    from src.common.messages import BUTTON_MAIN_MENU  # noqa: PLC0415
+    from src.common.telegram_user import UserAuthStatus  # noqa: PLC0415
+    from src.core.ai.event_loop_monitor import EventLoopLagMonitor  # noqa: PLC0415
+    from src.sbs_helper_telegram_bot.telegram_bot import telegram_bot  # noqa: PLC0415
+
+    # Профилирование каждого обновления в лог исказило бы замер.
+    logging.getLogger(telegram_bot.__name__).setLevel(logging.WARNING)
+    db = AsyncDatabase(io_workers=args.io_workers)
+    monitor = EventLoopLagMonitor(interval_seconds=args.interval_ms / 1000.0, warn_ms=1e9, report_interval_seconds=0)
+    db_seconds = args.db_ms / 1000.0
+
+    def _auth_status(_user_id: int) -> UserAuthStatus:
+        time.sleep(db_seconds)
+        return UserAuthStatus(
+            is_pre_invited=False,
+            is_pre_invited_activated=False,
+            is_invite_blocked=False,
+            is_legit=True,
+            is_admin=False,
+        )
+
+    def _main_menu_message(_user_id: int, _first_name: Optional[str] = None) -> str:
+        time.sleep(db_seconds)
+        return "Главное меню"
+
+    async def _run_inline(func, *call_args, **call_kwargs):
+        return func(*call_args, **call_kwargs)
+
+    latencies: List[float] = []
+
+    async def _user(user_id: int) -> None:
+        update = _make_update(user_id, BUTTON_MAIN_MENU, args.telegram_ms / 1000.0)
+        context = SimpleNamespace(user_data={}, chat_data={}, bot_data={})
+        started = time.perf_counter()
+        await telegram_bot.text_entered(update, context)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(telegram_bot, "get_ai_router"))
+        stack.enter_context(patch("src.common.async_database.get_async_database", return_value=db))
+        if not args.real_db:
+            stack.enter_context(patch.object(telegram_bot, "get_user_auth_status", _auth_status))
+            stack.enter_context(patch.object(telegram_bot, "get_main_menu_message", _main_menu_message))
+        if mode == "blocking":
+            stack.enter_context(patch.object(telegram_bot, "run_db", _run_inline))
+
+        monitor.start()
+        await asyncio.sleep(args.interval_ms / 1000.0 * 3)
+        started = time.perf_counter()
+        await asyncio.gather(*(_user(args.first_user_id + index) for index in range(args.users)))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(args.interval_ms / 1000.0 * 3)
+        await monitor.stop()
+    db.shutdown(wait=True)
+
+    stats = monitor.snapshot()
+    stats["elapsed_ms"] = elapsed * 1000.0
+    stats["latency_p50_ms"] = _percentile(latencies, 50)
+    stats["latency_p95_ms"] = _percentile(latencies, 95)
+    stats["latency_max_ms"] = max(latencies) if latencies else 0.0
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа нагрузочного теста."""
+    parser = argparse.ArgumentParser(description="Нагрузочный тест главного меню бота")
+    parser.add_argument("--users", type=int, default=200, help="Число одновременных пользователей")
+    parser.add_argument("--db-ms", type=float, default=10.0, help="Длительность одного запроса к БД, мс")
+    parser.add_argument("--telegram-ms", type=float, default=30.0, help="Длительность ответа Telegram API, мс")
+    parser.add_argument("--io-workers", type=int, default=8, help="Потоки пула db-io")
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="Интервал замера задержки event loop, мс")
+    parser.add_argument("--real-db", action="store_true", help="Выполнять запросы к настроенной MySQL")
+    parser.add_argument("--first-user-id", type=int, default=1_000_000, help="Telegram ID первого пользователя")
+    parser.add_argument("--modes", default="blocking,async", help="Режимы через запятую: blocking,async")
+    args = parser.parse_args(argv)
+
+    print(
+        f"users={args.users} db={args.db_ms}ms x2 telegram={args.telegram_ms}ms "
+        f"io_workers={args.io_workers} real_db={args.real_db}"
+    )
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        stats = asyncio.run(_run_mode(mode, args))
+        print(
+            f"{mode:<9} total={stats['elapsed_ms']:8.1f} ms  "
+            f"user p50={stats['latency_p50_ms']:7.1f} p95={stats['latency_p95_ms']:7.1f} "
+            f"max={stats['latency_max_ms']:7.1f} ms  "
+            f"loop lag p95={stats['p95_ms']:7.1f} max={stats['max_ms']:7.1f} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
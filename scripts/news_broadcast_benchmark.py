@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Бенчмарк рассылки новостей: последовательная отправка против NewsBroadcaster.
+
+Фейковый бот имитирует задержку Bot API (``--latency-ms``), лимит Telegram
+на бота (при превышении ``--telegram-limit`` сообщений за скользящую секунду
+отвечает ``RetryAfter``) и долю заблокировавших бота (``Forbidden``).
+Замеряется:
+  - sequential: прежний цикл — отправка, запись в журнал по одной строке,
+    пауза 0.1 с;
+  - engine: ``NewsBroadcaster`` с настройками ``BROADCAST_*`` и пакетной
+    записью журнала.
+
+Запись в БД имитируется задержкой ``--db-latency-ms`` на вызов (в пуле
+потоков для engine, в event loop — как раньше — для sequential).
+
+Примеры:
+  python scripts/news_broadcast_benchmark.py
+  python scripts/news_broadcast_benchmark.py --users 5000 --latency-ms 120 --rate 28
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import logging
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Optional
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+class FakeBot:
+    """Фейковый Bot API с задержкой, лимитом на бота и заблокированными чатами."""
+
+    def __init__(self, latency: float, limit_per_second: int, blocked: set) -> None:
+        self._latency = latency
+        self._limit = limit_per_second
+        self._blocked = blocked
+        self._window: collections.deque = collections.deque()
+        self.delivered = 0
+        self.flood_errors = 0
+
+    async def send_message(self, chat_id: int, **kwargs) -> None:
+        from telegram.error import Forbidden, RetryAfter  # noqa: PLC0415
+
+        now = time.monotonic()
+        while self._window and now - self._window[0] >= 1.0:
+            self._window.popleft()
+        if len(self._window) >= self._limit:
+            self.flood_errors += 1
+            raise RetryAfter(timedelta(seconds=1))
+        self._window.append(now)
+        await asyncio.sleep(self._latency)
+        if chat_id in self._blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        self.delivered += 1
+
+
+async def _send_step(bot: FakeBot, chat_id: int) -> None:
+    await bot.send_message(chat_id=chat_id, text="news")
+
+
+async def _run_sequential(bot: FakeBot, user_ids: List[int], db_latency: float) -> float:
+    """Прежний алгоритм broadcast_news: по одному получателю с паузой 0.1 с."""
+    from telegram.error import TelegramError  # noqa: PLC0415
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        try:
+            await _send_step(bot, user_id)
+        except TelegramError:
+            pass
+        # log_delivery — синхронный запрос в event loop
+        time.sleep(db_latency)
+        await asyncio.sleep(0.1)
+    return time.perf_counter() - started
+
+
+async def _run_engine(bot: FakeBot, user_ids: List[int], db_latency: float, args: argparse.Namespace) -> dict:
+    from src.sbs_helper_telegram_bot.news.broadcast import NewsBroadcaster  # noqa: PLC0415
+
+    flushes = []
+
+    def writer(news_id, rows):
+        time.sleep(db_latency)
+        flushes.append(len(rows))
+        return True
+
+    broadcaster = NewsBroadcaster(
+        bot,
+        delivery_writer=writer,
+        concurrency=args.concurrency,
+        rate_per_second=args.rate,
+    )
+    started = time.perf_counter()
+    results = await broadcaster.broadcast(1, [_send_step], user_ids)
+    results["seconds"] = time.perf_counter() - started
+    results["db_writes"] = len(flushes)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    from src.sbs_helper_telegram_bot.news import settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description="Бенчмарк рассылки новостей")
+    parser.add_argument("--users", type=int, default=2000, help="Число получателей")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Задержка ответа Bot API")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="Задержка одной записи в БД")
+    parser.add_argument("--telegram-limit", type=int, default=30, help="Лимит Telegram, сообщений/с")
+    parser.add_argument("--blocked", type=float, default=0.05, help="Доля заблокировавших бота")
+    parser.add_argument("--rate", type=float, default=settings.BROADCAST_RATE_PER_SECOND, help="Лимит движка, сообщений/с")
+    parser.add_argument("--concurrency", type=int, default=settings.BROADCAST_CONCURRENCY, help="Параллельных отправителей")
+    parser.add_argument("--modes", default="sequential,engine", help="Режимы через запятую")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора")
+    args = parser.parse_args(argv)
+    # Предупреждения о заблокировавших бота не нужны в выводе замера
+    logging.getLogger("src.sbs_helper_telegram_bot.news").setLevel(logging.ERROR)
+
+    rng = random.Random(args.seed)
+    user_ids = list(range(1, args.users + 1))
+    blocked = {user_id for user_id in user_ids if rng.random() < args.blocked}
+    latency = args.latency_ms / 1000.0
+    db_latency = args.db_latency_ms / 1000.0
+    print(
+        f"users={args.users} blocked={len(blocked)} api_latency={args.latency_ms:.0f} ms "
+        f"telegram_limit={args.telegram_limit}/s engine: rate={args.rate}/s concurrency={args.concurrency}"
+    )
+
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        bot = FakeBot(latency, args.telegram_limit, blocked)
+        if mode == "sequential":
+            seconds = asyncio.run(_run_sequential(bot, user_ids, db_latency))
+            extra = f"db_writes={args.users}"
+        elif mode == "engine":
+            results = asyncio.run(_run_engine(bot, user_ids, db_latency, args))
+            seconds = results["seconds"]
+            extra = f"db_writes={results['db_writes']} retries={results['retries']}"
+        else:
+            print(f"{mode}: неизвестный режим")
+            return 1
+        print(
+            f"{mode:<11} {seconds:7.1f} s  {args.users / seconds:6.1f} recipients/s  "
+            f"delivered={bot.delivered} flood_errors={bot.flood_errors}  {extra}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -145,6 +145,7 @@ _RAG_SQL_FILES: List[str] = [
     "sql/ai_rag_vector_setup.sql",
     "sql/ai_rag_summary_vector_setup.sql",
     "sql/ai_rag_certification_signals_setup.sql",
+    "sql/ai_rag_token_storage_setup.sql",
     "sql/rag_document_summaries_fulltext_index.sql",
     "sql/ai_router_setup.sql",
     "sql/ai_model_io_log_retention.sql",
@@ -194,6 +195,61 @@ def cmd_health(_args: argparse.Namespace) -> int:
     except Exception as exc:
         _warn(f"Qdrant недоступен или не сконфигурирован: {exc}")
 
+    # --- Embedding cache ---
+    _step("Embedding cache")
+    try:
+        from config import ai_settings  # noqa: PLC0415
+        from src.core.ai.embedding_cache import read_disk_cache_stats  # noqa: PLC0415
+
+        if not ai_settings.AI_RAG_EMBEDDING_CACHE_ENABLED:
+            _warn("AI_RAG_EMBEDDING_CACHE_ENABLED=0 — кэш эмбеддингов отключён.")
+        else:
+            disk_dir = ai_settings.AI_RAG_EMBEDDING_CACHE_DISK_DIR
+            _ok(
+                f"Кэш включён: memory={ai_settings.AI_RAG_EMBEDDING_CACHE_MAX_MB} МБ, "
+                f"disk={disk_dir or '—'}"
+            )
+            for meta in read_disk_cache_stats(disk_dir):
+                _info(f"{meta.get('model')}: диск entries={meta.get('entries')}/{meta.get('capacity')}")
+    except Exception as exc:
+        _warn(f"Не удалось прочитать статистику кэша эмбеддингов: {exc}")
+
+    # --- Runtime caches ---
+    _step("Кэши процессов (runtime_process_status)")
+    try:
+        from src.common.runtime_status import get_process_statuses  # noqa: PLC0415
+
+        statuses = get_process_statuses()
+        if not statuses:
+            _warn("Нет свежих снимков статистики процессов (бот не запущен или RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS=0).")
+        totals = {"hits": 0, "misses": 0}
+        for status in statuses:
+            label = f"{status.process_name} pid={status.pid}@{status.hostname}"
+            embedding_stats = status.payload.get("embedding_cache")
+            if embedding_stats:
+                totals["hits"] += int(embedding_stats.get("hits") or 0)
+                totals["misses"] += int(embedding_stats.get("misses") or 0)
+                _info(
+                    f"{label} embedding: hits={embedding_stats.get('hits', 0)} "
+                    f"misses={embedding_stats.get('misses', 0)} "
+                    f"hit_rate={float(embedding_stats.get('hit_rate') or 0.0):.1%} "
+                    f"memory={embedding_stats.get('memory_entries', 0)} записей"
+                )
+            for cache_stats in status.payload.get("rag_caches") or []:
+                _info(
+                    f"{label} {cache_stats.get('name')}: entries={cache_stats.get('entries', 0)} "
+                    f"hits={cache_stats.get('hits', 0)} misses={cache_stats.get('misses', 0)} "
+                    f"hit_rate={float(cache_stats.get('hit_rate') or 0.0):.1%}"
+                )
+        lookups = totals["hits"] + totals["misses"]
+        if lookups:
+            _ok(
+                f"Кэш эмбеддингов, все процессы: hits={totals['hits']} misses={totals['misses']} "
+                f"hit_rate={totals['hits'] / lookups:.1%}"
+            )
+    except Exception as exc:
+        _warn(f"Не удалось прочитать статистику процессов: {exc}")
+
     return 0 if ok else 1
 
 
@@ -217,6 +273,8 @@ def cmd_status(_args: argparse.Namespace) -> int:
         "rag_document_summaries": "SELECT COUNT(*) AS cnt FROM rag_document_summaries WHERE summary_text IS NOT NULL AND summary_text != ''",
         "rag_chunk_embeddings (indexed)": "SELECT COUNT(*) AS cnt FROM rag_chunk_embeddings",
         "rag_summary_embeddings (indexed)": "SELECT COUNT(*) AS cnt FROM rag_summary_embeddings",
+        "rag_chunk_tokens (pre-tokenized)": "SELECT COUNT(*) AS cnt FROM rag_chunk_tokens",
+        "rag_summary_tokens (pre-tokenized)": "SELECT COUNT(*) AS cnt FROM rag_summary_tokens",
     }
 
     for label, query in queries.items():
@@ -447,6 +505,41 @@ def cmd_update_vectors(args: argparse.Namespace) -> int:
     return _run_backfill(target=target, batch_size=batch_size, dry_run=dry_run, max_documents=max_docs)
 
 
+# ---------------------------------------------------------------------------
+# Команда: update tokens
+# ---------------------------------------------------------------------------
+
+def cmd_update_tokens(args: argparse.Namespace) -> int:
+    """Заполнить предтокенизированные чанки и summary для существующих документов."""
+    _header("Update Pre-tokenized Storage")
+    batch_size = getattr(args, "batch_size", 500)
+    dry_run = getattr(args, "dry_run", False)
+
+    try:
+        from src.core.ai.rag_service import get_rag_service  # noqa: PLC0415
+    except Exception as exc:
+        _err(f"Не удалось загрузить зависимости: {exc}")
+        return 1
+
+    _info(f"Batch size : {batch_size}")
+    _info(f"Dry-run    : {'да' if dry_run else 'нет'}")
+
+    started = time.monotonic()
+    try:
+        stats = get_rag_service().backfill_token_storage(batch_size=batch_size, dry_run=dry_run)
+    except Exception as exc:
+        _err(f"Backfill токенов завершился ошибкой: {exc}")
+        _warn("Проверьте, что применена миграция sql/ai_rag_token_storage_setup.sql.")
+        return 1
+    elapsed = time.monotonic() - started
+
+    _info(f"Signature  : {stats.get('signature')}")
+    _info(f"Chunks     : {stats.get('chunks_tokenized')}")
+    _info(f"Summaries  : {stats.get('summaries_tokenized')}")
+    _ok(f"Backfill токенов завершён за {elapsed:.1f}с.")
+    return 0
+
+
 # ---------------------------------------------------------------------------
 # Команда: update all
 # ---------------------------------------------------------------------------
@@ -779,6 +872,7 @@ def _build_parser() -> argparse.ArgumentParser:
               python scripts/rag_ops.py update docs -d /path/to/docs --force
               python scripts/rag_ops.py update cert --force --upsert-vectors
               python scripts/rag_ops.py update vectors --target both
+              python scripts/rag_ops.py update tokens --batch-size 500
               python scripts/rag_ops.py update all -d /path/to/docs --force
               python scripts/rag_ops.py preload-embeddings
               python scripts/rag_ops.py preload-embeddings --offline-check
@@ -799,7 +893,7 @@ def _build_parser() -> argparse.ArgumentParser:
     p_setup.add_argument("--apply-sql", action="store_true", help="Применить SQL-миграции без вопросов")
     p_setup.add_argument("--yes", "-y", action="store_true", help="Подтверждать все шаги автоматически")
 
-    # update (docs / cert / vectors / all)
+    # update (docs / cert / vectors / tokens / all)
     p_update = subparsers.add_parser("update", help="Обновить часть RAG-корпуса")
     update_sub = p_update.add_subparsers(dest="update_target", required=True)
 
@@ -826,6 +920,11 @@ def _build_parser() -> argparse.ArgumentParser:
     p_vec.add_argument("--dry-run", action="store_true", help="Только подсчитать, без записи в индекс")
     p_vec.add_argument("--max-documents", type=int, default=None, metavar="N", help="Ограничить число документов")
 
+    # update tokens
+    p_tokens = update_sub.add_parser("tokens", help="Заполнить предтокенизированные чанки и summary")
+    p_tokens.add_argument("--batch-size", type=int, default=500, metavar="N", help="Строк за один батч")
+    p_tokens.add_argument("--dry-run", action="store_true", help="Только подсчитать, без записи")
+
     # update all
     p_all = update_sub.add_parser("all", help="Полный update (docs + cert + vectors)")
     p_all.add_argument("-d", "--directory", default=None, metavar="PATH", help="Директория документов (опcionально)")
@@ -881,6 +980,7 @@ _UPDATE_TARGET_MAP = {
     "docs": cmd_update_docs,
     "cert": cmd_update_cert,
     "vectors": cmd_update_vectors,
+    "tokens": cmd_update_tokens,
     "all": cmd_update_all,
 }
 
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Бенчмарк пакетной валидации Excel-файла заявок: в памяти против потокового режима.
+
+Генерирует .xlsx с ``--rows`` заявками (по умолчанию 100 000) и синтетическими
+типами/правилами валидации, затем для каждого режима в отдельном процессе
+замеряет скорость (строк/с) и пиковый RSS:
+  - memory: ``validate_file`` — чтение всего файла, список результатов и
+    обычная книга openpyxl (прежнее поведение);
+  - streaming: ``validate_file_streaming`` без пула процессов;
+  - streaming-pool: ``validate_file_streaming`` с ``--workers`` процессами
+    (пиковый RSS воркеров выводится отдельно).
+
+Правила и типы заявок не читаются из БД — загрузчики validation_rules
+подменяются синтетическими данными.
+
+Примеры:
+  python scripts/ticket_file_validation_benchmark.py
+  python scripts/ticket_file_validation_benchmark.py --rows 20000 --workers 2
+  python scripts/ticket_file_validation_benchmark.py --modes streaming,streaming-pool --keep-files
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List, Optional
+from unittest.mock import patch
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+_TYPE_KEYWORDS = [
+    ["установка", "новый терминал", "-демонтаж"],
+    ["демонтаж", "возврат терминала"],
+    ["замена", "неисправность", "-установка"],
+    ["перепрошивка", "обновление по"],
+    ["выезд", "консультация"],
+]
+
+
+def _ticket_types():
+    from src.sbs_helper_telegram_bot.ticket_validator.validators import TicketType  # noqa: PLC0415
+
+    return [
+        TicketType(id=index, type_name=f"Тип {index}", description="", detection_keywords=keywords)
+        for index, keywords in enumerate(_TYPE_KEYWORDS, start=1)
+    ]
+
+
+def _rules(ticket_type_id: int):
+    from src.sbs_helper_telegram_bot.ticket_validator.validators import ValidationRule  # noqa: PLC0415
+
+    patterns = [
+        (r"ИНН:\s*\d{10,12}", "regex", "Не указан ИНН"),
+        (r"Тел(?:ефон)?[.:]?\s*\+?\d[\d\s()-]{9,}", "regex", "Не указан телефон"),
+        (r"тест(?:овая)?\s+заявка", "regex_not_match", "Тестовая заявка"),
+        (r"Адрес:\s*\S+", "regex", "Не указан адрес"),
+    ]
+    return [
+        ValidationRule(
+            id=ticket_type_id * 100 + index,
+            rule_name=f"Правило {ticket_type_id}.{index}",
+            pattern=pattern,
+            rule_type=rule_type,
+            error_message=message,
+            priority=index,
+        )
+        for index, (pattern, rule_type, message) in enumerate(patterns)
+    ]
+
+
+def _generate_file(path: str, rows: int, seed: int) -> None:
+    """Сгенерировать .xlsx с заявками (write-only, без роста памяти)."""
+    import openpyxl  # noqa: PLC0415
+
+    rng = random.Random(seed)
+    filler = "оборудование клиент точка обслуживания касса договор смена график".split()
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Заявки")
+    ws.append(["Номер", "Заявка", "Инженер", "Дата"])
+    for index in range(rows):
+        keywords = rng.choice(_TYPE_KEYWORDS)
+        parts = [keywords[0].lstrip("-"), " ".join(rng.choices(filler, k=rng.randint(20, 80)))]
+        if rng.random() > 0.1:
+            parts.append(f"ИНН: {rng.randint(10**9, 10**10 - 1)}")
+        if rng.random() > 0.1:
+            parts.append(f"Телефон: +7 9{rng.randint(10, 99)} {rng.randint(1000000, 9999999)}")
+        if rng.random() > 0.05:
+            parts.append("Адрес: г. Москва, ул. Ленина, д. 1")
+        text = "\n".join(parts) if rng.random() > 0.01 else ""
+        ws.append([f"SD-{index:07d}", text, f"Инженер {rng.randint(1, 300)}", "2026-01-15"])
+    wb.save(path)
+
+
+def _run_child(args: argparse.Namespace) -> int:
+    """Выполнить один режим и вывести JSON с результатами."""
+    from src.sbs_helper_telegram_bot.ticket_validator import validation_rules  # noqa: PLC0415
+    from src.sbs_helper_telegram_bot.ticket_validator.file_processor import ExcelFileProcessor  # noqa: PLC0415
+
+    processor = ExcelFileProcessor()
+    output_path = os.path.join(args.work_dir, f"result_{args.child_mode}.xlsx")
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(validation_rules, "load_all_ticket_types", return_value=_ticket_types()))
+        stack.enter_context(patch.object(validation_rules, "load_rules_from_db", side_effect=_rules))
+        started = time.perf_counter()
+        if args.child_mode == "memory":
+            result = processor.validate_file(args.input, "Заявка", output_path=output_path)
+        else:
+            workers = args.workers if args.child_mode == "streaming-pool" else 1
+            result = processor.validate_file_streaming(
+                args.input, "Заявка", output_path=output_path, workers=workers, chunk_size=args.chunk_size
+            )
+        elapsed = time.perf_counter() - started
+
+    # ru_maxrss в Linux — в килобайтах
+    print(json.dumps({
+        "error": result.error_message,
+        "rows": result.total_tickets,
+        "valid": result.valid_tickets,
+        "invalid": result.invalid_tickets,
+        "skipped": result.skipped_tickets,
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "workers_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0,
+    }))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк пакетной валидации Excel-файла заявок")
+    parser.add_argument("--rows", type=int, default=100_000, help="Число заявок в файле")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Процессов для streaming-pool")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Размер пачки строк")
+    parser.add_argument("--modes", default="memory,streaming,streaming-pool", help="Режимы через запятую")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора")
+    parser.add_argument("--keep-files", action="store_true", help="Не удалять сгенерированные файлы")
+    parser.add_argument("--child-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_mode:
+        return _run_child(args)
+
+    work_dir = tempfile.mkdtemp(prefix="ticket_file_bench_")
+    input_path = os.path.join(work_dir, "tickets.xlsx")
+    started = time.perf_counter()
+    _generate_file(input_path, args.rows, args.seed)
+    print(
+        f"rows={args.rows} file={os.path.getsize(input_path) / 1024 / 1024:.1f} MB "
+        f"generated in {time.perf_counter() - started:.1f} s; workers={args.workers} chunk={args.chunk_size}"
+    )
+
+    baseline: Optional[Dict[str, float]] = None
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        completed = subprocess.run(
+            [
+                sys.executable, str(Path(__file__).resolve()),
+                "--child-mode", mode, "--input", input_path, "--work-dir", work_dir,
+                "--workers", str(args.workers), "--chunk-size", str(args.chunk_size),
+            ],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if completed.returncode != 0:
+            print(f"{mode}: ошибка\n{completed.stderr[-2000:]}")
+            return 1
+        stats = json.loads(completed.stdout.strip().splitlines()[-1])
+        if stats["error"]:
+            print(f"{mode}: {stats['error']}")
+            return 1
+        counts = (stats["valid"], stats["invalid"], stats["skipped"])
+        if baseline is None:
+            baseline = stats
+        elif counts != (baseline["valid"], baseline["invalid"], baseline["skipped"]):
+            print(f"{mode}: счётчики отличаются от первого режима")
+            return 1
+        workers_rss = f"  workers peak RSS={stats['workers_peak_rss_mb']:7.1f} MB" if mode == "streaming-pool" else ""
+        print(
+            f"{mode:<15} {stats['seconds']:7.1f} s  {stats['rows'] / stats['seconds']:8.0f} rows/s  "
+            f"peak RSS={stats['peak_rss_mb']:7.1f} MB{workers_rss}  "
+            f"valid/invalid/skipped={'/'.join(map(str, counts))}"
+        )
+
+    if args.keep_files:
+        print(f"files: {work_dir}")
+    else:
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Бенчмарк валидации заявок: разбор правил на каждую заявку против скомпилированного плана.
+
+Генерирует синтетические типы заявок (ключевые слова, в том числе
+отрицательные), правила валидации и заявки ~1.5 тыс. символов, проверяет
+совпадение результатов и замеряет:
+  - legacy: ``detect_ticket_type`` + ``validate_ticket`` на каждую заявку
+    (разбор ключевых слов и компиляция regex при каждом вызове);
+  - plan: ``TicketTypeDetector`` и ``CompiledRuleSet``, собранные один раз;
+  - plan+automaton: то же с принудительным автоматом Ахо — Корасик.
+
+Запросы к БД (прежде выполнявшиеся на каждую строку файла) не эмулируются —
+замеряется только вычислительная часть.
+
+Примеры:
+  python scripts/ticket_validation_benchmark.py
+  python scripts/ticket_validation_benchmark.py --tickets 20000 --types 40 --keywords 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+_ALPHABET = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(4, 10)))
+
+
+def _build_data(args: argparse.Namespace) -> Tuple[list, dict, List[str]]:
+    """Собрать типы заявок, правила по типам и тексты заявок."""
+    from src.sbs_helper_telegram_bot.ticket_validator.validators import (  # noqa: PLC0415
+        TicketType,
+        ValidationRule,
+    )
+
+    rng = random.Random(args.seed)
+    vocabulary = [_word(rng) for _ in range(args.types * args.keywords * 2)]
+    ticket_types = []
+    rules_by_type = {}
+    for type_id in range(1, args.types + 1):
+        keywords = rng.sample(vocabulary, args.keywords)
+        keywords[-1] = "-" + keywords[-1]
+        ticket_types.append(
+            TicketType(id=type_id, type_name=f"Тип {type_id}", description="", detection_keywords=keywords)
+        )
+        rules_by_type[type_id] = [
+            ValidationRule(
+                id=type_id * 100 + index,
+                rule_name=f"rule_{type_id}_{index}",
+                pattern=pattern,
+                rule_type=rule_type,
+                error_message="Ошибка",
+                priority=index,
+            )
+            for index, (pattern, rule_type) in enumerate([
+                (r"ИНН:\s*\d{10,12}", "regex"),
+                (r"Тел(?:ефон)?[.:]?\s*\+?\d[\d\s()-]{9,}", "regex"),
+                (r"тест(?:овая)?\s+заявка", "regex_not_match"),
+                (r"Адрес:\s*\S+", "regex"),
+                (r"\d{2}\.\d{2}\.\d{4}", "regex"),
+            ])
+        ]
+
+    tickets = []
+    for _ in range(args.tickets):
+        words = rng.choices(vocabulary, k=args.ticket_words)
+        ticket_type = rng.choice(ticket_types)
+        words.extend(rng.sample([k.lstrip("-") for k in ticket_type.detection_keywords[:-1]], 3))
+        rng.shuffle(words)
+        tickets.append(
+            " ".join(words)
+            + f"\nИНН: {rng.randint(10**9, 10**10 - 1)}\nТелефон: +7 999 {rng.randint(1000000, 9999999)}"
+            + "\nАдрес: Москва\n01.02.2026"
+        )
+    return ticket_types, rules_by_type, tickets
+
+
+def _run_legacy(ticket_types, rules_by_type, tickets) -> Tuple[float, list]:
+    from src.sbs_helper_telegram_bot.ticket_validator.validators import (  # noqa: PLC0415
+        detect_ticket_type,
+        validate_ticket,
+    )
+
+    outcome = []
+    started = time.perf_counter()
+    for text in tickets:
+        detected, _ = detect_ticket_type(text, ticket_types)
+        rules = rules_by_type[detected.id] if detected else []
+        result = validate_ticket(text, rules, detected)
+        outcome.append((detected.id if detected else None, result.is_valid))
+    return time.perf_counter() - started, outcome
+
+
+def _run_plan(ticket_types, rules_by_type, tickets, automaton_min_keywords: int) -> Tuple[float, list]:
+    from src.sbs_helper_telegram_bot.ticket_validator import keyword_automaton  # noqa: PLC0415
+    from src.sbs_helper_telegram_bot.ticket_validator.validators import (  # noqa: PLC0415
+        CompiledRuleSet,
+        TicketTypeDetector,
+    )
+
+    previous = keyword_automaton.AUTOMATON_MIN_KEYWORDS
+    keyword_automaton.AUTOMATON_MIN_KEYWORDS = automaton_min_keywords
+    try:
+        started = time.perf_counter()
+        detector = TicketTypeDetector(ticket_types)
+        plans = {type_id: CompiledRuleSet(rules) for type_id, rules in rules_by_type.items()}
+        empty = CompiledRuleSet([])
+        outcome = []
+        for text in tickets:
+            detected, _ = detector.detect(text)
+            result = (plans[detected.id] if detected else empty).validate(text, detected)
+            outcome.append((detected.id if detected else None, result.is_valid))
+        return time.perf_counter() - started, outcome
+    finally:
+        keyword_automaton.AUTOMATON_MIN_KEYWORDS = previous
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк валидации заявок")
+    parser.add_argument("--tickets", type=int, default=10_000, help="Число заявок")
+    parser.add_argument("--types", type=int, default=20, help="Число типов заявок")
+    parser.add_argument("--keywords", type=int, default=10, help="Ключевых слов на тип")
+    parser.add_argument("--ticket-words", type=int, default=200, help="Слов в тексте заявки")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора")
+    args = parser.parse_args(argv)
+
+    ticket_types, rules_by_type, tickets = _build_data(args)
+    print(
+        f"tickets={len(tickets)} types={args.types} keywords/type={args.keywords} "
+        f"avg_len={sum(map(len, tickets)) // max(1, len(tickets))}"
+    )
+
+    legacy_seconds, expected = _run_legacy(ticket_types, rules_by_type, tickets)
+    rows = [("legacy", legacy_seconds)]
+    for name, threshold in (("plan", 10**9), ("plan+automaton", 1)):
+        seconds, outcome = _run_plan(ticket_types, rules_by_type, tickets, threshold)
+        if outcome != expected:
+            print(f"{name}: результаты отличаются от legacy")
+            return 1
+        rows.append((name, seconds))
+
+    for name, seconds in rows:
+        per_ticket_us = seconds / max(1, len(tickets)) * 1e6
+        print(
+            f"{name:<15} total={seconds * 1000:9.1f} ms  per_ticket={per_ticket_us:7.1f} us  "
+            f"speedup={legacy_seconds / seconds:5.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Обучение centroid-модели intent по журналу классификаций ``ai_router_log``.
+
+Берёт сообщения, которые LLM классифицировала с уверенностью не ниже
+``--min-confidence`` (записи быстрого пути ``FAST_*`` исключаются, чтобы
+модель не училась на собственных ответах), кодирует их локальной
+embedding-моделью и сохраняет нормированные центроиды intent в ``.npz``.
+
+На отложенной выборке печатает долю сообщений, которые pre-classifier
+закрыл бы без LLM (правила и centroid-модель), точность таких ответов
+относительно LLM-разметки и задержку.
+
+Примеры:
+  python scripts/train_intent_centroids.py --output ./data/intent_centroids.npz
+  python scripts/train_intent_centroids.py --days 30 --min-samples 50 --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _load_samples(days: int, min_confidence: float) -> List[Tuple[str, str]]:
+    """Прочитать (текст, intent) из ai_router_log."""
+    import src.common.database as database  # noqa: PLC0415
+    from src.core.ai.intent_preclassifier import FAST_PATH_EXPLAIN_PREFIX  # noqa: PLC0415
+
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            cursor.execute(
+                """
+                SELECT input_text, detected_intent
+                FROM ai_router_log
+                WHERE confidence >= %s
+                  AND created_at >= NOW() - INTERVAL %s DAY
+                  AND (explain_code IS NULL OR explain_code NOT LIKE %s)
+                """,
+                (min_confidence, days, f"{FAST_PATH_EXPLAIN_PREFIX}%"),
+            )
+            rows = cursor.fetchall() or []
+    samples: List[Tuple[str, str]] = []
+    for row in rows:
+        text = str(row.get("input_text") or "").strip()
+        intent = str(row.get("detected_intent") or "").strip()
+        if text and intent:
+            samples.append((text, intent))
+    return samples
+
+
+def _split(
+    samples: List[Tuple[str, str]],
+    max_per_intent: int,
+    holdout: float,
+    seed: int,
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """Ограничить число примеров на intent и отложить часть для оценки."""
+    rng = random.Random(seed)
+    by_intent: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for sample in dict.fromkeys(samples):
+        by_intent[sample[1]].append(sample)
+    train: List[Tuple[str, str]] = []
+    test: List[Tuple[str, str]] = []
+    for intent_samples in by_intent.values():
+        rng.shuffle(intent_samples)
+        intent_samples = intent_samples[:max_per_intent]
+        cut = int(len(intent_samples) * holdout)
+        test.extend(intent_samples[:cut])
+        train.extend(intent_samples[cut:])
+    return train, test
+
+
+def _encode(provider, texts: List[str], batch_size: int) -> List[List[float]]:
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(provider.encode_texts(texts[start:start + batch_size], use_cache=False))
+    return vectors
+
+
+def _evaluate(model, test: List[Tuple[str, str]], test_vectors: List[List[float]], args) -> None:
+    """Напечатать долю быстрых ответов и их точность на отложенной выборке."""
+    from src.core.ai.intent_preclassifier import score_rules  # noqa: PLC0415
+
+    rule_hits = rule_correct = centroid_hits = centroid_correct = 0
+    rule_latencies: List[float] = []
+    per_intent: Dict[str, Counter] = defaultdict(Counter)
+    for (text, intent), vector in zip(test, test_vectors):
+        started = time.perf_counter()
+        candidates = score_rules(text)
+        rule_latencies.append((time.perf_counter() - started) * 1000.0)
+        per_intent[intent]["total"] += 1
+        if candidates and candidates[0].confidence >= args.rule_min_confidence:
+            rule_hits += 1
+            rule_correct += int(candidates[0].intent == intent)
+            per_intent[intent]["hits"] += 1
+            continue
+        predicted, similarity, margin = model.predict(vector)
+        if similarity >= args.min_similarity and margin >= args.min_margin:
+            centroid_hits += 1
+            centroid_correct += int(predicted == intent)
+            per_intent[intent]["hits"] += 1
+
+    total = max(1, len(test))
+    hits = rule_hits + centroid_hits
+    print(f"Отложенная выборка: {len(test)} сообщений")
+    print(
+        f"  правила:  hit_rate={rule_hits / total:.3f} "
+        f"precision={rule_correct / max(1, rule_hits):.3f} "
+        f"p50={_percentile(rule_latencies, 50):.3f} ms p95={_percentile(rule_latencies, 95):.3f} ms"
+    )
+    print(
+        f"  centroid: hit_rate={centroid_hits / total:.3f} "
+        f"precision={centroid_correct / max(1, centroid_hits):.3f}"
+    )
+    print(f"  итого без LLM: {hits / total:.3f} (точность {(rule_correct + centroid_correct) / max(1, hits):.3f})")
+    for intent in sorted(per_intent):
+        counts = per_intent[intent]
+        print(f"    {intent:<20} hits={counts['hits']}/{counts['total']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа обучения centroid-модели intent."""
+    from config import ai_settings  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description="Обучение centroid-модели intent по ai_router_log")
+    parser.add_argument(
+        "--output",
+        default=ai_settings.AI_INTENT_CENTROID_MODEL_PATH or "./data/intent_centroids.npz",
+        help="Путь к файлу модели .npz (по умолчанию AI_INTENT_CENTROID_MODEL_PATH)",
+    )
+    parser.add_argument("--days", type=int, default=90, help="Глубина журнала в днях")
+    parser.add_argument("--min-confidence", type=float, default=0.8, help="Минимальная уверенность LLM-разметки")
+    parser.add_argument("--min-samples", type=int, default=20, help="Минимум примеров, чтобы intent попал в модель")
+    parser.add_argument("--max-per-intent", type=int, default=2000, help="Максимум примеров на intent")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Доля примеров для оценки")
+    parser.add_argument("--batch-size", type=int, default=64, help="Размер батча эмбеддингов")
+    parser.add_argument("--model", default=ai_settings.AI_RAG_VECTOR_EMBEDDING_MODEL, help="Embedding-модель")
+    parser.add_argument("--rule-min-confidence", type=float, default=ai_settings.AI_INTENT_PRECLASSIFIER_MIN_CONFIDENCE)
+    parser.add_argument("--min-similarity", type=float, default=ai_settings.AI_INTENT_CENTROID_MIN_SIMILARITY)
+    parser.add_argument("--min-margin", type=float, default=ai_settings.AI_INTENT_CENTROID_MIN_MARGIN)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dry-run", action="store_true", help="Только оценка, без сохранения модели")
+    args = parser.parse_args(argv)
+
+    from src.core.ai.intent_preclassifier import IntentCentroidModel  # noqa: PLC0415
+    from src.core.ai.vector_search import LocalEmbeddingProvider  # noqa: PLC0415
+
+    samples = _load_samples(args.days, args.min_confidence)
+    train, test = _split(samples, args.max_per_intent, args.holdout, args.seed)
+    print(f"Примеров в журнале: {len(samples)}, обучение: {len(train)}, оценка: {len(test)}")
+    if not train:
+        print("Нет данных для обучения")
+        return 1
+
+    provider = LocalEmbeddingProvider(model_name=args.model)
+    if not provider.is_ready():
+        print(f"Embedding-модель недоступна: {provider.last_error_message()}")
+        return 1
+
+    started = time.perf_counter()
+    train_vectors = _encode(provider, [text for text, _ in train], args.batch_size)
+    try:
+        model = IntentCentroidModel.train(
+            [intent for _, intent in train],
+            train_vectors,
+            embedding_model=args.model,
+            min_samples=args.min_samples,
+        )
+    except ValueError as exc:
+        print(str(exc))
+        return 1
+    print(f"Обучено за {time.perf_counter() - started:.1f} с, intent: {model.sample_counts}")
+
+    if test:
+        _evaluate(model, test, _encode(provider, [text for text, _ in test], args.batch_size), args)
+
+    if not args.dry_run:
+        model.save(args.output)
+        print(f"Модель сохранена: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
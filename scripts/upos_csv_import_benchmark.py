@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Бенчмарк импорта кодов ошибок UPOS из CSV: построчно против пакетного импорта.
+
+Генерируется CSV на ``--rows`` строк (по умолчанию 10 000) с ``--categories``
+категориями; доля ``--existing`` кодов уже есть в БД. Файл разбирается
+``parse_csv_error_codes``, затем замеряется:
+  - per-record: прежний алгоритм — на каждую запись поиск кода, поиск или
+    создание категории, создание или до трёх обновлений кода, каждое своим
+    соединением и commit;
+  - bulk: ``import_error_codes_from_csv`` — предзагрузка кодов и категорий,
+    executemany пачками ``CSV_IMPORT_BATCH_SIZE`` в одной транзакции.
+
+БД имитируется в памяти: каждый round-trip (execute, executemany, commit)
+стоит ``--db-latency-ms``, каждая строка executemany — ``--row-cost-us``.
+
+Примеры:
+  python scripts/upos_csv_import_benchmark.py
+  python scripts/upos_csv_import_benchmark.py --rows 10000 --db-latency-ms 0.5 --update
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import csv
+import io
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+from unittest import mock
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+
+class FakeDatabase:
+    """Таблицы кодов и категорий в памяти с задержкой на каждый round-trip."""
+
+    def __init__(self, latency: float, row_cost: float, codes: List[str]) -> None:
+        self._latency = latency
+        self._row_cost = row_cost
+        self.codes = {code.lower(): {"id": i, "error_code": code, "active": 1} for i, code in enumerate(codes, 1)}
+        self.categories: dict = {}
+        self.round_trips = 0
+        self.connections = 0
+        self._next_id = len(codes) + 1
+
+    def _round_trip(self, rows: int = 0) -> None:
+        self.round_trips += 1
+        time.sleep(self._latency + rows * self._row_cost)
+
+    @contextlib.contextmanager
+    def get_db_connection(self):
+        self.connections += 1
+        yield self
+        self._round_trip()  # commit
+
+    @contextlib.contextmanager
+    def get_cursor(self, conn):
+        yield _FakeCursor(self)
+
+
+class _FakeCursor:
+    def __init__(self, db: FakeDatabase) -> None:
+        self._db = db
+        self._result: list = []
+        self.lastrowid = 0
+        self.rowcount = 1
+
+    def _insert_category(self, name: str) -> None:
+        self._db._next_id += 1
+        self.lastrowid = self._db._next_id
+        self._db.categories[name.lower()] = {"id": self.lastrowid, "name": name, "active": 1}
+
+    def _upsert_code(self, code: str) -> None:
+        if code.lower() not in self._db.codes:
+            self._db._next_id += 1
+            self.lastrowid = self._db._next_id
+            self._db.codes[code.lower()] = {"id": self.lastrowid, "error_code": code, "active": 1}
+
+    def execute(self, sql: str, params=None) -> None:
+        self._db._round_trip()
+        sql = " ".join(sql.split())
+        if sql.startswith("INSERT INTO upos_error_categories"):
+            self._insert_category(params[0])
+        elif sql.startswith("INSERT INTO upos_error_codes"):
+            self._upsert_code(params[0])
+        elif "WHERE name IN" in sql:
+            names = {name.lower() for name in params}
+            self._result = [row for key, row in self._db.categories.items() if key in names]
+        elif "FROM upos_error_categories WHERE name" in sql:
+            row = self._db.categories.get(params[0].lower())
+            self._result = [row] if row else []
+        elif "FROM upos_error_categories" in sql:
+            self._result = list(self._db.categories.values())
+        elif "e.error_code = %s" in sql:
+            row = self._db.codes.get(params[0].lower())
+            self._result = [row] if row else []
+        elif "FROM upos_error_codes" in sql:
+            self._result = list(self._db.codes.values())
+
+    def executemany(self, sql: str, rows) -> None:
+        rows = list(rows)
+        self._db._round_trip(len(rows))
+        for row in rows:
+            if sql.lstrip().startswith("INSERT INTO upos_error_categories"):
+                self._insert_category(row[0])
+            else:
+                self._upsert_code(row[0])
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+
+def _generate_csv(rows: int, categories: int, seed: int) -> str:
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["error_code", "description", "suggested_actions", "category"])
+    for i in range(rows):
+        writer.writerow([
+            f"E{i:05d}",
+            f"Описание ошибки {i}",
+            "1. Перезагрузите терминал\n2. Повторите операцию",
+            f"Категория {rng.randrange(categories)}",
+        ])
+    return buffer.getvalue()
+
+
+def _legacy_import(records: List[dict], skip_existing: bool):
+    """Прежний построчный алгоритм import_error_codes_from_csv."""
+    from src.sbs_helper_telegram_bot.upos_error import upos_error_bot_part as part  # noqa: PLC0415
+
+    result = part.CSVImportResult()
+    for record in records:
+        try:
+            with part.database.get_db_connection() as conn:
+                with part.database.get_cursor(conn) as cursor:
+                    cursor.execute(
+                        "SELECT e.* FROM upos_error_codes e WHERE e.error_code = %s AND e.active = 1",
+                        (record['error_code'],),
+                    )
+                    existing = cursor.fetchone()
+            category_name = record.get('category_name')
+            if existing:
+                if skip_existing:
+                    result.skipped_count += 1
+                    continue
+                part.update_error_code(existing['id'], 'description', record['description'])
+                part.update_error_code(existing['id'], 'suggested_actions', record['suggested_actions'], update_timestamp=True)
+                if category_name:
+                    cat = part.get_category_by_name(category_name)
+                    if cat:
+                        part.update_error_code(existing['id'], 'category_id', cat['id'])
+                result.success_count += 1
+                continue
+            category_id = None
+            if category_name:
+                cat = part.get_category_by_name(category_name)
+                category_id = cat['id'] if cat else part.create_category(category_name, None, 0)
+            part.create_error_code(record['error_code'], record['description'], record['suggested_actions'], category_id)
+            result.success_count += 1
+        except Exception as e:
+            result.error_count += 1
+            result.errors.append(str(e))
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    from src.sbs_helper_telegram_bot.upos_error import settings  # noqa: PLC0415
+    from src.sbs_helper_telegram_bot.upos_error import upos_error_bot_part as part  # noqa: PLC0415
+
+    parser = argparse.ArgumentParser(description="Бенчмарк импорта кодов UPOS из CSV")
+    parser.add_argument("--rows", type=int, default=10_000, help="Строк в CSV")
+    parser.add_argument("--categories", type=int, default=20, help="Число категорий")
+    parser.add_argument("--existing", type=float, default=0.3, help="Доля кодов, уже имеющихся в БД")
+    parser.add_argument("--update", action="store_true", help="Обновлять существующие коды (иначе пропускать)")
+    parser.add_argument("--db-latency-ms", type=float, default=0.3, help="Задержка одного round-trip к БД")
+    parser.add_argument("--row-cost-us", type=float, default=5.0, help="Стоимость строки в executemany")
+    parser.add_argument("--batch-size", type=int, default=settings.CSV_IMPORT_BATCH_SIZE, help="Строк в пачке bulk")
+    parser.add_argument("--modes", default="per-record,bulk", help="Режимы через запятую")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    records, errors = part.parse_csv_error_codes(_generate_csv(args.rows, args.categories, args.seed))
+    parse_seconds = time.perf_counter() - started
+    if errors:
+        print(f"CSV errors: {errors[:3]}")
+        return 1
+    rng = random.Random(args.seed)
+    existing = [record['error_code'] for record in records if rng.random() < args.existing]
+    print(
+        f"rows={len(records)} existing={len(existing)} categories={args.categories} "
+        f"mode={'update' if args.update else 'skip'} db_latency={args.db_latency_ms} ms "
+        f"batch={args.batch_size} parse={parse_seconds:.2f} s"
+    )
+
+    for mode in [item.strip() for item in args.modes.split(",") if item.strip()]:
+        db = FakeDatabase(args.db_latency_ms / 1000.0, args.row_cost_us / 1_000_000.0, existing)
+        with mock.patch.object(part, "database", db):
+            started = time.perf_counter()
+            if mode == "per-record":
+                result = _legacy_import(records, skip_existing=not args.update)
+            elif mode == "bulk":
+                result = part.import_error_codes_from_csv(
+                    records, skip_existing=not args.update, batch_size=args.batch_size
+                )
+            else:
+                print(f"{mode}: неизвестный режим")
+                return 1
+            seconds = time.perf_counter() - started
+        print(
+            f"{mode:<10} {seconds:7.2f} s  {len(records) / seconds:8.0f} rows/s  "
+            f"connections={db.connections} round_trips={db.round_trips}  "
+            f"success={result.success_count} skipped={result.skipped_count} errors={result.error_count}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
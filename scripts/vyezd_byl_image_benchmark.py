@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Бенчмарк анализа скриншотов в очереди vyezd_byl: getpixel-циклы против NumPy.
+
+Для каждого изображения выполняются этапы анализа из ``generate_image``:
+  - mode: поиск пикселя логотипа (тёмный/светлый режим);
+  - dark_frame: границы карты и поиск тёмных иконок (только тёмный режим);
+  - light_icons: поиск светлых иконок (светлый режим или без пикселя логотипа).
+
+Сравниваются прежняя реализация (вложенные циклы ``getpixel`` +
+``is_color_close``) и векторная, замеряется время этапов и проверяется, что
+результаты (режим, границы, код ошибки) совпадают.
+
+Примеры:
+  python scripts/vyezd_byl_image_benchmark.py
+  python scripts/vyezd_byl_image_benchmark.py --images path/to/a.jpg path/to/b.jpg --repeat 3
+  python scripts/vyezd_byl_image_benchmark.py --skip-legacy
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _bootstrap_project_root() -> None:
+    """Добавить корень проекта в sys.path для прямого запуска скрипта."""
+    project_root = Path(__file__).resolve().parents[1]
+    project_root_str = str(project_root)
+    if project_root_str not in sys.path:
+        sys.path.insert(0, project_root_str)
+
+
+_bootstrap_project_root()
+
+AnalysisResult = Tuple[bool, bool, Optional[int], Optional[int], Optional[int]]
+
+
+def _legacy_analyze(image: Any, timings: Dict[str, float]) -> AnalysisResult:
+    """Прежний анализ: обход пикселей через getpixel (копия логики до векторизации)."""
+    from src.sbs_helper_telegram_bot.vyezd_byl import processimagequeue as piq  # noqa: PLC0415
+
+    width, height = image.size
+    dark_mode = False
+    good_pixel_found = False
+    highest: Optional[int] = None
+    lowest: Optional[int] = None
+
+    started = time.perf_counter()
+    for y in range(piq.MIN_HEIGHT_TO_START_LOOKING_FOR_GOOD_PIXEL, min(piq.MAX_HEIGHT_TO_END_LOOK_FOR_GOOD_PIXEL, height)):
+        if good_pixel_found:
+            break
+        for x in range(width):
+            pixel = image.getpixel((x, y))
+            if piq.is_color_close(pixel, piq.DARK_PIXEL_COLOR):
+                dark_mode = True
+                good_pixel_found = True
+                break
+            if piq.is_color_close(pixel, piq.LIGHT_PIXEL_COLOR):
+                good_pixel_found = True
+                break
+    timings["mode"] = time.perf_counter() - started
+
+    if dark_mode:
+        started = time.perf_counter()
+        highest = 0
+        lowest = height
+        escape = False
+        for y in range(height):
+            if escape:
+                break
+            for x in range(width):
+                pixel = image.getpixel((x, y))
+                if x == piq.COLUMN_TO_SCAN_FOR_FRAME_BORDER_COLOR and piq.is_color_close(pixel, piq.FRAME_BORDER_COLOR):
+                    highest = y
+                if (
+                    x == piq.COLUMN_TO_SCAN_FOR_TASKS_BORDER_COLOR
+                    and lowest == height
+                    and piq.is_color_close(pixel, piq.TASKS_BORDER_COLOR)
+                ):
+                    lowest = y
+                    escape = True
+                    break
+                if piq.is_color_close(pixel, piq.DARK_LOCATION_ICON_COLOR):
+                    timings["dark_frame"] = time.perf_counter() - started
+                    return dark_mode, good_pixel_found, None, None, piq.ERR_ALREADY_HAS_DARK_CIRCLE
+                if piq.is_color_close(pixel, piq.DARK_TRIANGLE_ICON_COLOR):
+                    timings["dark_frame"] = time.perf_counter() - started
+                    return dark_mode, good_pixel_found, None, None, piq.ERR_ALREADY_HAS_DARK_TRIANGLE
+        timings["dark_frame"] = time.perf_counter() - started
+
+    if not dark_mode:
+        started = time.perf_counter()
+        for y in range(height):
+            for x in range(width):
+                pixel = image.getpixel((x, y))
+                if piq.is_color_close(pixel, piq.LIGHT_LOCATION_ICON_COLOR):
+                    timings["light_icons"] = time.perf_counter() - started
+                    return dark_mode, good_pixel_found, None, None, piq.ERR_ALREADY_HAS_CIRCLE
+                if piq.is_color_close(pixel, piq.LIGHT_TRIANGLE_ICON_COLOR):
+                    timings["light_icons"] = time.perf_counter() - started
+                    return dark_mode, good_pixel_found, None, None, piq.ERR_ALREADY_HAS_TRIANGLE
+        timings["light_icons"] = time.perf_counter() - started
+
+    return dark_mode, good_pixel_found, highest, lowest, None
+
+
+def _vectorized_analyze(image: Any, timings: Dict[str, float]) -> AnalysisResult:
+    """Векторный анализ из processimagequeue."""
+    import numpy as np  # noqa: PLC0415
+
+    from src.sbs_helper_telegram_bot.vyezd_byl import processimagequeue as piq  # noqa: PLC0415
+
+    started = time.perf_counter()
+    pixels = np.asarray(image)
+    dark_mode, good_pixel_found = piq.detect_color_mode(pixels)
+    timings["mode"] = time.perf_counter() - started
+
+    highest: Optional[int] = None
+    lowest: Optional[int] = None
+    if dark_mode:
+        started = time.perf_counter()
+        highest, lowest, error_code = piq.scan_dark_mode_frame(pixels)
+        timings["dark_frame"] = time.perf_counter() - started
+        if error_code is not None:
+            return dark_mode, good_pixel_found, None, None, error_code
+
+    if not dark_mode:
+        started = time.perf_counter()
+        error_code = piq.scan_light_mode_icons(pixels)
+        timings["light_icons"] = time.perf_counter() - started
+        if error_code is not None:
+            return dark_mode, good_pixel_found, None, None, error_code
+
+    return dark_mode, good_pixel_found, highest, lowest, None
+
+
+def _default_images() -> List[Path]:
+    from src.common.constants.os import TEST_SAMPLES_DIR  # noqa: PLC0415
+
+    return sorted(
+        path for path in TEST_SAMPLES_DIR.rglob("*.jpg")
+        if path.name != "unknown_format.jpg"
+    )
+
+
+def _format_timings(timings: Dict[str, float]) -> str:
+    return " ".join(f"{stage}={seconds * 1000:8.1f}ms" for stage, seconds in timings.items())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Точка входа бенчмарка."""
+    parser = argparse.ArgumentParser(description="Бенчмарк анализа изображений vyezd_byl")
+    parser.add_argument("--images", type=Path, nargs="*", help="Изображения (по умолчанию — tests/samples)")
+    parser.add_argument("--repeat", type=int, default=1, help="Повторов векторного анализа (берётся лучший)")
+    parser.add_argument("--skip-legacy", action="store_true", help="Не запускать прежнюю реализацию")
+    args = parser.parse_args(argv)
+
+    import logging  # noqa: PLC0415
+
+    from PIL import Image  # noqa: PLC0415
+
+    logging.getLogger("src.sbs_helper_telegram_bot.vyezd_byl.processimagequeue").setLevel(logging.WARNING)
+
+    images = args.images or _default_images()
+    mismatches = 0
+    legacy_total = 0.0
+    vector_total = 0.0
+    for path in images:
+        image = Image.open(path)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.load()
+
+        best_timings: Dict[str, float] = {}
+        vector_result: Optional[AnalysisResult] = None
+        for _ in range(max(1, args.repeat)):
+            timings: Dict[str, float] = {}
+            vector_result = _vectorized_analyze(image, timings)
+            if not best_timings or sum(timings.values()) < sum(best_timings.values()):
+                best_timings = timings
+        vector_total += sum(best_timings.values())
+
+        print(f"{path.name} {image.size[0]}x{image.size[1]} result={vector_result}")
+        print(f"  numpy : {_format_timings(best_timings)}")
+        if args.skip_legacy:
+            continue
+
+        legacy_timings: Dict[str, float] = {}
+        legacy_result = _legacy_analyze(image, legacy_timings)
+        legacy_total += sum(legacy_timings.values())
+        print(f"  legacy: {_format_timings(legacy_timings)}")
+        if legacy_result != vector_result:
+            mismatches += 1
+            print(f"  MISMATCH: legacy={legacy_result} numpy={vector_result}")
+
+    print(f"images={len(images)} numpy_total={vector_total * 1000:.1f}ms", end="")
+    if not args.skip_legacy:
+        speedup = legacy_total / vector_total if vector_total else 0.0
+        print(f" legacy_total={legacy_total * 1000:.1f}ms x{speedup:.0f} mismatches={mismatches}")
+    else:
+        print()
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,44 @@
+-- ============================================================================
+-- ai_rag_token_storage_setup.sql — предтокенизированные чанки и summary RAG
+-- ============================================================================
+-- Хранит нормализованные токены чанков и summary, вычисленные при ingest,
+-- чтобы lexical retrieval не токенизировал корпус повторно.
+-- tokenizer_signature — режим нормализации (raw / ru:<mode>): строки с другой
+-- сигнатурой игнорируются и пересчитываются командой
+-- `python scripts/rag_ops.py update tokens`.
+--
+-- Запустить: mysql -u <user> -p <database> < sql/ai_rag_token_storage_setup.sql
+-- ============================================================================
+
+CREATE TABLE IF NOT EXISTS rag_chunk_tokens (
+    chunk_id BIGINT NOT NULL PRIMARY KEY,
+    document_id BIGINT NOT NULL,
+    tokenizer_signature VARCHAR(64) NOT NULL,
+    tokens_text MEDIUMTEXT NOT NULL,
+    token_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    INDEX idx_rag_chunk_tokens_document (document_id),
+    INDEX idx_rag_chunk_tokens_signature (tokenizer_signature),
+    CONSTRAINT fk_rag_chunk_tokens_chunk
+        FOREIGN KEY (chunk_id) REFERENCES rag_chunks(id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_rag_chunk_tokens_document
+        FOREIGN KEY (document_id) REFERENCES rag_documents(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+COMMENT='Нормализованные токены чанков RAG (через пробел) для lexical retrieval';
+
+CREATE TABLE IF NOT EXISTS rag_summary_tokens (
+    document_id BIGINT NOT NULL PRIMARY KEY,
+    tokenizer_signature VARCHAR(64) NOT NULL,
+    tokens_text MEDIUMTEXT NOT NULL,
+    token_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    INDEX idx_rag_summary_tokens_signature (tokenizer_signature),
+    CONSTRAINT fk_rag_summary_tokens_document
+        FOREIGN KEY (document_id) REFERENCES rag_documents(id)
+        ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+COMMENT='Нормализованные токены summary документов RAG для prefilter';
@@ -0,0 +1,51 @@
+-- =====================================================
+-- CERTIFICATION SUMMARIES
+-- Предрасчитанные сводки аттестации. complete_test_attempt обновляет их
+-- в той же транзакции, что и попытку, поэтому профиль («Мой рейтинг»,
+-- главное меню) и «Топ месяца» читаются отсюда по первичному ключу или
+-- индексу, а не агрегацией certification_attempts.
+--
+-- Заполнение по накопленной истории и полная перестройка:
+--   python scripts/certification_summary_rebuild.py
+-- =====================================================
+
+-- Успешно пройденные тесты пользователя (все категории и общий тест)
+CREATE TABLE IF NOT EXISTS `certification_user_summary` (
+  `userid` bigint(20) NOT NULL COMMENT 'Telegram user ID',
+  `passed_tests_count` int(11) NOT NULL DEFAULT '0',
+  `last_passed_timestamp` bigint(20) DEFAULT NULL,
+  `last_passed_score` decimal(5,2) DEFAULT NULL,
+  `updated_timestamp` bigint(20) NOT NULL,
+  PRIMARY KEY (`userid`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Результаты пользователя по категориям.
+-- best_score_percent — лучший процент завершённых попыток за окно
+-- CATEGORY_RESULT_VALIDITY_DAYS, best_score_timestamp — время последней
+-- попытки с этим процентом. Когда оно выходит из окна, строку пересчитывает
+-- очистка истёкших результатов (--sweep-expired) или первое чтение сводки.
+CREATE TABLE IF NOT EXISTS `certification_user_category_results` (
+  `userid` bigint(20) NOT NULL COMMENT 'Telegram user ID',
+  `category_id` bigint(20) NOT NULL,
+  `last_passed_timestamp` bigint(20) DEFAULT NULL COMMENT 'NULL if category never passed',
+  `best_score_percent` decimal(5,2) DEFAULT NULL COMMENT 'NULL if no attempts within validity window',
+  `best_score_timestamp` bigint(20) DEFAULT NULL,
+  `updated_timestamp` bigint(20) NOT NULL,
+  PRIMARY KEY (`userid`, `category_id`),
+  KEY `category_id` (`category_id`),
+  KEY `best_score_timestamp` (`best_score_timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Месячный рейтинг: лучший процент и число успешных тестов пользователя
+-- за месяц. category_id = 0 — общий рейтинг по всем тестам.
+CREATE TABLE IF NOT EXISTS `certification_monthly_results` (
+  `month_key` int(11) NOT NULL COMMENT 'YYYYMM',
+  `category_id` bigint(20) NOT NULL COMMENT '0 means all tests',
+  `userid` bigint(20) NOT NULL COMMENT 'Telegram user ID',
+  `best_score` decimal(5,2) NOT NULL,
+  `tests_count` int(11) NOT NULL DEFAULT '0',
+  `updated_timestamp` bigint(20) NOT NULL,
+  PRIMARY KEY (`month_key`, `category_id`, `userid`),
+  KEY `ranking` (`month_key`, `category_id`, `best_score`, `tests_count`),
+  KEY `user_month` (`userid`, `month_key`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,53 @@
+-- =====================================================
+-- GAMIFICATION PERIOD TOTALS
+-- Агрегаты очков и достижений по календарным месяцам и годам для рейтингов.
+-- add_score_points и разблокировка достижений увеличивают строки месяца и
+-- года события в той же транзакции, поэтому рейтинг за период читается
+-- отсюда, а не агрегацией gamification_scores / gamification_user_achievements.
+--
+-- period_type: 'monthly' (period_key = YYYYMM) или 'yearly' (period_key = YYYY)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS `gamification_period_totals` (
+  `period_type` enum('monthly','yearly') CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `period_key` int(11) NOT NULL COMMENT 'YYYYMM for monthly, YYYY for yearly',
+  `userid` bigint(20) NOT NULL COMMENT 'Telegram user ID',
+  `score` bigint(20) NOT NULL DEFAULT '0',
+  `achievements` int(11) NOT NULL DEFAULT '0' COMMENT 'Achievement levels unlocked in period',
+  `last_updated` bigint(20) NOT NULL,
+  PRIMARY KEY (`period_type`, `period_key`, `userid`),
+  KEY `userid` (`userid`),
+  KEY `period_score` (`period_type`, `period_key`, `score`),
+  KEY `period_achievements` (`period_type`, `period_key`, `achievements`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- BACKFILL
+-- Заполнение агрегатов из накопленных событий. Повторный запуск безопасен:
+-- значения перезаписываются, а не прибавляются. Границы месяцев считаются
+-- в часовом поясе сессии MySQL — он должен совпадать с часовым поясом бота.
+-- Выполняйте при остановленном боте, чтобы не потерять начисления,
+-- сделанные во время заполнения.
+-- =====================================================
+INSERT INTO `gamification_period_totals` (`period_type`, `period_key`, `userid`, `score`, `achievements`, `last_updated`)
+SELECT 'monthly', CAST(DATE_FORMAT(FROM_UNIXTIME(`timestamp`), '%Y%m') AS UNSIGNED), `userid`, SUM(`points`), 0, UNIX_TIMESTAMP()
+FROM `gamification_scores`
+GROUP BY 2, `userid`
+ON DUPLICATE KEY UPDATE `score` = VALUES(`score`), `last_updated` = VALUES(`last_updated`);
+
+INSERT INTO `gamification_period_totals` (`period_type`, `period_key`, `userid`, `score`, `achievements`, `last_updated`)
+SELECT 'yearly', YEAR(FROM_UNIXTIME(`timestamp`)), `userid`, SUM(`points`), 0, UNIX_TIMESTAMP()
+FROM `gamification_scores`
+GROUP BY 2, `userid`
+ON DUPLICATE KEY UPDATE `score` = VALUES(`score`), `last_updated` = VALUES(`last_updated`);
+
+INSERT INTO `gamification_period_totals` (`period_type`, `period_key`, `userid`, `score`, `achievements`, `last_updated`)
+SELECT 'monthly', CAST(DATE_FORMAT(FROM_UNIXTIME(`unlocked_timestamp`), '%Y%m') AS UNSIGNED), `userid`, 0, COUNT(*), UNIX_TIMESTAMP()
+FROM `gamification_user_achievements`
+GROUP BY 2, `userid`
+ON DUPLICATE KEY UPDATE `achievements` = VALUES(`achievements`), `last_updated` = VALUES(`last_updated`);
+
+INSERT INTO `gamification_period_totals` (`period_type`, `period_key`, `userid`, `score`, `achievements`, `last_updated`)
+SELECT 'yearly', YEAR(FROM_UNIXTIME(`unlocked_timestamp`)), `userid`, 0, COUNT(*), UNIX_TIMESTAMP()
+FROM `gamification_user_achievements`
+GROUP BY 2, `userid`
+ON DUPLICATE KEY UPDATE `achievements` = VALUES(`achievements`), `last_updated` = VALUES(`last_updated`);
@@ -0,0 +1,52 @@
+-- =====================================================================
+-- Group Knowledge: отметка времени изменения Q&A-пар
+-- =====================================================================
+-- Колонка updated_at обновляется MySQL автоматически при любом UPDATE
+-- и используется QASearchService для инкрементального обновления
+-- BM25-корпуса (загружаются только пары, изменённые с прошлой загрузки).
+--
+-- Запустить: mysql -u <user> -p <database> < sql/gk_qa_pairs_updated_at_setup.sql
+-- =====================================================================
+
+SET @db_name = DATABASE();
+
+SET @sql_add_updated_at = (
+    SELECT IF(
+        EXISTS (
+            SELECT 1
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = @db_name
+              AND TABLE_NAME = 'gk_qa_pairs'
+              AND COLUMN_NAME = 'updated_at'
+        ),
+        'SELECT 1',
+        "ALTER TABLE gk_qa_pairs
+            ADD COLUMN updated_at TIMESTAMP(6)
+            NOT NULL
+            DEFAULT CURRENT_TIMESTAMP(6)
+            ON UPDATE CURRENT_TIMESTAMP(6)
+            COMMENT 'Время последнего изменения записи (инкрементальный BM25-корпус)'"
+    )
+);
+
+PREPARE stmt_add_updated_at FROM @sql_add_updated_at;
+EXECUTE stmt_add_updated_at;
+DEALLOCATE PREPARE stmt_add_updated_at;
+
+SET @sql_add_updated_at_index = (
+    SELECT IF(
+        EXISTS (
+            SELECT 1
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = @db_name
+              AND TABLE_NAME = 'gk_qa_pairs'
+              AND INDEX_NAME = 'idx_gqp_updated_at'
+        ),
+        'SELECT 1',
+        'ALTER TABLE gk_qa_pairs ADD INDEX idx_gqp_updated_at (updated_at)'
+    )
+);
+
+PREPARE stmt_add_updated_at_index FROM @sql_add_updated_at_index;
+EXECUTE stmt_add_updated_at_index;
+DEALLOCATE PREPARE stmt_add_updated_at_index;
@@ -0,0 +1,19 @@
+-- News Broadcast State Setup
+-- Состояние рассылок новостей. Строка в статусе 'running' остаётся после
+-- остановки бота посреди рассылки; при запуске бот дорассылает новость
+-- пользователям без отметки 'sent' в news_delivery_log (не более
+-- BROADCAST_MAX_ATTEMPTS попыток), после чего статус меняется на
+-- 'completed' или 'abandoned'.
+
+CREATE TABLE IF NOT EXISTS `news_broadcasts` (
+    `news_id` int(11) NOT NULL,
+    `status` enum('running','completed','abandoned') COLLATE utf8mb4_unicode_ci NOT NULL DEFAULT 'running',
+    `attempts` int(11) NOT NULL DEFAULT 1,
+    `total_recipients` int(11) NOT NULL DEFAULT 0,
+    `started_timestamp` bigint(20) NOT NULL,
+    `finished_timestamp` bigint(20) DEFAULT NULL,
+    PRIMARY KEY (`news_id`),
+    KEY `idx_news_broadcasts_status` (`status`),
+    CONSTRAINT `fk_news_broadcasts_news` FOREIGN KEY (`news_id`)
+        REFERENCES `news_articles` (`id`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,14 @@
+-- Runtime status of long-running processes (bot, GK responder)
+-- Each process periodically publishes its in-process stats (DB pool, caches)
+-- so that the health check daemon and rag_ops can read them from another process.
+
+CREATE TABLE IF NOT EXISTS `runtime_process_status` (
+  `process_name` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `hostname` varchar(255) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `pid` int(11) NOT NULL,
+  `payload` mediumtext CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `started_timestamp` bigint(20) NOT NULL,
+  `updated_timestamp` bigint(20) NOT NULL,
+  PRIMARY KEY (`process_name`, `hostname`, `pid`),
+  KEY `idx_runtime_process_status_updated` (`updated_timestamp`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,22 @@
+-- Settings Version Table Setup
+-- Счётчики версий таблиц настроек (bot_settings, gamification_settings,
+-- certification_settings) и справочников кодов (upos_error_codes, ktr_codes).
+-- Каждый set_setting и каждое изменение кода или категории увеличивает
+-- версию своей области в той же транзакции; процессы бота и admin_web раз
+-- в секунду сверяют версии и перечитывают снимок настроек или справочник
+-- только при изменении.
+
+CREATE TABLE IF NOT EXISTS `settings_version` (
+  `scope` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+  `version` bigint(20) unsigned NOT NULL DEFAULT '0',
+  `updated_timestamp` bigint(20) NOT NULL,
+  PRIMARY KEY (`scope`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO `settings_version` (`scope`, `version`, `updated_timestamp`) VALUES
+  ('bot_settings', 1, UNIX_TIMESTAMP()),
+  ('gamification_settings', 1, UNIX_TIMESTAMP()),
+  ('certification_settings', 1, UNIX_TIMESTAMP()),
+  ('upos_error_codes', 1, UNIX_TIMESTAMP()),
+  ('ktr_codes', 1, UNIX_TIMESTAMP())
+ON DUPLICATE KEY UPDATE `scope` = `scope`;
@@ -0,0 +1,253 @@
+"""
+async_database.py — асинхронный фасад доступа к MySQL для процесса бота.
+
+Обработчики Telegram — корутины, а mysql-connector блокирует поток. Один
+медленный запрос внутри обработчика останавливает event loop и обработку
+обновлений всех пользователей. Фасад выполняет блокирующую работу в
+выделенных пулах потоков поверх общего пула соединений ``database``:
+
+- ``run_db(func, ...)`` — вызвать синхронную функцию, которая сама открывает
+  ``get_db_connection`` (существующая логика модулей без переписывания);
+- ``get_async_db_connection()`` / ``get_async_cursor()`` — те же контекстные
+  менеджеры, что ``get_db_connection``/``get_cursor``, но с ``await``.
+
+Ожидание свободного соединения и функции ``run_db`` выполняются в пуле
+``db-io``, а запросы через уже выданные соединения — в пуле ``db-conn``
+размером с пул соединений. Поэтому запросы держателей соединений не стоят
+в очереди за потоками, ждущими освобождения этих же соединений.
+
+Через фасад переведены: проверка авторизации и главное меню бота
+(``/start``, ``/menu``, ``/reset``, ``/help``, ``/invite``), обработчики
+модуля аттестации (тест, обучение, рейтинги и история) вместе с событиями
+геймификации, которые они публикуют, и рассылка новостей. Экраны
+геймификации (профиль, рейтинги), просмотр новостей и пути Group Knowledge
+пока обращаются к БД синхронно.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import src.common.database as database
+from config.database_settings import DB_ASYNC_IO_WORKERS, DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_IO_THREAD_PREFIX = "db-io"
+_CONN_THREAD_PREFIX = "db-conn"
+
+
+class AsyncDatabase:
+    """
+    Пара пулов потоков для асинхронного доступа к БД.
+
+    Args:
+        io_workers: Потоки для ``run`` и ожидания свободного соединения.
+        connection_workers: Потоки для запросов через выданные соединения.
+    """
+
+    def __init__(self, io_workers: Optional[int] = None, connection_workers: Optional[int] = None) -> None:
+        self._io_workers = max(1, int(io_workers or DB_ASYNC_IO_WORKERS))
+        self._connection_workers = max(1, int(connection_workers or DB_POOL_SIZE))
+        self._io_pool = ThreadPoolExecutor(max_workers=self._io_workers, thread_name_prefix=_IO_THREAD_PREFIX)
+        self._connection_pool = ThreadPoolExecutor(
+            max_workers=self._connection_workers,
+            thread_name_prefix=_CONN_THREAD_PREFIX,
+        )
+
+    async def run(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Выполнить блокирующую функцию доступа к БД в пуле ``db-io``."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self._io_pool, call)
+
+    def submit_io(self, func: Callable[..., T], /, *args: Any) -> "Future[T]":
+        """Поставить блокирующую функцию в пул ``db-io`` без ожидания результата."""
+        return self._io_pool.submit(contextvars.copy_context().run, func, *args)
+
+    def submit_on_connection(self, func: Callable[..., T], /, *args: Any) -> "Future[T]":
+        """Поставить операцию над выданным соединением в пул ``db-conn``."""
+        return self._connection_pool.submit(func, *args)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Остановить оба пула."""
+        self._io_pool.shutdown(wait=wait)
+        self._connection_pool.shutdown(wait=wait)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Вернуть конфигурацию пулов для диагностики."""
+        return {
+            "io_workers": self._io_workers,
+            "connection_workers": self._connection_workers,
+        }
+
+
+class AsyncConnection:
+    """
+    Соединение из пула с асинхронными методами.
+
+    Операции выполняются по одной: каждая следующая ставится в пул после
+    завершения предыдущей, поэтому соединение не используется из двух
+    потоков одновременно даже после отмены ожидающей корутины.
+    """
+
+    def __init__(self, db: AsyncDatabase, conn: Any) -> None:
+        self._db = db
+        self._conn = conn
+        self._pending: Optional[Future] = None
+
+    async def _call(self, func: Callable[..., T], *args: Any) -> T:
+        await self.drain()
+        future = self._db.submit_on_connection(func, *args)
+        self._pending = future
+        return await asyncio.wrap_future(future)
+
+    async def drain(self) -> None:
+        """Дождаться завершения последней поставленной операции (ошибки игнорируются)."""
+        pending, self._pending = self._pending, None
+        if pending is not None and not pending.done():
+            try:
+                await asyncio.shield(asyncio.wrap_future(pending))
+            except Exception:
+                pass
+
+    async def cursor(self, dictionary: bool = True) -> "AsyncCursor":
+        """Открыть курсор (по умолчанию — словарный, как ``database.get_cursor``)."""
+        cursor = await self._call(functools.partial(self._conn.cursor, dictionary=dictionary))
+        return AsyncCursor(self, cursor)
+
+    async def commit(self) -> None:
+        """Зафиксировать транзакцию."""
+        await self._call(self._conn.commit)
+
+    async def rollback(self) -> None:
+        """Откатить транзакцию."""
+        await self._call(self._conn.rollback)
+
+    async def close(self) -> None:
+        """Вернуть соединение в пул."""
+        await self._call(self._conn.close)
+
+
+class AsyncCursor:
+    """Курсор mysql-connector с асинхронными execute/fetch."""
+
+    def __init__(self, connection: AsyncConnection, cursor: Any) -> None:
+        self._connection = connection
+        self._cursor = cursor
+
+    @property
+    def rowcount(self) -> int:
+        """Число строк, затронутых последним запросом."""
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        """Идентификатор последней вставленной строки."""
+        return self._cursor.lastrowid
+
+    async def execute(self, operation: str, params: Optional[Sequence[Any]] = None) -> None:
+        """Выполнить запрос."""
+        await self._connection._call(self._cursor.execute, operation, params)
+
+    async def executemany(self, operation: str, seq_params: List[Sequence[Any]]) -> None:
+        """Выполнить запрос для набора параметров."""
+        await self._connection._call(self._cursor.executemany, operation, seq_params)
+
+    async def fetchone(self) -> Any:
+        """Получить следующую строку результата."""
+        return await self._connection._call(self._cursor.fetchone)
+
+    async def fetchall(self) -> List[Any]:
+        """Получить все строки результата."""
+        return await self._connection._call(self._cursor.fetchall)
+
+    async def close(self) -> None:
+        """Закрыть курсор."""
+        await self._connection._call(self._cursor.close)
+
+
+_async_db: Optional[AsyncDatabase] = None
+_async_db_lock = threading.Lock()
+
+
+def get_async_database() -> AsyncDatabase:
+    """Получить общий экземпляр AsyncDatabase (создаётся лениво)."""
+    global _async_db
+    if _async_db is None:
+        with _async_db_lock:
+            if _async_db is None:
+                _async_db = AsyncDatabase()
+                logger.info("Асинхронный фасад БД создан: %s", _async_db.snapshot())
+    return _async_db
+
+
+def shutdown_async_database(wait: bool = False) -> None:
+    """Остановить общий AsyncDatabase (следующий вызов создаст новый)."""
+    global _async_db
+    with _async_db_lock:
+        db = _async_db
+        _async_db = None
+    if db is not None:
+        db.shutdown(wait=wait)
+
+
+async def run_db(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Выполнить синхронную функцию доступа к БД, не блокируя event loop."""
+    return await get_async_database().run(func, *args, **kwargs)
+
+
+def _release_abandoned_connection(future: "Future[Any]") -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+@asynccontextmanager
+async def get_async_db_connection() -> AsyncIterator[AsyncConnection]:
+    """
+    Асинхронный контекстный менеджер соединения из общего пула.
+
+    Как ``database.get_db_connection``: commit при успешном выходе,
+    rollback при исключении, затем возврат соединения в пул.
+    """
+    call_site = database.detect_call_site(__name__)
+    db = get_async_database()
+    acquire = db.submit_io(database.get_pool().get_connection, call_site)
+    try:
+        conn = await asyncio.shield(asyncio.wrap_future(acquire))
+    except asyncio.CancelledError:
+        # Соединение, полученное уже после отмены, сразу возвращается в пул.
+        acquire.add_done_callback(_release_abandoned_connection)
+        raise
+    connection = AsyncConnection(db, conn)
+    try:
+        yield connection
+        await connection.commit()
+    except BaseException:
+        await connection.drain()
+        try:
+            await asyncio.shield(asyncio.wrap_future(db.submit_on_connection(conn.rollback)))
+        except Exception as exc:
+            logger.debug("Rollback асинхронного соединения не удался: %r", exc)
+        raise
+    finally:
+        await connection.drain()
+        await asyncio.shield(asyncio.wrap_future(db.submit_on_connection(conn.close)))
+
+
+@asynccontextmanager
+async def get_async_cursor(connection: AsyncConnection, dictionary: bool = True) -> AsyncIterator[AsyncCursor]:
+    """Асинхронный контекстный менеджер курсора (аналог ``database.get_cursor``)."""
+    cursor = await connection.cursor(dictionary=dictionary)
+    try:
+        yield cursor
+    finally:
+        await cursor.close()
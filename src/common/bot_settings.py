@@ -11,61 +11,33 @@ bot_settings.py
 - is_module_enabled(module_key) -> bool: Проверить, включён ли модуль.
 - set_module_enabled(module_key, enabled, updated_by) -> bool: Включить/выключить модуль.
 - get_all_module_states() -> dict: Получить состояние всех модулей (вкл/выкл).
-- clear_settings_cache() -> None: Очистить кеш настроек (вызывается при set_setting).
+- clear_settings_cache() -> None: Сбросить снимок настроек (вызывается при set_setting).
+
+Чтение идёт из общего снимка таблицы bot_settings (src.common.settings_snapshot),
+который обновляется по счётчику версии, увеличиваемому каждым set_setting.
 """
 
 import logging
-import time
 from typing import Optional, Dict, List
 import src.common.database as database
+from src.common.settings_snapshot import (
+    SCOPE_BOT_SETTINGS,
+    bump_settings_version,
+    get_settings_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
-# ─────────────────────────────────────────────────────────────
-# TTL-кеш для настроек (избегаем повторных обращений к БД)
-# ─────────────────────────────────────────────────────────────
-# Время жизни кеша в секундах. Настройки модулей меняются редко (админ-переключение),
-# поэтому 60 секунд — приемлемая задержка. При записи кеш сбрасывается немедленно.
-_SETTINGS_CACHE_TTL = 60
-
-# Кеш: ключ -> (значение, время_записи)
-_settings_cache: Dict[str, tuple] = {}
-
-
-def _cache_get(key: str) -> Optional[str]:
-    """
-    Получить значение из кеша, если оно ещё не протухло.
-
-    Returns:
-        Значение настройки или _CACHE_MISS-sentinel, если кеш пуст/протух.
-    """
-    entry = _settings_cache.get(key)
-    if entry is not None:
-        value, cached_at = entry
-        if time.monotonic() - cached_at < _SETTINGS_CACHE_TTL:
-            return value
-        # Протухло — удаляем
-        del _settings_cache[key]
-    return _CACHE_MISS
-
-
-# Sentinel-объект, отличающийся от None (None — допустимое значение «настройка не найдена»)
-_CACHE_MISS = object()
-
-
-def _cache_put(key: str, value: Optional[str]) -> None:
-    """Сохранить значение в кеш."""
-    _settings_cache[key] = (value, time.monotonic())
-
 
 def clear_settings_cache() -> None:
     """
-    Очистить весь кеш настроек.
+    Сбросить снимок настроек бота в текущем процессе.
 
     Вызывается автоматически при set_setting(), чтобы изменения
-    применялись немедленно в текущем процессе.
+    применялись немедленно в текущем процессе; остальные процессы
+    узнают об изменении по счётчику версии (см. settings_snapshot).
     """
-    _settings_cache.clear()
+    get_settings_snapshot().invalidate(SCOPE_BOT_SETTINGS)
 
 # Ключи настроек
 SETTING_INVITE_SYSTEM_ENABLED = 'invite_system_enabled'
@@ -163,20 +135,7 @@ def get_setting(key: str) -> Optional[str]:
     Returns:
         Значение настройки в виде строки или None, если не найдено.
     """
-    cached_value = _cache_get(key)
-    if cached_value is not _CACHE_MISS:
-        return cached_value
-
-    with database.get_db_connection() as conn:
-        with database.get_cursor(conn) as cursor:
-            cursor.execute(
-                "SELECT setting_value FROM bot_settings WHERE setting_key = %s",
-                (key,)
-            )
-            result = cursor.fetchone()
-            value = result['setting_value'] if result else None
-            _cache_put(key, value)
-            return value
+    return get_settings_snapshot().get(SCOPE_BOT_SETTINGS, key)
 
 
 def set_setting(key: str, value: str, updated_by: Optional[int] = None) -> bool:
@@ -204,8 +163,9 @@ def set_setting(key: str, value: str, updated_by: Optional[int] = None) -> bool:
                 """,
                 (key, value, updated_by)
             )
-            clear_settings_cache()
-            return True
+            bump_settings_version(cursor, SCOPE_BOT_SETTINGS)
+    clear_settings_cache()
+    return True
 
 
 def is_invite_system_enabled() -> bool:
@@ -288,43 +248,11 @@ def get_all_module_states() -> Dict[str, bool]:
     Returns:
         Словарь соответствий module_key -> состояние (True/False).
     """
-    module_pairs = [(key, setting_key) for key, setting_key in MODULE_KEYS.items()]
-    if not module_pairs:
-        return {}
-
-    cache_keys = [setting_key for _, setting_key in module_pairs]
-    cached_values: Dict[str, Optional[str]] = {}
-    missing_keys: List[str] = []
-
-    for cache_key in cache_keys:
-        cached_value = _cache_get(cache_key)
-        if cached_value is _CACHE_MISS:
-            missing_keys.append(cache_key)
-        else:
-            cached_values[cache_key] = cached_value
-
-    if missing_keys:
-        placeholders = ", ".join(["%s"] * len(missing_keys))
-        query = (
-            "SELECT setting_key, setting_value "
-            "FROM bot_settings "
-            f"WHERE setting_key IN ({placeholders})"
-        )
-
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(query, tuple(missing_keys))
-                rows = cursor.fetchall() or []
-
-        values_from_db = {row['setting_key']: row['setting_value'] for row in rows}
-        for key in missing_keys:
-            value = values_from_db.get(key)
-            _cache_put(key, value)
-            cached_values[key] = value
+    values = get_settings_snapshot().get_all(SCOPE_BOT_SETTINGS)
 
     states: Dict[str, bool] = {}
-    for module_key, setting_key in module_pairs:
-        value = cached_values.get(setting_key)
+    for module_key, setting_key in MODULE_KEYS.items():
+        value = values.get(setting_key)
         states[module_key] = True if value is None else value == '1'
 
     return states
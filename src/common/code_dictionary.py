@@ -0,0 +1,252 @@
+"""
+code_dictionary.py — справочники кодов в памяти с инвалидацией по версии.
+
+Справочники кодов ошибок UPOS и кодов КТР небольшие и меняются только
+действиями администратора, поэтому активные коды загружаются одним запросом
+и хранятся в процессе как неизменяемый индекс (``CodeIndex``):
+
+- точное совпадение кода;
+- нормализованный ключ (регистр, пробелы и разделители, кириллические
+  двойники латинских букв), чтобы «e-001» находил «E001»;
+- отсортированный список нормализованных ключей для подсказок
+  «возможно, вы имели в виду» (по префиксу и нечёткому сходству).
+
+Актуальность проверяется, как у снимка настроек, по счётчику в таблице
+``settings_version``: каждое изменение кода или категории увеличивает версию
+справочника в той же транзакции (``bump_settings_version``), процесс сверяет
+версию не чаще ``SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS`` и перечитывает
+справочник только при её изменении. Без таблицы версий справочник
+перечитывается раз в ``SETTINGS_SNAPSHOT_MAX_AGE_SECONDS``. В потоке event
+loop загруженный индекс отдаётся сразу, а сверка идёт в фоне
+(``BackgroundRefresh``).
+"""
+
+import difflib
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import src.common.database as database
+from config.database_settings import (
+    SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS,
+    SETTINGS_SNAPSHOT_MAX_AGE_SECONDS,
+)
+from src.common.settings_snapshot import BackgroundRefresh, on_event_loop
+
+logger = logging.getLogger(__name__)
+
+SCOPE_UPOS_ERROR_CODES = "upos_error_codes"
+SCOPE_KTR_CODES = "ktr_codes"
+
+_SEPARATORS_RE = re.compile(r"[\s\-_.,/\\:;]+")
+# Кириллические буквы, совпадающие по начертанию с латинскими (после upper())
+_CYRILLIC_LOOKALIKES = str.maketrans("АВЕКМНОРСТУХ", "ABEKMHOPCTYX")
+
+
+def normalize_code(code: Any) -> str:
+    """Нормализованный ключ кода: верхний регистр, без разделителей и кириллических двойников."""
+    if code is None:
+        return ""
+    return _SEPARATORS_RE.sub("", str(code)).upper().translate(_CYRILLIC_LOOKALIKES)
+
+
+class CodeIndex:
+    """
+    Неизменяемый индекс активных кодов справочника.
+
+    Args:
+        rows: Строки справочника (словари из БД).
+        key_field: Имя поля с кодом.
+    """
+
+    def __init__(self, rows: Iterable[Dict[str, Any]], key_field: str) -> None:
+        self._exact: Dict[str, Dict[str, Any]] = {}
+        self._upper: Dict[str, Dict[str, Any]] = {}
+        self._normalized: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            code = str(row[key_field])
+            self._exact[code] = row
+            self._upper.setdefault(code.upper(), row)
+            self._normalized.setdefault(normalize_code(code), []).append(row)
+        self._key_field = key_field
+        self._sorted_keys: List[str] = sorted(self._normalized)
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Найти код: сначала точное совпадение, затем по нормализованному ключу.
+
+        Нормализованный ключ, которому соответствует несколько кодов,
+        не даёт результата — такие коды попадут в подсказки.
+        """
+        row = self._exact.get(code)
+        if row is None:
+            candidates = self._normalized.get(normalize_code(code), ())
+            row = candidates[0] if len(candidates) == 1 else None
+        return dict(row) if row is not None else None
+
+    def get_exact(self, code: str) -> Optional[Dict[str, Any]]:
+        """Найти код без нормализации разделителей (регистр не учитывается, как в БД)."""
+        row = self._exact.get(code) or self._upper.get(str(code).upper())
+        return dict(row) if row is not None else None
+
+    def suggest(self, code: str, limit: int = 5) -> List[str]:
+        """Коды, похожие на введённый: продолжения по префиксу, затем нечёткие совпадения."""
+        key = normalize_code(code)
+        if not key or limit <= 0:
+            return []
+
+        matches: List[str] = []
+        if key in self._normalized:
+            matches.append(key)
+        position = bisect_left(self._sorted_keys, key)
+        while (
+            position < len(self._sorted_keys)
+            and len(matches) < limit
+            and self._sorted_keys[position].startswith(key)
+        ):
+            if self._sorted_keys[position] != key:
+                matches.append(self._sorted_keys[position])
+            position += 1
+        if len(matches) < limit:
+            for candidate in difflib.get_close_matches(key, self._sorted_keys, n=limit, cutoff=0.6):
+                if candidate not in matches:
+                    matches.append(candidate)
+
+        codes: List[str] = []
+        for match in matches:
+            for row in self._normalized[match]:
+                codes.append(str(row[self._key_field]))
+        return codes[:limit]
+
+
+class CodeDictionary:
+    """
+    Справочник кодов в памяти с перечитыванием при смене версии.
+
+    Args:
+        scope: Имя справочника в settings_version.
+        loader: Загрузка всех активных строк справочника.
+        key_field: Имя поля с кодом.
+        check_interval_seconds: Интервал сверки версии.
+        max_age_seconds: Возраст индекса, после которого он перечитывается,
+            если версия недоступна.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        loader: Callable[[], Iterable[Dict[str, Any]]],
+        key_field: str,
+        check_interval_seconds: float = SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS,
+        max_age_seconds: float = SETTINGS_SNAPSHOT_MAX_AGE_SECONDS,
+    ) -> None:
+        self.scope = scope
+        self._loader = loader
+        self._key_field = key_field
+        self._check_interval = max(0.0, float(check_interval_seconds))
+        self._max_age = max(self._check_interval, float(max_age_seconds))
+        self._lock = threading.Lock()
+        self._index: Optional[CodeIndex] = None
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._next_check_at = 0.0
+        self._loads = 0
+        self._load_errors = 0
+        self._version_checks = 0
+        self._background_refresh = BackgroundRefresh(f"code_dictionary:{scope}", self._refresh)
+
+    def index(self) -> CodeIndex:
+        """
+        Получить текущий индекс, сверив версию не чаще интервала проверки.
+
+        Raises:
+            Exception: Ошибка БД, если справочник ещё ни разу не загружен.
+        """
+        index = self._index
+        if index is not None and time.monotonic() < self._next_check_at:
+            return index
+        if index is not None and on_event_loop():
+            self._background_refresh.request()
+            return index
+        return self._refresh()
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """Найти активный код (точно или по нормализованному ключу)."""
+        return self.index().get(code)
+
+    def suggest(self, code: str, limit: int = 5) -> List[str]:
+        """Подсказки похожих кодов; при недоступном справочнике — пустой список."""
+        try:
+            return self.index().suggest(code, limit)
+        except Exception as exc:
+            logger.warning("Не удалось подобрать подсказки по справочнику %s: %s", self.scope, exc)
+            return []
+
+    def invalidate(self) -> None:
+        """Сбросить индекс в текущем процессе (после изменения справочника)."""
+        with self._lock:
+            self._index = None
+            self._next_check_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние справочника для диагностики."""
+        with self._lock:
+            return {
+                "codes": len(self._index) if self._index is not None else None,
+                "version": self._version,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._index is not None else None,
+                "loads": self._loads,
+                "load_errors": self._load_errors,
+                "version_checks": self._version_checks,
+            }
+
+    def _refresh(self) -> CodeIndex:
+        with self._lock:
+            now = time.monotonic()
+            index = self._index
+            if index is not None and now < self._next_check_at:
+                return index
+
+            version = self._read_version()
+            self._next_check_at = now + self._check_interval
+            if index is not None:
+                if version is not None and version == self._version:
+                    return index
+                # Без счётчика версии (нет таблицы или строки) — перечитывание по возрасту
+                if version is None and now - self._loaded_at < self._max_age:
+                    return index
+
+            try:
+                index = CodeIndex(self._loader(), self._key_field)
+            except Exception as exc:
+                self._load_errors += 1
+                if self._index is None:
+                    raise
+                # БД недоступна — отдаём прежний индекс до следующей проверки
+                logger.warning("Не удалось обновить справочник %s: %s", self.scope, exc)
+                return self._index
+
+            self._loads += 1
+            self._index = index
+            self._version = version
+            self._loaded_at = now
+            return index
+
+    def _read_version(self) -> Optional[int]:
+        """Прочитать версию справочника (None — таблица или строка версии отсутствует)."""
+        self._version_checks += 1
+        try:
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    cursor.execute("SELECT version FROM settings_version WHERE scope = %s", (self.scope,))
+                    row = cursor.fetchone()
+        except Exception as exc:
+            logger.debug("Версия справочника %s недоступна: %s", self.scope, exc)
+            return None
+        return int(row["version"]) if row else None
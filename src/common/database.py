@@ -1,9 +1,23 @@
 import logging
+import sys
+import threading
+import time
 import mysql.connector
 import mysql.connector.pooling
+from collections import deque
 from contextlib import contextmanager
-from typing import Generator, Optional
-from config.database_settings import MYSQL_DATABASE, MYSQL_HOST, MYSQL_PASSWORD, MYSQL_PORT, MYSQL_USER
+from typing import Any, Callable, Deque, Dict, Generator, List, Optional, Tuple
+from config.database_settings import (
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    DB_POOL_MAX_LIFETIME_SECONDS,
+    DB_POOL_PREPING_IDLE_SECONDS,
+    DB_POOL_SIZE,
+    MYSQL_DATABASE,
+    MYSQL_HOST,
+    MYSQL_PASSWORD,
+    MYSQL_PORT,
+    MYSQL_USER,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,14 +26,403 @@ logger = logging.getLogger(__name__)
 # ─────────────────────────────────────────────────────────────
 # Размер пула можно переопределить через переменную окружения DB_POOL_SIZE.
 # По умолчанию 5 соединений — достаточно для основного бота и воркера очереди.
+# В отличие от MySQLConnectionPool, при исчерпании пула запрос ждёт
+# освобождения соединения (DB_POOL_ACQUIRE_TIMEOUT_SECONDS), а не падает сразу.
 
-import os
-_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+_POOL_SIZE = DB_POOL_SIZE
 
-_connection_pool: Optional[mysql.connector.pooling.MySQLConnectionPool] = None
+# Верхние границы корзин гистограмм ожидания и удержания соединения (мс).
+_HISTOGRAM_BOUNDS_MS: Tuple[float, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000, float("inf"))
 
+_UNKNOWN_CALL_SITE = "unknown"
 
-def _get_pool() -> mysql.connector.pooling.MySQLConnectionPool:
+
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    """Свободное соединение не появилось за время ожидания."""
+
+
+class _Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (мс)."""
+
+    __slots__ = ("counts", "total_ms", "max_ms")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * len(_HISTOGRAM_BOUNDS_MS)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        for index, bound in enumerate(_HISTOGRAM_BOUNDS_MS):
+            if value_ms <= bound:
+                self.counts[index] += 1
+                break
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, percent: float) -> float:
+        """Оценка перцентиля: верхняя граница корзины (для последней — максимум)."""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        threshold = total * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= threshold:
+                bound = _HISTOGRAM_BOUNDS_MS[index]
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        total = sum(self.counts)
+        return {
+            "count": total,
+            "avg_ms": round(self.total_ms / total, 3) if total else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                ("+inf" if bound == float("inf") else f"<={bound:g}"): count
+                for bound, count in zip(_HISTOGRAM_BOUNDS_MS, self.counts)
+            },
+        }
+
+
+class _CallSiteStats:
+    """Метрики одного места вызова: ожидание, удержание, таймауты."""
+
+    __slots__ = ("wait", "hold", "timeouts")
+
+    def __init__(self) -> None:
+        self.wait = _Histogram()
+        self.hold = _Histogram()
+        self.timeouts = 0
+
+
+class _PoolEntry:
+    """Физическое соединение и его времена создания/последнего возврата."""
+
+    __slots__ = ("conn", "created_at", "released_at")
+
+    def __init__(self, conn: Any, now: float) -> None:
+        self.conn = conn
+        self.created_at = now
+        self.released_at = now
+
+
+class PooledConnection:
+    """
+    Соединение, выданное пулом.
+
+    Проксирует все атрибуты физического соединения; ``close()`` возвращает
+    соединение в пул (повторный вызов ничего не делает).
+    """
+
+    def __init__(self, pool: "BlockingConnectionPool", entry: _PoolEntry, call_site: str, acquired_at: float) -> None:
+        self._pool = pool
+        self._entry: Optional[_PoolEntry] = entry
+        self._call_site = call_site
+        self._acquired_at = acquired_at
+
+    def __getattr__(self, name: str) -> Any:
+        entry = self.__dict__.get("_entry")
+        if entry is None:
+            raise mysql.connector.errors.OperationalError("Соединение уже возвращено в пул")
+        return getattr(entry.conn, name)
+
+    def close(self) -> None:
+        """Вернуть соединение в пул."""
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry, self._call_site, self._acquired_at)
+
+
+class BlockingConnectionPool:
+    """
+    Пул соединений с ожиданием свободного соединения и метриками.
+
+    - ``get_connection`` ждёт освобождения соединения до ``acquire_timeout_seconds``
+      (очередь ожидающих — на условной переменной), затем бросает ``PoolTimeoutError``;
+    - соединение, простаивавшее дольше ``preping_idle_seconds``, проверяется ping,
+      мёртвые и старше ``max_lifetime_seconds`` пересоздаются;
+    - по каждому месту вызова собираются гистограммы ожидания и удержания соединения.
+
+    Args:
+        connection_factory: Функция открытия нового физического соединения.
+        pool_size: Максимум одновременно открытых соединений.
+        acquire_timeout_seconds: Таймаут ожидания свободного соединения.
+        preping_idle_seconds: Порог простоя для проверки ping (0 — проверять всегда).
+        max_lifetime_seconds: Максимальный срок жизни соединения (0 — без ограничения).
+        reset_session: Сбрасывать состояние сессии при возврате соединения.
+        name: Имя пула в логах и снимке метрик.
+    """
+
+    def __init__(
+        self,
+        connection_factory: Callable[[], Any],
+        pool_size: int,
+        acquire_timeout_seconds: float = DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+        preping_idle_seconds: float = DB_POOL_PREPING_IDLE_SECONDS,
+        max_lifetime_seconds: float = DB_POOL_MAX_LIFETIME_SECONDS,
+        reset_session: bool = True,
+        name: str = "bot_pool",
+    ) -> None:
+        self.name = name
+        self._factory = connection_factory
+        self._pool_size = max(1, int(pool_size))
+        self._acquire_timeout = max(0.0, float(acquire_timeout_seconds))
+        self._preping_idle = max(0.0, float(preping_idle_seconds))
+        self._max_lifetime = max(0.0, float(max_lifetime_seconds))
+        self._reset_session = reset_session
+
+        self._condition = threading.Condition(threading.Lock())
+        self._idle: Deque[_PoolEntry] = deque()
+        self._opened = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._acquired_total = 0
+        self._timeouts_total = 0
+        self._connects_total = 0
+        self._connect_errors = 0
+        self._recycled_stale = 0
+        self._recycled_lifetime = 0
+        self._discarded_broken = 0
+        self._peak_in_use = 0
+        self._peak_waiting = 0
+        self._call_sites: Dict[str, _CallSiteStats] = {}
+
+    @property
+    def pool_size(self) -> int:
+        """Максимум одновременно открытых соединений."""
+        return self._pool_size
+
+    def get_connection(self, call_site: Optional[str] = None, timeout: Optional[float] = None) -> PooledConnection:
+        """
+        Получить соединение из пула, при необходимости дождавшись освобождения.
+
+        Args:
+            call_site: Место вызова для метрик (по умолчанию — ``unknown``).
+            timeout: Таймаут ожидания (по умолчанию — из настроек пула).
+
+        Raises:
+            PoolTimeoutError: Свободное соединение не появилось за время ожидания.
+        """
+        site = call_site or _UNKNOWN_CALL_SITE
+        wait_timeout = self._acquire_timeout if timeout is None else max(0.0, float(timeout))
+        started = time.monotonic()
+        deadline = started + wait_timeout
+        entry: Optional[_PoolEntry] = None
+        open_new = False
+
+        with self._condition:
+            if self._closed:
+                raise mysql.connector.errors.PoolError(f"Пул {self.name} закрыт")
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._opened < self._pool_size:
+                    self._opened += 1
+                    open_new = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts_total += 1
+                    self._site_locked(site).timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Нет свободного соединения в пуле {self.name} "
+                        f"за {wait_timeout:.1f} с (pool_size={self._pool_size}, call_site={site})"
+                    )
+                self._waiting += 1
+                self._peak_waiting = max(self._peak_waiting, self._waiting)
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+
+        # Сетевые операции (connect/ping) выполняются вне блокировки.
+        try:
+            if open_new:
+                entry = self._open_entry()
+            else:
+                entry = self._validate_entry(entry)
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._opened -= 1
+                self._condition.notify()
+            raise
+
+        acquired_at = time.monotonic()
+        with self._condition:
+            self._acquired_total += 1
+            self._site_locked(site).wait.observe((acquired_at - started) * 1000.0)
+        return PooledConnection(self, entry, site, acquired_at)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Снимок состояния пула и метрик по местам вызова."""
+        with self._condition:
+            wait_total = _Histogram()
+            hold_total = _Histogram()
+            call_sites: Dict[str, Dict[str, Any]] = {}
+            for site, stats in sorted(self._call_sites.items()):
+                _merge_histogram(wait_total, stats.wait)
+                _merge_histogram(hold_total, stats.hold)
+                call_sites[site] = {
+                    "wait": stats.wait.snapshot(),
+                    "hold": stats.hold.snapshot(),
+                    "timeouts": stats.timeouts,
+                }
+            return {
+                "name": self.name,
+                "pool_size": self._pool_size,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "peak_in_use": self._peak_in_use,
+                "peak_waiting": self._peak_waiting,
+                "acquired_total": self._acquired_total,
+                "timeouts_total": self._timeouts_total,
+                "connects_total": self._connects_total,
+                "connect_errors": self._connect_errors,
+                "recycled_stale": self._recycled_stale,
+                "recycled_lifetime": self._recycled_lifetime,
+                "discarded_broken": self._discarded_broken,
+                "wait": wait_total.snapshot(),
+                "hold": hold_total.snapshot(),
+                "call_sites": call_sites,
+            }
+
+    def close(self) -> None:
+        """Закрыть простаивающие соединения; выданные закроются при возврате."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._opened -= len(idle)
+            self._condition.notify_all()
+        for entry in idle:
+            _close_quietly(entry.conn)
+
+    def _site_locked(self, site: str) -> _CallSiteStats:
+        stats = self._call_sites.get(site)
+        if stats is None:
+            stats = self._call_sites[site] = _CallSiteStats()
+        return stats
+
+    def _open_entry(self) -> _PoolEntry:
+        try:
+            conn = self._factory()
+        except Exception:
+            with self._condition:
+                self._connect_errors += 1
+            raise
+        with self._condition:
+            self._connects_total += 1
+        return _PoolEntry(conn, time.monotonic())
+
+    def _validate_entry(self, entry: _PoolEntry) -> _PoolEntry:
+        """Проверить простаивавшее соединение; старое или мёртвое — пересоздать."""
+        now = time.monotonic()
+        if self._max_lifetime and now - entry.created_at >= self._max_lifetime:
+            _close_quietly(entry.conn)
+            with self._condition:
+                self._recycled_lifetime += 1
+            return self._open_entry()
+        if now - entry.released_at >= self._preping_idle and not _ping(entry.conn):
+            _close_quietly(entry.conn)
+            with self._condition:
+                self._recycled_stale += 1
+            logger.info("Пул %s: соединение не ответило на ping, открываем новое", self.name)
+            return self._open_entry()
+        return entry
+
+    def _release(self, entry: _PoolEntry, call_site: str, acquired_at: float) -> None:
+        """Вернуть соединение: сбросить сессию, неисправное — закрыть."""
+        reusable = True
+        try:
+            if self._reset_session:
+                entry.conn.reset_session()
+        except Exception as exc:
+            reusable = False
+            logger.debug("Пул %s: сброс сессии не удался, соединение закрывается: %r", self.name, exc)
+        now = time.monotonic()
+        with self._condition:
+            self._in_use -= 1
+            self._site_locked(call_site).hold.observe((now - acquired_at) * 1000.0)
+            keep = reusable and not self._closed
+            if keep:
+                entry.released_at = now
+                self._idle.append(entry)
+            else:
+                self._opened -= 1
+                self._discarded_broken += int(not reusable)
+            self._condition.notify()
+        if not keep:
+            _close_quietly(entry.conn)
+
+
+def _merge_histogram(target: _Histogram, source: _Histogram) -> None:
+    for index, count in enumerate(source.counts):
+        target.counts[index] += count
+    target.total_ms += source.total_ms
+    target.max_ms = max(target.max_ms, source.max_ms)
+
+
+def _ping(conn: Any) -> bool:
+    try:
+        conn.ping(reconnect=False)
+        return True
+    except Exception:
+        return False
+
+
+def _close_quietly(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def detect_call_site(*skip_modules: str) -> str:
+    """
+    Определить место вызова get_db_connection: ``модуль:функция``.
+
+    Args:
+        skip_modules: Дополнительные модули-обёртки, кадры которых пропускаются
+            (например, асинхронный фасад ``async_database``).
+    """
+    skipped = (__name__, "contextlib") + skip_modules
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in skipped:
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return _UNKNOWN_CALL_SITE
+
+
+def _connect_default() -> Any:
+    """Открыть физическое соединение с параметрами из настроек."""
+    return mysql.connector.connect(
+        host=MYSQL_HOST,
+        user=MYSQL_USER,
+        password=MYSQL_PASSWORD,
+        database=MYSQL_DATABASE,
+        port=MYSQL_PORT,
+    )
+
+
+_connection_pool: Optional[BlockingConnectionPool] = None
+_connection_pool_lock = threading.Lock()
+
+
+def _get_pool() -> BlockingConnectionPool:
     """
     Получить (или создать) глобальный пул соединений MySQL.
 
@@ -27,33 +430,46 @@ def _get_pool() -> mysql.connector.pooling.MySQLConnectionPool:
     параметры из окружения, даже если модуль был импортирован до их загрузки.
 
     Returns:
-        Пул соединений MySQLConnectionPool.
+        Пул соединений BlockingConnectionPool.
     """
     global _connection_pool
     if _connection_pool is None:
-        logger.info(
-            "Инициализация пула MySQL-соединений: pool_size=%d, host=%s, database=%s",
-            _POOL_SIZE, MYSQL_HOST, MYSQL_DATABASE,
-        )
-        _connection_pool = mysql.connector.pooling.MySQLConnectionPool(
-            pool_name="bot_pool",
-            pool_size=_POOL_SIZE,
-            pool_reset_session=True,
-            host=MYSQL_HOST,
-            user=MYSQL_USER,
-            password=MYSQL_PASSWORD,
-            database=MYSQL_DATABASE,
-            port=MYSQL_PORT,
-        )
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                logger.info(
+                    "Инициализация пула MySQL-соединений: pool_size=%d, host=%s, database=%s",
+                    _POOL_SIZE, MYSQL_HOST, MYSQL_DATABASE,
+                )
+                _connection_pool = BlockingConnectionPool(_connect_default, pool_size=_POOL_SIZE)
     return _connection_pool
 
 
+def get_pool() -> BlockingConnectionPool:
+    """Глобальный пул соединений MySQL (для обёрток вроде ``async_database``)."""
+    return _get_pool()
+
+
 def reset_pool() -> None:
     """
     Сбросить глобальный пул (для тестов и повторной инициализации).
     """
     global _connection_pool
-    _connection_pool = None
+    pool, _connection_pool = _connection_pool, None
+    if isinstance(pool, BlockingConnectionPool):
+        pool.close()
+
+
+def get_pool_snapshot() -> Optional[Dict[str, Any]]:
+    """
+    Снимок состояния глобального пула для health check и логов.
+
+    Returns:
+        Словарь метрик пула или None, если пул ещё не создан.
+    """
+    pool = _connection_pool
+    if not isinstance(pool, BlockingConnectionPool):
+        return None
+    return pool.snapshot()
 
 
 @contextmanager
@@ -87,7 +503,7 @@ def get_db_connection(
     conn = None
     try:
         if use_pool:
-            conn = _get_pool().get_connection()
+            conn = _get_pool().get_connection(call_site=detect_call_site())
         else:
             conn = mysql.connector.connect(
                 host=host,
@@ -104,7 +520,9 @@ def get_db_connection(
             conn.rollback()
         raise
     finally:
-        if conn and conn.is_connected():
+        if conn and use_pool:
+            conn.close()  # возврат в пул (неисправное соединение пул закроет сам)
+        elif conn and conn.is_connected():
             conn.close()
 
 
@@ -0,0 +1,190 @@
+"""
+runtime_status.py — публикация внутрипроцессной статистики для других процессов.
+
+Долгоживущие процессы (бот, GK-автоответчик) периодически записывают
+снимок своей статистики (кэши, пул соединений) в таблицу
+``runtime_process_status`` — по строке на процесс. Health check демон и
+``rag_ops health`` работают в отдельных процессах и читают эти строки,
+а не собственные (пустые) счётчики.
+
+Содержимое снимка собирают провайдеры, зарегистрированные точкой входа
+процесса через ``register_runtime_status_provider``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import src.common.database as database
+from config.settings import RUNTIME_STATUS_MAX_AGE_SECONDS, RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_providers: Dict[str, Callable[[], Any]] = {}
+_started_at = int(time.time())
+_publisher_task: Optional["asyncio.Task[None]"] = None
+
+
+@dataclass(frozen=True)
+class ProcessStatus:
+    """Опубликованный снимок статистики одного процесса."""
+
+    process_name: str
+    hostname: str
+    pid: int
+    payload: Dict[str, Any]
+    started_at: int
+    updated_at: int
+
+
+def register_runtime_status_provider(key: str, provider: Callable[[], Any]) -> None:
+    """
+    Зарегистрировать источник раздела снимка статистики процесса.
+
+    Args:
+        key: Имя раздела в payload (например, ``embedding_cache``).
+        provider: Функция без аргументов; None пропускает раздел.
+    """
+    _providers[key] = provider
+
+
+def collect_runtime_status() -> Dict[str, Any]:
+    """Собрать снимок статистики процесса из зарегистрированных провайдеров."""
+    payload: Dict[str, Any] = {}
+    for key, provider in list(_providers.items()):
+        try:
+            value = provider()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Runtime status: провайдер %s завершился с ошибкой: %s", key, exc)
+            continue
+        if value is not None:
+            payload[key] = value
+    return payload
+
+
+def publish_process_status(process_name: str, payload: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Записать снимок статистики текущего процесса в ``runtime_process_status``.
+
+    Строки процессов, не обновлявшиеся дольше ``RUNTIME_STATUS_MAX_AGE_SECONDS``,
+    удаляются, чтобы перезапуски не копили записи с устаревшими pid.
+    """
+    if payload is None:
+        payload = collect_runtime_status()
+    now = int(time.time())
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            cursor.execute(
+                """
+                INSERT INTO runtime_process_status
+                    (process_name, hostname, pid, payload, started_timestamp, updated_timestamp)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    payload = VALUES(payload),
+                    updated_timestamp = VALUES(updated_timestamp)
+                """,
+                (
+                    process_name,
+                    socket.gethostname(),
+                    os.getpid(),
+                    json.dumps(payload, ensure_ascii=False, default=str),
+                    _started_at,
+                    now,
+                ),
+            )
+            cursor.execute(
+                "DELETE FROM runtime_process_status WHERE updated_timestamp < %s",
+                (now - RUNTIME_STATUS_MAX_AGE_SECONDS,),
+            )
+
+
+def get_process_statuses(
+    process_name: Optional[str] = None,
+    max_age_seconds: int = RUNTIME_STATUS_MAX_AGE_SECONDS,
+) -> List[ProcessStatus]:
+    """
+    Прочитать свежие снимки статистики процессов.
+
+    Args:
+        process_name: Фильтр по имени процесса (None — все процессы).
+        max_age_seconds: Максимальный возраст снимка.
+
+    Returns:
+        Снимки, отсортированные по имени процесса и pid.
+    """
+    query = """
+        SELECT process_name, hostname, pid, payload, started_timestamp, updated_timestamp
+        FROM runtime_process_status
+        WHERE updated_timestamp >= %s
+    """
+    params: List[Any] = [int(time.time()) - max_age_seconds]
+    if process_name is not None:
+        query += " AND process_name = %s"
+        params.append(process_name)
+    query += " ORDER BY process_name, hostname, pid"
+
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            cursor.execute(query, tuple(params))
+            rows = cursor.fetchall() or []
+
+    statuses: List[ProcessStatus] = []
+    for row in rows:
+        try:
+            payload = json.loads(row.get("payload") or "{}")
+        except (TypeError, ValueError):
+            payload = {}
+        statuses.append(
+            ProcessStatus(
+                process_name=str(row.get("process_name") or ""),
+                hostname=str(row.get("hostname") or ""),
+                pid=int(row.get("pid") or 0),
+                payload=payload if isinstance(payload, dict) else {},
+                started_at=int(row.get("started_timestamp") or 0),
+                updated_at=int(row.get("updated_timestamp") or 0),
+            )
+        )
+    return statuses
+
+
+async def _publish_loop(process_name: str, interval_seconds: float) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(publish_process_status, process_name)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Runtime status: не удалось опубликовать статистику %s: %s", process_name, exc)
+        await asyncio.sleep(interval_seconds)
+
+
+def start_runtime_status_publisher(process_name: str) -> Optional["asyncio.Task[None]"]:
+    """Запустить периодическую публикацию статистики процесса в текущем loop."""
+    global _publisher_task
+    if RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS <= 0:
+        return None
+    if _publisher_task is not None and not _publisher_task.done():
+        return _publisher_task
+    _publisher_task = asyncio.get_running_loop().create_task(
+        _publish_loop(process_name, float(RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS)),
+        name="runtime-status-publisher",
+    )
+    return _publisher_task
+
+
+async def stop_runtime_status_publisher() -> None:
+    """Остановить периодическую публикацию статистики процесса."""
+    global _publisher_task
+    task, _publisher_task = _publisher_task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,326 @@
+"""
+settings_snapshot.py — общий снимок таблиц настроек с инвалидацией по версии.
+
+Таблицы настроек (bot_settings, gamification_settings, certification_settings)
+читаются целиком одним запросом и хранятся в процессе как неизменяемый
+словарь (``MappingProxyType``). Чтение настройки — поиск в словаре без
+обращения к БД.
+
+Актуальность снимка проверяется по дешёвому счётчику в таблице
+``settings_version``: каждый ``set_setting`` увеличивает версию своей таблицы
+в той же транзакции (``bump_settings_version``). Не чаще раза в
+``SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS`` процесс читает все версии одним
+запросом и перечитывает только изменившиеся таблицы, поэтому изменения из
+admin_web или другого процесса бота применяются в пределах секунды.
+
+Если таблица ``settings_version`` ещё не создана, снимок перечитывается раз в
+``SETTINGS_SNAPSHOT_MAX_AGE_SECONDS`` (как прежний TTL-кеш), а запись в своём
+процессе сбрасывает снимок сразу.
+
+В потоке event loop запросы к БД не выполняются: если снимок уже загружен,
+читатель получает его сразу, а сверка версий и перечитывание идут в фоне
+в пуле ``db-io`` (``BackgroundRefresh``) и только подменяют ссылку на снимок.
+Синхронно (с блокировкой) загружается лишь отсутствующий снимок.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+
+import src.common.database as database
+from config.database_settings import (
+    SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS,
+    SETTINGS_SNAPSHOT_MAX_AGE_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+SCOPE_BOT_SETTINGS = "bot_settings"
+SCOPE_GAMIFICATION_SETTINGS = "gamification_settings"
+SCOPE_CERTIFICATION_SETTINGS = "certification_settings"
+
+
+@dataclass(frozen=True)
+class SettingsScope:
+    """Описание таблицы настроек: имя таблицы и колонки ключа/значения."""
+
+    table: str
+    key_column: str = "setting_key"
+    value_column: str = "setting_value"
+
+
+DEFAULT_SCOPES = (
+    SettingsScope(SCOPE_BOT_SETTINGS),
+    SettingsScope(SCOPE_GAMIFICATION_SETTINGS, key_column="key", value_column="value"),
+    SettingsScope(SCOPE_CERTIFICATION_SETTINGS),
+)
+
+
+def on_event_loop() -> bool:
+    """Выполняется ли код в потоке с запущенным event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class BackgroundRefresh:
+    """
+    Фоновый запуск обновления в пуле ``db-io``: не больше одного в очереди.
+
+    Args:
+        name: Имя для логов.
+        func: Синхронная функция обновления (ходит в БД).
+    """
+
+    def __init__(self, name: str, func: Callable[[], None]) -> None:
+        self._name = name
+        self._func = func
+        self._lock = threading.Lock()
+        self._pending = False
+
+    def request(self) -> None:
+        """Запланировать обновление, если оно ещё не запланировано."""
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+        try:
+            from src.common.async_database import get_async_database  # noqa: PLC0415
+
+            get_async_database().submit_io(self._run)
+        except Exception as exc:
+            with self._lock:
+                self._pending = False
+            logger.warning("Не удалось запланировать фоновое обновление %s: %s", self._name, exc)
+
+    def _run(self) -> None:
+        try:
+            self._func()
+        except Exception as exc:
+            logger.warning("Фоновое обновление %s не удалось: %s", self._name, exc)
+        finally:
+            with self._lock:
+                self._pending = False
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    values: Mapping[str, Optional[str]]
+    version: Optional[int]
+    loaded_at: float
+    fresh_until: float
+
+
+class SettingsSnapshotService:
+    """
+    Снимки таблиц настроек с проверкой версий не чаще заданного интервала.
+
+    Args:
+        scopes: Таблицы настроек, доступные через сервис.
+        check_interval_seconds: Интервал сверки счётчиков в settings_version.
+        max_age_seconds: Максимальный возраст снимка без подтверждения версией.
+    """
+
+    def __init__(
+        self,
+        scopes: Iterable[SettingsScope] = DEFAULT_SCOPES,
+        check_interval_seconds: float = SETTINGS_SNAPSHOT_CHECK_INTERVAL_SECONDS,
+        max_age_seconds: float = SETTINGS_SNAPSHOT_MAX_AGE_SECONDS,
+    ) -> None:
+        self._scopes: Dict[str, SettingsScope] = {scope.table: scope for scope in scopes}
+        self._check_interval = max(0.0, float(check_interval_seconds))
+        self._max_age = max(self._check_interval, float(max_age_seconds))
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, _Snapshot] = {}
+        self._versions: Dict[str, int] = {}
+        self._next_check_at = 0.0
+        self._versions_available = True
+        self._loads = 0
+        self._load_errors = 0
+        self._version_checks = 0
+        self._version_errors = 0
+        self._background_refresh = BackgroundRefresh("settings_snapshot", self._refresh_loaded)
+
+    def get_all(self, scope: str) -> Mapping[str, Optional[str]]:
+        """
+        Получить неизменяемый словарь всех настроек таблицы.
+
+        Raises:
+            KeyError: Неизвестная таблица настроек.
+            Exception: Ошибка БД, если снимок ещё ни разу не загружен.
+        """
+        snapshot = self._snapshots.get(scope)
+        now = time.monotonic()
+        if snapshot is not None and now < self._next_check_at and now < snapshot.fresh_until:
+            return snapshot.values
+        if snapshot is not None and on_event_loop():
+            # Не блокировать event loop запросом к БД: текущий снимок сейчас, свежий — после фоновой сверки.
+            self._background_refresh.request()
+            return snapshot.values
+        return self._refresh(scope)
+
+    def get(self, scope: str, key: str, default: Any = None) -> Any:
+        """Получить значение настройки или default, если ключа нет в таблице."""
+        value = self.get_all(scope).get(key)
+        return default if value is None else value
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """
+        Сбросить снимок таблицы (или всех таблиц) в текущем процессе.
+
+        Следующее чтение заново сверит версии и загрузит таблицу.
+        """
+        with self._lock:
+            if scope is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(scope, None)
+            self._next_check_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Вернуть состояние снимков и счётчики загрузок для диагностики."""
+        now = time.monotonic()
+        with self._lock:
+            snapshots = dict(self._snapshots)
+            return {
+                "scopes": {
+                    name: {
+                        "version": snapshot.version,
+                        "keys": len(snapshot.values),
+                        "age_seconds": round(now - snapshot.loaded_at, 3),
+                    }
+                    for name, snapshot in snapshots.items()
+                },
+                "versions_available": self._versions_available,
+                "loads": self._loads,
+                "load_errors": self._load_errors,
+                "version_checks": self._version_checks,
+                "version_errors": self._version_errors,
+            }
+
+    def _refresh(self, scope: str) -> Mapping[str, Optional[str]]:
+        spec = self._scopes[scope]
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_check_at:
+                self._check_versions()
+                self._next_check_at = now + self._check_interval
+
+            snapshot = self._snapshots.get(scope)
+            version = self._versions.get(scope)
+            if snapshot is not None and snapshot.version == version and now < snapshot.fresh_until:
+                return snapshot.values
+
+            try:
+                values = self._load(spec)
+            except Exception as exc:
+                self._load_errors += 1
+                if snapshot is None:
+                    raise
+                # БД недоступна — отдаём прежний снимок и повторяем попытку после интервала.
+                logger.warning("Не удалось обновить снимок настроек %s: %s", scope, exc)
+                self._snapshots[scope] = replace(snapshot, fresh_until=now + self._check_interval)
+                return snapshot.values
+
+            self._loads += 1
+            self._snapshots[scope] = _Snapshot(
+                values=values,
+                version=version,
+                loaded_at=now,
+                fresh_until=now + self._max_age,
+            )
+            return values
+
+    def _refresh_loaded(self) -> None:
+        """Сверить версии и перечитать устаревшие из загруженных снимков (фоновое обновление)."""
+        for scope in list(self._snapshots):
+            try:
+                self._refresh(scope)
+            except Exception as exc:
+                logger.warning("Не удалось обновить снимок настроек %s: %s", scope, exc)
+
+    def _check_versions(self) -> None:
+        self._version_checks += 1
+        try:
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    cursor.execute("SELECT scope, version FROM settings_version")
+                    rows = cursor.fetchall() or []
+            versions = {row["scope"]: int(row["version"]) for row in rows}
+        except Exception as exc:
+            self._version_errors += 1
+            if self._versions_available:
+                logger.warning(
+                    "Версии настроек недоступны (%s); снимки обновляются раз в %.0f с",
+                    exc,
+                    self._max_age,
+                )
+            self._versions_available = False
+            return
+        self._versions_available = True
+        self._versions = versions
+        # Снимки изменившихся таблиц помечаются устаревшими: их следующее чтение
+        # пойдёт в _refresh, даже если эта таблица сейчас не запрашивалась.
+        for name, snapshot in list(self._snapshots.items()):
+            if snapshot.version != self._versions.get(name):
+                self._snapshots[name] = replace(snapshot, fresh_until=0.0)
+
+    def _load(self, spec: SettingsScope) -> Mapping[str, Optional[str]]:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute(
+                    f"SELECT `{spec.key_column}` AS setting_key, `{spec.value_column}` AS setting_value "
+                    f"FROM `{spec.table}`"
+                )
+                rows = cursor.fetchall() or []
+        return MappingProxyType({row["setting_key"]: row["setting_value"] for row in rows})
+
+
+def bump_settings_version(cursor: Any, scope: str) -> None:
+    """
+    Увеличить версию таблицы настроек в текущей транзакции.
+
+    Вызывается из ``set_setting`` тем же курсором, что и запись значения,
+    чтобы другие процессы увидели новую версию вместе с новыми данными.
+    Отсутствие таблицы settings_version не мешает записи настройки.
+    """
+    try:
+        cursor.execute(
+            """
+            INSERT INTO settings_version (scope, version, updated_timestamp)
+            VALUES (%s, 1, UNIX_TIMESTAMP())
+            ON DUPLICATE KEY UPDATE
+                version = version + 1,
+                updated_timestamp = UNIX_TIMESTAMP()
+            """,
+            (scope,),
+        )
+    except Exception as exc:
+        logger.debug("Не удалось увеличить версию настроек %s: %s", scope, exc)
+
+
+_service: Optional[SettingsSnapshotService] = None
+_service_lock = threading.Lock()
+
+
+def get_settings_snapshot() -> SettingsSnapshotService:
+    """Получить общий сервис снимков настроек (создаётся лениво)."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = SettingsSnapshotService()
+    return _service
+
+
+def reset_settings_snapshot() -> None:
+    """Сбросить общий сервис (следующий вызов создаст новый с пустыми снимками)."""
+    global _service
+    with _service_lock:
+        _service = None
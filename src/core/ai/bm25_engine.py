@@ -0,0 +1,321 @@
+"""
+bm25_engine.py — векторизованный BM25 на разреженной term-document матрице.
+
+Общий движок lexical-scoring для RAG (``RagKnowledgeService``) и Group
+Knowledge (``QASearchService``). Корпус один раз упаковывается в CSR-матрицу
+«термин → документы» (NumPy-массивы ``indptr``/``indices``/``data``),
+IDF и нормировки длины документов считаются при построении, а запрос
+обходит только строки своих токенов. Изменения корпуса применяются
+``with_changes`` без пересборки CSR: изменённые документы попадают в
+небольшой delta-слой, пересчитываются только DF, длины и IDF.
+
+Формула и краевые случаи совпадают с ``rank_bm25.BM25Okapi``:
+
+- IDF = log(N - df + 0.5) - log(df + 0.5);
+- отрицательный IDF заменяется на ``epsilon * средний IDF словаря``;
+- пустой документ считается документом из одного токена ``""``;
+- повторяющиеся токены запроса учитываются каждый раз.
+"""
+
+import hashlib
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Epsilon-floor для отрицательного IDF (значение по умолчанию BM25Okapi).
+BM25_EPSILON = 0.25
+# Плейсхолдер для пустых документов: BM25Okapi получает [""] вместо [].
+EMPTY_DOCUMENT_TOKEN = ""
+
+
+def corpus_signature(corpus_tokens: Sequence[Sequence[str]]) -> str:
+    """Вычислить сигнатуру содержимого токенизированного корпуса.
+
+    Используется, когда вызывающий код не передаёт собственную сигнатуру
+    (например, версию корпуса): два корпуса одного размера, но с разными
+    токенами получают разные сигнатуры.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for tokens in corpus_tokens:
+        digest.update("\x1f".join(tokens).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class SparseBM25Index:
+    """
+    Неизменяемый BM25-индекс корпуса токенизированных документов.
+
+    Индекс строится один раз на корпус и переиспользуется для любого
+    числа запросов; k1/b фиксируются при построении, так как от них
+    зависят предвычисленные нормировки длины. ``signature`` идентифицирует
+    корпус (версия корпуса у вызывающего кода или хэш содержимого).
+
+    Документы хранятся в слотах: слоты базового корпуса лежат в CSR-матрице,
+    заменённые и добавленные ``with_changes`` документы — в delta-слое.
+    Наружу индекс отдаёт позиции документов в текущем корпусе (слоты без
+    удалённых, в исходном порядке).
+    """
+
+    def __init__(
+        self,
+        corpus_tokens: Sequence[Sequence[str]],
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = BM25_EPSILON,
+        signature: Optional[Hashable] = None,
+    ) -> None:
+        self.k1 = float(k1)
+        self.b = float(b)
+        self.epsilon = float(epsilon)
+        self.signature: Hashable = signature if signature is not None else corpus_signature(corpus_tokens)
+        self._vocabulary: Dict[str, int] = {}
+
+        doc_ids: List[int] = []
+        term_ids: List[int] = []
+        term_freqs: List[int] = []
+        doc_lengths: List[int] = []
+        for doc_id, tokens in enumerate(corpus_tokens):
+            safe_tokens = list(tokens) or [EMPTY_DOCUMENT_TOKEN]
+            doc_lengths.append(len(safe_tokens))
+            for token, freq in Counter(safe_tokens).items():
+                term_id = self._vocabulary.setdefault(token, len(self._vocabulary))
+                doc_ids.append(doc_id)
+                term_ids.append(term_id)
+                term_freqs.append(freq)
+
+        base_size = len(doc_lengths)
+        vocabulary_size = len(self._vocabulary)
+
+        term_id_array = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_id_array, kind="stable")
+        self._indices = np.asarray(doc_ids, dtype=np.int64)[order]
+        self._data = np.asarray(term_freqs, dtype=np.float64)[order]
+        self._indptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_id_array, minlength=vocabulary_size), out=self._indptr[1:])
+        # Термины базовых документов в порядке документов — для вычитания DF при замене.
+        self._doc_term_ids = term_id_array
+        self._doc_indptr = np.zeros(base_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(np.asarray(doc_ids, dtype=np.int64), minlength=base_size), out=self._doc_indptr[1:])
+
+        # Delta-слой: пусто, пока не применены изменения.
+        self._base_size = base_size
+        self._slot_count = base_size
+        self._base_valid: Optional[np.ndarray] = None
+        self._position_slots: Optional[np.ndarray] = None
+        self._extra_vocabulary: Dict[str, int] = {}
+        self._delta_docs: Dict[int, Dict[int, int]] = {}
+        self._delta_postings: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        self._doc_lengths = np.asarray(doc_lengths, dtype=np.float64)
+        self._doc_freq = np.diff(self._indptr).astype(np.float64)
+        self._update_statistics()
+
+    def _update_statistics(self) -> None:
+        """Пересчитать размер корпуса, нормировки длины и IDF по DF и длинам слотов."""
+        if self._position_slots is None:
+            self._size = self._slot_count
+            total_length = float(self._doc_lengths.sum())
+        else:
+            self._size = int(self._position_slots.size)
+            total_length = float(self._doc_lengths[self._position_slots].sum())
+        self._avgdl = total_length / self._size if self._size else 0.0
+        if self._size:
+            self._length_norm = self.k1 * (1 - self.b + self.b * self._doc_lengths / self._avgdl)
+        else:
+            self._length_norm = np.zeros(self._slot_count, dtype=np.float64)
+
+        doc_freq = self._doc_freq
+        idf = np.log(self._size - doc_freq + 0.5) - np.log(doc_freq + 0.5)
+        present = doc_freq > 0
+        present_count = int(np.count_nonzero(present))
+        if present_count:
+            eps = self.epsilon * (float(idf[present].sum()) / present_count)
+            idf[(idf < 0) & present] = eps
+        self._idf = idf
+
+    @property
+    def size(self) -> int:
+        """Число документов в индексе."""
+        return self._size
+
+    @property
+    def vocabulary_size(self) -> int:
+        """Число уникальных токенов корпуса."""
+        return int(np.count_nonzero(self._doc_freq))
+
+    @property
+    def pending_changes(self) -> int:
+        """Число документов в delta-слое и удалённых слотов (мера «разбавления» CSR)."""
+        return len(self._delta_docs) + (self._slot_count - self._size)
+
+    def matches(self, signature: Hashable, k1: float, b: float) -> bool:
+        """Проверить, что индекс построен для корпуса с этой сигнатурой и с теми же k1/b."""
+        return self.signature == signature and self.k1 == float(k1) and self.b == float(b)
+
+    def with_changes(
+        self,
+        replaced: Mapping[int, Sequence[str]],
+        deleted: Iterable[int],
+        appended: Sequence[Sequence[str]],
+        signature: Hashable,
+    ) -> "SparseBM25Index":
+        """
+        Вернуть новый индекс с применёнными изменениями корпуса.
+
+        Базовая CSR-матрица разделяется с исходным индексом; копируются
+        только векторы DF/длин и delta-слой, поэтому стоимость зависит от
+        размера словаря и числа изменённых документов, а не от объёма корпуса.
+        Результат совпадает с индексом, построенным заново по изменённому корпусу.
+
+        Args:
+            replaced: Новые токены документов по их текущим позициям.
+            deleted: Текущие позиции удаляемых документов.
+            appended: Токены документов, добавляемых в конец корпуса.
+            signature: Сигнатура изменённого корпуса.
+        """
+        position_slots = (
+            np.arange(self._slot_count, dtype=np.int64)
+            if self._position_slots is None
+            else self._position_slots
+        )
+        new_slot_count = self._slot_count + len(appended)
+
+        index = object.__new__(SparseBM25Index)
+        index.__dict__.update(self.__dict__)
+        index.signature = signature
+        index._slot_count = new_slot_count
+        index._base_valid = (
+            np.ones(self._base_size, dtype=bool) if self._base_valid is None else self._base_valid.copy()
+        )
+        index._extra_vocabulary = dict(self._extra_vocabulary)
+        index._delta_docs = dict(self._delta_docs)
+        index._doc_freq = self._doc_freq.copy()
+        index._doc_lengths = np.concatenate(
+            [self._doc_lengths, np.zeros(len(appended), dtype=np.float64)]
+        )
+        exists = np.zeros(new_slot_count, dtype=bool)
+        exists[position_slots] = True
+
+        for position, tokens in replaced.items():
+            slot = int(position_slots[position])
+            index._remove_slot_terms(slot)
+            index._add_slot_terms(slot, tokens)
+        for position in deleted:
+            slot = int(position_slots[position])
+            index._remove_slot_terms(slot)
+            index._doc_lengths[slot] = 0.0
+            exists[slot] = False
+        for offset, tokens in enumerate(appended):
+            slot = self._slot_count + offset
+            index._add_slot_terms(slot, tokens)
+            exists[slot] = True
+
+        index._position_slots = np.flatnonzero(exists)
+        index._delta_postings = index._build_delta_postings()
+        index._update_statistics()
+        return index
+
+    def _term_id(self, token: str) -> Optional[int]:
+        term_id = self._vocabulary.get(token)
+        if term_id is None:
+            term_id = self._extra_vocabulary.get(token)
+        return term_id
+
+    def _remove_slot_terms(self, slot: int) -> None:
+        """Вычесть вклад документа слота в DF (из delta-слоя или базовой CSR)."""
+        delta_terms = self._delta_docs.pop(slot, None)
+        if delta_terms is not None:
+            self._doc_freq[list(delta_terms)] -= 1
+            return
+        if slot < self._base_size and self._base_valid[slot]:
+            self._base_valid[slot] = False
+            start, end = self._doc_indptr[slot], self._doc_indptr[slot + 1]
+            self._doc_freq[self._doc_term_ids[start:end]] -= 1
+
+    def _add_slot_terms(self, slot: int, tokens: Sequence[str]) -> None:
+        """Записать документ слота в delta-слой и учесть его в DF и длинах."""
+        safe_tokens = list(tokens) or [EMPTY_DOCUMENT_TOKEN]
+        terms: Dict[int, int] = {}
+        new_terms = 0
+        for token, freq in Counter(safe_tokens).items():
+            term_id = self._term_id(token)
+            if term_id is None:
+                term_id = len(self._vocabulary) + len(self._extra_vocabulary)
+                self._extra_vocabulary[token] = term_id
+                new_terms += 1
+            terms[term_id] = freq
+        if new_terms:
+            self._doc_freq = np.concatenate([self._doc_freq, np.zeros(new_terms, dtype=np.float64)])
+        self._doc_freq[list(terms)] += 1
+        self._delta_docs[slot] = terms
+        self._doc_lengths[slot] = float(len(safe_tokens))
+
+    def _build_delta_postings(self) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """Собрать postings delta-слоя «термин → (слоты, частоты)»."""
+        postings: Dict[int, Tuple[List[int], List[int]]] = {}
+        for slot, terms in self._delta_docs.items():
+            for term_id, freq in terms.items():
+                slots, freqs = postings.setdefault(term_id, ([], []))
+                slots.append(slot)
+                freqs.append(freq)
+        return {
+            term_id: (np.asarray(slots, dtype=np.int64), np.asarray(freqs, dtype=np.float64))
+            for term_id, (slots, freqs) in postings.items()
+        }
+
+    def get_scores(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """Вычислить BM25-score всех документов (как ``BM25Okapi.get_scores``)."""
+        scores = np.zeros(self._slot_count, dtype=np.float64)
+        contributions: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+        for token in query_tokens:
+            if token not in contributions:
+                contributions[token] = self._token_contribution(token)
+            contribution = contributions[token]
+            if contribution is None:
+                continue
+            doc_ids, values = contribution
+            # Слот встречается в postings термина не более одного раза, поэтому fancy-index сложение корректно.
+            scores[doc_ids] += values
+        if self._position_slots is not None:
+            scores = scores[self._position_slots]
+        return scores
+
+    def top_k(self, query_tokens: Sequence[str], k: int) -> List[Tuple[int, float]]:
+        """Вернуть до ``k`` документов с положительным score, по убыванию score."""
+        if k <= 0 or self._size == 0:
+            return []
+        scores = self.get_scores(query_tokens)
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > k:
+            # Порог — k-й по величине score; равные порогу документы сохраняются,
+            # чтобы результат совпадал со стабильной сортировкой всего корпуса.
+            candidate_scores = scores[candidates]
+            threshold = candidate_scores[np.argpartition(candidate_scores, candidates.size - k)[candidates.size - k]]
+            candidates = candidates[candidate_scores >= threshold]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        return [(int(doc_id), float(scores[doc_id])) for doc_id in ordered]
+
+    def _token_contribution(self, token: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        term_id = self._term_id(token)
+        if term_id is None:
+            return None
+        doc_ids = np.zeros(0, dtype=np.int64)
+        freqs = np.zeros(0, dtype=np.float64)
+        if term_id < len(self._vocabulary):
+            start, end = self._indptr[term_id], self._indptr[term_id + 1]
+            doc_ids = self._indices[start:end]
+            freqs = self._data[start:end]
+            if self._base_valid is not None:
+                valid = self._base_valid[doc_ids]
+                doc_ids = doc_ids[valid]
+                freqs = freqs[valid]
+        delta = self._delta_postings.get(term_id)
+        if delta is not None:
+            doc_ids = np.concatenate([doc_ids, delta[0]])
+            freqs = np.concatenate([freqs, delta[1]])
+        if doc_ids.size == 0:
+            return None
+        values = self._idf[term_id] * (freqs * (self.k1 + 1) / (freqs + self._length_norm[doc_ids]))
+        return doc_ids, values
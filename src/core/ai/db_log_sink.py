@@ -0,0 +1,466 @@
+"""
+db_log_sink.py — фоновая пакетная запись аналитических логов в MySQL.
+
+Логи маршрутизации (``ai_router_log``), полного model I/O (``ai_model_io_log``),
+запросов к базе знаний (``rag_query_log``) и автоответчика GK
+(``gk_responder_log``) раньше писались отдельным INSERT на каждое событие:
+маршрутизатор ждал INSERT перед dispatch, а LLM-провайдер запускал поток и
+брал соединение из пула (5 соединений) на каждый вызов модели. Под нагрузкой
+логирование вытесняло из пула пользовательские запросы.
+
+Sink:
+
+- принимает записи без ожидания (``submit``) в asyncio-очередь текущего
+  event loop, ограниченную числом записей и суммарным размером параметров
+  (``AI_DB_LOG_SINK_MAX_QUEUE_BYTES``); при переполнении запись
+  отбрасывается и учитывается в счётчике ``dropped``;
+- фоновая задача собирает пакет (до ``AI_DB_LOG_SINK_BATCH_SIZE`` записей или
+  ``AI_DB_LOG_SINK_FLUSH_INTERVAL_MS``); записи с одинаковым SQL пишутся
+  ``executemany`` частями не больше ``AI_DB_LOG_SINK_MAX_BATCH_BYTES``
+  (строка ``ai_model_io_log`` бывает в сотни КБ, а INSERT целиком должен
+  уместиться в ``max_allowed_packet``), каждая часть — своей транзакцией;
+  если часть не записалась, её строки пишутся по одной, чтобы одна
+  проблемная строка не теряла соседние;
+- запись выполняется в единственном выделенном потоке, поэтому логирование
+  занимает не больше одного соединения пула;
+- параметры записи могут передаваться фабрикой: тяжёлая подготовка
+  (маскирование PII в 200 КБ prompt) выполняется в потоке записи;
+- время события (``created_at``) передаётся параметром, вычисленным при
+  постановке в очередь, а не ``NOW()`` в момент записи пакета;
+- ``flush``/``close`` дописывают очередь при остановке процесса.
+
+Без запущенного event loop (скрипты, синхронные потоки) и при
+``AI_DB_LOG_SINK_ENABLED=0`` запись выполняется сразу в вызывающем потоке.
+"""
+
+import asyncio
+import contextlib
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import src.common.database as database
+from config import ai_settings
+
+logger = logging.getLogger(__name__)
+
+ParamsFactory = Callable[[], Sequence[Any]]
+BatchWriter = Callable[[List["DbLogRecord"]], int]
+
+_WRITER_THREAD_PREFIX = "db-log-writer"
+# Предупреждение о переполнении пишется для первой и каждой N-й отброшенной записи.
+_DROP_WARNING_EVERY = 100
+# Оценка размера нестроковых параметров (числа, даты, NULL) в байтах.
+_SCALAR_PARAM_BYTES = 8
+# Построчная дозапись части прекращается после N ошибок подряд (БД недоступна).
+_FALLBACK_MAX_CONSECUTIVE_ERRORS = 3
+
+
+def estimate_params_bytes(params: Sequence[Any]) -> int:
+    """Оценить размер параметров INSERT в байтах (строки — по длине в UTF-8)."""
+    total = 0
+    for value in params:
+        if isinstance(value, str):
+            total += len(value.encode("utf-8", errors="replace"))
+        elif isinstance(value, (bytes, bytearray)):
+            total += len(value)
+        else:
+            total += _SCALAR_PARAM_BYTES
+    return total
+
+
+@dataclass
+class DbLogRecord:
+    """
+    Одна запись лога: таблица (для счётчиков), SQL и параметры или их фабрика.
+
+    ``size_bytes`` — оценка размера параметров для ограничения очереди;
+    для готовых параметров считается автоматически, для фабрики
+    передаётся вызывающим кодом (подсказка ``size_hint``).
+    """
+
+    table: str
+    sql: str
+    params: Union[Sequence[Any], ParamsFactory]
+    size_bytes: int = field(default=0)
+
+    def __post_init__(self) -> None:
+        if not self.size_bytes and not callable(self.params):
+            self.size_bytes = estimate_params_bytes(self.params)
+
+    def resolve_params(self) -> tuple:
+        """Вернуть параметры запроса (фабрика вызывается в потоке записи)."""
+        params = self.params() if callable(self.params) else self.params
+        return tuple(params)
+
+
+def _split_rows_by_bytes(rows: List[tuple], max_bytes: int) -> List[List[tuple]]:
+    """Разбить строки на части с суммарным размером не больше max_bytes (минимум строка в части)."""
+    chunks: List[List[tuple]] = []
+    chunk: List[tuple] = []
+    chunk_bytes = 0
+    for row in rows:
+        row_bytes = estimate_params_bytes(row)
+        if chunk and chunk_bytes + row_bytes > max_bytes:
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 0
+        chunk.append(row)
+        chunk_bytes += row_bytes
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _execute_rows(sql: str, rows: List[tuple]) -> None:
+    """Записать строки одного SQL одной транзакцией."""
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            if len(rows) == 1:
+                cursor.execute(sql, rows[0])
+            else:
+                cursor.executemany(sql, rows)
+
+
+def _write_rows_one_by_one(table: str, sql: str, rows: List[tuple]) -> int:
+    """Построчная дозапись части, которую не удалось записать целиком."""
+    written = 0
+    consecutive_errors = 0
+    for index, row in enumerate(rows):
+        try:
+            _execute_rows(sql, [row])
+        except Exception as exc:
+            consecutive_errors += 1
+            logger.warning(
+                "Не удалось записать строку лога %s (%d байт): %s",
+                table,
+                estimate_params_bytes(row),
+                exc,
+            )
+            if consecutive_errors >= _FALLBACK_MAX_CONSECUTIVE_ERRORS:
+                logger.warning(
+                    "Построчная запись лога %s прервана после %d ошибок подряд, пропущено строк: %d",
+                    table,
+                    consecutive_errors,
+                    len(rows) - index - 1,
+                )
+                break
+            continue
+        consecutive_errors = 0
+        written += 1
+    return written
+
+
+def write_db_log_records(records: List[DbLogRecord], max_batch_bytes: Optional[int] = None) -> int:
+    """
+    Записать пакет, сгруппировав записи по SQL (по таблице).
+
+    Строки одного SQL пишутся ``executemany`` частями не больше
+    ``max_batch_bytes``, каждая часть — отдельной транзакцией. Если часть
+    не записалась (например, превышен ``max_allowed_packet``), её строки
+    пишутся по одной.
+
+    Returns:
+        Число записанных строк.
+    """
+    if max_batch_bytes is None:
+        max_batch_bytes = ai_settings.AI_DB_LOG_SINK_MAX_BATCH_BYTES
+    max_batch_bytes = max(1, int(max_batch_bytes))
+
+    grouped: Dict[str, List[tuple]] = {}
+    tables: Dict[str, str] = {}
+    for record in records:
+        try:
+            params = record.resolve_params()
+        except Exception as exc:
+            logger.warning("Не удалось подготовить запись лога %s: %s", record.table, exc)
+            continue
+        grouped.setdefault(record.sql, []).append(params)
+        tables.setdefault(record.sql, record.table)
+
+    written = 0
+    for sql, rows in grouped.items():
+        table = tables[sql]
+        for chunk in _split_rows_by_bytes(rows, max_batch_bytes):
+            try:
+                _execute_rows(sql, chunk)
+            except Exception as exc:
+                if len(chunk) == 1:
+                    logger.warning("Ошибка записи лога %s: %s", table, exc)
+                    continue
+                logger.warning(
+                    "Ошибка пакетной записи лога %s (%d строк), запись по одной строке: %s",
+                    table,
+                    len(chunk),
+                    exc,
+                )
+                written += _write_rows_one_by_one(table, sql, chunk)
+                continue
+            written += len(chunk)
+    return written
+
+
+_writer_executor: Optional[ThreadPoolExecutor] = None
+_writer_executor_lock = threading.Lock()
+
+
+def _get_writer_executor() -> ThreadPoolExecutor:
+    global _writer_executor
+    if _writer_executor is None:
+        with _writer_executor_lock:
+            if _writer_executor is None:
+                _writer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=_WRITER_THREAD_PREFIX)
+    return _writer_executor
+
+
+class DbLogSink:
+    """
+    Очередь логов одного event loop с фоновой пакетной записью.
+
+    Args:
+        max_queue: Размер очереди (при переполнении записи отбрасываются).
+        max_queue_bytes: Суммарный размер параметров записей в очереди и
+            в ещё не записанных пакетах (при превышении записи отбрасываются).
+        batch_size: Максимум записей в пакете.
+        flush_interval_seconds: Максимальное время накопления пакета.
+        writer: Функция записи пакета (по умолчанию — ``write_db_log_records``).
+    """
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        max_queue_bytes: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_seconds: Optional[float] = None,
+        writer: Optional[BatchWriter] = None,
+    ) -> None:
+        self._max_queue = max(1, int(max_queue or ai_settings.AI_DB_LOG_SINK_MAX_QUEUE))
+        self._max_queue_bytes = max(1, int(max_queue_bytes or ai_settings.AI_DB_LOG_SINK_MAX_QUEUE_BYTES))
+        self._batch_size = max(1, int(batch_size or ai_settings.AI_DB_LOG_SINK_BATCH_SIZE))
+        if flush_interval_seconds is None:
+            flush_interval_seconds = ai_settings.AI_DB_LOG_SINK_FLUSH_INTERVAL_MS / 1000.0
+        self._flush_interval = max(0.0, float(flush_interval_seconds))
+        self._writer = writer or write_db_log_records
+        self._queue: "asyncio.Queue[DbLogRecord]" = asyncio.Queue(maxsize=self._max_queue)
+        self._pending: List[DbLogRecord] = []
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[Future] = None
+        self._closed = False
+
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._queued_bytes = 0
+        self._dropped: Dict[str, int] = defaultdict(int)
+
+    @property
+    def closed(self) -> bool:
+        """Закрыт ли sink (новые записи не принимаются)."""
+        return self._closed
+
+    def submit(self, record: DbLogRecord) -> bool:
+        """
+        Поставить запись в очередь без ожидания.
+
+        Должен вызываться из event loop, которому принадлежит sink.
+
+        Returns:
+            False, если sink закрыт или очередь переполнена по числу записей
+            или по размеру (запись отброшена).
+        """
+        if self._closed:
+            return False
+        self._ensure_task()
+        with self._stats_lock:
+            # Первая запись принимается при любом размере, иначе крупная запись не пройдёт никогда.
+            accepted = (
+                self._queued_bytes == 0
+                or self._queued_bytes + record.size_bytes <= self._max_queue_bytes
+            )
+            if accepted:
+                try:
+                    self._queue.put_nowait(record)
+                except asyncio.QueueFull:
+                    accepted = False
+            if accepted:
+                self._submitted += 1
+                self._queued_bytes += record.size_bytes
+                return True
+            self._dropped[record.table] += 1
+            dropped_total = sum(self._dropped.values())
+            queued_bytes = self._queued_bytes
+        if dropped_total == 1 or dropped_total % _DROP_WARNING_EVERY == 0:
+            logger.warning(
+                "Очередь логов БД переполнена (%d записей, %d/%d байт): запись в %s отброшена, всего отброшено %d",
+                self._max_queue,
+                queued_bytes,
+                self._max_queue_bytes,
+                record.table,
+                dropped_total,
+            )
+        return False
+
+    async def flush(self) -> None:
+        """Записать всё, что накоплено в очереди и текущем пакете."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        inflight = self._inflight
+        if inflight is not None and not inflight.done():
+            await asyncio.wrap_future(inflight)
+
+        batch, self._pending = self._pending, []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        for start in range(0, len(batch), self._batch_size):
+            await self._write(batch[start:start + self._batch_size])
+
+    async def close(self) -> None:
+        """Перестать принимать записи и дописать очередь."""
+        self._closed = True
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики sink для логов и health-проверок."""
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize() + len(self._pending),
+                "max_queue": self._max_queue,
+                "queued_bytes": self._queued_bytes,
+                "max_queue_bytes": self._max_queue_bytes,
+                "submitted": self._submitted,
+                "written": self._written,
+                "failed": self._failed,
+                "batches": self._batches,
+                "dropped": sum(self._dropped.values()),
+                "dropped_by_table": dict(self._dropped),
+            }
+
+    def _ensure_task(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="db-log-sink")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending.append(await self._queue.get())
+            deadline = loop.time() + self._flush_interval
+            while len(self._pending) < self._batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._pending = self._pending, []
+            await self._write(batch)
+
+    async def _write(self, batch: List[DbLogRecord]) -> None:
+        if not batch:
+            return
+        future = _get_writer_executor().submit(self._write_sync, batch)
+        self._inflight = future
+        # shield: отмена задачи (flush/close) не должна отменять уже отправленный пакет.
+        await asyncio.shield(asyncio.wrap_future(future))
+
+    def _write_sync(self, batch: List[DbLogRecord]) -> None:
+        batch_bytes = sum(record.size_bytes for record in batch)
+        try:
+            written = self._writer(batch)
+        except Exception as exc:
+            tables = sorted({record.table for record in batch})
+            logger.warning("Ошибка пакетной записи логов в БД (%s, %d записей): %s", ", ".join(tables), len(batch), exc)
+            with self._stats_lock:
+                self._failed += len(batch)
+                self._queued_bytes -= batch_bytes
+            return
+        with self._stats_lock:
+            self._written += written
+            self._failed += max(0, len(batch) - written)
+            self._batches += 1
+            self._queued_bytes -= batch_bytes
+
+
+_sinks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, DbLogSink]" = weakref.WeakKeyDictionary()
+_sinks_lock = threading.Lock()
+
+
+def get_db_log_sink() -> Optional[DbLogSink]:
+    """Sink текущего event loop (None — нет запущенного loop или sink выключен)."""
+    if not ai_settings.AI_DB_LOG_SINK_ENABLED:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    with _sinks_lock:
+        sink = _sinks.get(loop)
+        if sink is None or sink.closed:
+            sink = DbLogSink()
+            _sinks[loop] = sink
+        return sink
+
+
+def submit_db_log(
+    table: str,
+    sql: str,
+    params: Union[Sequence[Any], ParamsFactory],
+    size_hint: int = 0,
+) -> None:
+    """
+    Записать строку лога в фоне (или сразу, если фоновая запись недоступна).
+
+    Время события передаётся в ``params`` (значение на момент вызова),
+    а не через ``NOW()`` в SQL: запись пакета может отставать на секунды.
+
+    Args:
+        table: Имя таблицы (для счётчиков и сообщений об ошибках).
+        sql: INSERT-запрос с плейсхолдерами ``%s``.
+        params: Параметры запроса или функция, возвращающая их.
+        size_hint: Оценка размера параметров в байтах, если передана фабрика.
+    """
+    record = DbLogRecord(table=table, sql=sql, params=params, size_bytes=size_hint)
+    sink = get_db_log_sink()
+    if sink is not None:
+        sink.submit(record)
+        return
+    try:
+        write_db_log_records([record])
+    except Exception as exc:
+        logger.warning("Ошибка записи в %s: %s", table, exc)
+
+
+async def flush_db_log_sink() -> None:
+    """Дописать очередь логов текущего event loop."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    with _sinks_lock:
+        sink = _sinks.get(loop)
+    if sink is not None:
+        await sink.flush()
+
+
+async def close_db_log_sink() -> Optional[Dict[str, Any]]:
+    """
+    Закрыть sink текущего event loop (при остановке процесса).
+
+    Returns:
+        Итоговые счётчики sink или None, если sink не создавался.
+    """
+    loop = asyncio.get_running_loop()
+    with _sinks_lock:
+        sink = _sinks.pop(loop, None)
+    if sink is None:
+        return None
+    await sink.close()
+    return sink.stats()
@@ -0,0 +1,454 @@
+"""
+embedding_cache.py — общий LRU-кэш эмбеддингов с опциональным хранилищем на диске.
+
+Ключ — SHA-1 от имени модели и нормализованного текста
+(``LocalEmbeddingProvider._normalize_text``), поэтому кэш общий для
+RAG, Group Knowledge и ``rag_similarity`` и не зависит от версии корпуса:
+изменённый текст просто получает новый ключ.
+
+Уровни:
+
+- память: LRU с бюджетом в байтах (векторы хранятся как float32);
+- диск (если задан каталог): кольцевой буфер фиксированной ёмкости
+  в memory-mapped файлах ``keys.bin``/``vectors.f32`` на каждую модель,
+  переживает перезапуск процесса.
+
+Каталог на диске общий для бота, ``gk_responder`` и ``admin_web``: номер
+следующего слота лежит в ``cursor.bin``, выделение слотов и запись идут
+под ``fcntl.flock`` на ``store.lock``, а чтение сверяет ключ в слоте —
+слот, перезаписанный другим процессом, считается промахом.
+
+Счётчики попаданий/промахов доступны через ``stats()`` и сохраняются
+в ``meta.json`` дискового хранилища, чтобы их видел ``rag_ops.py health``.
+"""
+
+import atexit
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: межпроцессной блокировки нет
+    fcntl = None
+
+from config import ai_settings
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 20
+# Оценка накладных расходов на запись LRU (ключ, узел OrderedDict, заголовок ndarray).
+_ENTRY_OVERHEAD_BYTES = 160
+# Как часто (в записях) сбрасывать memory-mapped файлы и meta.json на диск.
+_DISK_FLUSH_EVERY = 256
+_META_FILE = "meta.json"
+_KEYS_FILE = "keys.bin"
+_VECTORS_FILE = "vectors.f32"
+_CURSOR_FILE = "cursor.bin"
+_LOCK_FILE = "store.lock"
+
+
+def make_embedding_cache_key(model_name: str, normalized_text: str) -> bytes:
+    """Построить ключ кэша: SHA-1 от имени модели и нормализованного текста."""
+    digest = hashlib.sha1()
+    digest.update(str(model_name).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(normalized_text).encode("utf-8"))
+    return digest.digest()
+
+
+class _DiskEmbeddingStore:
+    """
+    Кольцевое memory-mapped хранилище векторов одной модели.
+
+    Файлы разделяются несколькими процессами: счётчик слотов общий
+    (``cursor.bin``), запись — под эксклюзивной блокировкой ``store.lock``.
+    Локальный индекс ключ → слот может устареть, поэтому ключ в слоте
+    сверяется при каждом чтении.
+    """
+
+    def __init__(self, directory: Path, model_name: str, dim: int, capacity: int) -> None:
+        self.directory = directory
+        self.model_name = model_name
+        self.dim = int(dim)
+        self.capacity = max(1, int(capacity))
+        self._pending_writes = 0
+        self._index: Dict[bytes, int] = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(directory / _LOCK_FILE, "a+b")
+
+        with self._locked():
+            meta = self._read_meta(directory)
+            keys_path = directory / _KEYS_FILE
+            vectors_path = directory / _VECTORS_FILE
+            cursor_path = directory / _CURSOR_FILE
+            reuse = (
+                meta is not None
+                and meta.get("model") == model_name
+                and int(meta.get("dim") or 0) == self.dim
+                and int(meta.get("capacity") or 0) == self.capacity
+                and keys_path.exists()
+                and vectors_path.exists()
+            )
+            mode = "r+" if reuse else "w+"
+            self._keys = np.memmap(keys_path, dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_SIZE))
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+            cursor_mode = "r+" if reuse and cursor_path.exists() else "w+"
+            self._cursor = np.memmap(cursor_path, dtype=np.int64, mode=cursor_mode, shape=(1,))
+            if reuse:
+                if cursor_mode == "w+":
+                    # Хранилище прежнего формата: счётчик был только в meta.json.
+                    self._cursor[0] = int(meta.get("next_slot") or 0)
+                occupied = np.flatnonzero(self._keys.any(axis=1))
+                for slot in occupied:
+                    self._index[self._keys[slot].tobytes()] = int(slot)
+            self.saved_stats: Dict[str, Any] = dict((meta or {}).get("stats") or {}) if reuse else {}
+            if not reuse:
+                # meta.json сразу, иначе другой процесс не узнает файлы и пересоздаст их.
+                self._write_meta(self.saved_stats)
+
+    @staticmethod
+    def _read_meta(directory: Path) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads((directory / _META_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Эксклюзивная межпроцессная блокировка хранилища."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    @property
+    def entries(self) -> int:
+        """Число векторов в хранилище, известных этому процессу."""
+        return len(self._index)
+
+    @property
+    def next_slot(self) -> int:
+        """Общий для всех процессов номер следующей записи."""
+        return int(self._cursor[0])
+
+    def _slot_of(self, key: bytes) -> Optional[int]:
+        """Слот ключа, если в нём всё ещё лежит этот ключ."""
+        slot = self._index.get(key)
+        if slot is None:
+            return None
+        if self._keys[slot].tobytes() != key:
+            # Слот перезаписан другим процессом.
+            self._index.pop(key, None)
+            return None
+        return slot
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        """Прочитать вектор по ключу (копия) или None."""
+        slot = self._slot_of(key)
+        if slot is None:
+            return None
+        vector = np.array(self._vectors[slot], dtype=np.float32)
+        # Запись обнуляет ключ до смены вектора: если ключ на месте, копия целая.
+        if self._keys[slot].tobytes() != key:
+            self._index.pop(key, None)
+            return None
+        return vector
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        """Записать вектор в следующий слот кольцевого буфера."""
+        self.put_many([(key, vector)])
+
+    def put_many(self, items: Sequence[Tuple[bytes, np.ndarray]]) -> None:
+        """Записать векторы в следующие слоты одной блокировкой."""
+        items = [(key, vector) for key, vector in items if self._slot_of(key) is None]
+        if not items:
+            return
+        with self._locked():
+            for key, vector in items:
+                next_slot = int(self._cursor[0])
+                slot = next_slot % self.capacity
+                old_key = self._keys[slot].tobytes()
+                if any(old_key):
+                    self._index.pop(old_key, None)
+                # Ключ обнуляется до записи вектора: при падении или чтении
+                # из другого процесса слот выглядит «пустым», а не чужим.
+                self._keys[slot] = 0
+                self._vectors[slot] = vector
+                self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self._cursor[0] = next_slot + 1
+                self._index[key] = slot
+                self._pending_writes += 1
+
+    def needs_flush(self) -> bool:
+        """Накопилось ли достаточно записей для сброса на диск."""
+        return self._pending_writes >= _DISK_FLUSH_EVERY
+
+    def flush(self, stats: Dict[str, Any]) -> None:
+        """Сбросить memory-mapped файлы и meta.json (атомарная замена)."""
+        with self._locked():
+            self._vectors.flush()
+            self._keys.flush()
+            self._cursor.flush()
+            self._write_meta(stats)
+        self._pending_writes = 0
+
+    def _write_meta(self, stats: Dict[str, Any]) -> None:
+        meta = {
+            "model": self.model_name,
+            "dim": self.dim,
+            "capacity": self.capacity,
+            "next_slot": self.next_slot,
+            "entries": int(np.count_nonzero(self._keys.any(axis=1))),
+            "stats": stats,
+            "updated_at": int(time.time()),
+        }
+        tmp_path = self.directory / f"{_META_FILE}.tmp.{os.getpid()}"
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.directory / _META_FILE)
+
+
+class EmbeddingCache:
+    """
+    Потокобезопасный кэш эмбеддингов: LRU в памяти + опциональный диск.
+
+    Все векторы одной модели должны иметь одинаковую размерность.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        disk_dir: str = "",
+        disk_max_entries: int = 0,
+    ) -> None:
+        self._max_bytes = max(0, int(max_bytes))
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk_max_entries = max(0, int(disk_max_entries))
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_stores: Dict[str, Optional[_DiskEmbeddingStore]] = {}
+
+        self._hits = 0
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def disk_enabled(self) -> bool:
+        """Включено ли хранилище на диске."""
+        return self._disk_dir is not None and self._disk_max_entries > 0
+
+    def get_many(self, model_name: str, normalized_texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Найти векторы для нормализованных текстов.
+
+        Returns:
+            Список той же длины: вектор или None для промаха.
+        """
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            store = self._get_disk_store(model_name, dim=None)
+            for text in normalized_texts:
+                key = make_embedding_cache_key(model_name, text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    self._memory_hits += 1
+                    results.append(vector.tolist())
+                    continue
+                if store is not None:
+                    vector = store.get(key)
+                    if vector is not None:
+                        self._remember(key, vector)
+                        self._hits += 1
+                        self._disk_hits += 1
+                        results.append(vector.tolist())
+                        continue
+                self._misses += 1
+                results.append(None)
+        return results
+
+    def put_many(
+        self,
+        model_name: str,
+        normalized_texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """Сохранить векторы для нормализованных текстов."""
+        if not normalized_texts or len(normalized_texts) != len(vectors):
+            return
+        with self._lock:
+            store: Optional[_DiskEmbeddingStore] = None
+            disk_items: List[Tuple[bytes, np.ndarray]] = []
+            for text, raw_vector in zip(normalized_texts, vectors):
+                vector = np.asarray(raw_vector, dtype=np.float32)
+                if vector.ndim != 1 or not vector.size:
+                    continue
+                key = make_embedding_cache_key(model_name, text)
+                self._remember(key, vector)
+                if store is None:
+                    store = self._get_disk_store(model_name, dim=int(vector.size))
+                if store is not None and store.dim == vector.size:
+                    disk_items.append((key, vector))
+            if store is not None and disk_items:
+                store.put_many(disk_items)
+            if store is not None and store.needs_flush():
+                self._flush_store(store)
+
+    def stats(self) -> Dict[str, Any]:
+        """Вернуть счётчики и заполненность кэша."""
+        with self._lock:
+            return self._stats_locked()
+
+    def flush(self) -> None:
+        """Сбросить дисковые хранилища."""
+        with self._lock:
+            for store in self._disk_stores.values():
+                if store is not None:
+                    self._flush_store(store)
+
+    def clear_memory(self) -> None:
+        """Очистить in-memory уровень (диск не затрагивается)."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def _stats_locked(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            "evictions": self._evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "memory_max_bytes": self._max_bytes,
+            "disk_entries": sum(store.entries for store in self._disk_stores.values() if store is not None),
+        }
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        if self._max_bytes <= 0:
+            return
+        entry_bytes = int(vector.nbytes) + _ENTRY_OVERHEAD_BYTES
+        if entry_bytes > self._max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= int(previous.nbytes) + _ENTRY_OVERHEAD_BYTES
+        self._memory[key] = vector
+        self._memory_bytes += entry_bytes
+        while self._memory_bytes > self._max_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= int(evicted.nbytes) + _ENTRY_OVERHEAD_BYTES
+            self._evictions += 1
+
+    def _get_disk_store(self, model_name: str, dim: Optional[int]) -> Optional[_DiskEmbeddingStore]:
+        """Открыть/создать хранилище модели; без ``dim`` открывается только существующее."""
+        if not self.disk_enabled:
+            return None
+        store = self._disk_stores.get(model_name)
+        if store is not None:
+            return store
+        if model_name in self._disk_stores and dim is None:
+            return None
+
+        directory = self._disk_dir / hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16]
+        if dim is None:
+            meta = _DiskEmbeddingStore._read_meta(directory)
+            if not meta or meta.get("model") != model_name:
+                self._disk_stores[model_name] = None
+                return None
+            dim = int(meta.get("dim") or 0)
+            if dim <= 0:
+                self._disk_stores[model_name] = None
+                return None
+
+        try:
+            store = _DiskEmbeddingStore(directory, model_name, dim, self._disk_max_entries)
+        except (OSError, ValueError) as exc:
+            logger.warning("Embedding cache: дисковое хранилище недоступно (%s): %s", directory, exc)
+            self._disk_stores[model_name] = None
+            return None
+
+        self._disk_stores[model_name] = store
+        logger.info(
+            "Embedding cache: дисковое хранилище открыто model=%s dim=%d entries=%d capacity=%d path=%s",
+            model_name,
+            store.dim,
+            store.entries,
+            store.capacity,
+            directory,
+        )
+        return store
+
+    def _flush_store(self, store: _DiskEmbeddingStore) -> None:
+        try:
+            store.flush(self._stats_locked())
+        except OSError as exc:
+            logger.warning("Embedding cache: не удалось сбросить хранилище %s: %s", store.directory, exc)
+
+
+def read_disk_cache_stats(disk_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Прочитать meta.json дисковых хранилищ (для health-проверки из другого процесса).
+
+    Args:
+        disk_dir: Каталог кэша (по умолчанию из настроек).
+
+    Returns:
+        Список meta-словарей по моделям.
+    """
+    root = Path(disk_dir if disk_dir is not None else ai_settings.AI_RAG_EMBEDDING_CACHE_DISK_DIR or "")
+    if not str(root) or str(root) == "." or not root.is_dir():
+        return []
+    result: List[Dict[str, Any]] = []
+    for child in sorted(root.iterdir()):
+        meta = _DiskEmbeddingStore._read_meta(child) if child.is_dir() else None
+        if meta:
+            result.append(meta)
+    return result
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Получить общий кэш эмбеддингов процесса (None, если кэш выключен)."""
+    global _cache
+    if not ai_settings.AI_RAG_EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_bytes=int(float(ai_settings.AI_RAG_EMBEDDING_CACHE_MAX_MB) * 1024 * 1024),
+                    disk_dir=ai_settings.AI_RAG_EMBEDDING_CACHE_DISK_DIR,
+                    disk_max_entries=ai_settings.AI_RAG_EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+                )
+                atexit.register(_cache.flush)
+    return _cache
+
+
+def get_embedding_cache_stats() -> Optional[Dict[str, Any]]:
+    """Вернуть статистику общего кэша эмбеддингов (None, если кэш выключен или не создан)."""
+    cache = _cache
+    return cache.stats() if cache is not None else None
@@ -0,0 +1,183 @@
+"""
+embedding_coalescer.py — объединение одновременных encode-запросов в батчи.
+
+Несколько пользователей (RAG, автоответчик GK, summary-prefilter, HyDE)
+одновременно кодируют короткие запросы по одному тексту. На CPU один
+проход модели по батчу из N текстов заметно дешевле N отдельных проходов,
+поэтому запросы собираются в очередь и кодируются общим батчем в
+отдельном потоке-воркере:
+
+- воркер ждёт первый запрос, затем до ``max_wait_ms`` собирает попутные
+  (или сразу стартует, если набран ``max_batch_size`` текстов). Окно
+  ожидания применяется только при конкурентной нагрузке (в очереди или
+  в предыдущем батче больше одного запроса), поэтому одиночный запрос
+  не получает дополнительной задержки;
+- батч передаётся в ``encode_batch`` одним вызовом;
+- каждый ожидающий получает свой срез результата (или исключение).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+EncodeBatchFn = Callable[[List[str]], List[List[float]]]
+
+
+class _PendingEncode:
+    """Запрос одного вызывающего: тексты и future с результатом."""
+
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]) -> None:
+        self.texts = texts
+        self.future: "Future[List[List[float]]]" = Future()
+
+
+class EmbeddingRequestCoalescer:
+    """
+    Коалесцер encode-запросов поверх функции батчевого кодирования.
+
+    Потокобезопасен: ``encode_texts`` вызывается из любых потоков и
+    блокирует вызывающего до готовности его векторов.
+    """
+
+    def __init__(
+        self,
+        encode_batch: EncodeBatchFn,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        name: str = "embedding-coalescer",
+    ) -> None:
+        self._encode_batch = encode_batch
+        self._max_batch_size = max(1, int(max_batch_size))
+        self._max_wait_seconds = max(0.0, float(max_wait_ms)) / 1000.0
+        self._name = name
+        self._condition = threading.Condition()
+        self._queue: Deque[_PendingEncode] = deque()
+        self._queued_texts = 0
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self._last_batch_requests = 0
+
+        self._requests_total = 0
+        self._texts_total = 0
+        self._batches_total = 0
+        self._max_batch_seen = 0
+
+    @property
+    def max_batch_size(self) -> int:
+        """Максимальный размер объединённого батча."""
+        return self._max_batch_size
+
+    def encode_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Закодировать тексты в составе общего батча.
+
+        Args:
+            texts: Тексты вызывающего.
+
+        Returns:
+            Векторы в порядке ``texts`` (пустой список, если модель недоступна).
+        """
+        if not texts:
+            return []
+        if threading.current_thread() is self._worker:
+            # Повторный вход из encode_batch: ждать собственную очередь нельзя.
+            return self._encode_batch(list(texts))
+
+        request = _PendingEncode(list(texts))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"{self._name} остановлен")
+            self._queue.append(request)
+            self._queued_texts += len(request.texts)
+            self._ensure_worker_locked()
+            self._condition.notify_all()
+        return request.future.result()
+
+    def close(self) -> None:
+        """Остановить воркер после обработки уже поставленных запросов."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def snapshot(self) -> Dict[str, float]:
+        """Вернуть статистику батчинга."""
+        with self._condition:
+            batches = self._batches_total
+            return {
+                "requests": float(self._requests_total),
+                "texts": float(self._texts_total),
+                "batches": float(batches),
+                "avg_batch_texts": (self._texts_total / batches) if batches else 0.0,
+                "max_batch_texts": float(self._max_batch_seen),
+                "queued_texts": float(self._queued_texts),
+            }
+
+    def _ensure_worker_locked(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+
+                concurrent_load = len(self._queue) > 1 or self._last_batch_requests > 1
+                deadline = time.monotonic() + (self._max_wait_seconds if concurrent_load else 0.0)
+                while self._queued_texts < self._max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch: List[_PendingEncode] = [self._queue.popleft()]
+                batch_texts = len(batch[0].texts)
+                while self._queue and batch_texts + len(self._queue[0].texts) <= self._max_batch_size:
+                    request = self._queue.popleft()
+                    batch.append(request)
+                    batch_texts += len(request.texts)
+                self._queued_texts -= batch_texts
+                self._last_batch_requests = len(batch)
+
+                self._requests_total += len(batch)
+                self._texts_total += batch_texts
+                self._batches_total += 1
+                self._max_batch_seen = max(self._max_batch_seen, batch_texts)
+
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingEncode]) -> None:
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = self._encode_batch(texts)
+        except BaseException as exc:  # noqa: BLE001 — исключение передаётся каждому ожидающему
+            logger.warning("%s: ошибка батчевого encode (texts=%d): %s", self._name, len(texts), exc)
+            for request in batch:
+                request.future.set_exception(exc)
+            return
+
+        if len(vectors) != len(texts):
+            # Модель недоступна или вернула неполный ответ — как и при прямом encode_texts.
+            for request in batch:
+                request.future.set_result([])
+            return
+
+        offset = 0
+        for request in batch:
+            size = len(request.texts)
+            request.future.set_result(list(vectors[offset:offset + size]))
+            offset += size
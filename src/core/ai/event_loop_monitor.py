@@ -0,0 +1,160 @@
+"""
+event_loop_monitor.py — измерение задержки (lag) event loop бота.
+
+Фоновая задача засыпает на фиксированный интервал и измеряет, насколько
+позже запланированного она проснулась. Задержка показывает, как долго
+event loop был занят синхронной работой и не обрабатывал другие апдейты
+Telegram. Статистика (последнее значение, max, p50/p95/p99 по скользящему
+окну) доступна через ``snapshot()`` и периодически пишется в лог.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from config import ai_settings
+
+logger = logging.getLogger(__name__)
+
+# Размер скользящего окна замеров для перцентилей.
+_LAG_WINDOW_SIZE = 1200
+
+
+def _percentile(ordered: list, percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return float(ordered[index])
+
+
+class EventLoopLagMonitor:
+    """
+    Монитор задержки event loop.
+
+    Запускается внутри работающего loop через ``start()`` и
+    останавливается ``stop()``. Один экземпляр обслуживает один loop.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: Optional[float] = None,
+        warn_ms: Optional[float] = None,
+        report_interval_seconds: Optional[float] = None,
+        window_size: int = _LAG_WINDOW_SIZE,
+    ) -> None:
+        self._interval = max(0.01, float(interval_seconds or ai_settings.AI_EVENT_LOOP_LAG_INTERVAL_SECONDS))
+        self._warn_ms = float(warn_ms if warn_ms is not None else ai_settings.AI_EVENT_LOOP_LAG_WARN_MS)
+        self._report_interval = float(
+            report_interval_seconds
+            if report_interval_seconds is not None
+            else ai_settings.AI_EVENT_LOOP_LAG_REPORT_INTERVAL_SECONDS
+        )
+        self._samples_ms: Deque[float] = deque(maxlen=max(1, int(window_size)))
+        self._total_samples = 0
+        self._max_ms = 0.0
+        self._last_ms = 0.0
+        self._slow_samples = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def running(self) -> bool:
+        """Запущен ли монитор."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Запустить измерение в текущем event loop (повторный вызов игнорируется)."""
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="event-loop-lag-monitor")
+
+    async def stop(self) -> None:
+        """Остановить измерение."""
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def record(self, lag_ms: float) -> None:
+        """Учесть один замер задержки (мс)."""
+        lag_ms = max(0.0, float(lag_ms))
+        self._samples_ms.append(lag_ms)
+        self._total_samples += 1
+        self._last_ms = lag_ms
+        self._max_ms = max(self._max_ms, lag_ms)
+        if lag_ms >= self._warn_ms:
+            self._slow_samples += 1
+            logger.warning("Event loop lag: %.1f ms (порог %.0f ms)", lag_ms, self._warn_ms)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Вернуть статистику задержки event loop в миллисекундах."""
+        ordered = sorted(self._samples_ms)
+        return {
+            "samples": float(self._total_samples),
+            "slow_samples": float(self._slow_samples),
+            "last_ms": self._last_ms,
+            "max_ms": self._max_ms,
+            "p50_ms": _percentile(ordered, 50),
+            "p95_ms": _percentile(ordered, 95),
+            "p99_ms": _percentile(ordered, 99),
+        }
+
+    def reset(self) -> None:
+        """Сбросить накопленную статистику."""
+        self._samples_ms.clear()
+        self._total_samples = 0
+        self._slow_samples = 0
+        self._max_ms = 0.0
+        self._last_ms = 0.0
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_report_at = time.monotonic()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.record((loop.time() - expected) * 1000.0)
+
+            if self._report_interval > 0 and time.monotonic() - last_report_at >= self._report_interval:
+                last_report_at = time.monotonic()
+                stats = self.snapshot()
+                logger.info(
+                    "Event loop lag: samples=%d slow=%d p50=%.1fms p95=%.1fms p99=%.1fms max=%.1fms",
+                    int(stats["samples"]),
+                    int(stats["slow_samples"]),
+                    stats["p50_ms"],
+                    stats["p95_ms"],
+                    stats["p99_ms"],
+                    stats["max_ms"],
+                )
+
+
+_monitor: Optional[EventLoopLagMonitor] = None
+
+
+def get_event_loop_lag_monitor() -> EventLoopLagMonitor:
+    """Получить общий монитор задержки event loop бота."""
+    global _monitor
+    if _monitor is None:
+        _monitor = EventLoopLagMonitor()
+    return _monitor
+
+
+def start_event_loop_lag_monitor() -> Optional[EventLoopLagMonitor]:
+    """Запустить общий монитор в текущем loop, если он включён настройками."""
+    if not ai_settings.AI_EVENT_LOOP_LAG_MONITOR_ENABLED:
+        return None
+    monitor = get_event_loop_lag_monitor()
+    monitor.start()
+    return monitor
+
+
+async def stop_event_loop_lag_monitor() -> None:
+    """Остановить общий монитор, если он был запущен."""
+    if _monitor is not None:
+        await _monitor.stop()
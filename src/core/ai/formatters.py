@@ -107,6 +107,8 @@ AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED = "rag_augmented_request_started
 AI_PROGRESS_STAGE_RAG_CACHE_HIT = "rag_cache_hit"
 AI_PROGRESS_STAGE_RAG_FALLBACK_STARTED = "rag_fallback_started"
 AI_PROGRESS_STAGE_UPOS_NOT_FOUND_FALLBACK_STARTED = "upos_not_found_fallback_started"
+# Промежуточный текст свободного ответа AI (payload: {"text": MarkdownV2}).
+AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL = "chat_answer_partial"
 
 AI_STATUS_TO_MESSAGE_KEY: Dict[str, str] = {
     "low_confidence": AI_MESSAGE_KEY_STATUS_LOW_CONFIDENCE,
@@ -0,0 +1,278 @@
+"""
+gigachat_client_pool.py — долгоживущие клиенты GigaChat SDK для GigaChatProvider.
+
+Раньше каждый вызов создавал ``GigaChat(**kwargs)`` в ``with``-блоке: новый
+OAuth-обмен токена и новая HTTP-сессия на каждый запрос, выполнение
+в общем default executor через ``asyncio.to_thread``. Пул:
+
+- хранит один клиент SDK на набор параметров (модель, credentials, scope,
+  таймауты): SDK кэширует access token и переиспользует соединения;
+- обновляет токен заранее в фоне, если до истечения осталось меньше
+  ``GIGACHAT_TOKEN_REFRESH_AHEAD_SECONDS``: создаётся новый клиент с уже
+  полученным токеном, старый закрывается после завершения его запросов.
+  Запросы пользователей не ждут OAuth (кроме самого первого);
+- выполняет синхронные вызовы SDK в собственном ограниченном пуле потоков;
+- ограничивает число одновременных запросов семафором (на event loop).
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Set, TypeVar
+
+from config import ai_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ClientFactory = Callable[[Dict[str, Any]], Any]
+
+_THREAD_PREFIX = "gigachat"
+
+
+def make_client_key(client_kwargs: Dict[str, Any]) -> str:
+    """Ключ клиента по параметрам (хэш, чтобы не хранить credentials в явном виде)."""
+    serialized = json.dumps(client_kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _create_sdk_client(client_kwargs: Dict[str, Any]) -> Any:
+    from gigachat import GigaChat  # noqa: PLC0415
+
+    return GigaChat(**client_kwargs)
+
+
+def _close_client(client: Any) -> None:
+    try:
+        client.close()
+    except Exception as exc:
+        logger.warning("Ошибка закрытия клиента GigaChat: %s", exc)
+
+
+@dataclass
+class _PooledClient:
+    """Клиент SDK и число выполняющихся на нём запросов."""
+
+    client: Any
+    in_flight: int = 0
+    retired: bool = False
+
+
+class GigaChatClientPool:
+    """
+    Пул клиентов GigaChat SDK с фоновым обновлением токена.
+
+    Args:
+        max_workers: Размер пула потоков для синхронных вызовов SDK.
+        max_in_flight: Максимум одновременных запросов к GigaChat.
+        refresh_ahead_seconds: За сколько секунд до истечения токена
+            обновлять его в фоне (0 — не обновлять заранее, SDK обновит
+            токен сам при очередном запросе).
+        client_factory: Фабрика клиента ``(client_kwargs) -> client``.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        refresh_ahead_seconds: Optional[float] = None,
+        client_factory: Optional[ClientFactory] = None,
+    ) -> None:
+        self._max_workers = max(1, int(max_workers or ai_settings.GIGACHAT_MAX_WORKERS))
+        self._max_in_flight = max(1, int(max_in_flight or ai_settings.GIGACHAT_MAX_IN_FLIGHT))
+        if refresh_ahead_seconds is None:
+            refresh_ahead_seconds = ai_settings.GIGACHAT_TOKEN_REFRESH_AHEAD_SECONDS
+        self._refresh_ahead_ms = max(0.0, float(refresh_ahead_seconds) * 1000.0)
+        self._client_factory = client_factory or _create_sdk_client
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix=_THREAD_PREFIX)
+        self._lock = threading.Lock()
+        self._clients: Dict[str, _PooledClient] = {}
+        self._refreshing: Set[str] = set()
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._closed = False
+
+        self._calls = 0
+        self._errors = 0
+        self._clients_created = 0
+        self._token_refreshes = 0
+        self._token_refresh_errors = 0
+
+    @property
+    def max_in_flight(self) -> int:
+        """Максимум одновременных запросов."""
+        return self._max_in_flight
+
+    async def run(self, client_kwargs: Dict[str, Any], func: Callable[[Any], T]) -> T:
+        """
+        Выполнить ``func(client)`` в пуле потоков GigaChat.
+
+        Сохраняет contextvars вызывающей корутины (как ``asyncio.to_thread``).
+        Ожидание свободного слота семафора не занимает поток пула.
+        """
+        semaphore = self._get_semaphore()
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, self.call_sync, client_kwargs, func)
+            return await loop.run_in_executor(self._executor, call)
+
+    def call_sync(self, client_kwargs: Dict[str, Any], func: Callable[[Any], T]) -> T:
+        """Выполнить ``func(client)`` в текущем потоке на клиенте из пула."""
+        key = make_client_key(client_kwargs)
+        entry = self._acquire(key, client_kwargs)
+        try:
+            return func(entry.client)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            self._release(entry)
+            self._maybe_schedule_refresh(key, client_kwargs, entry)
+
+    def close(self) -> None:
+        """Закрыть все клиенты и остановить пул потоков."""
+        with self._lock:
+            self._closed = True
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for entry in entries:
+            _close_client(entry.client)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счётчики пула для логов и health-проверок."""
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "in_flight": sum(entry.in_flight for entry in self._clients.values()),
+                "max_in_flight": self._max_in_flight,
+                "max_workers": self._max_workers,
+                "calls": self._calls,
+                "errors": self._errors,
+                "clients_created": self._clients_created,
+                "token_refreshes": self._token_refreshes,
+                "token_refresh_errors": self._token_refresh_errors,
+            }
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self._max_in_flight)
+                self._semaphores[loop] = semaphore
+            return semaphore
+
+    def _acquire(self, key: str, client_kwargs: Dict[str, Any]) -> _PooledClient:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Пул клиентов GigaChat закрыт")
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = _PooledClient(client=self._client_factory(dict(client_kwargs)))
+                self._clients[key] = entry
+                self._clients_created += 1
+            entry.in_flight += 1
+            self._calls += 1
+            return entry
+
+    def _release(self, entry: _PooledClient) -> None:
+        with self._lock:
+            entry.in_flight -= 1
+            close_now = entry.retired and entry.in_flight == 0
+        if close_now:
+            _close_client(entry.client)
+
+    def _maybe_schedule_refresh(self, key: str, client_kwargs: Dict[str, Any], entry: _PooledClient) -> None:
+        if not self._refresh_ahead_ms or entry.retired:
+            return
+        expires_at = _token_expires_at_ms(entry.client)
+        if not expires_at or expires_at - time.time() * 1000.0 > self._refresh_ahead_ms:
+            return
+        with self._lock:
+            if self._closed or key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        try:
+            self._executor.submit(self._refresh_client, key, dict(client_kwargs))
+        except RuntimeError:
+            # Пул потоков уже остановлен (close во время запроса).
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh_client(self, key: str, client_kwargs: Dict[str, Any]) -> None:
+        """Создать клиент со свежим токеном и заменить им текущий."""
+        try:
+            client = self._client_factory(client_kwargs)
+            client.get_token()
+        except Exception as exc:
+            logger.warning("Не удалось заранее обновить токен GigaChat: %s", exc)
+            with self._lock:
+                self._token_refresh_errors += 1
+                self._refreshing.discard(key)
+            return
+
+        close_old: Optional[_PooledClient] = None
+        with self._lock:
+            self._refreshing.discard(key)
+            if self._closed:
+                close_old = _PooledClient(client=client)
+            else:
+                old = self._clients.get(key)
+                self._clients[key] = _PooledClient(client=client)
+                self._clients_created += 1
+                self._token_refreshes += 1
+                if old is not None:
+                    old.retired = True
+                    if old.in_flight == 0:
+                        close_old = old
+        if close_old is not None:
+            _close_client(close_old.client)
+        logger.debug("Токен GigaChat обновлён заранее")
+
+
+def _token_expires_at_ms(client: Any) -> Optional[float]:
+    """Момент истечения токена клиента (мс), если токен получен через OAuth."""
+    try:
+        token = client.get_token()
+    except Exception:
+        return None
+    expires_at = getattr(token, "expires_at", None)
+    return float(expires_at) if isinstance(expires_at, (int, float)) and expires_at > 0 else None
+
+
+_pool: Optional[GigaChatClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_gigachat_client_pool() -> GigaChatClientPool:
+    """Получить общий пул клиентов GigaChat процесса."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GigaChatClientPool()
+                atexit.register(close_gigachat_client_pool)
+    return _pool
+
+
+def close_gigachat_client_pool() -> None:
+    """Закрыть общий пул клиентов GigaChat (при остановке процесса)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
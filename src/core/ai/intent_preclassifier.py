@@ -0,0 +1,536 @@
+"""
+intent_preclassifier.py — быстрая локальная классификация intent перед LLM.
+
+Каждое сообщение, попавшее в ``IntentRouter.route``, стоило LLM-вызова
+``classify`` (и повторного при ответе без JSON), даже если это просто код
+ошибки UPOS, код КТР или готовый тикет СООС. Pre-classifier распознаёт такие
+сообщения локально:
+
+- правила: скомпилированные шаблоны кодов и признаки (ключевые слова,
+  поля тикета, число строк) дают оценку уверенности по каждому intent;
+- centroid-модель (опционально): эмбеддинг сообщения сравнивается
+  с центроидами intent, обученными по ``ai_router_log``
+  (``scripts/train_intent_centroids.py``).
+
+Если уверенность не ниже порога, роутер использует результат без LLM.
+Посреди диалога голый код («4040», «А01») может быть ответом на вопрос
+бота, поэтому при непустом контексте быстрый путь дают только однозначные
+формы (ключевое слово + код, тикет СООС), а остальное решает LLM с историей.
+Счётчики попаданий и задержки доступны через ``stats()``.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import ai_settings
+from src.core.ai.llm_provider import ClassificationResult
+from src.core.ai.prompts import MODULE_DESCRIPTIONS
+
+logger = logging.getLogger(__name__)
+
+# Префикс explain-кодов быстрого пути (по нему такие записи исключаются из обучения).
+FAST_PATH_EXPLAIN_PREFIX = "FAST_"
+# explain-код ответа centroid-модели.
+CENTROID_EXPLAIN_CODE = f"{FAST_PATH_EXPLAIN_PREFIX}CENTROID"
+# Intent без модуля (доступен всегда).
+GENERAL_CHAT_INTENT = "general_chat"
+# Intent, параметры которых нельзя получить без извлечения из текста, в centroid-модель не входят.
+CENTROID_EXCLUDED_INTENTS = frozenset({"upos_error_lookup", "ktr_lookup", "unknown"})
+
+_INTENT_TO_MODULE: Dict[str, str] = {
+    description["intent"]: module_key for module_key, description in MODULE_DESCRIPTIONS.items()
+}
+
+_LATENCY_WINDOW = 1000
+_STATS_LOG_EVERY = 500
+
+# --- UPOS: код ошибки только числовой ---
+_UPOS_BARE_RE = re.compile(r"^\s*[#№]?\s*(\d{1,6})\s*[?!.]?\s*$")
+_UPOS_KEYWORD_RE = re.compile(
+    r"^\s*(?:код(?:\s+ошибки)?|ошибк[аиуеой]|error|err)(?:\s+(?:upos|юпос))?"
+    r"\s*[:№#-]?\s*(\d{1,6})\s*[?!.]?\s*$",
+    re.IGNORECASE,
+)
+_UPOS_HINT_RE = re.compile(r"\b(?:ошибк\w*|код\w*|error|err|upos|юпос|терминал\w*)\b", re.IGNORECASE)
+_NUMBER_TOKEN_RE = re.compile(r"(?<![\w.,])\d{1,6}(?![\w.,])")
+
+# --- КТР: буквенный префикс + цифры ---
+_KTR_CODE = r"[A-Za-zА-Яа-яЁё]{1,5}-?\d{1,6}"
+_KTR_BARE_RE = re.compile(rf"^\s*({_KTR_CODE})\s*[?!.]?\s*$")
+_KTR_KEYWORD_RE = re.compile(
+    rf"^\s*(?:код\s+)?(?:ктр|ktr)\s*[:№#-]?\s*({_KTR_CODE})\s*[?!.]?\s*$",
+    re.IGNORECASE,
+)
+_KTR_HINT_RE = re.compile(r"\b(?:ктр|ktr)\b", re.IGNORECASE)
+_KTR_TOKEN_RE = re.compile(rf"(?<!\w)({_KTR_CODE})(?!\w)")
+
+# --- СООС: поля тикета (как в soos_parser) ---
+_SOOS_FIELD_RES: Tuple["re.Pattern[str]", ...] = tuple(
+    re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    for pattern in (
+        r"^\s*Наименование ТСТ\s*:",
+        r"^\s*Адрес установки POS-терминала\s*:",
+        r"^\s*TID\s*:\s*\d{6,12}",
+        r"^\s*Телефон(?: обратной связи| ТСТ| МПС)?\s*:",
+        r"^\s*(?:merchant|mid)\s*[:=]\s*\d{8,20}",
+    )
+)
+_SOOS_COMMAND_RE = re.compile(r"^\s*(?:сформируй|сделай|создай)\s+со+с\b", re.IGNORECASE)
+
+# Уверенность правил. Формы «ключевое слово + код» и тикет с полями однозначны;
+# голый код КТР и признаки в свободной фразе по умолчанию ниже порога и
+# используются, только если порог снижен.
+_CONFIDENCE_UPOS_KEYWORD = 0.97
+_CONFIDENCE_UPOS_BARE = 0.93
+_CONFIDENCE_UPOS_FEATURES = 0.85
+_CONFIDENCE_KTR_KEYWORD = 0.97
+_CONFIDENCE_KTR_BARE = 0.85
+_CONFIDENCE_KTR_FEATURES = 0.8
+_CONFIDENCE_SOOS_MANY_FIELDS = 0.97
+_CONFIDENCE_SOOS_COMMAND = 0.95
+_CONFIDENCE_SOOS_TWO_FIELDS = 0.92
+_CONFIDENCE_SOOS_ONE_FIELD = 0.75
+
+_MAX_FEATURE_WORDS = 6
+
+
+@dataclass(frozen=True)
+class RuleCandidate:
+    """Кандидат правила: intent, уверенность, параметры и explain-код."""
+
+    intent: str
+    confidence: float
+    parameters: Dict[str, Any]
+    explain_code: str
+    # Голый код или признаки в свободной фразе: смысл зависит от диалога.
+    context_dependent: bool = False
+
+
+def score_rules(text: str) -> List[RuleCandidate]:
+    """
+    Оценить сообщение правилами (без учёта включённых модулей).
+
+    Returns:
+        Кандидаты, отсортированные по убыванию уверенности.
+    """
+    stripped = str(text or "").strip()
+    if not stripped:
+        return []
+
+    candidates: List[RuleCandidate] = []
+    candidates.extend(_score_upos(stripped))
+    candidates.extend(_score_ktr(stripped))
+    candidates.extend(_score_soos(stripped))
+    candidates.sort(key=lambda candidate: candidate.confidence, reverse=True)
+    return candidates
+
+
+def _score_upos(text: str) -> List[RuleCandidate]:
+    match = _UPOS_KEYWORD_RE.match(text)
+    if match:
+        return [_upos_candidate(match.group(1), _CONFIDENCE_UPOS_KEYWORD, "ERR_KEYWORD")]
+    match = _UPOS_BARE_RE.match(text)
+    if match:
+        return [_upos_candidate(match.group(1), _CONFIDENCE_UPOS_BARE, "ERR_NUM", context_dependent=True)]
+    if "\n" in text or _KTR_HINT_RE.search(text):
+        return []
+    numbers = _NUMBER_TOKEN_RE.findall(text)
+    if len(numbers) == 1 and len(text.split()) <= _MAX_FEATURE_WORDS and _UPOS_HINT_RE.search(text):
+        return [_upos_candidate(numbers[0], _CONFIDENCE_UPOS_FEATURES, "ERR_FEATURES", context_dependent=True)]
+    return []
+
+
+def _upos_candidate(code: str, confidence: float, reason: str, context_dependent: bool = False) -> RuleCandidate:
+    return RuleCandidate(
+        intent="upos_error_lookup",
+        confidence=confidence,
+        parameters={"error_code": code},
+        explain_code=f"{FAST_PATH_EXPLAIN_PREFIX}{reason}",
+        context_dependent=context_dependent,
+    )
+
+
+def _score_ktr(text: str) -> List[RuleCandidate]:
+    match = _KTR_KEYWORD_RE.match(text)
+    if match:
+        return [_ktr_candidate(match.group(1), _CONFIDENCE_KTR_KEYWORD, "KTR_KEYWORD")]
+    match = _KTR_BARE_RE.match(text)
+    if match:
+        return [_ktr_candidate(match.group(1), _CONFIDENCE_KTR_BARE, "KTR_CODE", context_dependent=True)]
+    if "\n" in text or not _KTR_HINT_RE.search(text) or len(text.split()) > _MAX_FEATURE_WORDS:
+        return []
+    codes = _KTR_TOKEN_RE.findall(text)
+    if len(codes) == 1:
+        return [_ktr_candidate(codes[0], _CONFIDENCE_KTR_FEATURES, "KTR_FEATURES", context_dependent=True)]
+    return []
+
+
+def _ktr_candidate(code: str, confidence: float, reason: str, context_dependent: bool = False) -> RuleCandidate:
+    return RuleCandidate(
+        intent="ktr_lookup",
+        confidence=confidence,
+        parameters={"ktr_code": code.upper()},
+        explain_code=f"{FAST_PATH_EXPLAIN_PREFIX}{reason}",
+        context_dependent=context_dependent,
+    )
+
+
+def _score_soos(text: str) -> List[RuleCandidate]:
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return []
+    fields = sum(1 for pattern in _SOOS_FIELD_RES if pattern.search(text))
+    if fields >= 3:
+        confidence, reason = _CONFIDENCE_SOOS_MANY_FIELDS, "SOOS_FIELDS"
+    elif _SOOS_COMMAND_RE.match(text):
+        confidence, reason = _CONFIDENCE_SOOS_COMMAND, "SOOS_COMMAND"
+    elif fields == 2 and len(lines) >= 3:
+        confidence, reason = _CONFIDENCE_SOOS_TWO_FIELDS, "SOOS_FIELDS"
+    elif fields == 1 and len(lines) >= 5:
+        confidence, reason = _CONFIDENCE_SOOS_ONE_FIELD, "SOOS_FEATURES"
+    else:
+        return []
+    return [
+        RuleCandidate(
+            intent="ticket_soos",
+            confidence=confidence,
+            parameters={},
+            explain_code=f"{FAST_PATH_EXPLAIN_PREFIX}{reason}",
+        )
+    ]
+
+
+def default_parameters_for_intent(intent: str, text: str) -> Dict[str, Any]:
+    """Параметры обработчика для intent, определённого без извлечения параметров."""
+    if intent == "rag_qa":
+        return {"question": text}
+    if intent == "certification_info":
+        return {"query_type": "summary"}
+    if intent == "news_search":
+        return {"search_query": ""}
+    return {}
+
+
+class IntentCentroidModel:
+    """
+    Модель «ближайший центроид» по эмбеддингам сообщений.
+
+    Центроид intent — нормированное среднее нормированных эмбеддингов
+    сообщений, которые LLM уверенно отнесла к этому intent.
+    """
+
+    def __init__(
+        self,
+        intents: Sequence[str],
+        centroids: np.ndarray,
+        embedding_model: str,
+        sample_counts: Optional[Dict[str, int]] = None,
+    ) -> None:
+        matrix = np.asarray(centroids, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(intents):
+            raise ValueError("Число центроидов не совпадает с числом intent")
+        self.intents: List[str] = [str(intent) for intent in intents]
+        self.centroids = _normalize_rows(matrix)
+        self.embedding_model = str(embedding_model)
+        self.sample_counts: Dict[str, int] = dict(sample_counts or {})
+
+    @classmethod
+    def train(
+        cls,
+        intents: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        embedding_model: str,
+        min_samples: int = 1,
+    ) -> "IntentCentroidModel":
+        """
+        Обучить модель по размеченным эмбеддингам.
+
+        Args:
+            intents: Метка intent для каждого вектора.
+            vectors: Эмбеддинги сообщений.
+            embedding_model: Имя embedding-модели (сохраняется в файле модели).
+            min_samples: Минимум примеров, чтобы intent попал в модель.
+        """
+        matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        labels = np.asarray([str(intent) for intent in intents])
+        counts = Counter(labels.tolist())
+        kept = sorted(
+            intent
+            for intent, count in counts.items()
+            if count >= max(1, int(min_samples)) and intent not in CENTROID_EXCLUDED_INTENTS
+        )
+        if not kept:
+            raise ValueError("Недостаточно примеров для обучения centroid-модели")
+        centroids = np.stack([matrix[labels == intent].mean(axis=0) for intent in kept])
+        return cls(kept, centroids, embedding_model, {intent: counts[intent] for intent in kept})
+
+    @classmethod
+    def load(cls, path: str) -> "IntentCentroidModel":
+        """Загрузить модель из ``.npz``."""
+        with np.load(path, allow_pickle=False) as data:
+            sample_counts = dict(zip(data["intents"].tolist(), data["sample_counts"].tolist()))
+            return cls(
+                data["intents"].tolist(),
+                data["centroids"],
+                str(data["embedding_model"]),
+                {str(key): int(value) for key, value in sample_counts.items()},
+            )
+
+    def save(self, path: str) -> None:
+        """Сохранить модель в ``.npz``."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with target.open("wb") as handle:
+            np.savez(
+                handle,
+                intents=np.asarray(self.intents),
+                centroids=self.centroids,
+                embedding_model=np.asarray(self.embedding_model),
+                sample_counts=np.asarray([self.sample_counts.get(intent, 0) for intent in self.intents]),
+            )
+
+    def predict(self, vector: Sequence[float]) -> Tuple[str, float, float]:
+        """
+        Ближайший intent для эмбеддинга.
+
+        Returns:
+            (intent, косинусное сходство, отрыв от второго центроида).
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return self.intents[0], 0.0, 0.0
+        similarities = self.centroids @ (query / norm)
+        order = np.argsort(similarities)[::-1]
+        best = float(similarities[order[0]])
+        second = float(similarities[order[1]]) if len(order) > 1 else -1.0
+        return self.intents[int(order[0])], best, best - second
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+EncodeFunc = Callable[[List[str]], Any]
+
+
+class IntentPreclassifier:
+    """
+    Локальный pre-classifier intent перед LLM.
+
+    Args:
+        min_confidence: Порог уверенности правил для быстрого ответа.
+        centroid_model: Готовая centroid-модель (иначе загружается из
+            ``AI_INTENT_CENTROID_MODEL_PATH`` при первом вызове).
+        centroid_min_similarity: Минимальное сходство с центроидом.
+        centroid_min_margin: Минимальный отрыв от второго центроида.
+        encode_texts: Async-функция ``(texts) -> vectors`` для эмбеддингов
+            (по умолчанию — локальная модель в embedding-пуле retrieval).
+    """
+
+    def __init__(
+        self,
+        min_confidence: Optional[float] = None,
+        centroid_model: Optional[IntentCentroidModel] = None,
+        centroid_min_similarity: Optional[float] = None,
+        centroid_min_margin: Optional[float] = None,
+        encode_texts: Optional[EncodeFunc] = None,
+    ) -> None:
+        if min_confidence is None:
+            min_confidence = ai_settings.AI_INTENT_PRECLASSIFIER_MIN_CONFIDENCE
+        self._min_confidence = float(min_confidence)
+        if centroid_min_similarity is None:
+            centroid_min_similarity = ai_settings.AI_INTENT_CENTROID_MIN_SIMILARITY
+        self._centroid_min_similarity = float(centroid_min_similarity)
+        if centroid_min_margin is None:
+            centroid_min_margin = ai_settings.AI_INTENT_CENTROID_MIN_MARGIN
+        self._centroid_min_margin = float(centroid_min_margin)
+        self._centroid_model = centroid_model
+        self._centroid_model_loaded = centroid_model is not None
+        self._encode_texts = encode_texts
+        self._embedding_provider: Any = None
+
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hits_by_source: Counter = Counter()
+        self._hits_by_intent: Counter = Counter()
+        self._latencies_ms: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    @property
+    def min_confidence(self) -> float:
+        """Порог уверенности правил."""
+        return self._min_confidence
+
+    async def classify(
+        self,
+        text: str,
+        enabled_modules: Sequence[str],
+        context_messages: Optional[Sequence[Dict[str, Any]]] = None,
+    ) -> Optional[ClassificationResult]:
+        """
+        Классифицировать сообщение локально.
+
+        Args:
+            text: Текст сообщения.
+            enabled_modules: Ключи включённых модулей (как в промпте классификации).
+            context_messages: Предыдущие сообщения диалога (без текущего).
+                При непустом контексте зависящие от диалога правила
+                и centroid-модель не используются.
+
+        Returns:
+            Результат классификации или None, если нужен LLM.
+        """
+        started_at = time.perf_counter()
+        source = "rules"
+        has_context = bool(context_messages)
+        result = self.classify_rules(text, enabled_modules, has_context=has_context)
+        if result is None and not has_context:
+            source = "centroid"
+            result = await self._classify_centroid(text, enabled_modules)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        if result is not None:
+            result.response_time_ms = int(elapsed_ms)
+        self._record(source if result is not None else None, result, elapsed_ms)
+        return result
+
+    def classify_rules(
+        self,
+        text: str,
+        enabled_modules: Sequence[str],
+        has_context: bool = False,
+    ) -> Optional[ClassificationResult]:
+        """
+        Классифицировать сообщение правилами.
+
+        None — ниже порога, модуль выключен или (при ``has_context``)
+        правило зависит от диалога.
+        """
+        enabled = set(enabled_modules)
+        for candidate in score_rules(text):
+            if candidate.confidence < self._min_confidence:
+                break
+            if has_context and candidate.context_dependent:
+                continue
+            if not _is_intent_enabled(candidate.intent, enabled):
+                continue
+            return ClassificationResult(
+                intent=candidate.intent,
+                confidence=candidate.confidence,
+                parameters=dict(candidate.parameters),
+                explain_code=candidate.explain_code,
+            )
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Доля быстрых ответов и задержка pre-classifier."""
+        with self._lock:
+            hits = sum(self._hits_by_source.values())
+            latencies = sorted(self._latencies_ms)
+            return {
+                "calls": self._calls,
+                "hits": hits,
+                "hit_rate": round(hits / self._calls, 4) if self._calls else 0.0,
+                "hits_by_source": dict(self._hits_by_source),
+                "hits_by_intent": dict(self._hits_by_intent),
+                "latency_p50_ms": round(_percentile(latencies, 50), 3),
+                "latency_p95_ms": round(_percentile(latencies, 95), 3),
+                "latency_max_ms": round(latencies[-1], 3) if latencies else 0.0,
+                "centroid_model": self._centroid_model is not None,
+            }
+
+    async def _classify_centroid(self, text: str, enabled_modules: Sequence[str]) -> Optional[ClassificationResult]:
+        model = self._get_centroid_model()
+        if model is None or not str(text or "").strip():
+            return None
+        try:
+            vectors = await self._encode(model, [text])
+        except Exception as exc:
+            logger.warning("Pre-classifier: ошибка эмбеддинга сообщения: %s", exc)
+            return None
+        if not vectors:
+            return None
+
+        intent, similarity, margin = model.predict(vectors[0])
+        if similarity < self._centroid_min_similarity or margin < self._centroid_min_margin:
+            return None
+        if not _is_intent_enabled(intent, set(enabled_modules)):
+            return None
+        return ClassificationResult(
+            intent=intent,
+            confidence=round(similarity, 4),
+            parameters=default_parameters_for_intent(intent, text),
+            explain_code=CENTROID_EXPLAIN_CODE,
+        )
+
+    def _get_centroid_model(self) -> Optional[IntentCentroidModel]:
+        if self._centroid_model_loaded:
+            return self._centroid_model
+        with self._lock:
+            if not self._centroid_model_loaded:
+                self._centroid_model_loaded = True
+                path = ai_settings.AI_INTENT_CENTROID_MODEL_PATH
+                if path:
+                    try:
+                        self._centroid_model = IntentCentroidModel.load(path)
+                        logger.info(
+                            "Centroid-модель intent загружена: path=%s intents=%s",
+                            path,
+                            ",".join(self._centroid_model.intents),
+                        )
+                    except Exception as exc:
+                        logger.warning("Не удалось загрузить centroid-модель intent %s: %s", path, exc)
+        return self._centroid_model
+
+    async def _encode(self, model: IntentCentroidModel, texts: List[str]) -> Any:
+        if self._encode_texts is not None:
+            return await self._encode_texts(texts)
+
+        from src.core.ai.retrieval_executor import get_retrieval_executor  # noqa: PLC0415
+        from src.core.ai.vector_search import LocalEmbeddingProvider  # noqa: PLC0415
+
+        if self._embedding_provider is None:
+            self._embedding_provider = LocalEmbeddingProvider(model_name=model.embedding_model)
+        return await get_retrieval_executor().run_encode_texts(self._embedding_provider, texts)
+
+    def _record(self, source: Optional[str], result: Optional[ClassificationResult], elapsed_ms: float) -> None:
+        with self._lock:
+            self._calls += 1
+            self._latencies_ms.append(elapsed_ms)
+            if source is not None and result is not None:
+                self._hits_by_source[source] += 1
+                self._hits_by_intent[result.intent] += 1
+            calls = self._calls
+        if calls % _STATS_LOG_EVERY == 0:
+            stats = self.stats()
+            logger.info(
+                "Intent pre-classifier: calls=%d hit_rate=%.3f by_source=%s p50=%.2fms p95=%.2fms",
+                stats["calls"],
+                stats["hit_rate"],
+                stats["hits_by_source"],
+                stats["latency_p50_ms"],
+                stats["latency_p95_ms"],
+            )
+
+
+def _is_intent_enabled(intent: str, enabled_modules: set) -> bool:
+    if intent == GENERAL_CHAT_INTENT:
+        return True
+    module_key = _INTENT_TO_MODULE.get(intent)
+    return module_key is not None and module_key in enabled_modules
+
+
+def _percentile(ordered: List[float], percent: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
@@ -11,18 +11,38 @@ import logging
 import re
 import time
 import asyncio
+import functools
+import threading
+import weakref
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 import httpx
-import src.common.database as database
 from src.common.pii_masking import mask_sensitive_data
+from src.core.ai.db_log_sink import estimate_params_bytes, submit_db_log
+from src.core.ai.gigachat_client_pool import get_gigachat_client_pool
 
 from config import ai_settings
 
 logger = logging.getLogger(__name__)
 
+_MODEL_IO_LOG_SQL = """
+    INSERT INTO ai_model_io_log (
+        user_id,
+        provider,
+        model_name,
+        purpose,
+        request_text_full,
+        response_text_full,
+        error_text,
+        status,
+        response_time_ms,
+        created_at
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
 
 ALLOWED_CLASSIFICATION_INTENTS = {
     "certification_info",
@@ -68,6 +88,84 @@ class LLMProviderTemporaryError(RuntimeError):
     """Временная ошибка LLM-провайдера (таймаут/сетевая деградация)."""
 
 
+# =============================================
+# Общий пул HTTP-соединений
+# =============================================
+
+# Клиенты httpx привязаны к event loop, поэтому пул хранится отдельно для
+# каждого loop (скрипты могут запускать asyncio.run несколько раз) и для
+# каждого base URL. Экземпляры провайдеров создаются на каждый запрос
+# (get_provider), а соединения переиспользуются.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_http_clients_lock = threading.Lock()
+
+
+def _is_http2_available() -> bool:
+    """Проверить, установлен ли пакет h2 (нужен httpx для HTTP/2)."""
+    try:
+        import h2  # noqa: F401, PLC0415
+    except ImportError:
+        return False
+    return True
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Создать клиент с keep-alive пулом по настройкам DeepSeek."""
+    http2 = bool(ai_settings.DEEPSEEK_HTTP2_ENABLED)
+    if http2 and not _is_http2_available():
+        logger.warning("DEEPSEEK_HTTP2_ENABLED=1, но пакет h2 не установлен — используется HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max(1, int(ai_settings.DEEPSEEK_MAX_CONNECTIONS)),
+            max_keepalive_connections=max(0, int(ai_settings.DEEPSEEK_MAX_KEEPALIVE_CONNECTIONS)),
+            keepalive_expiry=float(ai_settings.DEEPSEEK_KEEPALIVE_EXPIRY_SECONDS),
+        ),
+        timeout=httpx.Timeout(ai_settings.LLM_REQUEST_TIMEOUT, read=ai_settings.LLM_READ_TIMEOUT),
+    )
+
+
+def get_shared_http_client(base_url: str) -> httpx.AsyncClient:
+    """
+    Вернуть общий HTTP-клиент для base URL в текущем event loop.
+
+    Должна вызываться из корутины. Таймауты передаются в каждом запросе,
+    поэтому провайдеры с разными таймаутами используют один пул.
+    """
+    loop = asyncio.get_running_loop()
+    with _http_clients_lock:
+        clients = _http_clients.get(loop)
+        if clients is None:
+            clients = {}
+            _http_clients[loop] = clients
+        client = clients.get(base_url)
+        if client is None or client.is_closed:
+            client = _create_http_client()
+            clients[base_url] = client
+        return client
+
+
+async def close_llm_http_clients() -> int:
+    """
+    Закрыть HTTP-клиенты LLM текущего event loop (вызывается при остановке бота).
+
+    Returns:
+        Число закрытых клиентов.
+    """
+    loop = asyncio.get_running_loop()
+    with _http_clients_lock:
+        clients = _http_clients.pop(loop, None) or {}
+    for base_url, client in clients.items():
+        try:
+            await client.aclose()
+        except Exception as exc:
+            logger.warning("Ошибка закрытия HTTP-клиента LLM %s: %s", base_url, exc)
+    return len(clients)
+
+
 # =============================================
 # Базовый класс провайдера
 # =============================================
@@ -119,6 +217,35 @@ class LLMProvider(ABC):
         """
         ...
 
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        user_id: Optional[int] = None,
+        purpose: str = "response",
+        model_override: Optional[str] = None,
+        temperature_override: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Получить ответ LLM фрагментами по мере генерации.
+
+        Реализация по умолчанию (для провайдеров без стриминга) отдаёт
+        один фрагмент с полным ответом ``chat()``.
+
+        Yields:
+            Очередной фрагмент текста ответа.
+        """
+        text = await self.chat(
+            messages,
+            system_prompt,
+            user_id=user_id,
+            purpose=purpose,
+            model_override=model_override,
+            temperature_override=temperature_override,
+        )
+        if text:
+            yield text
+
     @abstractmethod
     async def health_check(self) -> bool:
         """
@@ -251,17 +378,7 @@ class DeepSeekProvider(LLMProvider):
     ) -> str:
         """Получить свободный текстовый ответ через DeepSeek API."""
         full_messages = [{"role": "system", "content": system_prompt}] + messages
-
-        temperature = ai_settings.LLM_CHAT_TEMPERATURE
-        if temperature_override is not None:
-            try:
-                temperature = float(temperature_override)
-            except (TypeError, ValueError):
-                logger.warning(
-                    "Некорректный temperature_override=%r, используется дефолт %.3f",
-                    temperature_override,
-                    ai_settings.LLM_CHAT_TEMPERATURE,
-                )
+        temperature = self._resolve_chat_temperature(temperature_override)
 
         try:
             retry_attempts = 4 if model_override and purpose in {"gk_inference", "gk_prompt_tester"} else 2
@@ -293,23 +410,212 @@ class DeepSeekProvider(LLMProvider):
 
         return raw
 
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: str,
+        user_id: Optional[int] = None,
+        purpose: str = "response",
+        model_override: Optional[str] = None,
+        temperature_override: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Получить ответ DeepSeek фрагментами (``"stream": true``, SSE).
+
+        Повтор при таймауте/сетевой ошибке возможен только до первого
+        фрагмента; обрыв потока после него — LLMProviderTemporaryError.
+        Fallback reasoner → chat при пустом ответе не выполняется.
+        """
+        full_messages = [{"role": "system", "content": system_prompt}] + messages
+        temperature = self._resolve_chat_temperature(temperature_override)
+        max_tokens = ai_settings.LLM_CHAT_MAX_TOKENS
+        model_name = (
+            ai_settings.normalize_deepseek_model(model_override)
+            if model_override
+            else self._resolve_model(purpose=purpose)
+        )
+        payload = {
+            "model": model_name,
+            "messages": full_messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        request_payload_text = json.dumps(full_messages, ensure_ascii=False)
+        self._log_model_request(
+            purpose=purpose,
+            model_name=model_name,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            messages=full_messages,
+        )
+
+        client = self._get_http_client()
+        max_attempts = 2
+        chunks: List[str] = []
+        started = time.monotonic()
+        for attempt in range(1, max_attempts + 1):
+            try:
+                async with client.stream(
+                    "POST",
+                    f"{self._base_url}/v1/chat/completions",
+                    json=payload,
+                    headers=self._build_headers(),
+                    timeout=self._build_timeout(model_name),
+                ) as response:
+                    if response.status_code >= 400:
+                        response_body = (await response.aread()).decode("utf-8", errors="replace")
+                        logger.error(
+                            "DeepSeek HTTP error (stream): status=%s purpose=%s model=%s body=%s",
+                            response.status_code,
+                            purpose,
+                            model_name,
+                            self._truncate_for_log(response_body),
+                        )
+                        self._log_model_io_to_db(
+                            user_id=user_id,
+                            purpose=purpose,
+                            model_name=model_name,
+                            request_text=request_payload_text,
+                            response_text="",
+                            status="http_error",
+                            response_time_ms=None,
+                            error_text=response_body,
+                        )
+                        response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        delta = self._parse_stream_line(line)
+                        if delta is None:
+                            break
+                        if delta:
+                            chunks.append(delta)
+                            yield delta
+                break
+            except (httpx.TimeoutException, httpx.RequestError) as exc:
+                is_timeout = isinstance(exc, httpx.TimeoutException)
+                error_text = str(exc) or type(exc).__name__
+                logger.warning(
+                    "DeepSeek stream %s: purpose=%s model=%s attempt=%d/%d received_chunks=%d error=%s",
+                    "timeout" if is_timeout else "network error",
+                    purpose,
+                    model_name,
+                    attempt,
+                    max_attempts,
+                    len(chunks),
+                    error_text,
+                )
+                self._log_model_io_to_db(
+                    user_id=user_id,
+                    purpose=purpose,
+                    model_name=model_name,
+                    request_text=request_payload_text,
+                    response_text="".join(chunks),
+                    status="timeout" if is_timeout else "request_error",
+                    response_time_ms=None,
+                    error_text=error_text,
+                )
+                if not chunks and attempt < max_attempts:
+                    await asyncio.sleep(0.2 * attempt)
+                    continue
+                raise LLMProviderTemporaryError(
+                    "Временная ошибка AI-сервиса: истекло время ожидания ответа."
+                    if is_timeout
+                    else "Временная ошибка AI-сервиса: проблемы с сетевым подключением."
+                ) from None
+
+        content = "".join(chunks)
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+        if content.strip():
+            self._log_model_response(purpose=purpose, model_name=model_name, raw_content=content)
+        else:
+            logger.warning("DeepSeek stream returned empty content: purpose=%s model=%s", purpose, model_name)
+        self._log_model_io_to_db(
+            user_id=user_id,
+            purpose=purpose,
+            model_name=model_name,
+            request_text=request_payload_text,
+            response_text=content,
+            status="ok" if content.strip() else "empty_content",
+            response_time_ms=elapsed_ms,
+            error_text="",
+        )
+
     async def health_check(self) -> bool:
         """Проверить доступность DeepSeek API."""
         if not self._api_key:
             return False
         try:
-            async with httpx.AsyncClient(timeout=10) as client:
-                resp = await client.get(
-                    f"{self._base_url}/v1/models",
-                    headers={"Authorization": f"Bearer {self._api_key}"},
-                )
-                return resp.status_code == 200
+            resp = await self._get_http_client().get(
+                f"{self._base_url}/v1/models",
+                headers={"Authorization": f"Bearer {self._api_key}"},
+                timeout=10,
+            )
+            return resp.status_code == 200
         except Exception as exc:
             logger.warning("DeepSeek health check failed: %s", exc)
             return False
 
     # ----- Внутренние методы -----
 
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Вернуть общий пул соединений для base URL провайдера."""
+        return get_shared_http_client(self._base_url)
+
+    def _build_headers(self) -> Dict[str, str]:
+        """Заголовки запроса к DeepSeek API."""
+        return {
+            "Authorization": f"Bearer {self._api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _build_timeout(self, model_name: str) -> httpx.Timeout:
+        """Таймауты запроса: чтение зависит от модели (reasoner отвечает дольше)."""
+        return httpx.Timeout(
+            connect=self._timeout,
+            read=ai_settings.get_llm_read_timeout_for_model(model_name),
+            write=self._timeout,
+            pool=self._timeout,
+        )
+
+    @staticmethod
+    def _resolve_chat_temperature(temperature_override: Optional[float]) -> float:
+        """Температура chat-запроса с учётом корректного override."""
+        if temperature_override is None:
+            return ai_settings.LLM_CHAT_TEMPERATURE
+        try:
+            return float(temperature_override)
+        except (TypeError, ValueError):
+            logger.warning(
+                "Некорректный temperature_override=%r, используется дефолт %.3f",
+                temperature_override,
+                ai_settings.LLM_CHAT_TEMPERATURE,
+            )
+            return ai_settings.LLM_CHAT_TEMPERATURE
+
+    @staticmethod
+    def _parse_stream_line(line: str) -> Optional[str]:
+        """
+        Разобрать строку SSE-потока chat/completions.
+
+        Returns:
+            Фрагмент content (пустая строка для служебных строк и
+            reasoning-фрагментов) или None для маркера ``[DONE]``.
+        """
+        text = str(line or "").strip()
+        if not text.startswith("data:"):
+            return ""
+        data = text[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            event = json.loads(data)
+            delta = event["choices"][0].get("delta") or {}
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+            logger.debug("Пропущена некорректная строка SSE DeepSeek: %s", data[:200])
+            return ""
+        content = delta.get("content") if isinstance(delta, dict) else None
+        return content if isinstance(content, str) else ""
+
     async def _call_api(
         self,
         messages: List[Dict[str, str]],
@@ -360,51 +666,42 @@ class DeepSeekProvider(LLMProvider):
             response_format=response_format,
         )
 
-        headers = {
-            "Authorization": f"Bearer {self._api_key}",
-            "Content-Type": "application/json",
-        }
+        headers = self._build_headers()
 
         max_attempts = max(1, int(max_attempts))
         response: Optional[httpx.Response] = None
-        read_timeout = ai_settings.get_llm_read_timeout_for_model(str(payload.get("model") or ""))
+        timeout = self._build_timeout(str(payload.get("model") or ""))
+        client = self._get_http_client()
         for attempt in range(1, max_attempts + 1):
             try:
-                async with httpx.AsyncClient(
-                    timeout=httpx.Timeout(
-                        connect=self._timeout,
-                        read=read_timeout,
-                        write=self._timeout,
-                        pool=self._timeout,
+                response = await client.post(
+                    f"{self._base_url}/v1/chat/completions",
+                    json=payload,
+                    headers=headers,
+                    timeout=timeout,
+                )
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError:
+                    response_body = str(response.text or "")
+                    logger.error(
+                        "DeepSeek HTTP error: status=%s purpose=%s model=%s body=%s",
+                        response.status_code,
+                        purpose,
+                        payload.get("model"),
+                        self._truncate_for_log(response_body),
                     )
-                ) as client:
-                    response = await client.post(
-                        f"{self._base_url}/v1/chat/completions",
-                        json=payload,
-                        headers=headers,
+                    self._log_model_io_to_db(
+                        user_id=user_id,
+                        purpose=purpose,
+                        model_name=str(payload.get("model") or ""),
+                        request_text=request_payload_text,
+                        response_text="",
+                        status="http_error",
+                        response_time_ms=None,
+                        error_text=response_body,
                     )
-                    try:
-                        response.raise_for_status()
-                    except httpx.HTTPStatusError:
-                        response_body = str(response.text or "")
-                        logger.error(
-                            "DeepSeek HTTP error: status=%s purpose=%s model=%s body=%s",
-                            response.status_code,
-                            purpose,
-                            payload.get("model"),
-                            self._truncate_for_log(response_body),
-                        )
-                        self._log_model_io_to_db(
-                            user_id=user_id,
-                            purpose=purpose,
-                            model_name=str(payload.get("model") or ""),
-                            request_text=request_payload_text,
-                            response_text="",
-                            status="http_error",
-                            response_time_ms=None,
-                            error_text=response_body,
-                        )
-                        raise
+                    raise
                 break
             except httpx.TimeoutException as exc:
                 error_text = str(exc) or type(exc).__name__
@@ -630,7 +927,11 @@ class DeepSeekProvider(LLMProvider):
     @staticmethod
     def _extract_response_time_ms(response: Any) -> Optional[int]:
         """Извлечь длительность HTTP-запроса в миллисекундах, если доступна."""
-        elapsed = getattr(response, "elapsed", None)
+        try:
+            elapsed = getattr(response, "elapsed", None)
+        except RuntimeError:
+            # httpx: elapsed недоступен, пока поток ответа не закрыт.
+            return None
         if elapsed is None:
             return None
 
@@ -666,15 +967,16 @@ class DeepSeekProvider(LLMProvider):
         response_time_ms: Optional[int],
         error_text: str,
     ) -> None:
-        """Запланировать сохранение model I/O в БД в отдельном потоке (fire-and-forget)."""
+        """Поставить model I/O в фоновую очередь записи в БД (fire-and-forget)."""
         if not self._is_db_model_io_logging_enabled():
             return
 
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            # Нет event loop — вызываем синхронно (скрипты, тесты)
-            self._log_model_io_to_db_sync(
+        created_at = datetime.now()
+        # Маскирование PII и обрезка выполняются в потоке записи, а не в event loop.
+        submit_db_log(
+            "ai_model_io_log",
+            _MODEL_IO_LOG_SQL,
+            lambda: self._build_model_io_log_params(
                 user_id=user_id,
                 purpose=purpose,
                 model_name=model_name,
@@ -683,26 +985,12 @@ class DeepSeekProvider(LLMProvider):
                 status=status,
                 response_time_ms=response_time_ms,
                 error_text=error_text,
-            )
-            return
-
-        loop.call_soon(
-            lambda: asyncio.ensure_future(
-                asyncio.to_thread(
-                    self._log_model_io_to_db_sync,
-                    user_id=user_id,
-                    purpose=purpose,
-                    model_name=model_name,
-                    request_text=request_text,
-                    response_text=response_text,
-                    status=status,
-                    response_time_ms=response_time_ms,
-                    error_text=error_text,
-                )
-            )
+                created_at=created_at,
+            ),
+            size_hint=estimate_params_bytes((request_text or "", response_text or "", error_text or "")),
         )
 
-    def _log_model_io_to_db_sync(
+    def _build_model_io_log_params(
         self,
         user_id: Optional[int],
         purpose: str,
@@ -712,44 +1000,21 @@ class DeepSeekProvider(LLMProvider):
         status: str,
         response_time_ms: Optional[int],
         error_text: str,
-    ) -> None:
-        """Сохранить полный prompt/response модели в БД с маскированием PII."""
-        safe_request = self._truncate_db_text(mask_sensitive_data(request_text))
-        safe_response = self._truncate_db_text(mask_sensitive_data(response_text))
-        safe_error = self._truncate_db_text(mask_sensitive_data(error_text), max_chars=50_000)
-
-        try:
-            with database.get_db_connection() as conn:
-                with database.get_cursor(conn) as cursor:
-                    cursor.execute(
-                        """
-                        INSERT INTO ai_model_io_log (
-                            user_id,
-                            provider,
-                            model_name,
-                            purpose,
-                            request_text_full,
-                            response_text_full,
-                            error_text,
-                            status,
-                            response_time_ms,
-                            created_at
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                        """,
-                        (
-                            user_id,
-                            self.name,
-                            model_name[:64],
-                            str(purpose or "response")[:64],
-                            safe_request,
-                            safe_response,
-                            safe_error,
-                            str(status or "ok")[:32],
-                            response_time_ms,
-                        ),
-                    )
-        except Exception as exc:
-            logger.warning("Ошибка записи в ai_model_io_log: %s", exc)
+        created_at: Optional[datetime] = None,
+    ) -> Tuple[Any, ...]:
+        """Подготовить параметры INSERT в ai_model_io_log с маскированием PII."""
+        return (
+            user_id,
+            self.name,
+            model_name[:64],
+            str(purpose or "response")[:64],
+            self._truncate_db_text(mask_sensitive_data(request_text)),
+            self._truncate_db_text(mask_sensitive_data(response_text)),
+            self._truncate_db_text(mask_sensitive_data(error_text), max_chars=50_000),
+            str(status or "ok")[:32],
+            response_time_ms,
+            created_at or datetime.now(),
+        )
 
     @staticmethod
     def _is_model_io_logging_enabled() -> bool:
@@ -1017,6 +1282,8 @@ class GigaChatProvider(LLMProvider):
         verify_ssl_certs: Optional[bool] = None,
         ca_bundle_file: Optional[str] = None,
         max_retries: Optional[int] = None,
+        base_url: Optional[str] = None,
+        auth_url: Optional[str] = None,
     ):
         """
         Инициализация GigaChat-провайдера.
@@ -1029,6 +1296,8 @@ class GigaChatProvider(LLMProvider):
             verify_ssl_certs: Проверять ли SSL (по умолчанию из настроек).
             ca_bundle_file: Путь к CA-сертификату (по умолчанию из настроек).
             max_retries: Число повторных попыток (по умолчанию из настроек).
+            base_url: Адрес API (по умолчанию — из SDK/окружения).
+            auth_url: Адрес OAuth (по умолчанию — из SDK/окружения).
         """
         self._credentials = credentials or ai_settings.GIGACHAT_CREDENTIALS
         self._scope = scope or ai_settings.GIGACHAT_SCOPE
@@ -1040,6 +1309,8 @@ class GigaChatProvider(LLMProvider):
         )
         self._ca_bundle_file = ca_bundle_file or ai_settings.GIGACHAT_CA_BUNDLE_FILE or None
         self._max_retries = max_retries if max_retries is not None else ai_settings.GIGACHAT_MAX_RETRIES
+        self._base_url = base_url
+        self._auth_url = auth_url
 
         if not self._credentials:
             logger.warning("GigaChat credentials не заданы. GigaChat-провайдер будет недоступен.")
@@ -1056,6 +1327,10 @@ class GigaChatProvider(LLMProvider):
         }
         if self._ca_bundle_file:
             kwargs["ca_bundle_file"] = self._ca_bundle_file
+        if self._base_url:
+            kwargs["base_url"] = self._base_url
+        if self._auth_url:
+            kwargs["auth_url"] = self._auth_url
         return kwargs
 
     @staticmethod
@@ -1162,11 +1437,11 @@ class GigaChatProvider(LLMProvider):
         if not self._credentials:
             return False
         try:
-            from gigachat import GigaChat
-
-            with GigaChat(**self._create_client_kwargs()) as client:
-                models = client.get_models()
-                return bool(models and models.data)
+            models = await get_gigachat_client_pool().run(
+                self._create_client_kwargs(),
+                lambda client: client.get_models(),
+            )
+            return bool(models and models.data)
         except Exception as exc:
             logger.warning("GigaChat health check failed: %s", exc)
             return False
@@ -1207,8 +1482,9 @@ class GigaChatProvider(LLMProvider):
         )
 
         try:
-            result = await asyncio.to_thread(
-                self._describe_image_sync, image_path, prompt
+            result = await get_gigachat_client_pool().run(
+                self._create_client_kwargs(),
+                functools.partial(self._describe_image_sync, image_path=image_path, prompt=prompt),
             )
             logger.info(
                 "GigaChat describe_image success: path=%s result_length=%d",
@@ -1227,39 +1503,36 @@ class GigaChatProvider(LLMProvider):
                 f"Ошибка описания изображения через GigaChat: {self._format_gigachat_error(exc)}"
             ) from exc
 
-    def _describe_image_sync(self, image_path: str, prompt: str) -> str:
-        """Синхронная обёртка описания изображения через GigaChat SDK."""
-        from gigachat import GigaChat
-
-        with GigaChat(**self._create_client_kwargs()) as client:
-            # Загрузить изображение в хранилище GigaChat
-            with open(image_path, "rb") as f:
-                uploaded = client.upload_file(f, purpose="general")
-
-            file_id = self._extract_uploaded_file_id(uploaded)
-            logger.debug("GigaChat file uploaded: id=%s", file_id)
-
-            # Отправить запрос с attachment
-            result = client.chat({
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt,
-                        "attachments": [file_id],
-                    }
-                ],
-                "temperature": 0.1,
-            })
-
-            content = result.choices[0].message.content
-
-            # Удалить файл из хранилища после использования
-            try:
-                client.delete_file(file_id)
-            except Exception as del_exc:
-                logger.warning("Не удалось удалить файл из GigaChat: %s", del_exc)
+    def _describe_image_sync(self, client: Any, image_path: str, prompt: str) -> str:
+        """Синхронное описание изображения на клиенте GigaChat SDK из пула."""
+        # Загрузить изображение в хранилище GigaChat
+        with open(image_path, "rb") as f:
+            uploaded = client.upload_file(f, purpose="general")
+
+        file_id = self._extract_uploaded_file_id(uploaded)
+        logger.debug("GigaChat file uploaded: id=%s", file_id)
+
+        # Отправить запрос с attachment
+        result = client.chat({
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt,
+                    "attachments": [file_id],
+                }
+            ],
+            "temperature": 0.1,
+        })
+
+        content = result.choices[0].message.content
+
+        # Удалить файл из хранилища после использования
+        try:
+            client.delete_file(file_id)
+        except Exception as del_exc:
+            logger.warning("Не удалось удалить файл из GigaChat: %s", del_exc)
 
-            return content
+        return content
 
     @staticmethod
     def _extract_uploaded_file_id(uploaded: Any) -> str:
@@ -1304,7 +1577,6 @@ class GigaChatProvider(LLMProvider):
         Returns:
             Текстовый контент ответа.
         """
-        from gigachat import GigaChat
         from gigachat.models import Chat, Messages, MessagesRole
 
         client_kwargs = self._create_client_kwargs()
@@ -1330,8 +1602,9 @@ class GigaChatProvider(LLMProvider):
         request_text = json.dumps(messages, ensure_ascii=False)
 
         try:
-            result = await asyncio.to_thread(
-                self._call_gigachat_sync, client_kwargs, chat_request
+            result = await get_gigachat_client_pool().run(
+                client_kwargs,
+                functools.partial(self._call_gigachat_sync, chat_request=chat_request),
             )
         except Exception as exc:
             logger.error(
@@ -1346,14 +1619,11 @@ class GigaChatProvider(LLMProvider):
         return result
 
     @staticmethod
-    def _call_gigachat_sync(client_kwargs: Dict[str, Any], chat_request: Any) -> str:
-        """Синхронный вызов GigaChat API."""
-        from gigachat import GigaChat
-
-        with GigaChat(**client_kwargs) as client:
-            response = client.chat(chat_request)
-            content = response.choices[0].message.content
-            return content or ""
+    def _call_gigachat_sync(client: Any, chat_request: Any) -> str:
+        """Синхронный вызов GigaChat API на клиенте из пула."""
+        response = client.chat(chat_request)
+        content = response.choices[0].message.content
+        return content or ""
 
 
 # =============================================
@@ -0,0 +1,349 @@
+"""
+rag_lexical_index.py — in-process инвертированный индекс чанков RAG.
+
+Хранит postings (токен → чанк → TF), длины чанков и document frequency,
+чтобы lexical retrieval не перечитывал таблицу ``rag_chunks`` и не
+токенизировал весь корпус на каждый вопрос.
+
+Индекс привязан к версии корпуса (``rag_corpus_version``) и сигнатуре
+токенизатора. Полная перестройка выполняется один раз на версию, а
+изменения, сделанные текущим процессом (ingest, смена статуса, удаление),
+применяются инкрементально.
+
+BM25-scoring воспроизводит формулу ``rank_bm25.BM25Okapi`` (включая
+epsilon-floor для отрицательного IDF), но обходит только postings
+токенов запроса.
+"""
+
+import logging
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from src.core.ai.bm25_engine import BM25_EPSILON, EMPTY_DOCUMENT_TOKEN
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexedChunk:
+    """Чанк, загруженный в lexical-индекс."""
+
+    chunk_id: int
+    document_id: int
+    chunk_index: int
+    filename: str
+    chunk_text: str
+    length: int
+
+
+@dataclass(frozen=True)
+class IndexedChunkInput:
+    """Входные данные чанка для загрузки в индекс."""
+
+    chunk_id: int
+    document_id: int
+    chunk_index: int
+    filename: str
+    chunk_text: str
+    tokens: Sequence[str]
+
+
+class RagLexicalIndex:
+    """
+    Потокобезопасный инвертированный индекс активных чанков RAG.
+
+    Индекс считается актуальным, пока его версия и сигнатура токенизатора
+    совпадают с текущими значениями корпуса. Любое расхождение в
+    инкрементальном обновлении переводит индекс в состояние «не готов»,
+    и следующий запрос выполняет полную перестройку.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._version: int = -1
+        self._signature: str = ""
+        self._chunks: Dict[int, IndexedChunk] = {}
+        self._document_chunk_ids: Dict[int, List[int]] = {}
+        # document_id → (токен → число чанков документа с этим токеном)
+        self._document_term_counts: Dict[int, Counter] = {}
+        self._document_lengths: Dict[int, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length: int = 0
+        self._global_average_idf: Optional[float] = None
+
+    @property
+    def version(self) -> int:
+        """Версия корпуса, которую отражает индекс (-1 — индекс не готов)."""
+        return self._version
+
+    def is_current(self, version: int, signature: str) -> bool:
+        """Проверить, соответствует ли индекс версии корпуса и токенизатору."""
+        with self._lock:
+            return self._version >= 0 and self._version == version and self._signature == signature
+
+    def invalidate(self) -> None:
+        """Пометить индекс устаревшим: следующий запрос выполнит перестройку."""
+        with self._lock:
+            self._version = -1
+
+    def replace(self, version: int, signature: str, chunks: Iterable[IndexedChunkInput]) -> None:
+        """Полностью перестроить индекс из переданных чанков."""
+        with self._lock:
+            self._clear()
+            for chunk in chunks:
+                self._add_chunk(chunk)
+            self._version = int(version)
+            self._signature = signature
+            self._global_average_idf = None
+
+    def patch_document(
+        self,
+        document_id: int,
+        chunks: Iterable[IndexedChunkInput],
+        previous_version: int,
+        new_version: int,
+    ) -> bool:
+        """Заменить чанки документа, если индекс находится на ожидаемой версии.
+
+        Returns:
+            True, если обновление применено; False, если индекс рассинхронизирован
+            и помечен устаревшим.
+        """
+        with self._lock:
+            if not self._can_advance(previous_version, new_version):
+                return False
+            self._remove_document(int(document_id))
+            for chunk in chunks:
+                self._add_chunk(chunk)
+            self._version = int(new_version)
+            self._global_average_idf = None
+            return True
+
+    def drop_document(self, document_id: int, previous_version: int, new_version: int) -> bool:
+        """Удалить документ из индекса, если индекс находится на ожидаемой версии."""
+        with self._lock:
+            if not self._can_advance(previous_version, new_version):
+                return False
+            self._remove_document(int(document_id))
+            self._version = int(new_version)
+            self._global_average_idf = None
+            return True
+
+    def iter_chunks(self, document_ids: Optional[Iterable[int]] = None) -> Iterator[IndexedChunk]:
+        """Перечислить чанки индекса (всех документов или только заданных)."""
+        with self._lock:
+            if document_ids is None:
+                chunks = list(self._chunks.values())
+            else:
+                chunks = [
+                    self._chunks[chunk_id]
+                    for document_id in dict.fromkeys(int(doc_id) for doc_id in document_ids)
+                    for chunk_id in self._document_chunk_ids.get(document_id, [])
+                ]
+        return iter(chunks)
+
+    def get_chunk(self, chunk_id: int) -> Optional[IndexedChunk]:
+        """Получить чанк по идентификатору."""
+        with self._lock:
+            return self._chunks.get(int(chunk_id))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Вернуть размеры индекса для диагностики."""
+        with self._lock:
+            return {
+                "version": self._version,
+                "chunks": len(self._chunks),
+                "documents": len(self._document_chunk_ids),
+                "terms": len(self._postings),
+                "total_length": self._total_length,
+            }
+
+    def score_bm25(
+        self,
+        query_tokens: Sequence[str],
+        k1: float,
+        b: float,
+        document_ids: Optional[Iterable[int]] = None,
+    ) -> Dict[int, float]:
+        """Вычислить BM25-score чанков, содержащих хотя бы один токен запроса.
+
+        Статистики (N, avgdl, df, average IDF) считаются по области поиска:
+        по всему индексу или по чанкам заданных документов — так же, как
+        BM25Okapi, построенный по соответствующей выборке чанков.
+
+        Returns:
+            Словарь chunk_id → score (только положительные значения).
+        """
+        if not query_tokens:
+            return {}
+
+        with self._lock:
+            scope: Optional[Set[int]] = None
+            if document_ids is not None:
+                scope = {int(doc_id) for doc_id in document_ids if int(doc_id) in self._document_chunk_ids}
+                corpus_size = sum(len(self._document_chunk_ids[doc_id]) for doc_id in scope)
+                total_length = sum(self._document_lengths.get(doc_id, 0) for doc_id in scope)
+            else:
+                corpus_size = len(self._chunks)
+                total_length = self._total_length
+
+            if corpus_size <= 0:
+                return {}
+
+            avgdl = total_length / corpus_size
+            idf_by_token: Dict[str, float] = {}
+            has_negative_idf = False
+            for token in dict.fromkeys(query_tokens):
+                doc_freq = self._scoped_doc_freq(token, scope)
+                if doc_freq <= 0:
+                    continue
+                idf = math.log(corpus_size - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+                idf_by_token[token] = idf
+                has_negative_idf = has_negative_idf or idf < 0
+
+            if has_negative_idf:
+                eps = BM25_EPSILON * self._average_idf(scope, corpus_size)
+                for token, idf in list(idf_by_token.items()):
+                    if idf < 0:
+                        idf_by_token[token] = eps
+
+            scores: Dict[int, float] = {}
+            for token in query_tokens:
+                idf = idf_by_token.get(token)
+                if idf is None:
+                    continue
+                for chunk_id, freq in self._postings.get(token, {}).items():
+                    chunk = self._chunks[chunk_id]
+                    if scope is not None and chunk.document_id not in scope:
+                        continue
+                    denominator = freq + k1 * (1 - b + b * chunk.length / avgdl)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * (freq * (k1 + 1) / denominator)
+
+        return {chunk_id: score for chunk_id, score in scores.items() if score > 0}
+
+    def _scoped_doc_freq(self, token: str, scope: Optional[Set[int]]) -> int:
+        """Document frequency токена в области поиска."""
+        if scope is None:
+            return len(self._postings.get(token, {}))
+        return sum(self._document_term_counts[doc_id].get(token, 0) for doc_id in scope)
+
+    def _average_idf(self, scope: Optional[Set[int]], corpus_size: int) -> float:
+        """Средний IDF словаря области поиска (база epsilon-floor BM25Okapi)."""
+        if scope is None:
+            if self._global_average_idf is None:
+                self._global_average_idf = self._mean_idf(
+                    (len(postings) for postings in self._postings.values()),
+                    corpus_size,
+                )
+            return self._global_average_idf
+
+        scoped_doc_freq: Counter = Counter()
+        for doc_id in scope:
+            scoped_doc_freq.update(self._document_term_counts[doc_id])
+        return self._mean_idf(scoped_doc_freq.values(), corpus_size)
+
+    @staticmethod
+    def _mean_idf(doc_freqs: Iterable[int], corpus_size: int) -> float:
+        idf_sum = 0.0
+        terms = 0
+        for doc_freq in doc_freqs:
+            idf_sum += math.log(corpus_size - doc_freq + 0.5) - math.log(doc_freq + 0.5)
+            terms += 1
+        return idf_sum / terms if terms else 0.0
+
+    def _can_advance(self, previous_version: int, new_version: int) -> bool:
+        """Проверить, что инкрементальное обновление продолжает текущую версию."""
+        if self._version < 0:
+            return False
+        if self._version != int(previous_version):
+            logger.info(
+                "RAG lexical index out of sync: index_version=%s expected=%s new=%s, full rebuild scheduled",
+                self._version,
+                previous_version,
+                new_version,
+            )
+            self._version = -1
+            return False
+        return True
+
+    def _clear(self) -> None:
+        self._chunks = {}
+        self._document_chunk_ids = {}
+        self._document_term_counts = {}
+        self._document_lengths = {}
+        self._postings = {}
+        self._total_length = 0
+
+    def _add_chunk(self, chunk: IndexedChunkInput) -> None:
+        tokens = list(chunk.tokens) or [EMPTY_DOCUMENT_TOKEN]
+        chunk_id = int(chunk.chunk_id)
+        document_id = int(chunk.document_id)
+        if chunk_id in self._chunks:
+            self._remove_chunk(chunk_id)
+
+        self._chunks[chunk_id] = IndexedChunk(
+            chunk_id=chunk_id,
+            document_id=document_id,
+            chunk_index=int(chunk.chunk_index),
+            filename=chunk.filename,
+            chunk_text=chunk.chunk_text,
+            length=len(tokens),
+        )
+        self._document_chunk_ids.setdefault(document_id, []).append(chunk_id)
+        self._document_lengths[document_id] = self._document_lengths.get(document_id, 0) + len(tokens)
+        self._total_length += len(tokens)
+
+        term_counts = self._document_term_counts.setdefault(document_id, Counter())
+        for token, freq in Counter(tokens).items():
+            self._postings.setdefault(token, {})[chunk_id] = freq
+            term_counts[token] += 1
+
+    def _remove_chunk(self, chunk_id: int) -> None:
+        chunk = self._chunks.pop(chunk_id, None)
+        if chunk is None:
+            return
+
+        document_id = chunk.document_id
+        chunk_ids = self._document_chunk_ids.get(document_id, [])
+        if chunk_id in chunk_ids:
+            chunk_ids.remove(chunk_id)
+        self._document_lengths[document_id] = self._document_lengths.get(document_id, 0) - chunk.length
+        self._total_length -= chunk.length
+
+        term_counts = self._document_term_counts.get(document_id, Counter())
+        for token in list(term_counts):
+            postings = self._postings.get(token)
+            if not postings or chunk_id not in postings:
+                continue
+            del postings[chunk_id]
+            if not postings:
+                del self._postings[token]
+            term_counts[token] -= 1
+            if term_counts[token] <= 0:
+                del term_counts[token]
+
+        if not chunk_ids:
+            self._document_chunk_ids.pop(document_id, None)
+            self._document_lengths.pop(document_id, None)
+            self._document_term_counts.pop(document_id, None)
+
+    def _remove_document(self, document_id: int) -> None:
+        chunk_ids = self._document_chunk_ids.pop(document_id, [])
+        term_counts = self._document_term_counts.pop(document_id, Counter())
+        for token in term_counts:
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            for chunk_id in chunk_ids:
+                postings.pop(chunk_id, None)
+            if not postings:
+                del self._postings[token]
+
+        for chunk_id in chunk_ids:
+            chunk = self._chunks.pop(chunk_id, None)
+            if chunk is not None:
+                self._total_length -= chunk.length
+        self._document_lengths.pop(document_id, None)
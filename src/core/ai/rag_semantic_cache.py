@@ -0,0 +1,286 @@
+"""
+rag_semantic_cache.py — семантический кэш RAG-ответов по эмбеддингу вопроса.
+
+Точный кэш ответов (``RagKnowledgeService._answer_cache``) срабатывает только
+при совпадении нормализованной строки вопроса, а один и тот же вопрос
+техники формулируют по-разному. Семантический кэш хранит эмбеддинги уже
+отвеченных вопросов и отдаёт сохранённый ответ для ближайшего соседа,
+если косинусное сходство не ниже порога.
+
+- Записи разбиты на разделы (версия корпуса, подсказка категории):
+  ответ не переиспользуется между версиями корпуса и категориями.
+- Токены с цифрами (коды ошибок, номера, версии) должны совпадать точно:
+  у «ошибка 4040» и «ошибка 4041» сходство эмбеддингов выше порога,
+  но ответы разные.
+- ``invalidate`` удаляет записи устаревших версий (вызывается при
+  ``_bump_corpus_version``); записи чужих версий также не находятся поиском.
+- Размер ограничен числом записей (LRU), записи живут TTL.
+- Счётчики: попадания/промахи и сэкономленные LLM-вызовы.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, FrozenSet, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+V = TypeVar("V")
+
+PartitionKey = Tuple[int, str]
+
+_CODE_TOKEN_RE = re.compile(r"[\w.-]*\d[\w.-]*")
+
+
+@dataclass
+class _SemanticEntry(Generic[V]):
+    """Запись: нормированный эмбеддинг вопроса, ответ и его стоимость в LLM-вызовах."""
+
+    partition: PartitionKey
+    vector: np.ndarray
+    question: str
+    code_tokens: FrozenSet[str]
+    value: V
+    llm_calls: int
+
+
+@dataclass
+class SemanticCacheHit(Generic[V]):
+    """Результат поиска: сохранённый ответ, сходство и исходный вопрос."""
+
+    value: V
+    similarity: float
+    question: str
+
+
+class _Partition:
+    """Записи одного раздела и кэшированная матрица их векторов."""
+
+    def __init__(self) -> None:
+        self.entry_ids: List[int] = []
+        self.matrix: Optional[np.ndarray] = None
+
+    def add(self, entry_id: int) -> None:
+        self.entry_ids.append(entry_id)
+        self.matrix = None
+
+    def remove(self, entry_id: int) -> None:
+        self.entry_ids.remove(entry_id)
+        self.matrix = None
+
+
+class SemanticAnswerCache(Generic[V]):
+    """
+    Кэш ответов с поиском ближайшего вопроса по косинусному сходству.
+
+    Args:
+        max_entries: Максимум записей (вытесняются давно не использованные).
+        similarity_threshold: Минимальное косинусное сходство для попадания.
+        ttl_seconds: Время жизни записи.
+        name: Имя кэша в статистике.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        similarity_threshold: float,
+        ttl_seconds: float,
+        name: str = "rag_semantic_answer",
+    ) -> None:
+        self.name = name
+        self._max_entries = max(1, int(max_entries))
+        self._threshold = float(similarity_threshold)
+        self._ttl_seconds = max(0.0, float(ttl_seconds))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _SemanticEntry[V]]" = OrderedDict()
+        self._partitions: Dict[PartitionKey, _Partition] = {}
+        self._expiry_queue: Deque[Tuple[float, int]] = deque()
+        self._next_id = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._saved_llm_calls = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    @property
+    def similarity_threshold(self) -> float:
+        """Порог косинусного сходства."""
+        return self._threshold
+
+    @staticmethod
+    def partition_key(corpus_version: int, category_hint: Optional[str]) -> PartitionKey:
+        """Ключ раздела: версия корпуса и нормализованная подсказка категории."""
+        return int(corpus_version), str(category_hint or "").strip().lower()
+
+    def lookup(
+        self,
+        vector: Sequence[float],
+        corpus_version: int,
+        category_hint: Optional[str] = None,
+        question: Optional[str] = None,
+    ) -> Optional[SemanticCacheHit[V]]:
+        """
+        Найти ответ на ближайший сохранённый вопрос раздела (None — промах).
+
+        Если передан ``question``, подходят только записи с теми же
+        токенами-кодами (см. ``extract_code_tokens``).
+        """
+        query = _normalize(vector)
+        query_tokens = extract_code_tokens(question) if question is not None else None
+        partition_key = self.partition_key(corpus_version, category_hint)
+        with self._lock:
+            self._purge_expired_locked(time.monotonic())
+            partition = self._partitions.get(partition_key)
+            if query is None or partition is None or not partition.entry_ids:
+                self._misses += 1
+                return None
+            if partition.matrix is None:
+                partition.matrix = np.stack([self._entries[entry_id].vector for entry_id in partition.entry_ids])
+            similarities = partition.matrix @ query
+            entry_id, similarity = self._best_match_locked(partition, similarities, query_tokens)
+            if entry_id is None:
+                self._misses += 1
+                return None
+            entry = self._entries[entry_id]
+            self._entries.move_to_end(entry_id)
+            self._hits += 1
+            self._saved_llm_calls += entry.llm_calls
+            return SemanticCacheHit(value=entry.value, similarity=similarity, question=entry.question)
+
+    def put(
+        self,
+        vector: Sequence[float],
+        corpus_version: int,
+        category_hint: Optional[str],
+        question: str,
+        value: V,
+        llm_calls: int = 1,
+    ) -> None:
+        """Сохранить ответ на вопрос (llm_calls — сколько LLM-вызовов сэкономит попадание)."""
+        normalized = _normalize(vector)
+        if normalized is None:
+            return
+        partition_key = self.partition_key(corpus_version, category_hint)
+        with self._lock:
+            now = time.monotonic()
+            self._purge_expired_locked(now)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _SemanticEntry(
+                partition=partition_key,
+                vector=normalized,
+                question=question,
+                code_tokens=extract_code_tokens(question),
+                value=value,
+                llm_calls=max(0, int(llm_calls)),
+            )
+            self._partitions.setdefault(partition_key, _Partition()).add(entry_id)
+            self._expiry_queue.append((now + self._ttl_seconds, entry_id))
+            while len(self._entries) > self._max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove_locked(oldest_id)
+                self._evictions += 1
+
+    def invalidate(self, current_corpus_version: Optional[int] = None) -> int:
+        """
+        Удалить записи версий корпуса раньше ``current_corpus_version``.
+
+        Args:
+            current_corpus_version: Актуальная версия (None — удалить всё).
+
+        Returns:
+            Число удалённых записей.
+        """
+        with self._lock:
+            stale = [
+                entry_id
+                for entry_id, entry in self._entries.items()
+                if current_corpus_version is None or entry.partition[0] < int(current_corpus_version)
+            ]
+            for entry_id in stale:
+                self._remove_locked(entry_id)
+            if stale:
+                self._invalidations += 1
+            return len(stale)
+
+    def clear(self) -> None:
+        """Удалить все записи."""
+        self.invalidate(None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Вернуть счётчики и заполненность кэша."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "partitions": len(self._partitions),
+                "max_entries": self._max_entries,
+                "similarity_threshold": self._threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "saved_llm_calls": self._saved_llm_calls,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def _best_match_locked(
+        self,
+        partition: _Partition,
+        similarities: np.ndarray,
+        query_tokens: Optional[FrozenSet[str]],
+    ) -> Tuple[Optional[int], float]:
+        """Ближайшая запись не ниже порога с теми же токенами-кодами."""
+        if query_tokens is None:
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            return (partition.entry_ids[best], similarity) if similarity >= self._threshold else (None, 0.0)
+        candidates = np.flatnonzero(similarities >= self._threshold)
+        for position in candidates[np.argsort(-similarities[candidates], kind="stable")]:
+            entry_id = partition.entry_ids[int(position)]
+            if self._entries[entry_id].code_tokens == query_tokens:
+                return entry_id, float(similarities[position])
+        return None, 0.0
+
+    def _remove_locked(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        partition = self._partitions.get(entry.partition)
+        if partition is not None:
+            partition.remove(entry_id)
+            if not partition.entry_ids:
+                del self._partitions[entry.partition]
+
+    def _purge_expired_locked(self, now: float) -> None:
+        # TTL у всех записей одинаковый, поэтому очередь вставки упорядочена
+        # по времени истечения: снимаем с головы только просроченные.
+        queue = self._expiry_queue
+        while queue and queue[0][0] <= now:
+            _, entry_id = queue.popleft()
+            if entry_id in self._entries:
+                self._remove_locked(entry_id)
+                self._expirations += 1
+
+
+def extract_code_tokens(text: Optional[str]) -> FrozenSet[str]:
+    """Токены с цифрами (коды, номера, версии) в нижнем регистре."""
+    return frozenset(token.strip(".-") for token in _CODE_TOKEN_RE.findall(str(text or "").lower()))
+
+
+def _normalize(vector: Sequence[float]) -> Optional[np.ndarray]:
+    array = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(array))
+    if array.size == 0 or norm == 0.0:
+        return None
+    return array / norm
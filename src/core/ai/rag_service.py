@@ -17,13 +17,16 @@ import json
 import logging
 import re
 import asyncio
-import math
 import sys
+import threading
 import time
 from collections import Counter
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import datetime
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
 
+import numpy as np
+
 import src.common.database as database
 
 from config import ai_settings
@@ -40,6 +43,12 @@ from src.core.ai.prompts import (
     build_rag_summary_prompt,
     build_spellcheck_prompt,
 )
+from src.core.ai.bm25_engine import SparseBM25Index
+from src.core.ai.db_log_sink import submit_db_log
+from src.core.ai.rag_lexical_index import IndexedChunkInput, RagLexicalIndex
+from src.core.ai.rag_semantic_cache import SemanticAnswerCache
+from src.core.ai.retrieval_executor import encode_texts_off_loop, run_retrieval_io
+from src.core.ai.ttl_lru_cache import TTLLRUCache
 from src.core.ai.vector_search import (
     LocalEmbeddingProvider,
     LocalVectorIndex,
@@ -47,11 +56,6 @@ from src.core.ai.vector_search import (
 
 logger = logging.getLogger(__name__)
 
-try:
-    from rank_bm25 import BM25Okapi
-except Exception:
-    BM25Okapi = None
-
 try:
     from symspellpy import SymSpell, Verbosity as _SymSpellVerbosity  # type: ignore[import-untyped]
 except Exception:
@@ -188,7 +192,6 @@ _QUERY_STRIP_PATTERNS: list[re.Pattern[str]] = [
         re.IGNORECASE,
     ),
 ]
-_RAG_CHUNK_SCAN_LIMIT = 6000 
 _RAG_SUMMARY_SCAN_LIMIT = 6000
 _RAG_EMBEDDING_UPSERT_BATCH_SIZE = 25
 _RAG_EMBEDDING_UPSERT_MAX_RETRIES = 3
@@ -196,6 +199,10 @@ _RAG_EMBEDDING_RETRY_BASE_DELAY_SECONDS = 0.25
 _MYSQL_RETRYABLE_ERRNOS = {1205, 1213}
 _RAG_DB_OPERATION_MAX_RETRIES = 3
 _RAG_DB_OPERATION_RETRY_BASE_DELAY_SECONDS = 0.25
+# ER_NO_SUCH_TABLE / ER_BAD_FIELD_ERROR: схема хранилища токенов не развёрнута.
+_MYSQL_TOKEN_STORAGE_MISSING_ERRNOS = {1146, 1054}
+_RAG_TOKEN_STORAGE_RETRY_BASE_DELAY_SECONDS = 1.0
+_RAG_TOKEN_STORAGE_RETRY_MAX_DELAY_SECONDS = 300.0
 _SPACES_RE = re.compile(r"\s+")
 _RAG_SOURCE_TYPE_CERTIFICATION = "certification"
 _RAG_CERTIFICATION_SOURCE_URL_PREFIX = "certification://question/"
@@ -207,10 +214,9 @@ TResult = TypeVar("TResult")
 
 @dataclass
 class CachedAnswer:
-    """Элемент TTL-кэша ответа RAG."""
+    """Элемент TTL-кэша ответа RAG (TTL хранится в самом кэше)."""
 
     answer: str
-    expires_at: float
     is_fallback: bool = False
 
 
@@ -222,59 +228,95 @@ class RagAnswer:
     is_fallback: bool = False
 
 
+@dataclass(frozen=True)
+class _SummaryCorpus:
+    """Снимок активных summary одной версии корпуса (и сигнатуры токенизатора).
+
+    Строится один раз на версию и публикуется одним присваиванием; BM25-индекс
+    и матрица эмбеддингов достраиваются лениво новым снимком через ``replace``.
+    """
+
+    key: Tuple[int, str]
+    # (document_id, filename, summary_text, source_type)
+    rows: List[Tuple[int, str, str, str]]
+    tokens: List[List[str]]
+    bm25_index: Optional[SparseBM25Index] = None
+    # Эмбеддинги summary построчно (len(rows) × dim), для fallback vector-score
+    embedding_matrix: Optional[np.ndarray] = None
+
+
 class RagKnowledgeService:
     """Сервис работы с базой знаний RAG."""
 
     def __init__(self, cache_ttl_seconds: int = ai_settings.AI_RAG_CACHE_TTL_SECONDS):
         self._cache_ttl_seconds = cache_ttl_seconds
-        self._answer_cache: Dict[str, CachedAnswer] = {}
+        self._answer_cache: TTLLRUCache[str, CachedAnswer] = TTLLRUCache(
+            ai_settings.AI_RAG_CACHE_MAX_ENTRIES,
+            max_bytes=int(float(ai_settings.AI_RAG_CACHE_MAX_MB) * 1024 * 1024),
+            default_ttl_seconds=cache_ttl_seconds,
+            name="rag_answer",
+        )
+        self._semantic_answer_cache: SemanticAnswerCache[CachedAnswer] = SemanticAnswerCache(
+            ai_settings.AI_RAG_SEMANTIC_CACHE_MAX_ENTRIES,
+            similarity_threshold=ai_settings.AI_RAG_SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=cache_ttl_seconds,
+        )
         self._embedding_provider: Optional[LocalEmbeddingProvider] = None
         self._vector_index: Optional[LocalVectorIndex] = None
-        self._summary_embedding_cache: Dict[int, List[float]] = {}
-        self._summary_embedding_corpus_version: int = -1
         self._summary_vector_prefilter_source: str = "disabled"
         self._summary_vector_prefilter_hits: int = 0
-        self._hyde_cache: Dict[str, Tuple[str, float]] = {}
+        self._lexical_index = RagLexicalIndex()
+        self._lexical_index_build_lock = threading.Lock()
+        self._summary_corpus: Optional[_SummaryCorpus] = None
+        self._summary_corpus_lock = threading.Lock()
+        self._hyde_cache: TTLLRUCache[str, str] = TTLLRUCache(
+            ai_settings.AI_RAG_HYDE_CACHE_MAX_ENTRIES,
+            name="rag_hyde",
+        )
         self._ru_morph_analyzer: Optional[object] = None
         self._ru_stemmer: Optional[object] = None
-        self._normalized_token_cache: Dict[str, str] = {}
+        self._normalized_token_cache: TTLLRUCache[str, str] = TTLLRUCache(
+            ai_settings.AI_RAG_TOKEN_CACHE_MAX_ENTRIES,
+            name="rag_normalized_token",
+        )
         self._normalization_dependency_warning_logged: bool = False
         self._document_signals_table_warning_logged: bool = False
+        self._token_storage_available: bool = True
+        self._token_storage_warning_logged: bool = False
+        self._token_storage_failures: int = 0
+        self._token_storage_retry_at: float = 0.0
         self._certification_categories_cache: List[Tuple[str, str]] = []
         self._certification_categories_cache_expires_at: float = 0.0
         # Spell-correction state
         self._spellcheck_sym: Optional[object] = None  # SymSpell instance
         self._spellcheck_vocab_size: int = 0
         self._spellcheck_vocab_ready: bool = False
-        self._spellcheck_llm_cache: Dict[str, Tuple[str, List[Tuple[str, str]], float]] = {}
+        self._spellcheck_llm_cache: TTLLRUCache[str, Tuple[str, List[Tuple[str, str]]]] = TTLLRUCache(
+            ai_settings.AI_RAG_SPELLCHECK_LLM_CACHE_MAX_ENTRIES,
+            name="rag_spellcheck_llm",
+        )
 
     def _get_cached_hyde_text(self, question: str) -> Optional[str]:
         """Получить HyDE-текст из кэша, если он не истёк.
 
         Возвращает ``None``, если запись отсутствует или TTL истёк.
-        Очищает до 20 просроченных записей за вызов.
         """
-        now = time.time()
-        cached = self._hyde_cache.get(question)
-        if cached is not None:
-            hyde_text, expires_at = cached
-            if expires_at > now:
-                return hyde_text
-            del self._hyde_cache[question]
-
-        # Ленивая очистка просроченных записей
-        expired_keys = [
-            k for k, (_, exp) in self._hyde_cache.items() if exp <= now
-        ]
-        for key in expired_keys[:20]:
-            self._hyde_cache.pop(key, None)
-
-        return None
+        return self._hyde_cache.get(question)
 
     def _cache_hyde_text(self, question: str, hyde_text: str) -> None:
         """Сохранить HyDE-текст в кэш с TTL."""
         ttl = max(1, int(ai_settings.AI_RAG_HYDE_CACHE_TTL_SECONDS))
-        self._hyde_cache[question] = (hyde_text, time.time() + ttl)
+        self._hyde_cache.put(question, hyde_text, ttl_seconds=ttl)
+
+    def get_cache_stats(self) -> List[Dict[str, Any]]:
+        """Вернуть статистику кэшей сервиса (ответы, семантический кэш, HyDE, spellcheck, токены)."""
+        return [
+            self._answer_cache.stats(),
+            self._semantic_answer_cache.stats(),
+            self._hyde_cache.stats(),
+            self._spellcheck_llm_cache.stats(),
+            self._normalized_token_cache.stats(),
+        ]
 
     @staticmethod
     def is_supported_file(filename: str) -> bool:
@@ -459,10 +501,12 @@ class RagKnowledgeService:
         content_hash = hashlib.sha256(payload).hexdigest()
 
         _reactivated_document_id: Optional[int] = None
+        _reactivated_corpus_version: Optional[int] = None
 
         def _find_or_reactivate_existing_document() -> Optional[Dict[str, int]]:
-            nonlocal _reactivated_document_id
+            nonlocal _reactivated_document_id, _reactivated_corpus_version
             _reactivated_document_id = None
+            _reactivated_corpus_version = None
             with database.get_db_connection() as conn:
                 with database.get_cursor(conn) as cursor:
                     cursor.execute(
@@ -495,7 +539,7 @@ class RagKnowledgeService:
                             """,
                             (filename, source_type, source_url, uploaded_by, existing_id),
                         )
-                        self._bump_corpus_version(
+                        _reactivated_corpus_version = self._bump_corpus_version(
                             cursor,
                             f"reactivate:{existing_id}:{uploaded_by}:{filename}",
                         )
@@ -527,8 +571,13 @@ class RagKnowledgeService:
         )
         if existing_result:
             if _reactivated_document_id is not None:
+                self._apply_document_change_to_lexical_index(
+                    _reactivated_document_id,
+                    _reactivated_corpus_version,
+                    is_active=True,
+                )
                 self._set_vector_document_status(_reactivated_document_id, "active")
-                self._clear_expired_cache()
+                self._clear_expired_cache(_reactivated_corpus_version)
             return existing_result
 
         if self._is_html_file(filename):
@@ -559,7 +608,11 @@ class RagKnowledgeService:
                 source_type=source_type,
             )
 
-        def _insert_document_and_chunks() -> Tuple[int, List[Dict[str, object]]]:
+        # Токены считаются один раз при ingest: они сохраняются в rag_chunk_tokens
+        # и сразу используются для инкрементального обновления lexical-индекса.
+        chunk_tokens = [self._tokenize(chunk) for chunk in limited_chunks]
+
+        def _insert_document_and_chunks() -> Tuple[int, List[Dict[str, object]], List[int], Optional[int]]:
             with database.get_db_connection() as conn:
                 with database.get_cursor(conn) as cursor:
                     cursor.execute(
@@ -572,6 +625,8 @@ class RagKnowledgeService:
                     )
                     local_document_id = int(cursor.lastrowid)
                     local_inserted_vector_chunks: List[Dict[str, object]] = []
+                    local_chunk_ids: List[int] = []
+                    local_chunk_tokens: List[Tuple[int, int, List[str]]] = []
 
                     for idx, chunk in enumerate(limited_chunks):
                         cursor.execute(
@@ -582,6 +637,8 @@ class RagKnowledgeService:
                             """,
                             (local_document_id, idx, chunk),
                         )
+                        local_chunk_ids.append(int(cursor.lastrowid or 0))
+                        local_chunk_tokens.append((local_chunk_ids[-1], local_document_id, chunk_tokens[idx]))
                         local_inserted_vector_chunks.append(
                             {
                                 "document_id": local_document_id,
@@ -592,25 +649,44 @@ class RagKnowledgeService:
                             }
                         )
 
+                    self._store_chunk_tokens(cursor, local_chunk_tokens)
                     self._upsert_document_summary(
                         cursor=cursor,
                         document_id=local_document_id,
                         summary_text=summary_text,
                         model_name=summary_model_name,
                     )
-                    self._bump_corpus_version(cursor, f"upload:{filename}")
+                    local_corpus_version = self._bump_corpus_version(cursor, f"upload:{filename}")
 
-            return local_document_id, local_inserted_vector_chunks
+            return local_document_id, local_inserted_vector_chunks, local_chunk_ids, local_corpus_version
 
-        document_id, inserted_vector_chunks = self._execute_with_db_retry(
+        document_id, inserted_vector_chunks, inserted_chunk_ids, corpus_version = self._execute_with_db_retry(
             operation_name="ingest.insert_document_and_chunks",
             operation=_insert_document_and_chunks,
         )
 
+        if self._lexical_index.version >= 0:
+            self._apply_document_change_to_lexical_index(
+                document_id,
+                corpus_version,
+                is_active=True,
+                chunks=[
+                    IndexedChunkInput(
+                        chunk_id=chunk_id,
+                        document_id=document_id,
+                        chunk_index=idx,
+                        filename=filename,
+                        chunk_text=chunk,
+                        tokens=chunk_tokens[idx],
+                    )
+                    for idx, (chunk_id, chunk) in enumerate(zip(inserted_chunk_ids, limited_chunks))
+                ],
+            )
+
         if upsert_vectors:
             self._upsert_vectors_for_chunks(inserted_vector_chunks)
 
-        self._clear_expired_cache()
+        self._clear_expired_cache(corpus_version)
         logger.info(
             "RAG ingest success: file=%s document_id=%s chunks=%s uploaded_by=%s",
             filename,
@@ -791,6 +867,130 @@ class RagKnowledgeService:
             (document_id, safe_summary, model_name),
         )
         self._mark_summary_embedding_stale(cursor=cursor, document_id=document_id)
+        self._store_summary_tokens(cursor, document_id, self._tokenize(safe_summary))
+
+    @staticmethod
+    def _pack_tokens(tokens: List[str]) -> str:
+        """Упаковать токены в строку для rag_chunk_tokens / rag_summary_tokens."""
+        return " ".join(tokens)
+
+    @staticmethod
+    def _unpack_tokens(tokens_text: Optional[str]) -> Optional[List[str]]:
+        """Распаковать сохранённые токены; None — токены не сохранены."""
+        if tokens_text is None:
+            return None
+        return str(tokens_text).split()
+
+    def _is_token_storage_enabled(self) -> bool:
+        """Проверить, можно ли сейчас читать/писать предтокенизированные данные."""
+        return self._token_storage_available and time.monotonic() >= self._token_storage_retry_at
+
+    def _mark_token_storage_ok(self) -> None:
+        """Сбросить backoff хранилища токенов после успешного обращения."""
+        self._token_storage_failures = 0
+        self._token_storage_retry_at = 0.0
+
+    def _log_token_storage_unavailable(self, exc: Exception) -> None:
+        """Учесть ошибку хранилища токенов.
+
+        Отсутствие таблицы или колонки отключает хранилище до перезапуска
+        процесса. Прочие ошибки (deadlock, потеря соединения, таймаут)
+        считаются временными: хранилище пропускается на время
+        экспоненциального backoff, затем обращения возобновляются.
+        """
+        if getattr(exc, "errno", None) in _MYSQL_TOKEN_STORAGE_MISSING_ERRNOS:
+            self._token_storage_available = False
+            if not self._token_storage_warning_logged:
+                logger.warning(
+                    "Таблицы rag_chunk_tokens/rag_summary_tokens недоступны, токенизация выполняется на лету: %s",
+                    exc,
+                )
+                self._token_storage_warning_logged = True
+            return
+
+        self._token_storage_failures += 1
+        delay = min(
+            _RAG_TOKEN_STORAGE_RETRY_MAX_DELAY_SECONDS,
+            _RAG_TOKEN_STORAGE_RETRY_BASE_DELAY_SECONDS * (2 ** (self._token_storage_failures - 1)),
+        )
+        self._token_storage_retry_at = time.monotonic() + delay
+        logger.warning(
+            "Временная ошибка хранилища токенов RAG, повтор через %.1fs: failures=%s error=%s",
+            delay,
+            self._token_storage_failures,
+            exc,
+        )
+
+    def _store_chunk_tokens(
+        self,
+        cursor,
+        chunk_tokens: List[Tuple[int, int, List[str]]],
+        strict: bool = False,
+    ) -> None:
+        """Сохранить токены чанков (chunk_id, document_id, tokens) в rag_chunk_tokens.
+
+        При ``strict=False`` отсутствие таблицы или колонки не прерывает ingest
+        и отключает хранилище токенов до перезапуска. Прочие ошибки
+        (deadlock, потеря соединения) пробрасываются: запись идёт в транзакции
+        ingest, которую InnoDB при deadlock откатывает целиком, поэтому
+        продолжать её нельзя — транзакцию повторяет ``_execute_with_db_retry``.
+        """
+        signature = self._get_lexical_index_signature()
+        rows = [
+            (chunk_id, document_id, signature, self._pack_tokens(tokens), len(tokens))
+            for chunk_id, document_id, tokens in chunk_tokens
+            if chunk_id > 0
+        ]
+        if not rows or (not strict and not self._is_token_storage_enabled()):
+            return
+        try:
+            cursor.executemany(
+                """
+                INSERT INTO rag_chunk_tokens
+                    (chunk_id, document_id, tokenizer_signature, tokens_text, token_count, updated_at)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON DUPLICATE KEY UPDATE
+                    tokenizer_signature = VALUES(tokenizer_signature),
+                    tokens_text = VALUES(tokens_text),
+                    token_count = VALUES(token_count),
+                    updated_at = NOW()
+                """,
+                rows,
+            )
+        except Exception as exc:
+            if strict or getattr(exc, "errno", None) not in _MYSQL_TOKEN_STORAGE_MISSING_ERRNOS:
+                raise
+            self._log_token_storage_unavailable(exc)
+        else:
+            self._mark_token_storage_ok()
+
+    def _store_summary_tokens(self, cursor, document_id: int, tokens: List[str], strict: bool = False) -> None:
+        """Сохранить токены summary документа в rag_summary_tokens.
+
+        Ошибки обрабатываются так же, как в ``_store_chunk_tokens``.
+        """
+        if document_id <= 0 or (not strict and not self._is_token_storage_enabled()):
+            return
+        try:
+            cursor.execute(
+                """
+                INSERT INTO rag_summary_tokens
+                    (document_id, tokenizer_signature, tokens_text, token_count, updated_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON DUPLICATE KEY UPDATE
+                    tokenizer_signature = VALUES(tokenizer_signature),
+                    tokens_text = VALUES(tokens_text),
+                    token_count = VALUES(token_count),
+                    updated_at = NOW()
+                """,
+                (document_id, self._get_lexical_index_signature(), self._pack_tokens(tokens), len(tokens)),
+            )
+        except Exception as exc:
+            if strict or getattr(exc, "errno", None) not in _MYSQL_TOKEN_STORAGE_MISSING_ERRNOS:
+                raise
+            self._log_token_storage_unavailable(exc)
+        else:
+            self._mark_token_storage_ok()
 
     @staticmethod
     def _mark_summary_embedding_stale(cursor, document_id: int) -> None:
@@ -1175,8 +1375,8 @@ class RagKnowledgeService:
         if new_status not in allowed_statuses:
             raise ValueError("Некорректный статус документа")
 
-        def _update_status_in_db() -> Optional[Tuple[bool, str]]:
-            """Обновить статус в MySQL. Возвращает (changed, old_status) или None."""
+        def _update_status_in_db() -> Optional[Tuple[bool, str, Optional[int]]]:
+            """Обновить статус в MySQL. Возвращает (changed, old_status, corpus_version) или None."""
             with database.get_db_connection() as conn:
                 with database.get_cursor(conn) as cursor:
                     cursor.execute(
@@ -1191,7 +1391,7 @@ class RagKnowledgeService:
                     filename = str(existing.get("filename", "document"))
 
                     if old_status == new_status:
-                        return (False, old_status)
+                        return (False, old_status, None)
 
                     cursor.execute(
                         """
@@ -1202,24 +1402,32 @@ class RagKnowledgeService:
                         (new_status, document_id),
                     )
 
+                    corpus_version: Optional[int] = None
                     if old_status == "active" or new_status == "active":
-                        self._bump_corpus_version(
+                        corpus_version = self._bump_corpus_version(
                             cursor,
                             f"status:{document_id}:{old_status}->{new_status}:{updated_by}:{filename}",
                         )
 
-            return (True, old_status)
+            return (True, old_status, corpus_version)
 
         result = self._execute_with_db_retry("set_document_status", _update_status_in_db)
         if result is None:
             return False
 
-        changed, old_status = result
+        changed, old_status, corpus_version = result
         if not changed:
             return True
 
+        if corpus_version is not None:
+            self._apply_document_change_to_lexical_index(
+                document_id,
+                corpus_version,
+                is_active=new_status == "active",
+            )
+
         self._set_vector_document_status(document_id, new_status)
-        self._clear_expired_cache()
+        self._clear_expired_cache(corpus_version)
         logger.info(
             "RAG document status changed: document_id=%s old=%s new=%s by=%s",
             document_id,
@@ -1244,8 +1452,12 @@ class RagKnowledgeService:
         if not hard_delete:
             return self.set_document_status(document_id, "deleted", updated_by)
 
+        deleted_corpus_version: Optional[int] = None
+
         def _delete_from_db() -> bool:
             """Удалить документ из MySQL. Возвращает True если удалён, False если не найден."""
+            nonlocal deleted_corpus_version
+            deleted_corpus_version = None
             with database.get_db_connection() as conn:
                 with database.get_cursor(conn) as cursor:
                     cursor.execute(
@@ -1261,7 +1473,7 @@ class RagKnowledgeService:
 
                     cursor.execute("DELETE FROM rag_documents WHERE id = %s", (document_id,))
                     if old_status == "active":
-                        self._bump_corpus_version(
+                        deleted_corpus_version = self._bump_corpus_version(
                             cursor,
                             f"hard_delete:{document_id}:{updated_by}:{filename}",
                         )
@@ -1271,8 +1483,15 @@ class RagKnowledgeService:
         if not deleted:
             return False
 
+        if deleted_corpus_version is not None:
+            self._apply_document_change_to_lexical_index(
+                document_id,
+                deleted_corpus_version,
+                is_active=False,
+            )
+
         self._delete_vector_document(document_id)
-        self._clear_expired_cache()
+        self._clear_expired_cache(deleted_corpus_version)
         logger.info(
             "RAG document deleted: document_id=%s hard_delete=%s by=%s",
             document_id,
@@ -1363,12 +1582,13 @@ class RagKnowledgeService:
         self._last_spellcheck_changes = spellcheck_changes
         self._last_spellcheck_llm_triggered = spellcheck_llm_triggered
 
-        corpus_version = self._get_corpus_version()
+        corpus_version = await run_retrieval_io(self._get_corpus_version)
         cache_key = f"{corpus_version}:{normalized_question.lower()}"
-        cached = self._answer_cache.get(cache_key)
+        cached_entry = self._answer_cache.get_entry(cache_key, include_expired=True)
         now = time.time()
-        if cached and cached.expires_at > now:
-            ttl_remaining = max(0.0, cached.expires_at - now)
+        if cached_entry is not None and not cached_entry.is_expired():
+            cached = cached_entry.value
+            ttl_remaining = cached_entry.ttl_remaining() or 0.0
             logger.info(
                 "RAG answer cache hit: user_id=%s corpus_version=%s question='%.120s' ttl_remaining_s=%.2f is_fallback=%s",
                 user_id,
@@ -1386,7 +1606,7 @@ class RagKnowledgeService:
             )
             return RagAnswer(text=cached.answer, is_fallback=cached.is_fallback)
 
-        cache_miss_reason = "expired" if cached else "not_found"
+        cache_miss_reason = "expired" if cached_entry is not None else "not_found"
         logger.info(
             "RAG answer cache miss: user_id=%s corpus_version=%s question='%.120s' reason=%s",
             user_id,
@@ -1395,6 +1615,56 @@ class RagKnowledgeService:
             cache_miss_reason,
         )
 
+        # --- Семантический кэш: ответ на близкий вопрос той же версии корпуса ---
+        question_vector = await run_retrieval_io(self._encode_question_for_semantic_cache, normalized_question)
+        if question_vector is not None:
+            semantic_hit = self._semantic_answer_cache.lookup(
+                question_vector,
+                corpus_version,
+                category_hint,
+                question=normalized_question,
+            )
+            if semantic_hit is not None:
+                cached = semantic_hit.value
+                self._answer_cache.put(cache_key, cached)
+                semantic_stats = self._semantic_answer_cache.stats()
+                logger.info(
+                    "RAG semantic cache hit: user_id=%s corpus_version=%s similarity=%.4f question='%.120s' "
+                    "matched_question='%.120s' is_fallback=%s hit_rate=%.3f saved_llm_calls=%s",
+                    user_id,
+                    corpus_version,
+                    semantic_hit.similarity,
+                    normalized_question,
+                    semantic_hit.question,
+                    cached.is_fallback,
+                    semantic_stats["hit_rate"],
+                    semantic_stats["saved_llm_calls"],
+                )
+                await _emit_progress(
+                    AI_PROGRESS_STAGE_RAG_CACHE_HIT,
+                    {
+                        "cache_key": cache_key,
+                        "semantic_similarity": semantic_hit.similarity,
+                    },
+                )
+                return RagAnswer(text=cached.answer, is_fallback=cached.is_fallback)
+
+        # LLM-вызовы, которые сэкономит попадание в семантический кэш по этому ответу.
+        llm_calls = 0
+
+        def _remember_semantic_answer(cached: CachedAnswer, extra_llm_calls: int = 0) -> None:
+            """Сохранить ответ в семантический кэш."""
+            if question_vector is None:
+                return
+            self._semantic_answer_cache.put(
+                question_vector,
+                corpus_version,
+                category_hint,
+                normalized_question,
+                cached,
+                llm_calls=llm_calls + extra_llm_calls,
+            )
+
         await _emit_progress(AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED)
 
         # --- HyDE: генерация гипотетического документа для vector search ---
@@ -1413,6 +1683,7 @@ class RagKnowledgeService:
 
                     hyde_provider = _get_hyde_provider()
                     hyde_max_chars = max(50, int(ai_settings.AI_RAG_HYDE_MAX_CHARS))
+                    llm_calls += 1
                     hyde_text = await hyde_provider.chat(
                         messages=[{"role": "user", "content": normalized_question}],
                         system_prompt=build_hyde_prompt(normalized_question, hyde_max_chars),
@@ -1439,7 +1710,7 @@ class RagKnowledgeService:
                     )
                     hyde_text = None
 
-        chunks, summary_blocks = await asyncio.to_thread(
+        chunks, summary_blocks = await run_retrieval_io(
             self._retrieve_context_for_question,
             normalized_question,
             limit=ai_settings.AI_RAG_TOP_K,
@@ -1455,6 +1726,7 @@ class RagKnowledgeService:
                 cache_key=cache_key,
                 now=now,
                 _emit_progress=_emit_progress,
+                remember_answer=_remember_semantic_answer,
             )
 
         from src.core.ai.llm_provider import get_provider
@@ -1479,6 +1751,7 @@ class RagKnowledgeService:
                 "summary_blocks_count": len(summary_blocks),
             },
         )
+        llm_calls += 1
         raw_answer = await provider.chat(
             messages=[{"role": "user", "content": normalized_question}],
             system_prompt=build_rag_prompt(context_blocks, summary_blocks=summary_blocks),
@@ -1504,23 +1777,18 @@ class RagKnowledgeService:
                 cache_key=cache_key,
                 now=now,
                 _emit_progress=_emit_progress,
+                remember_answer=_remember_semantic_answer,
             )
 
-        self._answer_cache[cache_key] = CachedAnswer(
-            answer=answer_text,
-            expires_at=now + self._cache_ttl_seconds,
-            is_fallback=False,
-        )
-        self._clear_expired_cache()
+        cached_answer = CachedAnswer(answer=answer_text, is_fallback=False)
+        self._answer_cache.put(cache_key, cached_answer)
+        _remember_semantic_answer(cached_answer)
 
-        asyncio.create_task(
-            asyncio.to_thread(
-                self._log_query,
-                user_id=user_id,
-                query=normalized_question,
-                cache_hit=False,
-                chunks_count=len(context_blocks),
-            )
+        self._log_query(
+            user_id=user_id,
+            query=normalized_question,
+            cache_hit=False,
+            chunks_count=len(context_blocks),
         )
 
         return RagAnswer(text=answer_text, is_fallback=False)
@@ -1533,6 +1801,7 @@ class RagKnowledgeService:
         cache_key: str,
         now: float,
         _emit_progress: Callable[[str, Optional[Dict[str, Any]]], Awaitable[None]],
+        remember_answer: Optional[Callable[[CachedAnswer, int], None]] = None,
     ) -> RagAnswer:
         """Попытаться ответить пользователю на основе summary документов (fallback).
 
@@ -1546,6 +1815,8 @@ class RagKnowledgeService:
             cache_key: Ключ кэша RAG-ответа.
             now: Текущее время (time.time()).
             _emit_progress: Callback для прогресса.
+            remember_answer: Опциональный callback сохранения ответа в
+                семантический кэш (ответ, число LLM-вызовов fallback).
 
         Returns:
             RagAnswer с fallback-ответом или пустым текстом.
@@ -1563,7 +1834,7 @@ class RagKnowledgeService:
             {"reason": "question_not_answered"},
         )
 
-        fallback_blocks = await asyncio.to_thread(
+        fallback_blocks = await run_retrieval_io(
             self._retrieve_summaries_for_fallback,
             question=question,
             hyde_text=hyde_text,
@@ -1605,26 +1876,17 @@ class RagKnowledgeService:
         )
 
         fallback_cache_key = f"fallback:{cache_key}"
-        self._answer_cache[fallback_cache_key] = CachedAnswer(
-            answer=fallback_answer,
-            expires_at=now + self._cache_ttl_seconds,
-            is_fallback=True,
-        )
-        self._answer_cache[cache_key] = CachedAnswer(
-            answer=fallback_answer,
-            expires_at=now + self._cache_ttl_seconds,
-            is_fallback=True,
-        )
-        self._clear_expired_cache()
+        cached_answer = CachedAnswer(answer=fallback_answer, is_fallback=True)
+        self._answer_cache.put(fallback_cache_key, cached_answer)
+        self._answer_cache.put(cache_key, cached_answer)
+        if remember_answer is not None:
+            remember_answer(cached_answer, 1)
 
-        asyncio.create_task(
-            asyncio.to_thread(
-                self._log_query,
-                user_id=user_id,
-                query=question,
-                cache_hit=False,
-                chunks_count=0,
-            )
+        self._log_query(
+            user_id=user_id,
+            query=question,
+            cache_hit=False,
+            chunks_count=0,
         )
 
         return RagAnswer(text=fallback_answer, is_fallback=True)
@@ -2150,17 +2412,15 @@ class RagKnowledgeService:
         cache_key = question.strip().lower()
 
         # --- Проверка кэша ---
-        now = time.time()
         cached = self._spellcheck_llm_cache.get(cache_key)
         if cached is not None:
-            cached_text, cached_changes, expires_at = cached
-            if expires_at > now:
-                logger.info(
-                    "Spellcheck LLM cache hit: question='%.60s' changes=%d",
-                    question,
-                    len(cached_changes),
-                )
-                return cached_text, cached_changes
+            cached_text, cached_changes = cached
+            logger.info(
+                "Spellcheck LLM cache hit: question='%.60s' changes=%d",
+                question,
+                len(cached_changes),
+            )
+            return cached_text, cached_changes
 
         # --- LLM вызов ---
         try:
@@ -2214,15 +2474,7 @@ class RagKnowledgeService:
 
             # --- Кэширование ---
             ttl = max(30, int(ai_settings.AI_RAG_SPELLCHECK_LLM_CACHE_TTL_SECONDS))
-            self._spellcheck_llm_cache[cache_key] = (corrected, changes, now + ttl)
-
-            # Очистка просроченных записей (до 10 за вызов)
-            expired_keys = [
-                k for k, (_, _, exp) in list(self._spellcheck_llm_cache.items())[:50]
-                if exp <= now
-            ]
-            for k in expired_keys[:10]:
-                self._spellcheck_llm_cache.pop(k, None)
+            self._spellcheck_llm_cache.put(cache_key, (corrected, changes), ttl_seconds=ttl)
 
             logger.info(
                 "Spellcheck LLM corrected: question='%.60s' corrected='%.60s' changes=%d",
@@ -2582,7 +2834,7 @@ class RagKnowledgeService:
             return []
 
         embed_text = hyde_text if hyde_text else question
-        query_vectors = embedding_provider.encode_texts([embed_text])
+        query_vectors = encode_texts_off_loop(embedding_provider, [embed_text])
         if not query_vectors:
             return []
 
@@ -3082,69 +3334,224 @@ class RagKnowledgeService:
         summary_scores = summary_scores or {}
         normalized_summary_scores = normalized_summary_scores or {}
 
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                if prefiltered_doc_ids:
-                    placeholders = ",".join(["%s"] * len(prefiltered_doc_ids))
-                    cursor.execute(
-                        f"""
-                        SELECT c.chunk_text, c.chunk_index, d.filename, d.id AS document_id
-                        FROM rag_chunks c
-                        JOIN rag_documents d ON d.id = c.document_id
-                        WHERE d.status = 'active' AND d.id IN ({placeholders})
-                        ORDER BY c.id DESC
-                        LIMIT %s
-                        """,
-                        tuple(prefiltered_doc_ids) + (_RAG_CHUNK_SCAN_LIMIT,),
-                    )
-                else:
-                    cursor.execute(
-                        """
-                        SELECT c.chunk_text, c.chunk_index, d.filename, d.id AS document_id
-                        FROM rag_chunks c
-                        JOIN rag_documents d ON d.id = c.document_id
-                        WHERE d.status = 'active'
-                        ORDER BY c.id DESC
-                        LIMIT %s
-                        """,
-                        (_RAG_CHUNK_SCAN_LIMIT,),
-                    )
-                rows = cursor.fetchall() or []
+        lexical_index = self._ensure_lexical_index()
+        scope_doc_ids = list(prefiltered_doc_ids) if prefiltered_doc_ids else None
 
-        scored: List[Tuple[float, str, str, int, int]] = []
-        all_lexical_scores: Dict[Tuple[int, str], float] = {}
-
-        bm25_scores: List[float] = []
         if lexical_scorer == "bm25":
-            chunk_tokens_corpus = [self._tokenize(str(row.get("chunk_text") or "")) for row in rows]
-            bm25_scores = self._score_corpus_bm25(chunk_tokens_corpus, tokens)
+            chunk_scores = lexical_index.score_bm25(
+                tokens,
+                k1=max(0.01, float(ai_settings.AI_RAG_BM25_K1)),
+                b=max(0.0, min(1.0, float(ai_settings.AI_RAG_BM25_B))),
+                document_ids=scope_doc_ids,
+            )
+        else:
+            chunk_scores = {}
+            for indexed_chunk in lexical_index.iter_chunks(scope_doc_ids):
+                legacy_score = self._score_chunk(indexed_chunk.chunk_text, tokens)
+                if legacy_score > 0:
+                    chunk_scores[indexed_chunk.chunk_id] = legacy_score
 
-        for index, row in enumerate(rows):
-            chunk_text = row.get("chunk_text") or ""
-            chunk_index = int(row.get("chunk_index") or 0)
-            source = row.get("filename") or "document"
-            document_id = int(row.get("document_id") or 0)
-            if lexical_scorer == "bm25":
-                chunk_score = float(bm25_scores[index]) if index < len(bm25_scores) else 0.0
-            else:
-                chunk_score = self._score_chunk(chunk_text, tokens)
-            summary_score = summary_scores.get(document_id, 0.0)
+        def _summary_bonus_for(document_id: int) -> float:
             normalized_summary_score = normalized_summary_scores.get(document_id)
             if normalized_summary_score is None:
-                summary_bonus = self._summary_score_bonus(summary_score)
-            else:
-                summary_bonus = self._summary_score_bonus_from_normalized(float(normalized_summary_score))
-            score = chunk_score + summary_bonus
+                return self._summary_score_bonus(summary_scores.get(document_id, 0.0))
+            return self._summary_score_bonus_from_normalized(float(normalized_summary_score))
+
+        # Чанки без lexical-совпадения получают только summary-бонус документа,
+        # поэтому из них в кандидаты попадают лишь чанки документов с бонусом.
+        bonus_doc_ids = [
+            int(doc_id)
+            for doc_id in dict.fromkeys(list(summary_scores) + list(normalized_summary_scores))
+            if _summary_bonus_for(int(doc_id)) > 0
+        ]
+        if scope_doc_ids is not None:
+            scope_set = {int(doc_id) for doc_id in scope_doc_ids}
+            bonus_doc_ids = [doc_id for doc_id in bonus_doc_ids if doc_id in scope_set]
+        candidates = {chunk.chunk_id: chunk for chunk in lexical_index.iter_chunks(bonus_doc_ids)}
+        for chunk_id in chunk_scores:
+            indexed_chunk = lexical_index.get_chunk(chunk_id)
+            if indexed_chunk is not None:
+                candidates[chunk_id] = indexed_chunk
+
+        scored_with_ids: List[Tuple[float, int, Tuple[float, str, str, int, int]]] = []
+        all_lexical_scores: Dict[Tuple[int, str], float] = {}
+
+        for chunk_id, indexed_chunk in candidates.items():
+            chunk_text = indexed_chunk.chunk_text
+            document_id = indexed_chunk.document_id
+            score = float(chunk_scores.get(chunk_id, 0.0)) + _summary_bonus_for(document_id)
             # сохраняем score для всех чанков для использования при merge
             chunk_key = (int(document_id), str(chunk_text or "").strip())
             existing = all_lexical_scores.get(chunk_key, 0.0)
             if score > existing:
                 all_lexical_scores[chunk_key] = score
             if score > 0:
-                scored.append((score, source, chunk_text, document_id, chunk_index))
+                scored_with_ids.append(
+                    (
+                        score,
+                        chunk_id,
+                        (score, indexed_chunk.filename, chunk_text, document_id, indexed_chunk.chunk_index),
+                    )
+                )
+
+        # При равном score выше идут более свежие чанки (больший id), как при scan ORDER BY c.id DESC.
+        scored_with_ids.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [item[2] for item in scored_with_ids[:safe_limit]], all_lexical_scores
+
+    def _get_lexical_index_signature(self) -> str:
+        """Сигнатура токенизатора, от которой зависят токены lexical-индекса."""
+        if not ai_settings.is_rag_ru_normalization_enabled():
+            return "raw"
+        return f"ru:{ai_settings.get_rag_ru_normalization_mode()}"
+
+    def _ensure_lexical_index(self) -> RagLexicalIndex:
+        """Вернуть lexical-индекс, актуальный для текущей версии корпуса.
+
+        Полная перестройка выполняется один раз на версию корпуса (или при
+        смене режима нормализации токенов); параллельные запросы ждут её
+        завершения, а не строят индекс повторно.
+        """
+        corpus_version = self._get_corpus_version()
+        signature = self._get_lexical_index_signature()
+        if self._lexical_index.is_current(corpus_version, signature):
+            return self._lexical_index
+
+        with self._lexical_index_build_lock:
+            if self._lexical_index.is_current(corpus_version, signature):
+                return self._lexical_index
+
+            started_at = time.perf_counter()
+            chunk_inputs = self._load_lexical_index_chunks()
+            self._lexical_index.replace(corpus_version, signature, chunk_inputs)
+            stats = self._lexical_index.get_stats()
+            logger.info(
+                "RAG lexical index built: corpus_version=%s signature=%s chunks=%s documents=%s terms=%s duration_ms=%d",
+                corpus_version,
+                signature,
+                stats["chunks"],
+                stats["documents"],
+                stats["terms"],
+                int((time.perf_counter() - started_at) * 1000),
+            )
+        return self._lexical_index
+
+    def _load_lexical_index_chunks(self, document_ids: Optional[List[int]] = None) -> List[IndexedChunkInput]:
+        """Загрузить активные чанки (всего корпуса или заданных документов) для lexical-индекса."""
+        document_filter = ""
+        filter_params: Tuple[object, ...] = ()
+        if document_ids:
+            document_filter = f" AND d.id IN ({','.join(['%s'] * len(document_ids))})"
+            filter_params = tuple(document_ids)
+
+        def _build_query(with_tokens: bool) -> Tuple[str, Tuple[object, ...]]:
+            if not with_tokens:
+                return (
+                    f"""
+                    SELECT c.id, c.chunk_text, c.chunk_index, d.filename, d.id AS document_id
+                    FROM rag_chunks c
+                    JOIN rag_documents d ON d.id = c.document_id
+                    WHERE d.status = 'active'{document_filter}
+                    """,
+                    filter_params,
+                )
+            return (
+                f"""
+                SELECT c.id, c.chunk_text, c.chunk_index, d.filename, d.id AS document_id,
+                       t.tokens_text AS stored_tokens
+                FROM rag_chunks c
+                JOIN rag_documents d ON d.id = c.document_id
+                LEFT JOIN rag_chunk_tokens t
+                    ON t.chunk_id = c.id AND t.tokenizer_signature = %s
+                WHERE d.status = 'active'{document_filter}
+                """,
+                (self._get_lexical_index_signature(),) + filter_params,
+            )
 
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return scored[:safe_limit], all_lexical_scores
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                rows = self._fetch_rows_with_stored_tokens(cursor, _build_query)
+
+        chunk_inputs: List[IndexedChunkInput] = []
+        for row in rows:
+            raw_chunk_id = row.get("id")
+            if raw_chunk_id is None:
+                # id чанка — ключ индекса между загрузками; выдуманный id мог бы
+                # совпасть с реальным чанком при следующей перестройке.
+                raise ValueError(
+                    f"rag_chunks row without id for document_id={row.get('document_id')}"
+                )
+            chunk_text = str(row.get("chunk_text") or "")
+            tokens = self._unpack_tokens(row.get("stored_tokens"))
+            chunk_inputs.append(
+                IndexedChunkInput(
+                    chunk_id=int(raw_chunk_id),
+                    document_id=int(row.get("document_id") or 0),
+                    chunk_index=int(row.get("chunk_index") or 0),
+                    filename=str(row.get("filename") or "document"),
+                    chunk_text=chunk_text,
+                    tokens=tokens if tokens is not None else self._tokenize(chunk_text),
+                )
+            )
+        return chunk_inputs
+
+    def _fetch_rows_with_stored_tokens(
+        self,
+        cursor,
+        build_query: Callable[[bool], Tuple[str, Tuple[object, ...]]],
+    ) -> List[Dict[str, object]]:
+        """Выполнить выборку с JOIN предтокенизированных данных и fallback без него.
+
+        ``build_query(True)`` должен добавлять колонку ``stored_tokens``;
+        если таблицы токенов нет или JOIN не удался, выборка повторяется
+        без JOIN, а токены вычисляются на лету вызывающим кодом.
+        """
+        if self._is_token_storage_enabled():
+            query, params = build_query(True)
+            try:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() or []
+            except Exception as exc:
+                self._log_token_storage_unavailable(exc)
+            else:
+                self._mark_token_storage_ok()
+                return rows
+
+        query, params = build_query(False)
+        cursor.execute(query, params)
+        return cursor.fetchall() or []
+
+    def _apply_document_change_to_lexical_index(
+        self,
+        document_id: int,
+        new_corpus_version: Optional[int],
+        is_active: bool,
+        chunks: Optional[List[IndexedChunkInput]] = None,
+    ) -> None:
+        """Инкрементально отразить изменение документа в lexical-индексе.
+
+        Изменение применяется, только если индекс находится на версии,
+        непосредственно предшествующей ``new_corpus_version``; иначе индекс
+        помечается устаревшим и будет перестроен при следующем запросе.
+        """
+        index = self._lexical_index
+        if index.version < 0 or not isinstance(new_corpus_version, int) or new_corpus_version <= 0:
+            return
+
+        try:
+            previous_version = new_corpus_version - 1
+            if not is_active:
+                index.drop_document(document_id, previous_version, new_corpus_version)
+                return
+            if chunks is None:
+                chunks = self._load_lexical_index_chunks([document_id])
+            index.patch_document(document_id, chunks, previous_version, new_corpus_version)
+        except Exception as exc:
+            logger.warning(
+                "RAG lexical index patch failed, full rebuild scheduled: document_id=%s error=%s",
+                document_id,
+                exc,
+            )
+            index.invalidate()
 
     @staticmethod
     def _unpack_chunk_row(chunk: Tuple[object, ...]) -> Tuple[float, str, str, int, int]:
@@ -3181,6 +3588,97 @@ class RagKnowledgeService:
             return safe_doc_id, safe_chunk_index, ""
         return safe_doc_id, 0, normalized_text
 
+    def _build_active_summaries_query(self, with_tokens: bool) -> Tuple[str, Tuple[object, ...]]:
+        """SQL выборки активных summary (опционально с сохранёнными токенами)."""
+        if not with_tokens:
+            return (
+                """
+                SELECT s.document_id, s.summary_text, d.filename, d.source_type
+                FROM rag_document_summaries s
+                JOIN rag_documents d ON d.id = s.document_id
+                WHERE d.status = 'active'
+                ORDER BY s.updated_at DESC
+                LIMIT %s
+                """,
+                (_RAG_SUMMARY_SCAN_LIMIT,),
+            )
+        return (
+            """
+            SELECT s.document_id, s.summary_text, d.filename, d.source_type,
+                   st.tokens_text AS stored_tokens
+            FROM rag_document_summaries s
+            JOIN rag_documents d ON d.id = s.document_id
+            LEFT JOIN rag_summary_tokens st
+                ON st.document_id = s.document_id AND st.tokenizer_signature = %s
+            WHERE d.status = 'active'
+            ORDER BY s.updated_at DESC
+            LIMIT %s
+            """,
+            (self._get_lexical_index_signature(), _RAG_SUMMARY_SCAN_LIMIT),
+        )
+
+    def _get_summary_corpus(self) -> _SummaryCorpus:
+        """Вернуть снимок активных summary для текущей версии корпуса.
+
+        Summary читаются и токенизируются один раз на версию корпуса
+        (изменение summary или статуса документа её увеличивает); параллельные
+        запросы ждут построения снимка, а не читают таблицу повторно.
+        """
+        key = (self._get_corpus_version(), self._get_lexical_index_signature())
+        summary_corpus = self._summary_corpus
+        if summary_corpus is not None and summary_corpus.key == key:
+            return summary_corpus
+
+        with self._summary_corpus_lock:
+            summary_corpus = self._summary_corpus
+            if summary_corpus is not None and summary_corpus.key == key:
+                return summary_corpus
+
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    rows = self._fetch_rows_with_stored_tokens(cursor, self._build_active_summaries_query)
+
+            valid_rows: List[Tuple[int, str, str, str]] = []
+            tokens: List[List[str]] = []
+            for row in rows:
+                document_id = int(row.get("document_id") or 0)
+                filename = str(row.get("filename") or "document")
+                summary_text = str(row.get("summary_text") or "").strip()
+                source_type = str(row.get("source_type") or "").strip().lower()
+                if not document_id or not summary_text:
+                    continue
+                valid_rows.append((document_id, filename, summary_text, source_type))
+                stored_tokens = self._unpack_tokens(row.get("stored_tokens"))
+                tokens.append(stored_tokens if stored_tokens is not None else self._tokenize(summary_text))
+
+            summary_corpus = _SummaryCorpus(key=key, rows=valid_rows, tokens=tokens)
+            self._summary_corpus = summary_corpus
+        return summary_corpus
+
+    def _score_summary_corpus_bm25(self, summary_corpus: _SummaryCorpus, query_tokens: List[str]) -> Dict[int, float]:
+        """Вычислить положительные BM25-score summary по индексу снимка {document_id: score}."""
+        if not summary_corpus.rows or not query_tokens:
+            return {}
+
+        k1 = max(0.01, float(ai_settings.AI_RAG_BM25_K1))
+        b = max(0.0, min(1.0, float(ai_settings.AI_RAG_BM25_B)))
+        index = summary_corpus.bm25_index
+        if index is None or not index.matches(summary_corpus.key, k1, b):
+            with self._summary_corpus_lock:
+                current = self._summary_corpus
+                if current is not None and current.key == summary_corpus.key:
+                    summary_corpus = current
+                index = summary_corpus.bm25_index
+                if index is None or not index.matches(summary_corpus.key, k1, b):
+                    index = SparseBM25Index(summary_corpus.tokens, k1=k1, b=b, signature=summary_corpus.key)
+                    if summary_corpus is current:
+                        self._summary_corpus = replace(summary_corpus, bm25_index=index)
+
+        return {
+            summary_corpus.rows[position][0]: score
+            for position, score in index.top_k(query_tokens, index.size)
+        }
+
     def _prefilter_documents_by_summary(
         self,
         question: str,
@@ -3200,32 +3698,8 @@ class RagKnowledgeService:
             return [], {}, self._summary_vector_prefilter_source
 
         safe_limit = max(1, min(limit, 100))
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(
-                    """
-                    SELECT s.document_id, s.summary_text, d.filename, d.source_type
-                    FROM rag_document_summaries s
-                    JOIN rag_documents d ON d.id = s.document_id
-                    WHERE d.status = 'active'
-                    ORDER BY s.updated_at DESC
-                    LIMIT %s
-                    """,
-                    (_RAG_SUMMARY_SCAN_LIMIT,),
-                )
-                rows = cursor.fetchall() or []
-
-        summaries_for_vector: List[Tuple[int, str]] = []
-        valid_rows: List[Tuple[int, str, str, str]] = []
-        for row in rows:
-            document_id = int(row.get("document_id") or 0)
-            filename = str(row.get("filename") or "document")
-            summary_text = str(row.get("summary_text") or "").strip()
-            source_type = str(row.get("source_type") or "").strip().lower()
-            if not document_id or not summary_text:
-                continue
-            valid_rows.append((document_id, filename, summary_text, source_type))
-            summaries_for_vector.append((document_id, summary_text))
+        summary_corpus = self._get_summary_corpus()
+        valid_rows = summary_corpus.rows
 
         vector_scores = self._search_summary_vector_scores_from_collection(
             question=question,
@@ -3237,7 +3711,7 @@ class RagKnowledgeService:
         if not vector_scores:
             vector_scores = self._compute_summary_vector_scores(
                 question=question,
-                summaries=summaries_for_vector,
+                summary_corpus=summary_corpus,
                 hyde_text=hyde_text,
             )
             vector_source = "fallback"
@@ -3248,11 +3722,10 @@ class RagKnowledgeService:
         lexical_scorer = ai_settings.get_rag_lexical_scorer()
         summary_bm25_scores: Dict[int, float] = {}
         if lexical_scorer == "bm25":
-            summary_corpus_tokens = [self._tokenize(summary_text) for _, _, summary_text, _ in valid_rows]
             # IDF dampening: подавить query-токены, встречающиеся почти во всех summary
             dampened_tokens, dampening_diagnostics = self._dampen_common_query_tokens(
                 question_tokens,
-                summary_corpus_tokens,
+                summary_corpus.tokens,
                 return_diagnostics=True,
             )
             self._log_idf_dampening_effect(
@@ -3260,9 +3733,7 @@ class RagKnowledgeService:
                 question=question,
                 diagnostics=dampening_diagnostics,
             )
-            corpus_scores = self._score_corpus_bm25(summary_corpus_tokens, dampened_tokens)
-            for index, (document_id, _, _, _) in enumerate(valid_rows):
-                summary_bm25_scores[document_id] = float(corpus_scores[index]) if index < len(corpus_scores) else 0.0
+            summary_bm25_scores = self._score_summary_corpus_bm25(summary_corpus, dampened_tokens)
 
         source_types_by_doc_id: Dict[int, str] = {
             document_id: source_type
@@ -3643,7 +4114,7 @@ class RagKnowledgeService:
             return {}
 
         embed_text = hyde_text if hyde_text else question
-        query_vectors = embedding_provider.encode_texts([embed_text])
+        query_vectors = encode_texts_off_loop(embedding_provider, [embed_text])
         if not query_vectors:
             return {}
 
@@ -3776,34 +4247,9 @@ class RagKnowledgeService:
         if hyde_text and ai_settings.is_rag_hyde_lexical_enabled():
             retrieval_tokens = self._augment_tokens_with_hyde(retrieval_tokens, hyde_text)
 
-        # Получить все активные summary из БД
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(
-                    """
-                    SELECT s.document_id, s.summary_text, d.filename, d.source_type
-                    FROM rag_document_summaries s
-                    JOIN rag_documents d ON d.id = s.document_id
-                    WHERE d.status = 'active'
-                    ORDER BY s.updated_at DESC
-                    LIMIT %s
-                    """,
-                    (_RAG_SUMMARY_SCAN_LIMIT,),
-                )
-                rows = cursor.fetchall() or []
-
-        valid_rows: List[Tuple[int, str, str, str]] = []
-        summaries_for_vector: List[Tuple[int, str]] = []
-        for row in rows:
-            document_id = int(row.get("document_id") or 0)
-            filename = str(row.get("filename") or "document")
-            summary_text = str(row.get("summary_text") or "").strip()
-            source_type = str(row.get("source_type") or "").strip().lower()
-            if not document_id or not summary_text:
-                continue
-            valid_rows.append((document_id, filename, summary_text, source_type))
-            summaries_for_vector.append((document_id, summary_text))
-
+        # Все активные summary текущей версии корпуса
+        summary_corpus = self._get_summary_corpus()
+        valid_rows = summary_corpus.rows
         if not valid_rows:
             return []
 
@@ -3817,7 +4263,7 @@ class RagKnowledgeService:
         if not vector_scores:
             vector_scores = self._compute_summary_vector_scores(
                 question=question,
-                summaries=summaries_for_vector,
+                summary_corpus=summary_corpus,
                 hyde_text=hyde_text,
             )
 
@@ -3828,10 +4274,9 @@ class RagKnowledgeService:
         # BM25 scoring
         summary_bm25_scores: Dict[int, float] = {}
         if lexical_scorer == "bm25":
-            summary_corpus_tokens = [self._tokenize(summary_text) for _, _, summary_text, _ in valid_rows]
             dampened_tokens, dampening_diagnostics = self._dampen_common_query_tokens(
                 retrieval_tokens,
-                summary_corpus_tokens,
+                summary_corpus.tokens,
                 return_diagnostics=True,
             )
             self._log_idf_dampening_effect(
@@ -3839,9 +4284,7 @@ class RagKnowledgeService:
                 question=question,
                 diagnostics=dampening_diagnostics,
             )
-            corpus_scores = self._score_corpus_bm25(summary_corpus_tokens, dampened_tokens)
-            for index, (document_id, _, _, _) in enumerate(valid_rows):
-                summary_bm25_scores[document_id] = float(corpus_scores[index]) if index < len(corpus_scores) else 0.0
+            summary_bm25_scores = self._score_summary_corpus_bm25(summary_corpus, dampened_tokens)
 
         # Score and rank
         scored_docs: List[Tuple[int, str, str, float]] = []
@@ -4033,55 +4476,65 @@ class RagKnowledgeService:
     def _compute_summary_vector_scores(
         self,
         question: str,
-        summaries: List[Tuple[int, str]],
+        summary_corpus: _SummaryCorpus,
         hyde_text: Optional[str] = None,
     ) -> Dict[int, float]:
         """Вычислить семантическое сходство вопроса и каждого summary через эмбеддинги.
 
-        Результат — словарь {document_id: cosine_similarity}.  Если
-        embedding-провайдер недоступен, возвращается пустой словарь
-        (graceful degradation).
+        Эмбеддинги summary собираются в матрицу один раз на снимок (версию
+        корпуса), запрос скорится одним матричным умножением.  Результат —
+        словарь {document_id: cosine_similarity}.  Если embedding-провайдер
+        недоступен, возвращается пустой словарь (graceful degradation).
         """
-        if not summaries:
+        if not summary_corpus.rows:
             return {}
 
         embedding_provider = self._get_embedding_provider()
         if embedding_provider is None:
             return {}
 
-        corpus_version = self._get_corpus_version()
-        if corpus_version != self._summary_embedding_corpus_version:
-            self._summary_embedding_cache.clear()
-            self._summary_embedding_corpus_version = corpus_version
-
         embed_text = hyde_text if hyde_text else question
-        question_vectors = embedding_provider.encode_texts([embed_text])
+        question_vectors = encode_texts_off_loop(embedding_provider, [embed_text])
         if not question_vectors:
             return {}
-        q_vec = question_vectors[0]
-
-        uncached_ids: List[int] = []
-        uncached_texts: List[str] = []
-        for doc_id, summary_text in summaries:
-            if doc_id not in self._summary_embedding_cache:
-                uncached_ids.append(doc_id)
-                uncached_texts.append(summary_text)
-
-        if uncached_texts:
-            new_vectors = embedding_provider.encode_texts(uncached_texts)
-            for idx, doc_id in enumerate(uncached_ids):
-                if idx < len(new_vectors):
-                    self._summary_embedding_cache[doc_id] = new_vectors[idx]
 
-        scores: Dict[int, float] = {}
-        for doc_id, _ in summaries:
-            s_vec = self._summary_embedding_cache.get(doc_id)
-            if s_vec is None:
-                continue
-            similarity = self._cosine_dot(q_vec, s_vec)
-            scores[doc_id] = max(0.0, similarity)
+        matrix = self._get_summary_embedding_matrix(summary_corpus, embedding_provider)
+        if matrix is None:
+            return {}
+        similarities = np.maximum(matrix @ np.asarray(question_vectors[0], dtype=np.float32), 0.0)
+        return {
+            row[0]: float(similarity)
+            for row, similarity in zip(summary_corpus.rows, similarities)
+        }
 
-        return scores
+    def _get_summary_embedding_matrix(
+        self,
+        summary_corpus: _SummaryCorpus,
+        embedding_provider: LocalEmbeddingProvider,
+    ) -> Optional[np.ndarray]:
+        """Вернуть матрицу эмбеддингов summary снимка, построив её при первом обращении."""
+        matrix = summary_corpus.embedding_matrix
+        if matrix is not None:
+            return matrix
+
+        with self._summary_corpus_lock:
+            current = self._summary_corpus
+            if current is not None and current.key == summary_corpus.key:
+                summary_corpus = current
+            matrix = summary_corpus.embedding_matrix
+            if matrix is not None:
+                return matrix
+
+            summary_vectors = encode_texts_off_loop(
+                embedding_provider,
+                [summary_text for _, _, summary_text, _ in summary_corpus.rows],
+            )
+            if len(summary_vectors) != len(summary_corpus.rows):
+                return None
+            matrix = np.asarray(summary_vectors, dtype=np.float32)
+            if summary_corpus is current:
+                self._summary_corpus = replace(summary_corpus, embedding_matrix=matrix)
+        return matrix
 
     @staticmethod
     def _cosine_dot(vec_a: List[float], vec_b: List[float]) -> float:
@@ -4196,7 +4649,8 @@ class RagKnowledgeService:
             return 0
 
         texts = [str(chunk.get("chunk_text") or "") for chunk in chunks]
-        embeddings = embedding_provider.encode_texts(texts)
+        # Чанки кодируются однократно при индексации — не вытесняем ими горячие запросы из кэша.
+        embeddings = embedding_provider.encode_texts(texts, use_cache=False)
         if not embeddings:
             self._record_chunk_embedding_metadata(
                 chunks=chunks,
@@ -4537,6 +4991,100 @@ class RagKnowledgeService:
 
         return stats
 
+    def backfill_token_storage(self, batch_size: int = 500, dry_run: bool = False) -> Dict[str, object]:
+        """Заполнить rag_chunk_tokens / rag_summary_tokens для уже загруженных документов.
+
+        Обрабатываются чанки и summary без сохранённых токенов для текущей
+        сигнатуры токенизатора (в том числе после смены режима нормализации).
+        Выборка идёт keyset-пагинацией по id, каждый батч пишется отдельной
+        транзакцией.
+        """
+        signature = self._get_lexical_index_signature()
+        safe_batch_size = max(1, int(batch_size))
+        stats: Dict[str, object] = {
+            "signature": signature,
+            "chunks_tokenized": 0,
+            "summaries_tokenized": 0,
+        }
+
+        last_chunk_id = 0
+        while True:
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    cursor.execute(
+                        """
+                        SELECT c.id, c.document_id, c.chunk_text
+                        FROM rag_chunks c
+                        LEFT JOIN rag_chunk_tokens t
+                            ON t.chunk_id = c.id AND t.tokenizer_signature = %s
+                        WHERE t.chunk_id IS NULL AND c.id > %s
+                        ORDER BY c.id ASC
+                        LIMIT %s
+                        """,
+                        (signature, last_chunk_id, safe_batch_size),
+                    )
+                    rows = cursor.fetchall() or []
+                    if not rows:
+                        break
+                    last_chunk_id = int(rows[-1].get("id") or 0)
+                    if not dry_run:
+                        self._store_chunk_tokens(
+                            cursor,
+                            [
+                                (
+                                    int(row.get("id") or 0),
+                                    int(row.get("document_id") or 0),
+                                    self._tokenize(str(row.get("chunk_text") or "")),
+                                )
+                                for row in rows
+                            ],
+                            strict=True,
+                        )
+            stats["chunks_tokenized"] = int(stats["chunks_tokenized"]) + len(rows)
+            if len(rows) < safe_batch_size or last_chunk_id <= 0:
+                break
+
+        last_document_id = 0
+        while True:
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    cursor.execute(
+                        """
+                        SELECT s.document_id, s.summary_text
+                        FROM rag_document_summaries s
+                        LEFT JOIN rag_summary_tokens st
+                            ON st.document_id = s.document_id AND st.tokenizer_signature = %s
+                        WHERE st.document_id IS NULL AND s.document_id > %s
+                        ORDER BY s.document_id ASC
+                        LIMIT %s
+                        """,
+                        (signature, last_document_id, safe_batch_size),
+                    )
+                    rows = cursor.fetchall() or []
+                    if not rows:
+                        break
+                    last_document_id = int(rows[-1].get("document_id") or 0)
+                    if not dry_run:
+                        for row in rows:
+                            self._store_summary_tokens(
+                                cursor,
+                                int(row.get("document_id") or 0),
+                                self._tokenize(str(row.get("summary_text") or "")),
+                                strict=True,
+                            )
+            stats["summaries_tokenized"] = int(stats["summaries_tokenized"]) + len(rows)
+            if len(rows) < safe_batch_size or last_document_id <= 0:
+                break
+
+        logger.info(
+            "RAG token storage backfill: signature=%s chunks=%s summaries=%s dry_run=%s",
+            signature,
+            stats["chunks_tokenized"],
+            stats["summaries_tokenized"],
+            dry_run,
+        )
+        return stats
+
     @staticmethod
     def _load_backfill_chunks(source_type: Optional[str]) -> Dict[int, List[Dict[str, object]]]:
         """Загрузить активные чанки документов для chunk backfill."""
@@ -4926,7 +5474,6 @@ class RagKnowledgeService:
             return ""
 
         if safe_token in _RAG_FIXED_QUERY_TERMS:
-            self._normalized_token_cache[safe_token] = safe_token
             return safe_token
 
         cached = self._normalized_token_cache.get(safe_token)
@@ -4934,7 +5481,7 @@ class RagKnowledgeService:
             return cached
 
         if not _CYRILLIC_TOKEN_RE.search(safe_token):
-            self._normalized_token_cache[safe_token] = safe_token
+            self._normalized_token_cache.put(safe_token, safe_token)
             return safe_token
 
         mode = ai_settings.get_rag_ru_normalization_mode()
@@ -4945,7 +5492,7 @@ class RagKnowledgeService:
             normalized = self._stem_ru_token(normalized)
 
         normalized = normalized or safe_token
-        self._normalized_token_cache[safe_token] = normalized
+        self._normalized_token_cache.put(safe_token, normalized)
         return normalized
 
     def _lemmatize_ru_token(self, token: str) -> str:
@@ -5009,59 +5556,6 @@ class RagKnowledgeService:
                 self._normalization_dependency_warning_logged = True
             return None
 
-    @staticmethod
-    def _score_corpus_bm25(corpus_tokens: List[List[str]], query_tokens: List[str]) -> List[float]:
-        """Вычислить BM25-score для корпуса документов по токенам запроса."""
-        if not corpus_tokens or not query_tokens:
-            return [0.0 for _ in corpus_tokens]
-
-        safe_corpus = [tokens if tokens else [""] for tokens in corpus_tokens]
-
-        if BM25Okapi is not None:
-            try:
-                bm25 = BM25Okapi(
-                    safe_corpus,
-                    k1=max(0.01, float(ai_settings.AI_RAG_BM25_K1)),
-                    b=max(0.0, min(1.0, float(ai_settings.AI_RAG_BM25_B))),
-                )
-                return [max(0.0, float(score)) for score in bm25.get_scores(query_tokens)]
-            except Exception:
-                pass
-
-        k1 = max(0.01, float(ai_settings.AI_RAG_BM25_K1))
-        b = max(0.0, min(1.0, float(ai_settings.AI_RAG_BM25_B)))
-        doc_count = len(safe_corpus)
-        avg_doc_len = sum(len(doc_tokens) for doc_tokens in safe_corpus) / max(doc_count, 1)
-
-        doc_freq: Dict[str, int] = {}
-        term_freq_by_doc: List[Counter[str]] = []
-        for doc_tokens in safe_corpus:
-            tf = Counter(doc_tokens)
-            term_freq_by_doc.append(tf)
-            for token in tf.keys():
-                doc_freq[token] = doc_freq.get(token, 0) + 1
-
-        query_tf = Counter(query_tokens)
-        scores: List[float] = [0.0 for _ in safe_corpus]
-
-        for token, qf in query_tf.items():
-            df = doc_freq.get(token, 0)
-            if df <= 0:
-                continue
-
-            idf = math.log(1.0 + ((doc_count - df + 0.5) / (df + 0.5)))
-            for idx, tf in enumerate(term_freq_by_doc):
-                freq = tf.get(token, 0)
-                if freq <= 0:
-                    continue
-                doc_len = len(safe_corpus[idx])
-                denominator = freq + (k1 * (1.0 - b + (b * doc_len / max(avg_doc_len, 1e-9))))
-                if denominator <= 0:
-                    continue
-                scores[idx] += idf * ((freq * (k1 + 1.0)) / denominator) * qf
-
-        return [max(0.0, float(score)) for score in scores]
-
     @staticmethod
     def _score_chunk(chunk_text: str, question_tokens: List[str]) -> float:
         """Оценить релевантность чанка по вхождению токенов запроса."""
@@ -5088,8 +5582,12 @@ class RagKnowledgeService:
                 return int(row.get("version_id", 0))
 
     @staticmethod
-    def _bump_corpus_version(cursor, reason: str) -> None:
-        """Увеличить версию корпуса для инвалидации кэша и retrieval-состояния."""
+    def _bump_corpus_version(cursor, reason: str) -> Optional[int]:
+        """Увеличить версию корпуса для инвалидации кэша и retrieval-состояния.
+
+        Returns:
+            Идентификатор новой версии корпуса (или None, если драйвер его не вернул).
+        """
         cursor.execute(
             """
             INSERT INTO rag_corpus_version (reason, created_at)
@@ -5097,29 +5595,50 @@ class RagKnowledgeService:
             """,
             (reason[:255],),
         )
+        new_version = getattr(cursor, "lastrowid", None)
+        return new_version if isinstance(new_version, int) else None
 
-    def _clear_expired_cache(self) -> None:
-        """Очистить протухшие элементы кэша."""
-        now = time.time()
-        expired = [key for key, val in self._answer_cache.items() if val.expires_at <= now]
-        for key in expired:
-            self._answer_cache.pop(key, None)
+    def _clear_expired_cache(self, corpus_version: Optional[int] = None) -> None:
+        """Очистить протухшие элементы кэша ответов.
 
-    @staticmethod
-    def _log_query(user_id: int, query: str, cache_hit: bool, chunks_count: int) -> None:
-        """Записать факт запроса к базе знаний в БД."""
+        Args:
+            corpus_version: Новая версия корпуса после изменения документов —
+                записи семантического кэша более старых версий удаляются.
+        """
+        self._answer_cache.purge_expired()
+        if corpus_version is not None:
+            self._semantic_answer_cache.invalidate(corpus_version)
+
+    def _encode_question_for_semantic_cache(self, question: str) -> Optional[List[float]]:
+        """Вычислить эмбеддинг вопроса для семантического кэша (None — кэш недоступен)."""
+        if not ai_settings.AI_RAG_SEMANTIC_CACHE_ENABLED:
+            return None
+        embedding_provider = self._get_embedding_provider()
+        if embedding_provider is None:
+            return None
         try:
-            with database.get_db_connection() as conn:
-                with database.get_cursor(conn) as cursor:
-                    cursor.execute(
-                        """
-                        INSERT INTO rag_query_log (user_id, query_text, cache_hit, chunks_count, created_at)
-                        VALUES (%s, %s, %s, %s, NOW())
-                        """,
-                        (user_id, query[:1000], 1 if cache_hit else 0, chunks_count),
-                    )
+            vectors = encode_texts_off_loop(embedding_provider, [question])
         except Exception as exc:
-            logger.warning("Не удалось записать rag_query_log: %s", exc)
+            logger.warning(
+                "RAG semantic cache: question embedding failed: question='%.120s' error_type=%s error=%r",
+                question,
+                type(exc).__name__,
+                exc,
+            )
+            return None
+        return vectors[0] if vectors else None
+
+    @staticmethod
+    def _log_query(user_id: int, query: str, cache_hit: bool, chunks_count: int) -> None:
+        """Поставить факт запроса к базе знаний в очередь записи в БД."""
+        submit_db_log(
+            "rag_query_log",
+            """
+            INSERT INTO rag_query_log (user_id, query_text, cache_hit, chunks_count, created_at)
+            VALUES (%s, %s, %s, %s, %s)
+            """,
+            (user_id, query[:1000], 1 if cache_hit else 0, chunks_count, datetime.now()),
+        )
 
 
 _rag_service_instance: Optional[RagKnowledgeService] = None
@@ -5133,6 +5652,12 @@ def get_rag_service() -> RagKnowledgeService:
     return _rag_service_instance
 
 
+def get_rag_cache_stats() -> Optional[List[Dict[str, Any]]]:
+    """Вернуть статистику кэшей RAG-сервиса процесса (None, если сервис ещё не создан)."""
+    service = _rag_service_instance
+    return service.get_cache_stats() if service is not None else None
+
+
 def preload_rag_runtime_dependencies() -> Dict[str, bool]:
     """Прогреть lazy-зависимости RAG на старте процесса бота."""
     started_at = time.perf_counter()
@@ -0,0 +1,196 @@
+"""
+retrieval_executor.py — выделенные пулы потоков для retrieval RAG и Group Knowledge.
+
+Retrieval выполняет блокирующие операции: запросы mysql-connector,
+обращения к Qdrant и вычисление эмбеддингов. Чтобы они не останавливали
+event loop бота и не конкурировали с остальными задачами в общем
+default executor (``asyncio.to_thread``), используются два ограниченных пула:
+
+- ``io`` — MySQL/Qdrant и остальная синхронная часть retrieval-пайплайна;
+- ``embedding`` — кодирование запросов embedding-моделью. Отдельный пул
+  ограничивает число одновременных CPU/GPU-bound вызовов модели и не даёт
+  им занять все I/O-потоки.
+
+Запросы, которые провайдер объединяет коалесцером (``coalesces_requests``),
+в embedding-пул не передаются: модель и так вызывает один воркер коалесцера,
+а ожидание в потоках маленького embedding-пула ограничило бы число
+объединяемых запросов его размером.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from config import ai_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_IO_THREAD_PREFIX = "retrieval-io"
+_EMBEDDING_THREAD_PREFIX = "retrieval-embed"
+
+
+class RetrievalExecutor:
+    """
+    Пара ограниченных пулов потоков для retrieval-операций.
+
+    Async-методы ``run_io``/``run_embedding`` переносят вызов в пул и
+    сохраняют contextvars вызывающей корутины (как ``asyncio.to_thread``).
+    Синхронный ``encode_texts`` предназначен для кода, уже работающего
+    в I/O-потоке: вычисление эмбеддинга выполняется в embedding-пуле,
+    а запросы через коалесцер провайдера — в вызывающем потоке.
+    """
+
+    def __init__(
+        self,
+        io_workers: Optional[int] = None,
+        embedding_workers: Optional[int] = None,
+    ) -> None:
+        self._io_workers = max(1, int(io_workers or ai_settings.AI_RETRIEVAL_IO_WORKERS))
+        self._embedding_workers = max(
+            1,
+            int(embedding_workers or ai_settings.AI_RETRIEVAL_EMBEDDING_WORKERS),
+        )
+        self._local = threading.local()
+        self._io_pool = ThreadPoolExecutor(
+            max_workers=self._io_workers,
+            thread_name_prefix=_IO_THREAD_PREFIX,
+        )
+        self._embedding_pool = ThreadPoolExecutor(
+            max_workers=self._embedding_workers,
+            thread_name_prefix=_EMBEDDING_THREAD_PREFIX,
+            initializer=self._mark_embedding_thread,
+        )
+
+    @property
+    def io_workers(self) -> int:
+        """Размер I/O-пула."""
+        return self._io_workers
+
+    @property
+    def embedding_workers(self) -> int:
+        """Размер embedding-пула."""
+        return self._embedding_workers
+
+    def _mark_embedding_thread(self) -> None:
+        self._local.is_embedding_worker = True
+
+    def _in_embedding_thread(self) -> bool:
+        return bool(getattr(self._local, "is_embedding_worker", False))
+
+    async def run_io(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Выполнить блокирующую функцию в I/O-пуле retrieval."""
+        return await self._run(self._io_pool, func, *args, **kwargs)
+
+    async def run_embedding(self, func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Выполнить вычисление эмбеддингов в embedding-пуле."""
+        return await self._run(self._embedding_pool, func, *args, **kwargs)
+
+    async def run_encode_texts(self, embedding_provider: Any, texts: List[str]) -> List[List[float]]:
+        """Вычислить эмбеддинги из корутины (через коалесцер — в I/O-пуле, иначе в embedding-пуле)."""
+        if self._coalesces(embedding_provider, len(texts)):
+            return await self.run_io(embedding_provider.encode_texts, texts)
+        return await self.run_embedding(embedding_provider.encode_texts, texts)
+
+    def encode_texts(self, embedding_provider: Any, texts: List[str]) -> List[List[float]]:
+        """
+        Синхронно вычислить эмбеддинги в embedding-пуле.
+
+        Вызывается из I/O-потока retrieval; внутри embedding-потока
+        и для запросов через коалесцер провайдера выполняется напрямую.
+
+        Args:
+            embedding_provider: Провайдер с методом ``encode_texts``.
+            texts: Тексты для кодирования.
+
+        Returns:
+            Список векторов.
+        """
+        if self._in_embedding_thread() or self._coalesces(embedding_provider, len(texts)):
+            return embedding_provider.encode_texts(texts)
+        return self._embedding_pool.submit(embedding_provider.encode_texts, texts).result()
+
+    def encode(self, embedding_provider: Any, text: str) -> List[float]:
+        """Синхронно вычислить эмбеддинг одного текста в embedding-пуле."""
+        if self._in_embedding_thread() or self._coalesces(embedding_provider, 1):
+            return embedding_provider.encode(text)
+        return self._embedding_pool.submit(embedding_provider.encode, text).result()
+
+    @staticmethod
+    def _coalesces(embedding_provider: Any, text_count: int) -> bool:
+        """Объединяет ли провайдер запрос коалесцером (тогда пул не нужен)."""
+        coalesces_requests = getattr(embedding_provider, "coalesces_requests", None)
+        return callable(coalesces_requests) and coalesces_requests(text_count) is True
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Остановить оба пула."""
+        self._io_pool.shutdown(wait=wait)
+        self._embedding_pool.shutdown(wait=wait)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Вернуть конфигурацию пулов для диагностики."""
+        return {
+            "io_workers": self._io_workers,
+            "embedding_workers": self._embedding_workers,
+        }
+
+    @staticmethod
+    async def _run(
+        pool: ThreadPoolExecutor,
+        func: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(pool, call)
+
+
+_executor: Optional[RetrievalExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_retrieval_executor() -> RetrievalExecutor:
+    """Получить общий экземпляр RetrievalExecutor (создаётся лениво)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = RetrievalExecutor()
+                logger.info(
+                    "Retrieval executor создан: io_workers=%d embedding_workers=%d",
+                    _executor.io_workers,
+                    _executor.embedding_workers,
+                )
+    return _executor
+
+
+def shutdown_retrieval_executor(wait: bool = False) -> None:
+    """Остановить общий RetrievalExecutor (следующий вызов создаст новый)."""
+    global _executor
+    with _executor_lock:
+        executor = _executor
+        _executor = None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_retrieval_io(func: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Выполнить блокирующую retrieval-функцию в I/O-пуле общего executor."""
+    return await get_retrieval_executor().run_io(func, *args, **kwargs)
+
+
+def encode_texts_off_loop(embedding_provider: Any, texts: List[str]) -> List[List[float]]:
+    """Вычислить эмбеддинги текстов в embedding-пуле общего executor."""
+    return get_retrieval_executor().encode_texts(embedding_provider, texts)
+
+
+def encode_off_loop(embedding_provider: Any, text: str) -> List[float]:
+    """Вычислить эмбеддинг текста в embedding-пуле общего executor."""
+    return get_retrieval_executor().encode(embedding_provider, text)
@@ -0,0 +1,248 @@
+"""
+ttl_lru_cache.py — ограниченный LRU-кэш с TTL для сервисов RAG и Group Knowledge.
+
+Заменяет «словарь + полный проход по items() для очистки»:
+
+- ``get``/``put`` — O(1) (``OrderedDict``), просроченная запись удаляется
+  при обращении;
+- истечение TTL — через min-heap по времени истечения: каждая операция
+  снимает с вершины кучи только уже просроченные записи (амортизированно
+  O(log n)), без сканирования всего кэша;
+- ограничения по числу записей и (опционально) по приблизительному
+  размеру в байтах, при превышении вытесняются давно не использованные;
+- счётчики попаданий/промахов/вытеснений для логов и health-проверок.
+
+Потокобезопасен: RAG нормализует токены и в event loop, и в retrieval executor.
+"""
+
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+SizeOfFn = Callable[[Any, Any], int]
+
+# Куча с «мёртвыми» элементами (перезаписанные/вытесненные ключи) перестраивается,
+# когда становится больше числа живых записей в столько раз.
+_HEAP_COMPACT_FACTOR = 2
+
+
+@dataclass
+class CacheEntry(Generic[V]):
+    """Запись кэша: значение, момент истечения (monotonic, None — без TTL) и размер."""
+
+    value: V
+    expires_at: Optional[float]
+    size: int
+    version: int
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """Истёк ли TTL записи."""
+        return self.expires_at is not None and self.expires_at <= (time.monotonic() if now is None else now)
+
+    def ttl_remaining(self, now: Optional[float] = None) -> Optional[float]:
+        """Оставшееся время жизни в секундах (None — запись без TTL)."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - (time.monotonic() if now is None else now))
+
+
+def approximate_size(key: Any, value: Any) -> int:
+    """Приблизительный размер записи в байтах (строки, коллекции, dataclass-объекты)."""
+    return _approximate_size(key, depth=0) + _approximate_size(value, depth=0)
+
+
+def _approximate_size(obj: Any, depth: int) -> int:
+    size = sys.getsizeof(obj)
+    if depth >= 3 or isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(
+            _approximate_size(key, depth + 1) + _approximate_size(item, depth + 1)
+            for key, item in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(_approximate_size(item, depth + 1) for item in obj)
+    attributes = getattr(obj, "__dict__", None)
+    if isinstance(attributes, dict):
+        return size + _approximate_size(attributes, depth + 1)
+    return size
+
+
+class TTLLRUCache(Generic[K, V]):
+    """
+    LRU-кэш с TTL и ограничениями по числу записей и размеру.
+
+    Args:
+        max_entries: Максимум записей (0 — без ограничения).
+        max_bytes: Бюджет по приблизительному размеру (0 — без ограничения).
+        default_ttl_seconds: TTL по умолчанию для ``put`` (None — без истечения).
+        size_of: Функция оценки размера записи ``(key, value) -> bytes``.
+        name: Имя кэша для статистики.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        *,
+        max_bytes: int = 0,
+        default_ttl_seconds: Optional[float] = None,
+        size_of: Optional[SizeOfFn] = None,
+        name: str = "cache",
+    ) -> None:
+        self.name = name
+        self._max_entries = max(0, int(max_entries))
+        self._max_bytes = max(0, int(max_bytes))
+        self._default_ttl_seconds = default_ttl_seconds
+        self._size_of = size_of or approximate_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[K, CacheEntry[V]]" = OrderedDict()
+        self._expiry_heap: List[Tuple[float, int, K]] = []
+        self._bytes = 0
+        self._version = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._expirations = 0
+        self._evictions = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get_entry(key) is not None  # type: ignore[arg-type]
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Вернуть значение или ``default`` (промах или истёкший TTL)."""
+        entry = self.get_entry(key)
+        return entry.value if entry is not None else default
+
+    def get_entry(self, key: K, *, include_expired: bool = False) -> Optional[CacheEntry[V]]:
+        """
+        Вернуть запись кэша.
+
+        Args:
+            key: Ключ.
+            include_expired: Вернуть и просроченную запись (она всё равно
+                удаляется и считается промахом) — чтобы вызывающий мог
+                отличить «истёк» от «не найден», если запись ещё не была
+                снята с кучи другими операциями.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_expired(now):
+                self._remove_locked(key)
+                self._expirations += 1
+                self._misses += 1
+                self._purge_expired_locked(now)
+                return entry if include_expired else None
+            self._purge_expired_locked(now)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def put(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Сохранить значение.
+
+        Args:
+            key: Ключ.
+            value: Значение.
+            ttl_seconds: TTL записи (по умолчанию — ``default_ttl_seconds``).
+        """
+        ttl = self._default_ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.monotonic()
+        expires_at = (now + float(ttl)) if ttl is not None else None
+        size = int(self._size_of(key, value)) if self._max_bytes else 0
+        with self._lock:
+            self._purge_expired_locked(now)
+            if self._max_bytes and size > self._max_bytes:
+                self._remove_locked(key)
+                return
+            self._remove_locked(key)
+            self._version += 1
+            self._entries[key] = CacheEntry(value=value, expires_at=expires_at, size=size, version=self._version)
+            self._bytes += size
+            if expires_at is not None:
+                heapq.heappush(self._expiry_heap, (expires_at, self._version, key))
+            self._enforce_limits_locked()
+
+    def pop(self, key: K) -> Optional[V]:
+        """Удалить запись и вернуть её значение."""
+        with self._lock:
+            entry = self._remove_locked(key)
+            return entry.value if entry is not None else None
+
+    def purge_expired(self) -> int:
+        """Удалить все просроченные записи, вернуть их число."""
+        with self._lock:
+            return self._purge_expired_locked(time.monotonic())
+
+    def clear(self) -> None:
+        """Очистить кэш (счётчики сохраняются)."""
+        with self._lock:
+            self._entries.clear()
+            self._expiry_heap.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Вернуть счётчики и заполненность кэша."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self._max_entries,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+                "expirations": self._expirations,
+                "evictions": self._evictions,
+            }
+
+    def _remove_locked(self, key: K) -> Optional[CacheEntry[V]]:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        return entry
+
+    def _purge_expired_locked(self, now: float) -> int:
+        removed = 0
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            _, version, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._remove_locked(key)
+                self._expirations += 1
+                removed += 1
+        if len(heap) > _HEAP_COMPACT_FACTOR * len(self._entries) + 64:
+            self._expiry_heap = [
+                (entry.expires_at, entry.version, key)
+                for key, entry in self._entries.items()
+                if entry.expires_at is not None
+            ]
+            heapq.heapify(self._expiry_heap)
+        return removed
+
+    def _enforce_limits_locked(self) -> None:
+        while self._entries and (
+            (self._max_entries and len(self._entries) > self._max_entries)
+            or (self._max_bytes and self._bytes > self._max_bytes)
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
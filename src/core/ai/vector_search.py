@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import hashlib
 import os
+import threading
 import time
 from contextlib import nullcontext
 import logging
@@ -12,6 +13,8 @@ from pathlib import Path
 from typing import Dict, List, Optional
 
 from config import ai_settings
+from src.core.ai.embedding_cache import get_embedding_cache
+from src.core.ai.embedding_coalescer import EmbeddingRequestCoalescer
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +66,8 @@ class LocalEmbeddingProvider:
         )
         self._last_error_code: Optional[str] = None
         self._last_error_message: Optional[str] = None
+        self._coalescer: Optional[EmbeddingRequestCoalescer] = None
+        self._coalescer_lock = threading.Lock()
 
     def is_ready(self) -> bool:
         """Проверить, что модель эмбеддингов доступна для инференса."""
@@ -76,8 +81,78 @@ class LocalEmbeddingProvider:
         """Вернуть текст последней ошибки загрузки embedding-модели."""
         return self._last_error_message
 
-    def encode_texts(self, texts: List[str]) -> List[List[float]]:
-        """Преобразовать список текстов в dense-вектора."""
+    def encode_texts(self, texts: List[str], *, use_cache: bool = True) -> List[List[float]]:
+        """Преобразовать список текстов в dense-вектора.
+
+        Векторы ищутся в общем кэше эмбеддингов по имени модели и
+        нормализованному тексту; кодируются только промахи. Небольшие
+        запросы (не больше размера батча коалесцера) объединяются с
+        одновременными запросами других пользователей в один проход модели.
+
+        Args:
+            texts: Тексты для кодирования.
+            use_cache: Использовать кэш эмбеддингов (массовая индексация
+                передаёт False, чтобы не вытеснять горячие запросы).
+        """
+        if not texts:
+            return []
+
+        cache = get_embedding_cache() if use_cache else None
+        if cache is None:
+            return self._encode_uncached(texts)
+
+        max_chars = max(200, int(ai_settings.AI_RAG_VECTOR_EMBEDDING_MAX_CHARS))
+        cache_keys = [self._normalize_text(text, max_chars=max_chars) for text in texts]
+        vectors = cache.get_many(self._model_name, cache_keys)
+        miss_positions = [position for position, vector in enumerate(vectors) if vector is None]
+        if not miss_positions:
+            return vectors
+
+        encoded = self._encode_uncached([texts[position] for position in miss_positions])
+        if len(encoded) != len(miss_positions):
+            return []
+        cache.put_many(self._model_name, [cache_keys[position] for position in miss_positions], encoded)
+        for position, vector in zip(miss_positions, encoded):
+            vectors[position] = vector
+        return vectors
+
+    def _encode_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Закодировать тексты моделью (через коалесцер для небольших запросов)."""
+        if self.coalesces_requests(len(texts)):
+            return self._coalescer.encode_texts(texts)
+        return self._encode_texts_batch(texts)
+
+    def coalesces_requests(self, text_count: int) -> bool:
+        """
+        Проверить, пойдёт ли запрос из ``text_count`` текстов через коалесцер.
+
+        Такой запрос можно выполнять прямо в I/O-потоке: модель вызывает
+        только воркер коалесцера, а вызывающий поток лишь ждёт свой срез.
+        """
+        coalescer = self._get_coalescer()
+        return coalescer is not None and 0 < text_count <= coalescer.max_batch_size
+
+    def coalescer_stats(self) -> Optional[Dict[str, float]]:
+        """Вернуть статистику объединения encode-запросов (None, если батчинг выключен)."""
+        coalescer = self._coalescer
+        return coalescer.snapshot() if coalescer is not None else None
+
+    def _get_coalescer(self) -> Optional[EmbeddingRequestCoalescer]:
+        """Лениво создать коалесцер encode-запросов, если он включён настройками."""
+        if not ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED:
+            return None
+        if self._coalescer is None:
+            with self._coalescer_lock:
+                if self._coalescer is None:
+                    self._coalescer = EmbeddingRequestCoalescer(
+                        self._encode_texts_batch,
+                        max_batch_size=ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH,
+                        max_wait_ms=ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_WAIT_MS,
+                    )
+        return self._coalescer
+
+    def _encode_texts_batch(self, texts: List[str]) -> List[List[float]]:
+        """Закодировать тексты одним вызовом модели (без объединения запросов)."""
         if not texts:
             return []
 
@@ -10,6 +10,7 @@ import time
 from typing import Iterable, List, Optional, Dict, Any, Tuple
 
 from src.common.database import get_db_connection, get_cursor
+from src.core.ai.db_log_sink import get_db_log_sink, submit_db_log
 from src.group_knowledge.models import GroupMessage, QAPair
 
 logger = logging.getLogger(__name__)
@@ -1064,6 +1065,42 @@ def get_qa_pair_by_id(pair_id: int) -> Optional[QAPair]:
         return None
 
 
+def get_qa_pairs_by_ids(pair_ids: Iterable[int]) -> Dict[int, QAPair]:
+    """
+    Получить Q&A-пары по списку ID одним запросом.
+
+    Args:
+        pair_ids: Идентификаторы записей gk_qa_pairs.id.
+
+    Returns:
+        Словарь {pair_id: QAPair} для найденных записей.
+    """
+    normalized_ids = sorted({int(pair_id) for pair_id in (pair_ids or []) if pair_id is not None})
+    if not normalized_ids:
+        return {}
+
+    try:
+        with get_db_connection() as conn:
+            with get_cursor(conn) as cursor:
+                placeholders = ", ".join(["%s"] * len(normalized_ids))
+                cursor.execute(
+                    f"SELECT * FROM gk_qa_pairs WHERE id IN ({placeholders})",
+                    tuple(normalized_ids),
+                )
+                rows = cursor.fetchall() or []
+    except Exception as exc:
+        logger.error("Ошибка получения Q&A-пар по ID: %s", exc, exc_info=True)
+        return {}
+
+    pairs_by_id: Dict[int, QAPair] = {}
+    for row in rows:
+        pair = _row_to_qa_pair(row)
+        if pair.id is None:
+            continue
+        pairs_by_id[int(pair.id)] = pair
+    return pairs_by_id
+
+
 def get_all_approved_qa_pairs(
     extraction_types: Optional[Iterable[str]] = None,
     group_id: Optional[int] = None,
@@ -1166,6 +1203,76 @@ def get_approved_qa_pairs_corpus_signature(
         return None
 
 
+def get_qa_pairs_updated_watermark() -> Optional[Any]:
+    """
+    Получить максимальное значение gk_qa_pairs.updated_at.
+
+    Значение фиксируется перед полной загрузкой BM25-корпуса и служит
+    нижней границей следующего инкрементального обновления.
+
+    Returns:
+        Отметка времени или None, если колонка отсутствует / таблица пуста.
+    """
+    try:
+        with get_db_connection() as conn:
+            with get_cursor(conn) as cursor:
+                cursor.execute("SELECT MAX(updated_at) AS watermark FROM gk_qa_pairs")
+                row = cursor.fetchone() or {}
+                return row.get("watermark")
+    except Exception as exc:
+        logger.warning("Не удалось получить watermark gk_qa_pairs.updated_at: %s", exc)
+        return None
+
+
+def get_qa_pairs_updated_since(
+    updated_after: Any,
+    overlap_seconds: int = 0,
+) -> Optional[Tuple[List[QAPair], Dict[int, Any], Any]]:
+    """
+    Получить Q&A-пары, изменённые начиная с указанной отметки времени.
+
+    Возвращаются пары в любом статусе (включая отклонённые), чтобы
+    вызывающий код мог убрать их из корпуса. Граница включительная и
+    сдвигается назад на ``overlap_seconds``: транзакция, закоммиченная
+    после предыдущей выборки с более ранним updated_at, попадает в окно
+    перекрытия. Уже применённые строки вызывающий код отсеивает по
+    паре (id, updated_at).
+
+    Args:
+        updated_after: Watermark предыдущей выборки.
+        overlap_seconds: Перекрытие окна выборки в секундах.
+
+    Returns:
+        Кортеж (пары, updated_at по id пары, новый watermark) или None
+        при ошибке (например, если миграция updated_at не применена).
+    """
+    try:
+        with get_db_connection() as conn:
+            with get_cursor(conn) as cursor:
+                cursor.execute(
+                    """
+                    SELECT * FROM gk_qa_pairs
+                    WHERE updated_at >= DATE_SUB(%s, INTERVAL %s SECOND)
+                    ORDER BY updated_at, id
+                    """,
+                    (updated_after, max(0, int(overlap_seconds))),
+                )
+                rows = cursor.fetchall() or []
+    except Exception as exc:
+        logger.warning("Не удалось получить изменённые Q&A-пары: %s", exc)
+        return None
+
+    watermark = updated_after
+    updated_at_by_id: Dict[int, Any] = {}
+    for row in rows:
+        row_updated_at = row.get("updated_at")
+        if row.get("id") is not None:
+            updated_at_by_id[int(row["id"])] = row_updated_at
+        if row_updated_at is not None and (watermark is None or row_updated_at > watermark):
+            watermark = row_updated_at
+    return [_row_to_qa_pair(row) for row in rows], updated_at_by_id, watermark
+
+
 def _normalize_extraction_types(
     extraction_types: Optional[Iterable[str]],
 ) -> Optional[Tuple[str, ...]]:
@@ -1432,50 +1539,56 @@ def store_responder_log(
         llm_request_payload: Полный JSON запроса к LLM.
         question_message_date: Время исходного вопроса (UNIX timestamp).
 
+    Внутри event loop запись ставится в фоновую очередь логов БД
+    (``src.core.ai.db_log_sink``) и функция сразу возвращает 0.
+
     Returns:
-        ID записи в логе.
+        ID записи в логе (0 — запись поставлена в очередь или не сохранена).
     """
     now = int(time.time())
     has_payload_column = _responder_log_has_llm_request_payload_column()
     has_question_date_column = _responder_log_has_question_message_date_column()
+    columns = [
+        "group_id",
+        "question_message_id",
+        "question_text",
+        "answer_text",
+        "qa_pair_id",
+        "confidence",
+        "dry_run",
+        "responded_at",
+    ]
+    values: List[Any] = [
+        group_id,
+        question_message_id,
+        question_text[:8000] if question_text else "",
+        answer_text[:8000] if answer_text else "",
+        qa_pair_id,
+        confidence,
+        1 if dry_run else 0,
+        now,
+    ]
+
+    if has_question_date_column:
+        columns.append("question_message_date")
+        values.append(question_message_date)
+
+    if has_payload_column:
+        columns.append("llm_request_payload")
+        values.append(llm_request_payload)
+
+    placeholders = ", ".join(["%s"] * len(columns))
+    columns_sql = ", ".join(columns)
+    sql = f"INSERT INTO gk_responder_log ({columns_sql}) VALUES ({placeholders})"
+
+    if get_db_log_sink() is not None:
+        submit_db_log("gk_responder_log", sql, tuple(values))
+        return 0
+
     try:
         with get_db_connection() as conn:
             with get_cursor(conn) as cursor:
-                columns = [
-                    "group_id",
-                    "question_message_id",
-                    "question_text",
-                    "answer_text",
-                    "qa_pair_id",
-                    "confidence",
-                    "dry_run",
-                    "responded_at",
-                ]
-                values: List[Any] = [
-                    group_id,
-                    question_message_id,
-                    question_text[:8000] if question_text else "",
-                    answer_text[:8000] if answer_text else "",
-                    qa_pair_id,
-                    confidence,
-                    1 if dry_run else 0,
-                    now,
-                ]
-
-                if has_question_date_column:
-                    columns.append("question_message_date")
-                    values.append(question_message_date)
-
-                if has_payload_column:
-                    columns.append("llm_request_payload")
-                    values.append(llm_request_payload)
-
-                placeholders = ", ".join(["%s"] * len(columns))
-                columns_sql = ", ".join(columns)
-                cursor.execute(
-                    f"INSERT INTO gk_responder_log ({columns_sql}) VALUES ({placeholders})",
-                    tuple(values),
-                )
+                cursor.execute(sql, tuple(values))
                 return cursor.lastrowid or 0
     except Exception as exc:
         logger.error("Ошибка сохранения лога автоответчика: %s", exc, exc_info=True)
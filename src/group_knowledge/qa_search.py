@@ -5,15 +5,19 @@
 через Reciprocal Rank Fusion (RRF) и генерирует ответы с помощью LLM.
 """
 
+import itertools
 import json
 import logging
-import math
 import re
+import threading
 import time
 from collections import Counter
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
 
 from config import ai_settings
+from src.core.ai.bm25_engine import SparseBM25Index
+from src.core.ai.retrieval_executor import encode_off_loop, run_retrieval_io
+from src.core.ai.ttl_lru_cache import TTLLRUCache
 from src.core.ai.llm_provider import get_provider, is_provider_registered
 from src.group_knowledge.acronyms import (
     select_best_acronyms_by_term,
@@ -23,11 +27,6 @@ from src.group_knowledge import database as gk_db
 from src.group_knowledge.models import QAPair
 from src.group_knowledge.rag_text import enrich_question_for_rag
 
-try:
-    from rank_bm25 import BM25Okapi
-except ImportError:
-    BM25Okapi = None  # type: ignore[misc,assignment]
-
 try:
     from symspellpy import SymSpell, Verbosity as _SymSpellVerbosity  # type: ignore[import-untyped]
 except Exception:
@@ -243,6 +242,32 @@ ANSWER_GENERATION_PROMPT = _ANSWER_PROMPT_BASE.format(
 )
 
 
+class _CorpusSnapshot(NamedTuple):
+    """
+    Снимок BM25-корпуса со всеми производными структурами.
+
+    Публикуется одним присваиванием и не изменяется после публикации:
+    поиск читает снимок один раз и сопоставляет score с парами того же
+    корпуса, даже если параллельно корпус заменяется.
+    """
+
+    pairs: List[QAPair]
+    tokens: List[List[str]]
+    position_by_id: Dict[int, int]
+    # None — DF не построена для этих токенов (считается при поиске)
+    doc_freq: Optional[Counter]
+    bm25_index: Optional[SparseBM25Index]
+    # Номер публикации снимка — сигнатура корпуса для BM25-индекса
+    version: int = 0
+
+
+_EMPTY_CORPUS = _CorpusSnapshot(pairs=[], tokens=[], position_by_id={}, doc_freq=Counter(), bm25_index=None)
+# Номера публикаций снимков корпуса (общие для всех экземпляров сервиса)
+_CORPUS_VERSIONS = itertools.count(1)
+# Доля корпуса в delta-слое BM25-индекса, после которой индекс пересобирается целиком
+_BM25_DELTA_COMPACTION_RATIO = 0.25
+
+
 class QASearchService:
     """
     Сервис гибридного поиска по Q&A-парам.
@@ -264,14 +289,23 @@ class QASearchService:
         self._top_k = ai_settings.get_active_gk_responder_top_k()
 
         # Кэш BM25-корпуса
-        self._corpus_pairs: List[QAPair] = []
-        self._corpus_tokens: List[List[str]] = []
+        self._corpus: _CorpusSnapshot = _EMPTY_CORPUS
         self._corpus_loaded_at: float = 0.0
         self._corpus_signature: Optional[Tuple[int, int, int]] = None
         self._corpus_extraction_types: Optional[Tuple[str, ...]] = None
+        self._corpus_watermark: Optional[Any] = None
+        # updated_at пар из последнего окна инкрементальной выборки (дедупликация перекрытия)
+        self._corpus_applied_updates: Dict[int, Any] = {}
+        # Поиск выполняется в retrieval executor параллельно: загрузка корпуса/терминов
+        # и инициализация vector-ресурсов сериализуются своими блокировками.
+        self._corpus_lock = threading.RLock()
+        self._vector_resources_lock = threading.RLock()
 
         # Кэш нормализации токенов
-        self._normalized_token_cache: Dict[str, str] = {}
+        self._normalized_token_cache: TTLLRUCache[str, str] = TTLLRUCache(
+            ai_settings.AI_RAG_TOKEN_CACHE_MAX_ENTRIES,
+            name="gk_normalized_token",
+        )
         self._ru_morph_analyzer: Optional[object] = None
         self._ru_stemmer: Optional[object] = None
         self._normalization_warning_logged: bool = False
@@ -281,10 +315,15 @@ class QASearchService:
 
         # Spellcheck (SymSpellPy + LLM fallback)
         self._spellcheck_sym: Optional[object] = None
+        # Инкрементальный патч словаря и lookup из retrieval executor сериализуются
+        self._spellcheck_lock = threading.Lock()
         self._spellcheck_vocab_size: int = 0
         self._spellcheck_vocab_ready: bool = False
         self._spellcheck_token_freq: Dict[str, int] = {}
-        self._spellcheck_llm_cache: Dict[str, Tuple[str, List[Tuple[str, str]], float]] = {}
+        self._spellcheck_llm_cache: TTLLRUCache[str, Tuple[str, List[Tuple[str, str]]]] = TTLLRUCache(
+            ai_settings.GK_SPELLCHECK_LLM_CACHE_MAX_ENTRIES,
+            name="gk_spellcheck_llm",
+        )
 
         # Защищённые термины (загружаются из БД, fallback на хардкод)
         self._fixed_terms: frozenset = _GK_FIXED_TERMS_FALLBACK
@@ -344,10 +383,34 @@ class QASearchService:
         self._spellcheck_vocab_ready = False
         self._spellcheck_sym = None
 
+    @property
+    def _corpus_pairs(self) -> List[QAPair]:
+        return self._corpus.pairs
+
+    @property
+    def _corpus_tokens(self) -> List[List[str]]:
+        return self._corpus.tokens
+
+    @property
+    def _corpus_position_by_id(self) -> Dict[int, int]:
+        return self._corpus.position_by_id
+
+    @property
+    def _corpus_doc_freq(self) -> Optional[Counter]:
+        return self._corpus.doc_freq
+
+    @property
+    def _corpus_bm25_index(self) -> Optional[SparseBM25Index]:
+        return self._corpus.bm25_index
+
     def _ensure_terms_loaded(self) -> None:
         """Загрузить термины из БД если кэш протух."""
         ttl = ai_settings.GK_TERMS_CACHE_TTL_SECONDS
-        if (time.time() - self._fixed_terms_loaded_at) >= ttl:
+        if (time.time() - self._fixed_terms_loaded_at) < ttl:
+            return
+        with self._corpus_lock:
+            if (time.time() - self._fixed_terms_loaded_at) < ttl:
+                return
             self.reload_terms()
             if ai_settings.GK_SPELLCHECK_ENABLED and self._corpus_pairs:
                 rebuilt = self._build_spellcheck_vocabulary()
@@ -495,15 +558,17 @@ class QASearchService:
 
         # Важно: сначала прогреть/загрузить корпус, чтобы spellcheck vocabulary
         # была готова уже на первом поисковом запросе.
-        self._ensure_terms_loaded()
-        self._ensure_corpus_loaded()
+        # Загрузка терминов/корпуса и BM25 обращаются к MySQL и нагружают CPU,
+        # поэтому выполняются в retrieval executor, а не в event loop.
+        await run_retrieval_io(self._ensure_terms_loaded)
+        await run_retrieval_io(self._ensure_corpus_loaded)
 
         # Spell-check: коррекция опечаток перед поиском
         search_query = await self._apply_spellcheck_pipeline(query)
 
         # BM25 (лексический) поиск
         bm25_results = self._filter_by_group(
-            self._bm25_search(search_query, candidates_per_method),
+            await run_retrieval_io(self._bm25_search, search_query, candidates_per_method),
             group_id,
         )
 
@@ -828,7 +893,10 @@ class QASearchService:
                 )
                 return None
 
-            source_message_links = self._resolve_source_message_links(source_pair_ids)
+            source_message_links = await run_retrieval_io(
+                self._resolve_source_message_links,
+                source_pair_ids,
+            )
 
             return {
                 "answer": answer,
@@ -891,7 +959,11 @@ class QASearchService:
         """
         self._ensure_corpus_loaded()
 
-        if not self._corpus_pairs:
+        # Снимок читается один раз: пары, токены, DF и индекс — из одного корпуса
+        corpus = self._corpus
+        corpus_pairs = corpus.pairs
+        corpus_tokens = corpus.tokens
+        if not corpus_pairs:
             logger.info("GK BM25: корпус пуст, нет одобренных Q&A-пар")
             return []
 
@@ -907,8 +979,9 @@ class QASearchService:
 
         dampened_query_tokens, dampening_diagnostics = self._dampen_common_query_tokens(
             query_tokens,
-            self._corpus_tokens,
+            corpus_tokens,
             return_diagnostics=True,
+            doc_freq=corpus.doc_freq,
         )
         self._log_idf_dampening_effect(
             stage="gk_bm25_search",
@@ -916,16 +989,12 @@ class QASearchService:
             diagnostics=dampening_diagnostics,
         )
 
-        # Вычислить BM25-scores для всего корпуса
-        scores = self._score_corpus_bm25(self._corpus_tokens, dampened_query_tokens)
-
-        # Собрать результаты с ненулевым score
-        scored: List[Tuple[QAPair, float]] = []
-        for idx, score in enumerate(scores):
-            if score > 0 and idx < len(self._corpus_pairs):
-                scored.append((self._corpus_pairs[idx], score))
-
-        scored.sort(key=lambda x: x[1], reverse=True)
+        # Top-k по предпостроенному индексу корпуса (только положительные score)
+        scored: List[Tuple[QAPair, float]] = [
+            (corpus_pairs[position], score)
+            for position, score in self._rank_corpus_bm25(corpus, dampened_query_tokens, top_k)
+            if position < len(corpus_pairs)
+        ]
 
         logger.info(
             "GK BM25: query_tokens_head=%s query_tokens_tail=%s query_tokens_total=%d "
@@ -940,15 +1009,20 @@ class QASearchService:
             query_diag["removed_short_tokens"],
             query_diag["removed_stopwords"][:10],
             query_diag["removed_stopwords_count"],
-            len(self._corpus_pairs),
+            len(corpus_pairs),
             len(scored),
             scored[0][1] if scored else 0.0,
         )
 
-        return scored[:top_k]
+        return scored
 
     def _ensure_corpus_loaded(self) -> None:
         """Загрузить или перезагрузить BM25-корпус, если TTL истёк."""
+        with self._corpus_lock:
+            self._refresh_corpus_if_stale()
+
+    def _refresh_corpus_if_stale(self) -> None:
+        """Проверить сигнатуру/TTL корпуса и обновить его (вызывается под ``_corpus_lock``)."""
         now = time.time()
         ttl = ai_settings.GK_BM25_CORPUS_TTL_SECONDS
         allowed_extraction_types = self._get_allowed_extraction_types()
@@ -970,38 +1044,23 @@ class QASearchService:
                 latest_signature,
             )
 
+        if (
+            self._corpus_pairs
+            and extraction_types_unchanged
+            and self._refresh_corpus_incrementally(now, latest_signature, allowed_extraction_types)
+        ):
+            return
+
         try:
+            watermark = gk_db.get_qa_pairs_updated_watermark()
             pairs = gk_db.get_all_approved_qa_pairs(
                 extraction_types=allowed_extraction_types,
             )
-            question_message_ids = [
-                int(pair.question_message_id)
-                for pair in pairs
-                if pair.question_message_id is not None
-            ]
-            question_messages_by_id: Dict[int, Any] = {}
-            if question_message_ids:
-                question_messages_by_id = gk_db.get_messages_by_ids(question_message_ids)
-
-            corpus_tokens = []
-            for pair in pairs:
-                source_message = None
-                if pair.question_message_id is not None:
-                    source_message = question_messages_by_id.get(int(pair.question_message_id))
-                rag_question_text = enrich_question_for_rag(
-                    question_text=pair.question_text,
-                    source_message=source_message,
-                    enabled=ai_settings.GK_RAG_IMAGE_GIST_ENABLED,
-                )
-                if not rag_question_text:
-                    rag_question_text = (pair.question_text or "").strip()
-
-                text = f"{rag_question_text} {pair.answer_text}"
-                tokens = self._tokenize(text)
-                corpus_tokens.append(tokens)
+            corpus_tokens = self._tokenize_corpus_pairs(pairs)
 
-            self._corpus_pairs = pairs
-            self._corpus_tokens = corpus_tokens
+            self._set_corpus(pairs, corpus_tokens)
+            self._corpus_watermark = watermark
+            self._corpus_applied_updates = {}
             self._corpus_loaded_at = now
             self._corpus_signature = latest_signature or self._build_corpus_signature_from_pairs(pairs)
             self._corpus_extraction_types = allowed_extraction_types
@@ -1020,11 +1079,251 @@ class QASearchService:
         except Exception as exc:
             logger.error("GK BM25: ошибка загрузки корпуса: %s", exc, exc_info=True)
 
+    def _refresh_corpus_incrementally(
+        self,
+        now: float,
+        latest_signature: Optional[Tuple[int, int, int]],
+        allowed_extraction_types: Tuple[str, ...],
+    ) -> bool:
+        """
+        Применить к загруженному корпусу только пары, изменённые с прошлой загрузки.
+
+        Изменённые пары (по ``gk_qa_pairs.updated_at`` с окном перекрытия
+        ``GK_BM25_INCREMENTAL_OVERLAP_SECONDS``) добавляются, заменяются
+        или удаляются из корпуса; пары, уже применённые с тем же updated_at,
+        пропускаются. Токенизируются и обогащаются только изменения.
+        Document frequency и spellcheck-словарь обновляются по дельте,
+        BM25-индекс — через delta-слой ``SparseBM25Index.with_changes``.
+
+        Returns:
+            True, если корпус обновлён; False — требуется полная перезагрузка
+            (нет watermark/сигнатуры, ошибка выборки или число пар после
+            обновления не совпало с сигнатурой, например после удаления группы).
+        """
+        if latest_signature is None or self._corpus_watermark is None:
+            return False
+
+        started_at = time.time()
+        changes = gk_db.get_qa_pairs_updated_since(
+            self._corpus_watermark,
+            overlap_seconds=ai_settings.GK_BM25_INCREMENTAL_OVERLAP_SECONDS,
+        )
+        if changes is None:
+            return False
+        changed_pairs, updated_at_by_id, watermark = changes
+
+        applied_updates = self._corpus_applied_updates
+        latest_by_id: Dict[int, QAPair] = {
+            int(pair.id): pair
+            for pair in changed_pairs
+            if pair.id is not None
+            and (
+                int(pair.id) not in applied_updates
+                or applied_updates[int(pair.id)] != updated_at_by_id.get(int(pair.id))
+            )
+        }
+        upserts = [
+            pair for pair in latest_by_id.values()
+            if self._is_corpus_pair(pair, allowed_extraction_types)
+        ]
+        upsert_tokens = self._tokenize_corpus_pairs(upserts)
+
+        corpus = self._corpus
+        pairs = list(corpus.pairs)
+        corpus_tokens = list(corpus.tokens)
+        positions = dict(corpus.position_by_id)
+        doc_freq = Counter(corpus.doc_freq) if corpus.doc_freq is not None else Counter()
+        if corpus.doc_freq is None:
+            for tokens in corpus_tokens:
+                doc_freq.update(set(tokens))
+        removed_pairs: List[QAPair] = []
+        replaced_tokens: Dict[int, List[str]] = {}
+        appended_tokens: List[List[str]] = []
+
+        for pair, pair_tokens in zip(upserts, upsert_tokens):
+            position = positions.get(int(pair.id))
+            if position is None:
+                positions[int(pair.id)] = len(pairs)
+                pairs.append(pair)
+                corpus_tokens.append(pair_tokens)
+                appended_tokens.append(pair_tokens)
+            else:
+                removed_pairs.append(pairs[position])
+                doc_freq.subtract(set(corpus_tokens[position]))
+                pairs[position] = pair
+                corpus_tokens[position] = pair_tokens
+                replaced_tokens[position] = pair_tokens
+            doc_freq.update(set(pair_tokens))
+
+        drop_positions = {
+            positions[pair_id]
+            for pair_id, pair in latest_by_id.items()
+            if pair_id in positions and not self._is_corpus_pair(pair, allowed_extraction_types)
+        }
+        if drop_positions:
+            for position in drop_positions:
+                removed_pairs.append(pairs[position])
+                doc_freq.subtract(set(corpus_tokens[position]))
+            pairs = [pair for position, pair in enumerate(pairs) if position not in drop_positions]
+            corpus_tokens = [
+                tokens for position, tokens in enumerate(corpus_tokens) if position not in drop_positions
+            ]
+
+        if len(pairs) != int(latest_signature[0]):
+            logger.info(
+                "GK BM25: инкрементальное обновление не совпало с сигнатурой (pairs=%d expected=%d), "
+                "выполняется полная перезагрузка",
+                len(pairs),
+                latest_signature[0],
+            )
+            return False
+
+        if upserts or drop_positions:
+            version = next(_CORPUS_VERSIONS)
+            bm25_index = self._apply_bm25_changes(
+                corpus,
+                replaced=replaced_tokens,
+                deleted=drop_positions,
+                appended=appended_tokens,
+                version=version,
+            )
+            self._set_corpus(pairs, corpus_tokens, doc_freq=+doc_freq, bm25_index=bm25_index, version=version)
+        self._corpus_watermark = watermark
+        self._corpus_applied_updates = updated_at_by_id
+        self._corpus_loaded_at = now
+        self._corpus_signature = latest_signature
+
+        if ai_settings.GK_SPELLCHECK_ENABLED and (upserts or removed_pairs):
+            if self._spellcheck_vocab_ready:
+                self._patch_spellcheck_vocabulary(removed_pairs=removed_pairs, added_pairs=upserts)
+            else:
+                self._build_spellcheck_vocabulary()
+
+        logger.info(
+            "GK BM25: корпус обновлён инкрементально — changed=%d upserted=%d removed=%d total=%d "
+            "signature=%s duration_ms=%d",
+            len(latest_by_id),
+            len(upserts),
+            len(drop_positions),
+            len(pairs),
+            latest_signature,
+            int((time.time() - started_at) * 1000),
+        )
+        return True
+
+    def _apply_bm25_changes(
+        self,
+        corpus: _CorpusSnapshot,
+        replaced: Dict[int, List[str]],
+        deleted: Iterable[int],
+        appended: List[List[str]],
+        version: int,
+    ) -> Optional[SparseBM25Index]:
+        """
+        Применить изменения корпуса к BM25-индексу снимка через delta-слой.
+
+        Returns:
+            Новый индекс или None, если индекс нужно пересобрать целиком
+            (индекс построен для другого корпуса/k1/b либо delta-слой
+            превысил ``_BM25_DELTA_COMPACTION_RATIO`` от размера корпуса).
+        """
+        deleted = list(deleted)
+        index = corpus.bm25_index
+        k1, b = self._bm25_params()
+        if index is None or not index.matches(corpus.version, k1, b):
+            return None
+        pending = index.pending_changes + len(replaced) + len(deleted) + len(appended)
+        if pending > _BM25_DELTA_COMPACTION_RATIO * max(index.size, 1):
+            logger.info(
+                "GK BM25: delta-слой индекса превысил порог (pending=%d size=%d), индекс пересобирается",
+                pending,
+                index.size,
+            )
+            return None
+        return index.with_changes(replaced, deleted, appended, signature=version)
+
+    @staticmethod
+    def _is_corpus_pair(pair: QAPair, allowed_extraction_types: Tuple[str, ...]) -> bool:
+        """Проверить, входит ли пара в BM25-корпус (те же условия, что в get_all_approved_qa_pairs)."""
+        if int(pair.approved or 0) != 1 or pair.expert_status == "rejected":
+            return False
+        return not allowed_extraction_types or pair.extraction_type in allowed_extraction_types
+
+    def _tokenize_corpus_pairs(self, pairs: List[QAPair]) -> List[List[str]]:
+        """Токенизировать пары для BM25-корпуса (вопрос с image-gist + ответ)."""
+        if not pairs:
+            return []
+
+        question_message_ids = [
+            int(pair.question_message_id)
+            for pair in pairs
+            if pair.question_message_id is not None
+        ]
+        question_messages_by_id: Dict[int, Any] = {}
+        if question_message_ids:
+            question_messages_by_id = gk_db.get_messages_by_ids(question_message_ids)
+
+        corpus_tokens = []
+        for pair in pairs:
+            source_message = None
+            if pair.question_message_id is not None:
+                source_message = question_messages_by_id.get(int(pair.question_message_id))
+            rag_question_text = enrich_question_for_rag(
+                question_text=pair.question_text,
+                source_message=source_message,
+                enabled=ai_settings.GK_RAG_IMAGE_GIST_ENABLED,
+            )
+            if not rag_question_text:
+                rag_question_text = (pair.question_text or "").strip()
+
+            text = f"{rag_question_text} {pair.answer_text}"
+            corpus_tokens.append(self._tokenize(text))
+        return corpus_tokens
+
+    def _set_corpus(
+        self,
+        pairs: List[QAPair],
+        corpus_tokens: List[List[str]],
+        doc_freq: Optional[Counter] = None,
+        bm25_index: Optional[SparseBM25Index] = None,
+        version: Optional[int] = None,
+    ) -> None:
+        """
+        Установить корпус вместе с производными структурами (позиции, DF, BM25-индекс).
+
+        ``bm25_index`` — уже обновлённый по дельте индекс этого корпуса
+        (с сигнатурой ``version``); без него индекс строится заново.
+        """
+        if doc_freq is None:
+            doc_freq = Counter()
+            for tokens in corpus_tokens:
+                doc_freq.update(set(tokens))
+
+        # Производные структуры строятся до публикации снимка, чтобы параллельные
+        # поиски в retrieval executor видели корпус целиком старым или новым.
+        position_by_id = {
+            int(pair.id): position for position, pair in enumerate(pairs) if pair.id is not None
+        }
+        if version is None:
+            version = next(_CORPUS_VERSIONS)
+        k1, b = self._bm25_params()
+        if bm25_index is None or not bm25_index.matches(version, k1, b):
+            bm25_index = SparseBM25Index(corpus_tokens, k1=k1, b=b, signature=version)
+        self._corpus = _CorpusSnapshot(
+            pairs=pairs,
+            tokens=corpus_tokens,
+            position_by_id=position_by_id,
+            doc_freq=doc_freq,
+            bm25_index=bm25_index,
+            version=version,
+        )
+
     def invalidate_corpus_cache(self) -> None:
         """Инвалидировать кэш корпуса (вызывается после добавления новых пар)."""
         self._corpus_loaded_at = 0.0
-        self._corpus_pairs = []
-        self._corpus_tokens = []
+        self._corpus = _EMPTY_CORPUS
+        self._corpus_watermark = None
+        self._corpus_applied_updates = {}
         self._corpus_signature = None
         self._corpus_extraction_types = None
         # Сбросить spellcheck vocabulary — перестроится при следующей загрузке корпуса
@@ -1055,17 +1354,55 @@ class QASearchService:
         except ImportError:
             return None, None
 
-        if self._vector_embedding_provider is None:
-            self._vector_embedding_provider = LocalEmbeddingProvider()
+        with self._vector_resources_lock:
+            if self._vector_embedding_provider is None:
+                self._vector_embedding_provider = LocalEmbeddingProvider()
 
-        if (
-            self._vector_index is None
-            or self._vector_collection_name != collection_name
-        ):
-            self._vector_index = LocalVectorIndex(chunk_collection_name=collection_name)
-            self._vector_collection_name = collection_name
+            if (
+                self._vector_index is None
+                or self._vector_collection_name != collection_name
+            ):
+                self._vector_index = LocalVectorIndex(chunk_collection_name=collection_name)
+                self._vector_collection_name = collection_name
+
+            return self._vector_embedding_provider, self._vector_index
 
-        return self._vector_embedding_provider, self._vector_index
+    def _hydrate_qa_pairs(self, pair_ids: Iterable[int]) -> Dict[int, QAPair]:
+        """
+        Поднять Q&A-пары по ID: сначала из загруженного BM25-корпуса, остальные — одним запросом.
+
+        Args:
+            pair_ids: Идентификаторы пар (например, document_id кандидатов Qdrant).
+
+        Returns:
+            Словарь {pair_id: QAPair} для найденных пар.
+        """
+        corpus = self._corpus
+        corpus_pairs = corpus.pairs
+        position_by_id = corpus.position_by_id
+
+        pairs_by_id: Dict[int, QAPair] = {}
+        missing_ids: List[int] = []
+        for pair_id in pair_ids:
+            if not pair_id or pair_id in pairs_by_id:
+                continue
+            position = position_by_id.get(pair_id)
+            if position is not None and position < len(corpus_pairs) and corpus_pairs[position].id == pair_id:
+                pairs_by_id[pair_id] = corpus_pairs[position]
+            else:
+                missing_ids.append(pair_id)
+
+        from_corpus = len(pairs_by_id)
+        if missing_ids:
+            pairs_by_id.update(gk_db.get_qa_pairs_by_ids(missing_ids))
+
+        logger.debug(
+            "GK Vector: гидратация пар — from_corpus=%d from_db=%d missing=%d",
+            from_corpus,
+            len(pairs_by_id) - from_corpus,
+            len(missing_ids) - (len(pairs_by_id) - from_corpus),
+        )
+        return pairs_by_id
 
     async def _vector_search(
         self,
@@ -1075,6 +1412,9 @@ class QASearchService:
         """
         Выполнить векторный поиск по Q&A парам через Qdrant.
 
+        Эмбеддинг, запрос к Qdrant и гидратация пар выполняются
+        в retrieval executor, не блокируя event loop.
+
         Args:
             query: Текст запроса.
             top_k: Число результатов.
@@ -1082,6 +1422,14 @@ class QASearchService:
         Returns:
             Список кортежей (QAPair, cosine_score).
         """
+        return await run_retrieval_io(self._vector_search_sync, query, top_k)
+
+    def _vector_search_sync(
+        self,
+        query: str,
+        top_k: int,
+    ) -> List[Tuple[QAPair, float]]:
+        """Синхронная часть векторного поиска (см. ``_vector_search``)."""
         try:
             embedding_provider, vector_index = self._ensure_vector_resources()
             if embedding_provider is None or vector_index is None:
@@ -1089,7 +1437,7 @@ class QASearchService:
                 return []
 
             # Генерировать эмбеддинг запроса
-            query_embedding = embedding_provider.encode(query)
+            query_embedding = encode_off_loop(embedding_provider, query)
             if not query_embedding:
                 logger.warning("GK Vector: не удалось получить эмбеддинг для запроса")
                 return []
@@ -1104,12 +1452,15 @@ class QASearchService:
             allowed_extraction_types = set(self._get_allowed_extraction_types())
             skipped_by_extraction_type = 0
             skipped_by_expert_rejected = 0
+            pairs_by_id = self._hydrate_qa_pairs(
+                int(getattr(hit, "document_id", 0) or 0) for hit in hits
+            )
             for hit in hits:
                 pair_id = getattr(hit, "document_id", 0)
                 if not pair_id:
                     continue
 
-                pair = gk_db.get_qa_pair_by_id(int(pair_id))
+                pair = pairs_by_id.get(int(pair_id))
                 if not pair:
                     continue
                 if pair.extraction_type not in allowed_extraction_types:
@@ -1409,12 +1760,7 @@ class QASearchService:
             token_freq: Counter = Counter()
 
             for pair in self._corpus_pairs:
-                text = f"{pair.question_text or ''} {pair.answer_text or ''}"
-                prepared_text = self._prepare_text_for_fixed_terms(text)
-                raw_tokens = [_canonical_fixed_token(token, self._fixed_tokens, self._fixed_term_token_map) for token in _TOKEN_RE.findall(prepared_text)]
-                for t in raw_tokens:
-                    if len(t) >= 2:
-                        token_freq[t] += 1
+                token_freq.update(self._spellcheck_pair_token_counts(pair))
 
             # Добавить защищённые термины с высокой частотой
             protected_freq = (
@@ -1451,6 +1797,70 @@ class QASearchService:
             logger.exception("GK Spellcheck: не удалось построить словарь")
             return False
 
+    def _spellcheck_pair_token_counts(self, pair: QAPair) -> Counter:
+        """Частоты токенов Q&A-пары для spellcheck vocabulary."""
+        text = f"{pair.question_text or ''} {pair.answer_text or ''}"
+        prepared_text = self._prepare_text_for_fixed_terms(text)
+        token_counts: Counter = Counter()
+        for token in _TOKEN_RE.findall(prepared_text):
+            canonical = _canonical_fixed_token(token, self._fixed_tokens, self._fixed_term_token_map)
+            if len(canonical) >= 2:
+                token_counts[canonical] += 1
+        return token_counts
+
+    def _patch_spellcheck_vocabulary(
+        self,
+        removed_pairs: List[QAPair],
+        added_pairs: List[QAPair],
+    ) -> None:
+        """
+        Обновить spellcheck vocabulary по дельте корпуса без полной перестройки.
+
+        Частоты защищённых терминов не меняются: они зафиксированы
+        при построении словаря. Дельта применяется к текущему словарю на месте
+        под ``_spellcheck_lock`` — той же блокировкой, под которой поиски
+        в retrieval executor выполняют lookup, поэтому они не видят словарь
+        в промежуточном состоянии.
+        """
+        sym = self._spellcheck_sym
+        if sym is None:
+            return
+
+        delta: Counter = Counter()
+        for pair in added_pairs:
+            delta.update(self._spellcheck_pair_token_counts(pair))
+        for pair in removed_pairs:
+            delta.subtract(self._spellcheck_pair_token_counts(pair))
+
+        token_freq = dict(self._spellcheck_token_freq)
+        try:
+            with self._spellcheck_lock:
+                for token, change in delta.items():
+                    if change == 0 or token in self._fixed_tokens:
+                        continue
+                    new_freq = token_freq.get(token, 0) + change
+                    if change > 0:
+                        sym.create_dictionary_entry(token, change)
+                    else:
+                        # SymSpell умеет только увеличивать частоту: уменьшение — через пересоздание записи.
+                        sym.delete_dictionary_entry(token)
+                        if new_freq > 0:
+                            sym.create_dictionary_entry(token, new_freq)
+                    if new_freq > 0:
+                        token_freq[token] = new_freq
+                    else:
+                        token_freq.pop(token, None)
+                self._spellcheck_token_freq = token_freq
+                self._spellcheck_vocab_size = len(token_freq)
+        except Exception:
+            logger.exception("GK Spellcheck: не удалось обновить словарь инкрементально, перестройка")
+            self._build_spellcheck_vocabulary()
+
+    def _spellcheck_lookup(self, sym: object, token: str, verbosity: object, max_edit_distance: int) -> List[Any]:
+        """Выполнить SymSpell lookup под блокировкой инкрементального обновления словаря."""
+        with self._spellcheck_lock:
+            return sym.lookup(token, verbosity, max_edit_distance=max_edit_distance)
+
     def _spellcheck_tokens(
         self,
         tokens: List[str],
@@ -1466,7 +1876,9 @@ class QASearchService:
         Returns:
             Кортеж (исправленные токены, список изменений [(original, corrected)]).
         """
-        if not self._spellcheck_vocab_ready or self._spellcheck_sym is None:
+        # Словарь может быть подменён параллельным обновлением корпуса — читаем ссылку один раз
+        sym = self._spellcheck_sym
+        if not self._spellcheck_vocab_ready or sym is None:
             return tokens, []
 
         if _SymSpellVerbosity is None:
@@ -1499,7 +1911,8 @@ class QASearchService:
 
             # Ищем коррекцию через SymSpell
             try:
-                suggestions = self._spellcheck_sym.lookup(
+                suggestions = self._spellcheck_lookup(
+                    sym,
                     canonical_token,
                     _SymSpellVerbosity.CLOSEST,
                     max_edit_distance=max_edit,
@@ -1517,7 +1930,8 @@ class QASearchService:
                     token_freq = int(getattr(self, "_spellcheck_token_freq", {}).get(canonical_token, 0) or 0)
                     if token_freq <= exact_match_rare_freq_threshold:
                         try:
-                            all_suggestions = self._spellcheck_sym.lookup(
+                            all_suggestions = self._spellcheck_lookup(
+                                sym,
                                 canonical_token,
                                 _SymSpellVerbosity.ALL,
                                 max_edit_distance=max_edit,
@@ -1579,7 +1993,8 @@ class QASearchService:
         Returns:
             (suspicious_uncorrected_count, total_suspicious_count)
         """
-        if not self._spellcheck_vocab_ready or self._spellcheck_sym is None:
+        sym = self._spellcheck_sym
+        if not self._spellcheck_vocab_ready or sym is None:
             return 0, 0
 
         min_length = max(2, int(ai_settings.GK_SPELLCHECK_MIN_TOKEN_LENGTH))
@@ -1599,7 +2014,8 @@ class QASearchService:
 
             # Проверяем, есть ли токен в словаре
             try:
-                suggestions = self._spellcheck_sym.lookup(
+                suggestions = self._spellcheck_lookup(
+                    sym,
                     canonical_token,
                     _SymSpellVerbosity.CLOSEST,
                     max_edit_distance=0,
@@ -1677,17 +2093,15 @@ class QASearchService:
         cache_key = query.strip().lower()
 
         # Проверка кэша
-        now = time.time()
         cached = self._spellcheck_llm_cache.get(cache_key)
         if cached is not None:
-            cached_text, cached_changes, expires_at = cached
-            if expires_at > now:
-                logger.info(
-                    "GK Spellcheck LLM cache hit: query='%.60s' changes=%d",
-                    query,
-                    len(cached_changes),
-                )
-                return cached_text, cached_changes
+            cached_text, cached_changes = cached
+            logger.info(
+                "GK Spellcheck LLM cache hit: query='%.60s' changes=%d",
+                query,
+                len(cached_changes),
+            )
+            return cached_text, cached_changes
 
         # LLM вызов
         try:
@@ -1741,16 +2155,7 @@ class QASearchService:
 
             # Кэширование
             ttl = max(30, int(ai_settings.GK_SPELLCHECK_LLM_CACHE_TTL_SECONDS))
-            self._spellcheck_llm_cache[cache_key] = (corrected, changes, now + ttl)
-
-            # Очистка просроченных записей (до 10 за вызов)
-            expired_keys = [
-                k
-                for k, (_, _, exp) in list(self._spellcheck_llm_cache.items())[:50]
-                if exp <= now
-            ]
-            for k in expired_keys[:10]:
-                self._spellcheck_llm_cache.pop(k, None)
+            self._spellcheck_llm_cache.put(cache_key, (corrected, changes), ttl_seconds=ttl)
 
             logger.info(
                 "GK Spellcheck LLM corrected: query='%.60s' corrected='%.60s' changes=%d",
@@ -1993,7 +2398,7 @@ class QASearchService:
             return cached
 
         if not _CYRILLIC_TOKEN_RE.search(safe_token):
-            self._normalized_token_cache[safe_token] = safe_token
+            self._normalized_token_cache.put(safe_token, safe_token)
             return safe_token
 
         # Лемматизация → стемминг
@@ -2001,7 +2406,7 @@ class QASearchService:
         normalized = self._stem_ru_token(normalized)
         normalized = normalized or safe_token
 
-        self._normalized_token_cache[safe_token] = normalized
+        self._normalized_token_cache.put(safe_token, normalized)
         return normalized
 
     def _lemmatize_ru_token(self, token: str) -> str:
@@ -2067,8 +2472,13 @@ class QASearchService:
         query_tokens: List[str],
         corpus_tokens: List[List[str]],
         return_diagnostics: bool = False,
+        doc_freq: Optional[Mapping[str, int]] = None,
     ) -> List[str] | Tuple[List[str], Dict[str, object]]:
-        """Подавить common-токены запроса с высокой DF в BM25-корпусе GK."""
+        """Подавить common-токены запроса с высокой DF в BM25-корпусе GK.
+
+        Если передан ``doc_freq`` (предвычисленная DF корпуса), DF токенов
+        берётся из него без сканирования ``corpus_tokens``.
+        """
         def _result(
             tokens: List[str],
             *,
@@ -2146,13 +2556,15 @@ class QASearchService:
             )
 
         unique_query_tokens = set(query_tokens)
-        doc_freq: Dict[str, int] = {}
+        query_doc_freq: Dict[str, int] = {}
         for token in unique_query_tokens:
-            count = sum(1 for doc_tokens in corpus_tokens if token in doc_tokens)
-            doc_freq[token] = count
+            if doc_freq is not None:
+                query_doc_freq[token] = int(doc_freq.get(token, 0))
+            else:
+                query_doc_freq[token] = sum(1 for doc_tokens in corpus_tokens if token in doc_tokens)
 
         threshold = dampen_ratio * doc_count
-        common_tokens = {token for token, df in doc_freq.items() if df > threshold}
+        common_tokens = {token for token, df in query_doc_freq.items() if df > threshold}
 
         if not common_tokens:
             return _result(
@@ -2254,67 +2666,41 @@ class QASearchService:
         )
 
     @staticmethod
-    def _score_corpus_bm25(
-        corpus_tokens: List[List[str]],
+    def _bm25_params() -> Tuple[float, float]:
+        """Параметры BM25 (k1, b) Group Knowledge из настроек."""
+        return (
+            max(0.01, float(ai_settings.GK_BM25_K1)),
+            max(0.0, min(1.0, float(ai_settings.GK_BM25_B))),
+        )
+
+    @classmethod
+    def _rank_corpus_bm25(
+        cls,
+        corpus: _CorpusSnapshot,
         query_tokens: List[str],
-    ) -> List[float]:
+        top_k: int,
+    ) -> List[Tuple[int, float]]:
         """
-        Вычислить BM25-score для корпуса документов по токенам запроса.
+        Вернуть top-k документов корпуса по BM25 (формула ``rank_bm25.BM25Okapi``).
 
-        Использует rank_bm25.BM25Okapi, если доступен, иначе ручную реализацию.
+        Использует BM25-индекс снимка, если он построен для этой публикации
+        корпуса и текущих k1/b; иначе строит индекс на лету.
 
         Args:
-            corpus_tokens: Токенизированные документы корпуса.
+            corpus: Снимок корпуса.
             query_tokens: Токенизированный запрос.
+            top_k: Число результатов.
 
         Returns:
-            Список BM25-score для каждого документа корпуса.
+            Список (позиция в корпусе, score) с положительным score по убыванию.
         """
-        if not corpus_tokens or not query_tokens:
-            return [0.0 for _ in corpus_tokens]
-
-        safe_corpus = [tokens if tokens else [""] for tokens in corpus_tokens]
-        k1 = max(0.01, float(ai_settings.GK_BM25_K1))
-        b = max(0.0, min(1.0, float(ai_settings.GK_BM25_B)))
-
-        if BM25Okapi is not None:
-            try:
-                bm25 = BM25Okapi(safe_corpus, k1=k1, b=b)
-                return [max(0.0, float(score)) for score in bm25.get_scores(query_tokens)]
-            except Exception:
-                pass
-
-        # Ручная fallback-реализация BM25
-        doc_count = len(safe_corpus)
-        avg_doc_len = sum(len(dt) for dt in safe_corpus) / max(doc_count, 1)
-
-        doc_freq: Dict[str, int] = {}
-        term_freq_by_doc: List[Counter] = []
-        for doc_tokens in safe_corpus:
-            tf = Counter(doc_tokens)
-            term_freq_by_doc.append(tf)
-            for t in tf.keys():
-                doc_freq[t] = doc_freq.get(t, 0) + 1
-
-        query_tf = Counter(query_tokens)
-        scores: List[float] = [0.0 for _ in safe_corpus]
-
-        for token, qf in query_tf.items():
-            df = doc_freq.get(token, 0)
-            if df <= 0:
-                continue
-            idf = math.log(1.0 + ((doc_count - df + 0.5) / (df + 0.5)))
-            for idx, tf in enumerate(term_freq_by_doc):
-                freq = tf.get(token, 0)
-                if freq <= 0:
-                    continue
-                doc_len = len(safe_corpus[idx])
-                denominator = freq + (k1 * (1.0 - b + (b * doc_len / max(avg_doc_len, 1e-9))))
-                if denominator <= 0:
-                    continue
-                scores[idx] += idf * ((freq * (k1 + 1.0)) / denominator) * qf
-
-        return [max(0.0, float(s)) for s in scores]
+        if not corpus.tokens or not query_tokens or top_k <= 0:
+            return []
+        k1, b = cls._bm25_params()
+        index = corpus.bm25_index
+        if index is None or not index.matches(corpus.version, k1, b):
+            index = SparseBM25Index(corpus.tokens, k1=k1, b=b, signature=corpus.version)
+        return index.top_k(query_tokens, top_k)
 
     # -----------------------------------------------------------------------
     # Вспомогательные методы
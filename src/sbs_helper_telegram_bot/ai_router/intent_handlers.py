@@ -99,8 +99,10 @@ class UposErrorHandler(IntentHandler):
             get_error_code_by_code,
             record_error_request,
             record_unknown_code,
+            suggest_error_codes,
         )
         from src.sbs_helper_telegram_bot.upos_error.messages import (
+            format_did_you_mean,
             format_error_code_response,
         )
 
@@ -126,17 +128,19 @@ class UposErrorHandler(IntentHandler):
         else:
             record_error_request(user_id, error_code, found=False)
             record_unknown_code(error_code)
+            suggestions = suggest_error_codes(error_code)
             escaped_code = escape_markdown_v2(error_code)
             not_found_response = (
                 f"❌ Код ошибки `{escaped_code}` не найден в базе\\.\n\n"
                 "Попробуйте другой код или обратитесь к разделу "
                 "🔢 *UPOS Ошибки* в меню\\."
-            )
+            ) + format_did_you_mean(suggestions)
             return HandlerExecutionResult(
                 response=not_found_response,
                 meta={
                     "upos_not_found": True,
                     "error_code": error_code,
+                    "suggestions": suggestions,
                 },
             )
 
@@ -212,8 +216,10 @@ class KtrHandler(IntentHandler):
         from src.sbs_helper_telegram_bot.ktr.ktr_bot_part import (
             get_ktr_code_by_code,
             record_ktr_request,
+            suggest_ktr_codes,
         )
         from src.sbs_helper_telegram_bot.ktr.messages import (
+            format_did_you_mean,
             format_ktr_code_response,
         )
 
@@ -243,7 +249,7 @@ class KtrHandler(IntentHandler):
                 f"❌ Код КТР `{escaped}` не найден в базе\\.\n\n"
                 "Попробуйте другой код или обратитесь к разделу "
                 "⏱️ *КТР* в меню\\."
-            )
+            ) + format_did_you_mean(suggest_ktr_codes(ktr_code))
 
 
 # =============================================
@@ -5,19 +5,20 @@ intent_router.py — маршрутизатор намерений AI.
 классификацию через LLM-провайдер, проверку модулей и вызов обработчиков.
 """
 
-import asyncio
 import logging
 import re
 import time
+from datetime import datetime
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import src.common.bot_settings as bot_settings
-import src.common.database as database
 
 from config import ai_settings
 from src.sbs_helper_telegram_bot.ai_router.settings import AI_MODULE_KEY
 from src.core.ai.circuit_breaker import CircuitBreaker
 from src.core.ai.context_manager import ConversationContextManager
+from src.core.ai.db_log_sink import submit_db_log
+from src.core.ai.intent_preclassifier import CENTROID_EXPLAIN_CODE, IntentPreclassifier
 from src.sbs_helper_telegram_bot.ai_router.intent_handlers import (
     HandlerExecutionResult,
     IntentHandler,
@@ -30,6 +31,7 @@ from src.core.ai.llm_provider import (
     get_provider,
 )
 from src.sbs_helper_telegram_bot.ai_router.messages import (
+    AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL,
     AI_PROGRESS_STAGE_UPOS_NOT_FOUND_FALLBACK_STARTED,
     MESSAGE_AI_UNAVAILABLE,
     MESSAGE_AI_LOW_CONFIDENCE,
@@ -72,6 +74,7 @@ class IntentRouter:
         rate_limiter: Optional[AIRateLimiter] = None,
         circuit_breaker: Optional[CircuitBreaker] = None,
         context_manager: Optional[ConversationContextManager] = None,
+        preclassifier: Optional[IntentPreclassifier] = None,
     ):
         """
         Инициализация маршрутизатора.
@@ -81,11 +84,16 @@ class IntentRouter:
             rate_limiter: Rate-limiter (по умолчанию создаётся из настроек).
             circuit_breaker: Circuit breaker (по умолчанию создаётся из настроек).
             context_manager: Менеджер контекста (по умолчанию создаётся из настроек).
+            preclassifier: Локальный pre-classifier intent (по умолчанию
+                создаётся, если включён ``AI_INTENT_PRECLASSIFIER_ENABLED``).
         """
         self._provider = provider
         self._rate_limiter = rate_limiter or AIRateLimiter()
         self._circuit_breaker = circuit_breaker or CircuitBreaker()
         self._context_manager = context_manager or ConversationContextManager()
+        if preclassifier is None and ai_settings.AI_INTENT_PRECLASSIFIER_ENABLED:
+            preclassifier = IntentPreclassifier()
+        self._preclassifier = preclassifier
 
         # Индексируем обработчики по intent_name
         self._handlers: Dict[str, IntentHandler] = {}
@@ -165,73 +173,97 @@ class IntentRouter:
         # 6. Определяем доступные модули
         enabled_modules = self._get_enabled_routable_modules()
 
-        # 7. Классифицируем через LLM
-        try:
+        # 7. Классифицируем: сначала локальный pre-classifier, затем LLM
+        classification: Optional[ClassificationResult] = None
+        classify_source = "llm"
+        if self._preclassifier is not None:
             classify_started_at = time.monotonic()
-            provider = self._get_provider()
-            provider_name = provider.name
-            classify_model = self._get_model_name(provider, purpose="classification")
-            system_prompt = build_classification_prompt(enabled_modules)
-            classification = await provider.classify(
-                context_messages,
-                system_prompt,
-                user_id=user_id,
-            )
-
-            if self._should_retry_classification(classification):
+            try:
+                classification = await self._preclassifier.classify(
+                    text,
+                    enabled_modules,
+                    context_messages=context_messages[:-1],
+                )
+            except Exception as exc:
                 logger.warning(
-                    "AI classification non-JSON fallback, retry once: "
-                    "user=%s, explain=%s, intent=%s",
+                    "AI pre-classifier failed, fallback to LLM: user=%s, error_type=%s, error_repr=%r",
                     user_id,
-                    classification.explain_code,
-                    classification.intent,
+                    type(exc).__name__,
+                    exc,
                 )
-                retry_classification = await provider.classify(
+            if classification is not None:
+                classify_ms = int((time.monotonic() - classify_started_at) * 1000)
+                classify_source = "fast_path"
+                provider_name = "preclassifier"
+                classify_model = "centroid" if classification.explain_code == CENTROID_EXPLAIN_CODE else "rules"
+
+        if classification is None:
+            try:
+                classify_started_at = time.monotonic()
+                provider = self._get_provider()
+                provider_name = provider.name
+                classify_model = self._get_model_name(provider, purpose="classification")
+                system_prompt = build_classification_prompt(enabled_modules)
+                classification = await provider.classify(
                     context_messages,
                     system_prompt,
                     user_id=user_id,
                 )
-                if self._should_retry_classification(retry_classification):
-                    classification.explain_code = f"{classification.explain_code}_RETRY_FAILED"
+
+                if self._should_retry_classification(classification):
                     logger.warning(
-                        "AI classification retry failed, keep first result: "
-                        "user=%s, first_explain=%s, retry_explain=%s",
-                        user_id,
-                        classification.explain_code,
-                        retry_classification.explain_code,
-                    )
-                else:
-                    retry_classification.explain_code = (
-                        f"{retry_classification.explain_code}_AFTER_RETRY"
-                    )
-                    classification = retry_classification
-                    logger.info(
-                        "AI classification retry succeeded: user=%s, explain=%s, intent=%s",
+                        "AI classification non-JSON fallback, retry once: "
+                        "user=%s, explain=%s, intent=%s",
                         user_id,
                         classification.explain_code,
                         classification.intent,
                     )
+                    retry_classification = await provider.classify(
+                        context_messages,
+                        system_prompt,
+                        user_id=user_id,
+                    )
+                    if self._should_retry_classification(retry_classification):
+                        classification.explain_code = f"{classification.explain_code}_RETRY_FAILED"
+                        logger.warning(
+                            "AI classification retry failed, keep first result: "
+                            "user=%s, first_explain=%s, retry_explain=%s",
+                            user_id,
+                            classification.explain_code,
+                            retry_classification.explain_code,
+                        )
+                    else:
+                        retry_classification.explain_code = (
+                            f"{retry_classification.explain_code}_AFTER_RETRY"
+                        )
+                        classification = retry_classification
+                        logger.info(
+                            "AI classification retry succeeded: user=%s, explain=%s, intent=%s",
+                            user_id,
+                            classification.explain_code,
+                            classification.intent,
+                        )
 
-            classify_ms = int((time.monotonic() - classify_started_at) * 1000)
-            self._circuit_breaker.record_success()
-        except LLMProviderTemporaryError as exc:
-            self._circuit_breaker.record_failure()
-            logger.warning(
-                "AI classification temporary error: user=%s, error_type=%s, error_repr=%r",
-                user_id,
-                type(exc).__name__,
-                exc,
-            )
-            return None, "error"
-        except Exception as exc:
-            self._circuit_breaker.record_failure()
-            logger.exception(
-                "AI classification error: user=%s, error_type=%s, error_repr=%r",
-                user_id,
-                type(exc).__name__,
-                exc,
-            )
-            return None, "error"
+                classify_ms = int((time.monotonic() - classify_started_at) * 1000)
+                self._circuit_breaker.record_success()
+            except LLMProviderTemporaryError as exc:
+                self._circuit_breaker.record_failure()
+                logger.warning(
+                    "AI classification temporary error: user=%s, error_type=%s, error_repr=%r",
+                    user_id,
+                    type(exc).__name__,
+                    exc,
+                )
+                return None, "error"
+            except Exception as exc:
+                self._circuit_breaker.record_failure()
+                logger.exception(
+                    "AI classification error: user=%s, error_type=%s, error_repr=%r",
+                    user_id,
+                    type(exc).__name__,
+                    exc,
+                )
+                return None, "error"
 
         if on_classified is not None:
             try:
@@ -264,10 +296,9 @@ class IntentRouter:
             classify_model,
         )
 
-        # 10. Логируем в БД (в отдельном потоке, чтобы не блокировать event loop)
+        # 10. Логируем в БД (в фоновую очередь, без ожидания INSERT)
         db_log_started_at = time.monotonic()
-        await asyncio.to_thread(
-            self._log_to_db,
+        self._log_to_db(
             user_id=user_id,
             input_text=text[:500],
             classification=classification,
@@ -305,13 +336,14 @@ class IntentRouter:
 
         total_route_ms = int((time.monotonic() - start_time) * 1000)
         logger.info(
-            "AI route profiling: user=%s status=%s total_ms=%d classify_ms=%d "
+            "AI route profiling: user=%s status=%s total_ms=%d classify_ms=%d classify_source=%s "
             "db_log_ms=%d dispatch_ms=%d context_update_ms=%d path=%s "
             "chat_ms=%d handler_ms=%d",
             user_id,
             status,
             total_route_ms,
             classify_ms,
+            classify_source,
             db_log_ms,
             dispatch_ms,
             context_update_ms,
@@ -523,11 +555,12 @@ class IntentRouter:
                 provider = self._get_provider()
                 context_messages = self._context_manager.get_messages(user_id)
                 context_messages.append({"role": "user", "content": original_text})
-                chat_response = await provider.chat(
+                chat_response = await self._generate_chat_response(
+                    provider,
                     context_messages,
-                    build_chat_prompt(),
                     user_id=user_id,
                     purpose="chat",
+                    on_progress=on_progress,
                 )
                 logger.info(
                     "AI chat request: user=%s, provider=%s, model=%s, path=general_chat",
@@ -571,11 +604,12 @@ class IntentRouter:
                 provider = self._get_provider()
                 context_messages = self._context_manager.get_messages(user_id)
                 context_messages.append({"role": "user", "content": original_text})
-                chat_response = await provider.chat(
+                chat_response = await self._generate_chat_response(
+                    provider,
                     context_messages,
-                    build_chat_prompt(),
                     user_id=user_id,
                     purpose="fallback_chat",
+                    on_progress=on_progress,
                 )
                 logger.info(
                     "AI chat request: user=%s, provider=%s, model=%s, path=fallback_chat",
@@ -610,6 +644,53 @@ class IntentRouter:
         dispatch_meta["path"] = "unknown_low_confidence"
         return None, "low_confidence", dispatch_meta
 
+    async def _generate_chat_response(
+        self,
+        provider: LLMProvider,
+        messages: List[Dict[str, str]],
+        user_id: int,
+        purpose: str,
+        on_progress: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> str:
+        """
+        Получить свободный ответ LLM, при наличии ``on_progress`` — потоком.
+
+        Накопленный текст отправляется этапом ``AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL``
+        не чаще ``AI_CHAT_STREAM_UPDATE_INTERVAL_MS``, чтобы плейсхолдер в Telegram
+        показывал ответ до завершения генерации. Пустой поток повторяется
+        обычным ``chat()`` (у него есть fallback reasoner → chat).
+        """
+        if on_progress is None or not ai_settings.AI_CHAT_STREAMING_ENABLED:
+            return await provider.chat(messages, build_chat_prompt(), user_id=user_id, purpose=purpose)
+
+        interval_seconds = ai_settings.AI_CHAT_STREAM_UPDATE_INTERVAL_MS / 1000
+        parts: List[str] = []
+        last_update_at = time.monotonic()
+        async for delta in provider.stream_chat(messages, build_chat_prompt(), user_id=user_id, purpose=purpose):
+            parts.append(delta)
+            now = time.monotonic()
+            if now - last_update_at < interval_seconds:
+                continue
+            last_update_at = now
+            try:
+                await on_progress(
+                    AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL,
+                    {"text": format_ai_chat_response("".join(parts)) + " …"},
+                )
+            except Exception as exc:
+                logger.warning(
+                    "AI chat stream progress callback failed: user=%s, error_type=%s, error_repr=%r",
+                    user_id,
+                    type(exc).__name__,
+                    exc,
+                )
+
+        response = "".join(parts)
+        if response.strip():
+            return response
+        logger.warning("AI chat stream returned empty content, retry without streaming: user=%s", user_id)
+        return await provider.chat(messages, build_chat_prompt(), user_id=user_id, purpose=purpose)
+
     @staticmethod
     def _is_small_talk_message(text: str) -> bool:
         """Определить, является ли сообщение коротким small-talk без запроса по делу."""
@@ -720,29 +801,25 @@ class IntentRouter:
         classification: ClassificationResult,
         elapsed_ms: int,
     ) -> None:
-        """Записать результат маршрутизации в БД для аналитики."""
-        try:
-            with database.get_db_connection() as conn:
-                with database.get_cursor(conn) as cursor:
-                    cursor.execute(
-                        """
-                        INSERT INTO ai_router_log
-                            (user_id, input_text, detected_intent, confidence,
-                             explain_code, response_time_ms, created_at)
-                        VALUES (%s, %s, %s, %s, %s, %s, NOW())
-                        """,
-                        (
-                            user_id,
-                            input_text,
-                            classification.intent,
-                            classification.confidence,
-                            classification.explain_code,
-                            elapsed_ms,
-                        ),
-                    )
-        except Exception as exc:
-            # Не блокируем основной поток при ошибке логирования
-            logger.warning("Ошибка записи в ai_router_log: %s", exc)
+        """Поставить результат маршрутизации в очередь записи в БД для аналитики."""
+        submit_db_log(
+            "ai_router_log",
+            """
+            INSERT INTO ai_router_log
+                (user_id, input_text, detected_intent, confidence,
+                 explain_code, response_time_ms, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                user_id,
+                input_text,
+                classification.intent,
+                classification.confidence,
+                classification.explain_code,
+                elapsed_ms,
+                datetime.now(),
+            ),
+        )
 
 
 # =============================================
@@ -25,6 +25,7 @@ from telegram.ext import (
 )
 
 from config.settings import DEBUG
+from src.common.async_database import run_db
 from src.common.telegram_user import check_if_user_legit, check_if_user_admin
 from src.common.messages import MESSAGE_PLEASE_ENTER_INVITE, get_main_menu_message, get_main_menu_keyboard
 from src.sbs_helper_telegram_bot.gamification.events import emit_event
@@ -107,20 +108,20 @@ def shuffle_question_options(question: dict) -> dict:
 
 async def certification_submenu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Показать подменю аттестации."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return ConversationHandler.END
     
-    if check_if_user_admin(update.effective_user.id):
+    if await run_db(check_if_user_admin, update.effective_user.id):
         keyboard = keyboards.get_admin_submenu_keyboard()
     else:
         keyboard = keyboards.get_submenu_keyboard()
     
     # Получить статистику для подменю
-    stats = logic.get_certification_statistics()
+    stats = await run_db(logic.get_certification_statistics)
     questions_count = int(stats.get('total_questions', 0) or 0)
     categories_count = int(stats.get('active_categories', 0) or 0)
-    cert_summary = logic.get_user_certification_summary(update.effective_user.id)
+    cert_summary = await run_db(logic.get_user_certification_summary, update.effective_user.id)
 
     rank_icon = cert_summary.get('rank_icon', '🌱')
     rank_name = logic.escape_markdown(str(cert_summary.get('rank_name', 'Новичок')))
@@ -162,16 +163,16 @@ async def certification_submenu(update: Update, context: ContextTypes.DEFAULT_TY
 
 async def start_test_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработать кнопку «Начать тест» и показать выбор категории."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return ConversationHandler.END
     
     # Отменить все текущие попытки
-    logic.cancel_user_attempts(update.effective_user.id)
+    await run_db(logic.cancel_user_attempts, update.effective_user.id)
     clear_learning_context(context)
     
     # Проверить наличие вопросов
-    questions_count = logic.get_questions_count()
+    questions_count = await run_db(logic.get_questions_count)
     if questions_count == 0:
         await update.message.reply_text(
             messages.MESSAGE_NO_QUESTIONS,
@@ -180,10 +181,10 @@ async def start_test_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return ConversationHandler.END
     
     # Получить настройки теста
-    test_settings = logic.get_test_settings()
+    test_settings = await run_db(logic.get_test_settings)
     
     # Получить активные категории
-    categories = logic.get_all_categories(active_only=True)
+    categories = await run_db(logic.get_all_categories, active_only=True)
     
     # Показать вступление к тесту и выбор категории
     intro_text = messages.MESSAGE_TEST_INTRO.format(
@@ -203,17 +204,17 @@ async def start_test_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def start_learning_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработать кнопку «Режим обучения» и показать выбор сложности."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return ConversationHandler.END
 
     # Отменить все текущие попытки
-    logic.cancel_user_attempts(update.effective_user.id)
+    await run_db(logic.cancel_user_attempts, update.effective_user.id)
     clear_test_context(context)
     clear_learning_context(context)
 
     # Проверить наличие вопросов
-    questions_count = logic.get_questions_count()
+    questions_count = await run_db(logic.get_questions_count)
     if questions_count == 0:
         await update.message.reply_text(
             messages.MESSAGE_NO_QUESTIONS,
@@ -255,8 +256,8 @@ async def handle_learning_difficulty_selection(update: Update, context: ContextT
     context.user_data[settings.LEARNING_SELECTED_DIFFICULTY_KEY] = difficulty
 
     # Получить настройки теста (количество вопросов)
-    test_settings = logic.get_test_settings()
-    categories = logic.get_all_categories(active_only=True)
+    test_settings = await run_db(logic.get_test_settings)
+    categories = await run_db(logic.get_all_categories, active_only=True)
 
     intro_text = messages.MESSAGE_LEARNING_INTRO.format(
         questions_count=test_settings['questions_count']
@@ -294,14 +295,14 @@ async def handle_category_selection(update: Update, context: ContextTypes.DEFAUL
         return SELECTING_CATEGORY
     
     # Получить настройки теста
-    test_settings = logic.get_test_settings()
+    test_settings = await run_db(logic.get_test_settings)
     questions_count = test_settings['questions_count']
     time_limit_minutes = test_settings['time_limit_minutes']
     time_limit_seconds = time_limit_minutes * 60
     passing_score = test_settings['passing_score_percent']
     
     # Получить вопросы с целевым балансом сложности 33/33/33
-    question_set = logic.build_fair_test_questions(questions_count, category_id)
+    question_set = await run_db(logic.build_fair_test_questions, questions_count, category_id)
     questions = question_set.get('questions', [])
     
     if not questions:
@@ -312,7 +313,8 @@ async def handle_category_selection(update: Update, context: ContextTypes.DEFAUL
         return ConversationHandler.END
     
     # Создать попытку теста
-    attempt_id = logic.create_test_attempt(
+    attempt_id = await run_db(
+        logic.create_test_attempt,
         userid=update.effective_user.id,
         total_questions=len(questions),
         time_limit_seconds=time_limit_seconds,
@@ -345,7 +347,7 @@ async def handle_category_selection(update: Update, context: ContextTypes.DEFAUL
         ),
     ]
 
-    is_admin_debug = check_if_user_admin(update.effective_user.id) and DEBUG
+    is_admin_debug = await run_db(check_if_user_admin, update.effective_user.id) and DEBUG
     if is_admin_debug:
         target_distribution = question_set.get('target_distribution', {})
         actual_distribution = question_set.get('actual_distribution', {})
@@ -398,11 +400,12 @@ async def handle_learning_category_selection(update: Update, context: ContextTyp
     else:
         return SELECTING_LEARNING_CATEGORY
 
-    test_settings = logic.get_test_settings()
+    test_settings = await run_db(logic.get_test_settings)
     questions_count = test_settings['questions_count']
 
     difficulty = context.user_data.get(settings.LEARNING_SELECTED_DIFFICULTY_KEY)
-    questions = logic.get_random_questions(
+    questions = await run_db(
+        logic.get_random_questions,
         questions_count,
         category_id,
         difficulty=difficulty
@@ -450,7 +453,7 @@ async def send_question(
         return
     
     # Проверить время
-    attempt = logic.get_attempt_by_id(attempt_id)
+    attempt = await run_db(logic.get_attempt_by_id, attempt_id)
     if attempt:
         elapsed = time.time() - start_time
         remaining = attempt['time_limit_seconds'] - int(elapsed)
@@ -569,7 +572,7 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         # Отменить тест
         attempt_id = context.user_data.get(settings.CURRENT_ATTEMPT_ID_KEY)
         if attempt_id:
-            logic.complete_test_attempt(attempt_id, status='cancelled')
+            await run_db(logic.complete_test_attempt, attempt_id, status='cancelled')
         
         # Очистить контекст
         clear_test_context(context)
@@ -589,7 +592,7 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     # Сначала проверить время
     start_time = context.user_data.get(settings.TEST_START_TIME_KEY, time.time())
     attempt_id = context.user_data.get(settings.CURRENT_ATTEMPT_ID_KEY)
-    attempt = logic.get_attempt_by_id(attempt_id)
+    attempt = await run_db(logic.get_attempt_by_id, attempt_id)
     
     if attempt:
         elapsed = time.time() - start_time
@@ -622,7 +625,8 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
             break
     
     # Сохранить ответ (исходную букву для согласованности)
-    logic.save_answer(
+    await run_db(
+        logic.save_answer,
         attempt_id=attempt_id,
         question_id=question['id'],
         question_order=current_index + 1,
@@ -631,7 +635,7 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     )
     
     # Нужно ли показывать правильный ответ
-    test_settings = logic.get_test_settings()
+    test_settings = await run_db(logic.get_test_settings)
     show_correct = test_settings.get('show_correct_answer', True)
     
     # Перейти к следующему вопросу
@@ -765,7 +769,8 @@ async def handle_learning_answer(update: Update, context: ContextTypes.DEFAULT_T
             context.user_data.get(settings.LEARNING_CORRECT_COUNT_KEY, 0) + 1
         )
 
-    emit_event(
+    await run_db(
+        emit_event,
         "certification.learning_answered",
         update.effective_user.id,
         data={
@@ -848,7 +853,7 @@ async def finish_test(
     user_id = update.effective_user.id
 
     # Завершить попытку
-    result = logic.complete_test_attempt(attempt_id, status=status)
+    result = await run_db(logic.complete_test_attempt, attempt_id, status=status)
     
     if not result:
         return ConversationHandler.END
@@ -859,7 +864,7 @@ async def finish_test(
     # Получить информацию о месте в рейтинге
     rank_info = ""
     if result['passed']:
-        user_rank = logic.get_user_monthly_rank(update.effective_user.id)
+        user_rank = await run_db(logic.get_user_monthly_rank, update.effective_user.id)
         if user_rank:
             rank_info = messages.MESSAGE_RANK_INFO.format(rank=user_rank['rank'])
         else:
@@ -892,7 +897,7 @@ async def finish_test(
     )
     
     # Отправить события геймификации
-    attempt = logic.get_attempt_by_id(attempt_id)
+    attempt = await run_db(logic.get_attempt_by_id, attempt_id)
 
     if attempt and attempt.get('category_id') is not None:
         result_message += "\n\n" + messages.MESSAGE_CATEGORY_RESULT_VALIDITY_INFO.format(
@@ -915,9 +920,9 @@ async def finish_test(
         'total_questions': result['total_questions'],
         'category_id': attempt.get('category_id') if attempt else None,
     }
-    emit_event("certification.test_completed", user_id, data=event_data)
+    await run_db(emit_event, "certification.test_completed", user_id, data=event_data)
     if result['passed'] and status == 'completed':
-        emit_event("certification.test_passed", user_id, data=event_data)
+        await run_db(emit_event, "certification.test_passed", user_id, data=event_data)
 
     # Очистить контекст
     clear_test_context(context)
@@ -946,7 +951,8 @@ async def finish_learning(
     correct_count = context.user_data.get(settings.LEARNING_CORRECT_COUNT_KEY, 0)
     total_count = len(questions)
 
-    emit_event(
+    await run_db(
+        emit_event,
         "certification.learning_completed",
         update.effective_user.id,
         data={
@@ -1011,7 +1017,7 @@ def clear_learning_context(context: ContextTypes.DEFAULT_TYPE) -> None:
 
 async def show_my_ranking(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать рейтинг пользователя и статистику по категориям за месяц."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return
     
@@ -1019,8 +1025,8 @@ async def show_my_ranking(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     month_name = logic.get_month_name(now.month)
     
     # Получить категории, где пользователь проходил тесты в этом месяце
-    user_categories = logic.get_user_categories_this_month(update.effective_user.id)
-    cert_summary = logic.get_user_certification_summary(update.effective_user.id)
+    user_categories = await run_db(logic.get_user_categories_this_month, update.effective_user.id)
+    cert_summary = await run_db(logic.get_user_certification_summary, update.effective_user.id)
     
     if not user_categories:
         await update.message.reply_text(
@@ -1071,10 +1077,10 @@ async def show_my_ranking(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     message_parts.append("\n" + "\n".join(cert_progress_lines))
     
     # Получить общую статистику для данных последнего теста
-    user_stats = logic.get_user_stats(update.effective_user.id)
+    user_stats = await run_db(logic.get_user_stats, update.effective_user.id)
     
     # Добавить общий рейтинг (если есть успешные тесты)
-    combined_rank = logic.get_user_monthly_rank(update.effective_user.id)
+    combined_rank = await run_db(logic.get_user_monthly_rank, update.effective_user.id)
     if combined_rank:
         message_parts.append(messages.MESSAGE_MY_RANKING_ALL_ITEM.format(
             rank=combined_rank['rank'],
@@ -1132,7 +1138,7 @@ async def show_my_ranking(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
     message_parts.append("\n\n⏳ *Срок действия результатов по категориям:*\n" + "\n".join(expiry_lines))
 
-    rank_ladder = logic.get_certification_rank_ladder()
+    rank_ladder = await run_db(logic.get_certification_rank_ladder)
     rank_scale_lines = [messages.MESSAGE_RANK_SCALE_HEADER]
     for rank_data in rank_ladder:
         rank_scale_lines.append(
@@ -1157,11 +1163,11 @@ async def show_my_ranking(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 async def show_test_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать историю тестов пользователя."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return
     
-    history = logic.get_user_test_history(update.effective_user.id, limit=10)
+    history = await run_db(logic.get_user_test_history, update.effective_user.id, limit=10)
     
     if not history:
         await update.message.reply_text(
@@ -1198,7 +1204,7 @@ async def show_test_history(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def show_monthly_top(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Показать выбор категории для ТОПа месяца."""
-    if not check_if_user_legit(update.effective_user.id):
+    if not await run_db(check_if_user_legit, update.effective_user.id):
         await update.message.reply_text(MESSAGE_PLEASE_ENTER_INVITE)
         return
     
@@ -1206,7 +1212,7 @@ async def show_monthly_top(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     month_name = logic.get_month_name(now.month)
     
     # Получить активные категории
-    categories = logic.get_all_categories(active_only=True)
+    categories = await run_db(logic.get_all_categories, active_only=True)
     
     await update.message.reply_text(
         messages.MESSAGE_SELECT_TOP_CATEGORY.format(month=logic.escape_markdown(month_name)),
@@ -1231,7 +1237,7 @@ async def handle_top_category_selection(update: Update, context: ContextTypes.DE
         # Показать выбор категории снова
         now = datetime.now()
         month_name = logic.get_month_name(now.month)
-        categories = logic.get_all_categories(active_only=True)
+        categories = await run_db(logic.get_all_categories, active_only=True)
         
         await query.edit_message_text(
             messages.MESSAGE_SELECT_TOP_CATEGORY.format(month=logic.escape_markdown(month_name)),
@@ -1250,7 +1256,7 @@ async def handle_top_category_selection(update: Update, context: ContextTypes.DE
         is_combined = True
     elif data.startswith("cert_top_cat_"):
         category_id = int(data.replace("cert_top_cat_", ""))
-        category = logic.get_category_by_id(category_id)
+        category = await run_db(logic.get_category_by_id, category_id)
         category_name = category['name'] if category else "Unknown"
     else:
         return
@@ -1259,7 +1265,7 @@ async def handle_top_category_selection(update: Update, context: ContextTypes.DE
     month_name = logic.get_month_name(now.month)
     
     # Получить рейтинг для выбранной категории
-    ranking = logic.get_monthly_ranking_by_category(category_id=category_id, limit=10)
+    ranking = await run_db(logic.get_monthly_ranking_by_category, category_id=category_id, limit=10)
     
     if not ranking:
         if is_combined:
@@ -1277,7 +1283,7 @@ async def handle_top_category_selection(update: Update, context: ContextTypes.DE
         return
     
     # Проверить, нужно ли скрывать имена
-    test_settings = logic.get_test_settings()
+    test_settings = await run_db(logic.get_test_settings)
     should_obfuscate = test_settings.get('obfuscate_names', False)
     
     # Сформировать список ТОПа
@@ -1300,7 +1306,8 @@ async def handle_top_category_selection(update: Update, context: ContextTypes.DE
         ))
     
     # Получить позицию текущего пользователя
-    user_rank = logic.get_user_monthly_rank_by_category(
+    user_rank = await run_db(
+        logic.get_user_monthly_rank_by_category,
         update.effective_user.id, 
         category_id=category_id
     )
@@ -1354,7 +1361,7 @@ async def cancel_test(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     attempt_id = context.user_data.get(settings.CURRENT_ATTEMPT_ID_KEY)
     
     if attempt_id:
-        logic.complete_test_attempt(attempt_id, status='cancelled')
+        await run_db(logic.complete_test_attempt, attempt_id, status='cancelled')
     
     clear_test_context(context)
     clear_learning_context(context)
@@ -1372,16 +1379,16 @@ async def cancel_on_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     attempt_id = context.user_data.get(settings.CURRENT_ATTEMPT_ID_KEY)
     
     if attempt_id:
-        logic.complete_test_attempt(attempt_id, status='cancelled')
+        await run_db(logic.complete_test_attempt, attempt_id, status='cancelled')
     
     clear_test_context(context)
     clear_learning_context(context)
     
     # Показать главное меню, чтобы пользователю не приходилось нажимать дважды
     user_id = update.effective_user.id
-    is_admin = check_if_user_admin(user_id)
+    is_admin = await run_db(check_if_user_admin, user_id)
     await update.message.reply_text(
-        get_main_menu_message(user_id, update.effective_user.first_name),
+        await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
         parse_mode=constants.ParseMode.MARKDOWN_V2,
         reply_markup=get_main_menu_keyboard(is_admin=is_admin)
     )
@@ -13,10 +13,15 @@ import time
 import random
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
-from typing import List, Optional, Dict, Any, Tuple
+from typing import Iterable, List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 
 import src.common.database as database
+from src.common.settings_snapshot import (
+    SCOPE_CERTIFICATION_SETTINGS,
+    bump_settings_version,
+    get_settings_snapshot,
+)
 from . import settings
 
 logger = logging.getLogger(__name__)
@@ -130,7 +135,7 @@ class UserRanking:
 
 def get_setting(key: str, default: Any = None) -> Any:
     """
-    Получить значение настройки аттестации из БД.
+    Получить значение настройки аттестации из снимка таблицы certification_settings.
     
     Аргументы:
         key: Ключ настройки
@@ -140,16 +145,7 @@ def get_setting(key: str, default: Any = None) -> Any:
         Значение настройки или default
     """
     try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(
-                    "SELECT setting_value FROM certification_settings WHERE setting_key = %s",
-                    (key,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    return result['setting_value']
-                return default
+        return get_settings_snapshot().get(SCOPE_CERTIFICATION_SETTINGS, key, default)
     except Exception as e:
         logger.error(f"Error getting setting {key}: {e}")
         return default
@@ -180,7 +176,9 @@ def set_setting(key: str, value: Any, description: str = None) -> bool:
                        updated_timestamp = VALUES(updated_timestamp)""",
                     (key, str(value), description, int(time.time()))
                 )
-                return True
+                bump_settings_version(cursor, SCOPE_CERTIFICATION_SETTINGS)
+        get_settings_snapshot().invalidate(SCOPE_CERTIFICATION_SETTINGS)
+        return True
     except Exception as e:
         logger.error(f"Error setting {key}: {e}")
         return False
@@ -361,7 +359,18 @@ def delete_category(category_id: int) -> bool:
                     "DELETE FROM certification_categories WHERE id = %s",
                     (category_id,)
                 )
-                return cursor.rowcount > 0
+                deleted = cursor.rowcount > 0
+                # Попытки удалённой категории остаются без категории (ON DELETE SET NULL):
+                # их результаты по категории и рейтинги категории больше не учитываются
+                cursor.execute(
+                    "DELETE FROM certification_user_category_results WHERE category_id = %s",
+                    (category_id,)
+                )
+                cursor.execute(
+                    "DELETE FROM certification_monthly_results WHERE category_id = %s",
+                    (category_id,)
+                )
+                return deleted
     except Exception as e:
         logger.error(f"Error deleting category {category_id}: {e}")
         return False
@@ -1155,6 +1164,363 @@ def build_progress_bar(progress_percent: int, width: int = 10) -> str:
     return f"[{filled}{empty}]"
 
 
+# ============================================================================
+# Предрасчитанные сводки и месячные рейтинги
+# ============================================================================
+
+# category_id строк certification_monthly_results общего рейтинга (все тесты)
+ALL_CATEGORIES_RANKING_KEY = 0
+
+
+def _month_key(timestamp: int) -> int:
+    """Ключ месяца YYYYMM для timestamp (в часовом поясе бота)."""
+    moment = datetime.fromtimestamp(int(timestamp))
+    return moment.year * 100 + moment.month
+
+
+def _resolve_month_key(year: Optional[int] = None, month: Optional[int] = None) -> int:
+    """Ключ месяца YYYYMM; по умолчанию — текущий месяц."""
+    now = datetime.now()
+    return (year or now.year) * 100 + (month or now.month)
+
+
+def _get_valid_from_timestamp(current_timestamp: int) -> int:
+    """Начало окна валидности результатов по категориям."""
+    return current_timestamp - settings.CATEGORY_RESULT_VALIDITY_DAYS * 24 * 60 * 60
+
+
+def _load_category_bests(
+    cursor,
+    userid: int,
+    category_ids: List[int],
+    valid_from_timestamp: int
+) -> Dict[int, Tuple[Optional[float], Optional[int]]]:
+    """
+    Пересчитать лучшие результаты пользователя по категориям за окно валидности.
+
+    Возвращает:
+        {category_id: (лучший процент, время последней попытки с ним)};
+        (None, None) — в окне нет завершённых попыток
+    """
+    bests: Dict[int, Tuple[Optional[float], Optional[int]]] = {
+        category_id: (None, None) for category_id in category_ids
+    }
+    if not category_ids:
+        return bests
+
+    placeholders = ', '.join(['%s'] * len(category_ids))
+    cursor.execute(
+        f"""SELECT category_id, score_percent, completed_timestamp
+            FROM certification_attempts
+            WHERE userid = %s
+              AND status = 'completed'
+              AND category_id IN ({placeholders})
+              AND completed_timestamp >= %s
+            ORDER BY category_id, score_percent DESC, completed_timestamp DESC""",
+        (userid, *category_ids, valid_from_timestamp)
+    )
+    for row in cursor.fetchall() or []:
+        if bests.get(row['category_id'], (None, None))[0] is None:
+            bests[row['category_id']] = (float(row['score_percent']), row['completed_timestamp'])
+    return bests
+
+
+def _store_category_bests(
+    cursor,
+    userid: int,
+    bests: Dict[int, Tuple[Optional[float], Optional[int]]],
+    current_timestamp: int,
+    valid_from_timestamp: int
+) -> int:
+    """
+    Записать пересчитанные лучшие результаты вместо истёкших.
+
+    Строки, которые успела обновить новая попытка (лучший результат снова
+    в окне), не перезаписываются.
+
+    Возвращает:
+        Количество пересчитанных строк
+    """
+    if not bests:
+        return 0
+    cursor.executemany(
+        """UPDATE certification_user_category_results
+           SET best_score_percent = %s,
+               best_score_timestamp = %s,
+               updated_timestamp = %s
+           WHERE userid = %s
+             AND category_id = %s
+             AND best_score_timestamp < %s""",
+        [
+            (best_score, best_timestamp, current_timestamp, userid, category_id, valid_from_timestamp)
+            for category_id, (best_score, best_timestamp) in bests.items()
+        ]
+    )
+    return len(bests)
+
+
+def _apply_attempt_to_summaries(
+    cursor,
+    attempt: Dict,
+    score_percent: float,
+    passed: bool,
+    completed_timestamp: int
+) -> None:
+    """
+    Учесть завершённую попытку в сводках аттестации.
+
+    Вызывается в транзакции complete_test_attempt после обновления попытки.
+    """
+    userid = attempt['userid']
+    category_id = attempt.get('category_id')
+    score = round(score_percent, 2)
+
+    if passed:
+        cursor.execute(
+            """INSERT INTO certification_user_summary
+               (userid, passed_tests_count, last_passed_timestamp, last_passed_score, updated_timestamp)
+               VALUES (%s, 1, %s, %s, %s)
+               ON DUPLICATE KEY UPDATE
+               passed_tests_count = passed_tests_count + 1,
+               last_passed_timestamp = VALUES(last_passed_timestamp),
+               last_passed_score = VALUES(last_passed_score),
+               updated_timestamp = VALUES(updated_timestamp)""",
+            (userid, completed_timestamp, score, completed_timestamp)
+        )
+
+        scopes = [ALL_CATEGORIES_RANKING_KEY]
+        if category_id is not None:
+            scopes.append(category_id)
+        month_key = _month_key(completed_timestamp)
+        cursor.executemany(
+            """INSERT INTO certification_monthly_results
+               (month_key, category_id, userid, best_score, tests_count, updated_timestamp)
+               VALUES (%s, %s, %s, %s, 1, %s)
+               ON DUPLICATE KEY UPDATE
+               best_score = GREATEST(best_score, VALUES(best_score)),
+               tests_count = tests_count + 1,
+               updated_timestamp = VALUES(updated_timestamp)""",
+            [(month_key, scope, userid, score, completed_timestamp) for scope in scopes]
+        )
+
+    if category_id is None:
+        return
+
+    valid_from_timestamp = _get_valid_from_timestamp(completed_timestamp)
+    cursor.execute(
+        """SELECT best_score_percent, best_score_timestamp
+           FROM certification_user_category_results
+           WHERE userid = %s AND category_id = %s
+           FOR UPDATE""",
+        (userid, category_id)
+    )
+    current = cursor.fetchone()
+
+    best_score, best_timestamp = score, completed_timestamp
+    if current and current.get('best_score_timestamp') is not None:
+        if current['best_score_timestamp'] < valid_from_timestamp:
+            # Прежний лучший результат вышел из окна: максимум по попыткам окна,
+            # включая только что завершённую
+            best_score, best_timestamp = _load_category_bests(
+                cursor, userid, [category_id], valid_from_timestamp
+            )[category_id]
+        elif float(current['best_score_percent']) > score:
+            best_score, best_timestamp = current['best_score_percent'], current['best_score_timestamp']
+
+    cursor.execute(
+        """INSERT INTO certification_user_category_results
+           (userid, category_id, last_passed_timestamp, best_score_percent,
+            best_score_timestamp, updated_timestamp)
+           VALUES (%s, %s, %s, %s, %s, %s)
+           ON DUPLICATE KEY UPDATE
+           last_passed_timestamp = COALESCE(VALUES(last_passed_timestamp), last_passed_timestamp),
+           best_score_percent = VALUES(best_score_percent),
+           best_score_timestamp = VALUES(best_score_timestamp),
+           updated_timestamp = VALUES(updated_timestamp)""",
+        (userid, category_id, completed_timestamp if passed else None,
+         best_score, best_timestamp, completed_timestamp)
+    )
+
+
+def _aggregate_attempt_history(
+    attempts: Iterable[Dict],
+    valid_from_timestamp: int,
+    current_timestamp: int
+) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """
+    Построить строки сводок по истории завершённых попыток.
+
+    Аргументы:
+        attempts: Завершённые попытки в порядке completed_timestamp
+        valid_from_timestamp: Начало окна валидности результатов по категориям
+        current_timestamp: Значение updated_timestamp
+
+    Возвращает:
+        Строки certification_user_summary, certification_user_category_results
+        и certification_monthly_results в порядке колонок INSERT
+    """
+    summaries: Dict[int, List] = {}
+    categories: Dict[Tuple[int, int], List] = {}
+    monthly: Dict[Tuple[int, int, int], List] = {}
+
+    for attempt in attempts:
+        userid = attempt['userid']
+        category_id = attempt.get('category_id')
+        score = float(attempt['score_percent'])
+        completed_timestamp = attempt['completed_timestamp']
+        passed = bool(attempt['passed'])
+
+        if passed:
+            summary = summaries.setdefault(userid, [0, None, None])
+            summary[0] += 1
+            summary[1] = completed_timestamp
+            summary[2] = score
+
+            month_key = _month_key(completed_timestamp)
+            scopes = [ALL_CATEGORIES_RANKING_KEY] + ([category_id] if category_id is not None else [])
+            for scope in scopes:
+                month_result = monthly.setdefault((month_key, scope, userid), [score, 0])
+                month_result[0] = max(month_result[0], score)
+                month_result[1] += 1
+
+        if category_id is None:
+            continue
+        # [last_passed_timestamp, best_score_percent, best_score_timestamp]
+        category = categories.setdefault((userid, category_id), [None, None, None])
+        if passed:
+            category[0] = completed_timestamp
+        if completed_timestamp >= valid_from_timestamp and (category[1] is None or score >= category[1]):
+            category[1] = score
+            category[2] = completed_timestamp
+
+    return (
+        [(userid, *values, current_timestamp) for userid, values in summaries.items()],
+        [(userid, category_id, *values, current_timestamp) for (userid, category_id), values in categories.items()],
+        [(*key, *values, current_timestamp) for key, values in monthly.items()],
+    )
+
+
+def rebuild_certification_summaries(batch_size: int = 1000) -> Optional[Dict[str, int]]:
+    """
+    Перестроить сводки аттестации по всей истории попыток.
+
+    Выполняется одной транзакцией; запускайте при остановленном боте,
+    чтобы не потерять попытки, завершённые во время перестройки.
+
+    Аргументы:
+        batch_size: Размер пачки при чтении попыток и записи строк
+
+    Возвращает:
+        Количество строк по таблицам или None при ошибке
+    """
+    current_timestamp = int(time.time())
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute(
+                    """SELECT userid, category_id, score_percent, passed, completed_timestamp
+                       FROM certification_attempts
+                       WHERE status = 'completed'
+                         AND completed_timestamp IS NOT NULL
+                       ORDER BY completed_timestamp, id"""
+                )
+                attempts: List[Dict] = []
+                while True:
+                    chunk = cursor.fetchmany(batch_size)
+                    if not chunk:
+                        break
+                    attempts.extend(chunk)
+
+                summary_rows, category_rows, monthly_rows = _aggregate_attempt_history(
+                    attempts, _get_valid_from_timestamp(current_timestamp), current_timestamp
+                )
+
+                tables = (
+                    (
+                        'certification_user_summary',
+                        """INSERT INTO certification_user_summary
+                           (userid, passed_tests_count, last_passed_timestamp,
+                            last_passed_score, updated_timestamp)
+                           VALUES (%s, %s, %s, %s, %s)""",
+                        summary_rows,
+                    ),
+                    (
+                        'certification_user_category_results',
+                        """INSERT INTO certification_user_category_results
+                           (userid, category_id, last_passed_timestamp, best_score_percent,
+                            best_score_timestamp, updated_timestamp)
+                           VALUES (%s, %s, %s, %s, %s, %s)""",
+                        category_rows,
+                    ),
+                    (
+                        'certification_monthly_results',
+                        """INSERT INTO certification_monthly_results
+                           (month_key, category_id, userid, best_score, tests_count, updated_timestamp)
+                           VALUES (%s, %s, %s, %s, %s, %s)""",
+                        monthly_rows,
+                    ),
+                )
+                counts = {}
+                for table, insert_sql, rows in tables:
+                    cursor.execute(f"DELETE FROM {table}")
+                    for start in range(0, len(rows), batch_size):
+                        cursor.executemany(insert_sql, rows[start:start + batch_size])
+                    counts[table] = len(rows)
+                counts['attempts'] = len(attempts)
+                return counts
+    except Exception as e:
+        logger.error("Error rebuilding certification summaries: %s", e)
+        return None
+
+
+def sweep_expired_category_results(
+    batch_size: int = settings.CATEGORY_RESULT_SWEEP_BATCH_SIZE
+) -> int:
+    """
+    Пересчитать результаты по категориям, лучший процент которых истёк.
+
+    Лучший процент за окно CATEGORY_RESULT_VALIDITY_DAYS хранится вместе со
+    временем попытки; после выхода попытки из окна строка пересчитывается по
+    оставшимся в окне попыткам. Сводка пересчитывает такие строки и сама при
+    чтении — очистка убирает эту работу с пути отображения профиля.
+
+    Аргументы:
+        batch_size: Строк за одну транзакцию
+
+    Возвращает:
+        Количество пересчитанных строк
+    """
+    current_timestamp = int(time.time())
+    valid_from_timestamp = _get_valid_from_timestamp(current_timestamp)
+    updated = 0
+    try:
+        while True:
+            with database.get_db_connection() as conn:
+                with database.get_cursor(conn) as cursor:
+                    cursor.execute(
+                        """SELECT userid, category_id
+                           FROM certification_user_category_results
+                           WHERE best_score_timestamp < %s
+                           ORDER BY best_score_timestamp
+                           LIMIT %s""",
+                        (valid_from_timestamp, batch_size)
+                    )
+                    rows = cursor.fetchall() or []
+                    expired_by_user: Dict[int, List[int]] = {}
+                    for row in rows:
+                        expired_by_user.setdefault(row['userid'], []).append(row['category_id'])
+                    for userid, category_ids in expired_by_user.items():
+                        bests = _load_category_bests(cursor, userid, category_ids, valid_from_timestamp)
+                        updated += _store_category_bests(
+                            cursor, userid, bests, current_timestamp, valid_from_timestamp
+                        )
+            if len(rows) < batch_size:
+                return updated
+    except Exception as e:
+        logger.error("Error sweeping expired certification category results: %s", e)
+        return updated
+
+
 def get_user_certification_summary(userid: int) -> Dict[str, Any]:
     """
     Получить единый профиль достижений и ранга пользователя по аттестации.
@@ -1162,6 +1528,9 @@ def get_user_certification_summary(userid: int) -> Dict[str, Any]:
     Аргументы:
         userid: Telegram ID пользователя
 
+    Метрики читаются из предрасчитанных сводок certification_user_summary
+    и certification_user_category_results.
+
     Возвращает:
         Словарь с метриками passed тестов/категорий и сертификационным рангом
     """
@@ -1194,61 +1563,40 @@ def get_user_certification_summary(userid: int) -> Dict[str, Any]:
 
     try:
         current_timestamp = int(time.time())
-        validity_seconds = settings.CATEGORY_RESULT_VALIDITY_DAYS * 24 * 60 * 60
-        valid_from_timestamp = current_timestamp - validity_seconds
+        valid_from_timestamp = _get_valid_from_timestamp(current_timestamp)
 
         with database.get_db_connection() as conn:
             with database.get_cursor(conn) as cursor:
                 cursor.execute(
-                    """
-                    SELECT
-                        COUNT(*) as passed_tests_count,
-                        MAX(completed_timestamp) as last_passed_timestamp,
-                        (
-                            SELECT a2.score_percent
-                            FROM certification_attempts a2
-                            WHERE a2.userid = %s
-                              AND a2.status = 'completed'
-                              AND a2.passed = 1
-                            ORDER BY a2.completed_timestamp DESC
-                            LIMIT 1
-                        ) as last_passed_score
-                    FROM certification_attempts a
-                    WHERE a.userid = %s
-                      AND a.status = 'completed'
-                      AND a.passed = 1
-                    """,
-                    (userid, userid)
+                    """SELECT passed_tests_count, last_passed_timestamp, last_passed_score
+                       FROM certification_user_summary
+                       WHERE userid = %s""",
+                    (userid,)
                 )
                 result = cursor.fetchone() or {}
 
                 cursor.execute(
-                    """
-                    SELECT category_id, MAX(completed_timestamp) as last_passed_category_timestamp
-                    FROM certification_attempts
-                    WHERE userid = %s
-                      AND status = 'completed'
-                      AND passed = 1
-                      AND category_id IS NOT NULL
-                    GROUP BY category_id
-                    """,
+                    """SELECT category_id, last_passed_timestamp, best_score_percent, best_score_timestamp
+                       FROM certification_user_category_results
+                       WHERE userid = %s""",
                     (userid,)
                 )
-                category_results = cursor.fetchall() or []
-
-                cursor.execute(
-                    """
-                    SELECT category_id, MAX(score_percent) as best_score_percent
-                    FROM certification_attempts
-                    WHERE userid = %s
-                      AND status = 'completed'
-                      AND category_id IS NOT NULL
-                      AND completed_timestamp >= %s
-                    GROUP BY category_id
-                    """,
-                    (userid, valid_from_timestamp)
-                )
-                recent_best_category_attempts = cursor.fetchall() or []
+                category_rows = cursor.fetchall() or []
+
+                expired_best_category_ids = [
+                    row['category_id'] for row in category_rows
+                    if row.get('best_score_timestamp') is not None
+                    and row['best_score_timestamp'] < valid_from_timestamp
+                ]
+                if expired_best_category_ids:
+                    # Очистка истёкших результатов ещё не дошла до этих строк
+                    bests = _load_category_bests(
+                        cursor, userid, expired_best_category_ids, valid_from_timestamp
+                    )
+                    _store_category_bests(cursor, userid, bests, current_timestamp, valid_from_timestamp)
+                    for row in category_rows:
+                        if row['category_id'] in bests:
+                            row['best_score_percent'], row['best_score_timestamp'] = bests[row['category_id']]
 
         passed_tests_count = int(result.get('passed_tests_count') or 0)
 
@@ -1259,9 +1607,10 @@ def get_user_certification_summary(userid: int) -> Dict[str, Any]:
         expiring_soon_categories_count = 0
         nearest_category_expiry_timestamp = None
 
+        category_results = [row for row in category_rows if row.get('last_passed_timestamp') is not None]
         for category_result in category_results:
             expiry_timestamp = get_category_result_expiry_timestamp(
-                category_result.get('last_passed_category_timestamp')
+                category_result.get('last_passed_timestamp')
             )
             if expiry_timestamp is None:
                 continue
@@ -1281,8 +1630,8 @@ def get_user_certification_summary(userid: int) -> Dict[str, Any]:
         total_passed_categories_count = len(category_results)
 
         certification_points = int(round(sum(
-            float(category_attempt.get('best_score_percent') or 0)
-            for category_attempt in recent_best_category_attempts
+            float(category_row.get('best_score_percent') or 0)
+            for category_row in category_rows
         )))
         overall_progress_percent = int(
             min(max((certification_points / max(max_achievable_points, 1)) * 100, 0), 100)
@@ -1397,7 +1746,8 @@ def complete_test_attempt(
         status: Итоговый статус ('completed', 'expired', 'cancelled')
         
     Возвращает:
-        Словарь с результатом или None
+        Словарь с результатом или None (в том числе если попытка уже
+        завершена — повторное завершение не учитывается в сводках дважды)
     """
     try:
         with database.get_db_connection() as conn:
@@ -1434,7 +1784,9 @@ def complete_test_attempt(
                 completed_timestamp = int(time.time())
                 time_spent = completed_timestamp - attempt['started_timestamp']
                 
-                # Обновить попытку
+                # Обновить попытку, только если она ещё не завершена: повторный
+                # вызов (двойное нажатие, истечение времени после завершения)
+                # не должен второй раз применять результат к сводкам
                 cursor.execute(
                     """UPDATE certification_attempts 
                        SET correct_answers = %s,
@@ -1443,10 +1795,22 @@ def complete_test_attempt(
                            time_spent_seconds = %s,
                            completed_timestamp = %s,
                            status = %s
-                       WHERE id = %s""",
+                       WHERE id = %s AND status = 'in_progress'""",
                     (correct_answers, score_percent, passed, time_spent,
                      completed_timestamp, status, attempt_id)
                 )
+                if cursor.rowcount == 0:
+                    logger.info(
+                        "Попытка %s уже завершена (status=%s), повторное завершение пропущено",
+                        attempt_id,
+                        attempt.get('status'),
+                    )
+                    return None
+
+                if status == 'completed':
+                    _apply_attempt_to_summaries(
+                        cursor, attempt, score_percent, passed, completed_timestamp
+                    )
                 
                 return {
                     'attempt_id': attempt_id,
@@ -1682,52 +2046,7 @@ def get_monthly_ranking(
     Возвращает:
         Список записей рейтинга
     """
-    now = datetime.now()
-    year = year or now.year
-    month = month or now.month
-    
-    # Рассчитать границы месяца
-    month_start = datetime(year, month, 1)
-    if month == 12:
-        month_end = datetime(year + 1, 1, 1)
-    else:
-        month_end = datetime(year, month + 1, 1)
-    
-    start_ts = int(month_start.timestamp())
-    end_ts = int(month_end.timestamp())
-    
-    try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(
-                    """SELECT 
-                           a.userid,
-                           u.first_name,
-                           u.last_name,
-                           u.username,
-                           MAX(a.score_percent) as best_score,
-                           COUNT(*) as tests_count
-                       FROM certification_attempts a
-                       JOIN users u ON a.userid = u.userid
-                       WHERE a.status = 'completed'
-                         AND a.passed = 1
-                         AND a.completed_timestamp >= %s
-                         AND a.completed_timestamp < %s
-                       GROUP BY a.userid
-                       ORDER BY best_score DESC, tests_count DESC
-                       LIMIT %s""",
-                    (start_ts, end_ts, limit)
-                )
-                results = cursor.fetchall()
-                
-                # Добавить номера мест
-                for i, row in enumerate(results, 1):
-                    row['rank'] = i
-                
-                return results
-    except Exception as e:
-        logger.error(f"Error getting monthly ranking: {e}")
-        return []
+    return get_monthly_ranking_by_category(None, year, month, limit)
 
 
 def get_user_monthly_rank(
@@ -1746,64 +2065,7 @@ def get_user_monthly_rank(
     Возвращает:
         Словарь с информацией о месте или None
     """
-    now = datetime.now()
-    year = year or now.year
-    month = month or now.month
-    
-    month_start = datetime(year, month, 1)
-    if month == 12:
-        month_end = datetime(year + 1, 1, 1)
-    else:
-        month_end = datetime(year, month + 1, 1)
-    
-    start_ts = int(month_start.timestamp())
-    end_ts = int(month_end.timestamp())
-    
-    try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                # Получить лучший результат пользователя за месяц
-                cursor.execute(
-                    """SELECT MAX(score_percent) as best_score, COUNT(*) as tests_count
-                       FROM certification_attempts
-                       WHERE userid = %s
-                         AND status = 'completed'
-                         AND passed = 1
-                         AND completed_timestamp >= %s
-                         AND completed_timestamp < %s""",
-                    (userid, start_ts, end_ts)
-                )
-                user_result = cursor.fetchone()
-                
-                if not user_result or user_result['best_score'] is None:
-                    return None
-                
-                # Посчитать пользователей с более высоким результатом
-                cursor.execute(
-                    """SELECT COUNT(DISTINCT userid) as higher_count
-                       FROM certification_attempts
-                       WHERE status = 'completed'
-                         AND passed = 1
-                         AND completed_timestamp >= %s
-                         AND completed_timestamp < %s
-                         AND userid != %s
-                       GROUP BY userid
-                       HAVING MAX(score_percent) > %s""",
-                    (start_ts, end_ts, userid, user_result['best_score'])
-                )
-                
-                # Место пользователя = higher_count + 1
-                higher = cursor.fetchall()
-                rank = len(higher) + 1
-                
-                return {
-                    'rank': rank,
-                    'best_score': float(user_result['best_score']),
-                    'tests_count': user_result['tests_count']
-                }
-    except Exception as e:
-        logger.error(f"Error getting user rank: {e}")
-        return None
+    return get_user_monthly_rank_by_category(userid, None, year, month)
 
 
 def get_monthly_ranking_by_category(
@@ -1814,6 +2076,8 @@ def get_monthly_ranking_by_category(
 ) -> List[Dict]:
     """
     Получить ежемесячный рейтинг с фильтром по категории.
+
+    Читается из certification_monthly_results по индексу рейтинга месяца.
     
     Аргументы:
         category_id: ID категории. None — общий рейтинг (все тесты).
@@ -1824,67 +2088,28 @@ def get_monthly_ranking_by_category(
     Возвращает:
         Список записей рейтинга
     """
-    now = datetime.now()
-    year = year or now.year
-    month = month or now.month
-    
-    # Рассчитать границы месяца
-    month_start = datetime(year, month, 1)
-    if month == 12:
-        month_end = datetime(year + 1, 1, 1)
-    else:
-        month_end = datetime(year, month + 1, 1)
-    
-    start_ts = int(month_start.timestamp())
-    end_ts = int(month_end.timestamp())
+    month_key = _resolve_month_key(year, month)
+    scope = ALL_CATEGORIES_RANKING_KEY if category_id is None else category_id
     
     try:
         with database.get_db_connection() as conn:
             with database.get_cursor(conn) as cursor:
-                if category_id is None:
-                    # Общий ТОП — все тесты без учёта категории
-                    cursor.execute(
-                        """SELECT 
-                               a.userid,
-                               u.first_name,
-                               u.last_name,
-                               u.username,
-                               MAX(a.score_percent) as best_score,
-                               COUNT(*) as tests_count
-                           FROM certification_attempts a
-                           JOIN users u ON a.userid = u.userid
-                           WHERE a.status = 'completed'
-                             AND a.passed = 1
-                             AND a.completed_timestamp >= %s
-                             AND a.completed_timestamp < %s
-                           GROUP BY a.userid
-                           ORDER BY best_score DESC, tests_count DESC
-                           LIMIT %s""",
-                        (start_ts, end_ts, limit)
-                    )
-                else:
-                    # Фильтр по конкретной категории
-                    cursor.execute(
-                        """SELECT 
-                               a.userid,
-                               u.first_name,
-                               u.last_name,
-                               u.username,
-                               MAX(a.score_percent) as best_score,
-                               COUNT(*) as tests_count
-                           FROM certification_attempts a
-                           JOIN users u ON a.userid = u.userid
-                           WHERE a.status = 'completed'
-                             AND a.passed = 1
-                             AND a.completed_timestamp >= %s
-                             AND a.completed_timestamp < %s
-                             AND a.category_id = %s
-                           GROUP BY a.userid
-                           ORDER BY best_score DESC, tests_count DESC
-                           LIMIT %s""",
-                        (start_ts, end_ts, category_id, limit)
-                    )
-                
+                cursor.execute(
+                    """SELECT 
+                           r.userid,
+                           u.first_name,
+                           u.last_name,
+                           u.username,
+                           r.best_score,
+                           r.tests_count
+                       FROM certification_monthly_results r
+                       JOIN users u ON r.userid = u.userid
+                       WHERE r.month_key = %s
+                         AND r.category_id = %s
+                       ORDER BY r.best_score DESC, r.tests_count DESC
+                       LIMIT %s""",
+                    (month_key, scope, limit)
+                )
                 results = cursor.fetchall()
                 
                 # Добавить номера мест
@@ -1915,83 +2140,36 @@ def get_user_monthly_rank_by_category(
     Возвращает:
         Словарь с информацией о месте или None
     """
-    now = datetime.now()
-    year = year or now.year
-    month = month or now.month
-    
-    month_start = datetime(year, month, 1)
-    if month == 12:
-        month_end = datetime(year + 1, 1, 1)
-    else:
-        month_end = datetime(year, month + 1, 1)
-    
-    start_ts = int(month_start.timestamp())
-    end_ts = int(month_end.timestamp())
+    month_key = _resolve_month_key(year, month)
+    scope = ALL_CATEGORIES_RANKING_KEY if category_id is None else category_id
     
     try:
         with database.get_db_connection() as conn:
             with database.get_cursor(conn) as cursor:
-                # Получить лучший результат пользователя за месяц по категории
-                if category_id is None:
-                    cursor.execute(
-                        """SELECT MAX(score_percent) as best_score, COUNT(*) as tests_count
-                           FROM certification_attempts
-                           WHERE userid = %s
-                             AND status = 'completed'
-                             AND passed = 1
-                             AND completed_timestamp >= %s
-                             AND completed_timestamp < %s""",
-                        (userid, start_ts, end_ts)
-                    )
-                else:
-                    cursor.execute(
-                        """SELECT MAX(score_percent) as best_score, COUNT(*) as tests_count
-                           FROM certification_attempts
-                           WHERE userid = %s
-                             AND status = 'completed'
-                             AND passed = 1
-                             AND completed_timestamp >= %s
-                             AND completed_timestamp < %s
-                             AND category_id = %s""",
-                        (userid, start_ts, end_ts, category_id)
-                    )
-                
+                cursor.execute(
+                    """SELECT best_score, tests_count
+                       FROM certification_monthly_results
+                       WHERE month_key = %s
+                         AND category_id = %s
+                         AND userid = %s""",
+                    (month_key, scope, userid)
+                )
                 user_result = cursor.fetchone()
                 
                 if not user_result or user_result['best_score'] is None:
                     return None
                 
-                # Посчитать пользователей с более высоким результатом в этой категории
-                if category_id is None:
-                    cursor.execute(
-                        """SELECT COUNT(DISTINCT userid) as higher_count
-                           FROM certification_attempts
-                           WHERE status = 'completed'
-                             AND passed = 1
-                             AND completed_timestamp >= %s
-                             AND completed_timestamp < %s
-                             AND userid != %s
-                           GROUP BY userid
-                           HAVING MAX(score_percent) > %s""",
-                        (start_ts, end_ts, userid, user_result['best_score'])
-                    )
-                else:
-                    cursor.execute(
-                        """SELECT COUNT(DISTINCT userid) as higher_count
-                           FROM certification_attempts
-                           WHERE status = 'completed'
-                             AND passed = 1
-                             AND completed_timestamp >= %s
-                             AND completed_timestamp < %s
-                             AND userid != %s
-                             AND category_id = %s
-                           GROUP BY userid
-                           HAVING MAX(score_percent) > %s""",
-                        (start_ts, end_ts, userid, category_id, user_result['best_score'])
-                    )
-                
-                higher = cursor.fetchall()
-                rank = len(higher) + 1
+                # Место пользователя = число пользователей с более высоким результатом + 1
+                cursor.execute(
+                    """SELECT COUNT(*) as higher_count
+                       FROM certification_monthly_results
+                       WHERE month_key = %s
+                         AND category_id = %s
+                         AND best_score > %s""",
+                    (month_key, scope, user_result['best_score'])
+                )
+                higher = cursor.fetchone() or {}
+                rank = int(higher.get('higher_count') or 0) + 1
                 
                 return {
                     'rank': rank,
@@ -2060,46 +2238,31 @@ def get_user_categories_this_month(
                 if not results:
                     return results
 
-                # Собрать лучшие оценки пользователя по каждой категории (только passed=1)
-                category_ids = [row['category_id'] for row in results]
-                placeholders = ', '.join(['%s'] * len(category_ids))
-                cursor.execute(
-                    f"""SELECT category_id, MAX(score_percent) as best_score
-                        FROM certification_attempts
-                        WHERE userid = %s
-                          AND status = 'completed'
-                          AND passed = 1
-                          AND completed_timestamp >= %s
-                          AND completed_timestamp < %s
-                          AND category_id IN ({placeholders})
-                        GROUP BY category_id""",
-                    (userid, start_ts, end_ts, *category_ids)
-                )
-                user_scores = {r['category_id']: r['best_score'] for r in cursor.fetchall()}
-
-                # Для каждой категории подсчитать число пользователей с лучшим результатом
-                # одним запросом (batch)
+                # Места по категориям — из месячного рейтинга одним запросом
+                category_ids = [row['category_id'] for row in results if row['category_id'] is not None]
                 ranks: Dict[int, int] = {}
-                for cat_id in category_ids:
-                    user_best = user_scores.get(cat_id)
-                    if user_best is None:
-                        ranks[cat_id] = None
-                        continue
+                if category_ids:
+                    placeholders = ', '.join(['%s'] * len(category_ids))
                     cursor.execute(
-                        """SELECT COUNT(DISTINCT userid) as higher_count
-                           FROM certification_attempts
-                           WHERE status = 'completed'
-                             AND passed = 1
-                             AND completed_timestamp >= %s
-                             AND completed_timestamp < %s
-                             AND userid != %s
-                             AND category_id = %s
-                           GROUP BY userid
-                           HAVING MAX(score_percent) > %s""",
-                        (start_ts, end_ts, userid, cat_id, user_best)
+                        f"""SELECT
+                                mine.category_id,
+                                (
+                                    SELECT COUNT(*)
+                                    FROM certification_monthly_results other
+                                    WHERE other.month_key = mine.month_key
+                                      AND other.category_id = mine.category_id
+                                      AND other.best_score > mine.best_score
+                                ) as higher_count
+                            FROM certification_monthly_results mine
+                            WHERE mine.userid = %s
+                              AND mine.month_key = %s
+                              AND mine.category_id IN ({placeholders})""",
+                        (userid, year * 100 + month, *category_ids)
                     )
-                    higher = cursor.fetchall()
-                    ranks[cat_id] = len(higher) + 1
+                    ranks = {
+                        r['category_id']: int(r['higher_count'] or 0) + 1
+                        for r in cursor.fetchall()
+                    }
 
                 # Присвоить места
                 for row in results:
@@ -33,6 +33,7 @@ DEFAULT_PASSING_SCORE_PERCENT: Final[int] = 80
 DEFAULT_RELEVANCE_MONTHS: Final[int] = 6  # Вопросы становятся неактуальными спустя это число месяцев
 CATEGORY_RESULT_VALIDITY_DAYS: Final[int] = 30  # Срок действия результата по категории
 CATEGORY_RESULT_EXPIRY_WARNING_DAYS: Final[int] = 7  # Порог предупреждения о скором истечении
+CATEGORY_RESULT_SWEEP_BATCH_SIZE: Final[int] = 500  # Строк за проход очистки истёкших результатов
 
 # Конфигурация кнопок подменю для пользователей
 SUBMENU_BUTTONS: Final[List[List[str]]] = [
@@ -4,7 +4,7 @@
 Основная бизнес-логика системы геймификации:
 - Управление очками
 - Отслеживание прогресса достижений
-- Расчёт рейтингов
+- Расчёт рейтингов (агрегаты по периодам и снимки в памяти, см. leaderboard.py)
 - Данные профиля пользователя
 """
 
@@ -12,10 +12,15 @@ import time
 import logging
 from typing import Optional, Dict, List, Tuple, Any
 from datetime import datetime, timedelta
-from calendar import monthrange
 
 import src.common.database as database
+from src.common.settings_snapshot import (
+    SCOPE_GAMIFICATION_SETTINGS,
+    bump_settings_version,
+    get_settings_snapshot,
+)
 from . import settings
+from .leaderboard import LeaderboardCache, LeaderboardRow
 
 logger = logging.getLogger(__name__)
 
@@ -33,16 +38,9 @@ _TOTAL_ACHIEVEMENTS_CACHE_TTL_SECONDS = 300
 # ===== ПОМОЩНИКИ НАСТРОЕК =====
 
 def get_setting(key: str, default: Optional[str] = None) -> Optional[str]:
-    """Получить значение настройки из базы данных."""
+    """Получить значение настройки из снимка таблицы gamification_settings."""
     try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                cursor.execute(
-                    "SELECT value FROM gamification_settings WHERE `key` = %s",
-                    (key,)
-                )
-                result = cursor.fetchone()
-                return result['value'] if result else default
+        return get_settings_snapshot().get(SCOPE_GAMIFICATION_SETTINGS, key, default)
     except Exception as e:
         logger.error(f"Error getting setting {key}: {e}")
         return default
@@ -65,7 +63,9 @@ def set_setting(key: str, value: str, description: Optional[str] = None) -> bool
                         VALUES (%s, %s, UNIX_TIMESTAMP())
                         ON DUPLICATE KEY UPDATE value = %s, updated_timestamp = UNIX_TIMESTAMP()
                     """, (key, value, value))
-                return True
+                bump_settings_version(cursor, SCOPE_GAMIFICATION_SETTINGS)
+        get_settings_snapshot().invalidate(SCOPE_GAMIFICATION_SETTINGS)
+        return True
     except Exception as e:
         logger.error(f"Error setting {key}: {e}")
         return False
@@ -176,10 +176,14 @@ def add_score_points(
                         last_updated = %s
                 """, (userid, points, timestamp, points, timestamp))
                 
+                # Обновляем агрегаты месяца и года для рейтингов
+                _add_period_totals(cursor, userid, timestamp, score=points)
+                
                 # Обновляем ранг
                 _update_user_rank(cursor, userid)
-                
-                return True
+        
+        _record_leaderboard_change(settings.RANKING_TYPE_SCORE, userid, points, timestamp)
+        return True
     except Exception as e:
         logger.error(f"Error adding score points: {e}")
         return False
@@ -439,9 +443,12 @@ def increment_achievement_progress(userid: int, achievement_code: str) -> Option
                 current_count = result['current_count']
                 
                 # Проверяем, не разблокированы ли уровни
-                return _check_and_unlock_levels(
+                new_unlock, unlocked_count = _check_and_unlock_levels(
                     cursor, userid, achievement_id, achievement, current_count, timestamp
                 )
+        
+        _record_achievement_unlocks(userid, unlocked_count, timestamp)
+        return new_unlock
     except Exception as e:
         logger.error(f"Error incrementing achievement progress: {e}")
         return None
@@ -480,9 +487,12 @@ def set_achievement_progress(userid: int, achievement_code: str, count: int) ->
                 """, (userid, achievement_id, count, timestamp, count, timestamp))
                 
                 # Проверяем, не разблокированы ли уровни
-                return _check_and_unlock_levels(
+                new_unlock, unlocked_count = _check_and_unlock_levels(
                     cursor, userid, achievement_id, achievement, count, timestamp
                 )
+        
+        _record_achievement_unlocks(userid, unlocked_count, timestamp)
+        return new_unlock
     except Exception as e:
         logger.error(f"Error setting achievement progress: {e}")
         return None
@@ -495,8 +505,14 @@ def _check_and_unlock_levels(
     achievement: Dict,
     current_count: int,
     timestamp: int
-) -> Optional[int]:
-    """Проверить пороги и разблокировать новые уровни, если нужно."""
+) -> Tuple[Optional[int], int]:
+    """
+    Проверить пороги и разблокировать новые уровни, если нужно.
+    
+    Returns:
+        Новый разблокированный уровень (или None) и число разблокированных
+        уровней — его вызывающий код учитывает в рейтинге после commit.
+    """
     thresholds = [
         (settings.ACHIEVEMENT_LEVEL_BRONZE, achievement['threshold_bronze']),
         (settings.ACHIEVEMENT_LEVEL_SILVER, achievement['threshold_silver']),
@@ -504,6 +520,7 @@ def _check_and_unlock_levels(
     ]
     
     new_unlock = None
+    unlocked_count = 0
     
     for level, threshold in thresholds:
         if current_count >= threshold:
@@ -529,11 +546,19 @@ def _check_and_unlock_levels(
                         total_achievements = total_achievements + 1,
                         last_updated = %s
                 """, (userid, timestamp, timestamp))
+                _add_period_totals(cursor, userid, timestamp, achievements=1)
                 
                 new_unlock = level
+                unlocked_count += 1
                 logger.info(f"User {userid} unlocked {achievement['code']} level {level}")
     
-    return new_unlock
+    return new_unlock, unlocked_count
+
+
+def _record_achievement_unlocks(userid: int, unlocked_count: int, timestamp: int) -> None:
+    """Учесть разблокированные уровни в снимках рейтинга (только после commit)."""
+    if unlocked_count:
+        _record_leaderboard_change(settings.RANKING_TYPE_ACHIEVEMENTS, userid, unlocked_count, timestamp)
 
 
 def get_user_achievement_progress(userid: int, achievement_id: int) -> Dict:
@@ -696,22 +721,110 @@ def ensure_user_totals_exist(userid: int) -> None:
 
 # ===== РЕЙТИНГИ =====
 
-def _get_time_range(period: str) -> Tuple[int, int]:
-    """Получить диапазон временных меток для периода."""
-    now = datetime.now()
+# Периоды, для которых ведутся агрегаты в gamification_period_totals
+_AGGREGATED_PERIODS: Tuple[str, ...] = (settings.RANKING_PERIOD_MONTHLY, settings.RANKING_PERIOD_YEARLY)
+
+# Поле значения в записях рейтинга и столбцы-источники (итоги, агрегаты периода)
+_RANKING_COLUMNS: Dict[str, Tuple[str, str, str]] = {
+    settings.RANKING_TYPE_SCORE: ('total_score', 'total_score', 'score'),
+    settings.RANKING_TYPE_ACHIEVEMENTS: ('total_achievements', 'total_achievements', 'achievements'),
+}
+
+
+def _period_key(period: str, timestamp: Optional[int] = None) -> int:
+    """
+    Ключ периода: YYYYMM для месяца, YYYY для года, 0 для всего времени.
     
+    Считается по локальному времени процесса (календарный месяц и год).
+    """
+    moment = datetime.fromtimestamp(timestamp) if timestamp is not None else datetime.now()
     if period == settings.RANKING_PERIOD_MONTHLY:
-        start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        _, last_day = monthrange(now.year, now.month)
-        end = now.replace(day=last_day, hour=23, minute=59, second=59)
-    elif period == settings.RANKING_PERIOD_YEARLY:
-        start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        end = now.replace(month=12, day=31, hour=23, minute=59, second=59)
-    else:  # за всё время
-        start = datetime(2020, 1, 1)
-        end = now
-    
-    return int(start.timestamp()), int(end.timestamp())
+        return moment.year * 100 + moment.month
+    if period == settings.RANKING_PERIOD_YEARLY:
+        return moment.year
+    return 0
+
+
+def _add_period_totals(cursor, userid: int, timestamp: int, score: int = 0, achievements: int = 0) -> None:
+    """Прибавить очки/достижения к агрегатам месяца и года события (в транзакции вызывающего)."""
+    params: List[Any] = []
+    for period in _AGGREGATED_PERIODS:
+        params.extend((period, _period_key(period, timestamp), userid, score, achievements, timestamp))
+    cursor.execute("""
+        INSERT INTO gamification_period_totals
+            (period_type, period_key, userid, score, achievements, last_updated)
+        VALUES (%s, %s, %s, %s, %s, %s), (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            score = score + VALUES(score),
+            achievements = achievements + VALUES(achievements),
+            last_updated = VALUES(last_updated)
+    """, params)
+
+
+def _load_leaderboard_rows(key: Tuple[str, str, int]) -> List[LeaderboardRow]:
+    """Загрузить значения рейтинга для всех пользователей (снимок в памяти)."""
+    ranking_type, period, period_key = key
+    _, totals_column, period_column = _RANKING_COLUMNS[ranking_type]
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            if period == settings.RANKING_PERIOD_ALL_TIME:
+                cursor.execute(f"""
+                    SELECT u.userid, COALESCE(t.{totals_column}, 0) AS value, u.first_name, u.last_name
+                    FROM users u
+                    LEFT JOIN gamification_user_totals t ON t.userid = u.userid
+                """)
+            else:
+                cursor.execute(f"""
+                    SELECT u.userid, COALESCE(p.{period_column}, 0) AS value, u.first_name, u.last_name
+                    FROM users u
+                    LEFT JOIN gamification_period_totals p
+                        ON p.userid = u.userid AND p.period_type = %s AND p.period_key = %s
+                """, (period, period_key))
+            rows = cursor.fetchall() or []
+    return [(row['userid'], int(row['value']), row['first_name'], row['last_name']) for row in rows]
+
+
+_LEADERBOARDS = LeaderboardCache(_load_leaderboard_rows, settings.LEADERBOARD_MAX_AGE_SECONDS)
+
+
+def _leaderboard_key(ranking_type: str, period: str) -> Tuple[str, str, int]:
+    """Ключ снимка текущего периода; снимки прошедших периодов удаляются."""
+    if period not in _AGGREGATED_PERIODS:
+        period = settings.RANKING_PERIOD_ALL_TIME
+    _LEADERBOARDS.prune(lambda key: key[2] == _period_key(key[1]))
+    return ranking_type, period, _period_key(period)
+
+
+def _record_leaderboard_change(ranking_type: str, userid: int, delta: int, timestamp: int) -> None:
+    """Применить начисление к снимкам рейтинга в памяти (после записи в БД)."""
+    for period in (settings.RANKING_PERIOD_ALL_TIME,) + _AGGREGATED_PERIODS:
+        _LEADERBOARDS.apply((ranking_type, period, _period_key(period, timestamp)), userid, delta)
+
+
+def invalidate_leaderboards() -> None:
+    """Сбросить снимки рейтингов (например, после ручной правки очков в БД)."""
+    _LEADERBOARDS.invalidate()
+
+
+def _get_ranking(ranking_type: str, period: str, page: int, per_page: int) -> Tuple[List[Dict], int]:
+    """Страница рейтинга из снимка в памяти."""
+    value_field = _RANKING_COLUMNS[ranking_type][0]
+    offset = (page - 1) * per_page
+
+    def read(board):
+        entries = []
+        for userid, value, rank in board.page(offset, per_page):
+            first_name, last_name = board.names(userid)
+            entries.append({
+                'userid': userid,
+                value_field: value,
+                'first_name': first_name,
+                'last_name': last_name,
+                'rank': rank,
+            })
+        return entries, len(board)
+
+    return _LEADERBOARDS.view(_leaderboard_key(ranking_type, period), read)
 
 
 def get_score_ranking(
@@ -730,57 +843,8 @@ def get_score_ranking(
     Returns:
         Tuple of (ranking entries, total count)
     """
-    offset = (page - 1) * per_page
-    
     try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                if period == settings.RANKING_PERIOD_ALL_TIME:
-                    # Для общего рейтинга используем таблицу итогов
-                    cursor.execute("""
-                        SELECT COUNT(*) as cnt FROM gamification_user_totals 
-                        WHERE total_score > 0
-                    """)
-                    total = cursor.fetchone()['cnt']
-                    
-                    cursor.execute("""
-                        SELECT 
-                            t.userid, t.total_score, u.first_name, u.last_name,
-                            RANK() OVER (ORDER BY t.total_score DESC) as `rank`
-                        FROM gamification_user_totals t
-                        JOIN users u ON t.userid = u.userid
-                        WHERE t.total_score > 0
-                        ORDER BY t.total_score DESC
-                        LIMIT %s OFFSET %s
-                    """, (per_page, offset))
-                else:
-                    # Для периода считаем по таблице очков
-                    start_ts, end_ts = _get_time_range(period)
-                    
-                    cursor.execute("""
-                        SELECT COUNT(DISTINCT userid) as cnt 
-                        FROM gamification_scores 
-                        WHERE timestamp BETWEEN %s AND %s
-                    """, (start_ts, end_ts))
-                    total = cursor.fetchone()['cnt']
-                    
-                    cursor.execute("""
-                        SELECT 
-                            s.userid, 
-                            SUM(s.points) as total_score,
-                            u.first_name, u.last_name,
-                            RANK() OVER (ORDER BY SUM(s.points) DESC) as `rank`
-                        FROM gamification_scores s
-                        JOIN users u ON s.userid = u.userid
-                        WHERE s.timestamp BETWEEN %s AND %s
-                        GROUP BY s.userid
-                        HAVING total_score > 0
-                        ORDER BY total_score DESC
-                        LIMIT %s OFFSET %s
-                    """, (start_ts, end_ts, per_page, offset))
-                
-                entries = cursor.fetchall()
-                return entries, total
+        return _get_ranking(settings.RANKING_TYPE_SCORE, period, page, per_page)
     except Exception as e:
         logger.error(f"Error getting score ranking: {e}")
         return [], 0
@@ -802,56 +866,8 @@ def get_achievements_ranking(
     Returns:
         Tuple of (ranking entries, total count)
     """
-    offset = (page - 1) * per_page
-    
     try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                if period == settings.RANKING_PERIOD_ALL_TIME:
-                    # Используем таблицу итогов
-                    cursor.execute("""
-                        SELECT COUNT(*) as cnt FROM gamification_user_totals 
-                        WHERE total_achievements > 0
-                    """)
-                    total = cursor.fetchone()['cnt']
-                    
-                    cursor.execute("""
-                        SELECT 
-                            t.userid, t.total_achievements, u.first_name, u.last_name,
-                            RANK() OVER (ORDER BY t.total_achievements DESC) as `rank`
-                        FROM gamification_user_totals t
-                        JOIN users u ON t.userid = u.userid
-                        WHERE t.total_achievements > 0
-                        ORDER BY t.total_achievements DESC
-                        LIMIT %s OFFSET %s
-                    """, (per_page, offset))
-                else:
-                    # Для периода считаем по таблице достижений
-                    start_ts, end_ts = _get_time_range(period)
-                    
-                    cursor.execute("""
-                        SELECT COUNT(DISTINCT userid) as cnt 
-                        FROM gamification_user_achievements 
-                        WHERE unlocked_timestamp BETWEEN %s AND %s
-                    """, (start_ts, end_ts))
-                    total = cursor.fetchone()['cnt']
-                    
-                    cursor.execute("""
-                        SELECT 
-                            a.userid, 
-                            COUNT(*) as total_achievements,
-                            u.first_name, u.last_name,
-                            RANK() OVER (ORDER BY COUNT(*) DESC) as `rank`
-                        FROM gamification_user_achievements a
-                        JOIN users u ON a.userid = u.userid
-                        WHERE a.unlocked_timestamp BETWEEN %s AND %s
-                        GROUP BY a.userid
-                        ORDER BY total_achievements DESC
-                        LIMIT %s OFFSET %s
-                    """, (start_ts, end_ts, per_page, offset))
-                
-                entries = cursor.fetchall()
-                return entries, total
+        return _get_ranking(settings.RANKING_TYPE_ACHIEVEMENTS, period, page, per_page)
     except Exception as e:
         logger.error(f"Error getting achievements ranking: {e}")
         return [], 0
@@ -863,57 +879,16 @@ def get_user_rank(
     period: str = settings.RANKING_PERIOD_ALL_TIME
 ) -> Optional[Dict]:
     """Получить позицию конкретного пользователя в рейтинге."""
+    if ranking_type != settings.RANKING_TYPE_SCORE:
+        ranking_type = settings.RANKING_TYPE_ACHIEVEMENTS
+    value_field = _RANKING_COLUMNS[ranking_type][0]
+
+    def read(board):
+        value = board.value(userid)
+        return {'userid': userid, value_field: value, 'rank': board.rank_for_value(value)}
+
     try:
-        with database.get_db_connection() as conn:
-            with database.get_cursor(conn) as cursor:
-                if ranking_type == settings.RANKING_TYPE_SCORE:
-                    if period == settings.RANKING_PERIOD_ALL_TIME:
-                        cursor.execute("""
-                            SELECT 
-                                userid, total_score,
-                                (SELECT COUNT(*) + 1 FROM gamification_user_totals 
-                                 WHERE total_score > t.total_score) as `rank`
-                            FROM gamification_user_totals t
-                            WHERE userid = %s
-                        """, (userid,))
-                    else:
-                        start_ts, end_ts = _get_time_range(period)
-                        cursor.execute("""
-                            SELECT 
-                                %s as userid,
-                                COALESCE(SUM(points), 0) as total_score,
-                                (SELECT COUNT(DISTINCT s2.userid) + 1 
-                                 FROM gamification_scores s2 
-                                 WHERE s2.timestamp BETWEEN %s AND %s
-                                 GROUP BY s2.userid
-                                 HAVING SUM(s2.points) > COALESCE((
-                                     SELECT SUM(points) FROM gamification_scores 
-                                     WHERE userid = %s AND timestamp BETWEEN %s AND %s
-                                 ), 0)) as `rank`
-                            FROM gamification_scores
-                            WHERE userid = %s AND timestamp BETWEEN %s AND %s
-                        """, (userid, start_ts, end_ts, userid, start_ts, end_ts, userid, start_ts, end_ts))
-                else:
-                    if period == settings.RANKING_PERIOD_ALL_TIME:
-                        cursor.execute("""
-                            SELECT 
-                                userid, total_achievements,
-                                (SELECT COUNT(*) + 1 FROM gamification_user_totals 
-                                 WHERE total_achievements > t.total_achievements) as `rank`
-                            FROM gamification_user_totals t
-                            WHERE userid = %s
-                        """, (userid,))
-                    else:
-                        start_ts, end_ts = _get_time_range(period)
-                        cursor.execute("""
-                            SELECT 
-                                %s as userid,
-                                COUNT(*) as total_achievements
-                            FROM gamification_user_achievements
-                            WHERE userid = %s AND unlocked_timestamp BETWEEN %s AND %s
-                        """, (userid, userid, start_ts, end_ts))
-                
-                return cursor.fetchone()
+        return _LEADERBOARDS.view(_leaderboard_key(ranking_type, period), read)
     except Exception as e:
         logger.error(f"Error getting user rank: {e}")
         return None
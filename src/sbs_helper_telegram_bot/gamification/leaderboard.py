@@ -0,0 +1,165 @@
+"""
+Снимки рейтингов геймификации в памяти.
+
+``Leaderboard`` — отсортированный по убыванию значения список участников
+одного рейтинга (очки или достижения за месяц, год или всё время). Место
+считается как ``RANK()`` в SQL: 1 + число участников со строго большим
+значением, поиск — бинарный, страница — срез списка. Поэтому листание
+рейтинга не зависит от числа накопленных событий начисления очков.
+
+``LeaderboardCache`` хранит снимки по ключу (тип, период, ключ периода),
+обновляет их инкрементально на событиях начисления в этом процессе и
+перечитывает из агрегатных таблиц по истечении ``max_age_seconds`` —
+так подхватываются начисления из других процессов (внешние скрипты,
+admin_web).
+"""
+
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Строка загрузки снимка: (userid, значение, first_name, last_name)
+LeaderboardRow = Tuple[int, int, Optional[str], Optional[str]]
+# Запись страницы: (userid, значение, место)
+LeaderboardEntry = Tuple[int, int, int]
+
+
+class Leaderboard:
+    """
+    Отсортированный рейтинг с поиском места за O(log n).
+
+    В рейтинг попадают только участники с положительным значением — как
+    в прежних SQL-запросах (``WHERE total_score > 0`` / ``HAVING``).
+    """
+
+    def __init__(self, rows: Iterable[LeaderboardRow] = ()) -> None:
+        self._keys: List[Tuple[int, int]] = []
+        self._values: Dict[int, int] = {}
+        self._names: Dict[int, Tuple[Optional[str], Optional[str]]] = {}
+        for userid, value, first_name, last_name in rows:
+            self._names[userid] = (first_name, last_name)
+            self._values[userid] = value
+            if value > 0:
+                self._keys.append((-value, userid))
+        self._keys.sort()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def has_user(self, userid: int) -> bool:
+        """Известен ли пользователь снимку (есть в таблице users)."""
+        return userid in self._names
+
+    def names(self, userid: int) -> Tuple[Optional[str], Optional[str]]:
+        """Имя и фамилия пользователя."""
+        return self._names.get(userid, (None, None))
+
+    def value(self, userid: int) -> int:
+        """Значение пользователя (0, если у него нет начислений)."""
+        return self._values.get(userid, 0)
+
+    def rank_for_value(self, value: int) -> int:
+        """Место для значения: 1 + число участников со строго большим значением."""
+        # (-value,) меньше любого (-value, userid), поэтому равные значения не считаются
+        return bisect_left(self._keys, (-value,)) + 1
+
+    def page(self, offset: int, limit: int) -> List[LeaderboardEntry]:
+        """Срез рейтинга с местами."""
+        return [
+            (userid, -negative_value, self.rank_for_value(-negative_value))
+            for negative_value, userid in self._keys[max(0, offset):max(0, offset) + max(0, limit)]
+        ]
+
+    def add(self, userid: int, delta: int) -> None:
+        """Изменить значение пользователя на delta."""
+        self.set_value(userid, self._values.get(userid, 0) + delta)
+
+    def set_value(self, userid: int, value: int) -> None:
+        """Установить значение пользователя (не больше 0 — убрать из рейтинга)."""
+        previous = self._values.get(userid, 0)
+        if previous > 0:
+            del self._keys[bisect_left(self._keys, (-previous, userid))]
+        self._values[userid] = value
+        if value > 0:
+            insort(self._keys, (-value, userid))
+
+
+class LeaderboardCache:
+    """
+    Потокобезопасный кэш снимков рейтингов.
+
+    Args:
+        loader: Загрузка строк снимка по ключу (выполняется вне блокировки).
+        max_age_seconds: Через сколько секунд снимок перечитывается.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Iterable[LeaderboardRow]],
+        max_age_seconds: float,
+    ) -> None:
+        self._loader = loader
+        self._max_age = max_age_seconds
+        self._lock = threading.Lock()
+        self._boards: Dict[Hashable, Tuple[Leaderboard, float]] = {}
+        self._generation = 0
+        self.loads = 0
+
+    def get(self, key: Hashable) -> Leaderboard:
+        """Получить снимок по ключу, загрузив его при отсутствии или устаревании."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._boards.get(key)
+            if cached is not None and now - cached[1] < self._max_age:
+                return cached[0]
+            generation = self._generation
+
+        board = Leaderboard(self._loader(key))
+        with self._lock:
+            self.loads += 1
+            # Снимок, загрузка которого пересеклась со сбросом или изменением,
+            # мог их пропустить — используем его один раз, не кэшируя
+            if generation == self._generation:
+                self._boards[key] = (board, now)
+        return board
+
+    def view(self, key: Hashable, func: Callable[[Leaderboard], T]) -> T:
+        """Выполнить чтение снимка под блокировкой (без гонки с apply)."""
+        board = self.get(key)
+        with self._lock:
+            return func(board)
+
+    def apply(self, key: Hashable, userid: int, delta: int) -> None:
+        """
+        Применить изменение к загруженному снимку.
+
+        Пользователь, которого нет в снимке (новый в таблице users),
+        приводит к перечитыванию снимка при следующем обращении.
+        """
+        with self._lock:
+            # Идущая сейчас загрузка (в том числе перечитывание устаревшего
+            # снимка, который есть в кэше) могла не увидеть изменение
+            self._generation += 1
+            cached = self._boards.get(key)
+            if cached is None:
+                return
+            board = cached[0]
+            if board.has_user(userid):
+                board.add(userid, delta)
+            else:
+                del self._boards[key]
+
+    def invalidate(self) -> None:
+        """Сбросить все снимки."""
+        with self._lock:
+            self._boards.clear()
+            self._generation += 1
+
+    def prune(self, keep: Callable[[Hashable], bool]) -> None:
+        """Удалить снимки, ключи которых не проходят фильтр (прошедшие периоды)."""
+        with self._lock:
+            for key in [key for key in self._boards if not keep(key)]:
+                del self._boards[key]
@@ -60,6 +60,10 @@ BUTTON_ADMIN_OBFUSCATE: Final[str] = "🔒 Скрытие имён"
 
 # Настройки пагинации
 RANKINGS_PER_PAGE: Final[int] = 10
+
+# Через сколько секунд снимок рейтинга в памяти перечитывается из агрегатных
+# таблиц (начисления этого процесса применяются к снимку сразу)
+LEADERBOARD_MAX_AGE_SECONDS: Final[int] = 60
 ACHIEVEMENTS_PER_PAGE: Final[int] = 6
 
 # Состояния диалога для пользователя
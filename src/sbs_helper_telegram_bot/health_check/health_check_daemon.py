@@ -14,6 +14,7 @@ import requests
 
 from config.settings import DEBUG
 from src.common.health_check import record_health_status
+from src.common.runtime_status import get_process_statuses
 
 BASE_URL = "https://kkt-online.nalog.ru/"
 HEALTHCHECK_URL = (
@@ -80,6 +81,70 @@ def _check_once() -> None:
         logger.exception("Tax health check failed: %s", exc)
 
 
+def _log_db_pool_snapshot() -> None:
+    """
+    Записать в лог состояние пулов MySQL-соединений и самые долгие места ожидания.
+
+    Демон запускается отдельным процессом (run_bot.py), и собственный пул у
+    него почти пустой. Поэтому снимки читаются из ``runtime_process_status``:
+    их публикуют бот и GK-автоответчик (раздел ``db_pool``).
+    """
+    try:
+        statuses = get_process_statuses()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("DB pool: не удалось прочитать опубликованные снимки процессов: %s", exc)
+        return
+    now = int(time.time())
+    for status in statuses:
+        snapshot = status.payload.get("db_pool")
+        if not snapshot:
+            continue
+        process_label = f"{status.process_name}[{status.hostname}:{status.pid}]"
+        try:
+            _log_process_pool_snapshot(process_label, now - status.updated_at, snapshot)
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("DB pool %s: некорректный снимок: %s", process_label, exc)
+
+
+def _log_process_pool_snapshot(process_label: str, age_seconds: int, snapshot: Dict[str, Any]) -> None:
+    """Записать в лог снимок пула одного процесса."""
+    logger.info(
+        "DB pool %s (age=%ss): size=%s opened=%s in_use=%s idle=%s waiting=%s peak_waiting=%s "
+        "acquired=%s timeouts=%s recycled_stale=%s recycled_lifetime=%s "
+        "wait_p95_ms=%.1f hold_p95_ms=%.1f",
+        process_label,
+        age_seconds,
+        snapshot["pool_size"],
+        snapshot["opened"],
+        snapshot["in_use"],
+        snapshot["idle"],
+        snapshot["waiting"],
+        snapshot["peak_waiting"],
+        snapshot["acquired_total"],
+        snapshot["timeouts_total"],
+        snapshot["recycled_stale"],
+        snapshot["recycled_lifetime"],
+        snapshot["wait"]["p95_ms"],
+        snapshot["hold"]["p95_ms"],
+    )
+    slowest = sorted(
+        snapshot["call_sites"].items(),
+        key=lambda item: item[1]["wait"]["max_ms"],
+        reverse=True,
+    )[:3]
+    for call_site, stats in slowest:
+        logger.info(
+            "DB pool %s call site %s: acquires=%s wait_p95_ms=%.1f wait_max_ms=%.1f hold_p95_ms=%.1f timeouts=%s",
+            process_label,
+            call_site,
+            stats["wait"]["count"],
+            stats["wait"]["p95_ms"],
+            stats["wait"]["max_ms"],
+            stats["hold"]["p95_ms"],
+            stats["timeouts"],
+        )
+
+
 def run_loop() -> None:
     """Запуск периодических проверок доступности."""
     logger.info(
@@ -88,6 +153,7 @@ def run_loop() -> None:
     )
     while True:
         _check_once()
+        _log_db_pool_snapshot()
         time.sleep(CHECK_INTERVAL_SECONDS)
 
 
@@ -26,6 +26,8 @@ from telegram.ext import (
 
 import src.common.database as database
 from src.common import bot_settings
+from src.common.code_dictionary import CodeDictionary, SCOPE_KTR_CODES
+from src.common.settings_snapshot import bump_settings_version
 from src.common.telegram_user import check_if_user_legit, check_if_user_admin, get_unauthorized_message
 from src.common.messages import (
     get_main_menu_message,
@@ -136,9 +138,39 @@ def set_ktr_last_update_date(date_value: str, updated_by_userid: int) -> bool:
 
 # ===== ОПЕРАЦИИ С БАЗОЙ ДАННЫХ =====
 
+def _load_active_ktr_codes() -> List[dict]:
+    """
+    Загрузить все активные коды КТР для справочника в памяти.
+    """
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            cursor.execute("""
+                SELECT k.*, c.name as category_name
+                FROM ktr_codes k
+                LEFT JOIN ktr_categories c ON k.category_id = c.id
+                WHERE k.active = 1
+            """)
+            return cursor.fetchall()
+
+
+# Справочник активных кодов: поиск пользователей не обращается к БД.
+# Изменения кодов и категорий увеличивают версию справочника в settings_version.
+KTR_CODE_DICTIONARY = CodeDictionary(SCOPE_KTR_CODES, _load_active_ktr_codes, key_field="code")
+
+
+def _mark_ktr_codes_changed(cursor) -> None:
+    """
+    Увеличить версию справочника кодов КТР в текущей транзакции.
+    """
+    bump_settings_version(cursor, SCOPE_KTR_CODES)
+
+
 def get_ktr_code_by_code(code: str) -> Optional[dict]:
     """
-    Найти код КТР в базе данных.
+    Найти активный код КТР в справочнике.
+
+    Сначала ищется точное совпадение, затем — по нормализованному ключу
+    (регистр, пробелы и разделители, кириллические буквы вместо латинских).
     
     Args:
         code: Код КТР для поиска
@@ -146,15 +178,23 @@ def get_ktr_code_by_code(code: str) -> Optional[dict]:
     Returns:
         Словарь с данными кода или None, если не найден
     """
-    with database.get_db_connection() as conn:
-        with database.get_cursor(conn) as cursor:
-            cursor.execute("""
-                SELECT k.*, c.name as category_name
-                FROM ktr_codes k
-                LEFT JOIN ktr_categories c ON k.category_id = c.id
-                WHERE k.code = %s AND k.active = 1
-            """, (code,))
-            return cursor.fetchone()
+    return KTR_CODE_DICTIONARY.get(code)
+
+
+def suggest_ktr_codes(code: str, limit: int = None) -> List[str]:
+    """
+    Подобрать похожие коды КТР для подсказки «возможно, вы имели в виду».
+
+    Args:
+        code: Введённый код, не найденный в справочнике
+        limit: Максимальное число подсказок
+
+    Returns:
+        Список кодов (пустой, если похожих нет)
+    """
+    if limit is None:
+        limit = settings.SUGGESTIONS_LIMIT
+    return KTR_CODE_DICTIONARY.suggest(code, limit)
 
 
 def get_ktr_code_by_id(code_id: int) -> Optional[dict]:
@@ -225,7 +265,10 @@ def create_ktr_code(code: str, description: str, minutes: int, category_id: Opti
                 (code, description, minutes, category_id, date_updated, created_timestamp)
                 VALUES (%s, %s, %s, %s, %s, UNIX_TIMESTAMP())
             """, (code, description, minutes, category_id, date_updated))
-            return cursor.lastrowid
+            code_id = cursor.lastrowid
+            _mark_ktr_codes_changed(cursor)
+    KTR_CODE_DICTIONARY.invalidate()
+    return code_id
 
 
 def update_ktr_code(code_id: int, field: str, value, update_timestamp: bool = False) -> bool:
@@ -250,7 +293,10 @@ def update_ktr_code(code_id: int, field: str, value, update_timestamp: bool = Fa
                     SET {field} = %s
                     WHERE id = %s
                 """, (value, code_id))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            _mark_ktr_codes_changed(cursor)
+    KTR_CODE_DICTIONARY.invalidate()
+    return updated
 
 
 def delete_ktr_code(code_id: int) -> bool:
@@ -260,7 +306,10 @@ def delete_ktr_code(code_id: int) -> bool:
     with database.get_db_connection() as conn:
         with database.get_cursor(conn) as cursor:
             cursor.execute("DELETE FROM ktr_codes WHERE id = %s", (code_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            _mark_ktr_codes_changed(cursor)
+    KTR_CODE_DICTIONARY.invalidate()
+    return deleted
 
 
 def ktr_code_exists(code: str) -> bool:
@@ -377,7 +426,11 @@ def update_category(category_id: int, field: str, value) -> bool:
                 SET {field} = %s, updated_timestamp = UNIX_TIMESTAMP()
                 WHERE id = %s
             """, (value, category_id))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            # Название категории хранится в строках справочника кодов
+            _mark_ktr_codes_changed(cursor)
+    KTR_CODE_DICTIONARY.invalidate()
+    return updated
 
 
 def delete_category(category_id: int) -> bool:
@@ -388,7 +441,10 @@ def delete_category(category_id: int) -> bool:
         with database.get_cursor(conn) as cursor:
             # Ограничение FK с ON DELETE SET NULL корректно обрабатывает коды
             cursor.execute("DELETE FROM ktr_categories WHERE id = %s", (category_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            _mark_ktr_codes_changed(cursor)
+    KTR_CODE_DICTIONARY.invalidate()
+    return deleted
 
 
 def category_exists(name: str) -> bool:
@@ -948,7 +1004,8 @@ async def process_code_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
         
         escaped_code = messages.escape_markdown_v2(input_text)
         await update.message.reply_text(
-            messages.MESSAGE_CODE_NOT_FOUND.format(code=escaped_code),
+            messages.MESSAGE_CODE_NOT_FOUND.format(code=escaped_code)
+            + messages.format_did_you_mean(suggest_ktr_codes(input_text)),
             parse_mode=constants.ParseMode.MARKDOWN_V2
         )
     
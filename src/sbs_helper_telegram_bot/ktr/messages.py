@@ -7,7 +7,7 @@
 # pylint: disable=line-too-long
 # Примечание: двойные обратные слэши нужны для экранирования MarkdownV2
 
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import src.common.database as database
 
@@ -66,6 +66,8 @@ MESSAGE_SEARCH_CANCELLED = "❌ Поиск отменён\\."
 
 MESSAGE_CODE_NOT_FOUND = "❌ *Код КТР не найден*\n\nКод `{code}` отсутствует в базе данных\\.\n\nИнформация о запросе сохранена — мы добавим этот код в будущем\\."
 
+MESSAGE_DID_YOU_MEAN = "\n\n💡 *Возможно, вы имели в виду:* {codes}"
+
 MESSAGE_INVALID_CODE = "⚠️ *Некорректный код*\n\nПожалуйста, введите корректный код КТР \\(например: `POS2421`\\)\\."
 
 MESSAGE_NO_POPULAR_CODES = "📊 *Популярные коды КТР*\n\nПока нет данных о запросах\\."
@@ -287,6 +289,23 @@ def escape_markdown_v2(text: str) -> str:
     return text
 
 
+def format_did_you_mean(codes: List[str]) -> str:
+    """
+    Отформатировать подсказку с похожими кодами КТР.
+    
+    Args:
+        codes: Похожие коды из справочника
+        
+    Returns:
+        Строка MarkdownV2 для добавления к сообщению или пустая строка
+    """
+    if not codes:
+        return ""
+    return MESSAGE_DID_YOU_MEAN.format(
+        codes=", ".join(f"`{escape_markdown_v2(code)}`" for code in codes)
+    )
+
+
 def format_ktr_code_response(
     code: str,
     description: str,
@@ -84,3 +84,6 @@ UNKNOWN_CODES_PER_PAGE: Final[int] = 15
 
 # Количество популярных кодов для отображения
 TOP_POPULAR_COUNT: Final[int] = 10
+
+# Максимум подсказок «возможно, вы имели в виду» для ненайденного кода
+SUGGESTIONS_LIMIT: Final[int] = 5
@@ -0,0 +1,335 @@
+"""
+Движок рассылки новостей.
+
+Статья отправляется получателям ``BROADCAST_CONCURRENCY`` параллельными
+отправителями. Все отправки проходят через общий token bucket с лимитом
+Telegram на бота, а сообщения в один чат разносятся не менее чем на
+``BROADCAST_PER_CHAT_INTERVAL_SECONDS``. ``RetryAfter`` приостанавливает
+все отправки на время, указанное Telegram, сетевые ошибки повторяются с
+экспоненциальной задержкой, а «бот заблокирован» и «чат не найден»
+сразу считаются неудачной доставкой.
+
+Статусы доставки копятся в буфере и пишутся в ``news_delivery_log`` пачками
+через асинхронный фасад БД. Журнал доставки служит контрольной точкой:
+прерванная рассылка продолжается с неотправленных и неудачных получателей
+(см. ``news_logic.broadcast_news`` и ``resume_interrupted_broadcasts``).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+
+from src.common.async_database import run_db
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+# Запись журнала доставки: (user_id, status, error_message)
+Delivery = Tuple[int, str, Optional[str]]
+# Синхронная запись пачки в БД: (news_id, deliveries) -> успех
+DeliveryWriter = Callable[[int, List[Delivery]], bool]
+# Шаг отправки одному получателю: (bot, chat_id) -> ответ Telegram
+SendStep = Callable[[Any, int], Awaitable[Any]]
+ProgressCallback = Callable[[int, int, int], Awaitable[None]]
+
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Максимальная длина error_message в news_delivery_log
+_ERROR_MESSAGE_MAX_LENGTH = 500
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """Длительность паузы из RetryAfter (int или timedelta в разных версиях PTB)."""
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket для корутин одного event loop (в форме GCRA).
+
+    Каждый вызов ``acquire`` резервирует следующий слот синхронно, поэтому
+    ожидающие получают токены по очереди без гонки за пробуждение.
+    ``pause`` обнуляет запас и сдвигает все слоты на время паузы.
+
+    Args:
+        rate_per_second: Средняя скорость выдачи токенов.
+        capacity: Размер всплеска (сколько токенов можно взять сразу).
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float = 1.0) -> None:
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second должен быть положительным")
+        self._interval = 1.0 / rate_per_second
+        self._tolerance = max(0.0, capacity - 1.0) * self._interval
+        self._tat = 0.0
+        self._paused_until = 0.0
+
+    @property
+    def paused_until(self) -> float:
+        """Момент (time.monotonic) окончания паузы после RetryAfter."""
+        return self._paused_until
+
+    async def acquire(self) -> None:
+        """Дождаться токена."""
+        while True:
+            now = time.monotonic()
+            start = max(now, self._paused_until)
+            tat = max(self._tat, start)
+            allowed_at = max(tat - self._tolerance, start)
+            self._tat = tat + self._interval
+            if allowed_at > now:
+                await asyncio.sleep(allowed_at - now)
+            # Пауза, объявленная во время ожидания, действует и на уже выданный слот
+            if time.monotonic() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float) -> None:
+        """Приостановить выдачу токенов на seconds секунд."""
+        until = time.monotonic() + max(0.0, seconds)
+        if until > self._paused_until:
+            self._paused_until = until
+        self._tat = max(self._tat, self._paused_until)
+
+
+class DeliveryLogBuffer:
+    """
+    Буфер журнала доставки с пакетной записью в БД.
+
+    Пачка пишется при накоплении ``batch_size`` записей или через
+    ``flush_interval_seconds`` после предыдущей записи. При ошибке БД
+    записи остаются в буфере до следующей попытки.
+
+    Args:
+        news_id: ID рассылаемой новости.
+        writer: Синхронная функция записи пачки (выполняется через run_db).
+        batch_size: Размер пачки.
+        flush_interval_seconds: Максимальный интервал между записями.
+    """
+
+    def __init__(
+        self,
+        news_id: int,
+        writer: DeliveryWriter,
+        batch_size: int,
+        flush_interval_seconds: float,
+    ) -> None:
+        self._news_id = news_id
+        self._writer = writer
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = max(0.0, flush_interval_seconds)
+        self._rows: List[Delivery] = []
+        self._lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    @property
+    def pending(self) -> int:
+        """Число записей, ещё не записанных в БД."""
+        return len(self._rows)
+
+    async def add(self, user_id: int, status: str, error_message: Optional[str] = None) -> None:
+        """Добавить запись; при заполнении пачки или по интервалу — записать."""
+        self._rows.append((user_id, status, error_message))
+        if len(self._rows) >= self._batch_size or time.monotonic() - self._last_flush >= self._flush_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записать накопленные записи одной пачкой."""
+        async with self._lock:
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            self._last_flush = time.monotonic()
+            try:
+                ok = await run_db(self._writer, self._news_id, rows)
+            except Exception as exc:
+                logger.error("Ошибка записи журнала рассылки news_id=%s: %s", self._news_id, exc)
+                ok = False
+            if ok:
+                self.written += len(rows)
+                self.flushes += 1
+            else:
+                # Возвращаем записи в начало буфера до следующей попытки
+                self.failed_flushes += 1
+                self._rows[:0] = rows
+
+
+class NewsBroadcaster:
+    """
+    Рассылка одной новости параллельными отправителями с ограничением скорости.
+
+    Параметры по умолчанию берутся из настроек модуля (``BROADCAST_*``).
+
+    Args:
+        bot: Экземпляр telegram.Bot (или совместимый объект).
+        delivery_writer: Синхронная запись пачки журнала доставки.
+        concurrency: Число параллельных отправителей.
+        rate_per_second: Глобальный лимит сообщений в секунду.
+        burst: Допустимый всплеск сообщений.
+        per_chat_interval_seconds: Минимальный интервал между сообщениями в один чат.
+        max_retries: Повторов на получателя при RetryAfter и сетевых ошибках.
+        retry_base_delay_seconds: Базовая задержка экспоненциального повтора.
+        log_batch_size: Размер пачки журнала доставки.
+        log_flush_seconds: Максимальный интервал записи журнала.
+    """
+
+    def __init__(
+        self,
+        bot: Any,
+        delivery_writer: DeliveryWriter,
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[float] = None,
+        per_chat_interval_seconds: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_base_delay_seconds: Optional[float] = None,
+        log_batch_size: Optional[int] = None,
+        log_flush_seconds: Optional[float] = None,
+    ) -> None:
+        self._bot = bot
+        self._delivery_writer = delivery_writer
+        self._concurrency = max(1, concurrency or settings.BROADCAST_CONCURRENCY)
+        self._bucket = AsyncTokenBucket(
+            rate_per_second or settings.BROADCAST_RATE_PER_SECOND,
+            burst or settings.BROADCAST_BURST,
+        )
+        self._per_chat_interval = (
+            settings.BROADCAST_PER_CHAT_INTERVAL_SECONDS
+            if per_chat_interval_seconds is None else per_chat_interval_seconds
+        )
+        self._max_retries = settings.BROADCAST_MAX_RETRIES if max_retries is None else max_retries
+        self._retry_base_delay = (
+            settings.BROADCAST_RETRY_BASE_DELAY_SECONDS
+            if retry_base_delay_seconds is None else retry_base_delay_seconds
+        )
+        self._log_batch_size = log_batch_size or settings.BROADCAST_LOG_BATCH_SIZE
+        self._log_flush_seconds = (
+            settings.BROADCAST_LOG_FLUSH_SECONDS if log_flush_seconds is None else log_flush_seconds
+        )
+
+    async def broadcast(
+        self,
+        news_id: int,
+        steps: Sequence[SendStep],
+        user_ids: Iterable[int],
+        progress_callback: Optional[ProgressCallback] = None,
+    ) -> Dict[str, int]:
+        """
+        Отправить шаги steps каждому получателю.
+
+        Args:
+            news_id: ID новости (для журнала доставки).
+            steps: Шаги отправки одному получателю (сообщение, вложение).
+            user_ids: Получатели.
+            progress_callback: Асинхронный колбэк (sent, failed, total), вызывается
+                каждые BROADCAST_PROGRESS_INTERVAL получателей.
+
+        Returns:
+            Словарь со счётчиками 'sent', 'failed', 'retries'.
+        """
+        recipients = list(user_ids)
+        total = len(recipients)
+        results = {'sent': 0, 'failed': 0, 'retries': 0}
+        log_buffer = DeliveryLogBuffer(news_id, self._delivery_writer, self._log_batch_size, self._log_flush_seconds)
+        # Общий итератор: каждый отправитель берёт следующего получателя
+        queue = iter(recipients)
+
+        async def sender() -> None:
+            for user_id in queue:
+                status, error_message = await self._deliver(user_id, steps, results)
+                results[status] += 1
+                await log_buffer.add(user_id, status, error_message)
+                processed = results['sent'] + results['failed']
+                if progress_callback and processed % settings.BROADCAST_PROGRESS_INTERVAL == 0:
+                    try:
+                        await progress_callback(results['sent'], results['failed'], total)
+                    except Exception as exc:
+                        logger.warning("Ошибка колбэка прогресса рассылки: %s", exc)
+
+        started = time.monotonic()
+        try:
+            await asyncio.gather(*(sender() for _ in range(min(self._concurrency, max(1, total)))))
+        finally:
+            # Контрольная точка сохраняется и при отмене рассылки
+            await asyncio.shield(log_buffer.flush())
+            if log_buffer.pending:
+                logger.error(
+                    "Рассылка news_id=%s: %d записей журнала доставки не сохранены",
+                    news_id,
+                    log_buffer.pending,
+                )
+
+        elapsed = time.monotonic() - started
+        logger.info(
+            "Рассылка news_id=%s: отправлено=%d, ошибок=%d, повторов=%d за %.1f с (%.1f получателей/с), "
+            "записей журнала=%d пачками=%d",
+            news_id,
+            results['sent'],
+            results['failed'],
+            results['retries'],
+            elapsed,
+            total / elapsed if elapsed > 0 else 0.0,
+            log_buffer.written,
+            log_buffer.flushes,
+        )
+        return results
+
+    async def _deliver(
+        self,
+        chat_id: int,
+        steps: Sequence[SendStep],
+        results: Dict[str, int],
+    ) -> Tuple[str, Optional[str]]:
+        """Отправить все шаги одному получателю с повторами; вернуть (статус, ошибка)."""
+        step_index = 0
+        attempts = 0
+        next_send_at = 0.0
+        while step_index < len(steps):
+            # Интервал между сообщениями в один чат
+            wait = next_send_at - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._bucket.acquire()
+            try:
+                await steps[step_index](self._bot, chat_id)
+            except RetryAfter as exc:
+                delay = _retry_after_seconds(exc)
+                # Лимит Telegram общий для бота — приостанавливаем всех отправителей
+                self._bucket.pause(delay)
+                attempts += 1
+                results['retries'] += 1
+                if attempts > self._max_retries:
+                    return STATUS_FAILED, str(exc)[:_ERROR_MESSAGE_MAX_LENGTH]
+                logger.warning("Рассылка: RetryAfter %.1f с при отправке пользователю %s", delay, chat_id)
+                continue
+            except (Forbidden, BadRequest) as exc:
+                # Бот заблокирован, чат не найден и т. п. — повтор не поможет
+                logger.warning("Failed to send news to user %s: %s", chat_id, exc)
+                return STATUS_FAILED, str(exc)[:_ERROR_MESSAGE_MAX_LENGTH]
+            except NetworkError as exc:
+                attempts += 1
+                results['retries'] += 1
+                if attempts > self._max_retries:
+                    logger.warning("Failed to send news to user %s: %s", chat_id, exc)
+                    return STATUS_FAILED, str(exc)[:_ERROR_MESSAGE_MAX_LENGTH]
+                await asyncio.sleep(self._retry_base_delay * (2 ** (attempts - 1)))
+                continue
+            except TelegramError as exc:
+                logger.warning("Failed to send news to user %s: %s", chat_id, exc)
+                return STATUS_FAILED, str(exc)[:_ERROR_MESSAGE_MAX_LENGTH]
+            except Exception as exc:
+                logger.error("Unexpected error sending news to user %s: %s", chat_id, exc)
+                return STATUS_FAILED, str(exc)[:_ERROR_MESSAGE_MAX_LENGTH]
+            step_index += 1
+            next_send_at = time.monotonic() + self._per_chat_interval
+        return STATUS_SENT, None
@@ -7,16 +7,17 @@ Business logic, database operations, broadcasting, and search functionality.
 import asyncio
 import time
 import logging
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Iterable, Set, Tuple
 from datetime import datetime
 
 from telegram import Bot
-from telegram.error import TelegramError
 
 import src.common.database as database
 from src.common import bot_settings
+from src.common.async_database import run_db
 from . import settings
 from . import messages
+from .broadcast import Delivery, NewsBroadcaster, SendStep
 
 logger = logging.getLogger(__name__)
 
@@ -824,40 +825,152 @@ def get_failed_deliveries(news_id: int) -> List[int]:
         return []
 
 
-async def broadcast_news(
-    bot: Bot,
-    article: Dict[str, Any],
-    user_ids: List[int],
-    progress_callback: callable = None
-) -> Dict[str, int]:
+def log_deliveries(news_id: int, deliveries: List[Delivery]) -> bool:
     """
-    Broadcast news article to users with rate limiting.
+    Log a batch of delivery statuses with a single executemany.
     
     Args:
-        bot: Telegram Bot instance
-        article: Article dict with content, image_file_id, etc.
-        user_ids: List of user IDs to send to
-        progress_callback: Optional async callback(sent, failed, total) for progress updates
+        news_id: Article ID
+        deliveries: List of (user_id, status, error_message)
         
     Returns:
-        Dict with 'sent' and 'failed' counts
+        True if successful
+    """
+    if not deliveries:
+        return True
+    now = int(time.time())
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.executemany("""
+                    INSERT INTO news_delivery_log (news_id, user_id, status, error_message, delivered_timestamp)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        status = VALUES(status),
+                        error_message = VALUES(error_message),
+                        delivered_timestamp = VALUES(delivered_timestamp)
+                """, [
+                    (news_id, user_id, status, error_message, now)
+                    for user_id, status, error_message in deliveries
+                ])
+                conn.commit()
+                return True
+    except Exception as e:
+        logger.error("Error logging deliveries batch for article %s: %s", news_id, e)
+        return False
+
+
+def get_delivered_user_ids(news_id: int) -> Set[int]:
     """
-    results = {'sent': 0, 'failed': 0}
-    total = len(user_ids)
+    Get user IDs that already received the article (checkpoint for resume).
     
+    Returns:
+        Set of user IDs with 'sent' status
+    """
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute("""
+                    SELECT user_id FROM news_delivery_log
+                    WHERE news_id = %s AND status = 'sent'
+                """, (news_id,))
+                results = cursor.fetchall() or []
+                return {row['user_id'] for row in results}
+    except Exception as e:
+        logger.error("Error getting delivered users: %s", e)
+        return set()
+
+
+# ===== СОСТОЯНИЕ РАССЫЛОК =====
+
+
+def mark_broadcast_started(news_id: int, total_recipients: int) -> bool:
+    """
+    Mark broadcast as running and count the attempt.
+    
+    Returns:
+        True if successful
+    """
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute("""
+                    INSERT INTO news_broadcasts
+                        (news_id, status, attempts, total_recipients, started_timestamp, finished_timestamp)
+                    VALUES (%s, %s, 1, %s, %s, NULL)
+                    ON DUPLICATE KEY UPDATE
+                        status = VALUES(status),
+                        attempts = attempts + 1,
+                        total_recipients = VALUES(total_recipients),
+                        started_timestamp = VALUES(started_timestamp),
+                        finished_timestamp = NULL
+                """, (news_id, settings.BROADCAST_STATUS_RUNNING, total_recipients, int(time.time())))
+                conn.commit()
+                return True
+    except Exception as e:
+        # Без таблицы news_broadcasts рассылка работает, но не возобновляется
+        logger.warning("Error marking broadcast %s as started: %s", news_id, e)
+        return False
+
+
+def mark_broadcast_finished(news_id: int, status: str = settings.BROADCAST_STATUS_COMPLETED) -> bool:
+    """
+    Mark broadcast as completed or abandoned.
+    
+    Returns:
+        True if successful
+    """
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute("""
+                    UPDATE news_broadcasts
+                    SET status = %s, finished_timestamp = %s
+                    WHERE news_id = %s
+                """, (status, int(time.time()), news_id))
+                conn.commit()
+                return True
+    except Exception as e:
+        logger.warning("Error marking broadcast %s as %s: %s", news_id, status, e)
+        return False
+
+
+def get_interrupted_broadcasts() -> List[Dict[str, Any]]:
+    """
+    Get broadcasts left in 'running' state (bot stopped mid-broadcast).
+    
+    Returns:
+        List of dicts with news_id, attempts, total_recipients
+    """
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute("""
+                    SELECT news_id, attempts, total_recipients
+                    FROM news_broadcasts
+                    WHERE status = %s
+                    ORDER BY started_timestamp
+                """, (settings.BROADCAST_STATUS_RUNNING,))
+                return cursor.fetchall() or []
+    except Exception as e:
+        logger.warning("Error getting interrupted broadcasts: %s", e)
+        return []
+
+
+def _build_send_steps(article: Dict[str, Any], reactions: Dict[str, int]) -> List[SendStep]:
+    """
+    Build per-recipient send steps: article message and optional attachment.
+    """
     # Форматируем текст статьи
     title = messages.escape_markdown_v2(article['title'])
     content = messages.escape_markdown_v2(article['content'])
     category_emoji = article.get('category_emoji', '📰')
     category_name = messages.escape_markdown_v2(article.get('category_name', ''))
     
-    published_ts = article.get('published_timestamp', int(time.time()))
+    published_ts = article.get('published_timestamp') or int(time.time())
     published_date = datetime.fromtimestamp(published_ts).strftime('%d.%m.%Y')
     published_date = messages.escape_markdown_v2(published_date)
     
-    # Получаем реакции
-    reactions = get_article_reactions(article['id'])
-    
     text = messages.format_news_article(
         title=title,
         content=content,
@@ -870,56 +983,158 @@ async def broadcast_news(
     from . import keyboards
     reaction_keyboard = keyboards.get_reaction_keyboard(article['id'], reactions)
     
-    for i, user_id in enumerate(user_ids):
-        try:
-            if article.get('image_file_id'):
-                # Отправляем с изображением
-                await bot.send_photo(
-                    chat_id=user_id,
-                    photo=article['image_file_id'],
-                    caption=text,
-                    parse_mode='MarkdownV2',
-                    reply_markup=reaction_keyboard
-                )
-            else:
-                # Отправляем только текст
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=text,
-                    parse_mode='MarkdownV2',
-                    reply_markup=reaction_keyboard
-                )
-            
-            # Отправляем вложение, если есть
-            if article.get('attachment_file_id'):
-                await bot.send_document(
-                    chat_id=user_id,
-                    document=article['attachment_file_id'],
-                    filename=article.get('attachment_filename')
-                )
-            
-            log_delivery(article['id'], user_id, 'sent')
-            results['sent'] += 1
-            
-        except TelegramError as e:
-            logger.warning("Failed to send news to user %s: %s", user_id, e)
-            log_delivery(article['id'], user_id, 'failed', str(e)[:500])
-            results['failed'] += 1
-        except Exception as e:
-            logger.error("Unexpected error sending news to user %s: %s", user_id, e)
-            log_delivery(article['id'], user_id, 'failed', str(e)[:500])
-            results['failed'] += 1
-        
-        # Колбэк прогресса
-        if progress_callback and (i + 1) % settings.BROADCAST_PROGRESS_INTERVAL == 0:
-            await progress_callback(results['sent'], results['failed'], total)
+    async def send_article(bot: Bot, chat_id: int):
+        if article.get('image_file_id'):
+            # Отправляем с изображением
+            return await bot.send_photo(
+                chat_id=chat_id,
+                photo=article['image_file_id'],
+                caption=text,
+                parse_mode='MarkdownV2',
+                reply_markup=reaction_keyboard
+            )
+        # Отправляем только текст
+        return await bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode='MarkdownV2',
+            reply_markup=reaction_keyboard
+        )
+    
+    async def send_attachment(bot: Bot, chat_id: int):
+        return await bot.send_document(
+            chat_id=chat_id,
+            document=article['attachment_file_id'],
+            filename=article.get('attachment_filename')
+        )
+    
+    steps: List[SendStep] = [send_article]
+    # Вложение отправляется отдельным шагом: при повторе статья не дублируется
+    if article.get('attachment_file_id'):
+        steps.append(send_attachment)
+    return steps
+
+
+async def broadcast_news(
+    bot: Bot,
+    article: Dict[str, Any],
+    user_ids: Iterable[int],
+    progress_callback: callable = None,
+    resume: bool = True
+) -> Dict[str, int]:
+    """
+    Broadcast news article to users with rate limiting.
+    
+    Sending is concurrent and rate-aware (see broadcast.NewsBroadcaster).
+    Delivery log is the checkpoint: with resume=True users that already
+    received the article are skipped, so an interrupted broadcast can be
+    restarted without duplicates.
+    
+    Args:
+        bot: Telegram Bot instance
+        article: Article dict with content, image_file_id, etc.
+        user_ids: User IDs to send to
+        progress_callback: Optional async callback(sent, failed, total) for progress updates
+        resume: Skip users with 'sent' status in delivery log
         
-        # Ограничение скорости — 0.1с = 10 сообщений/с (безопасный запас)
-        await asyncio.sleep(settings.BROADCAST_DELAY_SECONDS)
+    Returns:
+        Dict with 'sent', 'failed', 'skipped', 'retries' and 'total' counts
+    """
+    news_id = article['id']
+    recipients = list(dict.fromkeys(user_ids))
+    skipped = 0
+    if resume:
+        delivered = await run_db(get_delivered_user_ids, news_id)
+        if delivered:
+            pending = [user_id for user_id in recipients if user_id not in delivered]
+            skipped = len(recipients) - len(pending)
+            recipients = pending
+    
+    # Получаем реакции
+    reactions = await run_db(get_article_reactions, news_id)
+    steps = _build_send_steps(article, reactions)
+    
+    await run_db(mark_broadcast_started, news_id, len(recipients) + skipped)
+    broadcaster = NewsBroadcaster(bot, delivery_writer=log_deliveries)
+    results = await broadcaster.broadcast(news_id, steps, recipients, progress_callback)
+    # При отмене (остановке бота) статус остаётся 'running' — рассылка возобновится
+    await run_db(mark_broadcast_finished, news_id, settings.BROADCAST_STATUS_COMPLETED)
     
+    results['skipped'] = skipped
+    results['total'] = len(recipients) + skipped
     return results
 
 
+async def resume_interrupted_broadcasts(bot: Bot) -> int:
+    """
+    Resume broadcasts interrupted by bot shutdown or crash.
+    
+    Returns:
+        Number of resumed broadcasts
+    """
+    resumed = 0
+    for state in await run_db(get_interrupted_broadcasts):
+        news_id = state['news_id']
+        article = await run_db(get_article_by_id, news_id)
+        if not article or article.get('status') != settings.STATUS_PUBLISHED or article.get('is_silent'):
+            await run_db(mark_broadcast_finished, news_id, settings.BROADCAST_STATUS_ABANDONED)
+            continue
+        if state['attempts'] >= settings.BROADCAST_MAX_ATTEMPTS:
+            logger.warning(
+                "Broadcast of article %s abandoned after %s attempts", news_id, state['attempts']
+            )
+            await run_db(mark_broadcast_finished, news_id, settings.BROADCAST_STATUS_ABANDONED)
+            continue
+        user_ids = await run_db(get_all_user_ids)
+        logger.info("Resuming broadcast of article %s (attempt %s)", news_id, state['attempts'] + 1)
+        results = await broadcast_news(bot, article, user_ids, resume=True)
+        logger.info(
+            "Resumed broadcast of article %s: sent=%s failed=%s skipped=%s",
+            news_id, results['sent'], results['failed'], results['skipped']
+        )
+        resumed += 1
+    return resumed
+
+
+# Фоновая задача возобновления рассылок (держим ссылку, чтобы задачу не собрал GC)
+_resume_task: Optional[asyncio.Task] = None
+
+
+def start_broadcast_resume(bot: Bot) -> Optional[asyncio.Task]:
+    """
+    Start background resume of interrupted broadcasts (called from post_init).
+    """
+    global _resume_task
+    if _resume_task is not None and not _resume_task.done():
+        return _resume_task
+    
+    async def _run() -> None:
+        try:
+            await resume_interrupted_broadcasts(bot)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error resuming interrupted broadcasts: %s", e)
+    
+    _resume_task = asyncio.create_task(_run(), name="news_broadcast_resume")
+    return _resume_task
+
+
+async def stop_broadcast_resume() -> None:
+    """
+    Cancel background resume (called from post_shutdown); progress stays in delivery log.
+    """
+    global _resume_task
+    task, _resume_task = _resume_task, None
+    if task is None or task.done():
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
 
 
@@ -148,8 +148,30 @@ REACTION_EMOJIS: Final[dict] = {
 
 # ===== НАСТРОЙКИ РАССЫЛКИ =====
 
-# Задержка между сообщениями в секундах (0.1 = 10 сообщений/с, запас до лимита 30/с)
-BROADCAST_DELAY_SECONDS: Final[float] = 0.1
+# Число параллельных отправителей
+BROADCAST_CONCURRENCY: Final[int] = 16
+
+# Глобальный лимит сообщений в секунду (лимит Telegram ~30/с на бота, оставляем запас)
+BROADCAST_RATE_PER_SECOND: Final[float] = 25.0
+
+# Допустимый всплеск сообщений сверх средней скорости
+BROADCAST_BURST: Final[int] = 5
+
+# Минимальный интервал между сообщениями в один чат (лимит Telegram ~1/с на чат)
+BROADCAST_PER_CHAT_INTERVAL_SECONDS: Final[float] = 1.0
+
+# Повторов на получателя при RetryAfter и сетевых ошибках
+BROADCAST_MAX_RETRIES: Final[int] = 5
+
+# Базовая задержка экспоненциального повтора при сетевой ошибке
+BROADCAST_RETRY_BASE_DELAY_SECONDS: Final[float] = 1.0
+
+# Журнал доставки пишется пачками по N записей или не реже чем раз в N секунд
+BROADCAST_LOG_BATCH_SIZE: Final[int] = 100
+BROADCAST_LOG_FLUSH_SECONDS: Final[float] = 2.0
+
+# Сколько раз прерванная рассылка возобновляется при запуске бота
+BROADCAST_MAX_ATTEMPTS: Final[int] = 3
 
 # Интервал обновления прогресса (каждые N пользователей)
 BROADCAST_PROGRESS_INTERVAL: Final[int] = 50
@@ -175,3 +197,9 @@ MAX_MESSAGE_LENGTH: Final[int] = 3800
 STATUS_DRAFT: Final[str] = "draft"
 STATUS_PUBLISHED: Final[str] = "published"
 STATUS_ARCHIVED: Final[str] = "archived"
+
+# ===== СТАТУСЫ РАССЫЛОК =====
+
+BROADCAST_STATUS_RUNNING: Final[str] = "running"
+BROADCAST_STATUS_COMPLETED: Final[str] = "completed"
+BROADCAST_STATUS_ABANDONED: Final[str] = "abandoned"
@@ -31,6 +31,12 @@ import httpx
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, CallbackQueryHandler, filters, ConversationHandler
 
 import src.common.database as database
+from src.common.async_database import (
+    get_async_cursor,
+    get_async_db_connection,
+    run_db,
+    shutdown_async_database,
+)
 import src.common.invites as invites
 import src.common.bot_settings as bot_settings
  
@@ -89,7 +95,18 @@ from src.sbs_helper_telegram_bot.soos import settings as soos_settings
 from src.sbs_helper_telegram_bot.upos_error import messages as upos_messages
 from src.sbs_helper_telegram_bot.upos_error import keyboards as upos_keyboards
 from src.sbs_helper_telegram_bot.upos_error import settings as upos_settings
-from src.core.ai.rag_service import preload_rag_runtime_dependencies
+from src.core.ai.event_loop_monitor import start_event_loop_lag_monitor, stop_event_loop_lag_monitor
+from src.core.ai.db_log_sink import close_db_log_sink
+from src.core.ai.gigachat_client_pool import close_gigachat_client_pool
+from src.core.ai.retrieval_executor import shutdown_retrieval_executor
+from src.core.ai.embedding_cache import get_embedding_cache_stats
+from src.common.runtime_status import (
+    register_runtime_status_provider,
+    start_runtime_status_publisher,
+    stop_runtime_status_publisher,
+)
+from src.core.ai.llm_provider import close_llm_http_clients
+from src.core.ai.rag_service import get_rag_cache_stats, preload_rag_runtime_dependencies
 
 from src.common.telegram_user import (
     check_if_user_legit,
@@ -209,6 +226,10 @@ from src.sbs_helper_telegram_bot.news import (
     has_unacked_mandatory_news,
     get_menu_button_with_badge as get_news_button_with_badge,
 )
+from src.sbs_helper_telegram_bot.news.news_logic import (
+    start_broadcast_resume as start_news_broadcast_resume,
+    stop_broadcast_resume as stop_news_broadcast_resume,
+)
 from src.sbs_helper_telegram_bot.news.news_bot_part import (
     get_news_user_handler,
     get_mandatory_ack_handler,
@@ -222,6 +243,7 @@ from src.sbs_helper_telegram_bot.ai_router.messages import (
     AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED,
     AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED,
     AI_PROGRESS_STAGE_UPOS_NOT_FOUND_FALLBACK_STARTED,
+    AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL,
     get_ai_message_by_key,
     get_ai_progress_message,
     get_ai_status_message,
@@ -644,43 +666,46 @@ async def start(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = update.effective_user.id
     
     # Проверяем, является ли пользователь предварительно приглашённым и не активирован
-    if invites.check_if_user_pre_invited(user_id) and not invites.is_pre_invited_user_activated(user_id):
+    if (
+        await run_db(invites.check_if_user_pre_invited, user_id)
+        and not await run_db(invites.is_pre_invited_user_activated, user_id)
+    ):
         # Активируем предварительно приглашённого пользователя
-        invites.mark_pre_invited_user_activated(user_id)
-        update_user_info_from_telegram(update.effective_user)
+        await run_db(invites.mark_pre_invited_user_activated, user_id)
+        await run_db(update_user_info_from_telegram, update.effective_user)
         
         # Выдаём инвайты недавно активированному пользователю
         await update.message.reply_text(MESSAGE_WELCOME_PRE_INVITED)
         for _ in range(INVITES_PER_NEW_USER):
-            invite = invites.generate_invite_for_user(user_id)
+            invite = await run_db(invites.generate_invite_for_user, user_id)
             await update.message.reply_text(MESSAGE_INVITE_ISSUED.format(invite=invite))
         
         # Показываем главное меню
-        is_admin = check_if_user_admin(user_id)
+        is_admin = await run_db(check_if_user_admin, user_id)
         main_keyboard = get_main_menu_keyboard(is_admin=is_admin)
         _remember_reply_keyboard(_context, main_keyboard)
         await update.message.reply_text(
-            get_main_menu_message(user_id, update.effective_user.first_name),
+            await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
             parse_mode=constants.ParseMode.MARKDOWN_V2,
             reply_markup=main_keyboard
         )
         return
     
     # Проверяем, заблокирован ли пользователь из-за выключенной системы инвайтов
-    if check_if_invite_user_blocked(user_id):
+    if await run_db(check_if_invite_user_blocked, user_id):
         await update.message.reply_text(MESSAGE_INVITE_SYSTEM_DISABLED)
         return
     
-    if not check_if_user_legit(user_id):
+    if not await run_db(check_if_user_legit, user_id):
         await update.message.reply_text(get_unauthorized_message(user_id))
         return
 
     user = update.effective_user
-    update_user_info_from_telegram(user)
-    is_admin = check_if_user_admin(user_id)
+    await run_db(update_user_info_from_telegram, user)
+    is_admin = await run_db(check_if_user_admin, user_id)
     
     # Проверяем наличие непрочитанных обязательных новостей
-    mandatory_news = get_unacked_mandatory_news(user_id)
+    mandatory_news = await run_db(get_unacked_mandatory_news, user_id)
     if mandatory_news:
         await _show_mandatory_news(update, mandatory_news)
         return
@@ -695,7 +720,7 @@ async def start(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> None:
         reply_markup=main_keyboard
     )
     await update.message.reply_text(
-        get_main_menu_message(user_id, update.effective_user.first_name),
+        await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
         parse_mode=constants.ParseMode.MARKDOWN_V2,
         reply_markup=main_keyboard
     )
@@ -710,26 +735,27 @@ async def invite_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) ->
     user_id = update.effective_user.id
     
     # Проверяем, заблокирован ли пользователь из-за выключенной системы инвайтов
-    if check_if_invite_user_blocked(user_id):
+    if await run_db(check_if_invite_user_blocked, user_id):
         await update.message.reply_text(MESSAGE_INVITE_SYSTEM_DISABLED)
         return
     
-    if not check_if_user_legit(user_id):
+    if not await run_db(check_if_user_legit, user_id):
         await update.message.reply_text(get_unauthorized_message(user_id))
         return
-    with database.get_db_connection() as conn:
-        with database.get_cursor(conn) as cursor:
+    # Соединение возвращается в пул до отправки сообщений в Telegram
+    async with get_async_db_connection() as conn:
+        async with get_async_cursor(conn) as cursor:
             sql_query = "SELECT invite from invites where userid=%s and consumed_userid is NULL "
             val=(user_id,)
-            cursor.execute(sql_query,val)
+            await cursor.execute(sql_query,val)
+            result = await cursor.fetchall()
 
-            result = cursor.fetchall()
-            if len(result)>0:
-                await update.message.reply_text(MESSAGE_AVAILABLE_INVITES)
-                for row in result:
-                    await update.message.reply_text(f'{row["invite"]}')
-            else:
-                await update.message.reply_text(MESSAGE_NO_INVITES)
+    if len(result)>0:
+        await update.message.reply_text(MESSAGE_AVAILABLE_INVITES)
+        for row in result:
+            await update.message.reply_text(f'{row["invite"]}')
+    else:
+        await update.message.reply_text(MESSAGE_NO_INVITES)
 
 
 async def menu_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -742,11 +768,11 @@ async def menu_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> N
     user_id = update.effective_user.id
     
     # Проверяем, заблокирован ли пользователь из-за выключенной системы инвайтов
-    if check_if_invite_user_blocked(user_id):
+    if await run_db(check_if_invite_user_blocked, user_id):
         await update.message.reply_text(MESSAGE_INVITE_SYSTEM_DISABLED)
         return
     
-    if not check_if_user_legit(user_id):
+    if not await run_db(check_if_user_legit, user_id):
         await update.message.reply_text(get_unauthorized_message(user_id))
         return
     
@@ -754,11 +780,11 @@ async def menu_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> N
     clear_all_states(_context)
     logger.info(f"User {user_id} used /menu - cleared all conversation states")
     
-    update_user_info_from_telegram(update.effective_user)
-    is_admin = check_if_user_admin(user_id)
+    await run_db(update_user_info_from_telegram, update.effective_user)
+    is_admin = await run_db(check_if_user_admin, user_id)
     
     # Проверяем наличие непрочитанных обязательных новостей
-    mandatory_news = get_unacked_mandatory_news(user_id)
+    mandatory_news = await run_db(get_unacked_mandatory_news, user_id)
     if mandatory_news:
         await _show_mandatory_news(update, mandatory_news)
         return
@@ -767,7 +793,7 @@ async def menu_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) -> N
     _remember_reply_keyboard(_context, main_keyboard)
     
     await update.message.reply_text(
-        get_main_menu_message(user_id, update.effective_user.first_name),
+        await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
         parse_mode=constants.ParseMode.MARKDOWN_V2,
         reply_markup=main_keyboard
     )
@@ -784,11 +810,11 @@ async def reset_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) ->
     user_id = update.effective_user.id
     
     # Проверяем, заблокирован ли пользователь из-за выключенной системы инвайтов
-    if check_if_invite_user_blocked(user_id):
+    if await run_db(check_if_invite_user_blocked, user_id):
         await update.message.reply_text(MESSAGE_INVITE_SYSTEM_DISABLED)
         return ConversationHandler.END
     
-    if not check_if_user_legit(user_id):
+    if not await run_db(check_if_user_legit, user_id):
         await update.message.reply_text(get_unauthorized_message(user_id))
         return ConversationHandler.END
     
@@ -796,11 +822,11 @@ async def reset_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) ->
     clear_all_states(_context)
     logger.info(f"User {user_id} used /reset - cleared all conversation states")
     
-    update_user_info_from_telegram(update.effective_user)
-    is_admin = check_if_user_admin(user_id)
+    await run_db(update_user_info_from_telegram, update.effective_user)
+    is_admin = await run_db(check_if_user_admin, user_id)
     
     # Проверяем наличие непрочитанных обязательных новостей
-    mandatory_news = get_unacked_mandatory_news(user_id)
+    mandatory_news = await run_db(get_unacked_mandatory_news, user_id)
     if mandatory_news:
         await _show_mandatory_news(update, mandatory_news)
         return ConversationHandler.END
@@ -810,7 +836,7 @@ async def reset_command(update: Update, _context: ContextTypes.DEFAULT_TYPE) ->
     
     # Тихо показываем главное меню (без подтверждения)
     await update.message.reply_text(
-        get_main_menu_message(user_id, update.effective_user.first_name),
+        await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
         parse_mode=constants.ParseMode.MARKDOWN_V2,
         reply_markup=main_keyboard
     )
@@ -827,11 +853,11 @@ async def help_main_command(update: Update, _context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
     
     # Проверяем, заблокирован ли пользователь из-за выключенной системы инвайтов
-    if check_if_invite_user_blocked(user_id):
+    if await run_db(check_if_invite_user_blocked, user_id):
         await update.message.reply_text(MESSAGE_INVITE_SYSTEM_DISABLED)
         return
     
-    if not check_if_user_legit(user_id):
+    if not await run_db(check_if_user_legit, user_id):
         await update.message.reply_text(get_unauthorized_message(user_id))
         return
     
@@ -890,25 +916,25 @@ async def text_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         mark_step("parse_message")
 
         # Единая проверка авторизации (одно подключение к БД вместо 6-9)
-        auth = await asyncio.to_thread(get_user_auth_status, user_id)
+        auth = await run_db(get_user_auth_status, user_id)
         mark_step("check_pre_invited")
         if auth.is_pre_invited and not auth.is_pre_invited_activated:
             # Активируем предварительно приглашённого пользователя
-            invites.mark_pre_invited_user_activated(user_id)
-            update_user_info_from_telegram(update.effective_user)
+            await run_db(invites.mark_pre_invited_user_activated, user_id)
+            await run_db(update_user_info_from_telegram, update.effective_user)
             mark_step("activate_pre_invited")
 
             # Выдаём инвайты недавно активированному пользователю
             await update.message.reply_text(MESSAGE_WELCOME_PRE_INVITED)
             for _ in range(INVITES_PER_NEW_USER):
-                invite = invites.generate_invite_for_user(user_id)
+                invite = await run_db(invites.generate_invite_for_user, user_id)
                 await update.message.reply_text(MESSAGE_INVITE_ISSUED.format(invite=invite))
             mark_step("send_pre_invited_welcome")
 
             # Показываем главное меню
             is_admin = auth.is_admin
             await update.message.reply_text(
-                get_main_menu_message(user_id, update.effective_user.first_name),
+                await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
                 parse_mode=constants.ParseMode.MARKDOWN_V2,
                 reply_markup=get_main_menu_keyboard(is_admin=is_admin)
             )
@@ -928,19 +954,19 @@ async def text_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         is_legit_user = auth.is_legit
         mark_step("check_legit_user")
         if not is_legit_user:
-            invite_status = check_if_invite_entered(user_id, text)
+            invite_status = await run_db(check_if_invite_entered, user_id, text)
             mark_step("check_invite_code")
             if invite_status == InviteStatus.SUCCESS:
-                update_user_info_from_telegram(update.effective_user)
+                await run_db(update_user_info_from_telegram, update.effective_user)
                 await update.message.reply_text(MESSAGE_WELCOME_SHORT)
                 for _ in range(INVITES_PER_NEW_USER):
-                    invite = invites.generate_invite_for_user(user_id)
+                    invite = await run_db(invites.generate_invite_for_user, user_id)
                     await update.message.reply_text(MESSAGE_INVITE_ISSUED.format(invite=invite))
                 mark_step("send_registration_welcome")
                 # Показываем главное меню после успешной регистрации
                 is_admin = auth.is_admin
                 await update.message.reply_text(
-                    get_main_menu_message(user_id, update.effective_user.first_name),
+                    await run_db(get_main_menu_message, user_id, update.effective_user.first_name),
                     parse_mode=constants.ParseMode.MARKDOWN_V2,
                     reply_markup=get_main_menu_keyboard(is_admin=is_admin)
                 )
@@ -973,7 +999,7 @@ async def text_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
         if text == BUTTON_MAIN_MENU:
             main_menu_started_at = time.perf_counter()
-            main_menu_message = get_main_menu_message(user_id, update.effective_user.first_name)
+            main_menu_message = await run_db(get_main_menu_message, user_id, update.effective_user.first_name)
             main_menu_keyboard = get_main_menu_keyboard(is_admin=is_admin)
             _remember_reply_keyboard(context, main_menu_keyboard)
             mark_step("main_menu_build")
@@ -1338,6 +1364,7 @@ async def text_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             classified_intent = None
             upos_not_found_notice_sent = False
             upos_fallback_flow = False
+            chat_stream_preview = ""
 
             async def _on_ai_classified(classification) -> None:
                 """Обновить плейсхолдер, когда запрос распознан как RAG."""
@@ -1357,11 +1384,29 @@ async def text_entered(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
                     )
 
             async def _on_ai_progress(stage: str, payload=None) -> None:
-                """Обновить плейсхолдер по этапам прогресса RAG."""
-                nonlocal classified_intent, upos_not_found_notice_sent, upos_fallback_flow
+                """Обновить плейсхолдер по этапам прогресса RAG и тексту потокового ответа."""
+                nonlocal classified_intent, upos_not_found_notice_sent, upos_fallback_flow, chat_stream_preview
                 if isinstance(payload, dict) and payload.get("intent") == "rag_qa":
                     classified_intent = "rag_qa"
 
+                if stage == AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL:
+                    # Длинный ответ показывается первой частью; итоговое
+                    # сообщение заменит плейсхолдер после завершения генерации.
+                    partial_text = payload.get("text") if isinstance(payload, dict) else ""
+                    preview = _split_markdown_v2_message(str(partial_text or ""))[0]
+                    if not preview.strip() or preview == chat_stream_preview:
+                        return
+                    chat_stream_preview = preview
+                    try:
+                        await _edit_markdown_safe(placeholder, preview)
+                    except Exception as stream_placeholder_exc:
+                        logger.warning(
+                            "Failed to update AI placeholder with streamed answer: preview_len=%d error=%s",
+                            len(preview),
+                            stream_placeholder_exc,
+                        )
+                    return
+
                 if stage not in {
                     AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED,
                     AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED,
@@ -1560,9 +1605,54 @@ async def post_init(application: Application) -> None:
         BotCommand("help", COMMAND_DESC_HELP),
     ])
 
+    # Фоновый замер задержки event loop: показывает, не блокируют ли
+    # синхронные операции обработку апдейтов.
+    start_event_loop_lag_monitor()
+
+    # Статистика кэшей и пула MySQL процесса бота публикуется в БД для
+    # health-проверок из других процессов (rag_ops health, health check демон).
+    register_runtime_status_provider("db_pool", database.get_pool_snapshot)
+    register_runtime_status_provider("embedding_cache", get_embedding_cache_stats)
+    register_runtime_status_provider("rag_caches", get_rag_cache_stats)
+    start_runtime_status_publisher("telegram_bot")
+
+    # Рассылки новостей, прерванные остановкой бота, дорассылаются в фоне
+    start_news_broadcast_resume(application.bot)
+
     await asyncio.to_thread(preload_rag_runtime_dependencies)
 
 
+async def post_shutdown(application: Application) -> None:
+    """Освободить общие ресурсы при остановке бота (очередь логов БД, пулы соединений LLM-провайдеров, retrieval executor)."""
+    await stop_event_loop_lag_monitor()
+    await stop_runtime_status_publisher()
+    await stop_news_broadcast_resume()
+    sink_stats = await close_db_log_sink()
+    if sink_stats:
+        logger.info(
+            "Очередь логов БД закрыта: записано=%d, отброшено=%d, ошибок=%d",
+            sink_stats["written"],
+            sink_stats["dropped"],
+            sink_stats["failed"],
+        )
+    closed = await close_llm_http_clients()
+    if closed:
+        logger.info("Закрыто HTTP-клиентов LLM: %d", closed)
+    close_gigachat_client_pool()
+    shutdown_retrieval_executor()
+    shutdown_async_database()
+    pool_snapshot = database.get_pool_snapshot()
+    if pool_snapshot:
+        logger.info(
+            "Пул MySQL: выдано=%d, таймаутов=%d, пересоздано=%d, пик ожидающих=%d, p95 ожидания=%.1f мс",
+            pool_snapshot["acquired_total"],
+            pool_snapshot["timeouts_total"],
+            pool_snapshot["recycled_stale"] + pool_snapshot["recycled_lifetime"],
+            pool_snapshot["peak_waiting"],
+            pool_snapshot["wait"]["p95_ms"],
+        )
+
+
 def main() -> None:
 
     """
@@ -1588,6 +1678,7 @@ def main() -> None:
         Application.builder()
         .token(TELEGRAM_TOKEN)
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .read_timeout(TELEGRAM_SEND_MSG_READ_TIMEOUT_SECONDS)
         .write_timeout(TELEGRAM_SEND_MSG_READ_TIMEOUT_SECONDS)
         .connect_timeout(TELEGRAM_SEND_MSG_CONNECT_TIMEOUT_SECONDS)
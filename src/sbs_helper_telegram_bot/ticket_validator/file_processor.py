@@ -3,12 +3,22 @@
 
 Обрабатывает чтение/запись Excel-файлов и пакетную валидацию заявок.
 Поддерживает форматы .xlsx и устаревший .xls.
+
+Для больших файлов есть потоковый режим (``validate_file_streaming``):
+строки читаются лениво, валидируются пачками (при большом числе строк —
+в пуле процессов со скомпилированным планом валидации), а результаты сразу
+пишутся в write-only книгу. В памяти находится лишь несколько пачек строк.
 """
 
+import copy
+import itertools
+import multiprocessing
 import os
 import re
 import logging
-from typing import List, Dict, Any, Optional, Callable, Tuple
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator, NamedTuple, Tuple
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
@@ -21,6 +31,9 @@ ILLEGAL_XML_CHARS_RE = re.compile(
 # Символы, которые Excel воспринимает как начало формулы
 FORMULA_START_CHARS = ('=', '+', '-', '@', '\t', '\r', '\n')
 
+# Тип заявки для пустых строк (такие строки пропускаются)
+SKIPPED_TICKET_TYPE = "Пустая строка"
+
 
 def sanitize_for_excel(value: Any) -> Any:
     """
@@ -80,6 +93,205 @@ class FileValidationResult:
     error_message: Optional[str] = None
 
 
+class RowOutcome(NamedTuple):
+    """Компактный результат валидации строки (передаётся между процессами)."""
+    is_valid: bool
+    ticket_type: str
+    errors: str
+    passed_rules: Tuple[str, ...]
+
+
+_SKIPPED_OUTCOME = RowOutcome(False, SKIPPED_TICKET_TYPE, "Текст заявки пуст", ())
+
+
+class FileValidationPlan:
+    """
+    Скомпилированный план валидации одного файла.
+
+    Содержит детектор типов (при автоопределении) или заданный тип и
+    наборы правил для всех типов, которые могут встретиться. Объект
+    сериализуется через pickle и передаётся воркерам пула процессов,
+    поэтому воркеры не обращаются к БД.
+
+    Args:
+        detector: детектор типов заявок (None — тип задан явно).
+        ticket_type_id: заданный тип заявки (None — автоопределение).
+        forced_type: объект заданного типа заявки, если найден.
+        rule_sets: скомпилированные наборы правил по ID типа заявки.
+    """
+
+    def __init__(self, detector, ticket_type_id: Optional[int], forced_type, rule_sets: Dict[int, Any]) -> None:
+        self.detector = detector
+        self.ticket_type_id = ticket_type_id
+        self.forced_type = forced_type
+        self.rule_sets = rule_sets
+
+    @classmethod
+    def load(cls, ticket_type_id: Optional[int] = None) -> "FileValidationPlan":
+        """Собрать план из кэша скомпилированных планов validation_rules."""
+        # Импортируем модули валидации здесь, чтобы избежать циклических импортов
+        from .validation_rules import get_cached_ticket_type, get_compiled_rules, get_ticket_type_detector
+
+        if ticket_type_id is None:
+            detector = get_ticket_type_detector()
+            type_ids = [ticket_type.id for ticket_type in detector.ticket_types if ticket_type.active]
+            forced_type = None
+        else:
+            detector = None
+            type_ids = [ticket_type_id] if ticket_type_id else []
+            forced_type = get_cached_ticket_type(ticket_type_id) if ticket_type_id else None
+        rule_sets = {type_id: get_compiled_rules(type_id) for type_id in type_ids}
+        return cls(detector, ticket_type_id, forced_type, rule_sets)
+
+    def validate_text(self, ticket_text: str) -> RowOutcome:
+        """Провалидировать текст заявки (уже без пробелов по краям)."""
+        from .validators import CompiledRuleSet
+
+        if not ticket_text:
+            return _SKIPPED_OUTCOME
+
+        # Определяем тип заявки, если он не задан явно
+        detected_type = None
+        type_id = self.ticket_type_id
+        if self.detector is not None and self.detector.ticket_types:
+            detected_type, _ = self.detector.detect(ticket_text)
+            type_id = detected_type.id if detected_type else None
+        elif self.ticket_type_id:
+            detected_type = self.forced_type
+
+        if not type_id:
+            # Не удалось определить тип
+            return RowOutcome(False, "Не определён", "Не удалось определить тип заявки", ())
+
+        rule_set = self.rule_sets.get(type_id)
+        if rule_set is None:
+            rule_set = CompiledRuleSet([])
+        validation_result = rule_set.validate(ticket_text, detected_type)
+        return RowOutcome(
+            validation_result.is_valid,
+            detected_type.type_name if detected_type else "Не определён",
+            "; ".join(validation_result.error_messages),
+            tuple(validation_result.passed_rules),
+        )
+
+    def validate_texts(self, texts: Iterable[str]) -> List[RowOutcome]:
+        """Провалидировать пачку текстов заявок."""
+        return [self.validate_text(text) for text in texts]
+
+
+# План валидации в процессе-воркере пула (задаётся инициализатором)
+_worker_plan: Optional[FileValidationPlan] = None
+
+
+def _init_validation_worker(plan: FileValidationPlan) -> None:
+    """Инициализатор воркера пула: сохранить план валидации файла."""
+    global _worker_plan
+    _worker_plan = plan
+
+
+def _validate_texts_in_worker(texts: List[str]) -> List[RowOutcome]:
+    """Провалидировать пачку текстов в процессе-воркере."""
+    return _worker_plan.validate_texts(texts)
+
+
+def _chunked(rows: Iterable[List[Any]], size: int) -> Iterator[List[List[Any]]]:
+    """Разбить поток строк на пачки по size строк."""
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ValidationSummary:
+    """Накопительная статистика валидации для листа «Статистика»."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.valid = 0
+        self.invalid = 0
+        self.skipped = 0
+        self.error_counts: Counter = Counter()
+        self.type_counts: Counter = Counter()
+
+    def add(self, is_valid: bool, ticket_type: str, errors: str) -> None:
+        """Учесть результат одной строки."""
+        self.total += 1
+        if ticket_type == SKIPPED_TICKET_TYPE:
+            self.skipped += 1
+        elif is_valid:
+            self.valid += 1
+        else:
+            self.invalid += 1
+        if errors:
+            for error in errors.split("; "):
+                error = error.strip()
+                if error:
+                    self.error_counts[error] += 1
+        if ticket_type and ticket_type != SKIPPED_TICKET_TYPE:
+            self.type_counts[ticket_type] += 1
+
+    def rows(self) -> List[Tuple[Any, Any, bool]]:
+        """
+        Строки листа статистики: (столбец A, столбец B, заголовок ли).
+
+        Порядок и пустые строки повторяют прежнюю раскладку листа.
+        """
+        rows: List[Tuple[Any, Any, bool]] = [
+            ("Статистика валидации", None, True),
+            (None, None, False),
+            ("Всего строк:", self.total, False),
+            ("✅ Валидных:", self.valid, False),
+            ("❌ С ошибками:", self.invalid, False),
+            ("⏭️ Пропущено:", self.skipped, False),
+        ]
+        if self.total > 0:
+            processed = self.total - self.skipped
+            success_rate = (self.valid / processed * 100) if processed > 0 else 0
+            rows.append((None, None, False))
+            rows.append(("Процент успеха:", f"{success_rate:.1f}%", False))
+
+        if self.error_counts:
+            rows.extend([(None, None, False)] * (9 - len(rows)))
+            rows.append(("Распространённые ошибки:", None, True))
+            rows.append((None, None, False))
+            for error, count in sorted(self.error_counts.items(), key=lambda x: -x[1])[:10]:
+                rows.append((sanitize_for_excel(error), count, False))
+
+        if self.type_counts:
+            rows.extend([(None, None, False)] * 2)
+            rows.append(("Типы заявок:", None, True))
+            rows.append((None, None, False))
+            for ticket_type, count in sorted(self.type_counts.items(), key=lambda x: -x[1]):
+                rows.append((sanitize_for_excel(ticket_type), count, False))
+        return rows
+
+
+class ClosingRowIterator:
+    """Итератор строк файла, закрывающий книгу при исчерпании или вызове close()."""
+
+    def __init__(self, rows: Iterator[List[Any]], close: Callable[[], None]) -> None:
+        self._rows = rows
+        self._close: Optional[Callable[[], None]] = close
+
+    def __iter__(self) -> "ClosingRowIterator":
+        return self
+
+    def __next__(self) -> List[Any]:
+        try:
+            return next(self._rows)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Закрыть книгу (повторный вызов ничего не делает)."""
+        close, self._close = self._close, None
+        if close is not None:
+            close()
+
+
 class ExcelFileProcessor:
     """
     Обрабатывает Excel-файлы для пакетной валидации заявок.
@@ -132,17 +344,36 @@ class ExcelFileProcessor:
         Raises:
             ValueError: Если формат файла не поддерживается
         """
+        headers, _, rows = self.iter_file_rows(file_path)
+        return headers, list(rows)
+    
+    def iter_file_rows(self, file_path: str) -> Tuple[List[str], int, Iterator[List[Any]]]:
+        """
+        Открыть Excel-файл для ленивого чтения строк.
+        
+        Полностью пустые строки пропускаются. Книга закрывается, когда
+        итератор строк исчерпан или закрыт методом close().
+        
+        Args:
+            file_path: Путь к Excel-файлу
+            
+        Returns:
+            Кортеж (заголовки, оценка числа строк данных по размеру листа, итератор строк)
+            
+        Raises:
+            ValueError: Если формат файла не поддерживается или файл не читается
+        """
         ext = os.path.splitext(file_path)[1].lower()
         
         if ext == '.xlsx':
-            return self._read_xlsx(file_path)
+            return self._open_xlsx(file_path)
         elif ext == '.xls':
-            return self._read_xls(file_path)
+            return self._open_xls(file_path)
         else:
             raise ValueError(f"Неподдерживаемый формат файла: {ext}. Используйте .xls или .xlsx")
     
-    def _read_xlsx(self, file_path: str) -> Tuple[List[str], List[List[Any]]]:
-        """Прочитать файл .xlsx с помощью openpyxl"""
+    def _open_xlsx(self, file_path: str) -> Tuple[List[str], int, Iterator[List[Any]]]:
+        """Открыть файл .xlsx с помощью openpyxl в режиме read-only"""
         openpyxl = self._ensure_openpyxl()
         
         try:
@@ -154,27 +385,32 @@ class ExcelFileProcessor:
             for cell in ws[1]:
                 headers.append(str(cell.value) if cell.value is not None else "")
             
-            # Получаем строки данных
-            rows = []
-            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            estimated_rows = max(0, (ws.max_row or 0) - 1)
+            return headers, estimated_rows, ClosingRowIterator(self._iter_xlsx_rows(ws), wb.close)
+            
+        except Exception as e:
+            logger.error(f"Error reading xlsx file: {e}")
+            raise ValueError(f"Error reading file: {str(e)}")
+    
+    def _iter_xlsx_rows(self, ws) -> Iterator[List[Any]]:
+        """Лениво выдать строки данных листа .xlsx"""
+        try:
+            for row in ws.iter_rows(min_row=2, values_only=True):
                 # Пропускаем полностью пустые строки
                 if all(cell is None or str(cell).strip() == "" for cell in row):
                     continue
-                rows.append(list(row))
-            
-            wb.close()
-            return headers, rows
-            
+                yield list(row)
         except Exception as e:
             logger.error(f"Error reading xlsx file: {e}")
             raise ValueError(f"Error reading file: {str(e)}")
     
-    def _read_xls(self, file_path: str) -> Tuple[List[str], List[List[Any]]]:
-        """Прочитать устаревший файл .xls с помощью xlrd"""
+    def _open_xls(self, file_path: str) -> Tuple[List[str], int, Iterator[List[Any]]]:
+        """Открыть устаревший файл .xls с помощью xlrd"""
         xlrd = self._ensure_xlrd()
         
         try:
-            wb = xlrd.open_workbook(file_path)
+            # on_demand: загружается только первый лист
+            wb = xlrd.open_workbook(file_path, on_demand=True)
             ws = wb.sheet_by_index(0)
             
             # Получаем заголовки
@@ -183,26 +419,26 @@ class ExcelFileProcessor:
                 val = ws.cell_value(0, col)
                 headers.append(str(val) if val else "")
             
-            # Получаем строки данных
-            rows = []
-            for row_idx in range(1, ws.nrows):
-                row = []
-                all_empty = True
-                for col in range(ws.ncols):
-                    val = ws.cell_value(row_idx, col)
-                    row.append(val)
-                    if val and str(val).strip():
-                        all_empty = False
-                # Пропускаем полностью пустые строки
-                if not all_empty:
-                    rows.append(row)
-            
-            return headers, rows
+            return headers, max(0, ws.nrows - 1), ClosingRowIterator(self._iter_xls_rows(ws), wb.release_resources)
             
         except Exception as e:
             logger.error(f"Error reading xls file: {e}")
             raise ValueError(f"Error reading file: {str(e)}")
     
+    def _iter_xls_rows(self, ws) -> Iterator[List[Any]]:
+        """Лениво выдать строки данных листа .xls"""
+        for row_idx in range(1, ws.nrows):
+            row = []
+            all_empty = True
+            for col in range(ws.ncols):
+                val = ws.cell_value(row_idx, col)
+                row.append(val)
+                if val and str(val).strip():
+                    all_empty = False
+            # Пропускаем полностью пустые строки
+            if not all_empty:
+                yield row
+    
     def get_column_names(self, file_path: str) -> List[str]:
         """
         Получить названия столбцов из Excel-файла.
@@ -213,7 +449,9 @@ class ExcelFileProcessor:
         Returns:
             Список названий столбцов
         """
-        headers, _ = self.read_file(file_path)
+        headers, _, rows = self.iter_file_rows(file_path)
+        # Строки данных не читаем: закрытие итератора закрывает книгу
+        rows.close()
         return headers
     
     def validate_file(
@@ -237,10 +475,6 @@ class ExcelFileProcessor:
         Returns:
             FileValidationResult с деталями валидации
         """
-        # Импортируем модули валидации здесь, чтобы избежать циклических импортов
-        from .validators import validate_ticket, detect_ticket_type, ValidationResult
-        from .validation_rules import load_rules_from_db, load_all_ticket_types
-        
         self.progress_callback = progress_callback
         
         try:
@@ -260,88 +494,33 @@ class ExcelFileProcessor:
             # Находим индекс столбца с заявками
             col_idx = self._resolve_column_index(headers, ticket_column)
             
-            # Получаем типы заявок для автоопределения
-            ticket_types = load_all_ticket_types() if ticket_type_id is None else None
+            # Скомпилированный детектор для автоопределения или заданный тип заявки:
+            # планы берутся из кэша один раз на файл, а не запросом к БД на каждую строку
+            plan = FileValidationPlan.load(ticket_type_id)
             
             # Валидируем каждую заявку
             results = []
-            valid_count = 0
-            invalid_count = 0
-            skipped_count = 0
+            summary = ValidationSummary()
             
             total_rows = len(rows)
             
             for idx, row in enumerate(rows, start=1):
-                # Получаем текст заявки из строки
-                if col_idx >= len(row):
-                    ticket_text = ""
-                else:
-                    ticket_text = str(row[col_idx]) if row[col_idx] is not None else ""
-                
-                ticket_text = ticket_text.strip()
-                
-                # Пропускаем пустые заявки
-                if not ticket_text:
-                    result = TicketValidationRow(
-                        row_number=idx,
-                        ticket_text="",
-                        is_valid=False,
-                        ticket_type="Пустая строка",
-                        errors="Текст заявки пуст",
-                        passed_rules=[],
-                        original_row=list(row)
-                    )
-                    results.append(result)
-                    skipped_count += 1
-                    
-                    if self.progress_callback:
-                        self.progress_callback(idx, total_rows)
-                    continue
-                
-                # Определяем тип заявки, если он не задан явно
-                detected_type = None
-                type_id = ticket_type_id
-                
-                if ticket_type_id is None and ticket_types:
-                    detected_type, _ = detect_ticket_type(ticket_text, ticket_types)
-                    type_id = detected_type.id if detected_type else None
-                elif ticket_type_id:
-                    # Загружаем данные принудительно заданного типа заявки
-                    from .validation_rules import load_ticket_type_by_id
-                    detected_type = load_ticket_type_by_id(ticket_type_id)
-                
-                # Загружаем правила и валидируем
-                if type_id:
-                    rules = load_rules_from_db(type_id)
-                    validation_result = validate_ticket(ticket_text, rules, detected_type)
-                else:
-                    # Не удалось определить тип
-                    validation_result = ValidationResult(
-                        is_valid=False,
-                        failed_rules=[],
-                        passed_rules=[],
-                        error_messages=["Не удалось определить тип заявки"],
-                        validation_details={},
-                        detected_ticket_type=None
-                    )
+                ticket_text = self._get_ticket_text(row, col_idx)
+                outcome = plan.validate_text(ticket_text)
+                summary.add(outcome.is_valid, outcome.ticket_type, outcome.errors)
                 
                 # Сохраняем результат
                 result = TicketValidationRow(
                     row_number=idx,
                     ticket_text=ticket_text[:500] + "..." if len(ticket_text) > 500 else ticket_text,
-                    is_valid=validation_result.is_valid,
-                    ticket_type=detected_type.type_name if detected_type else "Не определён",
-                    errors="; ".join(validation_result.error_messages),
-                    passed_rules=validation_result.passed_rules,
+                    is_valid=outcome.is_valid,
+                    ticket_type=outcome.ticket_type,
+                    errors=outcome.errors,
+                    passed_rules=list(outcome.passed_rules),
                     original_row=list(row)
                 )
                 results.append(result)
                 
-                if validation_result.is_valid:
-                    valid_count += 1
-                else:
-                    invalid_count += 1
-                
                 # Коллбэк прогресса
                 if self.progress_callback:
                     self.progress_callback(idx, total_rows)
@@ -355,9 +534,9 @@ class ExcelFileProcessor:
             
             return FileValidationResult(
                 total_tickets=total_rows,
-                valid_tickets=valid_count,
-                invalid_tickets=invalid_count,
-                skipped_tickets=skipped_count,
+                valid_tickets=summary.valid,
+                invalid_tickets=summary.invalid,
+                skipped_tickets=summary.skipped,
                 results=results,
                 output_file_path=output_path
             )
@@ -373,6 +552,155 @@ class ExcelFileProcessor:
                 error_message=f"Ошибка обработки файла: {str(e)}"
             )
     
+    def validate_file_streaming(
+        self,
+        file_path: str,
+        ticket_column: str | int,
+        output_path: Optional[str] = None,
+        ticket_type_id: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None
+    ) -> FileValidationResult:
+        """
+        Провалидировать все заявки в файле в потоковом режиме.
+        
+        Строки читаются лениво и обрабатываются пачками по chunk_size; для
+        больших файлов пачки валидируются в пуле процессов. Результаты сразу
+        пишутся в write-only книгу, поэтому память не растёт с размером файла,
+        а FileValidationResult.results остаётся пустым — в нём только счётчики.
+        
+        Args:
+            file_path: Путь к входному Excel-файлу
+            ticket_column: Название столбца или индекс (с 0), содержащий заявки
+            output_path: Путь для выходного файла (None = сгенерировать автоматически)
+            ticket_type_id: Принудительно задать тип заявки (None = автоопределение)
+            progress_callback: Функция для уведомления о прогрессе (current, total);
+                total — оценка по размеру листа, уточняется в конце
+            workers: Число процессов (None = по настройкам и размеру файла, 1 = без пула)
+            chunk_size: Размер пачки строк (None = FILE_VALIDATION_CHUNK_SIZE)
+        
+        Returns:
+            FileValidationResult со счётчиками и путём к выходному файлу
+        """
+        from . import settings
+        
+        self.progress_callback = progress_callback
+        chunk_size = max(1, chunk_size or settings.FILE_VALIDATION_CHUNK_SIZE)
+        rows = None
+        executor = None
+        
+        try:
+            headers, estimated_rows, rows = self.iter_file_rows(file_path)
+            
+            first_row = next(rows, None)
+            if first_row is None:
+                return FileValidationResult(
+                    total_tickets=0,
+                    valid_tickets=0,
+                    invalid_tickets=0,
+                    skipped_tickets=0,
+                    results=[],
+                    error_message="Файл не содержит данных"
+                )
+            
+            # Находим индекс столбца с заявками
+            col_idx = self._resolve_column_index(headers, ticket_column)
+            
+            plan = FileValidationPlan.load(ticket_type_id)
+            workers = self._resolve_workers(workers, estimated_rows)
+            
+            if output_path is None:
+                base_name = os.path.splitext(file_path)[0]
+                output_path = f"{base_name}_validated.xlsx"
+            
+            writer = StreamingResultsWriter(self._ensure_openpyxl(), headers, output_path, width_sample_rows=chunk_size)
+            summary = ValidationSummary()
+            
+            def write_chunk(chunk: List[List[Any]], outcomes: List[RowOutcome]) -> None:
+                for row, outcome in zip(chunk, outcomes):
+                    writer.write(row, outcome)
+                    summary.add(outcome.is_valid, outcome.ticket_type, outcome.errors)
+                if self.progress_callback:
+                    self.progress_callback(summary.total, max(estimated_rows, summary.total))
+            
+            chunks = _chunked(itertools.chain([first_row], rows), chunk_size)
+            
+            if workers > 1:
+                logger.info(f"Validating {file_path} in {workers} processes (~{estimated_rows} rows)")
+                executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context(settings.FILE_VALIDATION_MP_START_METHOD),
+                    initializer=_init_validation_worker,
+                    initargs=(plan,)
+                )
+                # Ограничиваем число пачек в работе: в памяти только они и их результаты
+                max_in_flight = workers * 2
+                pending = deque()
+                for chunk in chunks:
+                    texts = [self._get_ticket_text(row, col_idx) for row in chunk]
+                    pending.append((chunk, executor.submit(_validate_texts_in_worker, texts)))
+                    if len(pending) >= max_in_flight:
+                        done_chunk, future = pending.popleft()
+                        write_chunk(done_chunk, future.result())
+                while pending:
+                    done_chunk, future = pending.popleft()
+                    write_chunk(done_chunk, future.result())
+            else:
+                for chunk in chunks:
+                    write_chunk(chunk, plan.validate_texts(self._get_ticket_text(row, col_idx) for row in chunk))
+            
+            writer.close(summary)
+            
+            if self.progress_callback:
+                self.progress_callback(summary.total, summary.total)
+            
+            return FileValidationResult(
+                total_tickets=summary.total,
+                valid_tickets=summary.valid,
+                invalid_tickets=summary.invalid,
+                skipped_tickets=summary.skipped,
+                results=[],
+                output_file_path=output_path
+            )
+            
+        except Exception as e:
+            logger.error(f"Error validating file: {e}", exc_info=True)
+            return FileValidationResult(
+                total_tickets=0,
+                valid_tickets=0,
+                invalid_tickets=0,
+                skipped_tickets=0,
+                results=[],
+                error_message=f"Ошибка обработки файла: {str(e)}"
+            )
+        
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+            if rows is not None:
+                rows.close()
+    
+    @staticmethod
+    def _get_ticket_text(row: List[Any], col_idx: int) -> str:
+        """Получить текст заявки из строки (без пробелов по краям)."""
+        if col_idx >= len(row) or row[col_idx] is None:
+            return ""
+        return str(row[col_idx]).strip()
+    
+    @staticmethod
+    def _resolve_workers(workers: Optional[int], estimated_rows: int) -> int:
+        """Определить число процессов пула для файла."""
+        from . import settings
+        
+        if workers is None:
+            if estimated_rows < settings.FILE_VALIDATION_PARALLEL_MIN_ROWS:
+                return 1
+            workers = settings.FILE_VALIDATION_WORKERS or min(
+                settings.FILE_VALIDATION_MAX_AUTO_WORKERS, os.cpu_count() or 1
+            )
+        return max(1, workers)
+    
     def _resolve_column_index(self, headers: List[str], ticket_column: str | int) -> int:
         """
         Resolve column name or index to numeric index.
@@ -536,67 +864,196 @@ class ExcelFileProcessor:
     
     def _add_summary_sheet(self, wb, results: List[TicketValidationRow]):
         """Добавить лист со статистикой"""
-        ws = wb.create_sheet("Статистика")
+        summary = ValidationSummary()
+        for result in results:
+            summary.add(result.is_valid, result.ticket_type, result.errors)
         
-        from openpyxl.styles import PatternFill, Font, Alignment
+        from openpyxl.styles import Font
         
+        ws = wb.create_sheet("Статистика")
         header_font = Font(bold=True, size=14)
+        for row_idx, (label, value, is_header) in enumerate(summary.rows(), start=1):
+            if label is not None:
+                cell = ws.cell(row=row_idx, column=1, value=label)
+                if is_header:
+                    cell.font = header_font
+            if value is not None:
+                ws.cell(row=row_idx, column=2, value=value)
         
-        total = len(results)
-        valid = sum(1 for r in results if r.is_valid)
-        invalid = sum(1 for r in results if not r.is_valid and r.ticket_type != "Пустая строка")
-        skipped = sum(1 for r in results if r.ticket_type == "Пустая строка")
-        
-        # Записываем сводку
-        ws.cell(row=1, column=1, value="Статистика валидации").font = header_font
-        ws.cell(row=3, column=1, value="Всего строк:")
-        ws.cell(row=3, column=2, value=total)
-        ws.cell(row=4, column=1, value="✅ Валидных:")
-        ws.cell(row=4, column=2, value=valid)
-        ws.cell(row=5, column=1, value="❌ С ошибками:")
-        ws.cell(row=5, column=2, value=invalid)
-        ws.cell(row=6, column=1, value="⏭️ Пропущено:")
-        ws.cell(row=6, column=2, value=skipped)
-        
-        if total > 0:
-            success_rate = (valid / (total - skipped) * 100) if (total - skipped) > 0 else 0
-            ws.cell(row=8, column=1, value="Процент успеха:")
-            ws.cell(row=8, column=2, value=f"{success_rate:.1f}%")
-        
-        # Считаем ошибки по типам
-        error_counts: Dict[str, int] = {}
-        for result in results:
-            if result.errors:
-                for error in result.errors.split("; "):
-                    error = error.strip()
-                    if error:
-                        error_counts[error] = error_counts.get(error, 0) + 1
-        
-        if error_counts:
-            ws.cell(row=10, column=1, value="Распространённые ошибки:").font = header_font
-            row = 12
-            for error, count in sorted(error_counts.items(), key=lambda x: -x[1])[:10]:
-                ws.cell(row=row, column=1, value=sanitize_for_excel(error))
-                ws.cell(row=row, column=2, value=count)
-                row += 1
-        
-        # Считаем по типам заявок
-        type_counts: Dict[str, int] = {}
-        for result in results:
-            if result.ticket_type and result.ticket_type != "Пустая строка":
-                type_counts[result.ticket_type] = type_counts.get(result.ticket_type, 0) + 1
+        # Настраиваем ширину столбцов
+        ws.column_dimensions['A'].width = 50
+        ws.column_dimensions['B'].width = 15
+
+
+class StreamingResultsWriter:
+    """
+    Потоковая запись результатов валидации в write-only книгу openpyxl.
+    
+    Раскладка и стили совпадают с ExcelFileProcessor._write_results.
+    Ширина столбцов в write-only режиме задаётся до первой строки, поэтому
+    она считается по первым width_sample_rows строкам (они буферизуются).
+    
+    Args:
+        openpyxl: Модуль openpyxl
+        original_headers: Исходные заголовки столбцов
+        output_path: Путь к выходному файлу
+        width_sample_rows: Число первых строк для расчёта ширины столбцов
+    """
+    
+    def __init__(self, openpyxl, original_headers: List[str], output_path: str, width_sample_rows: int = 1000):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
         
-        if type_counts:
-            ws.cell(row=row + 2, column=1, value="Типы заявок:").font = header_font
-            row += 4
-            for ticket_type, count in sorted(type_counts.items(), key=lambda x: -x[1]):
-                ws.cell(row=row, column=1, value=sanitize_for_excel(ticket_type))
-                ws.cell(row=row, column=2, value=count)
-                row += 1
+        self._cell_class = WriteOnlyCell
+        self._headers = list(original_headers)
+        self._output_path = output_path
+        self._width_sample_rows = max(1, width_sample_rows)
+        self._pending: Optional[List[Tuple[List[Any], RowOutcome]]] = []
         
-        # Настраиваем ширину столбцов
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Результаты валидации")
+        
+        thin_border = Border(
+            left=Side(style='thin'),
+            right=Side(style='thin'),
+            top=Side(style='thin'),
+            bottom=Side(style='thin')
+        )
+        invalid_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+        top_wrap = Alignment(vertical='top', wrap_text=True)
+        
+        # Прототипы стилей: копирование готового стиля ячейки намного дешевле,
+        # чем присваивание объектов стиля каждой из сотен тысяч ячеек
+        def proto(fill=None, font=None, alignment=None, border=thin_border):
+            cell = WriteOnlyCell(self._ws)
+            if fill is not None:
+                cell.fill = fill
+            if font is not None:
+                cell.font = font
+            if alignment is not None:
+                cell.alignment = alignment
+            if border is not None:
+                cell.border = border
+            return cell._style
+        
+        self._header_style = proto(
+            fill=PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid"),
+            font=Font(bold=True, color="FFFFFF"),
+            alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)
+        )
+        self._data_style = proto(alignment=top_wrap)
+        self._padding_style = proto()
+        center = Alignment(horizontal='center', vertical='center')
+        self._status_styles = {
+            "skipped": ("⏭️ ПРОПУЩЕН", proto(
+                fill=PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"),
+                font=Font(color="9C5700"), alignment=center)),
+            "valid": ("✅ ВАЛИДНА", proto(
+                fill=PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+                font=Font(color="006100"), alignment=center)),
+            "invalid": ("❌ ОШИБКИ", proto(fill=invalid_fill, font=Font(color="9C0006"), alignment=center)),
+        }
+        self._type_style = proto(alignment=Alignment(vertical='top'))
+        self._errors_style = proto(alignment=top_wrap)
+        self._errors_invalid_style = proto(fill=invalid_fill, alignment=top_wrap)
+        self._passed_style = proto(alignment=top_wrap)
+        self._summary_header_style = proto(font=Font(bold=True, size=14), border=None)
+    
+    def write(self, original_row: List[Any], outcome: RowOutcome) -> None:
+        """Записать результат одной строки."""
+        if self._pending is not None:
+            self._pending.append((original_row, outcome))
+            if len(self._pending) >= self._width_sample_rows:
+                self._flush_pending()
+            return
+        self._ws.append(self._build_row(original_row, outcome))
+    
+    def close(self, summary: ValidationSummary) -> None:
+        """Дописать буфер и лист статистики, сохранить книгу."""
+        if self._pending is not None:
+            self._flush_pending()
+        
+        ws = self._wb.create_sheet("Статистика")
         ws.column_dimensions['A'].width = 50
         ws.column_dimensions['B'].width = 15
+        for label, value, is_header in summary.rows():
+            first = self._cell(ws, label, self._summary_header_style) if is_header else label
+            ws.append([first, value])
+        
+        self._wb.save(self._output_path)
+        logger.info(f"Wrote validation results to {self._output_path}")
+    
+    def _cell(self, ws, value: Any, style):
+        cell = self._cell_class(ws, value=value)
+        cell._style = copy.copy(style)
+        return cell
+    
+    def _row_values(self, original_row: List[Any], outcome: RowOutcome) -> List[Any]:
+        """Значения строки результата: исходные столбцы и четыре столбца проверки."""
+        # Столбцы проверки всегда идут сразу за заголовками исходного файла
+        values = [sanitize_for_excel(value) for value in original_row[:len(self._headers)]]
+        values.extend([""] * (len(self._headers) - len(values)))
+        values.append(self._status(outcome)[0])
+        values.append(sanitize_for_excel(outcome.ticket_type))
+        values.append(sanitize_for_excel(outcome.errors))
+        values.append(sanitize_for_excel("; ".join(outcome.passed_rules)))
+        return values
+    
+    def _status(self, outcome: RowOutcome):
+        if outcome.ticket_type == SKIPPED_TICKET_TYPE:
+            return self._status_styles["skipped"]
+        return self._status_styles["valid" if outcome.is_valid else "invalid"]
+    
+    def _build_row(self, original_row: List[Any], outcome: RowOutcome, values: Optional[List[Any]] = None) -> List[Any]:
+        ws = self._ws
+        if values is None:
+            values = self._row_values(original_row, outcome)
+        original_count = min(len(original_row), len(self._headers))
+        status_col = len(self._headers)
+        
+        cells = []
+        for col_idx, value in enumerate(values[:status_col]):
+            style = self._data_style if col_idx < original_count else self._padding_style
+            cells.append(self._cell(ws, value, style))
+        cells.append(self._cell(ws, values[status_col], self._status(outcome)[1]))
+        cells.append(self._cell(ws, values[status_col + 1], self._type_style))
+        errors_style = self._errors_invalid_style if outcome.errors else self._errors_style
+        cells.append(self._cell(ws, values[status_col + 2], errors_style))
+        cells.append(self._cell(ws, values[status_col + 3], self._passed_style))
+        return cells
+    
+    def _flush_pending(self) -> None:
+        """Рассчитать ширину столбцов по буферу, записать заголовки и буфер."""
+        from openpyxl.utils import get_column_letter
+        
+        pending, self._pending = self._pending or [], None
+        ws = self._ws
+        new_headers = self._headers + ["✅ Результат", "🎫 Тип заявки", "❌ Ошибки", "✓ Пройденные проверки"]
+        rows_values = [self._row_values(row, outcome) for row, outcome in pending]
+        
+        # Автоподстройка ширины столбцов (как в _write_results, по выборке строк)
+        errors_col = len(self._headers) + 3
+        passed_col = len(self._headers) + 4
+        for col_idx in range(1, len(new_headers) + 1):
+            max_length = 0
+            for values in [new_headers] + rows_values:
+                value = values[col_idx - 1] if col_idx <= len(values) else None
+                if value:
+                    cell_length = len(str(value))
+                    # Учитываем переносы строк
+                    if col_idx == errors_col:
+                        cell_length = min(cell_length, 60)
+                    elif col_idx == passed_col:
+                        cell_length = min(cell_length, 50)
+                    max_length = max(max_length, cell_length)
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(max(max_length + 2, 10), 60)
+        
+        # Закрепляем строку заголовков
+        ws.freeze_panes = 'A2'
+        
+        ws.append([self._cell(ws, header, self._header_style) for header in new_headers])
+        for (row, outcome), values in zip(pending, rows_values):
+            ws.append(self._build_row(row, outcome, values))
 
 
 def get_column_names(file_path: str) -> List[str]:
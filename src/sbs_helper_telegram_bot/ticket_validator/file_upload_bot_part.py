@@ -331,10 +331,10 @@ async def process_column_selection(update: Update, context: ContextTypes.DEFAULT
         loop = asyncio.get_event_loop()
         progress_task = loop.create_task(progress_updater())
         
-        # Запускаем проверку в executor с синхронным колбэком
+        # Запускаем потоковую проверку в executor с синхронным колбэком
         result: FileValidationResult = await loop.run_in_executor(
             None,
-            lambda: processor.validate_file(
+            lambda: processor.validate_file_streaming(
                 file_path=temp_file,
                 ticket_column=col_idx,
                 output_path=None,  # Автогенерация
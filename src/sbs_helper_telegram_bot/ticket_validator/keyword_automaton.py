@@ -0,0 +1,120 @@
+"""
+Модуль поиска множества ключевых слов в тексте заявки за один проход.
+
+Используется детектором типов заявок: все ключевые слова всех типов
+собираются в один словарь, и для текста возвращаются индексы найденных слов
+(подстрок, без учёта регистра — текст передаётся уже в нижнем регистре).
+
+Для больших словарей строится автомат Ахо — Корасик (детерминированный:
+переходы по провальным ссылкам вычислены заранее), и текст просматривается
+один раз независимо от числа слов. Для небольших словарей дешевле проверка
+``keyword in text`` на C-уровне, поэтому автомат строится только начиная с
+``AUTOMATON_MIN_KEYWORDS`` слов.
+"""
+
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Порог числа уникальных слов, с которого автомат быстрее цикла «in»
+# (замер на текстах заявок ~1.5 тыс. символов: автомат ~150 мкс независимо
+# от размера словаря, «in» — ~0.8 мкс на слово).
+AUTOMATON_MIN_KEYWORDS = 192
+
+
+class KeywordAutomaton:
+    """
+    Автомат Ахо — Корасик над набором ключевых слов.
+
+    Args:
+        keywords: Ключевые слова (уже в нижнем регистре); индекс слова
+            в последовательности — его идентификатор в результате ``find``.
+    """
+
+    def __init__(self, keywords: Sequence[str]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for index, keyword in enumerate(keywords):
+            if not keyword:
+                continue
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][char] = next_state
+                state = next_state
+            outputs[state].append(index)
+
+        # Обход в ширину: провальные ссылки и полная таблица переходов.
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [{} for _ in range(len(goto) - 1)]
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state].extend(outputs[fail[state]])
+            # Переходы состояния = переходы его провальной ссылки + собственные рёбра trie.
+            row = dict(transitions[fail[state]])
+            row.update(goto[state])
+            transitions[state] = row
+            for char, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(char, 0)
+                queue.append(child)
+
+        self._transitions = transitions
+        self._outputs: List[Tuple[int, ...]] = [tuple(sorted(set(found))) for found in outputs]
+
+    @property
+    def states_count(self) -> int:
+        """Число состояний автомата."""
+        return len(self._transitions)
+
+    def find(self, text: str) -> Set[int]:
+        """Вернуть индексы всех ключевых слов, входящих в text как подстрока."""
+        transitions = self._transitions
+        outputs = self._outputs
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+class KeywordMatcher:
+    """
+    Поиск набора ключевых слов: автомат для больших словарей, «in» — для малых.
+
+    Args:
+        keywords: Ключевые слова в нижнем регистре.
+        automaton_min_keywords: Порог числа слов для построения автомата
+            (по умолчанию AUTOMATON_MIN_KEYWORDS).
+    """
+
+    def __init__(self, keywords: Sequence[str], automaton_min_keywords: Optional[int] = None) -> None:
+        if automaton_min_keywords is None:
+            automaton_min_keywords = AUTOMATON_MIN_KEYWORDS
+        self._keywords = tuple(keywords)
+        self._automaton = (
+            KeywordAutomaton(self._keywords)
+            if len(self._keywords) >= automaton_min_keywords
+            else None
+        )
+
+    @property
+    def keywords_count(self) -> int:
+        """Число ключевых слов в словаре."""
+        return len(self._keywords)
+
+    @property
+    def uses_automaton(self) -> bool:
+        """Построен ли автомат Ахо — Корасик."""
+        return self._automaton is not None
+
+    def find(self, text: str) -> Set[int]:
+        """Вернуть индексы ключевых слов, найденных в text."""
+        if self._automaton is not None:
+            return self._automaton.find(text)
+        return {index for index, keyword in enumerate(self._keywords) if keyword and keyword in text}
@@ -69,11 +69,26 @@ DEBUG_MODE_KEY: Final[str] = 'validator_debug_mode'
 # Настройки валидации
 MAX_TICKET_LENGTH: Final[int] = 10000  # Максимум символов в тексте заявки
 MIN_TICKET_LENGTH: Final[int] = 20     # Минимум символов для валидной заявки
+# Максимальный возраст скомпилированного плана валидации (детектор типов и
+# наборы правил) в секундах. Правки из админ-панели сбрасывают кэш сразу;
+# срок нужен для изменений типов заявок, сделанных напрямую в БД.
+VALIDATION_PLAN_MAX_AGE_SECONDS: Final[int] = 300
 
 # Настройки загрузки файлов
 MAX_FILE_SIZE_MB: Final[int] = 20  # Максимальный размер файла в МБ
 SUPPORTED_FILE_EXTENSIONS: Final[List[str]] = ['.xls', '.xlsx']
 
+# Потоковая валидация файлов (validate_file_streaming)
+# Размер пачки строк: по столько строк читается, валидируется и пишется за раз
+FILE_VALIDATION_CHUNK_SIZE: Final[int] = 1000
+# Пул процессов включается для файлов не меньше этого числа строк
+FILE_VALIDATION_PARALLEL_MIN_ROWS: Final[int] = 20000
+# Число процессов пула (0 = по числу CPU, но не больше FILE_VALIDATION_MAX_AUTO_WORKERS)
+FILE_VALIDATION_WORKERS: Final[int] = 0
+FILE_VALIDATION_MAX_AUTO_WORKERS: Final[int] = 4
+# Способ запуска процессов: spawn безопасен для многопоточного процесса бота
+FILE_VALIDATION_MP_START_METHOD: Final[str] = "spawn"
+
 # Клавиатура загрузки файла
 FILE_UPLOAD_BUTTONS: Final[List[List[str]]] = [
     ["❌ Отмена"]
@@ -29,11 +29,10 @@ from . import messages
 from . import settings
 from .keyboards import get_submenu_keyboard, get_admin_submenu_keyboard
 from .validation_rules import (
-    load_rules_from_db,
-    load_all_ticket_types,
+    get_compiled_rules,
+    get_ticket_type_detector,
     run_all_template_tests
 )
-from .validators import validate_ticket, detect_ticket_type
 
 # Импорт настроек для шаблонов кнопок меню
 from . import settings as validator_settings
@@ -98,10 +97,10 @@ async def process_ticket_text(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # Загружаем типы заявок и определяем тип текущей заявки
     try:
-        ticket_types = load_all_ticket_types()
-        detected_type, debug_info = detect_ticket_type(
-            ticket_text, 
-            ticket_types, 
+        detector = get_ticket_type_detector()
+        ticket_types = detector.ticket_types
+        detected_type, debug_info = detector.detect(
+            ticket_text,
             debug=True  # Всегда получаем debug-информацию для проверки неоднозначности
         ) if ticket_types else (None, None)
         
@@ -141,8 +140,8 @@ async def process_ticket_text(update: Update, context: ContextTypes.DEFAULT_TYPE
             )
             return ConversationHandler.END
         
-        # Загружаем правила валидации для определённого типа
-        rules = load_rules_from_db(ticket_type_id=detected_type.id)
+        # Скомпилированные правила валидации для определённого типа
+        rules = get_compiled_rules(detected_type.id)
         
         if not rules:
             await update.message.reply_text(
@@ -152,7 +151,7 @@ async def process_ticket_text(update: Update, context: ContextTypes.DEFAULT_TYPE
             return ConversationHandler.END
         
         # Валидируем заявку
-        result = validate_ticket(ticket_text, rules, detected_ticket_type=detected_type)
+        result = rules.validate(ticket_text, detected_ticket_type=detected_type)
         
         # Определяем, какую клавиатуру показать в зависимости от статуса админа
         reply_keyboard = get_admin_submenu_keyboard() if is_admin else get_submenu_keyboard()
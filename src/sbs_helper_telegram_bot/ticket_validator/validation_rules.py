@@ -6,9 +6,91 @@
 
 import json
 import re
-from typing import List, Optional, Tuple, Dict, Any
+import threading
+import time
+from typing import Callable, List, Optional, Tuple, Dict, Any, TypeVar
 import src.common.database as database
-from .validators import ValidationRule, TicketType
+from . import settings
+from .validators import CompiledRuleSet, ValidationRule, TicketType, TicketTypeDetector
+
+T = TypeVar("T")
+
+# Кэш скомпилированных планов валидации: ключ -> (поколение правил, время сборки, план).
+# Поколение увеличивается при любой правке правил и их связей с типами заявок.
+_plan_lock = threading.Lock()
+_plan_generation = 0
+_plan_cache: Dict[Tuple[Any, ...], Tuple[int, float, Any]] = {}
+
+
+def invalidate_validation_plans() -> None:
+    """
+    Сбросить кэш скомпилированных планов валидации.
+
+    Вызывается функциями, изменяющими правила и их связи с типами заявок.
+    """
+    global _plan_generation
+    with _plan_lock:
+        _plan_generation += 1
+        _plan_cache.clear()
+
+
+def _get_cached_plan(key: Tuple[Any, ...], builder: Callable[[], T]) -> T:
+    """Вернуть план из кэша или собрать его для текущего поколения правил."""
+    entry = _plan_cache.get(key)
+    now = time.monotonic()
+    if (
+        entry is not None
+        and entry[0] == _plan_generation
+        and now - entry[1] < settings.VALIDATION_PLAN_MAX_AGE_SECONDS
+    ):
+        return entry[2]
+
+    generation = _plan_generation
+    plan = builder()
+    with _plan_lock:
+        # План, собранный во время правки правил, не кэшируем.
+        if generation == _plan_generation:
+            _plan_cache[key] = (generation, now, plan)
+    return plan
+
+
+def get_ticket_type_detector() -> TicketTypeDetector:
+    """
+    Получить скомпилированный детектор по всем активным типам заявок.
+
+    Returns:
+        TicketTypeDetector (список типов доступен в атрибуте ticket_types)
+    """
+    return _get_cached_plan(("detector",), lambda: TicketTypeDetector(load_all_ticket_types()))
+
+
+def get_compiled_rules(ticket_type_id: int) -> CompiledRuleSet:
+    """
+    Получить скомпилированный набор активных правил типа заявки.
+
+    Args:
+        ticket_type_id: ID типа заявки
+
+    Returns:
+        CompiledRuleSet (пустой, если правил нет)
+    """
+    return _get_cached_plan(
+        ("rules", ticket_type_id),
+        lambda: CompiledRuleSet(load_rules_from_db(ticket_type_id)),
+    )
+
+
+def get_cached_ticket_type(ticket_type_id: int) -> Optional[TicketType]:
+    """
+    Получить тип заявки по ID через кэш планов.
+
+    Args:
+        ticket_type_id: ID типа заявки
+
+    Returns:
+        Объект TicketType или None, если не найден
+    """
+    return _get_cached_plan(("ticket_type", ticket_type_id), lambda: load_ticket_type_by_id(ticket_type_id))
 
 
 def _normalize_keyword_weights(weights: Dict[str, float]) -> Dict[str, float]:
@@ -407,7 +489,9 @@ def create_validation_rule(rule_name: str, pattern: str, rule_type: str,
             """
             val = (rule_name, pattern, rule_type, error_message, priority)
             cursor.execute(sql, val)
-            return cursor.lastrowid
+            rule_id = cursor.lastrowid
+    invalidate_validation_plans()
+    return rule_id
 
 
 def update_validation_rule(rule_id: int, rule_name: str = None, pattern: str = None,
@@ -456,7 +540,9 @@ def update_validation_rule(rule_id: int, rule_name: str = None, pattern: str = N
         with database.get_cursor(conn) as cursor:
             sql = f"UPDATE ticket_validator_validation_rules SET {', '.join(updates)} WHERE id = %s"
             cursor.execute(sql, tuple(values))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+    invalidate_validation_plans()
+    return updated
 
 
 def toggle_rule_active(rule_id: int, active: bool) -> bool:
@@ -478,7 +564,9 @@ def toggle_rule_active(rule_id: int, active: bool) -> bool:
                 WHERE id = %s
             """
             cursor.execute(sql, (1 if active else 0, rule_id))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+    invalidate_validation_plans()
+    return updated
 
 
 def delete_validation_rule(rule_id: int) -> Tuple[bool, int]:
@@ -501,8 +589,9 @@ def delete_validation_rule(rule_id: int) -> Tuple[bool, int]:
             # Затем удаляем правило
             sql_rule = "DELETE FROM ticket_validator_validation_rules WHERE id = %s"
             cursor.execute(sql_rule, (rule_id,))
-            
-            return cursor.rowcount > 0, deleted_associations
+            deleted = cursor.rowcount > 0
+    invalidate_validation_plans()
+    return deleted, deleted_associations
 
 
 def get_rules_for_ticket_type(ticket_type_id: int) -> List[ValidationRule]:
@@ -615,10 +704,12 @@ def add_rule_to_ticket_type(rule_id: int, ticket_type_id: int) -> bool:
                     VALUES (%s, %s, UNIX_TIMESTAMP())
                 """
                 cursor.execute(sql, (ticket_type_id, rule_id))
-                return cursor.rowcount > 0
+                added = cursor.rowcount > 0
             except Exception:
                 # Дублирующийся ключ — связь уже существует
                 return False
+    invalidate_validation_plans()
+    return added
 
 
 def remove_rule_from_ticket_type(rule_id: int, ticket_type_id: int) -> bool:
@@ -639,7 +730,9 @@ def remove_rule_from_ticket_type(rule_id: int, ticket_type_id: int) -> bool:
                 WHERE ticket_type_id = %s AND validation_rule_id = %s
             """
             cursor.execute(sql, (ticket_type_id, rule_id))
-            return cursor.rowcount > 0
+            removed = cursor.rowcount > 0
+    invalidate_validation_plans()
+    return removed
 
 
 def get_rule_type_mapping() -> List[Dict[str, Any]]:
@@ -2,13 +2,28 @@
 Модуль логики валидации.
 
 Содержит правила, валидаторы и классы результатов для проверки заявок.
+
+Для многократной проверки правила и ключевые слова компилируются заранее:
+``CompiledRuleSet`` хранит отсортированные по приоритету правила с готовыми
+regex-объектами, ``TicketTypeDetector`` — общий словарь ключевых слов всех
+типов, который просматривается за один проход по тексту.
 """
 
 import re
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Pattern, Sequence, Tuple
 from enum import Enum
 
+from .keyword_automaton import KeywordMatcher
+
+# Флаги, с которыми применяются все regex-правила
+REGEX_FLAGS = re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL
+
+# Типы правил, которые при некорректном regex считаются пройденными
+_INVERTED_RULE_TYPES = frozenset({'regex_not_match', 'regex_not_fullmatch'})
+_REGEX_RULE_TYPES = frozenset({'regex', 'regex_fullmatch'}) | _INVERTED_RULE_TYPES
+_KNOWN_RULE_TYPES = _REGEX_RULE_TYPES | {'fias_check', 'custom'}
+
 
 class RuleType(Enum):
     """Типы правил валидации."""
@@ -174,7 +189,7 @@ def validate_regex(ticket_text: str, pattern: str) -> bool:
         True, если совпадение найдено, иначе False.
     """
     try:
-        return bool(re.search(pattern, ticket_text, re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL))
+        return bool(re.search(pattern, ticket_text, REGEX_FLAGS))
     except re.error:
         # Некорректное регулярное выражение
         return False
@@ -192,7 +207,7 @@ def validate_regex_not_match(ticket_text: str, pattern: str) -> bool:
         True, если совпадение НЕ найдено, иначе False.
     """
     try:
-        return not bool(re.search(pattern, ticket_text, re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL))
+        return not bool(re.search(pattern, ticket_text, REGEX_FLAGS))
     except re.error:
         # Некорректное регулярное выражение — считаем, что совпадения нет
         return True
@@ -210,7 +225,7 @@ def validate_regex_fullmatch(ticket_text: str, pattern: str) -> bool:
         True, если совпадает весь текст, иначе False.
     """
     try:
-        return bool(re.fullmatch(pattern, ticket_text, re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL))
+        return bool(re.fullmatch(pattern, ticket_text, REGEX_FLAGS))
     except re.error:
         # Некорректное регулярное выражение
         return False
@@ -228,7 +243,7 @@ def validate_regex_not_fullmatch(ticket_text: str, pattern: str) -> bool:
         True, если полного совпадения нет, иначе False.
     """
     try:
-        return not bool(re.fullmatch(pattern, ticket_text, re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL))
+        return not bool(re.fullmatch(pattern, ticket_text, REGEX_FLAGS))
     except re.error:
         # Некорректное регулярное выражение — считаем, что совпадения нет
         return True
@@ -257,7 +272,7 @@ def validate_fias_address(ticket_text: str, pattern: str) -> bool:
         ``True``, если адрес найден в ФИАС, иначе ``False``.
     """
     try:
-        match = re.search(pattern, ticket_text, re.IGNORECASE | re.MULTILINE | re.UNICODE | re.DOTALL)
+        match = re.search(pattern, ticket_text, REGEX_FLAGS)
         if not match or not match.group(1):
             return False
 
@@ -304,106 +319,149 @@ def detect_ticket_type(
             )
         return None, None
     
-    # Нормализуем ключи keyword_weights к нижнему регистру для поиска без учёта регистра
-    keyword_weights = {k.lower(): v for k, v in (keyword_weights or {}).items()}
-    
-    # Оцениваем каждый тип заявки по совпадениям ключевых слов
-    scores = {}
-    all_scores_debug: List[TicketTypeScore] = []
-    ticket_text_lower = ticket_text.lower()
-    active_types_count = 0
-    
-    for ticket_type in ticket_types:
-        if not ticket_type.active:
-            continue
-        
-        active_types_count += 1
-        score = 0.0
-        keyword_matches: List[KeywordMatch] = []
-        matched_count = 0
-        total_keywords = len(ticket_type.detection_keywords)
-        
-        for keyword in ticket_type.detection_keywords:
-            # Проверяем, является ли ключевое слово отрицательным (начинается с минуса)
-            is_negative = keyword.startswith('-')
-            # Убираем минус для поиска
-            keyword_to_match = keyword[1:] if is_negative else keyword
-            keyword_lower = keyword_to_match.lower()
-            
-            # Проверяем наличие ключевого слова (1 если найдено, иначе 0)
-            count = 1 if keyword_lower in ticket_text_lower else 0
-            
-            # Получаем вес для ключевого слова (по умолчанию 1.0)
-            # Приоритет: 1) параметр keyword_weights, 2) ticket_type.keyword_weights, 3) 1.0
-            # Для отрицательных ключевых слов используем исходный ключ (с минусом)
-            weight_key = keyword.lower() if is_negative else keyword_lower
-            if weight_key in keyword_weights:
-                weight = keyword_weights[weight_key]
-            else:
-                weight = ticket_type.get_keyword_weight(weight_key)
-            
-            # Считаем балл (отрицательный для отрицательных ключевых слов)
-            weighted_score = count * weight
-            if is_negative:
-                weighted_score = -weighted_score
-            score += weighted_score
-            
-            if count > 0:
+    return TicketTypeDetector(ticket_types, keyword_weights).detect(ticket_text, debug=debug)
+
+
+class TicketTypeDetector:
+    """
+    Скомпилированный детектор типов заявок.
+
+    Ключевые слова всех активных типов собираются в один словарь
+    (``KeywordMatcher``), текст заявки просматривается один раз, а баллы
+    типов считаются по заранее разобранным словам: знак, вес и позиция.
+    Результат совпадает с прежним построчным перебором ``detect_ticket_type``.
+
+    Args:
+        ticket_types: список доступных типов заявок.
+        keyword_weights: словарь пользовательских весов ключевых слов (по умолчанию 1.0).
+    """
+
+    def __init__(
+        self,
+        ticket_types: Sequence[TicketType],
+        keyword_weights: Optional[Dict[str, float]] = None,
+    ) -> None:
+        # Нормализуем ключи keyword_weights к нижнему регистру для поиска без учёта регистра
+        weights = {k.lower(): v for k, v in (keyword_weights or {}).items()}
+
+        self.ticket_types: List[TicketType] = list(ticket_types)
+        self._active_types: List[TicketType] = [tt for tt in self.ticket_types if tt.active]
+
+        keyword_index: Dict[str, int] = {}
+        # Для каждого типа: (индекс слова, слово для отчёта, вес, отрицательное ли)
+        self._entries: List[Tuple[Tuple[int, str, float, bool], ...]] = []
+        for ticket_type in self._active_types:
+            entries = []
+            for keyword in ticket_type.detection_keywords:
+                # Отрицательное ключевое слово начинается с минуса
+                is_negative = keyword.startswith('-')
+                keyword_to_match = keyword[1:] if is_negative else keyword
+                keyword_lower = keyword_to_match.lower()
+
+                # Приоритет веса: 1) keyword_weights, 2) ticket_type.keyword_weights, 3) 1.0
+                # Для отрицательных ключевых слов используем исходный ключ (с минусом)
+                weight_key = keyword.lower() if is_negative else keyword_lower
+                if weight_key in weights:
+                    weight = weights[weight_key]
+                else:
+                    weight = ticket_type.get_keyword_weight(weight_key)
+
+                index = keyword_index.setdefault(keyword_lower, len(keyword_index))
+                entries.append((index, keyword_to_match, weight, is_negative))
+            self._entries.append(tuple(entries))
+
+        keywords = list(keyword_index)
+        # Пустое слово (например, одиночный «-») входит в любой текст
+        self._always_found = {keyword_index['']} if '' in keyword_index else set()
+        self._matcher = KeywordMatcher(keywords)
+
+    @property
+    def keywords_count(self) -> int:
+        """Число уникальных ключевых слов в словаре детектора."""
+        return self._matcher.keywords_count
+
+    def detect(
+        self,
+        ticket_text: str,
+        debug: bool = False,
+    ) -> tuple[Optional[TicketType], Optional[DetectionDebugInfo]]:
+        """
+        Определить тип заявки по ключевым словам.
+
+        Args:
+            ticket_text: текст заявки для анализа.
+            debug: если True, вернуть подробную отладочную информацию.
+
+        Returns:
+            Кортеж: (лучше всего подходящий тип заявки или None, DetectionDebugInfo при debug=True).
+        """
+        found = self._matcher.find(ticket_text.lower())
+        if self._always_found:
+            found |= self._always_found
+
+        scores: List[Tuple[float, TicketType]] = []
+        all_scores_debug: List[TicketTypeScore] = []
+
+        for ticket_type, entries in zip(self._active_types, self._entries):
+            score = 0.0
+            keyword_matches: List[KeywordMatch] = []
+            matched_count = 0
+
+            for index, keyword_to_match, weight, is_negative in entries:
+                if index not in found:
+                    continue
+                score += -weight if is_negative else weight
                 # В счёт совпадений идут только положительные ключевые слова
                 if not is_negative:
                     matched_count += 1
                 if debug:
                     keyword_matches.append(KeywordMatch(
                         keyword=keyword_to_match,
-                        count=count,
+                        count=1,
                         weight=weight,
                         is_negative=is_negative
                     ))
-        
-        if score > 0:
-            scores[ticket_type.id] = (score, ticket_type)
-        
+
+            if score > 0:
+                scores.append((score, ticket_type))
+
+            if debug:
+                all_scores_debug.append(TicketTypeScore(
+                    ticket_type=ticket_type,
+                    total_score=score,
+                    keyword_matches=keyword_matches,
+                    matched_keywords_count=matched_count,
+                    total_keywords_count=len(ticket_type.detection_keywords)
+                ))
+
+        # Возвращаем тип заявки с максимальным баллом
+        detected_type = None
+        has_ambiguity = False
+        ambiguous_types = []
+
+        if scores:
+            max_score = max(score for score, _ in scores)
+            types_with_max_score = [tt for score, tt in scores if score == max_score]
+
+            # Проверяем неоднозначность (несколько типов с одинаковым максимумом)
+            if len(types_with_max_score) > 1:
+                has_ambiguity = True
+                ambiguous_types = types_with_max_score
+
+            detected_type = types_with_max_score[0]
+
         if debug:
-            all_scores_debug.append(TicketTypeScore(
-                ticket_type=ticket_type,
-                total_score=score,
-                keyword_matches=keyword_matches,
-                matched_keywords_count=matched_count,
-                total_keywords_count=total_keywords
-            ))
-    
-    # Возвращаем тип заявки с максимальным баллом
-    detected_type = None
-    has_ambiguity = False
-    ambiguous_types = []
-    
-    if scores:
-        # Находим максимальный балл
-        max_score = max(score for score, _ in scores.values())
-        
-        # Находим все типы с максимальным баллом
-        types_with_max_score = [tt for score, tt in scores.values() if score == max_score]
-        
-        # Проверяем неоднозначность (несколько типов с одинаковым максимумом)
-        if len(types_with_max_score) > 1:
-            has_ambiguity = True
-            ambiguous_types = types_with_max_score
-        
-        # Всё равно возвращаем первый (или можно вернуть None при неоднозначности)
-        detected_type = types_with_max_score[0]
-    
-    if debug:
-        debug_info = DetectionDebugInfo(
-            detected_type=detected_type,
-            all_scores=all_scores_debug,
-            ticket_text_preview=ticket_text[:200] if ticket_text else "",
-            has_ambiguity=has_ambiguity,
-            ambiguous_types=ambiguous_types,
-            total_types_evaluated=active_types_count
-        )
-        return detected_type, debug_info
-    
-    return detected_type, None
+            debug_info = DetectionDebugInfo(
+                detected_type=detected_type,
+                all_scores=all_scores_debug,
+                ticket_text_preview=ticket_text[:200] if ticket_text else "",
+                has_ambiguity=has_ambiguity,
+                ambiguous_types=ambiguous_types,
+                total_types_evaluated=len(self._active_types)
+            )
+            return detected_type, debug_info
+
+        return detected_type, None
 
 
 def validate_ticket(ticket_text: str, rules: List[ValidationRule], 
@@ -419,57 +477,118 @@ def validate_ticket(ticket_text: str, rules: List[ValidationRule],
     Returns:
         ValidationResult с результатом проверки и деталями.
     """
-    failed_rules = []
-    passed_rules = []
-    error_messages = []
-    validation_details = {}
-    
-    # Сортируем правила по приоритету (сначала более высокий)
-    sorted_rules = sorted(rules, key=lambda r: r.priority, reverse=True)
-    
-    for rule in sorted_rules:
-        if not rule.active:
-            continue
-            
-        is_valid = False
-        rule_type_value = rule.rule_type.value if isinstance(rule.rule_type, RuleType) else rule.rule_type
-        
-        try:
-            if rule_type_value == 'regex':
-                is_valid = validate_regex(ticket_text, rule.pattern)
-            elif rule_type_value == 'regex_not_match':
-                is_valid = validate_regex_not_match(ticket_text, rule.pattern)
-            elif rule_type_value == 'regex_fullmatch':
-                is_valid = validate_regex_fullmatch(ticket_text, rule.pattern)
-            elif rule_type_value == 'regex_not_fullmatch':
-                is_valid = validate_regex_not_fullmatch(ticket_text, rule.pattern)
-            elif rule_type_value == 'fias_check':
-                is_valid = validate_fias_address(ticket_text, rule.pattern)
-            elif rule_type_value == 'custom':
-                # Пользовательскую валидацию можно расширить в будущем
-                is_valid = True
-            else:
-                # Неизвестный тип правила — пропускаем
+    return CompiledRuleSet(rules).validate(ticket_text, detected_ticket_type)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """Правило валидации с заранее скомпилированным regex."""
+    rule: ValidationRule
+    rule_type: str
+    regex: Optional[Pattern[str]] = None
+    compile_error: Optional[Exception] = None
+
+
+def compile_rule(rule: ValidationRule) -> Optional[CompiledRule]:
+    """
+    Скомпилировать правило; None — для неизвестного типа (такие правила пропускаются).
+
+    Некорректный regex не вызывает ошибку: правило получает regex=None и при
+    проверке ведёт себя как прежние validate_regex* (провал либо успех для
+    инвертированных типов).
+    """
+    rule_type_value = rule.rule_type.value if isinstance(rule.rule_type, RuleType) else rule.rule_type
+    if rule_type_value not in _KNOWN_RULE_TYPES:
+        return None
+    if rule_type_value not in _REGEX_RULE_TYPES:
+        return CompiledRule(rule=rule, rule_type=rule_type_value)
+    try:
+        return CompiledRule(rule=rule, rule_type=rule_type_value, regex=re.compile(rule.pattern, REGEX_FLAGS))
+    except re.error:
+        return CompiledRule(rule=rule, rule_type=rule_type_value)
+    except Exception as e:
+        return CompiledRule(rule=rule, rule_type=rule_type_value, compile_error=e)
+
+
+class CompiledRuleSet:
+    """
+    Скомпилированный набор правил одного типа заявки.
+
+    Активные правила отсортированы по приоритету (сначала более высокий)
+    один раз при компиляции, regex-объекты готовы к повторному применению.
+
+    Args:
+        rules: список правил валидации.
+    """
+
+    def __init__(self, rules: Sequence[ValidationRule]) -> None:
+        sorted_rules = sorted(rules, key=lambda r: r.priority, reverse=True)
+        compiled = (compile_rule(rule) for rule in sorted_rules if rule.active)
+        self.rules: Tuple[CompiledRule, ...] = tuple(rule for rule in compiled if rule is not None)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def validate(self, ticket_text: str, detected_ticket_type: Optional[TicketType] = None) -> ValidationResult:
+        """
+        Применить все правила набора к заявке.
+
+        Args:
+            ticket_text: текст заявки для проверки.
+            detected_ticket_type: опционально определённый тип заявки.
+
+        Returns:
+            ValidationResult с результатом проверки и деталями.
+        """
+        failed_rules = []
+        passed_rules = []
+        error_messages = []
+        validation_details = {}
+
+        for compiled in self.rules:
+            rule = compiled.rule
+            try:
+                is_valid = _check_compiled_rule(compiled, ticket_text)
+            except Exception as e:
+                # Логируем ошибку, но продолжаем остальные правила
+                validation_details[rule.rule_name] = f"Error: {str(e)}"
                 continue
-                
-        except Exception as e:
-            # Логируем ошибку, но продолжаем остальные правила
-            validation_details[rule.rule_name] = f"Error: {str(e)}"
-            continue
-        
-        validation_details[rule.rule_name] = is_valid
-        
-        if is_valid:
-            passed_rules.append(rule.rule_name)
-        else:
-            failed_rules.append(rule.rule_name)
-            error_messages.append(rule.error_message)
-    
-    return ValidationResult(
-        is_valid=len(failed_rules) == 0,
-        failed_rules=failed_rules,
-        passed_rules=passed_rules,
-        error_messages=error_messages,
-        validation_details=validation_details,
-        detected_ticket_type=detected_ticket_type
-    )
+
+            validation_details[rule.rule_name] = is_valid
+
+            if is_valid:
+                passed_rules.append(rule.rule_name)
+            else:
+                failed_rules.append(rule.rule_name)
+                error_messages.append(rule.error_message)
+
+        return ValidationResult(
+            is_valid=len(failed_rules) == 0,
+            failed_rules=failed_rules,
+            passed_rules=passed_rules,
+            error_messages=error_messages,
+            validation_details=validation_details,
+            detected_ticket_type=detected_ticket_type
+        )
+
+
+def _check_compiled_rule(compiled: CompiledRule, ticket_text: str) -> bool:
+    """Проверить одно скомпилированное правило."""
+    if compiled.compile_error is not None:
+        raise compiled.compile_error
+    rule_type = compiled.rule_type
+    if rule_type == 'fias_check':
+        return validate_fias_address(ticket_text, compiled.rule.pattern)
+    if rule_type == 'custom':
+        # Пользовательскую валидацию можно расширить в будущем
+        return True
+    if compiled.regex is None:
+        # Некорректное регулярное выражение
+        return rule_type in _INVERTED_RULE_TYPES
+    if rule_type == 'regex':
+        return compiled.regex.search(ticket_text) is not None
+    if rule_type == 'regex_not_match':
+        return compiled.regex.search(ticket_text) is None
+    if rule_type == 'regex_fullmatch':
+        return compiled.regex.fullmatch(ticket_text) is not None
+    return compiled.regex.fullmatch(ticket_text) is None
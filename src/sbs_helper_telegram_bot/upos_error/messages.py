@@ -7,7 +7,7 @@
 # pylint: disable=line-too-long
 # Примечание: двойные обратные слэши нужны для экранирования в Telegram MarkdownV2
 
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 import src.common.database as database
 
@@ -59,6 +59,8 @@ MESSAGE_SEARCH_CANCELLED = "❌ Поиск отменён\\."
 
 MESSAGE_ERROR_NOT_FOUND = "❌ *Код ошибки не найден*\n\nКод `{code}` отсутствует в базе данных\\.\n\nИнформация о запросе сохранена — мы добавим описание этой ошибки в будущем\\."
 
+MESSAGE_DID_YOU_MEAN = "\n\n💡 *Возможно, вы имели в виду:* {codes}"
+
 MESSAGE_INVALID_ERROR_CODE = "⚠️ *Некорректный код ошибки*\n\nПожалуйста, введите числовой код ошибки \\(например: `101`, `2005`\\)\\."
 
 MESSAGE_NO_POPULAR_ERRORS = "📊 *Популярные ошибки*\n\nПока нет данных о запросах\\."
@@ -221,6 +223,9 @@ MESSAGE_CSV_ERROR_ROW_PROCESSING = "Строка {row}: ошибка обраб
 MESSAGE_CSV_ERROR_PARSE = "Ошибка парсинга CSV: {error}"
 MESSAGE_CSV_ERROR_UNEXPECTED = "Неожиданная ошибка: {error}"
 MESSAGE_CSV_ERROR_IMPORT = "Ошибка импорта '{code}': {error}"
+MESSAGE_CSV_ERROR_CODE_INACTIVE = "код существует, но отключён"
+MESSAGE_CSV_ERROR_CATEGORY_INACTIVE = "категория '{name}' отключена"
+MESSAGE_CSV_ERROR_IMPORT_FAILED = "Импорт отменён, изменения не сохранены: {error}"
 
 
 # ===== ОБЩИЕ UI-СООБЩЕНИЯ =====
@@ -265,6 +270,23 @@ def escape_markdown_v2(text: str) -> str:
     return text
 
 
+def format_did_you_mean(codes: List[str]) -> str:
+    """
+    Отформатировать подсказку с похожими кодами ошибок.
+
+    Args:
+        codes: Похожие коды из справочника.
+
+    Returns:
+        Строка MarkdownV2 для добавления к сообщению или пустая строка.
+    """
+    if not codes:
+        return ""
+    return MESSAGE_DID_YOU_MEAN.format(
+        codes=", ".join(f"`{escape_markdown_v2(code)}`" for code in codes)
+    )
+
+
 def format_error_code_response(
     error_code: str,
     description: str,
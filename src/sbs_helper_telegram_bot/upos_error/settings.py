@@ -78,3 +78,9 @@ UNKNOWN_CODES_PER_PAGE: Final[int] = 15
 
 # Количество популярных ошибок для отображения
 TOP_POPULAR_COUNT: Final[int] = 10
+
+# Максимум подсказок «возможно, вы имели в виду» для ненайденного кода
+SUGGESTIONS_LIMIT: Final[int] = 5
+
+# Строк в одном пакете INSERT при импорте CSV
+CSV_IMPORT_BATCH_SIZE: Final[int] = 500
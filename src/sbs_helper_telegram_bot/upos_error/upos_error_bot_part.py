@@ -11,7 +11,7 @@ import io
 import logging
 import math
 import re
-from typing import Optional, List, Tuple
+from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass
 
 from telegram import Update, constants
@@ -25,6 +25,8 @@ from telegram.ext import (
 )
 
 import src.common.database as database
+from src.common.code_dictionary import CodeDictionary, SCOPE_UPOS_ERROR_CODES
+from src.common.settings_snapshot import bump_settings_version
 from src.common.telegram_user import check_if_user_legit, check_if_user_admin, get_unauthorized_message
 from src.common.messages import (
     get_main_menu_message,
@@ -77,9 +79,39 @@ WAITING_FOR_ERROR_CODE = 1
 
 # ===== ОПЕРАЦИИ С БАЗОЙ ДАННЫХ =====
 
+def _load_active_error_codes() -> List[dict]:
+    """
+    Загрузить все активные коды ошибок для справочника в памяти.
+    """
+    with database.get_db_connection() as conn:
+        with database.get_cursor(conn) as cursor:
+            cursor.execute("""
+                SELECT e.*, c.name as category_name
+                FROM upos_error_codes e
+                LEFT JOIN upos_error_categories c ON e.category_id = c.id
+                WHERE e.active = 1
+            """)
+            return cursor.fetchall()
+
+
+# Справочник активных кодов: поиск пользователей не обращается к БД.
+# Изменения кодов и категорий увеличивают версию справочника в settings_version.
+ERROR_CODE_DICTIONARY = CodeDictionary(SCOPE_UPOS_ERROR_CODES, _load_active_error_codes, key_field="error_code")
+
+
+def _mark_error_codes_changed(cursor) -> None:
+    """
+    Увеличить версию справочника кодов в текущей транзакции.
+    """
+    bump_settings_version(cursor, SCOPE_UPOS_ERROR_CODES)
+
+
 def get_error_code_by_code(error_code: str) -> Optional[dict]:
     """
-    Найти код ошибки в базе данных.
+    Найти активный код ошибки в справочнике.
+
+    Сначала ищется точное совпадение, затем — по нормализованному ключу
+    (регистр, пробелы и разделители).
 
     Args:
         error_code: Код ошибки для поиска.
@@ -87,15 +119,23 @@ def get_error_code_by_code(error_code: str) -> Optional[dict]:
     Returns:
         Словарь с информацией об ошибке или None, если не найдено.
     """
-    with database.get_db_connection() as conn:
-        with database.get_cursor(conn) as cursor:
-            cursor.execute("""
-                SELECT e.*, c.name as category_name
-                FROM upos_error_codes e
-                LEFT JOIN upos_error_categories c ON e.category_id = c.id
-                WHERE e.error_code = %s AND e.active = 1
-            """, (error_code,))
-            return cursor.fetchone()
+    return ERROR_CODE_DICTIONARY.get(error_code)
+
+
+def suggest_error_codes(error_code: str, limit: int = None) -> List[str]:
+    """
+    Подобрать похожие коды ошибок для подсказки «возможно, вы имели в виду».
+
+    Args:
+        error_code: Введённый код, не найденный в справочнике.
+        limit: Максимальное число подсказок.
+
+    Returns:
+        Список кодов (пустой, если похожих нет).
+    """
+    if limit is None:
+        limit = settings.SUGGESTIONS_LIMIT
+    return ERROR_CODE_DICTIONARY.suggest(error_code, limit)
 
 
 def get_error_code_by_id(error_id: int) -> Optional[dict]:
@@ -159,7 +199,10 @@ def create_error_code(error_code: str, description: str, suggested_actions: str,
                 (error_code, description, suggested_actions, category_id, created_timestamp)
                 VALUES (%s, %s, %s, %s, UNIX_TIMESTAMP())
             """, (error_code, description, suggested_actions, category_id))
-            return cursor.lastrowid
+            error_id = cursor.lastrowid
+            _mark_error_codes_changed(cursor)
+    ERROR_CODE_DICTIONARY.invalidate()
+    return error_id
 
 
 def update_error_code(error_id: int, field: str, value: str, update_timestamp: bool = False) -> bool:
@@ -184,7 +227,10 @@ def update_error_code(error_id: int, field: str, value: str, update_timestamp: b
                     SET {field} = %s
                     WHERE id = %s
                 """, (value, error_id))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            _mark_error_codes_changed(cursor)
+    ERROR_CODE_DICTIONARY.invalidate()
+    return updated
 
 
 def delete_error_code(error_id: int) -> bool:
@@ -194,7 +240,10 @@ def delete_error_code(error_id: int) -> bool:
     with database.get_db_connection() as conn:
         with database.get_cursor(conn) as cursor:
             cursor.execute("DELETE FROM upos_error_codes WHERE id = %s", (error_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            _mark_error_codes_changed(cursor)
+    ERROR_CODE_DICTIONARY.invalidate()
+    return deleted
 
 
 def error_code_exists(error_code: str) -> bool:
@@ -279,7 +328,11 @@ def update_category(category_id: int, field: str, value) -> bool:
                 SET {field} = %s, updated_timestamp = UNIX_TIMESTAMP()
                 WHERE id = %s
             """, (value, category_id))
-            return cursor.rowcount > 0
+            updated = cursor.rowcount > 0
+            # Название категории хранится в строках справочника кодов
+            _mark_error_codes_changed(cursor)
+    ERROR_CODE_DICTIONARY.invalidate()
+    return updated
 
 
 def delete_category(category_id: int) -> bool:
@@ -290,7 +343,10 @@ def delete_category(category_id: int) -> bool:
         with database.get_cursor(conn) as cursor:
             # Внешний ключ с ON DELETE SET NULL обработает связанные коды ошибок
             cursor.execute("DELETE FROM upos_error_categories WHERE id = %s", (category_id,))
-            return cursor.rowcount > 0
+            deleted = cursor.rowcount > 0
+            _mark_error_codes_changed(cursor)
+    ERROR_CODE_DICTIONARY.invalidate()
+    return deleted
 
 
 def category_exists(name: str) -> bool:
@@ -427,62 +483,205 @@ def parse_csv_error_codes(csv_content: str, delimiter: str = ',') -> Tuple[List[
     return valid_records, errors
 
 
-def import_error_codes_from_csv(records: List[dict], skip_existing: bool = True) -> CSVImportResult:
+_CSV_IMPORT_UPSERT_SQL = """
+    INSERT INTO upos_error_codes
+    (error_code, description, suggested_actions, category_id, created_timestamp)
+    VALUES (%s, %s, %s, %s, UNIX_TIMESTAMP())
+    ON DUPLICATE KEY UPDATE
+        description = VALUES(description),
+        suggested_actions = VALUES(suggested_actions),
+        category_id = COALESCE(VALUES(category_id), category_id),
+        updated_timestamp = UNIX_TIMESTAMP()
+"""
+
+# В режиме пропуска код, добавленный параллельно после предзагрузки, не перезаписывается
+_CSV_IMPORT_INSERT_SKIP_SQL = """
+    INSERT INTO upos_error_codes
+    (error_code, description, suggested_actions, category_id, created_timestamp)
+    VALUES (%s, %s, %s, %s, UNIX_TIMESTAMP())
+    ON DUPLICATE KEY UPDATE id = id
+"""
+
+# Категория, совпавшая по правилам сравнения БД с уже существующей, не обрывает импорт
+_CSV_IMPORT_CATEGORY_SQL = """
+    INSERT INTO upos_error_categories
+    (name, description, display_order, created_timestamp)
+    VALUES (%s, NULL, 0, UNIX_TIMESTAMP())
+    ON DUPLICATE KEY UPDATE id = id
+"""
+
+
+def _collation_key(value: str) -> str:
+    """
+    Ключ сравнения, как в уникальных индексах (utf8mb4_unicode_ci).
+
+    Регистр и завершающие пробелы не учитываются, «ё» равна «е».
+    """
+    return value.rstrip().casefold().replace('ё', 'е')
+
+
+def _plan_csv_import(
+    records: List[dict],
+    skip_existing: bool,
+    existing_codes: Dict[str, dict],
+    categories: Dict[str, dict],
+    result: CSVImportResult,
+) -> Tuple[Dict[str, list], Dict[str, str]]:
+    """
+    Сопоставить записи CSV с предзагруженными кодами и категориями без обращений к БД.
+
+    Повторяет решения прежнего построчного импорта: существующий активный код
+    пропускается или обновляется (категория меняется, только если она уже есть),
+    для нового кода недостающая категория создаётся, отключённые код или
+    категория дают ошибку записи. Ключи сравниваются по правилам уникальных
+    индексов БД (``_collation_key``).
+
+    Args:
+        records: Валидированные записи CSV.
+        skip_existing: Пропускать существующие коды.
+        existing_codes: Коды из БД по ключу ``_collation_key(error_code)``.
+        categories: Категории из БД по ключу ``_collation_key(name)``.
+        result: Результат импорта, в который записываются пропуски и ошибки.
+
+    Returns:
+        Кортеж (строки для записи по ключу кода, названия новых категорий
+        по ключу категории).
+        Строка — ``[error_code, description, suggested_actions, category]``,
+        где category — ключ категории или None (не менять).
+    """
+    rows: Dict[str, list] = {}
+    new_categories: Dict[str, str] = {}
+
+    for record in records:
+        error_code = record['error_code']
+        description = record['description']
+        suggested_actions = record['suggested_actions']
+        category_name = record.get('category_name')
+        code_key = _collation_key(error_code)
+        category_key = _collation_key(category_name) if category_name else None
+        category = categories.get(category_key) if category_key else None
+
+        existing = existing_codes.get(code_key)
+        if existing is not None and not existing['active']:
+            result.error_count += 1
+            result.errors.append(messages.MESSAGE_CSV_ERROR_IMPORT.format(
+                code=error_code, error=messages.MESSAGE_CSV_ERROR_CODE_INACTIVE
+            ))
+            continue
+
+        if existing is not None or code_key in rows:
+            if skip_existing:
+                result.skipped_count += 1
+                continue
+            row = rows.setdefault(code_key, [existing['error_code'] if existing else error_code, None, None, None])
+            row[1] = description
+            row[2] = suggested_actions
+            # Категория существующего кода меняется, только если она уже есть
+            if category_key and ((category is not None and category['active']) or category_key in new_categories):
+                row[3] = category_key
+            result.success_count += 1
+            continue
+
+        if category is not None and not category['active']:
+            result.error_count += 1
+            result.errors.append(messages.MESSAGE_CSV_ERROR_IMPORT.format(
+                code=error_code, error=messages.MESSAGE_CSV_ERROR_CATEGORY_INACTIVE.format(name=category_name)
+            ))
+            continue
+        if category_key and category is None:
+            new_categories.setdefault(category_key, category_name)
+
+        rows[code_key] = [error_code, description, suggested_actions, category_key]
+        result.success_count += 1
+
+    return rows, new_categories
+
+
+def import_error_codes_from_csv(
+    records: List[dict],
+    skip_existing: bool = True,
+    batch_size: int = None,
+) -> CSVImportResult:
     """
-    Импортировать коды ошибок из разобранных CSV-записей.
+    Импортировать коды ошибок из разобранных CSV-записей одной транзакцией.
+
+    Существующие коды и категории загружаются одним запросом каждые,
+    решения по записям принимаются в памяти, новые категории и коды пишутся
+    пачками ``executemany`` (``INSERT ... ON DUPLICATE KEY UPDATE``).
+    Версия справочника кодов увеличивается один раз на весь импорт.
+    Если транзакция не удалась, не записывается ничего.
 
     Args:
         records: Список валидированных словарей записей.
         skip_existing: Если True, пропускать существующие коды; если False — обновлять их.
+        batch_size: Строк в одном executemany (по умолчанию CSV_IMPORT_BATCH_SIZE).
 
     Returns:
         CSVImportResult со статистикой импорта.
     """
     result = CSVImportResult()
-    
-    for record in records:
-        try:
-            error_code = record['error_code']
-            description = record['description']
-            suggested_actions = record['suggested_actions']
-            category_name = record.get('category_name')
-            
-            # Проверяем, существует ли код
-            existing = get_error_code_by_code(error_code)
-            
-            if existing:
-                if skip_existing:
-                    result.skipped_count += 1
-                    continue
-                else:
-                    # Обновляем существующий
-                    update_error_code(existing['id'], 'description', description)
-                    update_error_code(existing['id'], 'suggested_actions', suggested_actions, update_timestamp=True)
-                    if category_name:
-                        cat = get_category_by_name(category_name)
-                        if cat:
-                            update_error_code(existing['id'], 'category_id', cat['id'])
-                    result.success_count += 1
-                    continue
-            
-            # Получаем ID категории, если указана
-            category_id = None
-            if category_name:
-                cat = get_category_by_name(category_name)
-                if cat:
-                    category_id = cat['id']
-                # Если категории нет, создаём её
-                elif category_name:
-                    category_id = create_category(category_name, None, 0)
-            
-            # Создаём новый код ошибки
-            create_error_code(error_code, description, suggested_actions, category_id)
-            result.success_count += 1
-            
-        except Exception as e:
-            result.error_count += 1
-            result.errors.append(messages.MESSAGE_CSV_ERROR_IMPORT.format(code=record.get('error_code', '?'), error=str(e)))
-    
+    if not records:
+        return result
+    if batch_size is None:
+        batch_size = settings.CSV_IMPORT_BATCH_SIZE
+    batch_size = max(1, batch_size)
+
+    try:
+        with database.get_db_connection() as conn:
+            with database.get_cursor(conn) as cursor:
+                cursor.execute("SELECT id, error_code, active FROM upos_error_codes")
+                existing_codes = {_collation_key(row['error_code']): row for row in cursor.fetchall()}
+                cursor.execute("SELECT id, name, active FROM upos_error_categories")
+                categories = {_collation_key(row['name']): row for row in cursor.fetchall()}
+
+                rows, new_categories = _plan_csv_import(
+                    records, skip_existing, existing_codes, categories, result
+                )
+                if not rows:
+                    return result
+
+                category_ids = {key: category['id'] for key, category in categories.items()}
+                if new_categories:
+                    new_category_names = list(new_categories.values())
+                    for start in range(0, len(new_category_names), batch_size):
+                        cursor.executemany(
+                            _CSV_IMPORT_CATEGORY_SQL,
+                            [(name,) for name in new_category_names[start:start + batch_size]],
+                        )
+                    # id ищется по вставленному названию правилами сравнения БД:
+                    # upsert мог совпасть с категорией, добавленной параллельно
+                    # под другим написанием, и её название не даст тот же ключ
+                    for category_key, name in new_categories.items():
+                        cursor.execute("SELECT id FROM upos_error_categories WHERE name = %s", (name,))
+                        row = cursor.fetchone()
+                        if row:
+                            category_ids[category_key] = row['id']
+
+                params = [
+                    (error_code, description, suggested_actions, category_ids.get(category_key) if category_key else None)
+                    for error_code, description, suggested_actions, category_key in rows.values()
+                ]
+                sql = _CSV_IMPORT_INSERT_SKIP_SQL if skip_existing else _CSV_IMPORT_UPSERT_SQL
+                for start in range(0, len(params), batch_size):
+                    batch = params[start:start + batch_size]
+                    cursor.executemany(sql, batch)
+                    if skip_existing and cursor.rowcount >= 0:
+                        # Код, добавленный параллельно после предзагрузки, не записан
+                        # (``id = id`` не затрагивает строку) — это пропуск, а не успех
+                        not_written = len(batch) - cursor.rowcount
+                        if not_written > 0:
+                            result.success_count -= not_written
+                            result.skipped_count += not_written
+                _mark_error_codes_changed(cursor)
+    except Exception as e:
+        logger.error("CSV import of UPOS error codes failed: %s", e)
+        # Транзакция откатилась: записи, которые должны были сохраниться, не сохранены
+        result.error_count += result.success_count
+        result.success_count = 0
+        result.errors.append(messages.MESSAGE_CSV_ERROR_IMPORT_FAILED.format(error=str(e)))
+        return result
+
+    ERROR_CODE_DICTIONARY.invalidate()
     return result
 
 
@@ -720,7 +919,8 @@ async def process_error_code_input(update: Update, context: ContextTypes.DEFAULT
         
         escaped_code = messages.escape_markdown_v2(input_text)
         await update.message.reply_text(
-            messages.MESSAGE_ERROR_NOT_FOUND.format(code=escaped_code),
+            messages.MESSAGE_ERROR_NOT_FOUND.format(code=escaped_code)
+            + messages.format_did_you_mean(suggest_error_codes(input_text)),
             parse_mode=constants.ParseMode.MARKDOWN_V2
         )
     
@@ -17,8 +17,9 @@ processimagequeue.py
     - Помечает задачи как завершённые (status=2) при успехе или ошибке
     - Очищает зависшие незавершённые задачи при запуске
 
-Использует Pillow для обработки изображений и Telegram Bot API для доставки.
-Работает как долгоживущий демон.
+Использует Pillow для обработки изображений, NumPy для поиска цветов
+(векторные маски по массиву пикселей вместо обхода getpixel) и Telegram Bot
+API для доставки. Работает как долгоживущий демон.
 """
 
 import logging
@@ -26,6 +27,7 @@ import time
 import random
 from pathlib import Path
 
+import numpy as np
 import requests
 from requests.exceptions import RequestException
 from PIL import Image
@@ -199,6 +201,170 @@ def is_color_close(
     )
 
 
+# Сколько строк изображения проверяется за один векторный шаг при поиске
+# первого совпадения: ранний выход без построения масок по всему кадру.
+COLOR_SCAN_BLOCK_ROWS = 256
+
+
+def color_close_mask(
+    pixels: np.ndarray,
+    target_color: tuple[int, int, int],
+    tolerance: int = ALLOWED_COLOR_INTENSITY_DEVIATION,
+) -> np.ndarray:
+    """
+    Векторный аналог `is_color_close` для массива пикселей.
+
+    Args:
+        pixels: массив RGB-пикселей формы (..., 3).
+        target_color: ожидаемый эталонный RGB-цвет.
+        tolerance: максимально допустимое отклонение по каналу.
+
+    Returns:
+        Булев массив формы (...), True там, где цвет близок к эталонному.
+    """
+    # |p - t| <= tolerance  <=>  t - tolerance <= p <= t + tolerance: сравнения
+    # по каналам без приведения uint8 к знаковому типу и временного массива разностей.
+    mask = None
+    for channel, target in enumerate(target_color):
+        values = pixels[..., channel]
+        low = max(0, target - tolerance)
+        high = min(255, target + tolerance)
+        channel_mask = (values >= low) & (values <= high)
+        mask = channel_mask if mask is None else mask & channel_mask
+    return mask
+
+
+def find_first_color_hit(
+    pixels: np.ndarray,
+    colors: tuple[tuple[int, int, int], ...],
+    row_start: int = 0,
+    row_end: int | None = None,
+) -> tuple[int, int, int] | None:
+    """
+    Найти первый (в порядке обхода строка за строкой) пиксель одного из цветов.
+
+    Повторяет порядок вложенных циклов `for y: for x:` с проверкой цветов
+    в порядке `colors`, но проверяет блоки строк векторно и берёт первое
+    совпадение через `argmax`.
+
+    Args:
+        pixels: массив RGB-пикселей формы (height, width, 3).
+        colors: искомые цвета в порядке приоритета проверки.
+        row_start: первая проверяемая строка.
+        row_end: строка, на которой поиск заканчивается (не включительно).
+
+    Returns:
+        (y, x, индекс цвета в `colors`) или None, если совпадений нет.
+    """
+    height, width = pixels.shape[:2]
+    row_end = height if row_end is None else min(row_end, height)
+    if width == 0:
+        return None
+
+    for block_start in range(max(0, row_start), row_end, COLOR_SCAN_BLOCK_ROWS):
+        block = pixels[block_start:min(block_start + COLOR_SCAN_BLOCK_ROWS, row_end)]
+        masks = [color_close_mask(block, color) for color in colors]
+        flat_hits = np.logical_or.reduce(masks).ravel()
+        first = int(flat_hits.argmax())
+        if not flat_hits[first]:
+            continue
+        y, x = divmod(first, width)
+        for color_index, mask in enumerate(masks):
+            if mask[y, x]:
+                return block_start + y, x, color_index
+    return None
+
+
+def detect_color_mode(pixels: np.ndarray) -> tuple[bool, bool]:
+    """
+    Определить тёмный/светлый режим по пикселю логотипа Яндекс.Карт.
+
+    Returns:
+        (dark_mode, good_pixel_found).
+    """
+    hit = find_first_color_hit(
+        pixels,
+        (DARK_PIXEL_COLOR, LIGHT_PIXEL_COLOR),
+        MIN_HEIGHT_TO_START_LOOKING_FOR_GOOD_PIXEL,
+        MAX_HEIGHT_TO_END_LOOK_FOR_GOOD_PIXEL,
+    )
+    if hit is None:
+        return False, False
+    if hit[2] == 0:
+        logger.info("Found the dark pixel in Yandex maps logo, enabling dark mode")
+        return True, True
+    logger.info("Found the light pixel in Yandex maps logo, enabling light mode")
+    return False, True
+
+
+def _first_true_index(mask: np.ndarray) -> int | None:
+    """Индекс первого True в одномерной маске или None."""
+    if not mask.size:
+        return None
+    index = int(mask.argmax())
+    return index if mask[index] else None
+
+
+def scan_dark_mode_frame(pixels: np.ndarray) -> tuple[int, int, int | None]:
+    """
+    Найти границы карты в тёмном режиме и проверить, нет ли уже иконки.
+
+    Порядок совпадает с прежним обходом: строки сверху вниз до первой строки,
+    где в столбце COLUMN_TO_SCAN_FOR_TASKS_BORDER_COLOR найдена граница
+    задач (в этой строке проверяются только пиксели левее столбца), иконка,
+    встреченная раньше, прерывает обработку.
+
+    Returns:
+        (highest, lowest, error_code) — error_code не None, если иконка уже есть.
+    """
+    height, width = pixels.shape[:2]
+    tasks_column = COLUMN_TO_SCAN_FOR_TASKS_BORDER_COLOR
+    frame_column = COLUMN_TO_SCAN_FOR_FRAME_BORDER_COLOR
+
+    stop_row = None
+    if 0 <= tasks_column < width:
+        stop_row = _first_true_index(color_close_mask(pixels[:, tasks_column], TASKS_BORDER_COLOR))
+
+    icon_colors = (DARK_LOCATION_ICON_COLOR, DARK_TRIANGLE_ICON_COLOR)
+    hit = find_first_color_hit(pixels, icon_colors, 0, height if stop_row is None else stop_row)
+    if hit is None and stop_row is not None:
+        hit = find_first_color_hit(pixels[stop_row:stop_row + 1, :tasks_column], icon_colors)
+    if hit is not None:
+        if hit[2] == 0:
+            logger.info("Found dark location circle in the image")
+            return 0, height, ERR_ALREADY_HAS_DARK_CIRCLE
+        logger.info("Found dark triangle in the image")
+        return 0, height, ERR_ALREADY_HAS_DARK_TRIANGLE
+
+    highest = 0
+    if 0 <= frame_column < width:
+        frame_rows_end = height
+        if stop_row is not None:
+            frame_rows_end = stop_row + 1 if frame_column <= tasks_column else stop_row
+        frame_hits = np.flatnonzero(color_close_mask(pixels[:frame_rows_end, frame_column], FRAME_BORDER_COLOR))
+        if frame_hits.size:
+            highest = int(frame_hits[-1])
+
+    lowest = height if stop_row is None else stop_row
+    return highest, lowest, None
+
+
+def scan_light_mode_icons(pixels: np.ndarray) -> int | None:
+    """
+    Проверить, нет ли на карте светлой иконки локации или треугольника.
+
+    Returns:
+        Код ошибки, если иконка найдена, иначе None.
+    """
+    hit = find_first_color_hit(pixels, (LIGHT_LOCATION_ICON_COLOR, LIGHT_TRIANGLE_ICON_COLOR))
+    if hit is None:
+        return None
+    if hit[2] == 0:
+        logger.info("Found light location circle in the image")
+        return ERR_ALREADY_HAS_CIRCLE
+    return ERR_ALREADY_HAS_TRIANGLE
+
+
 def generate_image(user_id, file_name) -> bool:
     """
         Обрабатывает загруженный скриншот карты и накладывает фейковую метку локации.
@@ -222,9 +388,6 @@ def generate_image(user_id, file_name) -> bool:
             При ошибке: (False, error_code) из constants.errorcodes
     """
 
-    dark_mode = False
-    good_pixel_found = False
-
     # Загружаем файл с именем вида user_id.jpg из папки images
     # как фоновое изображение
     try:
@@ -249,78 +412,27 @@ def generate_image(user_id, file_name) -> bool:
         "Starting checking for color to determine if we are in the dark mode or light mode"
     )
 
-    for y in range(
-        MIN_HEIGHT_TO_START_LOOKING_FOR_GOOD_PIXEL,
-        min(MAX_HEIGHT_TO_END_LOOK_FOR_GOOD_PIXEL, height),
-    ):
-        if good_pixel_found:
-            logger.info("since we found the good pixel, break")
-            break
-        for x in range(width):
-            pixel = background_image.getpixel((x, y))
-            if is_color_close(pixel, DARK_PIXEL_COLOR):
-                logger.info(
-                    "Found the dark pixel in Yandex maps logo, enabling dark mode"
-                )
-                dark_mode = True
-                good_pixel_found = True
-                break
-
-            if is_color_close(pixel, LIGHT_PIXEL_COLOR):
-                logger.info(
-                    "Found the light pixel in Yandex maps logo, enabling light mode"
-                )
-                good_pixel_found = True
-                break
+    # Массив (height, width, 3) без копирования данных изображения.
+    pixels = np.asarray(background_image)
+    analysis_started_at = time.perf_counter()
+    dark_mode, good_pixel_found = detect_color_mode(pixels)
 
     if dark_mode:
-        highest = 0
-        lowest = height
-        escape = False
-        for y in range(height):
-            if escape:
-                break
-            for x in range(width):
-                pixel = background_image.getpixel((x, y))
-
-                # анализ темных границ нам нужно найти верхний и нижний пиксель
-                if x == COLUMN_TO_SCAN_FOR_FRAME_BORDER_COLOR and is_color_close(
-                    pixel, FRAME_BORDER_COLOR
-                ):
-                    highest = y
-
-                # Работает только если lowest ещё не менялся
-                # тогда можно безопасно прервать поиск
-                if (
-                    x == COLUMN_TO_SCAN_FOR_TASKS_BORDER_COLOR
-                    and lowest == height
-                    and is_color_close(pixel, TASKS_BORDER_COLOR)
-                ):
-                    lowest = y
-                    escape = True
-                    break
-
-                if is_color_close(pixel, DARK_LOCATION_ICON_COLOR):
-                    logger.info("Found dark location circle in the image")
-                    return False, ERR_ALREADY_HAS_DARK_CIRCLE
-
-                if is_color_close(pixel, DARK_TRIANGLE_ICON_COLOR):
-                    logger.info("Found dark triangle in the image")
-                    return False, ERR_ALREADY_HAS_DARK_TRIANGLE
+        highest, lowest, error_code = scan_dark_mode_frame(pixels)
+        if error_code is not None:
+            return False, error_code
 
     if not dark_mode:
-        escape = False
-        for y in range(height):
-            for x in range(width):
-                pixel = background_image.getpixel((x, y))
-                # Проверяем, нашли ли светлую иконку локации на карте
-                if is_color_close(pixel, LIGHT_LOCATION_ICON_COLOR):
-                    logger.info("Found light location circle in the image")
-                    return False, ERR_ALREADY_HAS_CIRCLE
-
-                # Проверяем, нашли ли светлый треугольник
-                if is_color_close(pixel, LIGHT_TRIANGLE_ICON_COLOR):
-                    return False, ERR_ALREADY_HAS_TRIANGLE
+        error_code = scan_light_mode_icons(pixels)
+        if error_code is not None:
+            return False, error_code
+
+    logger.info(
+        "Image analysis done in %.1f ms (dark_mode=%s, good_pixel_found=%s)",
+        (time.perf_counter() - analysis_started_at) * 1000,
+        dark_mode,
+        good_pixel_found,
+    )
 
     if not good_pixel_found:
         return False, ERR_NO_TRIGGER_PIXEL
@@ -339,6 +339,43 @@ class TestWebModuleBase(unittest.TestCase):
         self.assertEqual(mod.order, 100)
 
 
+@unittest.skipUnless(_HAS_FASTAPI, "FastAPI не установлен")
+class TestAppShutdown(unittest.IsolatedAsyncioTestCase):
+    """Завершение приложения дописывает очередь логов БД."""
+
+    async def test_shutdown_closes_db_log_sink_after_modules(self):
+        from admin_web.core import app as app_module
+
+        calls = []
+        module = MagicMock()
+        module.on_shutdown.side_effect = lambda: calls.append("module")
+
+        async def _close_sink():
+            calls.append("sink")
+            return {"written": 3, "dropped": 0, "failed": 0}
+
+        with patch.object(app_module, "_MODULES", [module]), patch.object(
+            app_module, "close_db_log_sink", side_effect=_close_sink
+        ):
+            await app_module._shutdown()
+
+        self.assertEqual(calls, ["module", "sink"])
+
+    async def test_shutdown_closes_llm_clients(self):
+        """Общие клиенты LLM (httpx и GigaChat) закрываются при остановке приложения."""
+        from admin_web.core import app as app_module
+
+        with patch.object(app_module, "_MODULES", []), patch.object(
+            app_module, "close_db_log_sink", new=AsyncMock(return_value=None)
+        ), patch.object(
+            app_module, "close_llm_http_clients", new=AsyncMock(return_value=1)
+        ) as mock_close_http, patch.object(app_module, "close_gigachat_client_pool") as mock_close_gigachat:
+            await app_module._shutdown()
+
+        mock_close_http.assert_awaited_once()
+        mock_close_gigachat.assert_called_once()
+
+
 @unittest.skipUnless(_HAS_FASTAPI, "FastAPI не установлен")
 class TestExpertValidationModule(unittest.TestCase):
     """Тесты свойств модуля экспертной валидации (обратная совместимость)."""
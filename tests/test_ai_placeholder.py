@@ -25,6 +25,7 @@ from src.sbs_helper_telegram_bot.ai_router.messages import (
     AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED,
     AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED,
     AI_PROGRESS_STAGE_UPOS_NOT_FOUND_FALLBACK_STARTED,
+    AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL,
     MESSAGE_AI_LOW_CONFIDENCE,
     MESSAGE_AI_UNAVAILABLE,
 )
@@ -329,6 +330,55 @@ class TestAIPlaceholderFlow(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(mock_edit_safe.await_args_list[1].args[1], MESSAGE_AI_REQUESTING_AUGMENTED_PAYLOAD)
         self.assertEqual(mock_edit_safe.await_args_list[2].args[1], "RAG ответ после reroute")
 
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_user_auth_status")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_ai_router")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_main_menu_keyboard")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot._edit_markdown_safe", new_callable=AsyncMock)
+    async def test_streamed_chat_answer_updates_placeholder_in_place(
+        self, mock_edit_safe, mock_keyboard, mock_get_router, mock_auth
+    ):
+        """Фрагменты потокового ответа редактируют плейсхолдер, итог заменяет его; повтор не редактирует."""
+        from src.sbs_helper_telegram_bot.telegram_bot.telegram_bot import text_entered
+
+        auth = MagicMock()
+        auth.is_pre_invited = False
+        auth.is_pre_invited_activated = True
+        auth.is_invite_blocked = False
+        auth.is_legit = True
+        auth.is_admin = False
+        mock_auth.return_value = auth
+
+        mock_keyboard.return_value = MagicMock()
+
+        mock_router = MagicMock()
+
+        async def _route_with_stream(_text, _user_id, on_classified=None, on_progress=None):
+            if on_classified is not None:
+                await on_classified(SimpleNamespace(intent="general_chat"))
+            await on_progress(AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL, {"text": "🤖 Пер …"})
+            await on_progress(AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL, {"text": "🤖 Пер …"})
+            await on_progress(AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL, {"text": "🤖 Первый ответ …"})
+            return "🤖 Первый ответ целиком", "chat"
+
+        mock_router.route = AsyncMock(side_effect=_route_with_stream)
+        mock_get_router.return_value = mock_router
+
+        update, context = _make_update_and_context(text="привет")
+        placeholder_msg = MagicMock()
+        update.message.reply_text.return_value = placeholder_msg
+
+        await text_entered(update, context)
+
+        edits = [(call.args[0], call.args[1]) for call in mock_edit_safe.await_args_list]
+        self.assertEqual(
+            edits,
+            [
+                (placeholder_msg, "🤖 Пер …"),
+                (placeholder_msg, "🤖 Первый ответ …"),
+                (placeholder_msg, "🤖 Первый ответ целиком"),
+            ],
+        )
+
     @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_user_auth_status")
     @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_ai_router")
     @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.get_main_menu_keyboard")
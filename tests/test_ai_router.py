@@ -17,9 +17,11 @@ from src.core.ai.llm_provider import (
     LLMProviderTemporaryError,
 )
 from src.sbs_helper_telegram_bot.ai_router.messages import (
+    AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL,
     AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED,
     AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED,
     AI_PROGRESS_STAGE_UPOS_NOT_FOUND_FALLBACK_STARTED,
+    format_ai_chat_response,
 )
 from src.core.ai.rate_limiter import AIRateLimiter
 
@@ -422,6 +424,65 @@ class TestIntentRouterClassification(unittest.IsolatedAsyncioTestCase):
             )
         )
 
+    @patch("src.common.bot_settings.is_module_enabled", return_value=True)
+    @patch("src.common.bot_settings.get_enabled_modules", return_value=[])
+    @patch.object(IntentRouter, "_log_to_db")
+    @patch("src.sbs_helper_telegram_bot.ai_router.intent_router.ai_settings.AI_CHAT_STREAM_UPDATE_INTERVAL_MS", 0)
+    async def test_general_chat_streams_partial_answer_to_progress(self, mock_log_to_db, mock_modules, mock_enabled):
+        """С колбэком прогресса general_chat читает ответ потоком и отдаёт накопленный текст."""
+        provider = AsyncMock()
+        provider.name = "deepseek"
+        provider.get_model_name = MagicMock(return_value="deepseek-chat")
+        provider.classify.return_value = ClassificationResult(intent="general_chat", confidence=0.91)
+
+        async def _stream(*_args, **kwargs):
+            self.assertEqual(kwargs["purpose"], "chat")
+            for delta in ("При", "вет!"):
+                yield delta
+
+        provider.stream_chat = _stream
+        on_progress = AsyncMock()
+
+        router = _make_router(provider=provider)
+        result, status = await router.route("привет", user_id=1, on_progress=on_progress)
+
+        self.assertEqual(status, "chat")
+        self.assertEqual(result, format_ai_chat_response("Привет!"))
+        provider.chat.assert_not_awaited()
+        partial_texts = [
+            call.args[1]["text"]
+            for call in on_progress.await_args_list
+            if call.args[0] == AI_PROGRESS_STAGE_CHAT_ANSWER_PARTIAL
+        ]
+        self.assertEqual(
+            partial_texts,
+            [format_ai_chat_response("При") + " …", format_ai_chat_response("Привет!") + " …"],
+        )
+
+    @patch("src.common.bot_settings.is_module_enabled", return_value=True)
+    @patch("src.common.bot_settings.get_enabled_modules", return_value=[])
+    @patch.object(IntentRouter, "_log_to_db")
+    async def test_general_chat_empty_stream_falls_back_to_chat(self, mock_log_to_db, mock_modules, mock_enabled):
+        """Пустой поток повторяется обычным chat()."""
+        provider = AsyncMock()
+        provider.name = "deepseek"
+        provider.get_model_name = MagicMock(return_value="deepseek-chat")
+        provider.classify.return_value = ClassificationResult(intent="general_chat", confidence=0.91)
+        provider.chat.return_value = "Привет!"
+
+        async def _empty_stream(*_args, **_kwargs):
+            for delta in ():
+                yield delta
+
+        provider.stream_chat = _empty_stream
+
+        router = _make_router(provider=provider)
+        result, status = await router.route("привет", user_id=1, on_progress=AsyncMock())
+
+        self.assertEqual(status, "chat")
+        self.assertEqual(result, format_ai_chat_response("Привет!"))
+        provider.chat.assert_awaited_once()
+
     @patch("src.common.bot_settings.is_module_enabled", return_value=True)
     @patch("src.common.bot_settings.get_enabled_modules", return_value=["ai_router"])
     @patch.object(IntentRouter, "_log_to_db")
@@ -0,0 +1,147 @@
+"""
+test_async_database.py — тесты асинхронного фасада доступа к БД.
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.common import database
+from src.common.async_database import (
+    AsyncDatabase,
+    get_async_cursor,
+    get_async_db_connection,
+    run_db,
+    shutdown_async_database,
+)
+from src.common.database import BlockingConnectionPool
+
+
+class _FakeCursor:
+    """Курсор-заглушка, запоминающий запросы и поток выполнения."""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.closed = False
+
+    def execute(self, operation, params=None):
+        self._conn.queries.append((operation, params, threading.current_thread().name))
+
+    def fetchall(self):
+        return [{"invite": "abc"}]
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeConnection:
+    """Соединение-заглушка с учётом commit/rollback."""
+
+    def __init__(self):
+        self.queries = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.cursors = []
+
+    def cursor(self, dictionary=True):
+        cursor = _FakeCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def reset_session(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestAsyncDatabase(unittest.IsolatedAsyncioTestCase):
+    """Асинхронные контекстные менеджеры и run_db поверх пула соединений."""
+
+    def setUp(self):
+        self.connections = []
+
+        def factory():
+            conn = _FakeConnection()
+            self.connections.append(conn)
+            return conn
+
+        self.pool = BlockingConnectionPool(factory, pool_size=2, acquire_timeout_seconds=1.0)
+        patcher = patch.object(database, "_connection_pool", self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutdown_async_database)
+
+    async def test_connection_commits_and_returns_to_pool(self):
+        """Запросы выполняются в пуле db-conn, соединение коммитится и возвращается."""
+        async with get_async_db_connection() as conn:
+            async with get_async_cursor(conn) as cursor:
+                await cursor.execute("SELECT invite FROM invites WHERE userid=%s", (1,))
+                rows = await cursor.fetchall()
+
+        self.assertEqual(rows, [{"invite": "abc"}])
+        fake = self.connections[0]
+        self.assertEqual(fake.commits, 1)
+        self.assertTrue(fake.cursors[0].closed)
+        self.assertTrue(fake.queries[0][2].startswith("db-conn"))
+        snapshot = self.pool.snapshot()
+        self.assertEqual((snapshot["in_use"], snapshot["idle"]), (0, 1))
+        site = f"{__name__}:test_connection_commits_and_returns_to_pool"
+        self.assertIn(site, snapshot["call_sites"])
+
+    async def test_exception_rolls_back(self):
+        """Исключение внутри блока откатывает транзакцию и пробрасывается."""
+        with self.assertRaises(ValueError):
+            async with get_async_db_connection():
+                raise ValueError("boom")
+
+        fake = self.connections[0]
+        self.assertEqual((fake.commits, fake.rollbacks), (0, 1))
+        self.assertEqual(self.pool.snapshot()["in_use"], 0)
+
+    async def test_waiters_do_not_starve_connection_holders(self):
+        """Ожидающие соединения не блокируют запросы тех, кто соединение уже держит."""
+        db = AsyncDatabase(io_workers=2, connection_workers=2)
+        self.addCleanup(db.shutdown)
+        with patch("src.common.async_database.get_async_database", return_value=db):
+            async def user(index):
+                async with get_async_db_connection() as conn:
+                    async with get_async_cursor(conn) as cursor:
+                        await asyncio.sleep(0.01)
+                        await cursor.execute("SELECT %s", (index,))
+
+            await asyncio.wait_for(asyncio.gather(*(user(index) for index in range(10))), timeout=5)
+
+        self.assertEqual(sum(len(conn.queries) for conn in self.connections), 10)
+        self.assertEqual(self.pool.snapshot()["timeouts_total"], 0)
+
+    async def test_run_db_keeps_event_loop_responsive(self):
+        """Блокирующая функция в run_db не останавливает event loop."""
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        blocking = MagicMock(side_effect=lambda: time.sleep(0.1) or "done")
+        result, _ = await asyncio.gather(run_db(blocking), ticker())
+
+        self.assertEqual(result, "done")
+        self.assertEqual(len(ticks), 5)
+        self.assertLess(ticks[-1] - ticks[0], 0.09)
+
+
+if __name__ == "__main__":
+    unittest.main()
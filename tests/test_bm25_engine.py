@@ -0,0 +1,117 @@
+"""
+test_bm25_engine.py — тесты векторизованного BM25-движка.
+"""
+
+import random
+import unittest
+
+from rank_bm25 import BM25Okapi
+
+from src.core.ai.bm25_engine import SparseBM25Index, corpus_signature
+
+
+def _random_corpus(documents, vocabulary, seed):
+    """Собрать случайный корпус с частыми и редкими токенами."""
+    rng = random.Random(seed)
+    words = [f"t{index}" for index in range(vocabulary)]
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+    corpus = [rng.choices(words, weights=weights, k=rng.randint(0, 12)) for _ in range(documents)]
+    queries = [rng.choices(words, k=rng.randint(1, 5)) for _ in range(30)]
+    return corpus, queries
+
+
+class TestSparseBM25Index(unittest.TestCase):
+    """Тесты SparseBM25Index."""
+
+    def test_scores_match_bm25okapi(self):
+        """Score совпадают с BM25Okapi, включая epsilon-floor, пустые документы и повторы в запросе."""
+        corpus, queries = _random_corpus(documents=300, vocabulary=40, seed=7)
+        queries.append(["t0", "t0", "t1", "unknown"])
+        for k1, b in ((1.5, 0.75), (1.2, 0.0), (0.8, 1.0)):
+            expected_index = BM25Okapi([tokens or [""] for tokens in corpus], k1=k1, b=b)
+            index = SparseBM25Index(corpus, k1=k1, b=b)
+            for query in queries:
+                expected = expected_index.get_scores(query)
+                actual = index.get_scores(query)
+                for expected_score, actual_score in zip(expected, actual):
+                    self.assertAlmostEqual(float(actual_score), float(expected_score), places=9)
+
+    def test_top_k_matches_stable_sort_of_full_scores(self):
+        """top_k совпадает со стабильной сортировкой положительных score всего корпуса."""
+        corpus, queries = _random_corpus(documents=500, vocabulary=25, seed=11)
+        index = SparseBM25Index(corpus)
+        for query in queries:
+            scores = index.get_scores(query)
+            expected = sorted(
+                ((doc_id, float(score)) for doc_id, score in enumerate(scores) if score > 0),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:7]
+            self.assertEqual(index.top_k(query, 7), expected)
+
+    def test_top_k_handles_empty_results(self):
+        """Запрос без совпадений и пустой индекс возвращают пустой top-k."""
+        self.assertEqual(SparseBM25Index([["a", "b"], ["c"]]).top_k(["zzz"], 5), [])
+        self.assertEqual(SparseBM25Index([]).top_k(["a"], 5), [])
+
+    def test_matches_compares_signature_and_parameters(self):
+        """Индекс совпадает только с корпусом той же сигнатуры и теми же k1/b."""
+        corpus = [["a", "b"], ["a", "c"], ["a", "d"]]
+        index = SparseBM25Index(corpus, k1=1.5, b=0.75)
+
+        self.assertTrue(index.matches(corpus_signature(corpus), 1.5, 0.75))
+        self.assertFalse(index.matches(corpus_signature(corpus), 1.2, 0.75))
+        # Корпус того же размера с другими токенами не совпадает с индексом.
+        self.assertFalse(index.matches(corpus_signature([["x", "b"], ["a", "c"], ["a", "d"]]), 1.5, 0.75))
+
+    def test_explicit_signature_replaces_content_hash(self):
+        """Переданная сигнатура (версия корпуса) используется вместо хэша содержимого."""
+        index = SparseBM25Index([["a"], ["b"]], signature=(7, "raw"))
+
+        self.assertTrue(index.matches((7, "raw"), 1.5, 0.75))
+        self.assertFalse(index.matches((8, "raw"), 1.5, 0.75))
+
+
+    def test_with_changes_matches_fresh_index(self):
+        """Цепочка with_changes даёт те же score, что индекс, построенный заново по изменённому корпусу."""
+        corpus, _ = _random_corpus(documents=80, vocabulary=30, seed=11)
+        rng = random.Random(11)
+        words = [f"t{index}" for index in range(30)]
+        index = SparseBM25Index(corpus)
+        for step in range(20):
+            replaced = {
+                position: rng.choices(words, k=rng.randint(0, 6)) + [f"new{step}"]
+                for position in rng.sample(range(len(corpus)), 3)
+            }
+            deleted = set(rng.sample([position for position in range(len(corpus)) if position not in replaced], 2))
+            appended = [rng.choices(words, k=rng.randint(0, 6)) for _ in range(rng.randint(0, 3))]
+            for position, tokens in replaced.items():
+                corpus[position] = tokens
+            corpus = [tokens for position, tokens in enumerate(corpus) if position not in deleted] + appended
+
+            index = index.with_changes(replaced, deleted, appended, signature=step)
+            expected_index = SparseBM25Index(corpus)
+
+            self.assertEqual(index.size, expected_index.size)
+            self.assertEqual(index.vocabulary_size, expected_index.vocabulary_size)
+            self.assertTrue(index.matches(step, 1.5, 0.75))
+            for query in (rng.choices(words + [f"new{step}", "t0"], k=3) for _ in range(5)):
+                for expected_score, actual_score in zip(expected_index.get_scores(query), index.get_scores(query)):
+                    self.assertAlmostEqual(float(actual_score), float(expected_score), places=9)
+        self.assertGreater(index.pending_changes, 0)
+
+    def test_with_changes_keeps_source_index_unchanged(self):
+        """Исходный индекс не меняется: поиски по старому снимку дочитывают прежние score."""
+        corpus = [["a", "b"], ["a", "c"], ["d"], ["e"]]
+        index = SparseBM25Index(corpus)
+        before = [float(score) for score in index.get_scores(["c", "d"])]
+
+        changed = index.with_changes({1: ["d"]}, [0], [["c", "c"]], signature="v2")
+
+        self.assertEqual([float(score) for score in index.get_scores(["c", "d"])], before)
+        self.assertEqual(changed.size, 4)
+        self.assertEqual(changed.top_k(["c"], 1)[0][0], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,12 +19,17 @@ from src.common.bot_settings import (
     get_modules_config,
     SETTING_INVITE_SYSTEM_ENABLED
 )
+from src.common.settings_snapshot import reset_settings_snapshot
 
 
 class TestGetSetting(unittest.TestCase):
     """Tests for get_setting function."""
 
-    @patch('src.common.bot_settings.database')
+    def setUp(self):
+        reset_settings_snapshot()
+        self.addCleanup(reset_settings_snapshot)
+
+    @patch('src.common.settings_snapshot.database')
     def test_get_existing_setting(self, mock_database):
         """Test retrieving an existing setting."""
         mock_conn = MagicMock()
@@ -33,14 +38,16 @@ class TestGetSetting(unittest.TestCase):
         mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
         mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
         
-        mock_cursor.fetchone.return_value = {'setting_value': 'test_value'}
+        # Первый запрос — версии настроек, второй — вся таблица bot_settings
+        mock_cursor.fetchall.side_effect = [[], [{'setting_key': 'test_key', 'setting_value': 'test_value'}]]
         
         result = get_setting('test_key')
         
         self.assertEqual(result, 'test_value')
-        mock_cursor.execute.assert_called_once()
+        query = mock_cursor.execute.call_args[0][0]
+        self.assertIn('FROM `bot_settings`', query)
 
-    @patch('src.common.bot_settings.database')
+    @patch('src.common.settings_snapshot.database')
     def test_get_nonexistent_setting(self, mock_database):
         """Test retrieving a non-existent setting returns None."""
         mock_conn = MagicMock()
@@ -49,7 +56,7 @@ class TestGetSetting(unittest.TestCase):
         mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
         mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
         
-        mock_cursor.fetchone.return_value = None
+        mock_cursor.fetchall.return_value = []
         
         result = get_setting('nonexistent_key')
         
@@ -71,10 +78,13 @@ class TestSetSetting(unittest.TestCase):
         result = set_setting('test_key', 'test_value', 12345)
         
         self.assertTrue(result)
-        mock_cursor.execute.assert_called_once()
+        self.assertEqual(mock_cursor.execute.call_count, 2)
         # Check that the query includes ON DUPLICATE KEY UPDATE
-        query = mock_cursor.execute.call_args[0][0]
+        query = mock_cursor.execute.call_args_list[0][0][0]
         self.assertIn('ON DUPLICATE KEY UPDATE', query)
+        # The settings version is bumped in the same transaction
+        version_query = mock_cursor.execute.call_args_list[1][0][0]
+        self.assertIn('settings_version', version_query)
 
 
 class TestIsInviteSystemEnabled(unittest.TestCase):
@@ -520,13 +520,24 @@ class TestCertificationRankSummary(unittest.TestCase):
         validity_seconds = settings.CATEGORY_RESULT_VALIDITY_DAYS * 24 * 60 * 60
         mock_cursor.fetchall.side_effect = [
             [
-                {'category_id': 11, 'last_passed_category_timestamp': now_ts - 1000},
-                {'category_id': 12, 'last_passed_category_timestamp': now_ts - validity_seconds - 10},
-                {'category_id': 13, 'last_passed_category_timestamp': now_ts - (validity_seconds // 2)},
-            ],
-            [
-                {'category_id': 11, 'best_score_percent': 92.5},
-                {'category_id': 13, 'best_score_percent': 57.5},
+                {
+                    'category_id': 11,
+                    'last_passed_timestamp': now_ts - 1000,
+                    'best_score_percent': 92.5,
+                    'best_score_timestamp': now_ts - 1000,
+                },
+                {
+                    'category_id': 12,
+                    'last_passed_timestamp': now_ts - validity_seconds - 10,
+                    'best_score_percent': None,
+                    'best_score_timestamp': None,
+                },
+                {
+                    'category_id': 13,
+                    'last_passed_timestamp': now_ts - (validity_seconds // 2),
+                    'best_score_percent': 57.5,
+                    'best_score_timestamp': now_ts - (validity_seconds // 2),
+                },
             ],
         ]
 
@@ -588,11 +599,18 @@ class TestCertificationRankSummary(unittest.TestCase):
         warning_seconds = settings.CATEGORY_RESULT_EXPIRY_WARNING_DAYS * 24 * 60 * 60
         mock_cursor.fetchall.side_effect = [
             [
-                {'category_id': 21, 'last_passed_category_timestamp': now_ts - validity_seconds - 1},
-                {'category_id': 22, 'last_passed_category_timestamp': now_ts - validity_seconds + warning_seconds - 100},
-            ],
-            [
-                {'category_id': 22, 'best_score_percent': 80.0},
+                {
+                    'category_id': 21,
+                    'last_passed_timestamp': now_ts - validity_seconds - 1,
+                    'best_score_percent': None,
+                    'best_score_timestamp': None,
+                },
+                {
+                    'category_id': 22,
+                    'last_passed_timestamp': now_ts - validity_seconds + warning_seconds - 100,
+                    'best_score_percent': 80.0,
+                    'best_score_timestamp': now_ts - validity_seconds + warning_seconds - 100,
+                },
             ],
         ]
 
@@ -764,6 +782,31 @@ class TestCancelOnMenu(unittest.IsolatedAsyncioTestCase):
         from src.sbs_helper_telegram_bot.certification.certification_bot_part import get_main_menu_keyboard
         get_main_menu_keyboard.assert_called_once_with(is_admin=True)
 
+    @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.get_main_menu_keyboard')
+    @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.get_main_menu_message', return_value='Главное меню')
+    @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.check_if_user_admin', return_value=False)
+    @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.logic.complete_test_attempt')
+    async def test_cancel_on_menu_runs_db_calls_off_event_loop(self, mock_complete, _mock_admin, _mock_msg, _mock_kb):
+        """Запросы к БД обработчика выполняются в пуле потоков db-io, а не в event loop."""
+        import threading
+        from src.sbs_helper_telegram_bot.certification.certification_bot_part import cancel_on_menu
+        from src.sbs_helper_telegram_bot.certification import settings
+
+        threads = []
+        mock_complete.side_effect = lambda *_args, **_kwargs: threads.append(threading.current_thread().name)
+
+        update = MagicMock()
+        update.effective_user.id = 12345
+        update.effective_user.first_name = 'Тест'
+        update.message.reply_text = AsyncMock()
+        context = MagicMock()
+        context.user_data = {settings.CURRENT_ATTEMPT_ID_KEY: 42}
+
+        await cancel_on_menu(update, context)
+
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('db-io'))
+
     @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.get_main_menu_keyboard')
     @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.get_main_menu_message', return_value='Меню')
     @patch('src.sbs_helper_telegram_bot.certification.certification_bot_part.check_if_user_admin', return_value=False)
@@ -0,0 +1,296 @@
+"""
+test_certification_summaries.py — тесты предрасчитанных сводок аттестации.
+"""
+
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.sbs_helper_telegram_bot.certification import certification_logic, settings
+
+NOW_TS = 1_700_000_000
+VALIDITY_SECONDS = settings.CATEGORY_RESULT_VALIDITY_DAYS * 24 * 60 * 60
+
+
+def _reference_aggregates(attempts, valid_from):
+    """Агрегаты так, как их считали прежние запросы к certification_attempts."""
+    passed = [a for a in attempts if a['passed']]
+    summaries = {}
+    for userid in {a['userid'] for a in passed}:
+        own = [a for a in passed if a['userid'] == userid]
+        last = max(own, key=lambda a: a['completed_timestamp'])
+        summaries[userid] = (len(own), last['completed_timestamp'], last['score_percent'])
+
+    categories = {}
+    for key in {(a['userid'], a['category_id']) for a in attempts if a['category_id'] is not None}:
+        own = [a for a in attempts if (a['userid'], a['category_id']) == key]
+        passed_ts = [a['completed_timestamp'] for a in own if a['passed']]
+        recent = [a['score_percent'] for a in own if a['completed_timestamp'] >= valid_from]
+        categories[key] = (max(passed_ts) if passed_ts else None, max(recent) if recent else None)
+
+    monthly = {}
+    for attempt in passed:
+        month_key = certification_logic._month_key(attempt['completed_timestamp'])
+        scopes = [0] + ([attempt['category_id']] if attempt['category_id'] is not None else [])
+        for scope in scopes:
+            best, count = monthly.get((month_key, scope, attempt['userid']), (0.0, 0))
+            monthly[(month_key, scope, attempt['userid'])] = (max(best, attempt['score_percent']), count + 1)
+    return summaries, categories, monthly
+
+
+class _RecordingCursor:
+    """Курсор-заглушка: записывает запросы и отдаёт заготовленные ответы."""
+
+    def __init__(self, fetchone=(), fetchall=(), rowcount=1):
+        self.executed = []
+        self._fetchone = list(fetchone)
+        self._fetchall = list(fetchall)
+        self.rowcount = rowcount
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+
+    def executemany(self, sql, rows):
+        self.executed.append((" ".join(sql.split()), list(rows)))
+
+    def fetchone(self):
+        return self._fetchone.pop(0) if self._fetchone else None
+
+    def fetchall(self):
+        return self._fetchall.pop(0) if self._fetchall else []
+
+    def statements(self, fragment):
+        return [params for sql, params in self.executed if fragment in sql]
+
+
+def _patch_database(test, cursor):
+    db_patch = patch.object(certification_logic, 'database')
+    mock_database = db_patch.start()
+    test.addCleanup(db_patch.stop)
+    mock_database.get_cursor.return_value.__enter__.return_value = cursor
+    return mock_database
+
+
+class TestAggregateAttemptHistory(unittest.TestCase):
+    """Перестройка сводок совпадает с прежними агрегирующими запросами."""
+
+    def test_matches_reference_queries(self):
+        """Случайная история: сводка, категории и месячные рейтинги совпадают."""
+        rng = random.Random(7)
+        valid_from = NOW_TS - VALIDITY_SECONDS
+        attempts = sorted(
+            (
+                {
+                    'userid': rng.randint(1, 6),
+                    'category_id': rng.choice([None, 1, 2, 3]),
+                    'score_percent': float(rng.choice([40, 60, 80, 85, 90, 100])),
+                    'passed': 0,
+                    'completed_timestamp': NOW_TS - rng.randint(0, 3 * VALIDITY_SECONDS),
+                }
+                for _ in range(400)
+            ),
+            key=lambda a: a['completed_timestamp'],
+        )
+        for attempt in attempts:
+            attempt['passed'] = int(attempt['score_percent'] >= 80)
+
+        summary_rows, category_rows, monthly_rows = certification_logic._aggregate_attempt_history(
+            attempts, valid_from, NOW_TS
+        )
+        summaries, categories, monthly = _reference_aggregates(attempts, valid_from)
+
+        self.assertEqual({row[0]: tuple(row[1:4]) for row in summary_rows}, summaries)
+        self.assertEqual({(row[0], row[1]): (row[2], row[3]) for row in category_rows}, categories)
+        self.assertEqual({tuple(row[:3]): tuple(row[3:5]) for row in monthly_rows}, monthly)
+        for row in category_rows:
+            if row[3] is not None:
+                self.assertGreaterEqual(row[4], valid_from)
+
+
+class TestApplyAttemptToSummaries(unittest.TestCase):
+    """Инкрементальное обновление сводок при завершении попытки."""
+
+    def test_passed_attempt_updates_all_summaries(self):
+        """Успешная попытка по категории: сводка, оба месячных рейтинга и категория."""
+        cursor = _RecordingCursor(fetchone=[None])
+
+        certification_logic._apply_attempt_to_summaries(
+            cursor, {'userid': 5, 'category_id': 3}, 86.666, True, NOW_TS
+        )
+
+        self.assertEqual(cursor.statements('INSERT INTO certification_user_summary'), [(5, NOW_TS, 86.67, NOW_TS)])
+        month_key = certification_logic._month_key(NOW_TS)
+        self.assertEqual(
+            cursor.statements('INSERT INTO certification_monthly_results')[0],
+            [(month_key, 0, 5, 86.67, NOW_TS), (month_key, 3, 5, 86.67, NOW_TS)],
+        )
+        self.assertEqual(
+            cursor.statements('INSERT INTO certification_user_category_results'),
+            [(5, 3, NOW_TS, 86.67, NOW_TS, NOW_TS)],
+        )
+
+    def test_failed_attempt_keeps_higher_valid_best(self):
+        """Неуспешная попытка не трогает рейтинги и не снижает лучший результат в окне."""
+        best_ts = NOW_TS - 1000
+        cursor = _RecordingCursor(fetchone=[{'best_score_percent': 95.0, 'best_score_timestamp': best_ts}])
+
+        certification_logic._apply_attempt_to_summaries(
+            cursor, {'userid': 5, 'category_id': 3}, 50.0, False, NOW_TS
+        )
+
+        self.assertEqual(cursor.statements('certification_user_summary'), [])
+        self.assertEqual(cursor.statements('certification_monthly_results'), [])
+        self.assertEqual(
+            cursor.statements('INSERT INTO certification_user_category_results'),
+            [(5, 3, None, 95.0, best_ts, NOW_TS)],
+        )
+
+    def test_expired_best_is_recalculated_from_window(self):
+        """Истёкший лучший результат заменяется максимумом по попыткам окна."""
+        window_ts = NOW_TS - 500
+        cursor = _RecordingCursor(
+            fetchone=[{'best_score_percent': 100.0, 'best_score_timestamp': NOW_TS - VALIDITY_SECONDS - 1}],
+            fetchall=[[
+                {'category_id': 3, 'score_percent': 85.0, 'completed_timestamp': window_ts},
+                {'category_id': 3, 'score_percent': 60.0, 'completed_timestamp': NOW_TS},
+            ]],
+        )
+
+        certification_logic._apply_attempt_to_summaries(
+            cursor, {'userid': 5, 'category_id': 3}, 60.0, False, NOW_TS
+        )
+
+        self.assertEqual(
+            cursor.statements('INSERT INTO certification_user_category_results'),
+            [(5, 3, None, 85.0, window_ts, NOW_TS)],
+        )
+
+    def test_uncategorized_attempt_skips_category_results(self):
+        """Общий тест без категории попадает только в сводку и общий рейтинг."""
+        cursor = _RecordingCursor()
+
+        certification_logic._apply_attempt_to_summaries(
+            cursor, {'userid': 5, 'category_id': None}, 90.0, True, NOW_TS
+        )
+
+        self.assertEqual(len(cursor.statements('INSERT INTO certification_monthly_results')[0]), 1)
+        self.assertEqual(cursor.statements('certification_user_category_results'), [])
+
+
+class TestCompleteTestAttemptSummaries(unittest.TestCase):
+    """complete_test_attempt обновляет сводки только для завершённых попыток."""
+
+    def _complete(self, status, rowcount=1):
+        cursor = _RecordingCursor(fetchone=[
+            {'id': 1, 'userid': 5, 'category_id': None, 'total_questions': 10, 'started_timestamp': NOW_TS - 60},
+            {'correct_count': 9},
+        ], rowcount=rowcount)
+        _patch_database(self, cursor)
+        with patch.object(certification_logic, 'get_test_settings', return_value={'passing_score_percent': 80}):
+            result = certification_logic.complete_test_attempt(1, status=status)
+        return result, cursor
+
+    def test_completed_attempt_updates_summaries(self):
+        result, cursor = self._complete('completed')
+
+        self.assertTrue(result['passed'])
+        self.assertEqual(len(cursor.statements('INSERT INTO certification_user_summary')), 1)
+
+    def test_expired_attempt_does_not_update_summaries(self):
+        _, cursor = self._complete('expired')
+
+        self.assertEqual(cursor.statements('certification_user_summary'), [])
+        self.assertEqual(cursor.statements('certification_monthly_results'), [])
+
+    def test_already_finished_attempt_is_not_counted_twice(self):
+        """Повторное завершение (UPDATE не затронул попытку in_progress) не трогает сводки."""
+        result, cursor = self._complete('completed', rowcount=0)
+
+        self.assertIsNone(result)
+        update_sql = next(sql for sql, _ in cursor.executed if sql.startswith('UPDATE certification_attempts'))
+        self.assertIn("status = 'in_progress'", update_sql)
+        self.assertEqual(cursor.statements('certification_user_summary'), [])
+        self.assertEqual(cursor.statements('certification_monthly_results'), [])
+
+
+class TestSummaryReads(unittest.TestCase):
+    """Профиль и рейтинги читаются из сводных таблиц."""
+
+    @patch.object(certification_logic, 'get_max_achievable_certification_points', return_value=300)
+    @patch.object(certification_logic.time, 'time', return_value=NOW_TS)
+    def test_summary_recalculates_expired_best_on_read(self, _mock_time, _mock_max_points):
+        """Не обработанный очисткой истёкший результат пересчитывается при чтении."""
+        valid_from = NOW_TS - VALIDITY_SECONDS
+        cursor = _RecordingCursor(
+            fetchone=[{'passed_tests_count': 3, 'last_passed_timestamp': NOW_TS - 100, 'last_passed_score': 90.0}],
+            fetchall=[
+                [
+                    {'category_id': 1, 'last_passed_timestamp': NOW_TS - 100,
+                     'best_score_percent': 90.0, 'best_score_timestamp': NOW_TS - 100},
+                    {'category_id': 2, 'last_passed_timestamp': valid_from - 10,
+                     'best_score_percent': 100.0, 'best_score_timestamp': valid_from - 10},
+                ],
+                [{'category_id': 2, 'score_percent': 40.0, 'completed_timestamp': NOW_TS - 50}],
+            ],
+        )
+        _patch_database(self, cursor)
+
+        summary = certification_logic.get_user_certification_summary(5)
+
+        self.assertEqual(summary['certification_points'], 130)
+        self.assertEqual((summary['passed_categories_count'], summary['expired_categories_count']), (1, 1))
+        self.assertEqual(summary['passed_tests_count'], 3)
+        self.assertEqual(
+            cursor.statements('UPDATE certification_user_category_results')[0],
+            [(40.0, NOW_TS - 50, NOW_TS, 5, 2, valid_from)],
+        )
+
+    def test_user_monthly_rank_is_indexed_count(self):
+        """Место — число строк месяца с большим результатом плюс один."""
+        cursor = _RecordingCursor(fetchone=[{'best_score': 90.0, 'tests_count': 2}, {'higher_count': 3}])
+        _patch_database(self, cursor)
+
+        rank = certification_logic.get_user_monthly_rank_by_category(5, category_id=4, year=2026, month=2)
+
+        self.assertEqual(rank, {'rank': 4, 'best_score': 90.0, 'tests_count': 2})
+        self.assertEqual(cursor.executed[0][1], (202602, 4, 5))
+        self.assertIn('FROM certification_monthly_results', cursor.executed[1][0])
+
+    def test_monthly_ranking_uses_all_tests_key(self):
+        """Общий рейтинг читается по category_id = 0 с нумерацией мест."""
+        cursor = _RecordingCursor(fetchall=[[{'userid': 1, 'best_score': 100.0}, {'userid': 2, 'best_score': 90.0}]])
+        _patch_database(self, cursor)
+
+        ranking = certification_logic.get_monthly_ranking(year=2026, month=2, limit=5)
+
+        self.assertEqual([row['rank'] for row in ranking], [1, 2])
+        self.assertEqual(cursor.executed[0][1], (202602, 0, 5))
+
+
+class TestSweepExpiredCategoryResults(unittest.TestCase):
+    """Очистка истёкших лучших результатов по категориям."""
+
+    @patch.object(certification_logic.time, 'time', return_value=NOW_TS)
+    def test_sweep_recalculates_expired_rows(self, _mock_time):
+        valid_from = NOW_TS - VALIDITY_SECONDS
+        cursor = _RecordingCursor(fetchall=[
+            [{'userid': 5, 'category_id': 1}, {'userid': 5, 'category_id': 2}, {'userid': 6, 'category_id': 1}],
+            [{'category_id': 2, 'score_percent': 70.0, 'completed_timestamp': NOW_TS - 10}],
+            [],
+        ])
+        mock_database = _patch_database(self, cursor)
+        mock_database.get_db_connection.return_value = MagicMock()
+
+        updated = certification_logic.sweep_expired_category_results(batch_size=10)
+
+        self.assertEqual(updated, 3)
+        updates = cursor.statements('UPDATE certification_user_category_results')
+        self.assertEqual(
+            updates[0],
+            [(None, None, NOW_TS, 5, 1, valid_from), (70.0, NOW_TS - 10, NOW_TS, 5, 2, valid_from)],
+        )
+        self.assertEqual(updates[1], [(None, None, NOW_TS, 6, 1, valid_from)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,249 @@
+"""
+test_code_dictionary.py — тесты справочников кодов UPOS и КТР в памяти.
+"""
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.common import code_dictionary
+from src.common.async_database import AsyncDatabase
+from src.common.code_dictionary import CodeDictionary, CodeIndex, normalize_code
+from src.sbs_helper_telegram_bot.ai_router.intent_handlers import KtrHandler, UposErrorHandler
+from src.sbs_helper_telegram_bot.ktr import ktr_bot_part
+from src.sbs_helper_telegram_bot.upos_error import upos_error_bot_part
+
+ROWS = [
+    {"id": 1, "error_code": "E001", "description": "Нет связи"},
+    {"id": 2, "error_code": "E002", "description": "Нет бумаги"},
+    {"id": 3, "error_code": "E0021", "description": "Замятие"},
+    {"id": 4, "error_code": "4119", "description": "Отказ банка"},
+    {"id": 5, "error_code": "A-10", "description": "Первый"},
+    {"id": 6, "error_code": "A10", "description": "Второй"},
+]
+
+
+class TestCodeIndex(unittest.TestCase):
+    """Точный и нормализованный поиск, подсказки."""
+
+    def setUp(self):
+        self.index = CodeIndex(ROWS, key_field="error_code")
+
+    def test_normalize_code(self):
+        """Регистр, разделители и кириллические двойники не влияют на ключ."""
+        self.assertEqual(normalize_code(" e-001 "), "E001")
+        # Кириллические «Е» и «Т»
+        self.assertEqual(normalize_code("ЕТ.12"), "ET12")
+        self.assertEqual(normalize_code(None), "")
+
+    def test_exact_then_normalized_lookup(self):
+        """Точный код находится сразу, варианты написания — по нормализованному ключу."""
+        self.assertEqual(self.index.get("E001")["id"], 1)
+        self.assertEqual(self.index.get("e 001")["id"], 1)
+        self.assertEqual(self.index.get("Е001")["id"], 1)
+        self.assertIsNone(self.index.get("E003"))
+
+    def test_ambiguous_normalized_key_has_no_match(self):
+        """Если ключу соответствует несколько кодов, ответа нет, а оба — в подсказках."""
+        self.assertEqual(self.index.get("A10")["id"], 6)
+        self.assertIsNone(self.index.get("a 10"))
+        self.assertEqual(sorted(self.index.suggest("a 10")), ["A-10", "A10"])
+
+    def test_get_exact_ignores_case_only(self):
+        """get_exact совпадает с поиском в БД: без учёта регистра, но без нормализации."""
+        self.assertEqual(self.index.get_exact("e001")["id"], 1)
+        self.assertIsNone(self.index.get_exact("E-001"))
+
+    def test_returned_rows_are_copies(self):
+        """Изменение результата не портит справочник."""
+        self.index.get("E001")["description"] = "изменено"
+        self.assertEqual(self.index.get("E001")["description"], "Нет связи")
+
+    def test_suggest_prefix_then_fuzzy(self):
+        """Сначала продолжения введённого префикса, затем похожие коды."""
+        self.assertEqual(self.index.suggest("E002"), ["E002", "E0021", "E001"])
+        self.assertEqual(self.index.suggest("411"), ["4119"])
+        self.assertEqual(self.index.suggest("E00", limit=2), ["E001", "E002"])
+        self.assertEqual(self.index.suggest("ZZZZZZ"), [])
+
+
+class TestCodeDictionary(unittest.TestCase):
+    """Загрузка один раз и перечитывание по версии."""
+
+    def setUp(self):
+        self.loads = 0
+        self.version = {"version": 1}
+        self.rows = [dict(row) for row in ROWS]
+        db_patch = patch.object(code_dictionary, "database")
+        mock_database = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        self.cursor = mock_database.get_cursor.return_value.__enter__.return_value
+        self.cursor.fetchone.side_effect = lambda: self.version
+
+    def _loader(self):
+        self.loads += 1
+        return self.rows
+
+    def test_loaded_once_and_reloaded_on_version_change(self):
+        """Повторные поиски не перечитывают справочник, новая версия — перечитывает."""
+        dictionary = CodeDictionary("upos_error_codes", self._loader, "error_code", check_interval_seconds=0)
+
+        for _ in range(5):
+            self.assertIsNotNone(dictionary.get("E001"))
+        self.assertEqual(self.loads, 1)
+
+        self.rows.append({"id": 7, "error_code": "E777", "description": "Новый"})
+        self.version = {"version": 2}
+        self.assertEqual(dictionary.get("E777")["id"], 7)
+        self.assertEqual(self.loads, 2)
+
+    def test_version_checked_once_per_interval(self):
+        """В пределах интервала проверки БД не запрашивается."""
+        dictionary = CodeDictionary("ktr_codes", self._loader, "error_code", check_interval_seconds=60)
+
+        for _ in range(10):
+            dictionary.get("E001")
+
+        self.assertEqual(self.cursor.execute.call_count, 1)
+        self.assertEqual(dictionary.stats()["version_checks"], 1)
+
+    def test_invalidate_forces_reload(self):
+        """Сброс после изменения в своём процессе перечитывает справочник сразу."""
+        dictionary = CodeDictionary("upos_error_codes", self._loader, "error_code", check_interval_seconds=60)
+        dictionary.get("E001")
+
+        dictionary.invalidate()
+        dictionary.get("E001")
+
+        self.assertEqual(self.loads, 2)
+
+    def test_load_error_keeps_previous_index(self):
+        """При недоступной БД отдаётся прежний справочник."""
+        dictionary = CodeDictionary("upos_error_codes", self._loader, "error_code", check_interval_seconds=0)
+        dictionary.get("E001")
+        self.version = {"version": 2}
+
+        with patch.object(self, "_loader", side_effect=RuntimeError("db down")):
+            dictionary._loader = self._loader
+            self.assertEqual(dictionary.get("E001")["id"], 1)
+
+    def test_without_version_reloads_by_age(self):
+        """Без строки версии справочник живёт max_age_seconds."""
+        self.version = None
+        dictionary = CodeDictionary(
+            "upos_error_codes", self._loader, "error_code", check_interval_seconds=0, max_age_seconds=60
+        )
+        dictionary.get("E001")
+        dictionary.get("E001")
+        self.assertEqual(self.loads, 1)
+
+        later = code_dictionary.time.monotonic() + 61
+        with patch("src.common.code_dictionary.time.monotonic", return_value=later):
+            dictionary.get("E001")
+        self.assertEqual(self.loads, 2)
+
+    def test_suggest_returns_empty_when_unavailable(self):
+        """Ошибка загрузки не ломает подсказки."""
+        dictionary = CodeDictionary("ktr_codes", MagicMock(side_effect=RuntimeError("db down")), "code")
+        self.assertEqual(dictionary.suggest("E001"), [])
+
+
+class TestCodeDictionaryOnEventLoop(unittest.IsolatedAsyncioTestCase):
+    """В event loop загруженный справочник отдаётся сразу, сверка — в пуле db-io."""
+
+    async def test_version_check_runs_in_background(self):
+        version = {"version": 1}
+        rows = [dict(row) for row in ROWS]
+        threads = []
+        async_db = AsyncDatabase(io_workers=1, connection_workers=1)
+        db_patch = patch.object(code_dictionary, "database")
+        mock_database = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        async_db_patch = patch("src.common.async_database.get_async_database", return_value=async_db)
+        async_db_patch.start()
+        self.addCleanup(async_db_patch.stop)
+        cursor = mock_database.get_cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = lambda *args: threads.append(threading.current_thread().name)
+        cursor.fetchone.side_effect = lambda: version
+        dictionary = CodeDictionary("upos_error_codes", lambda: rows, "error_code", check_interval_seconds=0)
+        self.assertIsNotNone(dictionary.get("E001"))
+
+        rows.append({"id": 7, "error_code": "E777", "description": "Новый"})
+        version = {"version": 2}
+        threads.clear()
+        self.assertIsNone(dictionary.get("E777"))
+        async_db.shutdown(wait=True)
+
+        self.assertEqual(dictionary.get("E777")["id"], 7)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.current_thread().name, threads)
+
+
+class TestModuleDictionaries(unittest.TestCase):
+    """Изменения администратора увеличивают версию справочника модуля."""
+
+    def _patch_module_database(self, module):
+        db_patch = patch.object(module, "database")
+        mock_database = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        cursor = mock_database.get_cursor.return_value.__enter__.return_value
+        cursor.rowcount = 1
+        cursor.lastrowid = 42
+        return cursor
+
+    def test_upos_edits_bump_version_and_invalidate(self):
+        cursor = self._patch_module_database(upos_error_bot_part)
+        with patch.object(upos_error_bot_part, "bump_settings_version") as mock_bump, patch.object(
+            upos_error_bot_part.ERROR_CODE_DICTIONARY, "invalidate"
+        ) as mock_invalidate:
+            self.assertEqual(upos_error_bot_part.create_error_code("E9", "d", "a"), 42)
+            self.assertTrue(upos_error_bot_part.update_error_code(42, "description", "x"))
+            self.assertTrue(upos_error_bot_part.delete_error_code(42))
+            self.assertTrue(upos_error_bot_part.update_category(1, "name", "Сеть"))
+
+        self.assertEqual(mock_bump.call_count, 4)
+        mock_bump.assert_called_with(cursor, code_dictionary.SCOPE_UPOS_ERROR_CODES)
+        self.assertEqual(mock_invalidate.call_count, 4)
+
+    def test_ktr_edits_bump_version_and_invalidate(self):
+        cursor = self._patch_module_database(ktr_bot_part)
+        with patch.object(ktr_bot_part, "bump_settings_version") as mock_bump, patch.object(
+            ktr_bot_part.KTR_CODE_DICTIONARY, "invalidate"
+        ) as mock_invalidate:
+            ktr_bot_part.create_ktr_code("POS1", "d", 10)
+            ktr_bot_part.update_ktr_code(42, "minutes", 5)
+            ktr_bot_part.delete_category(3)
+
+        self.assertEqual(mock_bump.call_count, 3)
+        mock_bump.assert_called_with(cursor, code_dictionary.SCOPE_KTR_CODES)
+        self.assertEqual(mock_invalidate.call_count, 3)
+
+
+class TestLookupHandlersSuggestions(unittest.IsolatedAsyncioTestCase):
+    """Интент-обработчики показывают подсказки для ненайденного кода."""
+
+    async def test_upos_not_found_lists_suggestions(self):
+        with patch.object(upos_error_bot_part, "get_error_code_by_code", return_value=None), patch.object(
+            upos_error_bot_part, "record_error_request"
+        ), patch.object(upos_error_bot_part, "record_unknown_code"), patch.object(
+            upos_error_bot_part, "suggest_error_codes", return_value=["E001", "E002"]
+        ):
+            result = await UposErrorHandler().execute({"error_code": "E00"}, user_id=1)
+
+        self.assertIn("Возможно, вы имели в виду", result.response)
+        self.assertIn("`E001`, `E002`", result.response)
+        self.assertEqual(result.meta["suggestions"], ["E001", "E002"])
+
+    async def test_ktr_found_via_dictionary_without_db(self):
+        index = CodeIndex([{"code": "POS2421", "description": "Замена", "minutes": 30}], "code")
+        with patch.object(ktr_bot_part.KTR_CODE_DICTIONARY, "index", return_value=index), patch.object(
+            ktr_bot_part, "record_ktr_request"
+        ) as mock_record:
+            result = await KtrHandler().execute({"ktr_code": "pos 2421"}, user_id=1)
+
+        self.assertIn("POS2421", result)
+        mock_record.assert_called_once_with(1, "POS 2421", found=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+"""
+test_database_pool.py — тесты пула соединений с ожиданием и метриками.
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from src.common import database
+from src.common.database import BlockingConnectionPool, PoolTimeoutError
+
+
+class _FakeConnection:
+    """Соединение-заглушка: ping, сброс сессии и закрытие."""
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.reset_count = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError("gone away")
+
+    def reset_session(self):
+        if not self.alive:
+            raise OSError("gone away")
+        self.reset_count += 1
+
+    def is_connected(self):
+        return self.alive and not self.closed
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeFactory:
+    """Фабрика соединений, запоминающая открытые соединения."""
+
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self):
+        conn = _FakeConnection(len(self.connections) + 1)
+        self.connections.append(conn)
+        return conn
+
+
+class TestBlockingConnectionPool(unittest.TestCase):
+    """Выдача, ожидание, пересоздание соединений и метрики."""
+
+    def _pool(self, **kwargs):
+        factory = _FakeFactory()
+        options = {"pool_size": 2, "acquire_timeout_seconds": 1.0, "preping_idle_seconds": 30.0}
+        options.update(kwargs)
+        return BlockingConnectionPool(factory, **options), factory
+
+    def test_connections_are_reused_and_session_reset(self):
+        """Возвращённое соединение выдаётся повторно после сброса сессии."""
+        pool, factory = self._pool()
+
+        first = pool.get_connection("site_a")
+        self.assertEqual(first.number, 1)
+        first.close()
+        first.close()
+        second = pool.get_connection("site_a")
+        second.close()
+
+        self.assertEqual(len(factory.connections), 1)
+        self.assertEqual(factory.connections[0].reset_count, 2)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot["opened"], snapshot["idle"], snapshot["in_use"]), (1, 1, 0))
+        self.assertEqual(snapshot["call_sites"]["site_a"]["hold"]["count"], 2)
+
+    def test_exhausted_pool_waits_for_release(self):
+        """При исчерпании пула запрос ждёт освобождения соединения, а не падает."""
+        pool, factory = self._pool(pool_size=1)
+        held = pool.get_connection("holder")
+        timer = threading.Timer(0.05, held.close)
+        timer.start()
+
+        started = time.monotonic()
+        conn = pool.get_connection("waiter")
+        waited = time.monotonic() - started
+        conn.close()
+        timer.join()
+
+        self.assertGreaterEqual(waited, 0.04)
+        self.assertEqual(len(factory.connections), 1)
+        snapshot = pool.snapshot()
+        self.assertEqual(snapshot["peak_waiting"], 1)
+        self.assertGreaterEqual(snapshot["call_sites"]["waiter"]["wait"]["max_ms"], 40)
+
+    def test_timeout_raises_pool_error_and_is_counted(self):
+        """Не дождавшись соединения, get_connection бросает PoolTimeoutError."""
+        pool, _ = self._pool(pool_size=1, acquire_timeout_seconds=0.02)
+        held = pool.get_connection("holder")
+
+        with self.assertRaises(PoolTimeoutError):
+            pool.get_connection("starved")
+        held.close()
+
+        snapshot = pool.snapshot()
+        self.assertEqual(snapshot["timeouts_total"], 1)
+        self.assertEqual(snapshot["call_sites"]["starved"]["timeouts"], 1)
+
+    def test_stale_and_old_connections_are_recycled(self):
+        """Мёртвое после простоя и слишком старое соединения пересоздаются."""
+        pool, factory = self._pool(preping_idle_seconds=0.0, max_lifetime_seconds=3600)
+        conn = pool.get_connection()
+        conn.close()
+        factory.connections[0].alive = False
+
+        fresh = pool.get_connection()
+        self.assertEqual(fresh.number, 2)
+        self.assertTrue(factory.connections[0].closed)
+        fresh.close()
+
+        with patch("src.common.database.time.monotonic", return_value=time.monotonic() + 7200):
+            renewed = pool.get_connection()
+        self.assertEqual(renewed.number, 3)
+        renewed.close()
+
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot["recycled_stale"], snapshot["recycled_lifetime"]), (1, 1))
+        self.assertEqual(snapshot["opened"], 1)
+
+    def test_broken_connection_is_discarded_on_release(self):
+        """Соединение, которое не удалось сбросить, закрывается и освобождает слот."""
+        pool, factory = self._pool(pool_size=1)
+        conn = pool.get_connection()
+        factory.connections[0].alive = False
+        conn.close()
+
+        replacement = pool.get_connection()
+        self.assertEqual(replacement.number, 2)
+        replacement.close()
+        self.assertEqual(pool.snapshot()["discarded_broken"], 1)
+
+    def test_failed_connect_releases_slot(self):
+        """Ошибка открытия соединения не занимает слот пула."""
+        calls = []
+
+        def failing_factory():
+            calls.append(1)
+            raise OSError("refused")
+
+        pool = BlockingConnectionPool(failing_factory, pool_size=1, acquire_timeout_seconds=0.01)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                pool.get_connection()
+
+        snapshot = pool.snapshot()
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((snapshot["opened"], snapshot["in_use"], snapshot["connect_errors"]), (0, 0, 2))
+
+
+class TestGetDbConnectionWithPool(unittest.TestCase):
+    """get_db_connection поверх пула: место вызова и снимок метрик."""
+
+    def setUp(self):
+        database.reset_pool()
+        self.factory = _FakeFactory()
+        pool = BlockingConnectionPool(self.factory, pool_size=2)
+        patcher = patch.object(database, "_connection_pool", pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_call_site_is_detected_and_connection_returned(self):
+        """Метрики пишутся под модулем и функцией вызывающего кода."""
+        with database.get_db_connection() as conn:
+            self.assertEqual(conn.number, 1)
+        with database.get_db_connection():
+            pass
+
+        snapshot = database.get_pool_snapshot()
+        site = f"{__name__}:test_call_site_is_detected_and_connection_returned"
+        self.assertEqual(snapshot["call_sites"][site]["wait"]["count"], 2)
+        self.assertEqual((snapshot["opened"], snapshot["in_use"]), (1, 0))
+
+    def test_disconnected_connection_still_returns_slot(self):
+        """Соединение, потерянное во время работы, не занимает слот пула."""
+        with database.get_db_connection():
+            self.factory.connections[0].alive = False
+
+        snapshot = database.get_pool_snapshot()
+        self.assertEqual((snapshot["opened"], snapshot["in_use"], snapshot["discarded_broken"]), (0, 0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,270 @@
+"""
+test_db_log_sink.py — тесты фоновой пакетной записи логов в БД.
+"""
+
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core.ai.db_log_sink import (
+    DbLogRecord,
+    DbLogSink,
+    estimate_params_bytes,
+    submit_db_log,
+    write_db_log_records,
+)
+
+_SQL_A = "INSERT INTO log_a (value) VALUES (%s)"
+_SQL_B = "INSERT INTO log_b (value) VALUES (%s)"
+
+
+class _RecordingWriter:
+    """Писатель пакетов, запоминающий размеры пакетов и поток записи."""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def __call__(self, records):
+        self.threads.add(threading.current_thread().name)
+        self.batches.append([record.resolve_params()[0] for record in records])
+        return len(records)
+
+
+class TestWriteDbLogRecords(unittest.TestCase):
+    """Запись пакета одной транзакцией."""
+
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
+    def test_groups_rows_by_sql_into_executemany(self, mock_get_db_connection, mock_get_cursor):
+        """Записи с одинаковым SQL пишутся одним executemany, одиночные — execute; таблица — своя транзакция."""
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        records = [
+            DbLogRecord("log_a", _SQL_A, (1,)),
+            DbLogRecord("log_b", _SQL_B, lambda: (10,)),
+            DbLogRecord("log_a", _SQL_A, [2]),
+        ]
+
+        written = write_db_log_records(records)
+
+        self.assertEqual(written, 3)
+        self.assertEqual(mock_get_db_connection.call_count, 2)
+        cursor.executemany.assert_called_once_with(_SQL_A, [(1,), (2,)])
+        cursor.execute.assert_called_once_with(_SQL_B, (10,))
+
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
+    def test_failed_params_factory_skips_only_its_record(self, mock_get_db_connection, mock_get_cursor):
+        """Ошибка подготовки параметров одной записи не мешает записи остальных."""
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+
+        def broken():
+            raise ValueError("bad")
+
+        written = write_db_log_records([
+            DbLogRecord("log_a", _SQL_A, broken),
+            DbLogRecord("log_a", _SQL_A, (5,)),
+        ])
+
+        self.assertEqual(written, 1)
+        cursor.execute.assert_called_once_with(_SQL_A, (5,))
+
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
+    def test_rows_of_one_table_are_split_by_bytes(self, mock_get_db_connection, mock_get_cursor):
+        """Крупные строки одной таблицы пишутся частями не больше max_batch_bytes."""
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        big = "я" * 300  # 600 байт в UTF-8
+        records = [DbLogRecord("log_a", _SQL_A, (f"{big}{index}",)) for index in range(5)]
+
+        written = write_db_log_records(records, max_batch_bytes=1300)
+
+        self.assertEqual(written, 5)
+        chunk_sizes = [len(call.args[1]) for call in cursor.executemany.call_args_list]
+        self.assertEqual(chunk_sizes, [2, 2])
+        cursor.execute.assert_called_once_with(_SQL_A, (f"{big}4",))
+        self.assertEqual(mock_get_db_connection.call_count, 3)
+
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
+    def test_failed_batch_falls_back_to_single_rows(self, mock_get_db_connection, mock_get_cursor):
+        """Если executemany не прошёл, строки пишутся по одной и плохая строка не теряет соседние."""
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.executemany.side_effect = Exception("packet too large")
+
+        def execute(_sql, params):
+            if params == (2,):
+                raise Exception("bad row")
+
+        cursor.execute.side_effect = execute
+
+        written = write_db_log_records([DbLogRecord("log_a", _SQL_A, (index,)) for index in range(4)])
+
+        self.assertEqual(written, 3)
+        self.assertEqual([call.args[1] for call in cursor.execute.call_args_list], [(0,), (1,), (2,), (3,)])
+
+    @patch("src.core.ai.db_log_sink.database.get_db_connection", side_effect=Exception("db down"))
+    def test_single_row_fallback_stops_when_database_is_down(self, mock_get_db_connection):
+        """При недоступной БД построчная запись прекращается после нескольких ошибок подряд."""
+        written = write_db_log_records([DbLogRecord("log_a", _SQL_A, (index,)) for index in range(50)])
+
+        self.assertEqual(written, 0)
+        self.assertEqual(mock_get_db_connection.call_count, 4)
+
+    def test_record_size_is_estimated_for_plain_params(self):
+        """Размер записи с готовыми параметрами считается в байтах UTF-8, для фабрики берётся подсказка."""
+        self.assertEqual(DbLogRecord("log_a", _SQL_A, ("абв", 1)).size_bytes, 6 + 8)
+        self.assertEqual(DbLogRecord("log_a", _SQL_A, lambda: ("x",), size_bytes=500).size_bytes, 500)
+        self.assertEqual(estimate_params_bytes((b"12", None)), 2 + 8)
+
+
+class TestDbLogSink(unittest.IsolatedAsyncioTestCase):
+    """Очередь, пакеты, переполнение и дозапись при закрытии."""
+
+    async def test_records_are_batched_by_size(self):
+        """Записи пишутся пакетами не больше batch_size в выделенном потоке."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=100, batch_size=3, flush_interval_seconds=5.0, writer=writer)
+
+        for index in range(7):
+            self.assertTrue(sink.submit(DbLogRecord("log_a", _SQL_A, (index,))))
+        await sink.flush()
+
+        self.assertEqual(sum(writer.batches, []), list(range(7)))
+        self.assertTrue(all(len(batch) <= 3 for batch in writer.batches))
+        self.assertEqual(len(writer.threads), 1)
+        self.assertTrue(next(iter(writer.threads)).startswith("db-log-writer"))
+        stats = sink.stats()
+        self.assertEqual((stats["submitted"], stats["written"], stats["queued"]), (7, 7, 0))
+
+    async def test_partial_batch_is_written_after_interval(self):
+        """Неполный пакет пишется по истечении интервала без явного flush."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=100, batch_size=100, flush_interval_seconds=0.02, writer=writer)
+        self.addAsyncCleanup(sink.close)
+
+        sink.submit(DbLogRecord("log_a", _SQL_A, (1,)))
+        sink.submit(DbLogRecord("log_a", _SQL_A, (2,)))
+        for _ in range(200):
+            if writer.batches:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(writer.batches, [[1, 2]])
+
+    async def test_full_queue_drops_records_and_counts_them(self):
+        """При переполнении очереди записи отбрасываются без ожидания и учитываются."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=2, batch_size=10, flush_interval_seconds=5.0, writer=writer)
+
+        accepted = [sink.submit(DbLogRecord("log_a", _SQL_A, (index,))) for index in range(3)]
+        accepted.append(sink.submit(DbLogRecord("log_b", _SQL_B, (99,))))
+        await sink.close()
+
+        self.assertEqual(accepted, [True, True, False, False])
+        self.assertEqual(sum(writer.batches, []), [0, 1])
+        stats = sink.stats()
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(stats["dropped_by_table"], {"log_a": 1, "log_b": 1})
+
+    async def test_queue_is_bounded_by_bytes(self):
+        """Очередь ограничена суммарным размером записей, после записи место освобождается."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=100, max_queue_bytes=1000, batch_size=10, flush_interval_seconds=5.0, writer=writer)
+
+        accepted = [
+            sink.submit(DbLogRecord("log_a", _SQL_A, lambda index=index: (index,), size_bytes=400))
+            for index in range(3)
+        ]
+        self.assertEqual(accepted, [True, True, False])
+        self.assertEqual(sink.stats()["queued_bytes"], 800)
+        self.assertEqual(sink.stats()["dropped_by_table"], {"log_a": 1})
+
+        await sink.flush()
+
+        self.assertEqual(sink.stats()["queued_bytes"], 0)
+        self.assertTrue(sink.submit(DbLogRecord("log_a", _SQL_A, lambda: (9,), size_bytes=400)))
+        await sink.close()
+        self.assertEqual(sum(writer.batches, []), [0, 1, 9])
+
+    async def test_oversized_record_is_accepted_into_empty_queue(self):
+        """Запись крупнее лимита принимается, если очередь пуста."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=100, max_queue_bytes=10, batch_size=10, flush_interval_seconds=5.0, writer=writer)
+
+        self.assertTrue(sink.submit(DbLogRecord("log_a", _SQL_A, ("x" * 50,))))
+        self.assertFalse(sink.submit(DbLogRecord("log_a", _SQL_A, ("y",))))
+        await sink.close()
+
+        self.assertEqual(len(writer.batches), 1)
+
+    async def test_rows_not_written_by_writer_are_counted_as_failed(self):
+        """Строки, которые писатель не записал, учитываются как failed."""
+        sink = DbLogSink(
+            max_queue=10,
+            batch_size=10,
+            flush_interval_seconds=5.0,
+            writer=MagicMock(return_value=1),
+        )
+        sink.submit(DbLogRecord("log_a", _SQL_A, (1,)))
+        sink.submit(DbLogRecord("log_a", _SQL_A, (2,)))
+
+        await sink.close()
+
+        stats = sink.stats()
+        self.assertEqual((stats["written"], stats["failed"]), (1, 1))
+
+    async def test_close_flushes_queue_and_rejects_new_records(self):
+        """close дописывает очередь, после закрытия записи не принимаются."""
+        writer = _RecordingWriter()
+        sink = DbLogSink(max_queue=100, batch_size=100, flush_interval_seconds=5.0, writer=writer)
+        sink.submit(DbLogRecord("log_a", _SQL_A, (1,)))
+        await asyncio.sleep(0)
+
+        await sink.close()
+
+        self.assertEqual(writer.batches, [[1]])
+        self.assertFalse(sink.submit(DbLogRecord("log_a", _SQL_A, (2,))))
+
+    async def test_writer_error_is_counted_and_not_raised(self):
+        """Ошибка записи пакета не пробрасывается, записи учитываются как failed."""
+
+        def failing_writer(_records):
+            raise RuntimeError("db down")
+
+        sink = DbLogSink(max_queue=10, batch_size=10, flush_interval_seconds=5.0, writer=failing_writer)
+        sink.submit(DbLogRecord("log_a", _SQL_A, (1,)))
+        sink.submit(DbLogRecord("log_a", _SQL_A, (2,)))
+
+        await sink.close()
+
+        stats = sink.stats()
+        self.assertEqual((stats["written"], stats["failed"]), (0, 2))
+
+
+class TestSubmitDbLogWithoutLoop(unittest.TestCase):
+    """Без event loop запись выполняется сразу."""
+
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
+    def test_writes_inline_without_running_loop(self, mock_get_db_connection, mock_get_cursor):
+        """Синхронный вызов пишет запись сразу."""
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+
+        submit_db_log("log_a", _SQL_A, (1,))
+
+        cursor.execute.assert_called_once_with(_SQL_A, (1,))
+
+    @patch("src.core.ai.db_log_sink.logger.warning")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection", side_effect=Exception("db down"))
+    def test_inline_error_is_logged(self, _mock_get_db_connection, mock_warning):
+        """Ошибка синхронной записи логируется и не пробрасывается."""
+        submit_db_log("log_a", _SQL_A, (1,))
+
+        mock_warning.assert_called_once()
+        self.assertIn("log_a", mock_warning.call_args.args)
+
+
+if __name__ == "__main__":
+    unittest.main()
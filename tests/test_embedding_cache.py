@@ -0,0 +1,128 @@
+"""
+test_embedding_cache.py — тесты общего кэша эмбеддингов.
+"""
+
+import tempfile
+import unittest
+from unittest import mock
+
+from src.core.ai.embedding_cache import EmbeddingCache, read_disk_cache_stats
+from src.core.ai.vector_search import LocalEmbeddingProvider
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Тесты EmbeddingCache."""
+
+    def test_hits_misses_and_model_isolation(self):
+        """Попадания считаются по (модель, текст), другая модель — промах."""
+        cache = EmbeddingCache(max_bytes=1024 * 1024)
+        cache.put_many("model-a", ["привет"], [[0.5, 0.5]])
+
+        self.assertEqual(cache.get_many("model-a", ["привет", "пока"]), [[0.5, 0.5], None])
+        self.assertEqual(cache.get_many("model-b", ["привет"]), [None])
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["memory_entries"], 1)
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """При превышении бюджета вытесняются давно не использованные векторы."""
+        probe = EmbeddingCache(max_bytes=1024 * 1024)
+        probe.put_many("m", ["x"], [[0.0] * 64])
+        entry_bytes = probe.stats()["memory_bytes"]
+
+        cache = EmbeddingCache(max_bytes=entry_bytes * 2)
+        cache.put_many("m", ["a", "b"], [[1.0] * 64, [2.0] * 64])
+        cache.get_many("m", ["a"])
+        cache.put_many("m", ["c"], [[3.0] * 64])
+
+        hits = cache.get_many("m", ["a", "b", "c"])
+        self.assertIsNotNone(hits[0])
+        self.assertIsNone(hits[1])
+        self.assertIsNotNone(hits[2])
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["memory_bytes"], entry_bytes * 2)
+
+    def test_disk_store_survives_new_instance(self):
+        """Векторы и счётчики из дискового хранилища доступны новому экземпляру."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = EmbeddingCache(max_bytes=1024 * 1024, disk_dir=tmp_dir, disk_max_entries=4)
+            first.put_many("m", ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+            first.get_many("m", ["a"])
+            first.flush()
+
+            second = EmbeddingCache(max_bytes=1024 * 1024, disk_dir=tmp_dir, disk_max_entries=4)
+            self.assertEqual(second.get_many("m", ["b", "z"]), [[0.0, 1.0], None])
+            self.assertEqual(second.stats()["disk_hits"], 1)
+
+            metas = read_disk_cache_stats(tmp_dir)
+            self.assertEqual(len(metas), 1)
+            self.assertEqual(metas[0]["entries"], 2)
+            self.assertEqual(metas[0]["stats"]["hits"], 1)
+
+    def test_disk_ring_buffer_overwrites_oldest_slot(self):
+        """Заполненное дисковое хранилище перезаписывает самый старый слот."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = EmbeddingCache(max_bytes=0, disk_dir=tmp_dir, disk_max_entries=2)
+            cache.put_many("m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+
+            self.assertEqual(cache.get_many("m", ["a", "b", "c"]), [None, [2.0], [3.0]])
+            self.assertEqual(cache.stats()["disk_entries"], 2)
+
+    def test_disk_store_shared_between_processes(self):
+        """Два процесса на одном каталоге: общий счётчик слотов, чужой слот — промах."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bot = EmbeddingCache(max_bytes=0, disk_dir=tmp_dir, disk_max_entries=2)
+            bot.put_many("m", ["a"], [[1.0]])
+            responder = EmbeddingCache(max_bytes=0, disk_dir=tmp_dir, disk_max_entries=2)
+            self.assertEqual(responder.get_many("m", ["a"]), [[1.0]])
+
+            # Второй процесс пишет в следующий общий слот, а не поверх «a».
+            responder.put_many("m", ["b"], [[2.0]])
+            self.assertEqual(bot.get_many("m", ["a"]), [[1.0]])
+
+            # Слот «a» перезаписан: у второго процесса это промах, а не вектор «c».
+            bot.put_many("m", ["c"], [[3.0]])
+            self.assertEqual(responder.get_many("m", ["a", "b"]), [None, [2.0]])
+
+
+class TestLocalEmbeddingProviderCache(unittest.TestCase):
+    """Интеграция кэша эмбеддингов в LocalEmbeddingProvider."""
+
+    def test_encode_texts_encodes_only_misses_by_normalized_text(self):
+        """Повторные и отличающиеся пробелами тексты берутся из кэша."""
+        cache = EmbeddingCache(max_bytes=1024 * 1024)
+        provider = LocalEmbeddingProvider(model_name="test-model")
+
+        with mock.patch("src.core.ai.vector_search.get_embedding_cache", return_value=cache):
+            with mock.patch.object(
+                provider,
+                "_encode_uncached",
+                side_effect=lambda texts: [[float(len(text))] for text in texts],
+            ) as mock_encode:
+                self.assertEqual(provider.encode_texts(["abc", "de"]), [[3.0], [2.0]])
+                self.assertEqual(provider.encode_texts(["  abc ", "fghi"]), [[3.0], [4.0]])
+                provider.encode_texts(["abc"], use_cache=False)
+
+        self.assertEqual(
+            [call.args[0] for call in mock_encode.call_args_list],
+            [["abc", "de"], ["fghi"], ["abc"]],
+        )
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_failed_encode_is_not_cached(self):
+        """Если модель недоступна, результат пустой и в кэш ничего не пишется."""
+        cache = EmbeddingCache(max_bytes=1024 * 1024)
+        provider = LocalEmbeddingProvider(model_name="test-model")
+
+        with mock.patch("src.core.ai.vector_search.get_embedding_cache", return_value=cache):
+            with mock.patch.object(provider, "_encode_uncached", return_value=[]):
+                self.assertEqual(provider.encode_texts(["abc"]), [])
+
+        self.assertEqual(cache.stats()["memory_entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
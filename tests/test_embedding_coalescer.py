@@ -0,0 +1,134 @@
+"""
+test_embedding_coalescer.py — тесты объединения одновременных encode-запросов.
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+from src.core.ai.embedding_coalescer import EmbeddingRequestCoalescer
+from src.core.ai.vector_search import LocalEmbeddingProvider
+
+
+class _RecordingEncoder:
+    """Фейковая модель: вектор текста — [len(text)], записывает размеры батчей."""
+
+    def __init__(self, delay: float = 0.0):
+        self.batches = []
+        self._delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+        if self._delay:
+            time.sleep(self._delay)
+        return [[float(len(text))] for text in texts]
+
+
+def _encode_concurrently(coalescer, texts_per_caller):
+    results = [None] * len(texts_per_caller)
+    barrier = threading.Barrier(len(texts_per_caller))
+
+    def _worker(index, texts):
+        barrier.wait()
+        results[index] = coalescer.encode_texts(texts)
+
+    threads = [
+        threading.Thread(target=_worker, args=(index, texts))
+        for index, texts in enumerate(texts_per_caller)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+class TestEmbeddingRequestCoalescer(unittest.TestCase):
+    """Тесты EmbeddingRequestCoalescer."""
+
+    def test_concurrent_callers_share_batches_and_get_own_vectors(self):
+        """Одновременные вызовы объединяются, каждый получает векторы своих текстов."""
+        encoder = _RecordingEncoder()
+        coalescer = EmbeddingRequestCoalescer(encoder, max_batch_size=64, max_wait_ms=50)
+        texts_per_caller = [["a" * (index + 1)] for index in range(16)]
+
+        results = _encode_concurrently(coalescer, texts_per_caller)
+        coalescer.close()
+
+        for index, vectors in enumerate(results):
+            self.assertEqual(vectors, [[float(index + 1)]])
+        self.assertLess(len(encoder.batches), 16)
+        stats = coalescer.snapshot()
+        self.assertEqual(stats["requests"], 16)
+        self.assertEqual(stats["texts"], 16)
+        self.assertGreater(stats["avg_batch_texts"], 1.0)
+
+    def test_batch_size_limit_is_respected(self):
+        """Батч не превышает max_batch_size, запросы не разрываются между батчами."""
+        encoder = _RecordingEncoder(delay=0.01)
+        coalescer = EmbeddingRequestCoalescer(encoder, max_batch_size=4, max_wait_ms=20)
+
+        results = _encode_concurrently(coalescer, [["x", "yy"] for _ in range(6)])
+        coalescer.close()
+
+        self.assertTrue(all(len(batch) <= 4 for batch in encoder.batches))
+        self.assertEqual(sum(len(batch) for batch in encoder.batches), 12)
+        self.assertTrue(all(vectors == [[1.0], [2.0]] for vectors in results))
+
+    def test_exception_is_propagated_to_every_waiter(self):
+        """Ошибка модели передаётся всем запросам батча."""
+        def _failing(_texts):
+            raise RuntimeError("model crashed")
+
+        coalescer = EmbeddingRequestCoalescer(_failing, max_batch_size=8, max_wait_ms=0)
+
+        with self.assertRaises(RuntimeError):
+            coalescer.encode_texts(["a"])
+        coalescer.close()
+
+    def test_incomplete_model_result_returns_empty_vectors(self):
+        """Если модель недоступна (пустой ответ), вызывающий получает пустой список."""
+        coalescer = EmbeddingRequestCoalescer(lambda _texts: [], max_batch_size=8, max_wait_ms=0)
+
+        self.assertEqual(coalescer.encode_texts(["a", "b"]), [])
+        self.assertEqual(coalescer.encode_texts([]), [])
+        coalescer.close()
+
+
+@mock.patch("src.core.ai.vector_search.get_embedding_cache", return_value=None)
+class TestLocalEmbeddingProviderCoalescing(unittest.TestCase):
+    """Интеграция коалесцера в LocalEmbeddingProvider (без кэша эмбеддингов)."""
+
+    @mock.patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED", True)
+    @mock.patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH", 4)
+    def test_small_requests_go_through_coalescer_and_large_bypass_it(self, _mock_cache):
+        """encode/encode_texts малых запросов идут через коалесцер, крупные — напрямую."""
+        provider = LocalEmbeddingProvider()
+        with mock.patch.object(
+            provider,
+            "_encode_texts_batch",
+            side_effect=lambda texts: [[float(len(text))] for text in texts],
+        ) as mock_batch:
+            self.assertEqual(provider.encode("abc"), [3.0])
+            self.assertEqual(len(provider.encode_texts(["a"] * 10)), 10)
+
+        self.assertEqual(mock_batch.call_count, 2)
+        self.assertEqual(provider.coalescer_stats()["requests"], 1)
+        provider._coalescer.close()
+
+    @mock.patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED", False)
+    def test_coalescer_disabled_encodes_directly(self, _mock_cache):
+        """При выключенном батчинге encode_texts вызывает модель напрямую."""
+        provider = LocalEmbeddingProvider()
+        with mock.patch.object(provider, "_encode_texts_batch", return_value=[[1.0]]) as mock_batch:
+            self.assertEqual(provider.encode("a"), [1.0])
+
+        mock_batch.assert_called_once_with(["a"])
+        self.assertIsNone(provider.coalescer_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
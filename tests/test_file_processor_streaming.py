@@ -0,0 +1,176 @@
+"""
+test_file_processor_streaming.py — тесты потоковой валидации Excel-файлов заявок.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pytest
+
+# openpyxl — необязательная зависимость валидатора (file_processor импортирует её лениво).
+openpyxl = pytest.importorskip("openpyxl")
+
+from src.sbs_helper_telegram_bot.ticket_validator import validation_rules
+from src.sbs_helper_telegram_bot.ticket_validator.file_processor import ExcelFileProcessor, get_column_names
+from src.sbs_helper_telegram_bot.ticket_validator.validators import TicketType, ValidationRule
+
+
+TICKET_TYPES = [
+    TicketType(id=1, type_name="Установка", description="", detection_keywords=["установка"]),
+    TicketType(id=2, type_name="Демонтаж", description="", detection_keywords=["демонтаж"]),
+]
+
+
+def _rules(ticket_type_id):
+    return [
+        ValidationRule(
+            id=ticket_type_id,
+            rule_name=f"ИНН {ticket_type_id}",
+            pattern=r"ИНН:\s*\d{10}",
+            rule_type="regex",
+            error_message="Не указан ИНН",
+        )
+    ]
+
+
+class TestStreamingValidation(unittest.TestCase):
+    """validate_file_streaming даёт тот же файл и счётчики, что и validate_file."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, True)
+        validation_rules.invalidate_validation_plans()
+        self.addCleanup(validation_rules.invalidate_validation_plans)
+        for patcher in (
+            patch.object(validation_rules, "load_all_ticket_types", return_value=TICKET_TYPES),
+            patch.object(validation_rules, "load_rules_from_db", side_effect=_rules),
+            patch.object(validation_rules, "load_ticket_type_by_id", side_effect=lambda type_id: TICKET_TYPES[type_id - 1]),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _make_file(self, rows, name="tickets.xlsx"):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.append(["ID", "Заявка", "Комментарий"])
+        for row in rows:
+            ws.append(row)
+        path = os.path.join(self.tmp_dir, name)
+        wb.save(path)
+        return path
+
+    def _sample_rows(self, count):
+        rows = []
+        for index in range(count):
+            if index % 25 == 3:
+                rows.append([index, None, "нет текста"])
+                continue
+            kind = "установка" if index % 2 else "демонтаж"
+            inn = f"ИНН: {1234567890 + index}" if index % 3 else "без ИНН"
+            rows.append([index, f"{kind} терминала, {inn}", "=формула" if index == 5 else "ok"])
+        rows.append([None, None, None])
+        return rows
+
+    def _dump(self, path):
+        wb = openpyxl.load_workbook(path)
+        sheets = {name: [[cell.value for cell in row] for row in wb[name].iter_rows()] for name in wb.sheetnames}
+        styles = [(cell.fill.fgColor.rgb, cell.border.left.style) for cell in wb.active[3]]
+        widths = {key: dim.width for key, dim in wb.active.column_dimensions.items()}
+        return sheets, styles, widths, wb.active.freeze_panes
+
+    def test_streaming_output_matches_in_memory_validation(self):
+        """Содержимое, стили, ширина столбцов и сводка совпадают с прежним режимом."""
+        path = self._make_file(self._sample_rows(400))
+        processor = ExcelFileProcessor()
+        legacy_path = os.path.join(self.tmp_dir, "legacy.xlsx")
+        streaming_path = os.path.join(self.tmp_dir, "streaming.xlsx")
+        progress = []
+
+        legacy = processor.validate_file(path, "Заявка", output_path=legacy_path)
+        streaming = processor.validate_file_streaming(
+            path,
+            "Заявка",
+            output_path=streaming_path,
+            workers=1,
+            chunk_size=64,
+            progress_callback=lambda current, total: progress.append((current, total)),
+        )
+
+        self.assertIsNone(streaming.error_message)
+        self.assertEqual(
+            (streaming.total_tickets, streaming.valid_tickets, streaming.invalid_tickets, streaming.skipped_tickets),
+            (legacy.total_tickets, legacy.valid_tickets, legacy.invalid_tickets, legacy.skipped_tickets),
+        )
+        self.assertEqual(streaming.results, [])
+        self.assertEqual(self._dump(streaming_path), self._dump(legacy_path))
+        # Итог до конца файла оценивается по размеру листа (вместе с пустой строкой)
+        self.assertEqual(progress[0], (64, 401))
+        self.assertEqual(progress[-1], (400, 400))
+
+    def test_process_pool_gives_same_result(self):
+        """Пачки, провалидированные в пуле процессов, записываются в исходном порядке."""
+        path = self._make_file(self._sample_rows(300))
+        processor = ExcelFileProcessor()
+        single_path = os.path.join(self.tmp_dir, "single.xlsx")
+        pool_path = os.path.join(self.tmp_dir, "pool.xlsx")
+
+        single = processor.validate_file_streaming(path, 1, output_path=single_path, workers=1, chunk_size=50)
+        pooled = processor.validate_file_streaming(path, 1, output_path=pool_path, workers=2, chunk_size=50)
+
+        self.assertIsNone(pooled.error_message)
+        self.assertEqual(pooled.valid_tickets, single.valid_tickets)
+        self.assertEqual(self._dump(pool_path), self._dump(single_path))
+
+    def test_all_valid_file_writes_summary(self):
+        """Сводка без ошибок и заданный тип заявки: лист статистики строится без сбоев."""
+        path = self._make_file([[1, "установка ИНН: 1234567890"], [2, "демонтаж ИНН: 1234567891"]])
+        processor = ExcelFileProcessor()
+
+        for method in (processor.validate_file, processor.validate_file_streaming):
+            output_path = os.path.join(self.tmp_dir, f"{method.__name__}.xlsx")
+            result = method(path, "Заявка", output_path=output_path, ticket_type_id=1)
+
+            self.assertIsNone(result.error_message)
+            self.assertEqual(result.valid_tickets, 2)
+            summary = [row[0] for row in openpyxl.load_workbook(output_path)["Статистика"].values]
+            self.assertNotIn("Распространённые ошибки:", summary)
+            types_header = summary.index("Типы заявок:")
+            self.assertEqual(summary[types_header + 2], "Установка")
+
+    def test_empty_file_and_unknown_column(self):
+        """Пустой файл и неизвестный столбец возвращают ошибку, как validate_file."""
+        processor = ExcelFileProcessor()
+
+        empty = processor.validate_file_streaming(self._make_file([], "empty.xlsx"), "Заявка")
+        missing = processor.validate_file_streaming(self._make_file([[1, "текст"]]), "Нет такого")
+
+        self.assertEqual(empty.error_message, "Файл не содержит данных")
+        self.assertIn("не найден", missing.error_message)
+
+    def test_column_names_do_not_read_rows(self):
+        """get_column_names читает только заголовки и закрывает книгу."""
+        path = self._make_file(self._sample_rows(10))
+
+        with patch.object(ExcelFileProcessor, "_iter_xlsx_rows") as mock_rows:
+            self.assertEqual(get_column_names(path), ["ID", "Заявка", "Комментарий"])
+
+        mock_rows.return_value.__next__.assert_not_called()
+
+    def test_workers_resolved_by_file_size(self):
+        """Пул процессов включается только для больших файлов."""
+        from src.sbs_helper_telegram_bot.ticket_validator import settings
+
+        self.assertEqual(ExcelFileProcessor._resolve_workers(None, settings.FILE_VALIDATION_PARALLEL_MIN_ROWS - 1), 1)
+        self.assertEqual(ExcelFileProcessor._resolve_workers(3, 10), 3)
+        with patch("src.sbs_helper_telegram_bot.ticket_validator.file_processor.os.cpu_count", return_value=16):
+            self.assertEqual(
+                ExcelFileProcessor._resolve_workers(None, settings.FILE_VALIDATION_PARALLEL_MIN_ROWS),
+                min(settings.FILE_VALIDATION_WORKERS or settings.FILE_VALIDATION_MAX_AUTO_WORKERS, 16),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
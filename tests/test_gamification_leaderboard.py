@@ -0,0 +1,218 @@
+"""
+test_gamification_leaderboard.py — тесты снимков рейтингов геймификации.
+"""
+
+import random
+import unittest
+from unittest.mock import patch
+
+from src.sbs_helper_telegram_bot.gamification import gamification_logic, settings
+from src.sbs_helper_telegram_bot.gamification.leaderboard import Leaderboard, LeaderboardCache
+
+
+def _sql_rank(values, value):
+    """RANK() OVER (ORDER BY value DESC) среди положительных значений."""
+    return 1 + sum(1 for other in values if other > 0 and other > value)
+
+
+class TestLeaderboard(unittest.TestCase):
+    """Отсортированный снимок: места как у RANK(), страницы и изменения."""
+
+    def test_ranks_match_sql_rank_after_updates(self):
+        """После случайных начислений места и порядок совпадают с RANK()."""
+        rng = random.Random(3)
+        values = {userid: rng.randint(-5, 20) for userid in range(1, 60)}
+        board = Leaderboard((userid, value, f"User{userid}", None) for userid, value in values.items())
+
+        for _ in range(300):
+            userid = rng.randint(1, 59)
+            delta = rng.randint(-10, 10)
+            values[userid] += delta
+            board.add(userid, delta)
+
+        positive = sorted((v for v in values.values() if v > 0), reverse=True)
+        page = board.page(0, len(values))
+        self.assertEqual(len(board), len(positive))
+        self.assertEqual([value for _, value, _ in page], positive)
+        for userid, value, rank in page:
+            self.assertEqual(rank, _sql_rank(values.values(), value))
+        for userid, value in values.items():
+            self.assertEqual(board.value(userid), value)
+
+    def test_page_slice_and_ties(self):
+        """Равные значения делят место, следующее место пропускается."""
+        board = Leaderboard([(1, 50, "A", None), (2, 30, "B", None), (3, 50, "C", None), (4, 0, "D", None)])
+
+        self.assertEqual(board.page(0, 2), [(1, 50, 1), (3, 50, 1)])
+        self.assertEqual(board.page(2, 10), [(2, 30, 3)])
+        self.assertEqual(board.rank_for_value(0), 4)
+        self.assertTrue(board.has_user(4))
+        self.assertEqual(board.names(3), ("C", None))
+
+
+class TestLeaderboardCache(unittest.TestCase):
+    """Кэш снимков: инкрементальные изменения, TTL и гонка с загрузкой."""
+
+    def test_apply_updates_loaded_snapshot_without_reload(self):
+        """Начисление известному пользователю не вызывает перечитывания."""
+        loads = []
+
+        def loader(key):
+            loads.append(key)
+            return [(1, 10, "A", None), (2, 5, "B", None)]
+
+        cache = LeaderboardCache(loader, max_age_seconds=60)
+        cache.get("k")
+        cache.apply("k", 2, 10)
+
+        self.assertEqual(cache.view("k", lambda board: board.page(0, 10)), [(2, 15, 1), (1, 10, 2)])
+        self.assertEqual(loads, ["k"])
+
+        cache.apply("k", 99, 1)
+        cache.get("k")
+        self.assertEqual(len(loads), 2)
+
+    def test_snapshot_expires(self):
+        """Снимок перечитывается по истечении max_age_seconds."""
+        loads = []
+        cache = LeaderboardCache(lambda key: loads.append(key) or [], max_age_seconds=60)
+        cache.get("k")
+
+        now = gamification_logic.time.monotonic() + 61
+        with patch("src.sbs_helper_telegram_bot.gamification.leaderboard.time.monotonic", return_value=now):
+            cache.get("k")
+
+        self.assertEqual(len(loads), 2)
+
+    def test_change_during_load_is_not_lost(self):
+        """Снимок, загрузка которого пересеклась с начислением, не кэшируется."""
+        cache = None
+        loads = []
+
+        def loader(key):
+            loads.append(key)
+            if len(loads) == 1:
+                # Начисление зафиксировано в БД после чтения, но до сохранения снимка
+                cache.apply(key, 1, 5)
+            return [(1, 10, "A", None)]
+
+        cache = LeaderboardCache(loader, max_age_seconds=60)
+        cache.get("k")
+        cache.get("k")
+        cache.get("k")
+
+        self.assertEqual(len(loads), 2)
+
+    def test_change_during_reload_of_expired_snapshot_is_not_lost(self):
+        """Перечитывание устаревшего снимка, пересёкшееся с начислением, не кэшируется."""
+        cache = None
+        loads = []
+
+        def loader(key):
+            loads.append(key)
+            if len(loads) == 2:
+                # Устаревший снимок ещё в кэше: apply меняет его, а загрузка уже прочитала БД
+                cache.apply(key, 1, 5)
+            return [(1, 10, "A", None)]
+
+        cache = LeaderboardCache(loader, max_age_seconds=60)
+        cache.get("k")
+
+        now = gamification_logic.time.monotonic() + 61
+        with patch("src.sbs_helper_telegram_bot.gamification.leaderboard.time.monotonic", return_value=now):
+            cache.get("k")
+            cache.get("k")
+
+        self.assertEqual(len(loads), 3)
+
+
+class TestRankingsFromSnapshots(unittest.TestCase):
+    """Рейтинги читаются из снимков; начисления обновляют агрегаты и снимки."""
+
+    def setUp(self):
+        gamification_logic.invalidate_leaderboards()
+        self.addCleanup(gamification_logic.invalidate_leaderboards)
+        self.rows = [
+            {"userid": 1, "value": 40, "first_name": "Анна", "last_name": "Иванова"},
+            {"userid": 2, "value": 0, "first_name": "Борис", "last_name": None},
+            {"userid": 3, "value": 25, "first_name": "Вера", "last_name": "Петрова"},
+        ]
+        self.executed = []
+        db_patch = patch.object(gamification_logic, "database")
+        self.mock_database = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        cursor = self.mock_database.get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.side_effect = lambda: [dict(row) for row in self.rows]
+        cursor.execute.side_effect = lambda sql, params=None: self.executed.append((" ".join(sql.split()), params))
+
+    def _load_count(self):
+        return sum(1 for sql, _ in self.executed if sql.startswith("SELECT u.userid"))
+
+    def test_pages_and_user_rank_share_one_snapshot(self):
+        """Страницы и место пользователя не обращаются к БД повторно."""
+        first, total = gamification_logic.get_score_ranking(settings.RANKING_PERIOD_MONTHLY, page=1, per_page=1)
+        second, _ = gamification_logic.get_score_ranking(settings.RANKING_PERIOD_MONTHLY, page=2, per_page=1)
+        user_rank = gamification_logic.get_user_rank(2, settings.RANKING_TYPE_SCORE, settings.RANKING_PERIOD_MONTHLY)
+
+        self.assertEqual(total, 2)
+        self.assertEqual(
+            first,
+            [{"userid": 1, "total_score": 40, "first_name": "Анна", "last_name": "Иванова", "rank": 1}],
+        )
+        self.assertEqual((second[0]["userid"], second[0]["rank"]), (3, 2))
+        self.assertEqual(user_rank, {"userid": 2, "total_score": 0, "rank": 3})
+        self.assertEqual(self._load_count(), 1)
+        sql, params = self.executed[0]
+        self.assertIn("gamification_period_totals", sql)
+        self.assertEqual(params, (settings.RANKING_PERIOD_MONTHLY, gamification_logic._period_key(settings.RANKING_PERIOD_MONTHLY)))
+
+    def test_add_score_points_updates_period_totals_and_snapshot(self):
+        """Начисление пишет агрегаты месяца и года и сразу меняет рейтинг."""
+        gamification_logic.get_score_ranking(settings.RANKING_PERIOD_YEARLY)
+
+        with patch.object(gamification_logic, "_update_user_rank"):
+            self.assertTrue(gamification_logic.add_score_points(2, 50, "test"))
+
+        upsert = [params for sql, params in self.executed if "INSERT INTO gamification_period_totals" in sql]
+        timestamp = upsert[0][5]
+        self.assertEqual(
+            tuple(upsert[0][:6]),
+            ("monthly", gamification_logic._period_key("monthly", timestamp), 2, 50, 0, timestamp),
+        )
+        self.assertEqual(tuple(upsert[0][6:9]), ("yearly", gamification_logic._period_key("yearly", timestamp), 2))
+
+        entries, _ = gamification_logic.get_score_ranking(settings.RANKING_PERIOD_YEARLY)
+        self.assertEqual((entries[0]["userid"], entries[0]["total_score"]), (2, 50))
+        self.assertEqual(self._load_count(), 1)
+
+    def _unlock_bronze(self):
+        cursor = self.mock_database.get_cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = [{"current_count": 1}, None, None]
+        achievement = {"id": 7, "code": "a", "threshold_bronze": 1, "threshold_silver": 5, "threshold_gold": 10}
+        with patch.object(gamification_logic, "get_achievement_by_code", return_value=achievement):
+            return gamification_logic.increment_achievement_progress(2, "a")
+
+    def test_achievement_unlock_updates_achievements_ranking(self):
+        """Разблокировка уровня учитывается в рейтинге достижений без перечитывания."""
+        entries, _ = gamification_logic.get_achievements_ranking()
+        self.assertEqual([entry["userid"] for entry in entries], [1, 3])
+
+        level = self._unlock_bronze()
+
+        self.assertEqual(level, settings.ACHIEVEMENT_LEVEL_BRONZE)
+        user_rank = gamification_logic.get_user_rank(2, settings.RANKING_TYPE_ACHIEVEMENTS)
+        self.assertEqual((user_rank["total_achievements"], user_rank["rank"]), (1, 3))
+        self.assertEqual(self._load_count(), 1)
+
+    def test_rolled_back_unlock_does_not_change_ranking(self):
+        """Если транзакция не зафиксирована, рейтинг достижений не меняется."""
+        gamification_logic.get_achievements_ranking()
+        self.mock_database.get_db_connection.return_value.__exit__.side_effect = RuntimeError("commit failed")
+
+        self.assertIsNone(self._unlock_bronze())
+
+        user_rank = gamification_logic.get_user_rank(2, settings.RANKING_TYPE_ACHIEVEMENTS)
+        self.assertEqual(user_rank["total_achievements"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,8 +10,10 @@
     - Unknown file format handling
     - Full processing cycle in both light and dark modes
 """
+import random
 import shutil
 
+import numpy as np
 import pytest
 import requests
 
@@ -117,3 +119,46 @@ def test_upload_timeout_returns_network_error(cleanup, monkeypatch):
     success, error_code = generate_image("test_999", "test_network_timeout.jpg")
     assert success is False
     assert error_code == ERR_TELEGRAM_UPLOAD_FAILED
+
+
+def _synthetic_screen(seed, dark):
+    """Случайный «скриншот» с точками цветов, которые ищет анализ."""
+    rng = random.Random(seed)
+    width, height = 24, 460
+    background = (30, 30, 30) if dark else (200, 200, 200)
+    img = Image.new("RGB", (width, height), background)
+    colors = [
+        processimagequeue.DARK_PIXEL_COLOR if dark else processimagequeue.LIGHT_PIXEL_COLOR,
+        processimagequeue.DARK_LOCATION_ICON_COLOR,
+        processimagequeue.DARK_TRIANGLE_ICON_COLOR,
+        processimagequeue.LIGHT_LOCATION_ICON_COLOR,
+        processimagequeue.LIGHT_TRIANGLE_ICON_COLOR,
+        processimagequeue.FRAME_BORDER_COLOR,
+        processimagequeue.TASKS_BORDER_COLOR,
+    ]
+    if seed % 4:
+        img.putpixel((rng.randrange(width), rng.randrange(150, 400)), colors[0])
+    for _ in range(rng.randint(0, 30)):
+        color = rng.choice(colors)
+        jitter = tuple(max(0, min(255, c + rng.randint(-6, 6))) for c in color)
+        x = rng.choice([processimagequeue.COLUMN_TO_SCAN_FOR_FRAME_BORDER_COLOR, rng.randrange(width)])
+        img.putpixel((x, rng.randrange(height)), jitter)
+    return img
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_vectorized_analysis_matches_pixel_loops(seed):
+    """Векторный анализ даёт тот же результат, что и прежний обход getpixel."""
+    from scripts.vyezd_byl_image_benchmark import _legacy_analyze, _vectorized_analyze
+
+    img = _synthetic_screen(seed, dark=seed % 2 == 0)
+    assert _vectorized_analyze(img, {}) == _legacy_analyze(img, {})
+
+
+def test_dark_mode_frame_bounds_on_sample():
+    """Границы карты в тёмном режиме совпадают с прежней реализацией."""
+    img = Image.open(TEST_SAMPLES_DIR / "dark_mode_screen.jpg").convert("RGB")
+    pixels = np.asarray(img)
+
+    assert processimagequeue.detect_color_mode(pixels) == (True, True)
+    assert processimagequeue.scan_dark_mode_frame(pixels) == (257, 1418, None)
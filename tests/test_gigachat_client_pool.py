@@ -0,0 +1,189 @@
+"""
+test_gigachat_client_pool.py — тесты пула клиентов GigaChat на локальной заглушке API.
+"""
+
+import asyncio
+import base64
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from src.core.ai.gigachat_client_pool import GigaChatClientPool
+from src.core.ai.llm_provider import GigaChatProvider
+
+
+class _StubGigaChatServer:
+    """
+    Заглушка OAuth (/oauth) и chat (/chat/completions) эндпоинтов GigaChat.
+
+    token_ttls — время жизни выдаваемых токенов по порядку (последнее повторяется).
+    """
+
+    def __init__(self, token_ttls=(1800.0,)):
+        self.token_ttls = list(token_ttls)
+        self.oauth_requests = 0
+        self.chat_requests = 0
+        self.authorizations = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                return
+
+            def _send_json(self, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path == "/oauth":
+                    stub.oauth_requests += 1
+                    ttl = stub.token_ttls[min(stub.oauth_requests, len(stub.token_ttls)) - 1]
+                    expires_at = int((time.time() + ttl) * 1000)
+                    self._send_json({"access_token": f"token-{stub.oauth_requests}", "expires_at": expires_at})
+                    return
+                stub.chat_requests += 1
+                stub.authorizations.append(self.headers.get("Authorization"))
+                self._send_json({
+                    "choices": [
+                        {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ответ"}}
+                    ],
+                    "created": int(time.time()),
+                    "model": "GigaChat",
+                    "object": "chat.completion",
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                })
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestGigaChatClientPoolWithStub(unittest.IsolatedAsyncioTestCase):
+    """Пул переиспользует клиент и токен, обновляет токен заранее."""
+
+    def _make(self, token_ttls, refresh_ahead_seconds):
+        server = _StubGigaChatServer(token_ttls=token_ttls)
+        self.addCleanup(server.close)
+        pool = GigaChatClientPool(max_workers=2, max_in_flight=2, refresh_ahead_seconds=refresh_ahead_seconds)
+        self.addCleanup(pool.close)
+        patcher = patch("src.core.ai.llm_provider.get_gigachat_client_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        provider = GigaChatProvider(
+            credentials=base64.b64encode(b"client:secret").decode("ascii"),
+            base_url=server.base_url,
+            auth_url=f"{server.base_url}/oauth",
+            max_retries=0,
+        )
+        return server, pool, provider
+
+    async def _wait_for(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail("условие не выполнено за отведённое время")
+            await asyncio.sleep(0.01)
+
+    async def test_token_is_fetched_once_for_many_requests(self):
+        """Несколько запросов (в т.ч. одновременных) используют один клиент и один OAuth-обмен."""
+        server, pool, provider = self._make(token_ttls=[1800], refresh_ahead_seconds=300)
+
+        self.assertEqual(await provider.chat([{"role": "user", "content": "привет"}], system_prompt="sys"), "ответ")
+        results = await asyncio.gather(*(
+            provider.chat([{"role": "user", "content": str(index)}], system_prompt="sys")
+            for index in range(4)
+        ))
+
+        self.assertEqual(results, ["ответ"] * 4)
+        self.assertEqual(server.oauth_requests, 1)
+        self.assertEqual(server.chat_requests, 5)
+        self.assertEqual(set(server.authorizations), {"Bearer token-1"})
+        stats = pool.stats()
+        self.assertEqual((stats["clients"], stats["clients_created"], stats["calls"]), (1, 1, 5))
+
+    async def test_token_close_to_expiry_is_refreshed_in_background(self):
+        """Токен, истекающий раньше refresh-ahead, обновляется в фоне новым клиентом."""
+        server, pool, provider = self._make(token_ttls=[200, 1800], refresh_ahead_seconds=300)
+
+        await provider.chat([{"role": "user", "content": "1"}], system_prompt="sys")
+        await self._wait_for(lambda: pool.stats()["token_refreshes"] == 1)
+
+        await provider.chat([{"role": "user", "content": "2"}], system_prompt="sys")
+        await provider.chat([{"role": "user", "content": "3"}], system_prompt="sys")
+
+        self.assertEqual(server.oauth_requests, 2)
+        self.assertEqual(server.authorizations, ["Bearer token-1", "Bearer token-2", "Bearer token-2"])
+        self.assertEqual(pool.stats()["clients"], 1)
+
+
+class _FakeClient:
+    """Клиент без сети: фиксирует закрытие."""
+
+    def __init__(self):
+        self.closed = False
+
+    def get_token(self):
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+class TestGigaChatClientPoolLimits(unittest.IsolatedAsyncioTestCase):
+    """Ограничение одновременных запросов."""
+
+    async def test_semaphore_limits_in_flight_requests(self):
+        """Одновременно выполняется не больше max_in_flight вызовов SDK."""
+        pool = GigaChatClientPool(max_workers=4, max_in_flight=2, client_factory=lambda _kwargs: _FakeClient())
+        self.addCleanup(pool.close)
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def slow_call(_client):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            time.sleep(0.05)
+            with lock:
+                state["current"] -= 1
+            return "ok"
+
+        results = await asyncio.gather(*(pool.run({"model": "m"}, slow_call) for _ in range(6)))
+
+        self.assertEqual(results, ["ok"] * 6)
+        self.assertEqual(state["peak"], 2)
+        self.assertEqual(pool.stats()["clients_created"], 1)
+
+    def test_close_closes_clients_and_rejects_new_calls(self):
+        """После close клиенты закрыты, новые вызовы отклоняются."""
+        clients = []
+
+        def factory(_kwargs):
+            clients.append(_FakeClient())
+            return clients[-1]
+
+        pool = GigaChatClientPool(max_workers=1, max_in_flight=1, client_factory=factory)
+        pool.call_sync({"model": "a"}, lambda client: None)
+        pool.call_sync({"model": "b"}, lambda client: None)
+        pool.close()
+
+        self.assertEqual([client.closed for client in clients], [True, True])
+        with self.assertRaises(RuntimeError):
+            pool.call_sync({"model": "a"}, lambda client: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
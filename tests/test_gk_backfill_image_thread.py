@@ -5,6 +5,9 @@ import threading
 import unittest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+# Импортируется до загрузки скрипта: patch.dict(sys.modules) при выходе удаляет
+# модули, впервые загруженные внутри блока, а numpy нельзя импортировать повторно
+import src.core.ai.bm25_engine  # noqa: F401
 from src.group_knowledge.image_processor import ImageProcessor
 from src.group_knowledge.models import ImageDescription
 
@@ -252,5 +255,28 @@ class TestRunImageQueueInThread(unittest.TestCase):
         self.assertEqual(result_container[0], 0)
 
 
+    def test_thread_closes_db_log_sink_and_llm_clients_of_its_loop(self):
+        """Перед закрытием loop поток дописывает очередь логов БД и закрывает клиенты LLM."""
+        gk_mod = self._load_gk_collector_module()
+
+        processor = ImageProcessor.__new__(ImageProcessor)
+        processor._provider = MagicMock()
+        processor._storage_path = "/tmp"
+
+        async def fake_process_queue(batch_size=5):
+            return 0
+
+        processor.process_queue = fake_process_queue
+
+        stop_event = threading.Event()
+        stop_event.set()
+        with patch.object(gk_mod, "close_db_log_sink", AsyncMock(return_value=None)) as mock_close_sink, \
+             patch.object(gk_mod, "close_llm_http_clients", AsyncMock(return_value=0)) as mock_close_llm:
+            gk_mod._run_image_queue_in_thread(processor, stop_event, [])
+
+        mock_close_sink.assert_awaited_once_with()
+        mock_close_llm.assert_awaited_once_with()
+
+
 if __name__ == "__main__":
     unittest.main()
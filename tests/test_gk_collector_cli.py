@@ -349,6 +349,53 @@ class TestGKCollectorCli(unittest.TestCase):
         mock_responder = asyncio.run(_run())
         mock_responder.preload_search_resources.assert_called_once_with(preload_vector_model=True)
 
+    def test_run_collector_shutdown_flushes_db_logs_and_closes_llm_clients(self):
+        """При остановке daemon collector дописывает очередь логов БД и закрывает клиенты LLM."""
+        args = argparse.Namespace(
+            manage_groups=False,
+            backfill=False,
+            days=7,
+            force=False,
+            live=False,
+            test_mode=False,
+            redirect_test_mode=False,
+            collect_only=False,
+        )
+        mock_client = AsyncMock()
+        mock_client.on = lambda *_args, **_kwargs: (lambda func: func)
+        mock_client.__bool__ = lambda self: True
+        calls = []
+
+        async def _run():
+            with patch.object(GK_COLLECTOR, "load_groups_config", return_value=[{"id": -1001, "title": "Real"}]):
+                with patch.object(GK_COLLECTOR, "start_telegram_client_with_logging", AsyncMock(return_value=mock_client)):
+                    with patch.object(GK_COLLECTOR, "disconnect_client_quietly", AsyncMock(side_effect=lambda *_: calls.append("disconnect"))):
+                        with patch.object(GK_COLLECTOR, "MessageCollector") as mock_collector_cls:
+                            mock_collector = mock_collector_cls.return_value
+                            mock_collector.group_ids = {-1001}
+                            mock_collector.resolve_group_ids = AsyncMock()
+                            mock_collector.sync_missed_messages = AsyncMock(return_value=0)
+                            mock_collector.handle_new_message = AsyncMock(return_value=None)
+                            with patch.object(GK_COLLECTOR, "GroupResponder"):
+                                with patch.object(GK_COLLECTOR, "CollectorResponderBridge") as mock_bridge_cls:
+                                    mock_bridge_cls.return_value.stop = AsyncMock(side_effect=lambda: calls.append("bridge"))
+                                    with patch.object(GK_COLLECTOR, "close_db_log_sink", AsyncMock(side_effect=lambda: calls.append("sink"))), \
+                                         patch.object(GK_COLLECTOR, "close_llm_http_clients", AsyncMock(return_value=1)) as mock_close_llm, \
+                                         patch.object(GK_COLLECTOR, "close_gigachat_client_pool") as mock_close_gigachat:
+                                        with patch("signal.signal"):
+                                            with patch.object(GK_COLLECTOR.asyncio, "sleep", new=AsyncMock(side_effect=[asyncio.CancelledError()])):
+                                                try:
+                                                    await GK_COLLECTOR.run_collector(args)
+                                                except asyncio.CancelledError:
+                                                    pass
+            return mock_close_llm, mock_close_gigachat
+
+        mock_close_llm, mock_close_gigachat = asyncio.run(_run())
+        # Логи моста пишутся до остановки sink, клиент Telegram отключается последним
+        self.assertEqual(calls, ["bridge", "sink", "disconnect"])
+        mock_close_llm.assert_awaited_once_with()
+        mock_close_gigachat.assert_called_once_with()
+
     def test_fill_missing_is_question_mode_does_not_start_telegram(self):
         """Режим заполнения missing is_question работает без запуска Telethon-клиента."""
         args = argparse.Namespace(
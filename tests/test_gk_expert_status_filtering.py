@@ -38,7 +38,7 @@ class TestVectorSearchExpertFiltering(unittest.TestCase):
         mock_settings.GK_RESPONDER_TOP_K = 5
         mock_settings.GK_INCLUDE_LLM_INFERRED_ANSWERS = False
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         service._model_name = "test"
         service._top_k = 5
 
@@ -20,7 +20,7 @@ from src.group_knowledge.qa_search import (
 
 
 def _patch_fixed_terms(service: QASearchService) -> None:
-    """Установить instance-level атрибуты защищённых терминов (для тестов через __new__)."""
+    """Установить instance-level атрибуты защищённых терминов (фиксированный набор вместо загрузки из БД)."""
     service._fixed_terms = _GK_FIXED_TERMS
     service._fixed_phrases = _GK_FIXED_PHRASES
     service._fixed_term_token_map = dict(_GK_FIXED_TERM_TOKEN_MAP)
@@ -158,16 +158,18 @@ class TestGKBm25IdfDampening(unittest.TestCase):
     @patch("src.group_knowledge.qa_search.ai_settings.get_active_gk_bm25_idf_dampen_ratio", return_value=0.5)
     def test_bm25_search_logs_dampening_diagnostics(self, _mock_ratio, _mock_factor):
         """_bm25_search вызывает детальный лог dampening и использует трансформированный query."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         service._ensure_corpus_loaded = MagicMock()
-        service._corpus_pairs = [
-            _make_pair(1, question="Q1", answer="A1"),
-            _make_pair(2, question="Q2", answer="A2"),
-        ]
-        service._corpus_tokens = [
-            ["ккт", "ошибка"],
-            ["ккт", "драйвер"],
-        ]
+        service._set_corpus(
+            [
+                _make_pair(1, question="Q1", answer="A1"),
+                _make_pair(2, question="Q2", answer="A2"),
+            ],
+            [
+                ["ккт", "ошибка"],
+                ["ккт", "драйвер"],
+            ],
+        )
         service._tokenize_with_diagnostics = MagicMock(return_value={
             "tokens": ["ккт", "ошибка"],
             "raw_tokens_total": 2,
@@ -175,7 +177,7 @@ class TestGKBm25IdfDampening(unittest.TestCase):
             "removed_stopwords": [],
             "removed_stopwords_count": 0,
         })
-        service._score_corpus_bm25 = MagicMock(return_value=[1.0, 0.2])
+        service._rank_corpus_bm25 = MagicMock(return_value=[(0, 1.0), (1, 0.2)])
         service._log_idf_dampening_effect = MagicMock()
 
         results = service._bm25_search("ошибка ккт", top_k=2)
@@ -501,9 +503,8 @@ class TestBuildSpellcheckVocabulary(unittest.TestCase):
     @patch("src.group_knowledge.qa_search.SymSpell", None)
     def test_no_symspell_returns_false(self):
         """Если symspellpy не установлен, _build_spellcheck_vocabulary → False."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
-        service._corpus_pairs = []
         service._spellcheck_sym = None
         service._spellcheck_vocab_size = 0
         service._spellcheck_vocab_ready = False
@@ -520,15 +521,18 @@ class TestBuildSpellcheckVocabulary(unittest.TestCase):
         mock_sym = MagicMock()
         mock_symspell_cls.return_value = mock_sym
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_sym = None
         service._spellcheck_vocab_size = 0
         service._spellcheck_vocab_ready = False
-        service._corpus_pairs = [
-            QAPair(id=1, question_text="тестовый вопрос", answer_text="тестовый ответ"),
-            QAPair(id=2, question_text="другой запрос", answer_text="другой ответ"),
-        ]
+        service._set_corpus(
+            [
+                QAPair(id=1, question_text="тестовый вопрос", answer_text="тестовый ответ"),
+                QAPair(id=2, question_text="другой запрос", answer_text="другой ответ"),
+            ],
+            [[], []],
+        )
 
         result = service._build_spellcheck_vocabulary()
 
@@ -547,12 +551,11 @@ class TestBuildSpellcheckVocabulary(unittest.TestCase):
         mock_sym = MagicMock()
         mock_symspell_cls.return_value = mock_sym
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_sym = None
         service._spellcheck_vocab_size = 0
         service._spellcheck_vocab_ready = False
-        service._corpus_pairs = []
 
         result = service._build_spellcheck_vocabulary()
 
@@ -566,7 +569,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_rare_exact_typo_replaced_by_frequent_neighbor(self):
         """Редкая «точная» опечатка заменяется на частотный соседний термин."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -610,7 +613,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_exact_typo_with_freq_two_still_replaced(self):
         """Даже при freq=2 редкая опечатка заменяется на частотный валидный токен."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -654,7 +657,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_skips_protected_terms(self):
         """Защищённые термины не корректируются."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -676,7 +679,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_skips_multiword_protected_terms(self):
         """Multi-word protected term пропускается после канонизации."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -697,7 +700,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_skips_short_tokens(self):
         """Токены короче min_length пропускаются."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -717,7 +720,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_skips_non_cyrillic_tokens(self):
         """Латинские и числовые токены пропускаются."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
 
@@ -737,7 +740,7 @@ class TestSpellcheckTokens(unittest.TestCase):
 
     def test_not_ready_returns_unchanged(self):
         """Если vocabulary не готов — возвращает токены без изменений."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = False
         service._spellcheck_sym = None
@@ -757,7 +760,7 @@ class TestApplySpellcheckToQuery(unittest.TestCase):
         """Если spellcheck выключен — возвращает оригинал."""
         mock_settings.GK_SPELLCHECK_ENABLED = False
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = False
         service._spellcheck_sym = None
@@ -772,7 +775,7 @@ class TestApplySpellcheckToQuery(unittest.TestCase):
         """Если vocabulary не готов — source='vocab_not_ready'."""
         mock_settings.GK_SPELLCHECK_ENABLED = True
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = False
         service._spellcheck_sym = None
@@ -786,7 +789,7 @@ class TestApplySpellcheckToQuery(unittest.TestCase):
         """После pipeline protected phrase остаётся с пробелом в исходном виде."""
         mock_settings.GK_SPELLCHECK_ENABLED = True
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._spellcheck_vocab_ready = True
         service._spellcheck_sym = MagicMock()
@@ -808,11 +811,10 @@ class TestInvalidateCorpusCacheResetsSpellcheck(unittest.TestCase):
 
     def test_spellcheck_state_reset(self):
         """После invalidate_corpus_cache spellcheck состояние сброшено."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._corpus_loaded_at = 100.0
-        service._corpus_pairs = [QAPair(id=1, question_text="q", answer_text="a")]
-        service._corpus_tokens = [["q"]]
+        service._set_corpus([QAPair(id=1, question_text="q", answer_text="a")], [["q"]])
         service._corpus_signature = (1, 1, 1)
         service._corpus_extraction_types = ("thread_reply",)
         service._spellcheck_sym = MagicMock()
@@ -839,7 +841,7 @@ class TestSearchSpellcheckInitializationOrder(unittest.TestCase):
         mock_settings.GK_RELEVANCE_HINTS_ENABLED = False
         mock_settings.GK_TERMS_CACHE_TTL_SECONDS = 99999
 
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._top_k = 3
 
@@ -867,10 +869,10 @@ class TestEnsureTermsLoadedSpellcheckRebuild(unittest.TestCase):
     @patch("src.group_knowledge.qa_search.ai_settings")
     def test_rebuilds_spellcheck_vocab_after_terms_reload(self, mock_settings):
         """Если кэш терминов протух, а корпус уже загружен — spellcheck vocabulary пересобирается."""
-        service = QASearchService.__new__(QASearchService)
+        service = QASearchService()
         _patch_fixed_terms(service)
         service._fixed_terms_loaded_at = 0.0
-        service._corpus_pairs = [QAPair(id=1, question_text="q", answer_text="a")]
+        service._set_corpus([QAPair(id=1, question_text="q", answer_text="a")], [[]])
 
         mock_settings.GK_TERMS_CACHE_TTL_SECONDS = 1
         mock_settings.GK_SPELLCHECK_ENABLED = True
@@ -627,6 +627,30 @@ class TestDatabaseLayer(unittest.TestCase):
         self.assertIn("qp.group_id = %s", executed_query)
         self.assertEqual(executed_params, ("2026-03-09", -1001234))
 
+    @patch("src.group_knowledge.database.get_db_connection")
+    def test_get_qa_pairs_by_ids_uses_single_in_query(self, mock_conn_ctx):
+        """Bulk-загрузка Q&A-пар выполняет один запрос IN (...) без дублей ID."""
+        from src.group_knowledge.database import get_qa_pairs_by_ids
+
+        mock_cursor = MagicMock()
+        mock_conn_ctx.return_value.__enter__.return_value = MagicMock()
+        with patch("src.group_knowledge.database.get_cursor") as mock_get_cursor:
+            mock_get_cursor.return_value.__enter__.return_value = mock_cursor
+            mock_cursor.fetchall.return_value = [
+                {"id": 3, "question_text": "Q3", "answer_text": "A3"},
+                {"id": 8, "question_text": "Q8", "answer_text": "A8"},
+            ]
+
+            pairs = get_qa_pairs_by_ids([8, 3, 8, None])
+
+        self.assertEqual(sorted(pairs), [3, 8])
+        self.assertEqual(pairs[8].question_text, "Q8")
+        mock_cursor.execute.assert_called_once()
+        executed_query, executed_params = mock_cursor.execute.call_args[0]
+        self.assertIn("WHERE id IN (%s, %s)", executed_query)
+        self.assertEqual(executed_params, (3, 8))
+        self.assertEqual(get_qa_pairs_by_ids([]), {})
+
     @patch("src.group_knowledge.database.get_db_connection")
     def test_store_message(self, mock_conn_ctx):
         """Сохранение сообщения выполняет INSERT."""
@@ -2860,10 +2884,14 @@ class TestQASearchAnswer(unittest.TestCase):
                 "src.core.ai.vector_search.LocalVectorIndex",
                 return_value=mock_vector_index,
             ) as mock_index_cls:
-                with patch("src.group_knowledge.qa_search.gk_db.get_qa_pair_by_id", return_value=pair):
+                with patch(
+                    "src.group_knowledge.qa_search.gk_db.get_qa_pairs_by_ids",
+                    return_value={17: pair},
+                ) as mock_bulk:
                     results = _run_async(service._vector_search("Как включить NFC?", 3))
 
         self.assertEqual(results, [(pair, 0.87)])
+        mock_bulk.assert_called_once_with([17])
         mock_index_cls.assert_called_once_with(chunk_collection_name="gk_qa_pairs_v1")
         mock_embedding_provider.encode.assert_called_once_with("Как включить NFC?")
         mock_vector_index.search.assert_called_once_with(
@@ -2890,12 +2918,69 @@ class TestQASearchAnswer(unittest.TestCase):
 
         with patch("src.core.ai.vector_search.LocalEmbeddingProvider", return_value=mock_embedding_provider):
             with patch("src.core.ai.vector_search.LocalVectorIndex", return_value=mock_vector_index):
-                with patch("src.group_knowledge.qa_search.gk_db.get_qa_pair_by_id", side_effect=[thread_pair, llm_pair]):
+                with patch(
+                    "src.group_knowledge.qa_search.gk_db.get_qa_pairs_by_ids",
+                    return_value={1: thread_pair, 2: llm_pair},
+                ):
                     with patch("src.group_knowledge.qa_search.ai_settings.GK_INCLUDE_LLM_INFERRED_ANSWERS", False):
                         results = _run_async(service._vector_search("Как включить NFC?", 3))
 
         self.assertEqual(results, [(thread_pair, 0.92)])
 
+    def test_vector_search_hydrates_pairs_from_corpus_and_single_bulk_query(self):
+        """Кандидаты Qdrant берутся из BM25-корпуса, а недостающие — одним bulk-запросом."""
+        from src.group_knowledge.models import QAPair
+        from src.group_knowledge.qa_search import QASearchService
+
+        cached_pair = QAPair(id=5, question_text="Q5", answer_text="A5", extraction_type="thread_reply", approved=1)
+        other_cached = QAPair(id=6, question_text="Q6", answer_text="A6", extraction_type="thread_reply", approved=1)
+        fresh_pair = QAPair(id=9, question_text="Q9", answer_text="A9", extraction_type="thread_reply")
+
+        hits = [
+            types.SimpleNamespace(document_id=9, score=0.95),
+            types.SimpleNamespace(document_id=5, score=0.90),
+            types.SimpleNamespace(document_id=404, score=0.80),
+            types.SimpleNamespace(document_id=5, score=0.70),
+        ]
+        mock_embedding_provider = MagicMock()
+        mock_embedding_provider.encode.return_value = [0.1, 0.2]
+        mock_vector_index = MagicMock()
+        mock_vector_index.search.return_value = hits
+
+        service = QASearchService()
+        service._set_corpus([other_cached, cached_pair], [["q6"], ["q5"]])
+
+        with patch("src.core.ai.vector_search.LocalEmbeddingProvider", return_value=mock_embedding_provider):
+            with patch("src.core.ai.vector_search.LocalVectorIndex", return_value=mock_vector_index):
+                with patch(
+                    "src.group_knowledge.qa_search.gk_db.get_qa_pairs_by_ids",
+                    return_value={9: fresh_pair},
+                ) as mock_bulk:
+                    with patch("src.group_knowledge.qa_search.gk_db.get_qa_pair_by_id") as mock_single:
+                        results = _run_async(service._vector_search("вопрос", 4))
+
+        self.assertEqual(results, [(fresh_pair, 0.95), (cached_pair, 0.90), (cached_pair, 0.70)])
+        mock_bulk.assert_called_once_with([9, 404])
+        mock_single.assert_not_called()
+
+    def test_hydrate_qa_pairs_skips_db_when_all_pairs_cached(self):
+        """Если все пары есть в загруженном корпусе, запрос в БД не выполняется."""
+        from src.group_knowledge.models import QAPair
+        from src.group_knowledge.qa_search import QASearchService
+
+        pairs = [
+            QAPair(id=1, question_text="Q1", answer_text="A1", extraction_type="thread_reply", approved=1),
+            QAPair(id=2, question_text="Q2", answer_text="A2", extraction_type="thread_reply", approved=1),
+        ]
+        service = QASearchService()
+        service._set_corpus(pairs, [["q1"], ["q2"]])
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_by_ids") as mock_bulk:
+            hydrated = service._hydrate_qa_pairs([2, 1, 0])
+
+        self.assertEqual(hydrated, {2: pairs[1], 1: pairs[0]})
+        mock_bulk.assert_not_called()
+
     def test_bm25_corpus_adds_image_gist_when_rag_flag_enabled(self):
         """BM25-корпус включает gist изображения при включённом RAG-флаге."""
         from src.group_knowledge.models import GroupMessage, QAPair
@@ -3789,42 +3874,56 @@ class TestGKTokenize(unittest.TestCase):
 # ===========================================================================
 
 class TestGKBM25Scoring(unittest.TestCase):
-    """Тесты для QASearchService._score_corpus_bm25."""
+    """Тесты для QASearchService._rank_corpus_bm25."""
+
+    @staticmethod
+    def _snapshot(corpus_tokens):
+        from src.group_knowledge.qa_search import _CorpusSnapshot
+
+        return _CorpusSnapshot(
+            pairs=[],
+            tokens=corpus_tokens,
+            position_by_id={},
+            doc_freq=None,
+            bm25_index=None,
+        )
 
     def test_basic_scoring(self):
-        """BM25 даёт ненулевой score для релевантного документа."""
+        """BM25 ранжирует документы с токенами запроса и отбрасывает нерелевантные."""
         from src.group_knowledge.qa_search import QASearchService
 
-        corpus = [
+        corpus = self._snapshot([
             ["включить", "nfc", "терминал", "настройк"],
             ["замена", "бумага", "чековый", "лента"],
             ["nfc", "ошибка", "подключен", "модуль"],
-        ]
-        query = ["nfc", "включить"]
-        scores = QASearchService._score_corpus_bm25(corpus, query)
-
-        self.assertEqual(len(scores), 3)
-        # Первый и третий документы содержат "nfc"
-        self.assertGreater(scores[0], 0.0)
-        self.assertGreater(scores[2], 0.0)
-        # Первый документ релевантнее (содержит оба токена)
-        self.assertGreater(scores[0], scores[2])
-        # Второй документ нерелевантен
-        self.assertAlmostEqual(scores[1], 0.0)
+        ])
+        ranked = QASearchService._rank_corpus_bm25(corpus, ["nfc", "включить"], top_k=5)
+
+        # Первый документ релевантнее (содержит оба токена), второй нерелевантен
+        self.assertEqual([position for position, _ in ranked], [0, 2])
+        self.assertGreater(ranked[0][1], ranked[1][1])
+        self.assertGreater(ranked[1][1], 0.0)
+
+    def test_top_k_limits_results(self):
+        """Возвращается не больше top_k документов."""
+        from src.group_knowledge.qa_search import QASearchService
+
+        corpus = self._snapshot([["nfc", "a"], ["nfc", "b"], ["c"], ["d"], ["e"]])
+        ranked = QASearchService._rank_corpus_bm25(corpus, ["nfc"], top_k=1)
+
+        self.assertEqual(len(ranked), 1)
 
     def test_empty_corpus(self):
         """Пустой корпус возвращает пустой список."""
         from src.group_knowledge.qa_search import QASearchService
 
-        scores = QASearchService._score_corpus_bm25([], ["test"])
-        self.assertEqual(scores, [])
+        self.assertEqual(QASearchService._rank_corpus_bm25(self._snapshot([]), ["test"], top_k=5), [])
 
     def test_empty_query(self):
-        """Пустой запрос возвращает нулевые score."""
+        """Пустой запрос не даёт результатов."""
         from src.group_knowledge.qa_search import QASearchService
 
-        scores = QASearchService._score_corpus_bm25([["a", "b"]], [])
-        self.assertEqual(scores, [0.0])
+        self.assertEqual(QASearchService._rank_corpus_bm25(self._snapshot([["a", "b"]]), [], top_k=5), [])
 
 
 # ===========================================================================
@@ -3893,6 +3992,228 @@ class TestGKBM25Search(unittest.TestCase):
         # get_all_approved_qa_pairs вызывается только 1 раз (кэш)
         mock_get.assert_called_once()
 
+    def test_bm25_index_built_once_per_corpus_load(self):
+        """BM25-индекс строится при загрузке корпуса и переиспользуется запросами."""
+        from src.core.ai.bm25_engine import SparseBM25Index
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        pairs = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1),
+            QAPair(id=3, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1),
+        ]
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", return_value=(3, 3, 100)), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", return_value=pairs), \
+             patch("src.group_knowledge.qa_search.SparseBM25Index", wraps=SparseBM25Index) as mock_index:
+            first = service._bm25_search("ошибка продажи", top_k=5)
+            second = service._bm25_search("замена ленты", top_k=5)
+
+        mock_index.assert_called_once()
+        self.assertEqual(first[0][0].id, 1)
+        self.assertEqual(second[0][0].id, 3)
+
+    def test_corpus_refreshes_incrementally_on_signature_change(self):
+        """Новая пара добавляется в корпус без полной перезагрузки и повторной токенизации корпуса."""
+        from src.group_knowledge import qa_search as qa_search_module
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        pair_sale = QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1, created_at=100)
+        pair_tape = QAPair(id=2, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1, created_at=150)
+        pair_print = QAPair(id=3, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1, created_at=200)
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", side_effect=[(2, 2, 150), (3, 3, 200)]), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_watermark", return_value="w1"), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", return_value=[pair_sale, pair_tape]) as mock_get_all, \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_since", return_value=([pair_print], {3: "w2"}, "w2")) as mock_since:
+            service._bm25_search("ошибка продажи", top_k=5)
+            with patch.object(service, "_tokenize", wraps=service._tokenize) as mock_tokenize:
+                results = service._bm25_search("бумага печати", top_k=5)
+
+        mock_get_all.assert_called_once()
+        mock_since.assert_called_once_with(
+            "w1",
+            overlap_seconds=qa_search_module.ai_settings.GK_BM25_INCREMENTAL_OVERLAP_SECONDS,
+        )
+        # Токенизируется только новая пара (запрос идёт через _tokenize_with_diagnostics)
+        self.assertEqual(mock_tokenize.call_count, 1)
+        self.assertEqual(results[0][0].id, 3)
+        self.assertEqual(service._corpus_watermark, "w2")
+        self.assertEqual(service._corpus_signature, (3, 3, 200))
+        self.assertEqual(service._corpus_doc_freq[service._tokenize("ошибка")[0]], 2)
+
+    def test_incremental_refresh_removes_rejected_and_updates_changed_pairs(self):
+        """Отклонённая экспертом пара удаляется, изменённая — заменяется на месте."""
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        pairs = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1),
+            QAPair(id=3, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1),
+            QAPair(id=4, question_text="Не включается пинпад", answer_text="Проверьте питание", group_id=-100, approved=1),
+        ]
+        changed = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Перезапустите кассу", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1, expert_status="rejected"),
+        ]
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", side_effect=[(4, 4, 100), (3, 4, 100)]), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_watermark", return_value="w1"), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", return_value=pairs) as mock_get_all, \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_since", return_value=(changed, {1: "w2", 2: "w2"}, "w2")):
+            service._bm25_search("ошибка", top_k=5)
+            results = service._bm25_search("перезапустите кассу", top_k=5)
+
+        mock_get_all.assert_called_once()
+        self.assertEqual([pair.id for pair in service._corpus_pairs], [1, 3, 4])
+        self.assertEqual(service._corpus_pairs[0].answer_text, "Перезапустите кассу")
+        self.assertEqual(service._corpus_position_by_id, {1: 0, 3: 1, 4: 2})
+        self.assertEqual(results[0][0].id, 1)
+        self.assertNotIn(service._tokenize("бумагу")[0], service._corpus_doc_freq)
+
+    def test_incremental_refresh_falls_back_to_full_reload_on_count_mismatch(self):
+        """Если после дельты число пар не совпадает с сигнатурой (удаление группы), корпус перезагружается."""
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        pairs = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-200, approved=1),
+        ]
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", side_effect=[(2, 2, 100), (1, 1, 100)]), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_watermark", return_value="w1"), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", side_effect=[pairs, pairs[:1]]) as mock_get_all, \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_since", return_value=([], {}, "w1")):
+            service._bm25_search("ошибка", top_k=5)
+            service._bm25_search("ошибка", top_k=5)
+
+        self.assertEqual(mock_get_all.call_count, 2)
+        self.assertEqual([pair.id for pair in service._corpus_pairs], [1])
+
+    def test_incremental_refresh_skips_overlap_rows_and_applies_late_commits(self):
+        """Окно перекрытия: уже применённые строки пропускаются, поздно закоммиченные — применяются."""
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        pairs = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1),
+        ]
+        pair_print = QAPair(id=3, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1)
+        late_pair = QAPair(id=4, question_text="Нет связи", answer_text="Проверьте SIM", group_id=-100, approved=1)
+        since_results = [
+            ([pair_print], {3: 20}, 20),
+            # Пара 3 снова в окне перекрытия, пара 4 закоммичена позже с более ранним updated_at
+            ([late_pair, pair_print], {4: 15, 3: 20}, 20),
+        ]
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", side_effect=[(2, 2, 100), (3, 3, 200), (4, 4, 200)]), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_watermark", return_value=10), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", return_value=pairs) as mock_get_all, \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_since", side_effect=since_results):
+            service._bm25_search("ошибка", top_k=5)
+            service._bm25_search("ошибка", top_k=5)
+            with patch.object(service, "_tokenize", wraps=service._tokenize) as mock_tokenize:
+                results = service._bm25_search("проверьте sim", top_k=5)
+
+        mock_get_all.assert_called_once()
+        self.assertEqual(mock_tokenize.call_count, 1)
+        self.assertEqual([pair.id for pair in service._corpus_pairs], [1, 2, 3, 4])
+        self.assertEqual(results[0][0].id, 4)
+        self.assertEqual(service._corpus_applied_updates, {4: 15, 3: 20})
+
+    def test_incremental_refresh_patches_bm25_index_without_rebuild(self):
+        """Инкрементальное обновление применяет дельту к BM25-индексу, а не строит его заново."""
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+        from src.core.ai.bm25_engine import SparseBM25Index
+
+        service = QASearchService()
+        pairs = [
+            QAPair(id=index, question_text=f"Вопрос номер {index}", answer_text=f"Ответ {index}", group_id=-100, approved=1)
+            for index in range(1, 9)
+        ]
+        changed = QAPair(id=2, question_text="Ошибка печати", answer_text="Проверьте бумагу", group_id=-100, approved=1)
+
+        with patch("src.group_knowledge.qa_search.gk_db.get_approved_qa_pairs_corpus_signature", side_effect=[(8, 8, 100), (8, 8, 101)]), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_watermark", return_value=10), \
+             patch("src.group_knowledge.qa_search.gk_db.get_all_approved_qa_pairs", return_value=pairs), \
+             patch("src.group_knowledge.qa_search.gk_db.get_qa_pairs_updated_since", return_value=([changed], {2: 20}, 20)):
+            service._bm25_search("вопрос", top_k=5)
+            with patch.object(SparseBM25Index, "__init__", side_effect=AssertionError("полная пересборка индекса")):
+                results = service._bm25_search("бумагу печати", top_k=5)
+
+        self.assertEqual(results[0][0].id, 2)
+        self.assertEqual(service._corpus_bm25_index.pending_changes, 1)
+        self.assertTrue(service._corpus_bm25_index.matches(service._corpus.version, *service._bm25_params()))
+
+    def test_bm25_search_scores_against_single_corpus_snapshot(self):
+        """Замена корпуса того же размера во время поиска не смешивает score и пары разных корпусов."""
+        from src.group_knowledge.qa_search import QASearchService
+        from src.group_knowledge.models import QAPair
+
+        service = QASearchService()
+        service._ensure_corpus_loaded = MagicMock()
+        old_pairs = [
+            QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=2, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1),
+            QAPair(id=3, question_text="Нет связи", answer_text="Проверьте SIM", group_id=-100, approved=1),
+        ]
+        new_pairs = [
+            QAPair(id=4, question_text="Замена ленты", answer_text="Откройте крышку", group_id=-100, approved=1),
+            QAPair(id=5, question_text="Ошибка продажи", answer_text="Проверьте ФН", group_id=-100, approved=1),
+            QAPair(id=6, question_text="Нет связи", answer_text="Проверьте SIM", group_id=-100, approved=1),
+        ]
+        service._set_corpus(old_pairs, service._tokenize_corpus_pairs(old_pairs))
+        new_tokens = service._tokenize_corpus_pairs(new_pairs)
+        original_dampen = service._dampen_common_query_tokens
+
+        def _dampen_and_swap(*args, **kwargs):
+            # Параллельное обновление публикует корпус того же размера между чтениями корпуса
+            service._set_corpus(new_pairs, new_tokens)
+            return original_dampen(*args, **kwargs)
+
+        with patch.object(service, "_dampen_common_query_tokens", side_effect=_dampen_and_swap):
+            results = service._bm25_search("ошибка продажи", top_k=1)
+
+        self.assertEqual(results[0][0].id, 1)
+        self.assertEqual([pair.id for pair in service._corpus_pairs], [4, 5, 6])
+
+    def test_patch_spellcheck_vocabulary_applies_corpus_delta(self):
+        """Spellcheck-словарь обновляется по дельте: новые токены добавляются, исчезнувшие удаляются."""
+        from src.group_knowledge.qa_search import QASearchService, SymSpell
+        from src.group_knowledge.models import QAPair
+
+        if SymSpell is None:
+            self.skipTest("symspellpy не установлен")
+
+        service = QASearchService()
+        old_pair = QAPair(id=1, question_text="Ошибка продажи", answer_text="Проверьте накопитель", group_id=-100, approved=1)
+        new_pair = QAPair(id=2, question_text="Ошибка печати", answer_text="Замените термоленту", group_id=-100, approved=1)
+        service._set_corpus([old_pair], [[]])
+        self.assertTrue(service._build_spellcheck_vocabulary())
+        previous_sym = service._spellcheck_sym
+
+        service._patch_spellcheck_vocabulary(removed_pairs=[old_pair], added_pairs=[new_pair])
+
+        # Дельта применяется на месте, без копирования словаря
+        self.assertIs(service._spellcheck_sym, previous_sym)
+
+        self.assertEqual(service._spellcheck_token_freq.get("ошибка"), 1)
+        self.assertIn("термоленту", service._spellcheck_token_freq)
+        self.assertNotIn("накопитель", service._spellcheck_token_freq)
+        self.assertIn("термоленту", service._spellcheck_sym.words)
+        self.assertNotIn("накопитель", service._spellcheck_sym.words)
+
     def test_invalidate_corpus_cache(self):
         """invalidate_corpus_cache сбрасывает кэш."""
         from src.group_knowledge.qa_search import QASearchService
@@ -0,0 +1,69 @@
+"""Тесты демона health check (src/sbs_helper_telegram_bot/health_check/health_check_daemon.py)."""
+
+import time
+import unittest
+from unittest.mock import patch
+
+from src.common.runtime_status import ProcessStatus
+from src.sbs_helper_telegram_bot.health_check import health_check_daemon
+
+
+def _pool_snapshot():
+    """Минимальный снимок пула в формате database.get_pool_snapshot()."""
+    stats = {"count": 4, "p95_ms": 12.0, "max_ms": 30.0}
+    return {
+        "pool_size": 5,
+        "opened": 3,
+        "in_use": 1,
+        "idle": 2,
+        "waiting": 0,
+        "peak_waiting": 2,
+        "acquired_total": 40,
+        "timeouts_total": 0,
+        "recycled_stale": 0,
+        "recycled_lifetime": 1,
+        "wait": stats,
+        "hold": stats,
+        "call_sites": {"rag_service.py:100": {"wait": stats, "hold": stats, "timeouts": 0}},
+    }
+
+
+class TestLogDbPoolSnapshot(unittest.TestCase):
+    """Снимок пула берётся из опубликованной статистики процессов, а не из пула демона."""
+
+    @patch.object(health_check_daemon, "get_process_statuses")
+    def test_logs_pool_published_by_bot_process(self, mock_statuses):
+        now = int(time.time())
+        mock_statuses.return_value = [
+            ProcessStatus("gk_responder", "host", 11, {"embedding_cache": {"hits": 1}}, now, now),
+            ProcessStatus("telegram_bot", "host", 12, {"db_pool": _pool_snapshot()}, now, now),
+        ]
+
+        with self.assertLogs(health_check_daemon.logger, level="INFO") as logs:
+            health_check_daemon._log_db_pool_snapshot()
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("DB pool telegram_bot[host:12]", logs.output[0])
+        self.assertIn("acquired=40", logs.output[0])
+        self.assertIn("call site rag_service.py:100", logs.output[1])
+
+    @patch.object(health_check_daemon, "get_process_statuses", side_effect=Exception("db down"))
+    def test_read_error_is_logged_and_not_raised(self, _mock_statuses):
+        with self.assertLogs(health_check_daemon.logger, level="WARNING") as logs:
+            health_check_daemon._log_db_pool_snapshot()
+
+        self.assertIn("db down", logs.output[0])
+
+    @patch.object(health_check_daemon, "get_process_statuses")
+    def test_malformed_snapshot_does_not_stop_daemon(self, mock_statuses):
+        now = int(time.time())
+        mock_statuses.return_value = [ProcessStatus("telegram_bot", "host", 12, {"db_pool": {"pool_size": 5}}, now, now)]
+
+        with self.assertLogs(health_check_daemon.logger, level="WARNING") as logs:
+            health_check_daemon._log_db_pool_snapshot()
+
+        self.assertIn("некорректный снимок", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
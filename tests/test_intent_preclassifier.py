@@ -0,0 +1,224 @@
+"""
+test_intent_preclassifier.py — тесты локального pre-classifier intent.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+
+from src.core.ai.circuit_breaker import CircuitBreaker
+from src.core.ai.context_manager import ConversationContextManager
+from src.core.ai.intent_preclassifier import (
+    CENTROID_EXPLAIN_CODE,
+    IntentCentroidModel,
+    IntentPreclassifier,
+    score_rules,
+)
+from src.core.ai.llm_provider import ClassificationResult
+from src.core.ai.rate_limiter import AIRateLimiter
+from src.sbs_helper_telegram_bot.ai_router.intent_router import IntentRouter
+
+_ALL_MODULES = ["upos_errors", "ktr", "soos", "ai_router", "certification", "news"]
+
+_TICKET = (
+    "Наименование ТСТ: ООО Ромашка\n"
+    "Адрес установки POS-терминала: г. Москва, ул. Ленина, 1\n"
+    "TID: 12345678\n"
+    "Телефон обратной связи: +7 999 111-22-33\n"
+)
+
+
+class TestScoreRules(unittest.TestCase):
+    """Правила: коды UPOS/КТР и тикеты СООС."""
+
+    def _top(self, text):
+        candidates = score_rules(text)
+        return candidates[0] if candidates else None
+
+    def test_upos_codes(self):
+        """Голое число и «ошибка N» — код UPOS с извлечённым кодом."""
+        for text, code in (("99", "99"), ("ошибка 4040", "4040"), ("Код ошибки: 301?", "301"), ("error 42", "42")):
+            with self.subTest(text=text):
+                top = self._top(text)
+                self.assertEqual(top.intent, "upos_error_lookup")
+                self.assertEqual(top.parameters, {"error_code": code})
+                self.assertGreaterEqual(top.confidence, 0.9)
+
+    def test_ktr_codes(self):
+        """«КТР код» — уверенно, голый буквенно-цифровой код — ниже порога по умолчанию."""
+        top = self._top("ктр pos2421")
+        self.assertEqual((top.intent, top.parameters["ktr_code"]), ("ktr_lookup", "POS2421"))
+        self.assertGreaterEqual(top.confidence, 0.9)
+
+        bare = self._top("А01")
+        self.assertEqual(bare.intent, "ktr_lookup")
+        self.assertLess(bare.confidence, 0.9)
+
+    def test_feature_scoring_for_free_phrases(self):
+        """Короткая фраза с ключевым словом и одним числом даёт кандидата ниже порога."""
+        top = self._top("что значит код 42")
+        self.assertEqual((top.intent, top.parameters["error_code"]), ("upos_error_lookup", "42"))
+        self.assertLess(top.confidence, 0.9)
+
+    def test_ticket_with_fields(self):
+        """Многострочный тикет с полями СООС — ticket_soos."""
+        top = self._top(_TICKET)
+        self.assertEqual(top.intent, "ticket_soos")
+        self.assertGreaterEqual(top.confidence, 0.9)
+
+    def test_questions_have_no_candidates(self):
+        """Обычные вопросы и приветствия не распознаются правилами."""
+        for text in ("как оформить заявку по регламенту?", "привет", "ошибка E001 на терминале после обновления ПО"):
+            with self.subTest(text=text):
+                self.assertEqual(score_rules(text), [])
+
+
+class TestIntentPreclassifier(unittest.IsolatedAsyncioTestCase):
+    """Порог, включённые модули, centroid-модель и статистика."""
+
+    async def test_threshold_and_enabled_modules(self):
+        """Ниже порога или при выключенном модуле — None (нужен LLM)."""
+        preclassifier = IntentPreclassifier(min_confidence=0.9)
+
+        result = await preclassifier.classify("ошибка 99", _ALL_MODULES)
+        self.assertEqual((result.intent, result.explain_code), ("upos_error_lookup", "FAST_ERR_KEYWORD"))
+
+        self.assertIsNone(await preclassifier.classify("ошибка 99", ["ktr"]))
+        self.assertIsNone(await preclassifier.classify("А01", _ALL_MODULES))
+
+        lowered = IntentPreclassifier(min_confidence=0.8)
+        self.assertEqual((await lowered.classify("А01", _ALL_MODULES)).intent, "ktr_lookup")
+
+        stats = preclassifier.stats()
+        self.assertEqual((stats["calls"], stats["hits"]), (3, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3, places=3)
+        self.assertEqual(stats["hits_by_source"], {"rules": 1})
+
+    async def test_centroid_model_routes_confident_messages(self):
+        """Centroid-модель отвечает при достаточном сходстве и отрыве."""
+        model = IntentCentroidModel.train(
+            ["rag_qa", "rag_qa", "news_search", "news_search"],
+            [[1.0, 0.1, 0.0], [0.9, 0.0, 0.1], [0.0, 1.0, 0.0], [0.1, 0.9, 0.0]],
+            embedding_model="test-model",
+        )
+        vectors = {"как прошить терминал": [1.0, 0.05, 0.0], "неясно": [0.7, 0.7, 0.0]}
+        preclassifier = IntentPreclassifier(
+            centroid_model=model,
+            centroid_min_similarity=0.85,
+            centroid_min_margin=0.05,
+            encode_texts=AsyncMock(side_effect=lambda texts: [vectors[texts[0]]]),
+        )
+
+        result = await preclassifier.classify("как прошить терминал", _ALL_MODULES)
+        self.assertEqual((result.intent, result.explain_code), ("rag_qa", CENTROID_EXPLAIN_CODE))
+        self.assertEqual(result.parameters, {"question": "как прошить терминал"})
+
+        self.assertIsNone(await preclassifier.classify("неясно", _ALL_MODULES))
+        self.assertIsNone(await preclassifier.classify("как прошить терминал", ["news"]))
+        self.assertEqual(preclassifier.stats()["hits_by_source"], {"centroid": 1})
+
+    async def test_dialog_context_keeps_only_unambiguous_rules(self):
+        """Посреди диалога голый код и centroid-модель уступают LLM, «ошибка N» — нет."""
+        model = IntentCentroidModel.train(["rag_qa", "news_search"], [[1.0, 0.0], [0.0, 1.0]], embedding_model="m")
+        encode = AsyncMock(return_value=[[1.0, 0.0]])
+        preclassifier = IntentPreclassifier(min_confidence=0.9, centroid_model=model, encode_texts=encode)
+        context = [{"role": "assistant", "content": "Сколько терминалов в точке?"}]
+
+        self.assertIsNone(await preclassifier.classify("3", _ALL_MODULES, context_messages=context))
+        self.assertIsNone(await preclassifier.classify("как прошить терминал", _ALL_MODULES, context_messages=context))
+        encode.assert_not_awaited()
+
+        result = await preclassifier.classify("ошибка 4040", _ALL_MODULES, context_messages=context)
+        self.assertEqual((result.intent, result.explain_code), ("upos_error_lookup", "FAST_ERR_KEYWORD"))
+        self.assertEqual((await preclassifier.classify(_TICKET, _ALL_MODULES, context_messages=context)).intent, "ticket_soos")
+        self.assertEqual((await preclassifier.classify("3", _ALL_MODULES, context_messages=[])).intent, "upos_error_lookup")
+
+    def test_centroid_model_save_and_load(self):
+        """Модель сохраняется в .npz и загружается без изменений; коды UPOS/КТР в неё не входят."""
+        model = IntentCentroidModel.train(
+            ["rag_qa", "news_search", "upos_error_lookup"],
+            [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]],
+            embedding_model="test-model",
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "centroids.npz")
+            model.save(path)
+            loaded = IntentCentroidModel.load(path)
+
+        self.assertEqual(loaded.intents, ["news_search", "rag_qa"])
+        self.assertEqual(loaded.embedding_model, "test-model")
+        self.assertEqual(loaded.sample_counts, {"news_search": 1, "rag_qa": 1})
+        np.testing.assert_allclose(loaded.centroids, model.centroids)
+
+
+class TestIntentRouterFastPath(unittest.IsolatedAsyncioTestCase):
+    """Роутер пропускает LLM-классификацию для уверенных ответов pre-classifier."""
+
+    @patch("src.common.bot_settings.is_module_enabled", return_value=True)
+    @patch("src.common.bot_settings.get_enabled_modules", return_value=["upos_errors", "ktr"])
+    @patch.object(IntentRouter, "_log_to_db")
+    async def test_upos_code_skips_llm(self, mock_log, mock_modules, mock_enabled):
+        """Голый код ошибки обрабатывается без вызова provider.classify."""
+        provider = AsyncMock()
+        router = IntentRouter(
+            provider=provider,
+            rate_limiter=AIRateLimiter(max_requests=100, window_seconds=60),
+            circuit_breaker=CircuitBreaker(failure_threshold=10),
+            context_manager=ConversationContextManager(),
+            preclassifier=IntentPreclassifier(min_confidence=0.9),
+        )
+        handler = AsyncMock()
+        handler.intent_name = "upos_error_lookup"
+        handler.module_key = "upos_errors"
+        handler.execute.return_value = "✅ Код найден"
+        router._handlers["upos_error_lookup"] = handler
+
+        result, status = await router.route("301", user_id=1)
+
+        self.assertEqual((result, status), ("✅ Код найден", "routed"))
+        provider.classify.assert_not_awaited()
+        self.assertEqual(handler.execute.await_args.args[0], {"error_code": "301"})
+        self.assertEqual(mock_log.call_args.kwargs["classification"].explain_code, "FAST_ERR_NUM")
+
+    @patch("src.common.bot_settings.is_module_enabled", return_value=True)
+    @patch("src.common.bot_settings.get_enabled_modules", return_value=["upos_errors", "ktr"])
+    @patch.object(IntentRouter, "_log_to_db")
+    async def test_bare_number_with_dialog_context_goes_to_llm(self, mock_log, mock_modules, mock_enabled):
+        """Число в ответ на вопрос бота классифицирует LLM с историей диалога."""
+        provider = AsyncMock()
+        provider.name = "test"
+        provider.classify.return_value = ClassificationResult(
+            intent="upos_error_lookup",
+            confidence=0.95,
+            parameters={"error_code": "2"},
+            explain_code="ERR_NUM_MATCH",
+        )
+        context_manager = ConversationContextManager()
+        context_manager.add_message(1, "user", "Терминал не печатает чеки")
+        context_manager.add_message(1, "assistant", "Сколько раз вы перезагружали терминал?")
+        router = IntentRouter(
+            provider=provider,
+            rate_limiter=AIRateLimiter(max_requests=100, window_seconds=60),
+            circuit_breaker=CircuitBreaker(failure_threshold=10),
+            context_manager=context_manager,
+            preclassifier=IntentPreclassifier(min_confidence=0.9),
+        )
+        handler = AsyncMock()
+        handler.intent_name = "upos_error_lookup"
+        handler.module_key = "upos_errors"
+        handler.execute.return_value = "✅ Код найден"
+        router._handlers["upos_error_lookup"] = handler
+
+        await router.route("2", user_id=1)
+
+        provider.classify.assert_awaited_once()
+        messages = provider.classify.await_args.args[0]
+        self.assertEqual([message["content"] for message in messages][-2:], ["Сколько раз вы перезагружали терминал?", "2"])
+        self.assertEqual(mock_log.call_args.kwargs["classification"].explain_code, "ERR_NUM_MATCH")
+
+
+if __name__ == "__main__":
+    unittest.main()
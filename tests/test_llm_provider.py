@@ -6,12 +6,15 @@ import unittest
 from unittest.mock import patch, MagicMock, AsyncMock
 import httpx
 
+from src.core.ai.db_log_sink import flush_db_log_sink
 from src.core.ai.llm_provider import (
     ClassificationResult,
     DeepSeekProvider,
     GigaChatProvider,
     LLMProviderTemporaryError,
+    close_llm_http_clients,
     get_provider,
+    get_shared_http_client,
     register_provider,
 )
 
@@ -261,7 +264,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """_call_api отправляет в payload активную модель из настроек."""
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
 
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -282,7 +285,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """При включённом флаге логируются prompt payload и сырой ответ модели."""
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "choices": [{"message": {"content": "raw model response"}}]
@@ -302,7 +305,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """_call_api для классификации берёт отдельную модель классификатора."""
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
 
         mock_response = MagicMock()
         mock_response.json.return_value = {
@@ -322,7 +325,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """chat использует model_override для конкретного вызова."""
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "choices": [{"message": {"content": "ok"}}]
@@ -436,7 +439,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """При пустом ответе reasoner выполняется автоповтор на deepseek-chat."""
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
 
         first_response = MagicMock()
         first_response.json.return_value = {
@@ -470,7 +473,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """При таймауте выполняется один повтор, и успешный второй ответ возвращается."""
         provider = DeepSeekProvider(api_key="test_key", model="deepseek-chat")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
 
         success_response = MagicMock()
         success_response.json.return_value = {
@@ -495,7 +498,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """После всех попыток (max_attempts=2) _call_api выбрасывает LLMProviderTemporaryError."""
         provider = DeepSeekProvider(api_key="test_key", model="deepseek-chat")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_client.post = AsyncMock(side_effect=httpx.ReadTimeout(""))
 
         with self.assertRaises(LLMProviderTemporaryError):
@@ -508,7 +511,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         """_call_api корректно извлекает текст из content в list-формате."""
         provider = DeepSeekProvider(api_key="test_key", model="deepseek-chat")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "choices": [
@@ -531,8 +534,8 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
 
     @patch("src.core.ai.llm_provider.logger.warning")
     @patch("src.core.ai.llm_provider.ai_settings.AI_MODEL_IO_DB_LOG_ENABLED", True)
-    @patch("src.core.ai.llm_provider.database.get_cursor")
-    @patch("src.core.ai.llm_provider.database.get_db_connection")
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
     @patch("src.core.ai.llm_provider.httpx.AsyncClient")
     async def test_call_api_logs_and_persists_empty_content_diagnostics_without_retry(
         self,
@@ -542,11 +545,9 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         mock_logger_warning,
     ):
         """Пустой content логируется с диагностикой и пишется в БД как empty_content без fallback."""
-        import asyncio
-
         provider = DeepSeekProvider(api_key="test_key", model="deepseek-chat")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {
@@ -580,7 +581,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, "   ")
 
-        await asyncio.sleep(0.1)
+        await flush_db_log_sink()
 
         self.assertTrue(mock_cursor.execute.called)
         sql_params = mock_cursor.execute.call_args.args[1]
@@ -597,8 +598,8 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         self.assertIn('"finish_reason": "length"', diagnostics_payload)
 
     @patch("src.core.ai.llm_provider.ai_settings.AI_MODEL_IO_DB_LOG_ENABLED", True)
-    @patch("src.core.ai.llm_provider.database.get_cursor")
-    @patch("src.core.ai.llm_provider.database.get_db_connection")
+    @patch("src.core.ai.db_log_sink.database.get_cursor")
+    @patch("src.core.ai.db_log_sink.database.get_db_connection")
     @patch("src.core.ai.llm_provider.httpx.AsyncClient")
     async def test_call_api_stores_masked_full_text_in_db(
         self,
@@ -607,10 +608,9 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         mock_get_cursor,
     ):
         """Полные request/response сохраняются в БД с маскировкой PII."""
-        import asyncio
         provider = DeepSeekProvider(api_key="test_key")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "choices": [{"message": {"content": "email admin@test.ru phone +7 (999) 111-22-33"}}]
@@ -629,8 +629,8 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
             user_id=77,
         )
 
-        # Дождаться завершения background-задач (fire-and-forget логирование)
-        await asyncio.sleep(0.1)
+        # Дождаться записи фоновой очереди логов
+        await flush_db_log_sink()
 
         self.assertTrue(mock_cursor.execute.called)
         sql_params = mock_cursor.execute.call_args.args[1]
@@ -642,7 +642,7 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         self.assertNotIn("111-22-33", sql_params[4])
 
     @patch("src.core.ai.llm_provider.ai_settings.AI_MODEL_IO_DB_LOG_ENABLED", True)
-    @patch("src.core.ai.llm_provider.database.get_db_connection", side_effect=Exception("db down"))
+    @patch("src.core.ai.db_log_sink.database.get_db_connection", side_effect=Exception("db down"))
     @patch("src.core.ai.llm_provider.httpx.AsyncClient")
     async def test_call_api_db_log_failure_does_not_break_response(
         self,
@@ -650,10 +650,9 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         mock_get_db_connection,
     ):
         """Ошибка записи full-text лога в БД не должна ломать основной ответ."""
-        import asyncio
         provider = DeepSeekProvider(api_key="test_key", model="deepseek-chat")
 
-        mock_client = mock_async_client.return_value.__aenter__.return_value
+        mock_client = mock_async_client.return_value
         mock_response = MagicMock()
         mock_response.json.return_value = {
             "choices": [{"message": {"content": "ok"}}]
@@ -664,8 +663,8 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         result = await provider._call_api(messages=[{"role": "user", "content": "hi"}], purpose="chat")
 
         self.assertEqual(result, "ok")
-        # Дождаться завершения background-задач (fire-and-forget логирование)
-        await asyncio.sleep(0.1)
+        # Дождаться записи фоновой очереди логов
+        await flush_db_log_sink()
         self.assertTrue(mock_get_db_connection.called)
 
     @patch("src.core.ai.llm_provider.logger.exception")
@@ -691,5 +690,140 @@ class TestDeepSeekProviderModelResolution(unittest.IsolatedAsyncioTestCase):
         self.assertIs(log_args[2], empty_exc)
 
 
+def _sse_body(*deltas):
+    """Собрать тело SSE-ответа chat/completions из фрагментов content."""
+    lines = [": keep-alive", ""]
+    for delta in deltas:
+        event = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+        lines.extend([f"data: {json.dumps(event, ensure_ascii=False)}", ""])
+    lines.extend(["data: [DONE]", ""])
+    return "\n".join(lines).encode("utf-8")
+
+
+@patch("src.core.ai.llm_provider.ai_settings.AI_MODEL_IO_DB_LOG_ENABLED", False)
+class TestDeepSeekHttpPoolAndStreaming(unittest.IsolatedAsyncioTestCase):
+    """Тесты общего пула соединений и потокового режима DeepSeek."""
+
+    async def asyncTearDown(self):
+        await close_llm_http_clients()
+
+    def _patch_transport(self, handler):
+        """Подменить транспорт пула на httpx.MockTransport."""
+        created = []
+
+        def factory():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            created.append(client)
+            return client
+
+        patcher = patch("src.core.ai.llm_provider._create_http_client", side_effect=factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return created
+
+    async def test_pool_is_shared_between_provider_instances_and_closed_on_shutdown(self):
+        """Экземпляры провайдера переиспользуют один клиент; после закрытия создаётся новый."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+        created = self._patch_transport(handler)
+
+        for _ in range(3):
+            provider = DeepSeekProvider(api_key="k", base_url="http://llm.local", model="deepseek-chat")
+            self.assertEqual(await provider._call_api([{"role": "user", "content": "hi"}]), "ok")
+
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(requests), 3)
+        self.assertIs(get_shared_http_client("http://llm.local"), created[0])
+
+        self.assertEqual(await close_llm_http_clients(), 1)
+        self.assertTrue(created[0].is_closed)
+        self.assertIsNot(get_shared_http_client("http://llm.local"), created[0])
+
+    async def test_stream_chat_yields_deltas_incrementally(self):
+        """stream_chat отправляет stream=true и отдаёт фрагменты content по порядку."""
+        payloads = []
+
+        def handler(request):
+            payloads.append(json.loads(request.content))
+            return httpx.Response(
+                200,
+                content=_sse_body("Пер", "вый ", "ответ"),
+                headers={"Content-Type": "text/event-stream"},
+            )
+
+        self._patch_transport(handler)
+        provider = DeepSeekProvider(api_key="k", base_url="http://llm.local", model="deepseek-chat")
+
+        chunks = [
+            chunk
+            async for chunk in provider.stream_chat([{"role": "user", "content": "hi"}], system_prompt="sys")
+        ]
+
+        self.assertEqual(chunks, ["Пер", "вый ", "ответ"])
+        self.assertTrue(payloads[0]["stream"])
+        self.assertEqual(payloads[0]["messages"][0], {"role": "system", "content": "sys"})
+
+    async def test_stream_chat_retries_network_error_before_first_chunk(self):
+        """Сетевая ошибка до первого фрагмента повторяется, HTTP-ошибка пробрасывается."""
+        calls = {"count": 0}
+
+        def handler(request):
+            calls["count"] += 1
+            if calls["count"] == 1:
+                raise httpx.ConnectError("refused", request=request)
+            if calls["count"] == 2:
+                return httpx.Response(200, content=_sse_body("ok"))
+            return httpx.Response(500, text="boom")
+
+        self._patch_transport(handler)
+        provider = DeepSeekProvider(api_key="k", base_url="http://llm.local", model="deepseek-chat")
+
+        with patch("src.core.ai.llm_provider.asyncio.sleep", new=AsyncMock()):
+            chunks = [chunk async for chunk in provider.stream_chat([], system_prompt="sys")]
+        self.assertEqual(chunks, ["ok"])
+        self.assertEqual(calls["count"], 2)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            async for _ in provider.stream_chat([], system_prompt="sys"):
+                pass
+
+    async def test_stream_chat_does_not_retry_after_first_chunk(self):
+        """Обрыв потока после первого фрагмента не повторяет запрос (фрагмент уже показан)."""
+        calls = {"count": 0}
+
+        async def broken_body():
+            yield _sse_body("Пер").split(b"data: [DONE]")[0]
+            raise httpx.ReadError("connection reset")
+
+        def handler(request):
+            calls["count"] += 1
+            return httpx.Response(200, content=broken_body())
+
+        self._patch_transport(handler)
+        provider = DeepSeekProvider(api_key="k", base_url="http://llm.local", model="deepseek-chat")
+
+        chunks = []
+        with patch("src.core.ai.llm_provider.asyncio.sleep", new=AsyncMock()):
+            with self.assertRaises(LLMProviderTemporaryError):
+                async for chunk in provider.stream_chat([], system_prompt="sys"):
+                    chunks.append(chunk)
+
+        self.assertEqual(chunks, ["Пер"])
+        self.assertEqual(calls["count"], 1)
+
+    def test_parse_stream_line(self):
+        """Служебные строки SSE игнорируются, [DONE] завершает поток."""
+        parse = DeepSeekProvider._parse_stream_line
+        self.assertEqual(parse('data: {"choices": [{"delta": {"content": "a"}}]}'), "a")
+        self.assertEqual(parse('data: {"choices": [{"delta": {"reasoning_content": "r"}}]}'), "")
+        self.assertEqual(parse(": ping"), "")
+        self.assertEqual(parse("data: not-json"), "")
+        self.assertIsNone(parse("data: [DONE]"))
+
+
 if __name__ == "__main__":
     unittest.main()
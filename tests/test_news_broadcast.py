@@ -0,0 +1,299 @@
+"""
+test_news_broadcast.py — тесты движка рассылки новостей.
+"""
+
+import asyncio
+import time
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from src.sbs_helper_telegram_bot.news import news_logic
+from src.sbs_helper_telegram_bot.news.broadcast import AsyncTokenBucket, DeliveryLogBuffer, NewsBroadcaster
+
+
+class FakeBot:
+    """Фейковый бот: фиксирует отправки и выбрасывает заданные ошибки."""
+
+    def __init__(self, latency=0.0, errors=None):
+        self.latency = latency
+        # {(chat_id, method): [исключения по очереди]}
+        self.errors = errors or {}
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _send(self, method, chat_id):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            queued = self.errors.get((chat_id, method))
+            if queued:
+                raise queued.pop(0)
+            self.calls.append((chat_id, method, time.monotonic()))
+        finally:
+            self.in_flight -= 1
+
+    async def send_message(self, chat_id, **kwargs):
+        await self._send("message", chat_id)
+
+    async def send_photo(self, chat_id, **kwargs):
+        await self._send("photo", chat_id)
+
+    async def send_document(self, chat_id, **kwargs):
+        await self._send("document", chat_id)
+
+
+async def _send_message(bot, chat_id):
+    await bot.send_message(chat_id=chat_id, text="news")
+
+
+async def _send_document(bot, chat_id):
+    await bot.send_document(chat_id=chat_id, document="file")
+
+
+class RecordingWriter:
+    """Синхронная запись пачек журнала доставки в память."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, news_id, rows):
+        self.batches.append((news_id, list(rows)))
+        return True
+
+    @property
+    def rows(self):
+        return [row for _, batch in self.batches for row in batch]
+
+
+def _broadcaster(bot, writer, **overrides):
+    options = dict(
+        concurrency=8,
+        rate_per_second=1000.0,
+        burst=1000,
+        per_chat_interval_seconds=0.0,
+        max_retries=3,
+        retry_base_delay_seconds=0.01,
+        log_batch_size=100,
+        log_flush_seconds=60.0,
+    )
+    options.update(overrides)
+    return NewsBroadcaster(bot, delivery_writer=writer, **options)
+
+
+class TestAsyncTokenBucket(unittest.IsolatedAsyncioTestCase):
+    """Token bucket: средняя скорость, всплеск и пауза."""
+
+    async def test_rate_and_burst(self):
+        """Первые burst токенов выдаются сразу, остальные — со скоростью rate."""
+        bucket = AsyncTokenBucket(rate_per_second=50.0, capacity=5)
+        started = time.monotonic()
+        stamps = []
+
+        async def take():
+            await bucket.acquire()
+            stamps.append(time.monotonic() - started)
+
+        await asyncio.gather(*(take() for _ in range(15)))
+
+        stamps.sort()
+        self.assertLess(stamps[4], 0.05)
+        # 10 токенов сверх всплеска при 50/с — не раньше ~0.2 с
+        self.assertGreaterEqual(stamps[-1], 0.18)
+
+    async def test_pause_delays_pending_tokens(self):
+        """Пауза после выдачи слота задерживает и уже ожидающих."""
+        bucket = AsyncTokenBucket(rate_per_second=20.0, capacity=1)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        bucket.pause(0.2)
+        started = time.monotonic()
+
+        await waiter
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+
+class TestDeliveryLogBuffer(unittest.IsolatedAsyncioTestCase):
+    """Пакетная запись журнала доставки."""
+
+    async def test_rows_kept_when_write_fails(self):
+        """При ошибке записи пачка остаётся в буфере и пишется следующей попыткой."""
+        results = iter([False, True])
+        written = []
+
+        def writer(news_id, rows):
+            ok = next(results)
+            if ok:
+                written.extend(rows)
+            return ok
+
+        buffer = DeliveryLogBuffer(1, writer, batch_size=2, flush_interval_seconds=60.0)
+        await buffer.add(10, "sent")
+        await buffer.add(11, "failed", "err")
+        self.assertEqual(buffer.pending, 2)
+
+        await buffer.add(12, "sent")
+
+        self.assertEqual(buffer.pending, 0)
+        self.assertEqual([row[0] for row in written], [10, 11, 12])
+
+
+class TestNewsBroadcaster(unittest.IsolatedAsyncioTestCase):
+    """Рассылка: параллельность, лимиты, повторы и журнал."""
+
+    async def test_concurrent_senders_and_batched_log(self):
+        """Получатели обслуживаются параллельно, журнал пишется пачками."""
+        bot = FakeBot(latency=0.02)
+        writer = RecordingWriter()
+        progress = []
+
+        async def on_progress(sent, failed, total):
+            progress.append((sent, failed, total))
+
+        with patch("src.sbs_helper_telegram_bot.news.settings.BROADCAST_PROGRESS_INTERVAL", 50):
+            results = await _broadcaster(bot, writer, log_batch_size=40).broadcast(
+                7, [_send_message], range(200), on_progress
+            )
+
+        self.assertEqual((results["sent"], results["failed"]), (200, 0))
+        self.assertEqual(bot.max_in_flight, 8)
+        self.assertEqual(sorted(row[0] for row in writer.rows), list(range(200)))
+        self.assertEqual([len(batch) for _, batch in writer.batches], [40] * 5)
+        self.assertEqual([item[0] for item in progress], [50, 100, 150, 200])
+
+    async def test_global_rate_limit(self):
+        """Общая скорость не превышает rate_per_second при любой параллельности."""
+        bot = FakeBot()
+        started = time.monotonic()
+
+        await _broadcaster(bot, RecordingWriter(), rate_per_second=100.0, burst=1, concurrency=16).broadcast(
+            1, [_send_message], range(30)
+        )
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.28)
+
+    async def test_retry_after_pauses_all_senders(self):
+        """RetryAfter одного получателя останавливает остальных на время паузы."""
+        bot = FakeBot(errors={(0, "message"): [RetryAfter(timedelta(milliseconds=300))]})
+        writer = RecordingWriter()
+        started = time.monotonic()
+
+        results = await _broadcaster(bot, writer, concurrency=4).broadcast(1, [_send_message], range(40))
+
+        self.assertEqual((results["sent"], results["failed"], results["retries"]), (40, 0, 1))
+        # После RetryAfter в первых отправках большая часть ушла после паузы
+        late = [stamp - started for chat_id, _, stamp in bot.calls if stamp - started >= 0.28]
+        self.assertGreaterEqual(len(late), 30)
+
+    async def test_permanent_errors_fail_without_retry(self):
+        """Forbidden и BadRequest не повторяются, сетевая ошибка повторяется."""
+        bot = FakeBot(errors={
+            (1, "message"): [Forbidden("bot was blocked by the user")],
+            (2, "message"): [BadRequest("Chat not found")],
+            (3, "message"): [NetworkError("connection reset"), NetworkError("connection reset")],
+        })
+        writer = RecordingWriter()
+
+        results = await _broadcaster(bot, writer).broadcast(5, [_send_message], [1, 2, 3, 4])
+
+        self.assertEqual((results["sent"], results["failed"], results["retries"]), (2, 2, 2))
+        statuses = {user_id: (status, error) for user_id, status, error in writer.rows}
+        self.assertEqual(statuses[1], ("failed", "bot was blocked by the user"))
+        self.assertEqual(statuses[3], ("sent", None))
+
+    async def test_retry_resumes_from_failed_step(self):
+        """Повтор после ошибки вложения не дублирует статью; шаги в чат разнесены."""
+        bot = FakeBot(errors={(1, "document"): [NetworkError("timeout")]})
+
+        results = await _broadcaster(bot, RecordingWriter(), per_chat_interval_seconds=0.1).broadcast(
+            5, [_send_message, _send_document], [1]
+        )
+
+        self.assertEqual(results["sent"], 1)
+        self.assertEqual([method for _, method, _ in bot.calls], ["message", "document"])
+        self.assertGreaterEqual(bot.calls[1][2] - bot.calls[0][2], 0.1)
+
+    async def test_retries_exhausted(self):
+        """После max_retries сетевых ошибок доставка считается неудачной."""
+        bot = FakeBot(errors={(1, "message"): [NetworkError("down")] * 5})
+        writer = RecordingWriter()
+
+        results = await _broadcaster(bot, writer, max_retries=2).broadcast(5, [_send_message], [1])
+
+        self.assertEqual((results["failed"], results["retries"]), (1, 3))
+        self.assertEqual(writer.rows, [(1, "failed", "down")])
+
+    async def test_cancel_flushes_checkpoint(self):
+        """При отмене рассылки уже обработанные получатели записываются в журнал."""
+        bot = FakeBot(latency=0.01)
+        writer = RecordingWriter()
+        broadcaster = _broadcaster(bot, writer, concurrency=1, rate_per_second=50.0, burst=1)
+        task = asyncio.create_task(broadcaster.broadcast(5, [_send_message], range(100)))
+        await asyncio.sleep(0.2)
+
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        logged = [row[0] for row in writer.rows]
+        self.assertTrue(0 < len(logged) < 100)
+        self.assertEqual(logged, [chat_id for chat_id, _, _ in bot.calls])
+
+
+class TestBroadcastNews(unittest.IsolatedAsyncioTestCase):
+    """broadcast_news: контрольная точка и возобновление."""
+
+    def setUp(self):
+        self.article = {"id": 9, "title": "Заголовок", "content": "Текст", "published_timestamp": 1700000000}
+        self.writer = RecordingWriter()
+        for patcher in (
+            patch.object(news_logic, "get_article_reactions", return_value={}),
+            patch.object(news_logic, "log_deliveries", side_effect=self.writer),
+            patch.object(news_logic, "mark_broadcast_started", return_value=True),
+            patch.object(news_logic, "mark_broadcast_finished", return_value=True),
+        ):
+            self.addCleanup(patcher.stop)
+            setattr(self, f"mock_{patcher.attribute}", patcher.start())
+
+    async def test_resume_skips_delivered_users(self):
+        """Пользователи со статусом sent не получают новость повторно."""
+        bot = FakeBot()
+
+        with patch.object(news_logic, "get_delivered_user_ids", return_value={1, 3}):
+            results = await news_logic.broadcast_news(bot, self.article, [1, 2, 3, 4, 2])
+
+        self.assertEqual((results["sent"], results["skipped"], results["total"]), (2, 2, 4))
+        self.assertEqual(sorted(chat_id for chat_id, _, _ in bot.calls), [2, 4])
+        self.mock_mark_broadcast_started.assert_called_once_with(9, 4)
+        self.mock_mark_broadcast_finished.assert_called_once_with(9, "completed")
+
+    async def test_interrupted_broadcasts_resumed_or_abandoned(self):
+        """Опубликованная новость дорассылается, исчерпавшая попытки — отменяется."""
+        articles = {
+            9: dict(self.article, status="published", is_silent=0),
+            10: dict(self.article, id=10, status="published", is_silent=0),
+        }
+        states = [{"news_id": 9, "attempts": 1}, {"news_id": 10, "attempts": 99}]
+        bot = FakeBot()
+
+        with patch.object(news_logic, "get_interrupted_broadcasts", return_value=states), patch.object(
+            news_logic, "get_article_by_id", side_effect=articles.get
+        ), patch.object(news_logic, "get_all_user_ids", return_value=[1, 2]), patch.object(
+            news_logic, "get_delivered_user_ids", return_value={1}
+        ):
+            resumed = await news_logic.resume_interrupted_broadcasts(bot)
+
+        self.assertEqual(resumed, 1)
+        self.assertEqual([chat_id for chat_id, _, _ in bot.calls], [2])
+        self.mock_mark_broadcast_finished.assert_any_call(10, "abandoned")
+
+
+if __name__ == "__main__":
+    unittest.main()
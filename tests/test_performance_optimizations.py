@@ -3,7 +3,7 @@
 
 Покрывает:
 - Пул соединений MySQL (database.py)
-- TTL-кеш настроек (bot_settings.py)
+- Снимок настроек с инвалидацией по версии (bot_settings.py)
 - Пакетная загрузка настроек модулей (bot_settings.py)
 - Консолидированная проверка авторизации (telegram_user.py)
 - Кеш статуса здоровья (health_check.py)
@@ -15,6 +15,7 @@ from unittest.mock import MagicMock, patch
 
 from src.common import database
 from src.common import bot_settings
+from src.common.settings_snapshot import reset_settings_snapshot
 from src.common.telegram_user import get_user_auth_status, UserAuthStatus
 
 
@@ -79,118 +80,144 @@ class TestConnectionPool(unittest.TestCase):
         self.assertIsNone(database._connection_pool)
 
 
+def _mock_settings_db(mock_database, rows, versions=None):
+    """Настроить мок БД: fetchall отдаёт версии или строки bot_settings по последнему запросу."""
+    mock_conn = MagicMock()
+    mock_cursor = MagicMock()
+    mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
+    mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
+    state = {'rows': rows, 'versions': versions or [{'scope': 'bot_settings', 'version': 1}]}
+
+    def fetchall():
+        query = mock_cursor.execute.call_args[0][0]
+        return state['versions'] if 'settings_version' in query else state['rows']
+
+    mock_cursor.fetchall.side_effect = fetchall
+    return mock_cursor, state
+
+
+def _table_loads(mock_cursor):
+    """Число полных загрузок таблицы bot_settings."""
+    return sum(1 for call in mock_cursor.execute.call_args_list if 'FROM `bot_settings`' in call[0][0])
+
+
 class TestSettingsCache(unittest.TestCase):
-    """Тесты TTL-кеша настроек."""
+    """Тесты снимка настроек бота."""
 
     def setUp(self):
-        bot_settings.clear_settings_cache()
+        reset_settings_snapshot()
 
     def tearDown(self):
-        bot_settings.clear_settings_cache()
+        reset_settings_snapshot()
 
-    @patch('src.common.bot_settings.database')
+    @patch('src.common.settings_snapshot.database')
     def test_get_setting_caches_result(self, mock_database):
-        """Повторный вызов get_setting() берёт значение из кеша, а не из БД."""
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = {'setting_value': 'cached_value'}
+        """Повторный вызов get_setting() берёт значение из снимка, а не из БД."""
+        mock_cursor, _ = _mock_settings_db(
+            mock_database, [{'setting_key': 'test_key', 'setting_value': 'cached_value'}]
+        )
 
-        # Первый вызов — обращение к БД
+        # Первый вызов — загрузка всей таблицы
         result1 = bot_settings.get_setting('test_key')
         self.assertEqual(result1, 'cached_value')
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
-        # Второй вызов — из кеша, execute не вызывается повторно
+        # Второй вызов — из снимка, таблица повторно не читается
         result2 = bot_settings.get_setting('test_key')
         self.assertEqual(result2, 'cached_value')
-        self.assertEqual(mock_cursor.execute.call_count, 1)  # Не увеличилось
+        self.assertEqual(mock_cursor.execute.call_count, 2)  # версии + таблица
 
-    @patch('src.common.bot_settings.database')
+    @patch('src.common.settings_snapshot.database')
     def test_get_setting_caches_none(self, mock_database):
-        """None-результат (настройка не найдена) тоже кешируется."""
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = None
+        """Отсутствующая настройка (None) тоже отдаётся из снимка."""
+        mock_cursor, _ = _mock_settings_db(mock_database, [])
 
         result1 = bot_settings.get_setting('missing_key')
         self.assertIsNone(result1)
 
         result2 = bot_settings.get_setting('missing_key')
         self.assertIsNone(result2)
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
     @patch('src.common.bot_settings.database')
-    def test_set_setting_clears_cache(self, mock_database):
-        """set_setting() сбрасывает кеш, чтобы новое значение стало доступным."""
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = {'setting_value': 'old'}
+    @patch('src.common.settings_snapshot.database')
+    def test_set_setting_clears_cache(self, mock_database, mock_write_database):
+        """set_setting() увеличивает версию и сбрасывает снимок, чтобы новое значение стало доступным."""
+        mock_cursor, state = _mock_settings_db(
+            mock_database, [{'setting_key': 'key1', 'setting_value': 'old'}]
+        )
+        write_cursor = MagicMock()
+        mock_write_database.get_cursor.return_value.__enter__.return_value = write_cursor
 
-        # Кешируем
+        # Загружаем снимок
         bot_settings.get_setting('key1')
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
-        # Обновляем — кеш должен сброситься
+        # Обновляем — версия увеличивается в той же транзакции, снимок сбрасывается
         bot_settings.set_setting('key1', 'new', 123)
+        self.assertIn('settings_version', write_cursor.execute.call_args_list[-1][0][0])
 
-        # Следующий get_setting должен снова обратиться к БД
-        mock_cursor.fetchone.return_value = {'setting_value': 'new'}
+        # Следующий get_setting должен снова загрузить таблицу
+        state['rows'] = [{'setting_key': 'key1', 'setting_value': 'new'}]
         result = bot_settings.get_setting('key1')
         self.assertEqual(result, 'new')
-        # execute вызван: 1 (get) + 1 (set) + 1 (get after clear) = 3
-        self.assertEqual(mock_cursor.execute.call_count, 3)
-
-    def test_cache_ttl_expiry(self):
-        """Кеш истекает после _SETTINGS_CACHE_TTL секунд."""
-        # Вручную помещаем в кеш запись с истёкшим TTL
-        bot_settings._settings_cache['expired_key'] = ('value', time.monotonic() - 120)
-
-        result = bot_settings._cache_get('expired_key')
-        self.assertIs(result, bot_settings._CACHE_MISS)
+        self.assertEqual(_table_loads(mock_cursor), 2)
 
-    def test_clear_settings_cache(self):
-        """clear_settings_cache() полностью очищает кеш."""
-        bot_settings._cache_put('key1', 'val1')
-        bot_settings._cache_put('key2', 'val2')
+    @patch('src.common.settings_snapshot.database')
+    def test_snapshot_reloads_only_on_version_change(self, mock_database):
+        """После интервала проверки таблица перечитывается, только если изменилась версия."""
+        mock_cursor, state = _mock_settings_db(
+            mock_database, [{'setting_key': 'key1', 'setting_value': 'v1'}]
+        )
+        now = [1000.0]
+
+        with patch('src.common.settings_snapshot.time.monotonic', side_effect=lambda: now[0]):
+            self.assertEqual(bot_settings.get_setting('key1'), 'v1')
+
+            now[0] += 2
+            self.assertEqual(bot_settings.get_setting('key1'), 'v1')
+            self.assertEqual(_table_loads(mock_cursor), 1)
+
+            # Другой процесс изменил настройку и увеличил версию
+            state['rows'] = [{'setting_key': 'key1', 'setting_value': 'v2'}]
+            state['versions'] = [{'scope': 'bot_settings', 'version': 2}]
+            now[0] += 2
+            self.assertEqual(bot_settings.get_setting('key1'), 'v2')
+            self.assertEqual(_table_loads(mock_cursor), 2)
+
+    @patch('src.common.settings_snapshot.database')
+    def test_clear_settings_cache(self, mock_database):
+        """clear_settings_cache() сбрасывает снимок: следующее чтение загружает таблицу заново."""
+        mock_cursor, _ = _mock_settings_db(mock_database, [])
+        bot_settings.get_setting('key1')
 
         bot_settings.clear_settings_cache()
+        bot_settings.get_setting('key1')
 
-        self.assertEqual(len(bot_settings._settings_cache), 0)
+        self.assertEqual(_table_loads(mock_cursor), 2)
 
 
 class TestBatchModuleSettings(unittest.TestCase):
     """Тесты пакетной загрузки настроек модулей."""
 
     def setUp(self):
-        bot_settings.clear_settings_cache()
+        reset_settings_snapshot()
 
     def tearDown(self):
-        bot_settings.clear_settings_cache()
+        reset_settings_snapshot()
 
-    @patch('src.common.bot_settings.database')
+    @patch('src.common.settings_snapshot.database')
     def test_get_all_module_states_one_query(self, mock_database):
-        """get_all_module_states() делает один запрос к БД вместо N."""
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
-
-        # Возвращаем все настройки модулей за один запрос
-        mock_cursor.fetchall.return_value = [
+        """get_all_module_states() читает таблицу одним запросом вместо N."""
+        mock_cursor, _ = _mock_settings_db(mock_database, [
             {'setting_key': 'module_certification_enabled', 'setting_value': '1'},
             {'setting_key': 'module_screenshot_enabled', 'setting_value': '0'},
-        ]
+        ])
 
         states = bot_settings.get_all_module_states()
 
-        # Один вызов execute (один запрос), а не 8 отдельных
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        # Одна загрузка таблицы, а не 8 отдельных запросов
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
         # Проверяем что модули с настройками распарсены корректно
         self.assertTrue(states['certification'])
@@ -198,28 +225,23 @@ class TestBatchModuleSettings(unittest.TestCase):
         # Модули без настройки в БД считаются включёнными
         self.assertTrue(states['upos_errors'])
 
-    @patch('src.common.bot_settings.database')
+    @patch('src.common.settings_snapshot.database')
     def test_get_modules_config_uses_batch(self, mock_database):
-        """get_modules_config() загружает настройки пакетно и кеширует."""
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_database.get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_database.get_cursor.return_value.__enter__.return_value = mock_cursor
-
-        mock_cursor.fetchall.return_value = [
+        """get_modules_config() загружает настройки пакетно и берёт их из снимка."""
+        mock_cursor, _ = _mock_settings_db(mock_database, [
             {'setting_key': 'module_certification_enabled', 'setting_value': '1'},
-        ]
+        ])
 
         modules = bot_settings.get_modules_config(enabled_only=True)
 
         # Все модули включены (кроме тех, кто явно '0')
         self.assertTrue(len(modules) > 0)
-        # Один запрос к БД
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        # Одна загрузка таблицы
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
-        # Повторный вызов использует кеш — execute не увеличивается
+        # Повторный вызов использует снимок — запросов не прибавляется
         modules2 = bot_settings.get_modules_config(enabled_only=True)
-        self.assertEqual(mock_cursor.execute.call_count, 1)
+        self.assertEqual(_table_loads(mock_cursor), 1)
 
 
 class TestConsolidatedAuth(unittest.TestCase):
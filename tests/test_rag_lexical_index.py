@@ -0,0 +1,102 @@
+"""
+test_rag_lexical_index.py — тесты инвертированного lexical-индекса RAG.
+"""
+
+import unittest
+
+from rank_bm25 import BM25Okapi
+
+from src.core.ai.rag_lexical_index import IndexedChunkInput, RagLexicalIndex
+
+
+def _chunk(chunk_id, document_id, tokens, chunk_index=0):
+    """Собрать входной чанк для индекса."""
+    return IndexedChunkInput(
+        chunk_id=chunk_id,
+        document_id=document_id,
+        chunk_index=chunk_index,
+        filename=f"doc-{document_id}.txt",
+        chunk_text=" ".join(tokens),
+        tokens=tokens,
+    )
+
+
+_CORPUS = [
+    _chunk(1, 10, ["sla", "выезд", "час", "инцидент"]),
+    _chunk(2, 10, ["sla", "регламент", "выезд"]),
+    _chunk(3, 11, ["отпуск", "график", "смена"]),
+    _chunk(4, 11, ["регламент", "отпуск", "sla"]),
+    _chunk(5, 12, ["касса", "фн", "замена", "фн"]),
+    _chunk(6, 12, []),
+]
+
+
+class TestRagLexicalIndex(unittest.TestCase):
+    """Тесты RagLexicalIndex."""
+
+    def _build(self):
+        index = RagLexicalIndex()
+        index.replace(5, "raw", _CORPUS)
+        return index
+
+    def _assert_bm25_parity(self, index, chunks, query, document_ids=None):
+        corpus = [list(chunk.tokens) or [""] for chunk in chunks]
+        expected = BM25Okapi(corpus, k1=1.5, b=0.75).get_scores(query)
+        actual = index.score_bm25(query, k1=1.5, b=0.75, document_ids=document_ids)
+        for chunk, expected_score in zip(chunks, expected):
+            self.assertAlmostEqual(actual.get(chunk.chunk_id, 0.0), max(0.0, float(expected_score)), places=9)
+
+    def test_bm25_matches_bm25okapi_on_full_corpus(self):
+        """Score по всему индексу совпадает с BM25Okapi (включая epsilon-floor для частых токенов)."""
+        index = self._build()
+        self._assert_bm25_parity(index, _CORPUS, ["sla", "выезд", "фн", "sla"])
+
+    def test_bm25_matches_bm25okapi_on_document_scope(self):
+        """Статистики BM25 считаются по области prefilter-документов, как при scan только этих чанков."""
+        index = self._build()
+        scoped_chunks = [chunk for chunk in _CORPUS if chunk.document_id in {10, 11}]
+        self._assert_bm25_parity(index, scoped_chunks, ["sla", "регламент", "отпуск"], document_ids=[10, 11])
+
+    def test_bm25_returns_only_matching_chunks(self):
+        """Результат содержит только чанки из postings токенов запроса."""
+        index = self._build()
+        scores = index.score_bm25(["замена"], k1=1.5, b=0.75)
+        self.assertEqual(set(scores), {5})
+
+    def test_patch_document_applies_on_expected_version(self):
+        """Инкрементальное добавление документа продвигает версию и сразу участвует в поиске."""
+        index = self._build()
+        applied = index.patch_document(13, [_chunk(7, 13, ["пинпад", "ошибка"])], previous_version=5, new_version=6)
+
+        self.assertTrue(applied)
+        self.assertTrue(index.is_current(6, "raw"))
+        self.assertIn(7, index.score_bm25(["пинпад"], k1=1.5, b=0.75))
+        self._assert_bm25_parity(index, _CORPUS + [_chunk(7, 13, ["пинпад", "ошибка"])], ["пинпад", "sla"])
+
+    def test_drop_document_removes_postings(self):
+        """Удаление документа убирает его чанки и статистики из индекса."""
+        index = self._build()
+        self.assertTrue(index.drop_document(12, previous_version=5, new_version=6))
+
+        self.assertEqual(index.score_bm25(["фн"], k1=1.5, b=0.75), {})
+        self.assertEqual(index.get_stats()["documents"], 2)
+        self._assert_bm25_parity(index, [chunk for chunk in _CORPUS if chunk.document_id != 12], ["sla", "отпуск"])
+
+    def test_patch_out_of_sync_invalidates_index(self):
+        """Если индекс пропустил версию корпуса, патч не применяется и индекс требует перестройки."""
+        index = self._build()
+        applied = index.drop_document(12, previous_version=7, new_version=8)
+
+        self.assertFalse(applied)
+        self.assertFalse(index.is_current(5, "raw"))
+        self.assertEqual(index.version, -1)
+
+    def test_is_current_checks_signature(self):
+        """Смена сигнатуры токенизатора делает индекс неактуальным."""
+        index = self._build()
+        self.assertTrue(index.is_current(5, "raw"))
+        self.assertFalse(index.is_current(5, "ru:lemma_then_stem"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -97,6 +97,53 @@ class TestRagOpsScript(unittest.TestCase):
         self.assertTrue(any("Qdrant подключён" in call.args[0] for call in mock_ok.call_args_list))
         mock_local_vector_index.assert_called_once()
 
+    def test_cmd_health_aggregates_embedding_cache_stats_per_process(self):
+        """health показывает статистику кэша эмбеддингов каждого процесса и сумму по процессам."""
+        from src.common.runtime_status import ProcessStatus
+
+        statuses = [
+            ProcessStatus("telegram_bot", "host", 11, {"embedding_cache": {"hits": 3, "misses": 1, "hit_rate": 0.75}}, 1, 2),
+            ProcessStatus("gk_responder", "host", 12, {"embedding_cache": {"hits": 1, "misses": 3, "hit_rate": 0.25}}, 1, 2),
+        ]
+
+        with patch("src.common.database.get_db_connection", return_value=_FakeConnection()), \
+             patch("src.common.database.get_cursor", return_value=_FakeCursor()), \
+             patch("src.common.runtime_status.get_process_statuses", return_value=statuses), \
+             patch("config.ai_settings.AI_RAG_VECTOR_ENABLED", False), \
+             patch("config.ai_settings.AI_RAG_EMBEDDING_CACHE_ENABLED", True), \
+             patch.object(rag_ops, "_header"), patch.object(rag_ops, "_step"), \
+             patch.object(rag_ops, "_info") as mock_info, \
+             patch.object(rag_ops, "_ok") as mock_ok, patch.object(rag_ops, "_warn"), patch.object(rag_ops, "_err"):
+            rc = rag_ops.cmd_health(argparse.Namespace())
+
+        self.assertEqual(rc, 0)
+        info_lines = [call.args[0] for call in mock_info.call_args_list]
+        self.assertTrue(any(line.startswith("telegram_bot pid=11") and "hits=3" in line for line in info_lines))
+        self.assertTrue(any(line.startswith("gk_responder pid=12") and "hits=1" in line for line in info_lines))
+        ok_lines = [call.args[0] for call in mock_ok.call_args_list]
+        self.assertTrue(any("все процессы: hits=4 misses=4 hit_rate=50.0%" in line for line in ok_lines))
+
+    def test_update_tokens_runs_token_storage_backfill(self):
+        """update tokens вызывает backfill предтокенизированного хранилища с параметрами CLI."""
+        args = rag_ops._build_parser().parse_args(["update", "tokens", "--batch-size", "50", "--dry-run"])
+        self.assertIs(rag_ops._UPDATE_TARGET_MAP[args.update_target], rag_ops.cmd_update_tokens)
+
+        service = MagicMock()
+        service.backfill_token_storage.return_value = {
+            "signature": "raw",
+            "chunks_tokenized": 3,
+            "summaries_tokenized": 1,
+        }
+        with patch("src.core.ai.rag_service.get_rag_service", return_value=service), patch.object(
+            rag_ops, "_header"
+        ), patch.object(rag_ops, "_info"), patch.object(rag_ops, "_ok"), patch.object(
+            rag_ops, "_warn"
+        ), patch.object(rag_ops, "_err"):
+            rc = rag_ops.cmd_update_tokens(args)
+
+        self.assertEqual(rc, 0)
+        service.backfill_token_storage.assert_called_once_with(batch_size=50, dry_run=True)
+
 
 if __name__ == "__main__":
     unittest.main()
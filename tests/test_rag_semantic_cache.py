@@ -0,0 +1,155 @@
+"""
+test_rag_semantic_cache.py — тесты семантического кэша RAG-ответов.
+"""
+
+import json
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from src.core.ai.rag_semantic_cache import SemanticAnswerCache
+from src.core.ai.rag_service import CachedAnswer, RagKnowledgeService
+from src.sbs_helper_telegram_bot.ai_router.messages import AI_PROGRESS_STAGE_RAG_CACHE_HIT
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    """Поиск ближайшего вопроса, разделы, инвалидация и ограничения."""
+
+    def test_lookup_returns_nearest_above_threshold(self):
+        """Попадание — ближайший вопрос с косинусным сходством не ниже порога."""
+        cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.9, ttl_seconds=60)
+        cache.put([1.0, 0.0, 0.0], 3, None, "какой sla", "SLA 4 часа", llm_calls=2)
+        cache.put([0.0, 1.0, 0.0], 3, None, "как прошить терминал", "Прошивка", llm_calls=1)
+
+        hit = cache.lookup([2.0, 0.1, 0.0], 3)
+
+        self.assertEqual((hit.value, hit.question), ("SLA 4 часа", "какой sla"))
+        self.assertGreater(hit.similarity, 0.99)
+        self.assertIsNone(cache.lookup([1.0, 1.0, 0.0], 3))
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["saved_llm_calls"]), (1, 1, 2))
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_partitions_by_corpus_version_and_category(self):
+        """Ответы не переиспользуются между версиями корпуса и категориями."""
+        cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.9, ttl_seconds=60)
+        cache.put([1.0, 0.0], 3, "Регламенты", "какой sla", "SLA 4 часа")
+
+        self.assertIsNotNone(cache.lookup([1.0, 0.0], 3, " регламенты "))
+        self.assertIsNone(cache.lookup([1.0, 0.0], 3, None))
+        self.assertIsNone(cache.lookup([1.0, 0.0], 4, "Регламенты"))
+
+    def test_invalidate_removes_older_versions(self):
+        """invalidate удаляет записи версий корпуса раньше актуальной."""
+        cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.9, ttl_seconds=60)
+        cache.put([1.0, 0.0], 3, None, "q1", "a1")
+        cache.put([0.0, 1.0], 4, None, "q2", "a2")
+
+        self.assertEqual(cache.invalidate(4), 1)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.lookup([0.0, 1.0], 4))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_bounded_by_max_entries_and_ttl(self):
+        """Давно не использованные записи вытесняются, просроченные удаляются."""
+        cache = SemanticAnswerCache(max_entries=2, similarity_threshold=0.9, ttl_seconds=60)
+        cache.put([1.0, 0.0, 0.0], 1, None, "q1", "a1")
+        cache.put([0.0, 1.0, 0.0], 1, None, "q2", "a2")
+        cache.lookup([1.0, 0.0, 0.0], 1)
+        cache.put([0.0, 0.0, 1.0], 1, None, "q3", "a3")
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup([0.0, 1.0, 0.0], 1))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        with patch("src.core.ai.rag_semantic_cache.time.monotonic", return_value=10**9):
+            self.assertIsNone(cache.lookup([1.0, 0.0, 0.0], 1))
+        self.assertEqual((len(cache), cache.stats()["expirations"]), (0, 2))
+
+    def test_codes_in_question_must_match_exactly(self):
+        """«ошибка 4040» и «ошибка 4041» близки по эмбеддингу, но ответ не переиспользуется."""
+        cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.95, ttl_seconds=60)
+        cache.put([1.0, 0.0], 1, None, "ошибка 4040", "Ответ про 4040")
+        cache.put([0.97, 0.2], 1, None, "что значит ошибка 4041", "Ответ про 4041")
+
+        self.assertIsNone(cache.lookup([1.0, 0.0], 1, question="ошибка 4042"))
+        hit = cache.lookup([1.0, 0.0], 1, question="ошибка 4041")
+        self.assertEqual(hit.value, "Ответ про 4041")
+        self.assertEqual(cache.lookup([1.0, 0.01], 1, question="расскажи про ошибку 4040").value, "Ответ про 4040")
+        self.assertIsNone(cache.lookup([1.0, 0.0], 1, question="что значит ошибка"))
+
+    def test_zero_vector_is_ignored(self):
+        """Нулевой вектор не сохраняется и даёт промах."""
+        cache = SemanticAnswerCache(max_entries=10, similarity_threshold=0.9, ttl_seconds=60)
+        cache.put([0.0, 0.0], 1, None, "q", "a")
+
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.lookup([0.0, 0.0], 1))
+
+
+class TestAnswerQuestionSemanticCache(unittest.IsolatedAsyncioTestCase):
+    """Семантический кэш в answer_question."""
+
+    _VECTORS = {
+        "Какой SLA?": [1.0, 0.0, 0.0],
+        "Какой SLA по заявкам?": [0.99, 0.05, 0.0],
+        "Как прошить терминал?": [0.0, 1.0, 0.0],
+    }
+
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_spellcheck_enabled", return_value=False)
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_hyde_enabled", return_value=False)
+    @patch("src.core.ai.rag_service.RagKnowledgeService._get_corpus_version", return_value=3)
+    @patch("src.core.ai.rag_service.RagKnowledgeService._retrieve_context_for_question")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._log_query")
+    @patch("src.core.ai.llm_provider.get_provider")
+    async def test_paraphrase_served_without_llm(
+        self,
+        mock_get_provider,
+        _mock_log_query,
+        mock_retrieve,
+        _mock_version,
+        _mock_hyde,
+        _mock_spellcheck,
+    ):
+        """Перефразированный вопрос получает сохранённый ответ без retrieval и LLM."""
+        service = RagKnowledgeService(cache_ttl_seconds=300)
+        mock_retrieve.return_value = ([(1.2, "reglament.txt", "SLA 4 часа", 1)], [])
+        provider = AsyncMock()
+        provider.chat.return_value = json.dumps({"answer": "SLA составляет 4 часа", "question_answered": True})
+        mock_get_provider.return_value = provider
+        progress = AsyncMock()
+
+        with patch.object(service, "_encode_question_for_semantic_cache", side_effect=self._VECTORS.get):
+            first = await service.answer_question("Какой SLA?", user_id=1)
+            second = await service.answer_question("Какой SLA по заявкам?", user_id=2, on_progress=progress)
+            other = await service.answer_question("Как прошить терминал?", user_id=3)
+
+        self.assertEqual(first.text, "SLA составляет 4 часа")
+        self.assertEqual((second.text, second.is_fallback), ("SLA составляет 4 часа", False))
+        self.assertEqual(other.text, "SLA составляет 4 часа")
+        self.assertEqual(provider.chat.await_count, 2)
+        self.assertEqual(mock_retrieve.call_count, 2)
+
+        stage, payload = progress.await_args_list[-1].args
+        self.assertEqual(stage, AI_PROGRESS_STAGE_RAG_CACHE_HIT)
+        self.assertGreater(payload["semantic_similarity"], 0.95)
+
+        stats = service.get_cache_stats()[1]
+        self.assertEqual(stats["name"], "rag_semantic_answer")
+        self.assertEqual((stats["hits"], stats["saved_llm_calls"]), (1, 1))
+
+    def test_corpus_change_invalidates_semantic_cache(self):
+        """Изменение корпуса удаляет записи прежних версий."""
+        service = RagKnowledgeService(cache_ttl_seconds=300)
+        cached = CachedAnswer(answer="SLA 4 часа")
+        service._semantic_answer_cache.put([1.0, 0.0], 3, None, "какой sla", cached)
+
+        service._clear_expired_cache()
+        self.assertEqual(len(service._semantic_answer_cache), 1)
+
+        service._clear_expired_cache(4)
+        self.assertEqual(len(service._semantic_answer_cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,12 +8,32 @@ import json
 import unittest
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import mysql.connector
+
 from src.sbs_helper_telegram_bot.ai_router.messages import (
     AI_PROGRESS_STAGE_RAG_CACHE_HIT,
     AI_PROGRESS_STAGE_RAG_AUGMENTED_REQUEST_STARTED,
     AI_PROGRESS_STAGE_RAG_PREFILTER_STARTED,
 )
-from src.core.ai.rag_service import RagAnswer, RagKnowledgeService, preload_rag_runtime_dependencies
+from src.core.ai.bm25_engine import SparseBM25Index
+from src.core.ai.embedding_cache import EmbeddingCache
+from src.core.ai.rag_lexical_index import IndexedChunkInput
+from src.core.ai.rag_service import (
+    RagAnswer,
+    RagKnowledgeService,
+    _SummaryCorpus,
+    preload_rag_runtime_dependencies,
+)
+from src.core.ai.vector_search import LocalEmbeddingProvider
+
+
+def _make_summary_corpus(summaries, version=1):
+    """Собрать снимок summary из пар (document_id, summary_text)."""
+    return _SummaryCorpus(
+        key=(version, "test-signature"),
+        rows=[(document_id, f"doc{document_id}.txt", summary_text, "") for document_id, summary_text in summaries],
+        tokens=[[] for _ in summaries],
+    )
 
 
 class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
@@ -513,11 +533,13 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         cursor = mock_get_cursor.return_value.__enter__.return_value
         cursor.fetchall.return_value = [
             {
+                "id": 2,
                 "chunk_text": "SLA выезда 4 часа при критическом инциденте",
                 "chunk_index": 8,
                 "filename": "reglament.txt",
             },
             {
+                "id": 1,
                 "chunk_text": "Нерелевантный текст про отпуск",
                 "chunk_index": 2,
                 "filename": "other.txt",
@@ -540,18 +562,21 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         cursor = mock_get_cursor.return_value.__enter__.return_value
         cursor.fetchall.return_value = [
             {
+                "id": 3,
                 "chunk_text": "SLA выезда 4 часа при критическом инциденте",
                 "chunk_index": 8,
                 "filename": "reglament.txt",
                 "document_id": 11,
             },
             {
+                "id": 2,
                 "chunk_text": "Общие правила графика отпусков",
                 "chunk_index": 2,
                 "filename": "other.txt",
                 "document_id": 12,
             },
             {
+                "id": 1,
                 "chunk_text": "Регламент отпусков и графика смен",
                 "chunk_index": 3,
                 "filename": "other2.txt",
@@ -565,6 +590,194 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result[0][1], "reglament.txt")
         self.assertEqual(result[0][4], 8)
 
+    @patch("src.core.ai.rag_service.ai_settings.get_rag_lexical_scorer", return_value="bm25")
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_search_relevant_chunks_builds_lexical_index_once_per_version(
+        self, mock_get_cursor, mock_get_db_connection, mock_norm, mock_mode
+    ):
+        """Чанки загружаются и токенизируются один раз на версию корпуса, а не на каждый вопрос."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [
+            {"id": 2, "chunk_text": "SLA выезда 4 часа", "chunk_index": 1, "filename": "a.txt", "document_id": 11},
+            {"id": 1, "chunk_text": "График отпусков", "chunk_index": 0, "filename": "b.txt", "document_id": 12},
+            {"id": 3, "chunk_text": "Замена ФН на кассе", "chunk_index": 0, "filename": "c.txt", "document_id": 13},
+        ]
+        corpus_version = {"value": 3}
+
+        with patch.object(service, "_get_corpus_version", side_effect=lambda: corpus_version["value"]):
+            with patch.object(service, "_tokenize", wraps=service._tokenize) as mock_tokenize:
+                service._search_relevant_chunks("SLA выезда", limit=1)
+                service._search_relevant_chunks("график отпусков", limit=1)
+                self.assertEqual(cursor.execute.call_count, 1)
+                # 3 чанка при построении индекса + 2 вопроса
+                self.assertEqual(mock_tokenize.call_count, 3 + 2)
+
+                corpus_version["value"] = 4
+                result, _ = service._search_relevant_chunks("SLA", limit=1)
+
+        self.assertEqual(cursor.execute.call_count, 2)
+        self.assertEqual(result[0][1], "a.txt")
+
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_load_lexical_index_chunks_rejects_rows_without_id(self, mock_get_cursor, mock_get_db_connection):
+        """Строка чанка без id не получает выдуманный id, а прерывает загрузку индекса."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [
+            {"chunk_text": "SLA выезда", "chunk_index": 0, "filename": "a.txt", "document_id": 11},
+        ]
+
+        with self.assertRaises(ValueError):
+            service._load_lexical_index_chunks()
+
+    @patch("src.core.ai.rag_service.ai_settings.get_rag_lexical_scorer", return_value="bm25")
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    def test_set_document_status_patches_lexical_index_without_rebuild(self, mock_norm, mock_mode):
+        """Архивация документа текущим процессом применяется к lexical-индексу инкрементально."""
+        service = RagKnowledgeService()
+        service._lexical_index.replace(
+            4,
+            service._get_lexical_index_signature(),
+            [
+                IndexedChunkInput(
+                    chunk_id=1,
+                    document_id=11,
+                    chunk_index=0,
+                    filename="manual.pdf",
+                    chunk_text="SLA выезда",
+                    tokens=service._tokenize("SLA выезда"),
+                )
+            ],
+        )
+
+        with patch("src.common.database.get_db_connection"), patch("src.common.database.get_cursor") as mock_get_cursor:
+            cursor = mock_get_cursor.return_value.__enter__.return_value
+            cursor.fetchone.return_value = {"status": "active", "filename": "manual.pdf"}
+            with patch.object(service, "_bump_corpus_version", return_value=5):
+                with patch.object(service, "_set_vector_document_status"):
+                    self.assertTrue(service.set_document_status(11, "archived", updated_by=1))
+
+        self.assertEqual(service._lexical_index.version, 5)
+        with patch.object(service, "_get_corpus_version", return_value=5):
+            with patch.object(service, "_load_lexical_index_chunks") as mock_load:
+                result, _ = service._search_relevant_chunks("SLA", limit=1)
+        mock_load.assert_not_called()
+        self.assertEqual(result, [])
+
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_load_lexical_index_chunks_uses_stored_tokens(self, mock_get_cursor, mock_get_db_connection, mock_norm):
+        """Сохранённые токены чанков используются без повторной токенизации."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [
+            {"id": 1, "chunk_text": "SLA выезда", "chunk_index": 0, "filename": "a.txt", "document_id": 11, "stored_tokens": "sla выезда"},
+            {"id": 2, "chunk_text": "График отпусков", "chunk_index": 1, "filename": "a.txt", "document_id": 11, "stored_tokens": None},
+        ]
+
+        with patch.object(service, "_tokenize", wraps=service._tokenize) as mock_tokenize:
+            chunks = service._load_lexical_index_chunks()
+
+        mock_tokenize.assert_called_once_with("График отпусков")
+        self.assertEqual(list(chunks[0].tokens), ["sla", "выезда"])
+        query, params = cursor.execute.call_args.args
+        self.assertIn("LEFT JOIN rag_chunk_tokens", query)
+        self.assertEqual(params, ("raw",))
+
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_load_lexical_index_chunks_falls_back_without_token_table(
+        self, mock_get_cursor, mock_get_db_connection, mock_norm
+    ):
+        """Без таблицы rag_chunk_tokens выборка повторяется без JOIN, а хранилище токенов отключается."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+
+        def execute_side_effect(query, *args, **kwargs):
+            if "rag_chunk_tokens" in query:
+                raise mysql.connector.errors.ProgrammingError(
+                    msg="Table 'rag_chunk_tokens' doesn't exist", errno=1146
+                )
+            return None
+
+        cursor.execute.side_effect = execute_side_effect
+        cursor.fetchall.return_value = [
+            {"id": 1, "chunk_text": "SLA выезда", "chunk_index": 0, "filename": "a.txt", "document_id": 11},
+        ]
+
+        chunks = service._load_lexical_index_chunks([11])
+        self.assertEqual(list(chunks[0].tokens), ["sla", "выезда"])
+        self.assertFalse(service._token_storage_available)
+
+        cursor.execute.reset_mock()
+        service._load_lexical_index_chunks([11])
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertNotIn("rag_chunk_tokens", cursor.execute.call_args.args[0])
+
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_load_lexical_index_chunks_retries_token_table_after_transient_error(
+        self, mock_get_cursor, mock_get_db_connection, mock_norm
+    ):
+        """Временная ошибка JOIN с rag_chunk_tokens не отключает хранилище токенов навсегда."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        failures = {"left": 1}
+
+        def execute_side_effect(query, *args, **kwargs):
+            if "rag_chunk_tokens" in query and failures["left"] > 0:
+                failures["left"] -= 1
+                raise mysql.connector.errors.InternalError(msg="Deadlock found", errno=1213)
+            return None
+
+        cursor.execute.side_effect = execute_side_effect
+        cursor.fetchall.return_value = [
+            {"id": 1, "chunk_text": "SLA выезда", "chunk_index": 0, "filename": "a.txt", "document_id": 11},
+        ]
+
+        with patch("src.core.ai.rag_service.time.monotonic", return_value=1000.0):
+            service._load_lexical_index_chunks([11])
+            self.assertTrue(service._token_storage_available)
+            self.assertFalse(service._is_token_storage_enabled())
+
+        cursor.execute.reset_mock()
+        with patch("src.core.ai.rag_service.time.monotonic", return_value=1000.0 + 60.0):
+            service._load_lexical_index_chunks([11])
+
+        self.assertIn("rag_chunk_tokens", cursor.execute.call_args.args[0])
+        self.assertEqual(service._token_storage_failures, 0)
+
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_backfill_token_storage_tokenizes_missing_rows(self, mock_get_cursor, mock_get_db_connection, mock_norm):
+        """Backfill записывает токены чанков и summary, для которых их ещё нет."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.side_effect = [
+            [
+                {"id": 5, "document_id": 11, "chunk_text": "SLA выезда"},
+                {"id": 6, "document_id": 11, "chunk_text": "График отпусков"},
+            ],
+            [{"document_id": 11, "summary_text": "Регламент выезда"}],
+        ]
+
+        stats = service.backfill_token_storage(batch_size=10)
+
+        self.assertEqual(stats["chunks_tokenized"], 2)
+        self.assertEqual(stats["summaries_tokenized"], 1)
+        chunk_rows = cursor.executemany.call_args.args[1]
+        self.assertEqual(chunk_rows[0], (5, 11, "raw", "sla выезда", 2))
+        summary_calls = [call for call in cursor.execute.call_args_list if "INSERT INTO rag_summary_tokens" in call.args[0]]
+        self.assertEqual(summary_calls[0].args[1], (11, "raw", "регламент выезда", 2))
+
     @patch("src.core.ai.rag_service.ai_settings.is_rag_hyde_enabled", return_value=False)
     @patch("src.core.ai.rag_service.RagKnowledgeService._get_corpus_version", return_value=3)
     @patch("src.core.ai.rag_service.RagKnowledgeService._retrieve_context_for_question")
@@ -943,19 +1156,38 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         self.assertIn("осно", tokens)
         self.assertNotIn("осн", tokens)
 
-    def test_score_corpus_bm25_scores_relevant_document_higher(self):
-        """BM25-счётчик отдаёт больший score более релевантному документу."""
-        corpus = [
-            ["sla", "выезд", "критический", "инцидент"],
-            ["отпуск", "график", "выходные"],
-            ["регламент", "отпуск", "график", "дежурство"],
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    def test_summary_corpus_bm25_index_built_once_per_corpus_version(
+        self, mock_get_cursor, mock_get_db_connection, mock_norm
+    ):
+        """Summary читаются и BM25-индекс строится один раз на версию корпуса."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchall.return_value = [
+            {"document_id": 1, "summary_text": "SLA выезда критический инцидент", "filename": "sla.txt"},
+            {"document_id": 2, "summary_text": "Отпуск график выходные", "filename": "hr.txt"},
+            {"document_id": 3, "summary_text": "Регламент отпуск график дежурство", "filename": "ops.txt"},
         ]
-        query = ["sla", "выезд"]
+        corpus_version = {"value": 7}
+
+        with patch.object(service, "_get_corpus_version", side_effect=lambda: corpus_version["value"]):
+            with patch("src.core.ai.rag_service.SparseBM25Index", wraps=SparseBM25Index) as mock_index:
+                first = service._get_summary_corpus()
+                scores = service._score_summary_corpus_bm25(first, ["sla", "выезда"])
+                second = service._get_summary_corpus()
+                service._score_summary_corpus_bm25(second, ["график"])
+                self.assertEqual(cursor.fetchall.call_count, 1)
+                self.assertEqual(mock_index.call_count, 1)
 
-        scores = RagKnowledgeService._score_corpus_bm25(corpus, query)
+                corpus_version["value"] = 8
+                third = service._get_summary_corpus()
 
-        self.assertEqual(len(scores), 3)
-        self.assertGreater(scores[0], scores[1])
+        self.assertEqual(list(scores), [1])
+        self.assertGreater(scores[1], 0.0)
+        self.assertIsNot(third, second)
+        self.assertEqual(cursor.fetchall.call_count, 2)
 
     @patch("src.common.database.get_db_connection")
     @patch("src.common.database.get_cursor")
@@ -964,8 +1196,8 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         service = RagKnowledgeService()
         cursor = mock_get_cursor.return_value.__enter__.return_value
         cursor.fetchall.return_value = [
-            {"chunk_text": "SLA", "filename": "doc-low.txt", "document_id": 10},
-            {"chunk_text": "SLA", "filename": "doc-high.txt", "document_id": 11},
+            {"id": 2, "chunk_text": "SLA", "filename": "doc-low.txt", "document_id": 10},
+            {"id": 1, "chunk_text": "SLA", "filename": "doc-high.txt", "document_id": 11},
         ]
 
         rows, _all_scores = service._search_relevant_chunks(
@@ -1046,7 +1278,7 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         with patch.object(service, "_get_embedding_provider", return_value=None):
             scores = service._compute_summary_vector_scores(
                 question="X5 shop",
-                summaries=[(1, "summary X5"), (2, "summary VX520")],
+                summary_corpus=_make_summary_corpus([(1, "summary X5"), (2, "summary VX520")]),
             )
 
         self.assertEqual(scores, {})
@@ -1062,40 +1294,46 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         ]
 
         with patch.object(service, "_get_embedding_provider", return_value=mock_provider):
-            with patch.object(service, "_get_corpus_version", return_value=42):
-                scores = service._compute_summary_vector_scores(
-                    question="X5 shop",
-                    summaries=[(10, "summary X5"), (20, "summary VX520")],
-                )
+            scores = service._compute_summary_vector_scores(
+                question="X5 shop",
+                summary_corpus=_make_summary_corpus([(10, "summary X5"), (20, "summary VX520")], version=42),
+            )
 
         self.assertIn(10, scores)
         self.assertIn(20, scores)
         self.assertGreater(scores[10], scores[20])
 
-    def test_compute_summary_vector_scores_uses_cache(self):
-        """_compute_summary_vector_scores \u043a\u044d\u0448\u0438\u0440\u0443\u0435\u0442 \u044d\u043c\u0431\u0435\u0434\u0434\u0438\u043d\u0433\u0438 summary \u0438 \u043d\u0435 \u043f\u0435\u0440\u0435\u0437\u0430\u043f\u0440\u0430\u0448\u0438\u0432\u0430\u0435\u0442."""
-        service = RagKnowledgeService()
-
-        mock_provider = MagicMock()
-        mock_provider.encode_texts.side_effect = [
-            [[1.0, 0.0]],
-            [[0.9, 0.1]],
-            [[0.5, 0.5]],
-        ]
+    def test_compute_summary_vector_scores_builds_matrix_once_per_corpus_version(self):
+        """Эмбеддинги summary кодируются один раз на версию корпуса, новая версия кодируется заново."""
+        service = RagKnowledgeService()
+        provider = LocalEmbeddingProvider(model_name="test-model")
+        cache = EmbeddingCache(max_bytes=1024 * 1024)
+        encoded_batches = []
+
+        def _fake_encode(texts):
+            encoded_batches.append(list(texts))
+            return [[1.0, 0.0] if text.startswith("Q") else [0.6, 0.8] for text in texts]
+
+        summary_corpus = _make_summary_corpus([(10, "summary A"), (20, "summary B")])
+        service._summary_corpus = summary_corpus
+        with patch("src.core.ai.vector_search.get_embedding_cache", return_value=cache):
+            with patch.object(provider, "_encode_uncached", side_effect=_fake_encode):
+                with patch.object(service, "_get_embedding_provider", return_value=provider):
+                    service._compute_summary_vector_scores(question="Q1", summary_corpus=summary_corpus)
+                    # Вызывающий код мог прочитать снимок до публикации матрицы
+                    scores2 = service._compute_summary_vector_scores(question="Q2", summary_corpus=summary_corpus)
+                    next_corpus = _make_summary_corpus([(10, "summary C")], version=2)
+                    service._summary_corpus = next_corpus
+                    scores3 = service._compute_summary_vector_scores(question="Q3", summary_corpus=next_corpus)
 
-        with patch.object(service, "_get_embedding_provider", return_value=mock_provider):
-            with patch.object(service, "_get_corpus_version", return_value=1):
-                service._compute_summary_vector_scores(
-                    question="Q1",
-                    summaries=[(10, "summary A")],
-                )
-                scores2 = service._compute_summary_vector_scores(
-                    question="Q2",
-                    summaries=[(10, "summary A")],
-                )
-
-        self.assertEqual(mock_provider.encode_texts.call_count, 3)
-        self.assertIn(10, scores2)
+        self.assertEqual(
+            encoded_batches,
+            [["Q1"], ["summary A", "summary B"], ["Q2"], ["Q3"], ["summary C"]],
+        )
+        self.assertAlmostEqual(scores2[10], 0.6)
+        self.assertAlmostEqual(scores2[20], 0.6)
+        self.assertEqual(list(scores3), [10])
+        self.assertEqual(service._summary_corpus.embedding_matrix.shape, (1, 2))
 
     @patch.object(RagKnowledgeService, "_build_summary_blocks", return_value=[])
     @patch.object(RagKnowledgeService, "_determine_retrieval_mode", return_value="hybrid")
@@ -1826,6 +2064,10 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(any("INSERT INTO rag_document_summaries" in call for call in sql_calls))
         mock_generate_summary.assert_called_once()
         mock_bump.assert_called_once()
+        self.assertTrue(any("INSERT INTO rag_summary_tokens" in call for call in sql_calls))
+        token_sql, token_rows = cursor.executemany.call_args.args
+        self.assertIn("INSERT INTO rag_chunk_tokens", token_sql)
+        self.assertEqual([row[0] for row in token_rows], [321, 321])
 
     @patch("src.core.ai.rag_service.time.sleep")
     @patch("src.core.ai.rag_service.logger.warning")
@@ -1892,6 +2134,93 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
             )
         )
 
+    @patch("src.core.ai.rag_service.time.sleep")
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._bump_corpus_version")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._split_text")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._extract_text")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._generate_document_summary")
+    @patch.object(RagKnowledgeService, "_upsert_vectors_for_chunks")
+    def test_ingest_retries_whole_transaction_on_token_storage_deadlock(
+        self,
+        mock_upsert_vectors,
+        mock_generate_summary,
+        mock_extract_text,
+        mock_split_text,
+        mock_bump,
+        mock_get_cursor,
+        mock_get_db_connection,
+        mock_sleep,
+    ):
+        """Deadlock при записи токенов откатывает ingest целиком, и транзакция повторяется."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = None
+        cursor.lastrowid = 555
+        mock_extract_text.return_value = "Полезный текст документа"
+        mock_split_text.return_value = ["Первый чанк"]
+        mock_generate_summary.return_value = ("Краткое summary документа", "deepseek-chat")
+        cursor.executemany.side_effect = [self._FakeMySqlError(1213), None]
+
+        result = service.ingest_document_from_bytes_sync(
+            filename="manual.txt",
+            payload=b"payload",
+            uploaded_by=7,
+            source_type="filesystem",
+            source_url="/kb/manual.txt",
+        )
+
+        self.assertEqual(result["document_id"], 555)
+        self.assertEqual(
+            sum(1 for call in cursor.execute.call_args_list if "INSERT INTO rag_documents" in call.args[0]),
+            2,
+        )
+        # Версия корпуса увеличивается только в повторной (успешной) транзакции
+        mock_bump.assert_called_once()
+        mock_sleep.assert_called_once()
+        self.assertTrue(service._token_storage_available)
+        self.assertEqual(service._token_storage_failures, 0)
+
+    @patch("src.common.database.get_db_connection")
+    @patch("src.common.database.get_cursor")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._bump_corpus_version")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._split_text")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._extract_text")
+    @patch("src.core.ai.rag_service.RagKnowledgeService._generate_document_summary")
+    @patch.object(RagKnowledgeService, "_upsert_vectors_for_chunks")
+    def test_ingest_continues_without_token_table(
+        self,
+        mock_upsert_vectors,
+        mock_generate_summary,
+        mock_extract_text,
+        mock_split_text,
+        mock_bump,
+        mock_get_cursor,
+        mock_get_db_connection,
+    ):
+        """Отсутствие таблицы rag_chunk_tokens не прерывает ingest и отключает хранилище токенов."""
+        service = RagKnowledgeService()
+        cursor = mock_get_cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = None
+        cursor.lastrowid = 556
+        mock_extract_text.return_value = "Полезный текст документа"
+        mock_split_text.return_value = ["Первый чанк"]
+        mock_generate_summary.return_value = ("Краткое summary документа", "deepseek-chat")
+        cursor.executemany.side_effect = self._FakeMySqlError(1146)
+
+        result = service.ingest_document_from_bytes_sync(
+            filename="manual.txt",
+            payload=b"payload",
+            uploaded_by=7,
+            source_type="filesystem",
+            source_url="/kb/manual.txt",
+        )
+
+        self.assertEqual(result["document_id"], 556)
+        self.assertFalse(service._token_storage_available)
+        mock_bump.assert_called_once()
+
     @patch("src.common.database.get_db_connection")
     @patch("src.common.database.get_cursor")
     def test_list_documents_by_source(self, mock_get_cursor, mock_get_db_connection):
@@ -1979,9 +2308,10 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(stats["summaries_indexed"], 1)
         self.assertEqual(stats["errors"], 0)
 
+    @patch("src.core.ai.rag_service.ai_settings.is_rag_ru_normalization_enabled", return_value=False)
     @patch("src.core.ai.rag_service.ai_settings.is_rag_summary_vector_enabled", return_value=True)
     @patch("src.core.ai.rag_service.ai_settings.AI_RAG_VECTOR_ENABLED", True)
-    def test_prefilter_documents_by_summary_uses_collection_scores(self, mock_summary_enabled):
+    def test_prefilter_documents_by_summary_uses_collection_scores(self, mock_summary_enabled, mock_ru_normalization):
         """Summary-prefilter использует vector-score из коллекции без fallback на in-memory encode."""
         service = RagKnowledgeService()
         with patch("src.common.database.get_db_connection"), patch("src.common.database.get_cursor") as mock_get_cursor:
@@ -2500,9 +2830,10 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         import time
 
         service = RagKnowledgeService()
-        # Вставляем запись с истёкшим TTL
-        service._hyde_cache["expired_q"] = ("old text", time.time() - 10)
-        result = service._get_cached_hyde_text("expired_q")
+        service._cache_hyde_text("expired_q", "old text")
+        # Время жизни записи истекло
+        with patch("src.core.ai.ttl_lru_cache.time.monotonic", return_value=time.monotonic() + 10):
+            result = service._get_cached_hyde_text("expired_q")
         self.assertIsNone(result)
 
     @patch("src.core.ai.rag_service.ai_settings.AI_RAG_SUMMARY_FALLBACK_ENABLED", False)
@@ -2705,12 +3036,11 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
         mock_embedding.encode_texts = MagicMock(return_value=[[0.5, 0.5]])
 
         with patch.object(service, "_get_embedding_provider", return_value=mock_embedding):
-            with patch.object(service, "_get_corpus_version", return_value=1):
-                service._compute_summary_vector_scores(
-                    question="оригинальный вопрос",
-                    summaries=[(1, "summary text")],
-                    hyde_text="гипотетический документ",
-                )
+            service._compute_summary_vector_scores(
+                question="оригинальный вопрос",
+                summary_corpus=_make_summary_corpus([(1, "summary text")]),
+                hyde_text="гипотетический документ",
+            )
 
         # Первый вызов encode_texts должен быть для hyde_text
         first_call = mock_embedding.encode_texts.call_args_list[0]
@@ -3057,15 +3387,13 @@ class TestRagKnowledgeService(unittest.IsolatedAsyncioTestCase):
     @patch("src.core.ai.rag_service.ai_settings.AI_RAG_SPELLCHECK_LLM_CACHE_TTL_SECONDS", 300)
     async def test_spellcheck_llm_cache_hit(self, *_mocks):
         """Повторный запрос с тем же текстом возвращает кэшированный результат LLM."""
-        import time as _time
-
         service = RagKnowledgeService()
 
         # Предзаполняем кэш
-        service._spellcheck_llm_cache["рагистрация"] = (
-            "регистрация",
-            [("рагистрация", "регистрация")],
-            _time.time() + 600,
+        service._spellcheck_llm_cache.put(
+            "рагистрация",
+            ("регистрация", [("рагистрация", "регистрация")]),
+            ttl_seconds=600,
         )
 
         corrected, changes = await service._spellcheck_llm_fallback("рагистрация", user_id=123)
@@ -0,0 +1,164 @@
+"""
+test_retrieval_executor.py — тесты retrieval executor и монитора задержки event loop.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.core.ai import retrieval_executor
+from src.core.ai import event_loop_monitor
+from src.core.ai.event_loop_monitor import EventLoopLagMonitor
+from src.core.ai.retrieval_executor import RetrievalExecutor, encode_texts_off_loop
+from src.core.ai.vector_search import LocalEmbeddingProvider
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestRetrievalExecutor(unittest.IsolatedAsyncioTestCase):
+    """Тесты RetrievalExecutor."""
+
+    async def asyncSetUp(self):
+        self.executor = RetrievalExecutor(io_workers=2, embedding_workers=1)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown(wait=True)
+
+    async def test_run_io_uses_dedicated_pool_and_keeps_contextvars(self):
+        """Функция выполняется в I/O-пуле retrieval и видит contextvars вызывающей корутины."""
+        _request_id.set("req-1")
+
+        def _probe(value):
+            return threading.current_thread().name, _request_id.get(), value
+
+        thread_name, request_id, value = await self.executor.run_io(_probe, 42)
+
+        self.assertTrue(thread_name.startswith("retrieval-io"))
+        self.assertEqual(request_id, "req-1")
+        self.assertEqual(value, 42)
+
+    async def test_encode_from_io_thread_runs_in_embedding_pool(self):
+        """Эмбеддинг, запрошенный из I/O-потока, считается в отдельном embedding-пуле."""
+        encode_threads = []
+        provider = MagicMock()
+        provider.encode_texts.side_effect = lambda texts: encode_threads.append(
+            threading.current_thread().name
+        ) or [[0.1, 0.2] for _ in texts]
+
+        vectors = await self.executor.run_io(self.executor.encode_texts, provider, ["вопрос"])
+
+        self.assertEqual(vectors, [[0.1, 0.2]])
+        self.assertEqual(len(encode_threads), 1)
+        self.assertTrue(encode_threads[0].startswith("retrieval-embed"))
+
+    async def test_encode_inside_embedding_thread_runs_inline(self):
+        """Вложенный вызов из embedding-потока не ждёт собственный (заполненный) пул."""
+        provider = MagicMock()
+        provider.encode.return_value = [1.0]
+
+        result = await self.executor.run_embedding(self.executor.encode, provider, "текст")
+
+        self.assertEqual(result, [1.0])
+
+    @patch("src.core.ai.vector_search.get_embedding_cache", return_value=None)
+    @patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_ENABLED", True)
+    @patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_BATCH", 32)
+    @patch("src.core.ai.vector_search.ai_settings.AI_RAG_VECTOR_EMBEDDING_COALESCE_MAX_WAIT_MS", 20)
+    async def test_off_loop_encodes_coalesce_beyond_embedding_pool_size(self, _mock_cache):
+        """Запросы retrieval через encode_texts_off_loop объединяются в батчи больше embedding-пула."""
+        executor = RetrievalExecutor(io_workers=12, embedding_workers=1)
+        self.addCleanup(executor.shutdown, True)
+        provider = LocalEmbeddingProvider()
+        batches = []
+
+        def _encode_batch(texts):
+            batches.append(len(texts))
+            time.sleep(0.05)
+            return [[float(len(text))] for text in texts]
+
+        with patch.object(retrieval_executor, "_executor", executor), \
+             patch.object(provider, "_encode_texts_batch", side_effect=_encode_batch):
+            results = await asyncio.gather(*[
+                executor.run_io(encode_texts_off_loop, provider, ["x" * size])
+                for size in range(1, 13)
+            ])
+        provider._coalescer.close()
+
+        self.assertEqual(results, [[[float(size)]] for size in range(1, 13)])
+        self.assertEqual(sum(batches), 12)
+        # Через embedding-пул из одного потока батч не превысил бы 1 запрос
+        self.assertGreater(max(batches), executor.embedding_workers)
+
+    async def test_blocking_retrieval_does_not_stall_event_loop(self):
+        """Пока блокирующая функция выполняется в пуле, event loop продолжает обрабатывать задачи."""
+        ticks = 0
+
+        async def _ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(_ticker())
+        try:
+            await self.executor.run_io(time.sleep, 0.2)
+        finally:
+            ticker.cancel()
+
+        self.assertGreaterEqual(ticks, 5)
+
+
+class TestEventLoopLagMonitor(unittest.IsolatedAsyncioTestCase):
+    """Тесты EventLoopLagMonitor."""
+
+    async def test_blocking_call_is_reported_as_lag(self):
+        """Синхронная блокировка loop отражается в max/p99 задержки."""
+        monitor = EventLoopLagMonitor(interval_seconds=0.01, warn_ms=10_000, report_interval_seconds=0)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.15)
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        stats = monitor.snapshot()
+        self.assertGreater(stats["samples"], 0)
+        self.assertGreaterEqual(stats["max_ms"], 100.0)
+        self.assertFalse(monitor.running)
+
+    def test_snapshot_percentiles_and_slow_samples(self):
+        """Перцентили считаются по окну, медленные замеры считаются по порогу."""
+        monitor = EventLoopLagMonitor(interval_seconds=1, warn_ms=50, window_size=100)
+        for lag_ms in [1.0] * 98 + [60.0, 300.0]:
+            monitor.record(lag_ms)
+
+        stats = monitor.snapshot()
+
+        self.assertEqual(stats["samples"], 100)
+        self.assertEqual(stats["slow_samples"], 2)
+        self.assertEqual(stats["p50_ms"], 1.0)
+        self.assertEqual(stats["max_ms"], 300.0)
+        self.assertEqual(stats["last_ms"], 300.0)
+
+        monitor.reset()
+        self.assertEqual(monitor.snapshot()["samples"], 0)
+
+
+    async def test_shared_monitor_is_stopped_on_shutdown(self):
+        """Общий монитор, запущенный при старте процесса, останавливается shutdown-хуком."""
+        with patch.object(event_loop_monitor, "_monitor", None), \
+             patch.object(event_loop_monitor.ai_settings, "AI_EVENT_LOOP_LAG_MONITOR_ENABLED", True):
+            monitor = event_loop_monitor.start_event_loop_lag_monitor()
+            self.assertTrue(monitor.running)
+
+            await event_loop_monitor.stop_event_loop_lag_monitor()
+
+            self.assertFalse(monitor.running)
+
+
+if __name__ == "__main__":
+    unittest.main()
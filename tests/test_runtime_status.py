@@ -0,0 +1,103 @@
+"""Тесты публикации статистики процессов (src/common/runtime_status.py)."""
+
+import json
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.common import runtime_status
+
+
+def _mock_db(mock_database, rows=None):
+    """Подготовить мок database.get_db_connection/get_cursor и вернуть курсор."""
+    cursor = MagicMock()
+    cursor.fetchall.return_value = rows or []
+    mock_database.get_db_connection.return_value.__enter__.return_value = MagicMock()
+    mock_database.get_cursor.return_value.__enter__.return_value = cursor
+    return cursor
+
+
+class TestRuntimeStatus(unittest.TestCase):
+    """Тесты сбора, записи и чтения снимков статистики процессов."""
+
+    def setUp(self):
+        patcher = patch.object(runtime_status, "_providers", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_collect_skips_failing_and_empty_providers(self):
+        """Ошибка или None провайдера не мешает остальным разделам снимка."""
+        runtime_status.register_runtime_status_provider("embedding_cache", lambda: {"hits": 3})
+        runtime_status.register_runtime_status_provider("rag_caches", lambda: None)
+        runtime_status.register_runtime_status_provider("broken", MagicMock(side_effect=RuntimeError("boom")))
+
+        self.assertEqual(runtime_status.collect_runtime_status(), {"embedding_cache": {"hits": 3}})
+
+    @patch("src.common.runtime_status.database")
+    def test_publish_upserts_row_of_current_process(self, mock_database):
+        """Каждый процесс пишет свою строку (pid), а не перезаписывает общий снимок."""
+        cursor = _mock_db(mock_database)
+
+        runtime_status.publish_process_status("telegram_bot", {"embedding_cache": {"hits": 5}})
+
+        insert_query, insert_params = cursor.execute.call_args_list[0].args
+        self.assertIn("ON DUPLICATE KEY UPDATE", insert_query)
+        self.assertEqual(insert_params[0], "telegram_bot")
+        self.assertEqual(insert_params[2], os.getpid())
+        self.assertEqual(json.loads(insert_params[3]), {"embedding_cache": {"hits": 5}})
+        self.assertIn("DELETE FROM runtime_process_status", cursor.execute.call_args_list[1].args[0])
+
+    @patch("src.common.runtime_status.database")
+    def test_get_process_statuses_parses_payload(self, mock_database):
+        """Снимки читаются по процессам, битый payload превращается в пустой словарь."""
+        cursor = _mock_db(
+            mock_database,
+            rows=[
+                {
+                    "process_name": "gk_responder",
+                    "hostname": "host",
+                    "pid": 11,
+                    "payload": '{"embedding_cache": {"hits": 1}}',
+                    "started_timestamp": 100,
+                    "updated_timestamp": 200,
+                },
+                {
+                    "process_name": "telegram_bot",
+                    "hostname": "host",
+                    "pid": 12,
+                    "payload": "not json",
+                    "started_timestamp": 100,
+                    "updated_timestamp": 200,
+                },
+            ],
+        )
+
+        statuses = runtime_status.get_process_statuses(process_name="gk_responder")
+
+        self.assertIn("process_name = %s", cursor.execute.call_args.args[0])
+        self.assertEqual(cursor.execute.call_args.args[1][1], "gk_responder")
+        self.assertEqual(statuses[0].payload, {"embedding_cache": {"hits": 1}})
+        self.assertEqual(statuses[0].pid, 11)
+        self.assertEqual(statuses[1].payload, {})
+
+
+class TestRuntimeStatusPublisher(unittest.IsolatedAsyncioTestCase):
+    """Тесты фоновой публикации статистики."""
+
+    async def test_publisher_publishes_and_stops(self):
+        """Публикатор пишет снимок сразу после старта и останавливается shutdown-хуком."""
+        with patch.object(runtime_status, "publish_process_status") as mock_publish, \
+             patch.object(runtime_status, "RUNTIME_STATUS_PUBLISH_INTERVAL_SECONDS", 60):
+            task = runtime_status.start_runtime_status_publisher("telegram_bot")
+            for _ in range(50):
+                if mock_publish.called:
+                    break
+                await runtime_status.asyncio.sleep(0.01)
+            await runtime_status.stop_runtime_status_publisher()
+
+        mock_publish.assert_called_once_with("telegram_bot")
+        self.assertTrue(task.done())
+
+
+if __name__ == "__main__":
+    unittest.main()
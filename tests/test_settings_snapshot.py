@@ -0,0 +1,263 @@
+"""
+test_settings_snapshot.py — тесты снимка таблиц настроек с инвалидацией по версии.
+"""
+
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from src.common import settings_snapshot
+from src.common.async_database import AsyncDatabase
+from src.common.settings_snapshot import (
+    SCOPE_BOT_SETTINGS,
+    SCOPE_CERTIFICATION_SETTINGS,
+    SCOPE_GAMIFICATION_SETTINGS,
+    SettingsSnapshotService,
+    bump_settings_version,
+    reset_settings_snapshot,
+)
+
+
+class _FakeCursor:
+    """Курсор общей «БД»: таблицы настроек и settings_version."""
+
+    def __init__(self, db):
+        self._db = db
+        self._rows = []
+
+    def execute(self, query, params=None):
+        self._db.queries.append(query)
+        self._db.threads.append(threading.current_thread().name)
+        if self._db.fail:
+            raise OSError("db down")
+        if "INTO settings_version" in query:
+            if not self._db.has_version_table:
+                raise OSError("Table 'settings_version' doesn't exist")
+            self._db.versions[params[0]] = self._db.versions.get(params[0], 0) + 1
+        elif "FROM settings_version" in query:
+            if not self._db.has_version_table:
+                raise OSError("Table 'settings_version' doesn't exist")
+            self._rows = [{"scope": scope, "version": version} for scope, version in self._db.versions.items()]
+        else:
+            table = query.rsplit("FROM", 1)[1].strip(" `")
+            self._rows = [
+                {"setting_key": key, "setting_value": value}
+                for key, value in self._db.tables.get(table, {}).items()
+            ]
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class _FakeDb:
+    """Заглушка модуля database, общая для нескольких «процессов»."""
+
+    def __init__(self):
+        self.tables = {SCOPE_BOT_SETTINGS: {}, SCOPE_GAMIFICATION_SETTINGS: {}, SCOPE_CERTIFICATION_SETTINGS: {}}
+        self.versions = {}
+        self.queries = []
+        self.threads = []
+        self.fail = False
+        self.has_version_table = True
+
+    @contextmanager
+    def get_db_connection(self):
+        yield self
+
+    @contextmanager
+    def get_cursor(self, conn):
+        yield _FakeCursor(self)
+
+    def write(self, scope, key, value):
+        """Записать настройку так, как это делает set_setting другого процесса."""
+        self.tables[scope][key] = value
+        bump_settings_version(_FakeCursor(self), scope)
+
+    def table_loads(self, scope):
+        return sum(1 for query in self.queries if f"FROM `{scope}`" in query)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSettingsSnapshotService(unittest.TestCase):
+    """Загрузка целиком, проверка версий и резервные режимы."""
+
+    def setUp(self):
+        self.db = _FakeDb()
+        self.clock = _Clock()
+        for patcher in (
+            patch.object(settings_snapshot, "database", self.db),
+            patch("src.common.settings_snapshot.time.monotonic", self.clock),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _service(self, **kwargs):
+        options = {"check_interval_seconds": 1.0, "max_age_seconds": 60.0}
+        options.update(kwargs)
+        return SettingsSnapshotService(**options)
+
+    def test_reads_are_served_from_immutable_snapshot(self):
+        """Таблица читается один раз, снимок неизменяем."""
+        self.db.tables[SCOPE_BOT_SETTINGS] = {"a": "1", "b": "2"}
+        service = self._service()
+
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "a"), "1")
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "missing", "def"), "def")
+        values = service.get_all(SCOPE_BOT_SETTINGS)
+
+        self.assertEqual(self.db.table_loads(SCOPE_BOT_SETTINGS), 1)
+        with self.assertRaises(TypeError):
+            values["a"] = "3"
+
+    def test_change_from_other_process_applies_after_check_interval(self):
+        """Запись другого процесса видна после сверки версий, без неё таблица не перечитывается."""
+        self.db.write(SCOPE_BOT_SETTINGS, "module_news_enabled", "1")
+        reader = self._service()
+        self.assertEqual(reader.get(SCOPE_BOT_SETTINGS, "module_news_enabled"), "1")
+
+        self.db.write(SCOPE_BOT_SETTINGS, "module_news_enabled", "0")
+        self.clock.now += 0.5
+        self.assertEqual(reader.get(SCOPE_BOT_SETTINGS, "module_news_enabled"), "1")
+
+        self.clock.now += 0.6
+        self.assertEqual(reader.get(SCOPE_BOT_SETTINGS, "module_news_enabled"), "0")
+
+        self.clock.now += 5
+        reader.get(SCOPE_BOT_SETTINGS, "module_news_enabled")
+        self.assertEqual(self.db.table_loads(SCOPE_BOT_SETTINGS), 2)
+        self.assertEqual(reader.stats()["scopes"][SCOPE_BOT_SETTINGS]["version"], 2)
+
+    def test_scopes_are_reloaded_independently(self):
+        """Изменение одной таблицы не перечитывает остальные."""
+        service = self._service()
+        service.get_all(SCOPE_BOT_SETTINGS)
+        service.get_all(SCOPE_CERTIFICATION_SETTINGS)
+
+        self.db.write(SCOPE_CERTIFICATION_SETTINGS, "questions_count", "25")
+        self.clock.now += 2
+        service.get_all(SCOPE_BOT_SETTINGS)
+        self.assertEqual(service.get(SCOPE_CERTIFICATION_SETTINGS, "questions_count"), "25")
+
+        self.assertEqual(self.db.table_loads(SCOPE_BOT_SETTINGS), 1)
+        self.assertEqual(self.db.table_loads(SCOPE_CERTIFICATION_SETTINGS), 2)
+
+    def test_without_version_table_falls_back_to_max_age(self):
+        """Без settings_version снимок обновляется по возрасту, запись настройки не падает."""
+        self.db.has_version_table = False
+        service = self._service(max_age_seconds=60.0)
+        self.assertIsNone(service.get(SCOPE_BOT_SETTINGS, "key"))
+
+        self.db.write(SCOPE_BOT_SETTINGS, "key", "value")
+        self.clock.now += 30
+        self.assertIsNone(service.get(SCOPE_BOT_SETTINGS, "key"))
+        self.clock.now += 31
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "value")
+        self.assertFalse(service.stats()["versions_available"])
+
+    def test_db_error_serves_previous_snapshot(self):
+        """При недоступной БД отдаётся прежний снимок, повтор — не чаще интервала."""
+        self.db.tables[SCOPE_BOT_SETTINGS] = {"key": "old"}
+        service = self._service()
+        service.get_all(SCOPE_BOT_SETTINGS)
+
+        self.db.fail = True
+        self.clock.now += 61
+        with self.assertLogs("src.common.settings_snapshot", level="WARNING"):
+            self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "old")
+        queries = len(self.db.queries)
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "old")
+        self.assertEqual(len(self.db.queries), queries)
+        self.assertEqual(service.stats()["load_errors"], 1)
+
+        fresh = self._service()
+        with self.assertRaises(OSError):
+            fresh.get_all(SCOPE_BOT_SETTINGS)
+
+
+class TestSettingsSnapshotOnEventLoop(unittest.IsolatedAsyncioTestCase):
+    """В event loop сверка версий не блокирует чтение и идёт в пуле db-io."""
+
+    async def test_version_check_runs_in_background(self):
+        db = _FakeDb()
+        clock = _Clock()
+        async_db = AsyncDatabase(io_workers=1, connection_workers=1)
+        for patcher in (
+            patch.object(settings_snapshot, "database", db),
+            patch("src.common.settings_snapshot.time.monotonic", clock),
+            patch("src.common.async_database.get_async_database", return_value=async_db),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        db.write(SCOPE_BOT_SETTINGS, "key", "old")
+        service = SettingsSnapshotService(check_interval_seconds=1.0, max_age_seconds=60.0)
+        # Первый снимок загружается сразу: отдавать ещё нечего.
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "old")
+
+        db.write(SCOPE_BOT_SETTINGS, "key", "new")
+        db.threads.clear()
+        clock.now += 2
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "old")
+        async_db.shutdown(wait=True)
+
+        self.assertEqual(service.get(SCOPE_BOT_SETTINGS, "key"), "new")
+        self.assertTrue(db.threads)
+        self.assertNotIn(threading.current_thread().name, db.threads)
+
+
+class TestModuleSettingsUseSnapshot(unittest.TestCase):
+    """get_setting модулей геймификации и аттестации читают общий снимок."""
+
+    def setUp(self):
+        self.db = _FakeDb()
+        reset_settings_snapshot()
+        self.addCleanup(reset_settings_snapshot)
+        patcher = patch.object(settings_snapshot, "database", self.db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_gamification_setting_from_snapshot(self):
+        """gamification_logic.get_setting — поиск в снимке таблицы gamification_settings."""
+        from src.sbs_helper_telegram_bot.gamification import gamification_logic
+
+        self.db.tables[SCOPE_GAMIFICATION_SETTINGS] = {"obfuscate_names": "1"}
+
+        self.assertEqual(gamification_logic.get_setting("obfuscate_names"), "1")
+        self.assertEqual(gamification_logic.get_setting("missing", "0"), "0")
+        self.assertEqual(self.db.table_loads(SCOPE_GAMIFICATION_SETTINGS), 1)
+
+    def test_certification_test_settings_single_load(self):
+        """get_test_settings собирает все значения из одной загрузки таблицы."""
+        from src.sbs_helper_telegram_bot.certification import certification_logic
+        from src.sbs_helper_telegram_bot.certification import settings
+
+        self.db.tables[SCOPE_CERTIFICATION_SETTINGS] = {
+            settings.DB_SETTING_QUESTIONS_COUNT: "30",
+            settings.DB_SETTING_SHOW_CORRECT: "false",
+        }
+
+        result = certification_logic.get_test_settings()
+
+        self.assertEqual(result["questions_count"], 30)
+        self.assertEqual(result["time_limit_minutes"], int(settings.DEFAULT_TIME_LIMIT_MINUTES))
+        self.assertFalse(result["show_correct_answer"])
+        self.assertEqual(self.db.table_loads(SCOPE_CERTIFICATION_SETTINGS), 1)
+
+    def test_database_error_returns_default(self):
+        """Ошибка БД без снимка даёт значение по умолчанию, как и раньше."""
+        from src.sbs_helper_telegram_bot.certification import certification_logic
+
+        self.db.fail = True
+
+        self.assertEqual(certification_logic.get_setting("questions_count", 20), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,10 +12,13 @@ import unittest
 from unittest.mock import Mock, patch, MagicMock, call, AsyncMock
 from datetime import datetime
 
+import src.common.database as database
+
 from src.common.constants.errorcodes import InviteStatus
 from src.sbs_helper_telegram_bot.telegram_bot.telegram_bot import (
     check_if_invite_entered,
     post_init,
+    post_shutdown,
 )
 from src.sbs_helper_telegram_bot.vyezd_byl.vyezd_byl_bot_part import (
     get_number_of_jobs_in_the_queue,
@@ -105,10 +108,21 @@ class TestCheckIfInviteEntered(unittest.TestCase):
 class TestPostInit(unittest.IsolatedAsyncioTestCase):
     """Тесты post_init Telegram-бота."""
 
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.register_runtime_status_provider")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.start_runtime_status_publisher")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.start_event_loop_lag_monitor")
     @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.asyncio.to_thread", new_callable=AsyncMock)
     @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.preload_rag_runtime_dependencies")
-    async def test_post_init_runs_rag_preload_in_background_thread(self, mock_preload, mock_to_thread):
-        """При старте бота post_init запускает preload RAG-зависимостей."""
+    async def test_post_init_runs_rag_preload_in_background_thread(
+        self,
+        mock_preload,
+        mock_to_thread,
+        mock_lag_monitor,
+        mock_status_publisher,
+        mock_register_provider,
+    ):
+        """При старте бота post_init запускает preload RAG-зависимостей, монитор event loop
+        и публикацию статистики процесса (включая снимок пула MySQL)."""
         application = Mock()
         application.bot = Mock()
         application.bot.set_my_commands = AsyncMock()
@@ -117,6 +131,35 @@ class TestPostInit(unittest.IsolatedAsyncioTestCase):
 
         application.bot.set_my_commands.assert_awaited_once()
         mock_to_thread.assert_awaited_once_with(mock_preload)
+        mock_lag_monitor.assert_called_once_with()
+        mock_status_publisher.assert_called_once_with("telegram_bot")
+        mock_register_provider.assert_any_call("db_pool", database.get_pool_snapshot)
+
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.shutdown_retrieval_executor")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.stop_event_loop_lag_monitor", new_callable=AsyncMock)
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.close_db_log_sink", new_callable=AsyncMock)
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.close_gigachat_client_pool")
+    @patch("src.sbs_helper_telegram_bot.telegram_bot.telegram_bot.close_llm_http_clients", new_callable=AsyncMock)
+    async def test_post_shutdown_closes_llm_http_pool(
+        self,
+        mock_close,
+        mock_close_gigachat,
+        mock_close_sink,
+        mock_stop_lag_monitor,
+        mock_shutdown_executor,
+    ):
+        """При остановке бота дописывается очередь логов БД, закрываются пулы DeepSeek и GigaChat,
+        останавливаются монитор event loop и retrieval executor."""
+        mock_close.return_value = 1
+        mock_close_sink.return_value = {"written": 3, "dropped": 0, "failed": 0}
+
+        await post_shutdown(Mock())
+
+        mock_close_sink.assert_awaited_once_with()
+        mock_close.assert_awaited_once_with()
+        mock_close_gigachat.assert_called_once_with()
+        mock_stop_lag_monitor.assert_awaited_once_with()
+        mock_shutdown_executor.assert_called_once_with()
 
 
 class TestCheckIfUserLegit(unittest.TestCase):
@@ -0,0 +1,213 @@
+"""
+test_ticket_validation_plan.py — тесты скомпилированных планов валидации заявок.
+"""
+
+import random
+import unittest
+from unittest.mock import MagicMock, patch
+
+from src.sbs_helper_telegram_bot.ticket_validator import validation_rules
+from src.sbs_helper_telegram_bot.ticket_validator.file_processor import ExcelFileProcessor
+from src.sbs_helper_telegram_bot.ticket_validator.keyword_automaton import KeywordAutomaton, KeywordMatcher
+from src.sbs_helper_telegram_bot.ticket_validator.validators import (
+    CompiledRuleSet,
+    TicketType,
+    TicketTypeDetector,
+    ValidationRule,
+)
+
+
+def _rule(rule_id, pattern, rule_type="regex", priority=0, active=True):
+    return ValidationRule(
+        id=rule_id,
+        rule_name=f"rule_{rule_id}",
+        pattern=pattern,
+        rule_type=rule_type,
+        error_message=f"error_{rule_id}",
+        active=active,
+        priority=priority,
+    )
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    """Автомат Ахо — Корасик находит те же слова, что и проверка «in»."""
+
+    def test_matches_substring_scan(self):
+        """Пересекающиеся и вложенные слова находятся все за один проход."""
+        rng = random.Random(7)
+        for _ in range(200):
+            keywords = ["".join(rng.choice("абв") for _ in range(rng.randint(1, 5))) for _ in range(15)]
+            text = "".join(rng.choice("абвг ") for _ in range(60))
+            expected = {index for index, keyword in enumerate(keywords) if keyword in text}
+            self.assertEqual(KeywordAutomaton(keywords).find(text), expected)
+
+    def test_matcher_switches_to_automaton_by_threshold(self):
+        """Автомат строится только для словаря не меньше порога; результат одинаков."""
+        keywords = ["замена", "замена терминала", "терминал", "дубль"]
+        text = "нужна замена терминала в офисе"
+
+        small = KeywordMatcher(keywords, automaton_min_keywords=10)
+        large = KeywordMatcher(keywords, automaton_min_keywords=1)
+
+        self.assertFalse(small.uses_automaton)
+        self.assertTrue(large.uses_automaton)
+        self.assertEqual(small.find(text), {0, 1, 2})
+        self.assertEqual(large.find(text), {0, 1, 2})
+
+
+class TestTicketTypeDetector(unittest.TestCase):
+    """Детектор с общим словарём даёт те же баллы, что и прежний перебор."""
+
+    def setUp(self):
+        self.types = [
+            TicketType(
+                id=1,
+                type_name="Установка",
+                description="",
+                detection_keywords=["установка", "терминал", "-демонтаж"],
+                keyword_weights={"установка": 2.0, "-демонтаж": 3.0},
+            ),
+            TicketType(
+                id=2,
+                type_name="Демонтаж",
+                description="",
+                detection_keywords=["демонтаж", "терминал"],
+            ),
+            TicketType(id=3, type_name="Выключен", description="", detection_keywords=["терминал"], active=False),
+        ]
+
+    def test_weighted_scores_and_debug(self):
+        """Вес, отрицательные слова и отладочная информация считаются по общему словарю."""
+        detector = TicketTypeDetector(self.types)
+
+        detected, debug_info = detector.detect("Демонтаж: ТЕРМИНАЛ и установка", debug=True)
+
+        scores = {score.ticket_type.id: score.total_score for score in debug_info.all_scores}
+        self.assertEqual(scores, {1: 0.0, 2: 2.0})
+        self.assertEqual(detected.id, 2)
+        self.assertEqual(debug_info.total_types_evaluated, 2)
+        negative = [m for m in debug_info.all_scores[0].keyword_matches if m.is_negative]
+        self.assertEqual((negative[0].keyword, negative[0].weighted_score), ("демонтаж", -3.0))
+
+    def test_automaton_path_gives_same_result(self):
+        """Результат не зависит от того, построен ли автомат."""
+        text = "установка терминала"
+        expected = TicketTypeDetector(self.types).detect(text, debug=True)
+
+        with patch(
+            "src.sbs_helper_telegram_bot.ticket_validator.keyword_automaton.AUTOMATON_MIN_KEYWORDS", 1
+        ):
+            detector = TicketTypeDetector(self.types, keyword_weights={"Терминал": 0.5})
+            self.assertTrue(detector._matcher.uses_automaton)
+            detected, debug_info = detector.detect(text, debug=True)
+
+        self.assertEqual(detected.id, expected[0].id)
+        self.assertEqual(debug_info.all_scores[0].total_score, 2.5)
+
+
+class TestCompiledRuleSet(unittest.TestCase):
+    """Скомпилированные правила: приоритет, активность, некорректные regex."""
+
+    def test_rules_are_sorted_filtered_and_compiled_once(self):
+        """Неактивные и неизвестные правила отброшены, порядок — по приоритету."""
+        rule_set = CompiledRuleSet([
+            _rule(1, r"ИНН:\s*\d{10}", priority=1),
+            _rule(2, r"\d+", active=False),
+            _rule(3, r"срочно", rule_type="regex_not_match", priority=5),
+            _rule(4, r"x", rule_type="unknown"),
+        ])
+
+        self.assertEqual([compiled.rule.id for compiled in rule_set.rules], [3, 1])
+        result = rule_set.validate("ИНН: 1234567890, срочно")
+        self.assertEqual((result.passed_rules, result.failed_rules), (["rule_1"], ["rule_3"]))
+        self.assertEqual(result.error_messages, ["error_3"])
+
+    def test_invalid_regex_keeps_previous_semantics(self):
+        """Некорректный regex: обычное правило проваливается, инвертированное проходит."""
+        rule_set = CompiledRuleSet([
+            _rule(1, r"([", rule_type="regex"),
+            _rule(2, r"([", rule_type="regex_not_fullmatch"),
+        ])
+
+        result = rule_set.validate("любой текст")
+
+        self.assertEqual((result.failed_rules, result.passed_rules), (["rule_1"], ["rule_2"]))
+
+
+class TestValidationPlanCache(unittest.TestCase):
+    """Кэш планов: повторное использование, сброс при правке правил и по возрасту."""
+
+    def setUp(self):
+        validation_rules.invalidate_validation_plans()
+        self.addCleanup(validation_rules.invalidate_validation_plans)
+
+    @patch.object(validation_rules, "load_rules_from_db")
+    def test_rules_plan_cached_until_rules_change(self, mock_load_rules):
+        """План строится один раз и пересобирается после изменения правила."""
+        mock_load_rules.return_value = [_rule(1, r"\d+")]
+
+        first = validation_rules.get_compiled_rules(7)
+        self.assertIs(validation_rules.get_compiled_rules(7), first)
+        self.assertEqual(mock_load_rules.call_count, 1)
+
+        with patch.object(validation_rules.database, "get_db_connection"), patch.object(
+            validation_rules.database, "get_cursor"
+        ) as mock_get_cursor:
+            mock_get_cursor.return_value.__enter__.return_value.rowcount = 1
+            self.assertTrue(validation_rules.toggle_rule_active(1, False))
+
+        mock_load_rules.return_value = []
+        self.assertEqual(len(validation_rules.get_compiled_rules(7)), 0)
+        self.assertEqual(mock_load_rules.call_count, 2)
+
+    @patch.object(validation_rules, "load_all_ticket_types")
+    def test_detector_expires_by_max_age(self, mock_load_types):
+        """Детектор пересобирается по истечении VALIDATION_PLAN_MAX_AGE_SECONDS."""
+        mock_load_types.return_value = []
+        validation_rules.get_ticket_type_detector()
+
+        now = validation_rules.time.monotonic() + validation_rules.settings.VALIDATION_PLAN_MAX_AGE_SECONDS + 1
+        with patch("src.sbs_helper_telegram_bot.ticket_validator.validation_rules.time.monotonic", return_value=now):
+            validation_rules.get_ticket_type_detector()
+
+        self.assertEqual(mock_load_types.call_count, 2)
+
+
+class TestValidateFileUsesPlans(unittest.TestCase):
+    """validate_file загружает правила и типы один раз на файл, а не на строку."""
+
+    def setUp(self):
+        validation_rules.invalidate_validation_plans()
+        self.addCleanup(validation_rules.invalidate_validation_plans)
+
+    @patch.object(validation_rules, "load_rules_from_db")
+    @patch.object(validation_rules, "load_all_ticket_types")
+    def test_file_rows_share_compiled_plans(self, mock_load_types, mock_load_rules):
+        """Тысяча строк двух типов — одна загрузка типов и по одной на тип для правил."""
+        mock_load_types.return_value = [
+            TicketType(id=1, type_name="Установка", description="", detection_keywords=["установка"]),
+            TicketType(id=2, type_name="Демонтаж", description="", detection_keywords=["демонтаж"]),
+        ]
+        mock_load_rules.side_effect = lambda type_id: [_rule(type_id, r"ИНН:\s*\d{10}")]
+        rows = [
+            [f"{'установка' if index % 2 else 'демонтаж'} ИНН: {1234567890 + index % 3}"]
+            for index in range(1000)
+        ] + [["неизвестно"], [None]]
+
+        processor = ExcelFileProcessor()
+        processor.read_file = MagicMock(return_value=(["Заявка"], rows))
+        processor._write_results = MagicMock()
+
+        result = processor.validate_file("tickets.xlsx", 0, output_path="out.xlsx")
+
+        self.assertIsNone(result.error_message)
+        self.assertEqual(
+            (result.valid_tickets, result.invalid_tickets, result.skipped_tickets),
+            (1000, 1, 1),
+        )
+        self.assertEqual(mock_load_types.call_count, 1)
+        self.assertEqual(sorted(call.args[0] for call in mock_load_rules.call_args_list), [1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+test_ttl_lru_cache.py — тесты ограниченного LRU-кэша с TTL.
+"""
+
+import unittest
+from unittest import mock
+
+from src.core.ai.ttl_lru_cache import TTLLRUCache
+
+
+class _Clock:
+    """Управляемые monotonic-часы."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLLRUCache(unittest.TestCase):
+    """Тесты TTLLRUCache."""
+
+    def setUp(self):
+        self.clock = _Clock()
+        patcher = mock.patch("src.core.ai.ttl_lru_cache.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_put_and_stats(self):
+        """Попадания и промахи учитываются в статистике."""
+        cache = TTLLRUCache(10, name="test")
+        cache.put("a", 1)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+        self.assertEqual(stats["name"], "test")
+
+    def test_lru_eviction_by_max_entries(self):
+        """При превышении max_entries вытесняется давно не использованная запись."""
+        cache = TTLLRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_byte_budget_eviction(self):
+        """Бюджет по размеру ограничивает суммарный размер записей."""
+        cache = TTLLRUCache(0, max_bytes=100, size_of=lambda _key, value: len(value))
+        cache.put("a", "x" * 60)
+        cache.put("b", "y" * 60)
+        cache.put("huge", "z" * 500)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "y" * 60)
+        self.assertIsNone(cache.get("huge"))
+        self.assertEqual(cache.stats()["bytes"], 60)
+
+    def test_ttl_expiry_via_heap_without_access(self):
+        """Просроченные записи удаляются при следующих операциях, не только при чтении."""
+        cache = TTLLRUCache(10, default_ttl_seconds=5)
+        cache.put("a", 1)
+        cache.put("b", 2, ttl_seconds=60)
+
+        self.clock.now += 10
+        cache.put("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_overwrite_refreshes_ttl(self):
+        """Повторный put продлевает TTL, устаревшая запись кучи не удаляет новую."""
+        cache = TTLLRUCache(10, default_ttl_seconds=5)
+        cache.put("a", 1)
+        self.clock.now += 4
+        cache.put("a", 2)
+        self.clock.now += 4
+
+        self.assertEqual(cache.purge_expired(), 0)
+        self.assertEqual(cache.get("a"), 2)
+
+    def test_get_entry_can_report_expired_entry(self):
+        """include_expired позволяет отличить истёкшую запись от отсутствующей."""
+        cache = TTLLRUCache(10, default_ttl_seconds=5)
+        cache.put("a", 1)
+        self.clock.now += 3
+        self.assertAlmostEqual(cache.get_entry("a").ttl_remaining(), 2.0)
+
+        self.clock.now += 5
+        entry = cache.get_entry("a", include_expired=True)
+        self.assertIsNotNone(entry)
+        self.assertTrue(entry.is_expired())
+        self.assertIsNone(cache.get_entry("a", include_expired=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
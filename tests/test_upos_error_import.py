@@ -0,0 +1,249 @@
+"""
+test_upos_error_import.py — тесты пакетного импорта кодов ошибок UPOS из CSV.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from src.sbs_helper_telegram_bot.upos_error import messages, upos_error_bot_part
+
+
+def _ci(value):
+    """Сравнение строк как в utf8mb4_unicode_ci: регистр, «ё»/«е», завершающие пробелы."""
+    return value.rstrip().lower().replace('ё', 'е').replace('Ё', 'Е')
+
+
+class _FakeUposCursor:
+    """Курсор-заглушка над таблицами кодов и категорий в памяти."""
+
+    def __init__(self, codes=(), categories=()):
+        self.codes = {_ci(row['error_code']): dict(row) for row in codes}
+        self.categories = {_ci(row['name']): dict(row) for row in categories}
+        self.executed = []
+        self.executemany_calls = []
+        self.fail_on_executemany = None
+        # Строки, добавленные другим процессом между предзагрузкой и записью
+        self.concurrent_codes = []
+        self.concurrent_categories = []
+        self.rowcount = -1
+        self._result = []
+        self._next_category_id = 100
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.executed.append((sql, params))
+        if "FROM upos_error_codes" in sql:
+            self._result = [dict(row) for row in self.codes.values()]
+        elif "WHERE name = %s" in sql:
+            row = self.categories.get(_ci(params[0]))
+            self._result = [{'id': row['id']}] if row else []
+        elif "FROM upos_error_categories" in sql:
+            self._result = [dict(row) for row in self.categories.values()]
+
+    def executemany(self, sql, rows):
+        sql = " ".join(sql.split())
+        rows = list(rows)
+        self.executemany_calls.append((sql, rows))
+        if self.fail_on_executemany:
+            raise self.fail_on_executemany
+        for row in self.concurrent_codes:
+            self.codes[_ci(row['error_code'])] = dict(row)
+        for row in self.concurrent_categories:
+            self.categories[_ci(row['name'])] = dict(row)
+        self.concurrent_codes, self.concurrent_categories = [], []
+        # Затронутые строки как в MySQL: вставка — 1, обновление — 2, ``id = id`` — 0
+        self.rowcount = 0
+        if sql.startswith("INSERT INTO upos_error_categories"):
+            for (name,) in rows:
+                if _ci(name) in self.categories:
+                    if "ON DUPLICATE KEY" not in sql:
+                        raise RuntimeError(f"Duplicate entry '{name}' for key 'name'")
+                    continue
+                self._next_category_id += 1
+                self.categories[_ci(name)] = {'id': self._next_category_id, 'name': name, 'active': 1}
+                self.rowcount += 1
+            return
+        for error_code, description, suggested_actions, category_id in rows:
+            existing = self.codes.get(_ci(error_code))
+            if existing is None:
+                self.codes[_ci(error_code)] = {
+                    'id': len(self.codes) + 1, 'error_code': error_code, 'active': 1,
+                    'description': description, 'suggested_actions': suggested_actions,
+                    'category_id': category_id,
+                }
+                self.rowcount += 1
+            elif "description = VALUES(description)" in sql:
+                existing.update(description=description, suggested_actions=suggested_actions)
+                if category_id is not None:
+                    existing['category_id'] = category_id
+                self.rowcount += 2
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+
+def _record(code, description="Описание", actions="Действия", category=None):
+    return {'error_code': code, 'description': description, 'suggested_actions': actions, 'category_name': category}
+
+
+class TestBulkCsvImport(unittest.TestCase):
+    """Импорт одной транзакцией: предзагрузка, executemany, одна смена версии."""
+
+    def _run(self, cursor, records, **kwargs):
+        db_patch = patch.object(upos_error_bot_part, 'database')
+        mock_database = db_patch.start()
+        self.addCleanup(db_patch.stop)
+        mock_database.get_cursor.return_value.__enter__.return_value = cursor
+        with patch.object(upos_error_bot_part, 'bump_settings_version') as mock_bump, patch.object(
+            upos_error_bot_part.ERROR_CODE_DICTIONARY, 'invalidate'
+        ) as mock_invalidate:
+            result = upos_error_bot_part.import_error_codes_from_csv(records, **kwargs)
+        self.bump_calls = mock_bump.call_count
+        self.invalidate_calls = mock_invalidate.call_count
+        self.connections = mock_database.get_db_connection.call_count
+        return result
+
+    def test_new_codes_and_categories_written_in_batches(self):
+        """Новые категории создаются одной пачкой, коды — пачками batch_size."""
+        cursor = _FakeUposCursor(categories=[{'id': 1, 'name': 'Сеть', 'active': 1}])
+        records = [_record(f"E{i:03d}", category="Принтер" if i % 2 else "сеть") for i in range(5)]
+
+        result = self._run(cursor, records, batch_size=2)
+
+        self.assertEqual((result.success_count, result.skipped_count, result.error_count), (5, 0, 0))
+        self.assertEqual(self.connections, 1)
+        code_batches = [rows for sql, rows in cursor.executemany_calls if "upos_error_codes" in sql]
+        self.assertEqual([len(rows) for rows in code_batches], [2, 2, 1])
+        category_batches = [rows for sql, rows in cursor.executemany_calls if "upos_error_categories" in sql]
+        self.assertEqual(category_batches, [[("Принтер",)]])
+        self.assertEqual(cursor.codes['e000']['category_id'], 1)
+        self.assertEqual(cursor.codes['e001']['category_id'], cursor.categories['принтер']['id'])
+        self.assertEqual((self.bump_calls, self.invalidate_calls), (1, 1))
+
+    def test_category_names_compared_like_db_collation(self):
+        """«ё»/«е» и завершающий пробел — одна категория, как в уникальном индексе БД."""
+        cursor = _FakeUposCursor(categories=[{'id': 1, 'name': 'Ёмкость', 'active': 1}])
+        records = [
+            _record("E001", category="емкость "),
+            _record("E002", category="Печать ёлки"),
+            _record("E003", category="печать елки "),
+        ]
+
+        result = self._run(cursor, records)
+
+        self.assertEqual((result.success_count, result.error_count), (3, 0))
+        category_batches = [rows for sql, rows in cursor.executemany_calls if "upos_error_categories" in sql]
+        self.assertEqual(category_batches, [[("Печать ёлки",)]])
+        self.assertEqual(cursor.codes['e001']['category_id'], 1)
+        new_id = cursor.categories['печать елки']['id']
+        self.assertEqual((cursor.codes['e002']['category_id'], cursor.codes['e003']['category_id']), (new_id, new_id))
+
+    def test_skip_existing_skips_known_and_repeated_codes(self):
+        """Существующий код (без учёта регистра) и повтор в файле пропускаются."""
+        cursor = _FakeUposCursor(codes=[{'id': 7, 'error_code': 'E001', 'active': 1}])
+        records = [_record("e001"), _record("E002"), _record("E002", description="Другое")]
+
+        result = self._run(cursor, records, skip_existing=True)
+
+        self.assertEqual((result.success_count, result.skipped_count), (1, 2))
+        ((sql, rows),) = cursor.executemany_calls
+        self.assertIn("ON DUPLICATE KEY UPDATE id = id", sql)
+        self.assertEqual(rows, [("E002", "Описание", "Действия", None)])
+
+    def test_codes_added_concurrently_are_skipped_not_successes(self):
+        """Код, появившийся после предзагрузки, не перезаписывается и считается пропуском."""
+        cursor = _FakeUposCursor()
+        cursor.concurrent_codes = [{'id': 9, 'error_code': 'E002', 'active': 1, 'description': "Чужое"}]
+
+        result = self._run(cursor, [_record("E001"), _record("E002"), _record("E003")], batch_size=2)
+
+        self.assertEqual((result.success_count, result.skipped_count, result.error_count), (2, 1, 0))
+        self.assertEqual(cursor.codes['e002']['description'], "Чужое")
+
+    def test_new_category_id_looked_up_by_inserted_name(self):
+        """Категория, созданная параллельно под другим написанием, находится по имени из CSV."""
+        cursor = _FakeUposCursor()
+        cursor.concurrent_categories = [{'id': 42, 'name': 'ПЕЧАТЬ ЕЛКИ', 'active': 1}]
+
+        result = self._run(cursor, [_record("E001", category="Печать ёлки")])
+
+        self.assertEqual(result.success_count, 1)
+        self.assertIn(
+            ("SELECT id FROM upos_error_categories WHERE name = %s", ("Печать ёлки",)), cursor.executed
+        )
+        self.assertEqual(cursor.codes['e001']['category_id'], 42)
+
+    def test_update_existing_keeps_category_unless_known(self):
+        """Обновление меняет категорию только на уже существующую, последняя запись побеждает."""
+        cursor = _FakeUposCursor(
+            codes=[
+                {'id': 7, 'error_code': 'E001', 'active': 1, 'category_id': 1},
+                {'id': 8, 'error_code': 'E002', 'active': 1, 'category_id': 1},
+            ],
+            categories=[{'id': 1, 'name': 'Сеть', 'active': 1}, {'id': 2, 'name': 'Принтер', 'active': 1}],
+        )
+        records = [
+            _record("e001", description="Новое", category="Принтер"),
+            _record("E002", category="Неизвестная"),
+            _record("E002", description="Последнее"),
+        ]
+
+        result = self._run(cursor, records, skip_existing=False)
+
+        self.assertEqual((result.success_count, result.skipped_count, result.error_count), (3, 0, 0))
+        self.assertEqual(cursor.codes['e001']['description'], "Новое")
+        self.assertEqual(cursor.codes['e001']['category_id'], 2)
+        self.assertEqual(cursor.codes['e002']['description'], "Последнее")
+        self.assertEqual(cursor.codes['e002']['category_id'], 1)
+        self.assertNotIn('неизвестная', cursor.categories)
+        ((sql, rows),) = cursor.executemany_calls
+        self.assertIn("description = VALUES(description)", sql)
+        # Пишется исходное написание кода из БД
+        self.assertEqual(rows[0][0], "E001")
+
+    def test_inactive_code_or_category_is_record_error(self):
+        """Отключённые код и категория дают ошибку записи, остальные импортируются."""
+        cursor = _FakeUposCursor(
+            codes=[{'id': 7, 'error_code': 'E001', 'active': 0}],
+            categories=[{'id': 3, 'name': 'Архив', 'active': 0}],
+        )
+        records = [_record("E001"), _record("E002", category="Архив"), _record("E003")]
+
+        result = self._run(cursor, records, skip_existing=False)
+
+        self.assertEqual((result.success_count, result.error_count), (1, 2))
+        self.assertEqual(result.errors, [
+            messages.MESSAGE_CSV_ERROR_IMPORT.format(code="E001", error=messages.MESSAGE_CSV_ERROR_CODE_INACTIVE),
+            messages.MESSAGE_CSV_ERROR_IMPORT.format(
+                code="E002", error=messages.MESSAGE_CSV_ERROR_CATEGORY_INACTIVE.format(name="Архив")
+            ),
+        ])
+        self.assertIn('e003', cursor.codes)
+
+    def test_failed_transaction_reports_nothing_saved(self):
+        """Ошибка БД откатывает весь импорт, справочник не сбрасывается."""
+        cursor = _FakeUposCursor(codes=[{'id': 7, 'error_code': 'E001', 'active': 1}])
+        cursor.fail_on_executemany = RuntimeError("Deadlock found")
+
+        result = self._run(cursor, [_record("E001"), _record("E002"), _record("E003")])
+
+        self.assertEqual((result.success_count, result.skipped_count, result.error_count), (0, 1, 2))
+        self.assertIn("Deadlock found", result.errors[-1])
+        self.assertEqual(self.invalidate_calls, 0)
+
+    def test_nothing_to_write_does_not_bump_version(self):
+        """Если все коды пропущены, запись и смена версии не выполняются."""
+        cursor = _FakeUposCursor(codes=[{'id': 7, 'error_code': 'E001', 'active': 1}])
+
+        result = self._run(cursor, [_record("E001")])
+
+        self.assertEqual(result.skipped_count, 1)
+        self.assertEqual(cursor.executemany_calls, [])
+        self.assertEqual((self.bump_calls, self.invalidate_calls), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()